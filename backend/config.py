@@ -65,10 +65,38 @@ class Settings(BaseSettings):
     UPSTOX_CANDLE_RL_SCHEDULED_MAX_WAIT: float = float(
         os.getenv("UPSTOX_CANDLE_RL_SCHEDULED_MAX_WAIT", "300")
     )
+    # Background candle refreshes (cache stale-while-revalidate, 5m prefetch) give up
+    # after this many seconds so they never queue behind signal-path fetches.
+    UPSTOX_CANDLE_RL_BACKGROUND_MAX_WAIT: float = float(
+        os.getenv("UPSTOX_CANDLE_RL_BACKGROUND_MAX_WAIT", "20")
+    )
+    # Exit/entry candle checks (CandlePriority.ORDER) outrank warms in the queue but
+    # give up quickly: a stale exit decision is worse than a skipped one.
+    UPSTOX_CANDLE_RL_ORDER_MAX_WAIT: float = float(os.getenv("UPSTOX_CANDLE_RL_ORDER_MAX_WAIT", "10"))
     # Reserve this many 30-min-window slots for the next scheduled_10m (~200 keys + buffer).
     # Discretionary fetches deny when usage would exceed (per_30min - headroom).
     SCHEDULED_CANDLE_RL_HEADROOM: int = int(os.getenv("SCHEDULED_CANDLE_RL_HEADROOM", "220"))
 
+    # Per-endpoint-family budgets for the rest of the Upstox REST API (quotes,
+    # option chains, orders, positions/funds); same scheduler as candles. A 429
+    # halves the family's caps, recovering 10% per 30 s. ORDER-class requests
+    # (order placement/modify/cancel, exit checks) keep the reserve share of each cap.
+    UPSTOX_API_RATE_LIMIT_ENABLED: bool = os.getenv("UPSTOX_API_RATE_LIMIT_ENABLED", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    UPSTOX_API_RL_MAX_WAIT: float = float(os.getenv("UPSTOX_API_RL_MAX_WAIT", "10"))
+    UPSTOX_API_RL_ORDER_RESERVE: float = float(os.getenv("UPSTOX_API_RL_ORDER_RESERVE", "0.2"))
+    UPSTOX_QUOTE_RL_PER_SEC: int = int(os.getenv("UPSTOX_QUOTE_RL_PER_SEC", "25"))
+    UPSTOX_QUOTE_RL_PER_MIN: int = int(os.getenv("UPSTOX_QUOTE_RL_PER_MIN", "400"))
+    UPSTOX_OPTION_CHAIN_RL_PER_SEC: int = int(os.getenv("UPSTOX_OPTION_CHAIN_RL_PER_SEC", "10"))
+    UPSTOX_OPTION_CHAIN_RL_PER_MIN: int = int(os.getenv("UPSTOX_OPTION_CHAIN_RL_PER_MIN", "150"))
+    UPSTOX_ORDER_RL_PER_SEC: int = int(os.getenv("UPSTOX_ORDER_RL_PER_SEC", "10"))
+    UPSTOX_ORDER_RL_PER_MIN: int = int(os.getenv("UPSTOX_ORDER_RL_PER_MIN", "250"))
+    UPSTOX_PORTFOLIO_RL_PER_SEC: int = int(os.getenv("UPSTOX_PORTFOLIO_RL_PER_SEC", "10"))
+    UPSTOX_PORTFOLIO_RL_PER_MIN: int = int(os.getenv("UPSTOX_PORTFOLIO_RL_PER_MIN", "200"))
+
     # Stock/next VWAP+EMA5 hourly REST warm (arbitrage_master stock_* / nextmth_*).
     # Default OFF: those four columns have no live readers after SF/Vajra removal
     # (c115a77); the job contended with scheduled_10m on the shared candle RL.
@@ -90,6 +118,23 @@ class Settings(BaseSettings):
     # bars update every interval, so keep short; daily/weekly far longer.
     UPSTOX_CANDLE_CACHE_TTL_INTRADAY_SEC: float = float(os.getenv("UPSTOX_CANDLE_CACHE_TTL_INTRADAY_SEC", "150"))
     UPSTOX_CANDLE_CACHE_TTL_DAILY_SEC: float = float(os.getenv("UPSTOX_CANDLE_CACHE_TTL_DAILY_SEC", "900"))
+    # Stale-while-revalidate: an entry up to this many seconds past its TTL is
+    # returned immediately while one low-priority background refresh is queued
+    # (0 disables; expired entries then block on a synchronous fetch). Opt-in:
+    # callers may also pass ``cache_stale_sec`` to accept stale bars per call.
+    UPSTOX_CANDLE_CACHE_SWR_SEC: float = float(os.getenv("UPSTOX_CANDLE_CACHE_SWR_SEC", "0"))
+    # On-disk historical candle store shared by every backtest (market_data.candle_store).
+    # Fetches with a past range_end_date are served from it; Upstox is only asked for
+    # sessions not stored yet. Empty dir => data/candle_store under the repo root.
+    CANDLE_STORE_ENABLED: bool = os.getenv("CANDLE_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+    CANDLE_STORE_DIR: str = os.getenv("CANDLE_STORE_DIR", "")
+    # Refetch the curr-month 5m universe this many seconds after each 5m bar close.
+    CANDLE_PREFETCH_5M_ENABLED: bool = os.getenv("CANDLE_PREFETCH_5M_ENABLED", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    CANDLE_PREFETCH_5M_DELAY_SEC: int = int(os.getenv("CANDLE_PREFETCH_5M_DELAY_SEC", "20"))
 
     # Iron Condor advisory sizing (workspace UI no longer edits these; override via env on EC2)
     IRON_CONDOR_TRADING_CAPITAL_DEFAULT: float = float(os.getenv("IRON_CONDOR_TRADING_CAPITAL_DEFAULT", "500000"))
@@ -119,6 +164,46 @@ class Settings(BaseSettings):
     )
     # Drop WebSocket quote if last tick older than this (seconds); gate uses heatmap or WS fallback
     UPSTOX_MARKET_FEED_STALE_SEC: float = float(os.getenv("UPSTOX_MARKET_FEED_STALE_SEC", "120"))
+    # Upstox portfolio-stream WebSocket (order updates) feeding the order-state hub; live fill
+    # waiters wake on it (and on postbacks) and fall back to slow REST polling
+    UPSTOX_PORTFOLIO_STREAM_ENABLED: bool = os.getenv("UPSTOX_PORTFOLIO_STREAM_ENABLED", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    # Feed-thread DB writes go through one background flusher (multi-row upserts on a
+    # fixed cadence) instead of one INSERT+commit per instrument per frame.
+    UPSTOX_WS_WRITER_ENABLED: bool = os.getenv("UPSTOX_WS_WRITER_ENABLED", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    UPSTOX_WS_WRITER_FLUSH_SEC: float = float(os.getenv("UPSTOX_WS_WRITER_FLUSH_SEC", "1.0"))
+    # Read feed fields straight off the protobuf objects (MessageToDict path stays as fallback).
+    UPSTOX_WS_DIRECT_DECODE: bool = os.getenv("UPSTOX_WS_DIRECT_DECODE", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    # Optional: append raw feed frames (length-prefixed) here for decode benchmarks / replay.
+    UPSTOX_WS_RECORD_FRAMES_PATH: str = os.getenv("UPSTOX_WS_RECORD_FRAMES_PATH", "")
+
+    # Application log files: producers enqueue, one writer thread batches writes (log_pipeline).
+    # false => legacy flush+fsync on every record from the calling thread.
+    LOG_PIPELINE_ENABLED: bool = os.getenv("LOG_PIPELINE_ENABLED", "true").lower() in ("1", "true", "yes")
+    LOG_FLUSH_INTERVAL_SEC: float = float(os.getenv("LOG_FLUSH_INTERVAL_SEC", "0.5"))
+    # fsync cadence; ERROR records and shutdown always fsync immediately
+    LOG_FSYNC_INTERVAL_SEC: float = float(os.getenv("LOG_FSYNC_INTERVAL_SEC", "5"))
+    LOG_MAX_BYTES: int = int(os.getenv("LOG_MAX_BYTES", str(100 * 1024 * 1024)))
+    LOG_BACKUP_COUNT: int = int(os.getenv("LOG_BACKUP_COUNT", "10"))
+    LOG_ROTATE_DAILY: bool = os.getenv("LOG_ROTATE_DAILY", "true").lower() in ("1", "true", "yes")
+    # Pending records beyond this are dropped (below ERROR) rather than blocking callers
+    LOG_QUEUE_MAX: int = int(os.getenv("LOG_QUEUE_MAX", "100000"))
+    # Per-logger caps, "logger.prefix=records_per_sec,..."; ERROR+ is never limited
+    LOG_RATE_LIMITS: str = os.getenv(
+        "LOG_RATE_LIMITS",
+        "backend.services.upstox_market_feed=20,backend.services.upstox_ws_writer=20,backend.services.vwap_updater=50",
+    )
 
     # Pre-market watchlist schedule (IST, HH:MM)
     PREMKET_ENABLED: bool = os.getenv("PREMKET_ENABLED", "true").lower() in ("1", "true", "yes")
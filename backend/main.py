@@ -86,24 +86,12 @@ for handler in root_logger.handlers[:]:
 # CRITICAL: Write logs ONLY to the log file (trademanthan.log), not stdout/stderr
 # This ensures all logs go to a single file regardless of how backend is started
 
-# CRITICAL: Create a custom handler class that flushes after each emit
-class FlushingFileHandler(logging.FileHandler):
-    """FileHandler that flushes after each log entry to ensure immediate writes"""
-    def emit(self, record):
-        super().emit(record)
-        self.flush()
-        # Also force OS-level flush to ensure data is written to disk
-        if hasattr(self.stream, 'fileno'):
-            try:
-                import os
-                os.fsync(self.stream.fileno())
-            except (OSError, AttributeError):
-                pass  # Ignore if fsync fails
+# File logging goes through log_pipeline: callers enqueue, one writer thread batches writes,
+# flushes/fsyncs on a cadence (immediately for ERROR) and rotates. LOG_PIPELINE_ENABLED=false
+# falls back to the old flush+fsync-per-record FileHandler.
+from backend.services.log_pipeline import get_file_handler, shutdown as shutdown_log_pipeline
 
-# Use FlushingFileHandler to ensure immediate log writes
-file_handler = FlushingFileHandler(log_file, mode='a', encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+file_handler = get_file_handler(log_file, level=logging.INFO)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -274,7 +262,24 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"⚠️ Error stopping ATR daily precompute scheduler: {e}", exc_info=True)
 
+    try:
+        from backend.services.upstox_portfolio_feed import stop_portfolio_feed
+
+        stop_portfolio_feed()
+        logger.info("✅ Upstox portfolio feed stopped")
+    except Exception as e:
+        logger.error(f"⚠️ Error stopping Upstox portfolio feed: {e}", exc_info=True)
+
+    try:
+        from backend.services.upstox_ws_writer import stop_writer
+
+        stop_writer()
+        logger.info("✅ Upstox WS writer flushed and stopped")
+    except Exception as e:
+        logger.error(f"⚠️ Error stopping Upstox WS writer: {e}", exc_info=True)
+
     logger.info("✅ Shutdown complete")
+    shutdown_log_pipeline()
 
 app = FastAPI(
     title="Trade Manthan API",
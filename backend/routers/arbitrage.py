@@ -17,6 +17,7 @@ from backend.config import get_instruments_file_path
 from backend.database import engine
 from backend.utils.json_safe import json_safe_row
 from backend.services.upstox_service import UpstoxService
+from backend.services.upstox_async import get_async_upstox_service
 from backend.config import settings
 
 from backend.services.arbitrage_daily_setup_scheduler import (
@@ -368,10 +369,11 @@ async def get_arbitrage_selection():
     falls back to the legacy DB-only query.
     """
     try:
-        rows, err = _arbitrage_selection_rows_live()
+        upstox_async = get_async_upstox_service()
+        rows, err = await upstox_async.run_sync(_arbitrage_selection_rows_live)
         ltp_source = "live"
         if err == "live_quotes_unavailable":
-            rows = _arbitrage_selection_rows_db_only()
+            rows = await upstox_async.run_sync(_arbitrage_selection_rows_db_only)
             ltp_source = "db_fallback"
 
         return JSONResponse(
@@ -821,9 +823,11 @@ async def get_pivot_breakout(
             ).mappings().all()
 
         upstox = UpstoxService(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET)
-        target_date_str, use_same_day = _pivot_breakout_candle_mode(upstox)
+        upstox_async = get_async_upstox_service()
+        target_date_str, use_same_day = await upstox_async.run_sync(_pivot_breakout_candle_mode, upstox)
         interval = ohlc_interval if ohlc_interval in ("daily", "hourly", "15min") else "daily"
-        bullish, bearish = _process_pivot_batch(
+        bullish, bearish = await upstox_async.run_sync(
+            _process_pivot_batch,
             rows,
             upstox,
             target_date_str,
@@ -891,10 +895,11 @@ async def get_pivot_breakout_debug(
             return {"success": False, "error": f"Symbol {symbol} not found in arbitrage_master"}
 
         upstox = UpstoxService(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET)
-        target_date_str, use_same_day = _pivot_breakout_candle_mode(upstox)
+        upstox_async = get_async_upstox_service()
+        target_date_str, use_same_day = await upstox_async.run_sync(_pivot_breakout_candle_mode, upstox)
         live_ltp = None
         try:
-            quote = upstox.get_market_quote_by_key(row["currmth_future_instrument_key"])
+            quote = await upstox_async.get_market_quote_by_key(row["currmth_future_instrument_key"])
             if quote:
                 live_price = float(quote.get("last_price", 0) or 0)
                 if live_price > 0:
@@ -903,11 +908,12 @@ async def get_pivot_breakout_debug(
             live_ltp = None
         ltp = float(live_ltp if live_ltp is not None else row["currmth_future_ltp"])
         interval = ohlc_interval if ohlc_interval in ("daily", "hourly", "15min") else "daily"
-        ohlc = _get_prev_day_ohlc(
-            upstox, row["currmth_future_instrument_key"], target_date_str, interval, use_same_day
+        ohlc = await upstox_async.run_sync(
+            _get_prev_day_ohlc, upstox, row["currmth_future_instrument_key"], target_date_str, interval, use_same_day
         )
         if not ohlc:
-            candles = upstox.get_historical_candles_by_instrument_key(
+            candles = await upstox_async.run_sync(
+                upstox.get_historical_candles_by_instrument_key,
                 row["currmth_future_instrument_key"],
                 interval="minutes/15" if interval == "15min" else "hours/1" if interval == "hourly" else "days/1",
                 days_back=5 if interval in ("hourly", "15min") else 15,
@@ -962,8 +968,11 @@ async def get_pivot_breakout_debug(
             "note": f"R3/S3 from previous day OHLC ({interval} candles). Use ?ohlc_interval=hourly or 15min for intraday-aggregated, and ?threshold_pct=1|2|3|5 for band.",
         }
         if interval == "daily":
-            candles = upstox.get_historical_candles_by_instrument_key(
-                row["currmth_future_instrument_key"], interval="days/1", days_back=15
+            candles = await upstox_async.run_sync(
+                upstox.get_historical_candles_by_instrument_key,
+                row["currmth_future_instrument_key"],
+                interval="days/1",
+                days_back=15,
             ) or []
             out["available_candle_dates"] = sorted(
                 set(_candle_date_ist(c) for c in candles if _candle_date_ist(c))
@@ -1026,10 +1035,12 @@ async def get_pivot_breakout_report(
             ).mappings().all()
 
         upstox = UpstoxService(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET)
-        target_date_str, use_same_day = _pivot_breakout_candle_mode(upstox)
+        upstox_async = get_async_upstox_service()
+        target_date_str, use_same_day = await upstox_async.run_sync(_pivot_breakout_candle_mode, upstox)
         interval = ohlc_interval if ohlc_interval in ("daily", "hourly", "15min") else "daily"
         failures: list[dict] = []
-        bullish, bearish = _process_pivot_batch(
+        bullish, bearish = await upstox_async.run_sync(
+            _process_pivot_batch,
             rows,
             upstox,
             target_date_str,
@@ -1111,7 +1122,8 @@ async def get_pivot_breakout_stream(
                 ).mappings().all()
 
             upstox = UpstoxService(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET)
-            target_date_str, use_same_day = _pivot_breakout_candle_mode(upstox)
+            upstox_async = get_async_upstox_service()
+            target_date_str, use_same_day = await upstox_async.run_sync(_pivot_breakout_candle_mode, upstox)
             interval = ohlc_interval if ohlc_interval in ("daily", "hourly", "15min") else "daily"
             band_pct = max(0.1, min(threshold_pct or 5.0, 10.0))
             all_bullish: list[dict] = []
@@ -1121,7 +1133,8 @@ async def get_pivot_breakout_stream(
 
             for i in range(0, len(rows), BATCH_SIZE):
                 batch = rows[i : i + BATCH_SIZE]
-                b, be = _process_pivot_batch(
+                b, be = await upstox_async.run_sync(
+                    _process_pivot_batch,
                     batch,
                     upstox,
                     target_date_str,
@@ -31,8 +31,11 @@ def candle_warm_cycles(
     limit: int = Query(36, ge=1, le=72),
     user: User = Depends(get_current_user),
 ):
-    """Rolling candle-warm cycle deny rates + symbols missing candles."""
+    """Rolling candle-warm cycle deny rates + symbols missing candles, plus live
+    candle-scheduler state (per-class grants/drops/wait histograms)."""
     try:
+        from backend.services.upstox_rate_limiter import stats as candle_rl_stats
+
         cycles = recent_warm_cycles(limit=limit)
         return JSONResponse(
             status_code=200,
@@ -41,6 +44,7 @@ def candle_warm_cycles(
                 "count": len(cycles),
                 "latest": latest_warm_cycle(),
                 "cycles": cycles,
+                "candle_rl": candle_rl_stats(),
             },
         )
     except Exception as e:
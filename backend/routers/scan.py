@@ -12,12 +12,12 @@ import json
 import os
 import sys
 import time
-import requests
 from urllib.parse import urlencode, parse_qs, quote
 import secrets
 import logging
 import asyncio
 import threading
+import functools
 from pathlib import Path
 
 # Configure logger to write to smart_future_algo.log instead of trademanthan.log
@@ -28,38 +28,22 @@ log_dir = Path(__file__).parent.parent.parent / 'logs'
 log_dir.mkdir(exist_ok=True)
 log_file = log_dir / 'smart_future_algo.log'
 
-# Create file handler with immediate flushing
-class FlushingFileHandler(logging.FileHandler):
-    """FileHandler that flushes after each log entry to ensure immediate writes"""
-    def emit(self, record):
-        super().emit(record)
-        self.flush()
-        if hasattr(self.stream, 'fileno'):
-            try:
-                import os
-                os.fsync(self.stream.fileno())
-            except (OSError, AttributeError):
-                pass
-
 # Get the logger for backend.routers.scan (smart_future_algo.py will also configure this)
 logger = logging.getLogger(__name__)  # This will be 'backend.routers.scan'
 
 # Check if handler already exists to avoid duplicates
 handler_exists = False
 for h in logger.handlers:
-    if isinstance(h, logging.FileHandler):
-        handler_path = getattr(h, 'baseFilename', None) or (getattr(h, 'stream', {}).name if hasattr(getattr(h, 'stream', None), 'name') else None)
-        if handler_path and 'smart_future_algo.log' in str(handler_path):
-            handler_exists = True
-            break
+    handler_path = getattr(h, 'baseFilename', None)
+    if handler_path and 'smart_future_algo.log' in str(handler_path):
+        handler_exists = True
+        break
 
 if not handler_exists:
-    file_handler = FlushingFileHandler(log_file, mode='a', encoding='utf-8')
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    ))
+    # Queue-backed handler shared with smart_future_algo (see services/log_pipeline.py)
+    from backend.services.log_pipeline import get_file_handler
+
+    file_handler = get_file_handler(log_file, level=logging.INFO)
     logger.setLevel(logging.INFO)
     logger.addHandler(file_handler)
     logger.propagate = False  # Only log to smart_future_algo.log, not to root logger
@@ -90,6 +74,11 @@ from backend.services.dashboard_oi_heatmap import (
 )
 from backend.services.oi_heatmap import get_live_oi_heatmap_json
 from backend.services.market_holiday import is_nse_holiday_ist, should_skip_scheduled_market_jobs_ist
+from backend.services.trading_calendar import get_trading_calendar
+from backend.services.upstox_http import get_session as get_upstox_http_session
+from backend.services.upstox_http import stats as upstox_http_stats
+from backend.services.upstox_async import get_async_upstox_service
+from backend.services.webhook_enrichment import StageTimer, archive_webhook_payload, enrich_webhook_stocks
 from backend.services import live_trading
 from backend.database import get_db
 from backend.models.trading import IntradayStockOption, MasterStock, HistoricalMarketData
@@ -140,6 +129,7 @@ def _run_webhook_worker(webhook_data: dict, forced_type: Optional[str]) -> None:
 
     from backend.database import SessionLocal
 
+    archive_webhook_payload(webhook_data, forced_type)
     db = SessionLocal()
     try:
         with _webhook_process_lock:
@@ -683,22 +673,17 @@ def find_option_contract_from_instruments(stock_name: str, option_type: str, sto
         if api_instrument_key:
             logger.info(f"✅ Using instrument_key from option chain API for {stock_name} {option_type}: {api_instrument_key}")
             # Direct lookup by instrument_key - bypass underlying_symbol/strike matching which can fail for Bearish
-            from backend.config import get_instruments_file_path
-            instruments_file = get_instruments_file_path()
-            if instruments_file.exists():
-                try:
-                    with open(instruments_file, 'r') as f:
-                        instruments_data = json_lib.load(f)
-                    if isinstance(instruments_data, list):
-                        for inst in instruments_data:
-                            if isinstance(inst, dict) and inst.get('instrument_key') == api_instrument_key:
-                                option_contract = inst.get('trading_symbol') or inst.get('tradingsymbol')
-                                if option_contract:
-                                    logger.info(f"✅ Found option by instrument_key for {stock_name} {option_type}: {option_contract}")
-                                    return (option_contract, api_instrument_key)
-                                break
-                except Exception as lookup_err:
-                    logger.warning(f"Direct instrument_key lookup failed: {lookup_err}, falling back to instruments search")
+            from backend.services.instrument_master import get_instrument_master
+            try:
+                master = get_instrument_master()
+                inst = master.get(api_instrument_key) if master is not None else None
+                if inst is not None:
+                    option_contract = inst.get('trading_symbol') or inst.get('tradingsymbol')
+                    if option_contract:
+                        logger.info(f"✅ Found option by instrument_key for {stock_name} {option_type}: {option_contract}")
+                        return (option_contract, api_instrument_key)
+            except Exception as lookup_err:
+                logger.warning(f"Direct instrument_key lookup failed: {lookup_err}, falling back to instruments search")
             # If direct lookup failed, continue with normal flow below
         
         logger.info(f"Looking for {option_type} option with strike {target_strike} for {stock_name}")
@@ -713,9 +698,23 @@ def find_option_contract_from_instruments(stock_name: str, option_type: str, sto
             logger.error(f"Instruments JSON file not found: {instruments_file}")
             return (None, None)
         
-        # Load instruments data with retry logic
+        # Candidate rows come from the indexed instrument master (underlying + NSE_FO + CE/PE);
+        # fall back to loading the full JSON with retry logic if the master is unavailable.
         max_retries = 3
         instruments_data = None
+        symbols_to_try = _symbols_to_try_for_underlying(stock_name)
+        try:
+            from backend.services.instrument_master import get_instrument_master
+            master = get_instrument_master(instruments_file)
+            if master is not None:
+                instruments_data = [
+                    inst
+                    for u in symbols_to_try
+                    for inst in master.by_underlying(u, segment='NSE_FO', instrument_type=option_type)
+                ]
+                max_retries = 0
+        except Exception as master_err:
+            logger.warning(f"Instrument master lookup failed for {stock_name}: {master_err}, loading JSON")
         
         for retry in range(1, max_retries + 1):
             try:
@@ -761,7 +760,6 @@ def find_option_contract_from_instruments(stock_name: str, option_type: str, sto
         best_match = None
         best_match_score = float('inf')
         
-        symbols_to_try = _symbols_to_try_for_underlying(stock_name)
         for inst in instruments_data:
             # Skip non-dictionary entries
             if not isinstance(inst, dict):
@@ -901,6 +899,588 @@ def find_option_contract_from_master_stock(db: Session, stock_name: str, option_
         return (None, None)
 
 
+def _enrich_webhook_stock(stock: dict, forced_option_type: str, triggered_datetime: datetime, vwap_service) -> dict:
+    """
+    Enrich one webhook stock: LTP/VWAP, option contract (option chain), instrument key and lot size,
+    option LTP and candles, previous-hour VWAP. Every activity is independent and failures only
+    leave defaults, so a row is always returned. Runs on webhook enrichment worker threads.
+    """
+    import pytz
+
+    ist = pytz.timezone('Asia/Kolkata')
+    stock_name = stock.get("stock_name", "")
+    trigger_price = stock.get("trigger_price", 0.0)
+
+    logger.info(f"Processing stock: {stock_name}")
+
+    # Initialize all fields with defaults - each activity is independent
+    stock_ltp = trigger_price
+    stock_vwap = 0.0
+    option_contract = None
+    option_strike = 0.0
+    qty = 0
+    option_ltp = 0.0
+    instrument_key = None
+    option_candles = None
+    stock_vwap_previous_hour = None
+    stock_vwap_previous_hour_time = None
+
+    # ====================================================================
+    # ACTIVITY 1: Fetch Stock LTP and VWAP (Independent)
+    # ====================================================================
+    try:
+        stock_data = vwap_service.get_stock_ltp_and_vwap(stock_name)
+        if stock_data:
+            if stock_data.get('ltp') and stock_data['ltp'] > 0:
+                stock_ltp = stock_data['ltp']
+                logger.info(f"✅ Stock LTP for {stock_name}: ₹{stock_ltp:.2f}")
+            else:
+                logger.info(f"⚠️ Could not fetch LTP for {stock_name}, using trigger price: ₹{trigger_price}")
+
+            if stock_data.get('vwap') and stock_data['vwap'] > 0:
+                stock_vwap = stock_data['vwap']
+                logger.info(f"✅ Stock VWAP for {stock_name}: ₹{stock_vwap:.2f}")
+            else:
+                logger.info(f"⚠️ Could not fetch VWAP for {stock_name} - will retry via hourly updater")
+        else:
+            logger.info(f"⚠️ Stock data fetch completely failed for {stock_name} - using defaults")
+    except Exception as e:
+        logger.info(f"❌ Stock data fetch failed for {stock_name}: {str(e)} - Using trigger price")
+        import traceback
+        traceback.print_exc()
+
+    # ====================================================================
+    # ACTIVITY 2: Find Option Contract (Independent)
+    # ====================================================================
+    logger.info(f"🔍 ACTIVITY 2: Finding option contract for {stock_name} with forced_option_type={forced_option_type}, stock_ltp={stock_ltp}")
+    max_retries = 3
+    for retry_attempt in range(1, max_retries + 1):
+        try:
+            logger.info(f"Calling find_option_contract_from_master_stock for {stock_name} (attempt {retry_attempt})")
+            contract_result = find_option_contract_from_master_stock(
+                None, stock_name, forced_option_type, stock_ltp, vwap_service
+            )
+            option_contract = contract_result[0] if isinstance(contract_result, tuple) else contract_result
+            instrument_key = contract_result[1] if isinstance(contract_result, tuple) and len(contract_result) >= 2 else None
+            logger.info(f"find_option_contract_from_master_stock returned: option_contract={option_contract}, instrument_key={'...' + str(instrument_key)[-20:] if instrument_key else None}")
+            if option_contract:
+                if instrument_key:
+                    logger.info(f"✅ Using instrument_key from option chain for {stock_name} (Bearish/PE fix)")
+                logger.info(f"✅ Option contract found for {stock_name} (attempt {retry_attempt}): {option_contract}")
+                break
+            else:
+                if retry_attempt < max_retries:
+                    logger.info(f"⚠️ No option contract found for {stock_name} (attempt {retry_attempt}/{max_retries}), retrying...")
+                    logger.warning(f"⚠️ No option contract found for {stock_name} (attempt {retry_attempt}/{max_retries}), retrying...")
+                    import time
+                    time.sleep(1)  # Brief delay before retry
+                else:
+                    logger.info(f"⚠️ No option contract found for {stock_name} after {max_retries} attempts")
+                    logger.warning(f"⚠️ No option contract found for {stock_name} after {max_retries} attempts")
+        except Exception as e:
+            if retry_attempt < max_retries:
+                logger.info(f"⚠️ Option contract search failed for {stock_name} (attempt {retry_attempt}/{max_retries}): {str(e)}, retrying...")
+                logger.warning(f"⚠️ Option contract search failed for {stock_name} (attempt {retry_attempt}/{max_retries}): {str(e)}, retrying...")
+                import time
+                time.sleep(1)  # Brief delay before retry
+            else:
+                logger.info(f"⚠️ Option contract search failed for {stock_name} after {max_retries} attempts: {str(e)}")
+                logger.error(f"⚠️ Option contract search failed for {stock_name} after {max_retries} attempts: {str(e)}")
+                option_contract = None
+
+    # ====================================================================
+    # ACTIVITY 3: Extract Option Strike (Independent - requires option_contract)
+    # ====================================================================
+    if option_contract:
+        try:
+            import re
+            match = re.search(r'-(\d+\.?\d*)-(?:CE|PE)$', option_contract)
+            if match:
+                option_strike = float(match.group(1))
+                logger.info(f"✅ Extracted option strike: {option_strike} from {option_contract}")
+            else:
+                logger.info(f"⚠️ Could not extract option strike from {option_contract} - regex did not match")
+                logger.warning(f"Could not extract option strike from {option_contract} for {stock_name}")
+        except Exception as e:
+            logger.info(f"❌ ERROR extracting option strike from {option_contract}: {str(e)}")
+            logger.error(f"Error extracting option strike from {option_contract} for {stock_name}: {str(e)}", exc_info=True)
+
+    # ====================================================================
+    # ACTIVITY 4: Fetch Lot Size from instruments.json (Independent - requires option_contract)
+    # NOTE: Lot size is now fetched in ACTIVITY 5 when we find instrument_key
+    # This activity is kept for backward compatibility but lot_size should be
+    # fetched from instruments.json in Activity 5, not from master_stock table
+    # ====================================================================
+    # Lot size is now fetched from instruments.json in Activity 5 when instrument_key is found
+    # This ensures we use the same data source and don't depend on master_stock table
+    # If lot_size wasn't found in Activity 5, it will remain 0 (default)
+    if option_contract and qty == 0:
+        logger.info(f"⚠️ Lot size not found in instruments.json for {option_contract}, qty remains 0")
+        logger.warning(f"Lot size not found in instruments.json for {option_contract} (stock: {stock_name})")
+
+    # ====================================================================
+    # ACTIVITY 5: Find Instrument Key from instruments.json (Independent - requires option_contract)
+    # When instrument_key from option chain API is available (Bearish/PE fix), use it and only fetch lot_size
+    # ====================================================================
+    if option_contract:
+        try:
+            from pathlib import Path
+            import json as json_lib
+            import re
+
+            from backend.config import get_instruments_file_path
+            instruments_file = get_instruments_file_path()
+
+            # FAST PATH: resolve from the indexed instrument master (no JSON parse) — by the
+            # option chain's instrument_key (Bearish/PE fix), else by trading_symbol.
+            skip_full_search = False
+            try:
+                from backend.services.instrument_master import get_instrument_master
+
+                master = get_instrument_master(instruments_file) if instruments_file.exists() else None
+                inst = master.get(instrument_key) if (master is not None and instrument_key) else None
+                if inst is None and master is not None:
+                    inst = next(
+                        (r for r in master.by_trading_symbol(option_contract.strip()) if r.get('instrument_key')),
+                        None,
+                    )
+                if inst is not None:
+                    instrument_key = inst.get('instrument_key')
+                    inst_lot = inst.get('lot_size')
+                    if inst_lot and inst_lot > 0:
+                        qty = int(inst_lot)
+                    logger.info(f"✅ Resolved {option_contract} from instrument master for {stock_name}: instrument_key={instrument_key}, lot_size={qty or 'N/A'}")
+                    skip_full_search = True
+            except Exception as fast_err:
+                logger.warning(f"Instrument master lookup failed: {fast_err}, falling back to full search")
+
+            if skip_full_search:
+                pass  # instrument_key and lot_size already set
+            elif not instruments_file.exists():
+                logger.info(f"⚠️ Instruments JSON file not found: {instruments_file}")
+                logger.error(f"Instruments JSON file not found: {instruments_file}")
+            else:
+                # CRITICAL: Retry logic ensures we can read the file even if there are transient issues
+                # The file age doesn't matter - as long as instruments match, they will be found
+                max_retries = 3
+                instruments_data = None
+
+                for retry in range(1, max_retries + 1):
+                    try:
+                        logger.info(f"📂 Loading instruments from: {instruments_file} (attempt {retry}/{max_retries})")
+                        with open(instruments_file, 'r') as f:
+                            instruments_data = json_lib.load(f)
+                        logger.info(f"✅ Loaded {len(instruments_data)} instruments from file")
+                        break  # Success - exit retry loop
+                    except (json_lib.JSONDecodeError, IOError, OSError) as file_error:
+                        if retry < max_retries:
+                            import time
+                            wait_time = retry * 0.5  # Exponential backoff: 0.5s, 1s, 1.5s
+                            logger.info(f"⚠️ Failed to read instruments file (attempt {retry}/{max_retries}): {str(file_error)}")
+                            logger.info(f"   Retrying in {wait_time}s...")
+                            time.sleep(wait_time)
+                        else:
+                            logger.info(f"❌ ERROR: Failed to read instruments file after {max_retries} attempts: {str(file_error)}")
+                            logger.error(f"Failed to read instruments file for {stock_name} after {max_retries} attempts: {str(file_error)}")
+                            import traceback
+                            traceback.print_exc()
+                            instruments_data = []  # Set to empty list to prevent further processing
+                    except Exception as file_error:
+                        # For other exceptions, don't retry
+                        logger.info(f"❌ ERROR: Unexpected error reading instruments file: {str(file_error)}")
+                        logger.error(f"Unexpected error reading instruments file for {stock_name}: {str(file_error)}")
+                        import traceback
+                        traceback.print_exc()
+                        instruments_data = []
+                        break
+
+                if instruments_data is None:
+                    instruments_data = []  # Ensure it's set to empty list if all retries failed
+
+                if not instruments_data:
+                    logger.info(f"⚠️ Instruments data is empty - cannot search for {option_contract}")
+                    logger.warning(f"Instruments data is empty for {stock_name} - cannot find instrument_key")
+                else:
+                    # FIRST: Try to find by trading_symbol directly (since find_option_contract_from_instruments now returns trading_symbol)
+                    logger.info(f"🔍 Searching for instrument_key by trading_symbol: {option_contract}")
+                    logger.info(f"🔍 Searching for instrument_key by trading_symbol: '{option_contract}' (stock: {stock_name})")
+                    found_by_trading_symbol = False
+                    match_count = 0
+                    # Normalize option_contract for comparison (strip whitespace, handle case)
+                    option_contract_normalized = option_contract.strip() if option_contract else ""
+                    for inst in instruments_data:
+                        if isinstance(inst, dict):
+                            inst_trading_symbol = inst.get('trading_symbol', '')
+                            if inst_trading_symbol:
+                                match_count += 1
+                                # Try exact match first
+                                inst_trading_symbol_normalized = inst_trading_symbol.strip()
+                                if inst_trading_symbol_normalized == option_contract_normalized:
+                                    instrument_key = inst.get('instrument_key')
+                                    if instrument_key:
+                                        inst_lot_size = inst.get('lot_size')
+                                        if inst_lot_size and inst_lot_size > 0:
+                                            qty = int(inst_lot_size)
+                                        expiry_ms = inst.get('expiry', 0)
+                                        if expiry_ms:
+                                            if expiry_ms > 1e12:
+                                                expiry_ms = expiry_ms / 1000
+                                            try:
+                                                inst_expiry = datetime.fromtimestamp(expiry_ms, tz=ist)
+                                                inst_strike = inst.get('strike_price', 0)
+                                                logger.info(f"✅ Found instrument by trading_symbol for {option_contract}:")
+                                                logger.info(f"   Instrument Key: {instrument_key}")
+                                                logger.info(f"   Strike: {inst_strike}")
+                                                logger.info(f"   Expiry: {inst_expiry.strftime('%d %b %Y')}")
+                                                logger.info(f"   Lot Size: {qty if inst_lot_size and inst_lot_size > 0 else 'Not available'}")
+                                                logger.info(f"✅ Found instrument by trading_symbol for {option_contract} (stock: {stock_name}): instrument_key={instrument_key}, strike={inst_strike}, expiry={inst_expiry.strftime('%d %b %Y')}, lot_size={qty if inst_lot_size and inst_lot_size > 0 else 'N/A'}")
+                                                found_by_trading_symbol = True
+                                                break
+                                            except (ValueError, OSError) as e:
+                                                logger.warning(f"Invalid expiry timestamp for {option_contract}: {expiry_ms}, error: {str(e)}")
+                                                continue
+                                    else:
+                                        logger.warning(f"Found trading_symbol match for {option_contract} but instrument_key is None")
+                                        logger.info(f"⚠️ WARNING: Found trading_symbol match but instrument_key is None for {option_contract}")
+                                        # Continue searching - maybe another instrument has the key
+
+                    if not found_by_trading_symbol:
+                        logger.warning(f"⚠️ Could not find instrument by trading_symbol '{option_contract}' for {stock_name} (checked {match_count} instruments)")
+                        logger.info(f"⚠️ Could not find instrument by trading_symbol '{option_contract}' for {stock_name}")
+
+                    # SECOND: If not found by trading_symbol, try parsing old format: STOCK-MonthYYYY-STRIKE-CE/PE
+                    match = None
+                    if not found_by_trading_symbol:
+                        logger.info(f"⚠️ Not found by trading_symbol, trying old format parsing...")
+                        match = re.match(r'^([A-Z-]+)-(\w{3})(\d{4})-(\d+\.?\d*?)-(CE|PE)$', option_contract)
+
+                    if not found_by_trading_symbol and match:
+                        symbol, month, year, strike, opt_type = match.groups()
+                        strike_value = float(strike)
+
+                        logger.info(f"🔍 Searching for instrument_key: symbol={symbol}, month={month}, year={year}, strike={strike_value}, type={opt_type}")
+
+                        # Parse month
+                        month_map = {
+                            'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4,
+                            'May': 5, 'Jun': 6, 'Jul': 7, 'Aug': 8,
+                            'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
+                        }
+                        target_month = month_map.get(month[:3].capitalize(), None)
+                        target_year = int(year)
+
+                        if target_month:
+                            # Search for matching option in NSE_FO segment
+                            # Improved matching: Allow tolerance for expiry dates (±7 days) and strikes (±1%)
+                            best_match = None
+                            best_match_score = float('inf')
+                            match_count = 0
+
+                            # Calculate target expiry date range (±7 days tolerance)
+                            target_expiry_start = datetime(target_year, target_month, 1, tzinfo=ist)
+                            # Get last day of target month
+                            if target_month == 12:
+                                target_expiry_end = datetime(target_year + 1, 1, 1, tzinfo=ist) - timedelta(days=1)
+                            else:
+                                target_expiry_end = datetime(target_year, target_month + 1, 1, tzinfo=ist) - timedelta(days=1)
+
+                            # Allow ±7 days tolerance for expiry matching
+                            expiry_tolerance_days = 7
+                            target_expiry_min = target_expiry_start - timedelta(days=expiry_tolerance_days)
+                            target_expiry_max = target_expiry_end + timedelta(days=expiry_tolerance_days)
+
+                            # Strike tolerance: ±1% or ±10, whichever is larger
+                            strike_tolerance = max(strike_value * 0.01, 10.0)
+
+                            for inst in instruments_data:
+                                if (inst.get('underlying_symbol') == symbol and 
+                                    inst.get('instrument_type') == opt_type and
+                                    inst.get('segment') == 'NSE_FO'):
+
+                                    inst_strike = inst.get('strike_price', 0)
+                                    strike_diff = abs(inst_strike - strike_value)
+
+                                    expiry_ms = inst.get('expiry', 0)
+                                    if expiry_ms:
+                                        if expiry_ms > 1e12:
+                                            expiry_ms = expiry_ms / 1000
+                                        inst_expiry = datetime.fromtimestamp(expiry_ms, tz=ist)
+
+                                        # Check if expiry is within tolerance (same month/year or ±7 days)
+                                        expiry_in_range = (
+                                            (inst_expiry.year == target_year and inst_expiry.month == target_month) or
+                                            (target_expiry_min <= inst_expiry <= target_expiry_max)
+                                        )
+
+                                        # Check if strike is within tolerance
+                                        strike_in_range = strike_diff <= strike_tolerance
+
+                                        if expiry_in_range and strike_in_range:
+                                            match_count += 1
+                                            # Score: prioritize exact expiry match, then strike difference
+                                            expiry_score = 0 if (inst_expiry.year == target_year and inst_expiry.month == target_month) else 1000
+                                            score = expiry_score + strike_diff
+
+                                            if strike_diff < 0.01 and expiry_in_range and (inst_expiry.year == target_year and inst_expiry.month == target_month):  # Exact match
+                                                instrument_key = inst.get('instrument_key')
+                                                trading_symbol = inst.get('trading_symbol', 'Unknown')
+                                                # Also fetch lot_size from the same instrument record
+                                                inst_lot_size = inst.get('lot_size')
+                                                if inst_lot_size and inst_lot_size > 0:
+                                                    qty = int(inst_lot_size)
+                                                logger.info(f"✅ Found EXACT match for {option_contract}:")
+                                                logger.info(f"   Instrument Key: {instrument_key}")
+                                                logger.info(f"   Trading Symbol: {trading_symbol}")
+                                                logger.info(f"   Strike: {inst_strike} (requested: {strike_value}, diff: {strike_diff:.4f})")
+                                                logger.info(f"   Expiry: {inst_expiry.strftime('%d %b %Y')}")
+                                                logger.info(f"   Lot Size: {qty if inst_lot_size and inst_lot_size > 0 else 'Not available'}")
+                                                break
+                                            else:
+                                                # Track best match (within tolerance)
+                                                if best_match is None or score < best_match_score:
+                                                    best_match = inst
+                                                    best_match_score = score
+
+                            logger.info(f"   📊 Found {match_count} instrument(s) matching symbol={symbol}, type={opt_type}, expiry={target_month}/{target_year} (with tolerance)")
+
+                            # Use best match if no exact match but we have matches within tolerance
+                            if not instrument_key and best_match:
+                                instrument_key = best_match.get('instrument_key')
+                                inst_strike = best_match.get('strike_price', 0)
+                                expiry_ms = best_match.get('expiry', 0)
+                                if expiry_ms > 1e12:
+                                    expiry_ms = expiry_ms / 1000
+                                inst_expiry = datetime.fromtimestamp(expiry_ms, tz=ist)
+                                trading_symbol = best_match.get('trading_symbol', 'Unknown')
+                                # Also fetch lot_size from the best match
+                                inst_lot_size = best_match.get('lot_size')
+                                if inst_lot_size and inst_lot_size > 0:
+                                    qty = int(inst_lot_size)
+                                logger.info(f"⚠️ WARNING: Using BEST MATCH (within tolerance) for {option_contract}:")
+                                logger.info(f"   Instrument Key: {instrument_key}")
+                                logger.info(f"   Trading Symbol: {trading_symbol}")
+                                logger.info(f"   Strike: {inst_strike} (requested: {strike_value}, diff: {abs(inst_strike - strike_value):.4f})")
+                                logger.info(f"   Expiry: {inst_expiry.strftime('%d %b %Y')} (requested: {target_month}/{target_year})")
+                                if inst_lot_size and inst_lot_size > 0:
+                                    logger.info(f"   Lot Size: {qty}")
+                                else:
+                                    logger.info(f"   ⚠️ Lot Size: Not available in instruments.json")
+                                logger.info(f"   ⚠️ This match is within tolerance but may not be exact!")
+
+                            # If instrument_key was found but lot_size is still 0, try to find lot_size from any instrument with same underlying_symbol
+                            if instrument_key and qty == 0:
+                                logger.info(f"⚠️ Instrument key found but lot_size not available, searching for lot_size from other {symbol} instruments...")
+                                for inst in instruments_data:
+                                    if (inst.get('underlying_symbol') == symbol and 
+                                        inst.get('segment') == 'NSE_FO' and
+                                        inst.get('lot_size') and inst.get('lot_size') > 0):
+                                        qty = int(inst.get('lot_size'))
+                                        logger.info(f"✅ Found lot_size from another {symbol} instrument: {qty}")
+                                        break
+
+                            if not instrument_key:
+                                logger.info(f"❌ ERROR: Could not find instrument_key for {option_contract}")
+                                logger.info(f"   Searched for: symbol={symbol}, type={opt_type}, strike={strike_value}, expiry={target_month}/{target_year}")
+                                logger.error(f"Could not find instrument_key for {stock_name} ({option_contract}): symbol={symbol}, type={opt_type}, strike={strike_value}, expiry={target_month}/{target_year}")
+
+                                # Debug: Count how many instruments match the symbol and type
+                                symbol_type_matches = [inst for inst in instruments_data 
+                                                     if inst.get('underlying_symbol') == symbol 
+                                                     and inst.get('instrument_type') == opt_type
+                                                     and inst.get('segment') == 'NSE_FO']
+                                logger.info(f"   📊 Found {len(symbol_type_matches)} instruments with symbol={symbol} and type={opt_type}")
+
+                                # Show some examples
+                                if symbol_type_matches:
+                                    logger.info(f"   Examples (first 5):")
+                                    for inst in symbol_type_matches[:5]:
+                                        expiry_ms = inst.get('expiry', 0)
+                                        if expiry_ms > 1e12:
+                                            expiry_ms = expiry_ms / 1000
+                                        expiry_dt = datetime.fromtimestamp(expiry_ms) if expiry_ms else None
+                                        logger.info(f"      - Strike: {inst.get('strike_price', 0)}, Expiry: {expiry_dt.strftime('%d %b %Y') if expiry_dt else 'N/A'}, Key: {inst.get('instrument_key', 'N/A')}, Lot Size: {inst.get('lot_size', 'N/A')}")
+                        else:
+                            logger.info(f"⚠️ Could not parse month from option contract: {option_contract} (month: {month})")
+                            logger.warning(f"Could not parse month from option contract for {stock_name}: {option_contract} (month: {month})")
+                    else:
+                        if not found_by_trading_symbol:
+                            logger.info(f"⚠️ Could not parse option contract format: {option_contract}")
+                            logger.warning(f"Could not parse option contract format for {stock_name}: {option_contract}")
+
+                    # Final check: If instrument_key is still None after all searching methods
+                    if not instrument_key:
+                        logger.info(f"❌ ERROR: Could not find instrument_key for {option_contract} after trying both trading_symbol lookup and format parsing")
+                        logger.error(f"Could not find instrument_key for {stock_name} ({option_contract}) - tried trading_symbol lookup and format parsing")
+        except Exception as e:
+            logger.info(f"❌ ERROR: Exception finding instrument_key for {option_contract}: {str(e)}")
+            logger.error(f"Exception finding instrument_key for {stock_name} ({option_contract}): {str(e)}", exc_info=True)
+            import traceback
+            traceback.print_exc()
+
+    # ====================================================================
+    # ACTIVITY 6: Fetch Option LTP (Independent - requires instrument_key)
+    # ====================================================================
+    # CRITICAL: Fetch option LTP even if candles fail - this is independent
+    # CRITICAL: Also try to fetch if we have option_contract but no instrument_key yet
+    if instrument_key and vwap_service:
+        try:
+            logger.info(f"🔍 Fetching option LTP for {option_contract} using instrument_key: {instrument_key}")
+            quote_data = vwap_service.get_market_quote_by_key(instrument_key)
+            if quote_data and quote_data.get('last_price'):
+                option_ltp = float(quote_data.get('last_price', 0))
+                logger.info(f"✅ Fetched option LTP for {option_contract}: ₹{option_ltp}")
+            else:
+                logger.info(f"⚠️ Could not fetch option LTP for {option_contract} - no quote data returned")
+                logger.info(f"   Quote data: {quote_data}")
+                logger.warning(f"Could not fetch option LTP for {option_contract} (stock: {stock_name}, instrument_key: {instrument_key}) - quote_data: {quote_data}")
+                # Try fallback: use historical candles if available
+                try:
+                    candles = vwap_service.get_historical_candles_by_instrument_key(instrument_key, interval="hours/1", days_back=1)
+                    if candles and len(candles) > 0:
+                        candles.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
+                        option_ltp = round(candles[0].get('close', 0), 2)
+                        logger.info(f"✅ Fetched option LTP from historical candles: ₹{option_ltp}")
+                except Exception as fallback_error:
+                    logger.info(f"⚠️ Fallback LTP fetch also failed: {str(fallback_error)}")
+        except Exception as e:
+            logger.info(f"❌ ERROR fetching option LTP for {option_contract}: {str(e)}")
+            logger.error(f"Error fetching option LTP for {option_contract} (stock: {stock_name}, instrument_key: {instrument_key}): {str(e)}", exc_info=True)
+    elif option_contract and vwap_service and not instrument_key:
+        # FALLBACK: Try to find instrument_key again if we have option_contract but no instrument_key
+        # This handles cases where Activity 5 failed due to nested conditions but option_contract exists
+        logger.info(f"⚠️ instrument_key is None but option_contract exists: {option_contract}")
+        logger.info(f"   Attempting fallback: Retry instrument_key lookup...")
+        try:
+            # Try a simpler lookup - search by option contract string directly
+            from pathlib import Path
+            import json as json_lib
+            from backend.config import get_instruments_file_path
+            instruments_file = get_instruments_file_path()
+            if instruments_file.exists():
+                with open(instruments_file, 'r') as f:
+                    instruments_data = json_lib.load(f)
+                # Search for instrument by trading_symbol matching option_contract
+                for inst in instruments_data:
+                    trading_symbol = inst.get('trading_symbol', '')
+                    # Try to match option contract format in trading_symbol
+                    if option_contract.replace('-', '') in trading_symbol.replace(' ', ''):
+                        instrument_key = inst.get('instrument_key')
+                        if instrument_key:
+                            logger.info(f"✅ Fallback: Found instrument_key: {instrument_key}")
+                            # Also get qty if available
+                            inst_lot_size = inst.get('lot_size')
+                            if inst_lot_size and inst_lot_size > 0 and qty == 0:
+                                qty = int(inst_lot_size)
+                                logger.info(f"✅ Fallback: Found lot_size: {qty}")
+                            # Now try to fetch option LTP
+                            try:
+                                quote_data = vwap_service.get_market_quote_by_key(instrument_key)
+                                if quote_data and quote_data.get('last_price'):
+                                    option_ltp = float(quote_data.get('last_price', 0))
+                                    logger.info(f"✅ Fallback: Fetched option LTP: ₹{option_ltp}")
+                            except Exception:
+                                pass
+                            break
+        except Exception as fallback_error:
+            logger.info(f"⚠️ Fallback instrument_key lookup failed: {str(fallback_error)}")
+        if not instrument_key:
+            logger.info(f"⚠️ Cannot fetch option LTP for {option_contract} - instrument_key is None (fallback also failed)")
+            logger.warning(f"Cannot fetch option LTP for {option_contract} (stock: {stock_name}) - instrument_key is None")
+    elif not instrument_key:
+        logger.info(f"⚠️ Cannot fetch option LTP for {option_contract if option_contract else 'N/A'} - instrument_key is None")
+        if option_contract:
+            logger.warning(f"Cannot fetch option LTP for {option_contract} (stock: {stock_name}) - instrument_key is None")
+    elif not vwap_service:
+        logger.info(f"⚠️ Cannot fetch option LTP for {option_contract if option_contract else 'N/A'} - vwap_service is None")
+        if option_contract:
+            logger.warning(f"Cannot fetch option LTP for {option_contract} (stock: {stock_name}) - vwap_service is None")
+
+    # ====================================================================
+    # ACTIVITY 7: Fetch Option Candles (Independent - requires instrument_key)
+    # ====================================================================
+    # NOTE: Candle fetch failure should NOT block option LTP or lot size
+    # Candles are used for candle size filter, but option LTP and lot size are critical for trade entry
+    if instrument_key and vwap_service:
+        try:
+            logger.info(f"🔍 Fetching option candles for {option_contract} using instrument_key: {instrument_key}")
+            option_candles = vwap_service.get_option_daily_candles_current_and_previous(instrument_key)
+            if option_candles:
+                logger.info(f"✅ Fetched option OHLC candles for {option_contract}")
+                if option_candles.get('current_day_candle'):
+                    logger.info(f"   Current day candle: {option_candles.get('current_day_candle')}")
+                if option_candles.get('previous_day_candle'):
+                    logger.info(f"   Previous day candle: {option_candles.get('previous_day_candle')}")
+            else:
+                logger.info(f"⚠️ Could not fetch option OHLC candles for {option_contract} - returned None (this is OK, will continue with option LTP and lot size)")
+                logger.warning(f"Could not fetch option OHLC candles for {option_contract} (stock: {stock_name}, instrument_key: {instrument_key}) - returned None. Continuing with other data.")
+        except Exception as e:
+            logger.info(f"❌ ERROR fetching option OHLC candles for {option_contract}: {str(e)} (this is OK, will continue with option LTP and lot size)")
+            logger.error(f"Error fetching option OHLC candles for {option_contract} (stock: {stock_name}, instrument_key: {instrument_key}): {str(e)}. Continuing with other data.", exc_info=True)
+    elif not instrument_key:
+        logger.info(f"⚠️ Cannot fetch option candles for {option_contract} - instrument_key is None")
+        logger.warning(f"Cannot fetch option candles for {option_contract} (stock: {stock_name}) - instrument_key is None")
+    elif not vwap_service:
+        logger.info(f"⚠️ Cannot fetch option candles for {option_contract} - vwap_service is None")
+        logger.warning(f"Cannot fetch option candles for {option_contract} (stock: {stock_name}) - vwap_service is None")
+
+    # ====================================================================
+    # ACTIVITY 8: Fetch Previous Hour VWAP (Independent)
+    # ====================================================================
+    if vwap_service and stock_name:
+        try:
+            prev_vwap_data = vwap_service.get_stock_vwap_for_previous_hour(stock_name, reference_time=triggered_datetime)
+            if prev_vwap_data:
+                stock_vwap_previous_hour = prev_vwap_data.get('vwap')
+                stock_vwap_previous_hour_time = prev_vwap_data.get('time')
+                logger.info(f"✅ Fetched previous hour VWAP for {stock_name}: ₹{stock_vwap_previous_hour:.2f} at {stock_vwap_previous_hour_time.strftime('%H:%M:%S')}")
+            else:
+                logger.info(f"⚠️ Could not fetch previous hour VWAP for {stock_name}")
+        except Exception as e:
+            logger.info(f"⚠️ Error fetching previous hour VWAP for {stock_name}: {str(e)}")
+
+    # ====================================================================
+    # CREATE ENRICHED STOCK DATA (Always created with whatever data we have)
+    # ====================================================================
+    # Check if enrichment is truly failed: option_contract found but instrument_key missing
+    # This is critical because without instrument_key, we can't fetch option LTP or candles
+    enrichment_failed = False
+    enrichment_error_msg = None
+
+    if option_contract and not instrument_key:
+        enrichment_failed = True
+        enrichment_error_msg = f"Could not find instrument_key for option contract {option_contract}"
+        logger.info(f"❌ ENRICHMENT FAILED for {stock_name}: {enrichment_error_msg}")
+
+    # ALWAYS create enriched_stock, regardless of enrichment success/failure
+    # This ensures stocks are saved even if enrichment partially fails
+    enriched_stock = {
+        "stock_name": stock_name,
+        "trigger_price": trigger_price,
+        "last_traded_price": stock_ltp,
+        "stock_vwap": stock_vwap,
+        "stock_vwap_previous_hour": stock_vwap_previous_hour,
+        "stock_vwap_previous_hour_time": stock_vwap_previous_hour_time,
+        "option_type": forced_option_type,
+        "option_contract": option_contract or "",
+        "otm1_strike": option_strike,
+        "option_ltp": option_ltp,
+        "option_vwap": 0.0,  # Not used
+        "qty": qty,
+        "instrument_key": instrument_key,
+        "option_candles": option_candles,
+        "_enrichment_failed": enrichment_failed,
+        "_enrichment_error": enrichment_error_msg
+    }
+
+    # Log what we got
+    if option_contract:
+        logger.info(f"✅ Enriched stock: {stock_name} - LTP: ₹{stock_ltp}, Option: {option_contract}, Qty: {qty}, Instrument Key: {instrument_key or 'N/A'}")
+    else:
+        logger.info(f"⚠️ Partial data for: {stock_name} - LTP: ₹{stock_ltp}, Option: N/A")
+
+    return enriched_stock
+
+
 async def process_webhook_data(data: dict, db: Session, forced_type: str = None):
     """
     Process webhook data and store in database and in-memory cache
@@ -915,7 +1495,8 @@ async def process_webhook_data(data: dict, db: Session, forced_type: str = None)
     """
     global bullish_data, bearish_data
     import json as json_module  # Use alias to avoid any potential shadowing issues
-    
+
+    timer = StageTimer(f"webhook[{forced_type or 'auto'}]")
     try:
         # Ensure instruments file is available before processing (prevents "Missing option data" for Bearish/PE)
         try:
@@ -936,11 +1517,8 @@ async def process_webhook_data(data: dict, db: Session, forced_type: str = None)
         triggered_at_raw = data.get("triggered_at", "")
         
         # For intraday alerts, use today if it's a trading day, otherwise get last trading date
-        today_aware = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        if vwap_service.is_trading_day(today_aware):
-            trading_date = naive_ist(today_aware)
-        else:
-            trading_date = naive_ist(vwap_service.get_last_trading_date(now))
+        last_session = get_trading_calendar().previous_trading_day(now, include_self=True)
+        trading_date = datetime.combine(last_session, dt_time(0, 0))
         
         logger.info(f"Current date: {now.strftime('%Y-%m-%d %A')}")
         logger.info(f"Last trading date: {trading_date.strftime('%Y-%m-%d %A')}")
@@ -1135,578 +1713,26 @@ async def process_webhook_data(data: dict, db: Session, forced_type: str = None)
         alert_name_display = processed_data.get('alert_name', '') if processed_data and isinstance(processed_data, dict) else ''
         logger.info(f"Alert name: {alert_name_display}")
         
-        # Process each stock individually to fetch LTP and find option contract
+        timer.lap("parse")
+
+        # Enrich stocks concurrently (deduped by name) to fetch LTP and find option contract.
         # IMPORTANT: Always save at minimum stock_name and alert_time, even if enrichment fails
-        enriched_stocks = []
         stocks_to_enrich = processed_data.get("stocks", []) if processed_data and isinstance(processed_data, dict) else []
-        for stock in stocks_to_enrich:
-            stock_name = stock.get("stock_name", "")
-            trigger_price = stock.get("trigger_price", 0.0)
-            
-            logger.info(f"Processing stock: {stock_name}")
-            
-            # Initialize all fields with defaults - each activity is independent
-            stock_ltp = trigger_price
-            stock_vwap = 0.0
-            option_contract = None
-            option_strike = 0.0
-            qty = 0
-            option_ltp = 0.0
-            instrument_key = None
-            option_candles = None
-            stock_vwap_previous_hour = None
-            stock_vwap_previous_hour_time = None
-            
-            # ====================================================================
-            # ACTIVITY 1: Fetch Stock LTP and VWAP (Independent)
-            # ====================================================================
-            try:
-                stock_data = vwap_service.get_stock_ltp_and_vwap(stock_name)
-                if stock_data:
-                    if stock_data.get('ltp') and stock_data['ltp'] > 0:
-                        stock_ltp = stock_data['ltp']
-                        logger.info(f"✅ Stock LTP for {stock_name}: ₹{stock_ltp:.2f}")
-                    else:
-                        logger.info(f"⚠️ Could not fetch LTP for {stock_name}, using trigger price: ₹{trigger_price}")
-                    
-                    if stock_data.get('vwap') and stock_data['vwap'] > 0:
-                        stock_vwap = stock_data['vwap']
-                        logger.info(f"✅ Stock VWAP for {stock_name}: ₹{stock_vwap:.2f}")
-                    else:
-                        logger.info(f"⚠️ Could not fetch VWAP for {stock_name} - will retry via hourly updater")
-                else:
-                    logger.info(f"⚠️ Stock data fetch completely failed for {stock_name} - using defaults")
-            except Exception as e:
-                logger.info(f"❌ Stock data fetch failed for {stock_name}: {str(e)} - Using trigger price")
-                import traceback
-                traceback.print_exc()
-            
-            # ====================================================================
-            # ACTIVITY 2: Find Option Contract (Independent)
-            # ====================================================================
-            logger.info(f"🔍 ACTIVITY 2: Finding option contract for {stock_name} with forced_option_type={forced_option_type}, stock_ltp={stock_ltp}")
-            max_retries = 3
-            for retry_attempt in range(1, max_retries + 1):
-                try:
-                    logger.info(f"Calling find_option_contract_from_master_stock for {stock_name} (attempt {retry_attempt})")
-                    contract_result = find_option_contract_from_master_stock(
-                        db, stock_name, forced_option_type, stock_ltp, vwap_service
-                    )
-                    option_contract = contract_result[0] if isinstance(contract_result, tuple) else contract_result
-                    instrument_key = contract_result[1] if isinstance(contract_result, tuple) and len(contract_result) >= 2 else None
-                    logger.info(f"find_option_contract_from_master_stock returned: option_contract={option_contract}, instrument_key={'...' + str(instrument_key)[-20:] if instrument_key else None}")
-                    if option_contract:
-                        if instrument_key:
-                            logger.info(f"✅ Using instrument_key from option chain for {stock_name} (Bearish/PE fix)")
-                        logger.info(f"✅ Option contract found for {stock_name} (attempt {retry_attempt}): {option_contract}")
-                        break
-                    else:
-                        if retry_attempt < max_retries:
-                            logger.info(f"⚠️ No option contract found for {stock_name} (attempt {retry_attempt}/{max_retries}), retrying...")
-                            logger.warning(f"⚠️ No option contract found for {stock_name} (attempt {retry_attempt}/{max_retries}), retrying...")
-                            import time
-                            time.sleep(1)  # Brief delay before retry
-                        else:
-                            logger.info(f"⚠️ No option contract found for {stock_name} after {max_retries} attempts")
-                            logger.warning(f"⚠️ No option contract found for {stock_name} after {max_retries} attempts")
-                except Exception as e:
-                    if retry_attempt < max_retries:
-                        logger.info(f"⚠️ Option contract search failed for {stock_name} (attempt {retry_attempt}/{max_retries}): {str(e)}, retrying...")
-                        logger.warning(f"⚠️ Option contract search failed for {stock_name} (attempt {retry_attempt}/{max_retries}): {str(e)}, retrying...")
-                        import time
-                        time.sleep(1)  # Brief delay before retry
-                    else:
-                        logger.info(f"⚠️ Option contract search failed for {stock_name} after {max_retries} attempts: {str(e)}")
-                        logger.error(f"⚠️ Option contract search failed for {stock_name} after {max_retries} attempts: {str(e)}")
-                        option_contract = None
-                
-            # ====================================================================
-            # ACTIVITY 3: Extract Option Strike (Independent - requires option_contract)
-            # ====================================================================
-            if option_contract:
-                try:
-                    import re
-                    match = re.search(r'-(\d+\.?\d*)-(?:CE|PE)$', option_contract)
-                    if match:
-                        option_strike = float(match.group(1))
-                        logger.info(f"✅ Extracted option strike: {option_strike} from {option_contract}")
-                    else:
-                        logger.info(f"⚠️ Could not extract option strike from {option_contract} - regex did not match")
-                        logger.warning(f"Could not extract option strike from {option_contract} for {stock_name}")
-                except Exception as e:
-                    logger.info(f"❌ ERROR extracting option strike from {option_contract}: {str(e)}")
-                    logger.error(f"Error extracting option strike from {option_contract} for {stock_name}: {str(e)}", exc_info=True)
-            
-            # ====================================================================
-            # ACTIVITY 4: Fetch Lot Size from instruments.json (Independent - requires option_contract)
-            # NOTE: Lot size is now fetched in ACTIVITY 5 when we find instrument_key
-            # This activity is kept for backward compatibility but lot_size should be
-            # fetched from instruments.json in Activity 5, not from master_stock table
-            # ====================================================================
-            # Lot size is now fetched from instruments.json in Activity 5 when instrument_key is found
-            # This ensures we use the same data source and don't depend on master_stock table
-            # If lot_size wasn't found in Activity 5, it will remain 0 (default)
-            if option_contract and qty == 0:
-                logger.info(f"⚠️ Lot size not found in instruments.json for {option_contract}, qty remains 0")
-                logger.warning(f"Lot size not found in instruments.json for {option_contract} (stock: {stock_name})")
-            
-            # ====================================================================
-            # ACTIVITY 5: Find Instrument Key from instruments.json (Independent - requires option_contract)
-            # When instrument_key from option chain API is available (Bearish/PE fix), use it and only fetch lot_size
-            # ====================================================================
-            if option_contract:
-                try:
-                    from pathlib import Path
-                    import json as json_lib
-                    import re
-                    
-                    from backend.config import get_instruments_file_path
-                    instruments_file = get_instruments_file_path()
-                    
-                    # FAST PATH: When we have instrument_key from option chain (Bearish/PE), just get lot_size and skip full search
-                    skip_full_search = False
-                    if instrument_key and instruments_file.exists():
-                        try:
-                            with open(instruments_file, 'r') as f:
-                                inst_data = json_lib.load(f)
-                            for inst in (inst_data if isinstance(inst_data, list) else []):
-                                if isinstance(inst, dict) and inst.get('instrument_key') == instrument_key:
-                                    inst_lot = inst.get('lot_size')
-                                    if inst_lot and inst_lot > 0:
-                                        qty = int(inst_lot)
-                                        logger.info(f"✅ Got lot_size {qty} from instrument_key for {stock_name} (Bearish/PE fast path)")
-                                    skip_full_search = True
-                                    break
-                        except Exception as fast_err:
-                            logger.warning(f"Fast path lot_size lookup failed: {fast_err}, falling back to full search")
-                    
-                    if skip_full_search:
-                        pass  # instrument_key and lot_size already set
-                    elif not instruments_file.exists():
-                        logger.info(f"⚠️ Instruments JSON file not found: {instruments_file}")
-                        logger.error(f"Instruments JSON file not found: {instruments_file}")
-                    else:
-                        # CRITICAL: Retry logic ensures we can read the file even if there are transient issues
-                        # The file age doesn't matter - as long as instruments match, they will be found
-                        max_retries = 3
-                        instruments_data = None
-                        
-                        for retry in range(1, max_retries + 1):
-                            try:
-                                logger.info(f"📂 Loading instruments from: {instruments_file} (attempt {retry}/{max_retries})")
-                                with open(instruments_file, 'r') as f:
-                                    instruments_data = json_lib.load(f)
-                                logger.info(f"✅ Loaded {len(instruments_data)} instruments from file")
-                                break  # Success - exit retry loop
-                            except (json_lib.JSONDecodeError, IOError, OSError) as file_error:
-                                if retry < max_retries:
-                                    import time
-                                    wait_time = retry * 0.5  # Exponential backoff: 0.5s, 1s, 1.5s
-                                    logger.info(f"⚠️ Failed to read instruments file (attempt {retry}/{max_retries}): {str(file_error)}")
-                                    logger.info(f"   Retrying in {wait_time}s...")
-                                    time.sleep(wait_time)
-                                else:
-                                    logger.info(f"❌ ERROR: Failed to read instruments file after {max_retries} attempts: {str(file_error)}")
-                                    logger.error(f"Failed to read instruments file for {stock_name} after {max_retries} attempts: {str(file_error)}")
-                                    import traceback
-                                    traceback.print_exc()
-                                    instruments_data = []  # Set to empty list to prevent further processing
-                            except Exception as file_error:
-                                # For other exceptions, don't retry
-                                logger.info(f"❌ ERROR: Unexpected error reading instruments file: {str(file_error)}")
-                                logger.error(f"Unexpected error reading instruments file for {stock_name}: {str(file_error)}")
-                                import traceback
-                                traceback.print_exc()
-                                instruments_data = []
-                                break
-                        
-                        if instruments_data is None:
-                            instruments_data = []  # Ensure it's set to empty list if all retries failed
-                        
-                        if not instruments_data:
-                            logger.info(f"⚠️ Instruments data is empty - cannot search for {option_contract}")
-                            logger.warning(f"Instruments data is empty for {stock_name} - cannot find instrument_key")
-                        else:
-                            # FIRST: Try to find by trading_symbol directly (since find_option_contract_from_instruments now returns trading_symbol)
-                            logger.info(f"🔍 Searching for instrument_key by trading_symbol: {option_contract}")
-                            logger.info(f"🔍 Searching for instrument_key by trading_symbol: '{option_contract}' (stock: {stock_name})")
-                            found_by_trading_symbol = False
-                            match_count = 0
-                            # Normalize option_contract for comparison (strip whitespace, handle case)
-                            option_contract_normalized = option_contract.strip() if option_contract else ""
-                            for inst in instruments_data:
-                                if isinstance(inst, dict):
-                                    inst_trading_symbol = inst.get('trading_symbol', '')
-                                    if inst_trading_symbol:
-                                        match_count += 1
-                                        # Try exact match first
-                                        inst_trading_symbol_normalized = inst_trading_symbol.strip()
-                                        if inst_trading_symbol_normalized == option_contract_normalized:
-                                            instrument_key = inst.get('instrument_key')
-                                            if instrument_key:
-                                                inst_lot_size = inst.get('lot_size')
-                                                if inst_lot_size and inst_lot_size > 0:
-                                                    qty = int(inst_lot_size)
-                                                expiry_ms = inst.get('expiry', 0)
-                                                if expiry_ms:
-                                                    if expiry_ms > 1e12:
-                                                        expiry_ms = expiry_ms / 1000
-                                                    try:
-                                                        inst_expiry = datetime.fromtimestamp(expiry_ms, tz=ist)
-                                                        inst_strike = inst.get('strike_price', 0)
-                                                        logger.info(f"✅ Found instrument by trading_symbol for {option_contract}:")
-                                                        logger.info(f"   Instrument Key: {instrument_key}")
-                                                        logger.info(f"   Strike: {inst_strike}")
-                                                        logger.info(f"   Expiry: {inst_expiry.strftime('%d %b %Y')}")
-                                                        logger.info(f"   Lot Size: {qty if inst_lot_size and inst_lot_size > 0 else 'Not available'}")
-                                                        logger.info(f"✅ Found instrument by trading_symbol for {option_contract} (stock: {stock_name}): instrument_key={instrument_key}, strike={inst_strike}, expiry={inst_expiry.strftime('%d %b %Y')}, lot_size={qty if inst_lot_size and inst_lot_size > 0 else 'N/A'}")
-                                                        found_by_trading_symbol = True
-                                                        break
-                                                    except (ValueError, OSError) as e:
-                                                        logger.warning(f"Invalid expiry timestamp for {option_contract}: {expiry_ms}, error: {str(e)}")
-                                                        continue
-                                            else:
-                                                logger.warning(f"Found trading_symbol match for {option_contract} but instrument_key is None")
-                                                logger.info(f"⚠️ WARNING: Found trading_symbol match but instrument_key is None for {option_contract}")
-                                                # Continue searching - maybe another instrument has the key
-                            
-                            if not found_by_trading_symbol:
-                                logger.warning(f"⚠️ Could not find instrument by trading_symbol '{option_contract}' for {stock_name} (checked {match_count} instruments)")
-                                logger.info(f"⚠️ Could not find instrument by trading_symbol '{option_contract}' for {stock_name}")
-                            
-                            # SECOND: If not found by trading_symbol, try parsing old format: STOCK-MonthYYYY-STRIKE-CE/PE
-                            match = None
-                            if not found_by_trading_symbol:
-                                logger.info(f"⚠️ Not found by trading_symbol, trying old format parsing...")
-                                match = re.match(r'^([A-Z-]+)-(\w{3})(\d{4})-(\d+\.?\d*?)-(CE|PE)$', option_contract)
-                            
-                            if not found_by_trading_symbol and match:
-                                symbol, month, year, strike, opt_type = match.groups()
-                                strike_value = float(strike)
-                                
-                                logger.info(f"🔍 Searching for instrument_key: symbol={symbol}, month={month}, year={year}, strike={strike_value}, type={opt_type}")
-                                
-                                # Parse month
-                                month_map = {
-                                    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4,
-                                    'May': 5, 'Jun': 6, 'Jul': 7, 'Aug': 8,
-                                    'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
-                                }
-                                target_month = month_map.get(month[:3].capitalize(), None)
-                                target_year = int(year)
-                                
-                                if target_month:
-                                    # Search for matching option in NSE_FO segment
-                                    # Improved matching: Allow tolerance for expiry dates (±7 days) and strikes (±1%)
-                                    best_match = None
-                                    best_match_score = float('inf')
-                                    match_count = 0
-                                    
-                                    # Calculate target expiry date range (±7 days tolerance)
-                                    target_expiry_start = datetime(target_year, target_month, 1, tzinfo=ist)
-                                    # Get last day of target month
-                                    if target_month == 12:
-                                        target_expiry_end = datetime(target_year + 1, 1, 1, tzinfo=ist) - timedelta(days=1)
-                                    else:
-                                        target_expiry_end = datetime(target_year, target_month + 1, 1, tzinfo=ist) - timedelta(days=1)
-                                    
-                                    # Allow ±7 days tolerance for expiry matching
-                                    expiry_tolerance_days = 7
-                                    target_expiry_min = target_expiry_start - timedelta(days=expiry_tolerance_days)
-                                    target_expiry_max = target_expiry_end + timedelta(days=expiry_tolerance_days)
-                                    
-                                    # Strike tolerance: ±1% or ±10, whichever is larger
-                                    strike_tolerance = max(strike_value * 0.01, 10.0)
-                                    
-                                    for inst in instruments_data:
-                                        if (inst.get('underlying_symbol') == symbol and 
-                                            inst.get('instrument_type') == opt_type and
-                                            inst.get('segment') == 'NSE_FO'):
-                                            
-                                            inst_strike = inst.get('strike_price', 0)
-                                            strike_diff = abs(inst_strike - strike_value)
-                                            
-                                            expiry_ms = inst.get('expiry', 0)
-                                            if expiry_ms:
-                                                if expiry_ms > 1e12:
-                                                    expiry_ms = expiry_ms / 1000
-                                                inst_expiry = datetime.fromtimestamp(expiry_ms, tz=ist)
-                                                
-                                                # Check if expiry is within tolerance (same month/year or ±7 days)
-                                                expiry_in_range = (
-                                                    (inst_expiry.year == target_year and inst_expiry.month == target_month) or
-                                                    (target_expiry_min <= inst_expiry <= target_expiry_max)
-                                                )
-                                                
-                                                # Check if strike is within tolerance
-                                                strike_in_range = strike_diff <= strike_tolerance
-                                                
-                                                if expiry_in_range and strike_in_range:
-                                                    match_count += 1
-                                                    # Score: prioritize exact expiry match, then strike difference
-                                                    expiry_score = 0 if (inst_expiry.year == target_year and inst_expiry.month == target_month) else 1000
-                                                    score = expiry_score + strike_diff
-                                                    
-                                                    if strike_diff < 0.01 and expiry_in_range and (inst_expiry.year == target_year and inst_expiry.month == target_month):  # Exact match
-                                                        instrument_key = inst.get('instrument_key')
-                                                        trading_symbol = inst.get('trading_symbol', 'Unknown')
-                                                        # Also fetch lot_size from the same instrument record
-                                                        inst_lot_size = inst.get('lot_size')
-                                                        if inst_lot_size and inst_lot_size > 0:
-                                                            qty = int(inst_lot_size)
-                                                        logger.info(f"✅ Found EXACT match for {option_contract}:")
-                                                        logger.info(f"   Instrument Key: {instrument_key}")
-                                                        logger.info(f"   Trading Symbol: {trading_symbol}")
-                                                        logger.info(f"   Strike: {inst_strike} (requested: {strike_value}, diff: {strike_diff:.4f})")
-                                                        logger.info(f"   Expiry: {inst_expiry.strftime('%d %b %Y')}")
-                                                        logger.info(f"   Lot Size: {qty if inst_lot_size and inst_lot_size > 0 else 'Not available'}")
-                                                        break
-                                                    else:
-                                                        # Track best match (within tolerance)
-                                                        if best_match is None or score < best_match_score:
-                                                            best_match = inst
-                                                            best_match_score = score
-                                    
-                                    logger.info(f"   📊 Found {match_count} instrument(s) matching symbol={symbol}, type={opt_type}, expiry={target_month}/{target_year} (with tolerance)")
-                                    
-                                    # Use best match if no exact match but we have matches within tolerance
-                                    if not instrument_key and best_match:
-                                        instrument_key = best_match.get('instrument_key')
-                                        inst_strike = best_match.get('strike_price', 0)
-                                        expiry_ms = best_match.get('expiry', 0)
-                                        if expiry_ms > 1e12:
-                                            expiry_ms = expiry_ms / 1000
-                                        inst_expiry = datetime.fromtimestamp(expiry_ms, tz=ist)
-                                        trading_symbol = best_match.get('trading_symbol', 'Unknown')
-                                        # Also fetch lot_size from the best match
-                                        inst_lot_size = best_match.get('lot_size')
-                                        if inst_lot_size and inst_lot_size > 0:
-                                            qty = int(inst_lot_size)
-                                        logger.info(f"⚠️ WARNING: Using BEST MATCH (within tolerance) for {option_contract}:")
-                                        logger.info(f"   Instrument Key: {instrument_key}")
-                                        logger.info(f"   Trading Symbol: {trading_symbol}")
-                                        logger.info(f"   Strike: {inst_strike} (requested: {strike_value}, diff: {abs(inst_strike - strike_value):.4f})")
-                                        logger.info(f"   Expiry: {inst_expiry.strftime('%d %b %Y')} (requested: {target_month}/{target_year})")
-                                        if inst_lot_size and inst_lot_size > 0:
-                                            logger.info(f"   Lot Size: {qty}")
-                                        else:
-                                            logger.info(f"   ⚠️ Lot Size: Not available in instruments.json")
-                                        logger.info(f"   ⚠️ This match is within tolerance but may not be exact!")
-                                    
-                                    # If instrument_key was found but lot_size is still 0, try to find lot_size from any instrument with same underlying_symbol
-                                    if instrument_key and qty == 0:
-                                        logger.info(f"⚠️ Instrument key found but lot_size not available, searching for lot_size from other {symbol} instruments...")
-                                        for inst in instruments_data:
-                                            if (inst.get('underlying_symbol') == symbol and 
-                                                inst.get('segment') == 'NSE_FO' and
-                                                inst.get('lot_size') and inst.get('lot_size') > 0):
-                                                qty = int(inst.get('lot_size'))
-                                                logger.info(f"✅ Found lot_size from another {symbol} instrument: {qty}")
-                                                break
-                                    
-                                    if not instrument_key:
-                                        logger.info(f"❌ ERROR: Could not find instrument_key for {option_contract}")
-                                        logger.info(f"   Searched for: symbol={symbol}, type={opt_type}, strike={strike_value}, expiry={target_month}/{target_year}")
-                                        logger.error(f"Could not find instrument_key for {stock_name} ({option_contract}): symbol={symbol}, type={opt_type}, strike={strike_value}, expiry={target_month}/{target_year}")
-                                        
-                                        # Debug: Count how many instruments match the symbol and type
-                                        symbol_type_matches = [inst for inst in instruments_data 
-                                                             if inst.get('underlying_symbol') == symbol 
-                                                             and inst.get('instrument_type') == opt_type
-                                                             and inst.get('segment') == 'NSE_FO']
-                                        logger.info(f"   📊 Found {len(symbol_type_matches)} instruments with symbol={symbol} and type={opt_type}")
-                                        
-                                        # Show some examples
-                                        if symbol_type_matches:
-                                            logger.info(f"   Examples (first 5):")
-                                            for inst in symbol_type_matches[:5]:
-                                                expiry_ms = inst.get('expiry', 0)
-                                                if expiry_ms > 1e12:
-                                                    expiry_ms = expiry_ms / 1000
-                                                expiry_dt = datetime.fromtimestamp(expiry_ms) if expiry_ms else None
-                                                logger.info(f"      - Strike: {inst.get('strike_price', 0)}, Expiry: {expiry_dt.strftime('%d %b %Y') if expiry_dt else 'N/A'}, Key: {inst.get('instrument_key', 'N/A')}, Lot Size: {inst.get('lot_size', 'N/A')}")
-                                else:
-                                    logger.info(f"⚠️ Could not parse month from option contract: {option_contract} (month: {month})")
-                                    logger.warning(f"Could not parse month from option contract for {stock_name}: {option_contract} (month: {month})")
-                            else:
-                                if not found_by_trading_symbol:
-                                    logger.info(f"⚠️ Could not parse option contract format: {option_contract}")
-                                    logger.warning(f"Could not parse option contract format for {stock_name}: {option_contract}")
-                            
-                            # Final check: If instrument_key is still None after all searching methods
-                            if not instrument_key:
-                                logger.info(f"❌ ERROR: Could not find instrument_key for {option_contract} after trying both trading_symbol lookup and format parsing")
-                                logger.error(f"Could not find instrument_key for {stock_name} ({option_contract}) - tried trading_symbol lookup and format parsing")
-                except Exception as e:
-                    logger.info(f"❌ ERROR: Exception finding instrument_key for {option_contract}: {str(e)}")
-                    logger.error(f"Exception finding instrument_key for {stock_name} ({option_contract}): {str(e)}", exc_info=True)
-                    import traceback
-                    traceback.print_exc()
-            
-            # ====================================================================
-            # ACTIVITY 6: Fetch Option LTP (Independent - requires instrument_key)
-            # ====================================================================
-            # CRITICAL: Fetch option LTP even if candles fail - this is independent
-            # CRITICAL: Also try to fetch if we have option_contract but no instrument_key yet
-            if instrument_key and vwap_service:
-                try:
-                    logger.info(f"🔍 Fetching option LTP for {option_contract} using instrument_key: {instrument_key}")
-                    quote_data = vwap_service.get_market_quote_by_key(instrument_key)
-                    if quote_data and quote_data.get('last_price'):
-                        option_ltp = float(quote_data.get('last_price', 0))
-                        logger.info(f"✅ Fetched option LTP for {option_contract}: ₹{option_ltp}")
-                    else:
-                        logger.info(f"⚠️ Could not fetch option LTP for {option_contract} - no quote data returned")
-                        logger.info(f"   Quote data: {quote_data}")
-                        logger.warning(f"Could not fetch option LTP for {option_contract} (stock: {stock_name}, instrument_key: {instrument_key}) - quote_data: {quote_data}")
-                        # Try fallback: use historical candles if available
-                        try:
-                            candles = vwap_service.get_historical_candles_by_instrument_key(instrument_key, interval="hours/1", days_back=1)
-                            if candles and len(candles) > 0:
-                                candles.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
-                                option_ltp = round(candles[0].get('close', 0), 2)
-                                logger.info(f"✅ Fetched option LTP from historical candles: ₹{option_ltp}")
-                        except Exception as fallback_error:
-                            logger.info(f"⚠️ Fallback LTP fetch also failed: {str(fallback_error)}")
-                except Exception as e:
-                    logger.info(f"❌ ERROR fetching option LTP for {option_contract}: {str(e)}")
-                    logger.error(f"Error fetching option LTP for {option_contract} (stock: {stock_name}, instrument_key: {instrument_key}): {str(e)}", exc_info=True)
-            elif option_contract and vwap_service and not instrument_key:
-                # FALLBACK: Try to find instrument_key again if we have option_contract but no instrument_key
-                # This handles cases where Activity 5 failed due to nested conditions but option_contract exists
-                logger.info(f"⚠️ instrument_key is None but option_contract exists: {option_contract}")
-                logger.info(f"   Attempting fallback: Retry instrument_key lookup...")
-                try:
-                    # Try a simpler lookup - search by option contract string directly
-                    from pathlib import Path
-                    import json as json_lib
-                    from backend.config import get_instruments_file_path
-                    instruments_file = get_instruments_file_path()
-                    if instruments_file.exists():
-                        with open(instruments_file, 'r') as f:
-                            instruments_data = json_lib.load(f)
-                        # Search for instrument by trading_symbol matching option_contract
-                        for inst in instruments_data:
-                            trading_symbol = inst.get('trading_symbol', '')
-                            # Try to match option contract format in trading_symbol
-                            if option_contract.replace('-', '') in trading_symbol.replace(' ', ''):
-                                instrument_key = inst.get('instrument_key')
-                                if instrument_key:
-                                    logger.info(f"✅ Fallback: Found instrument_key: {instrument_key}")
-                                    # Also get qty if available
-                                    inst_lot_size = inst.get('lot_size')
-                                    if inst_lot_size and inst_lot_size > 0 and qty == 0:
-                                        qty = int(inst_lot_size)
-                                        logger.info(f"✅ Fallback: Found lot_size: {qty}")
-                                    # Now try to fetch option LTP
-                                    try:
-                                        quote_data = vwap_service.get_market_quote_by_key(instrument_key)
-                                        if quote_data and quote_data.get('last_price'):
-                                            option_ltp = float(quote_data.get('last_price', 0))
-                                            logger.info(f"✅ Fallback: Fetched option LTP: ₹{option_ltp}")
-                                    except Exception:
-                                        pass
-                                    break
-                except Exception as fallback_error:
-                    logger.info(f"⚠️ Fallback instrument_key lookup failed: {str(fallback_error)}")
-                if not instrument_key:
-                    logger.info(f"⚠️ Cannot fetch option LTP for {option_contract} - instrument_key is None (fallback also failed)")
-                    logger.warning(f"Cannot fetch option LTP for {option_contract} (stock: {stock_name}) - instrument_key is None")
-            elif not instrument_key:
-                logger.info(f"⚠️ Cannot fetch option LTP for {option_contract if option_contract else 'N/A'} - instrument_key is None")
-                if option_contract:
-                    logger.warning(f"Cannot fetch option LTP for {option_contract} (stock: {stock_name}) - instrument_key is None")
-            elif not vwap_service:
-                logger.info(f"⚠️ Cannot fetch option LTP for {option_contract if option_contract else 'N/A'} - vwap_service is None")
-                if option_contract:
-                    logger.warning(f"Cannot fetch option LTP for {option_contract} (stock: {stock_name}) - vwap_service is None")
-            
-            # ====================================================================
-            # ACTIVITY 7: Fetch Option Candles (Independent - requires instrument_key)
-            # ====================================================================
-            # NOTE: Candle fetch failure should NOT block option LTP or lot size
-            # Candles are used for candle size filter, but option LTP and lot size are critical for trade entry
-            if instrument_key and vwap_service:
-                try:
-                    logger.info(f"🔍 Fetching option candles for {option_contract} using instrument_key: {instrument_key}")
-                    option_candles = vwap_service.get_option_daily_candles_current_and_previous(instrument_key)
-                    if option_candles:
-                        logger.info(f"✅ Fetched option OHLC candles for {option_contract}")
-                        if option_candles.get('current_day_candle'):
-                            logger.info(f"   Current day candle: {option_candles.get('current_day_candle')}")
-                        if option_candles.get('previous_day_candle'):
-                            logger.info(f"   Previous day candle: {option_candles.get('previous_day_candle')}")
-                    else:
-                        logger.info(f"⚠️ Could not fetch option OHLC candles for {option_contract} - returned None (this is OK, will continue with option LTP and lot size)")
-                        logger.warning(f"Could not fetch option OHLC candles for {option_contract} (stock: {stock_name}, instrument_key: {instrument_key}) - returned None. Continuing with other data.")
-                except Exception as e:
-                    logger.info(f"❌ ERROR fetching option OHLC candles for {option_contract}: {str(e)} (this is OK, will continue with option LTP and lot size)")
-                    logger.error(f"Error fetching option OHLC candles for {option_contract} (stock: {stock_name}, instrument_key: {instrument_key}): {str(e)}. Continuing with other data.", exc_info=True)
-            elif not instrument_key:
-                logger.info(f"⚠️ Cannot fetch option candles for {option_contract} - instrument_key is None")
-                logger.warning(f"Cannot fetch option candles for {option_contract} (stock: {stock_name}) - instrument_key is None")
-            elif not vwap_service:
-                logger.info(f"⚠️ Cannot fetch option candles for {option_contract} - vwap_service is None")
-                logger.warning(f"Cannot fetch option candles for {option_contract} (stock: {stock_name}) - vwap_service is None")
-            
-            # ====================================================================
-            # ACTIVITY 8: Fetch Previous Hour VWAP (Independent)
-            # ====================================================================
-            if vwap_service and stock_name:
-                try:
-                    prev_vwap_data = vwap_service.get_stock_vwap_for_previous_hour(stock_name, reference_time=triggered_datetime)
-                    if prev_vwap_data:
-                        stock_vwap_previous_hour = prev_vwap_data.get('vwap')
-                        stock_vwap_previous_hour_time = prev_vwap_data.get('time')
-                        logger.info(f"✅ Fetched previous hour VWAP for {stock_name}: ₹{stock_vwap_previous_hour:.2f} at {stock_vwap_previous_hour_time.strftime('%H:%M:%S')}")
-                    else:
-                        logger.info(f"⚠️ Could not fetch previous hour VWAP for {stock_name}")
-                except Exception as e:
-                    logger.info(f"⚠️ Error fetching previous hour VWAP for {stock_name}: {str(e)}")
-                
-            # ====================================================================
-            # CREATE ENRICHED STOCK DATA (Always created with whatever data we have)
-            # ====================================================================
-            # Check if enrichment is truly failed: option_contract found but instrument_key missing
-            # This is critical because without instrument_key, we can't fetch option LTP or candles
-            enrichment_failed = False
-            enrichment_error_msg = None
-            
-            if option_contract and not instrument_key:
-                enrichment_failed = True
-                enrichment_error_msg = f"Could not find instrument_key for option contract {option_contract}"
-                logger.info(f"❌ ENRICHMENT FAILED for {stock_name}: {enrichment_error_msg}")
-            
-            # ALWAYS create enriched_stock, regardless of enrichment success/failure
-            # This ensures stocks are saved even if enrichment partially fails
-            enriched_stock = {
-                "stock_name": stock_name,
-                "trigger_price": trigger_price,
-                "last_traded_price": stock_ltp,
-                "stock_vwap": stock_vwap,
-                "stock_vwap_previous_hour": stock_vwap_previous_hour,
-                "stock_vwap_previous_hour_time": stock_vwap_previous_hour_time,
-                "option_type": forced_option_type,
-                "option_contract": option_contract or "",
-                "otm1_strike": option_strike,
-                "option_ltp": option_ltp,
-                "option_vwap": 0.0,  # Not used
-                "qty": qty,
-                "instrument_key": instrument_key,
-                "option_candles": option_candles,
-                "_enrichment_failed": enrichment_failed,
-                "_enrichment_error": enrichment_error_msg
-            }
-            
-            enriched_stocks.append(enriched_stock)
-            enrichment_successful = True
-            
-            # Log what we got
-            if option_contract:
-                logger.info(f"✅ Enriched stock: {stock_name} - LTP: ₹{stock_ltp}, Option: {option_contract}, Qty: {qty}, Instrument Key: {instrument_key or 'N/A'}")
-            else:
-                logger.info(f"⚠️ Partial data for: {stock_name} - LTP: ₹{stock_ltp}, Option: N/A")
-        
+        enriched_stocks = await asyncio.get_running_loop().run_in_executor(
+            None,
+            functools.partial(
+                enrich_webhook_stocks,
+                stocks_to_enrich,
+                functools.partial(
+                    _enrich_webhook_stock,
+                    forced_option_type=forced_option_type,
+                    triggered_datetime=triggered_datetime,
+                    vwap_service=vwap_service,
+                ),
+                timer=timer,
+            ),
+        )
+
         processed_data["stocks"] = enriched_stocks
         logger.info(f"Successfully processed {len(enriched_stocks)} stocks")
 
@@ -1783,7 +1809,9 @@ async def process_webhook_data(data: dict, db: Session, forced_type: str = None)
         
         # Check index trends at the time of alert
         # Index trends determine trade entry, not alert display
+        timer.lap("rank")
         index_trends = vwap_service.check_index_trends()
+        timer.lap("index_trends")
         nifty_trend = index_trends.get("nifty_trend", "unknown")
         banknifty_trend = index_trends.get("banknifty_trend", "unknown")
         
@@ -2897,6 +2925,7 @@ async def process_webhook_data(data: dict, db: Session, forced_type: str = None)
         # Commit all database records
         try:
             db.commit()
+            timer.lap("entries")
             logger.info(f"\n✅ DATABASE COMMIT SUCCESSFUL")
             logger.info(f"   • Total Stocks Processed: {len(processed_data.get('stocks', []))}")
             logger.info(f"   • Saved to DB: {saved_count} stocks")
@@ -2959,7 +2988,9 @@ async def process_webhook_data(data: dict, db: Session, forced_type: str = None)
         # Track webhook success
         if health_monitor:
             health_monitor.record_webhook_success()
-        
+
+        timer.lap("cache")
+        logger.info("⏱️ %s (%d stocks)", timer.summary(), len(processed_data["stocks"]))
         return JSONResponse(
             status_code=200,
             content={
@@ -3214,7 +3245,10 @@ async def manually_update_no_entry_trades(db: Session = Depends(get_db)):
     - Update all hourly market data
     """
     try:
-        from backend.services.vwap_updater import update_vwap_for_all_open_positions
+        from backend.services.vwap_updater import (
+            get_last_open_position_cycle_stats,
+            update_vwap_for_all_open_positions,
+        )
         
         logger.info("🔄 Manual trigger: Updating all 'no_entry' trades from today")
         
@@ -3239,6 +3273,7 @@ async def manually_update_no_entry_trades(db: Session = Depends(get_db)):
             "success": True,
             "message": f"Update completed for all 'no_entry' trades from today",
             "no_entry_trades_count": no_entry_count,
+            "open_position_cycle": get_last_open_position_cycle_stats(),
             "timestamp": datetime.now().isoformat()
         }
         
@@ -4385,6 +4420,7 @@ async def health_check():
                     "healthy": not pool_stats.get("stressed"),
                     **{k: v for k, v in pool_stats.items() if k != "available"},
                 },
+                "upstox_http": upstox_http_stats(top=10),
             },
             "metrics": {
                 "consecutive_webhook_failures": health_monitor.webhook_failures if health_monitor else 0,
@@ -4830,6 +4866,16 @@ async def manual_stock_entry(request: Request, db: Session = Depends(get_db)):
             }
         )
 
+
+def _reconcile_scan_today_with_broker() -> Dict[str, Any]:
+    """Throttled broker reconcile on its own short-lived session (runs off the event loop)."""
+    from backend.database import db_session
+    from backend.services.live_trading import reconcile_scan_algo_today_with_broker
+
+    with db_session() as rec_db:
+        return reconcile_scan_algo_today_with_broker(rec_db, force=False)
+
+
 @router.get("/latest")
 async def get_latest_webhook_data(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
@@ -4849,11 +4895,7 @@ async def get_latest_webhook_data(background_tasks: BackgroundTasks, db: Session
     # Align today's DB rows with Upstox positions + order book so scan.html matches the broker.
     # Use a dedicated short-lived session — reconcile calls Upstox and must not hold the request pool slot.
     try:
-        from backend.database import db_session
-        from backend.services.live_trading import reconcile_scan_algo_today_with_broker
-
-        with db_session() as rec_db:
-            rec = reconcile_scan_algo_today_with_broker(rec_db, force=False)
+        rec = await get_async_upstox_service().run_sync(_reconcile_scan_today_with_broker)
         if rec.get("success") and not rec.get("skipped"):
             logger.info(
                 "Broker↔scan reconcile: updated=%s orphans=%s qty_sync=%s err=%s",
@@ -4892,10 +4934,9 @@ async def get_latest_webhook_data(background_tasks: BackgroundTasks, db: Session
             logger.info(f"Current time: {now.strftime('%Y-%m-%d %H:%M:%S')} IST - Showing YESTERDAY's data (before 9:00 AM)")
         
         # For intraday alerts, use today if it's a trading day, otherwise get last trading date
-        if vwap_service.is_trading_day(today):
-            trading_date = today
-        else:
-            trading_date = vwap_service.get_last_trading_date(now)
+        trading_date = datetime.combine(
+            get_trading_calendar().previous_trading_day(now, include_self=True), dt_time(0, 0)
+        )
         current_date = trading_date.strftime('%Y-%m-%d')
         
         # Fetch Bullish alerts from database for the current trading day only
@@ -5386,7 +5427,7 @@ async def post_reconcile_scan_with_broker(db: Session = Depends(get_db)):
     try:
         from backend.services.live_trading import reconcile_scan_algo_today_with_broker
 
-        rec = reconcile_scan_algo_today_with_broker(db, force=True)
+        rec = await get_async_upstox_service().run_sync(reconcile_scan_algo_today_with_broker, db, force=True)
         return JSONResponse(
             status_code=200 if rec.get("success") else 503,
             content={"status": "success" if rec.get("success") else "error", "data": rec},
@@ -5405,6 +5446,10 @@ async def refresh_hourly_prices(db: Session = Depends(get_db)):
     Refresh option_ltp and sell_price hourly for existing records
     Only updates sell_price, buy_price remains unchanged (historical)
     """
+    return await get_async_upstox_service().run_sync(_refresh_hourly_prices_sync, db)
+
+
+def _refresh_hourly_prices_sync(db: Session):
     try:
         import pytz
         # datetime already imported at module level
@@ -5905,6 +5950,10 @@ async def refresh_current_vwap():
     Called every 5 minutes to update prices and strikes
     Stock list remains unchanged
     """
+    return await get_async_upstox_service().run_sync(_refresh_current_vwap_sync)
+
+
+def _refresh_current_vwap_sync():
     global bullish_data, bearish_data
     
     has_bullish = len(bullish_data.get("alerts", [])) > 0
@@ -6120,8 +6169,11 @@ async def get_index_prices():
         
         # During market hours - fetch real-time data
         # Get real-time market quotes for indices using correct instrument keys
-        nifty_quote = vwap_service.get_market_quote_by_key(vwap_service.NIFTY50_KEY)
-        banknifty_quote = vwap_service.get_market_quote_by_key(vwap_service.BANKNIFTY_KEY)
+        upstox_async = get_async_upstox_service()
+        nifty_quote, banknifty_quote = await asyncio.gather(
+            upstox_async.get_market_quote_by_key(vwap_service.NIFTY50_KEY),
+            upstox_async.get_market_quote_by_key(vwap_service.BANKNIFTY_KEY),
+        )
         
         # Process NIFTY data
         nifty_data = {}
@@ -6215,7 +6267,7 @@ async def get_index_prices():
             # Double-check we're still in market hours before fallback API call
             current_hour = datetime.now(ist).hour
             if 9 <= current_hour <= 16:
-                index_check_result = vwap_service.check_index_trends()
+                index_check_result = await upstox_async.run_sync(vwap_service.check_index_trends)
             else:
                 # Return default/empty data after hours
                 index_check_result = {
@@ -6440,6 +6492,22 @@ async def upstox_market_feed_status():
         return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
 
 
+@router.get("/upstox-order-stream/status")
+async def upstox_order_stream_status():
+    """Order-state hub (postback + portfolio stream + REST fallback) and portfolio stream health."""
+    try:
+        from backend.services.order_state_hub import hub
+        from backend.services.upstox_portfolio_feed import portfolio_feed_status
+
+        return JSONResponse(
+            status_code=200,
+            content={"success": True, "hub": hub.stats(), "portfolio_stream": portfolio_feed_status()},
+        )
+    except Exception as e:
+        logger.exception("upstox_order_stream_status: %s", e)
+        return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
+
+
 @router.post("/smart-futures/run-picker")
 def smart_futures_run_picker_now(
     warmup_oi: bool = Query(
@@ -6881,7 +6949,7 @@ async def upstox_oauth_callback(code: str = None, state: str = None, error: str
             "Content-Type": "application/x-www-form-urlencoded"
         }
         
-        response = requests.post(token_url, data=token_data, headers=headers, timeout=10)
+        response = get_upstox_http_session().post(token_url, data=token_data, headers=headers, timeout=10)
         
         if response.status_code != 200:
             return JSONResponse(
@@ -7079,8 +7147,8 @@ async def upstox_oauth_status():
         market_params = {"instrument_key": "NSE_INDEX|Nifty 50"}
 
         try:
-            profile_response = requests.get(test_url_profile, headers=headers, timeout=5)
-            market_response = requests.get(test_url_market, headers=headers, params=market_params, timeout=5)
+            profile_response = get_upstox_http_session().get(test_url_profile, headers=headers, timeout=5)
+            market_response = get_upstox_http_session().get(test_url_market, headers=headers, params=market_params, timeout=5)
         except Exception as net_err:
             payload = _soft_unavailable_payload(f"Upstox status probe unavailable: {net_err}")
             _upstox_status_cache["ts"] = now_ts
@@ -7101,8 +7169,8 @@ async def upstox_oauth_status():
                 headers["Authorization"] = f"Bearer {vwap_service.access_token}"
                 cur_fp = _upstox_token_fingerprint(getattr(vwap_service, "access_token", None))
                 try:
-                    profile_response = requests.get(test_url_profile, headers=headers, timeout=5)
-                    market_response = requests.get(test_url_market, headers=headers, params=market_params, timeout=5)
+                    profile_response = get_upstox_http_session().get(test_url_profile, headers=headers, timeout=5)
+                    market_response = get_upstox_http_session().get(test_url_market, headers=headers, params=market_params, timeout=5)
                 except Exception:
                     pass
             if profile_response.status_code == 401 or market_response.status_code == 401:
@@ -7163,6 +7231,14 @@ async def upstox_postback(request: Request, background_tasks: BackgroundTasks, d
         
         logger.info(f"📥 Upstox postback: type={update_type}, order_id={order_id}, status={status}")
         
+        # Wake live fill waiters now; the DB sync below runs after the response.
+        try:
+            from backend.services.order_state_hub import publish_order_update
+
+            publish_order_update(payload, source="postback")
+        except Exception as hub_err:
+            logger.warning(f"Order-state hub publish failed: {hub_err}")
+        
         def process_postback():
             try:
                 from backend.database import SessionLocal
@@ -41,6 +41,7 @@ from backend.services.smart_futures_signal_gates import (
     apply_live_signal_invalidation,
     signal_status_tooltip,
 )
+from backend.services.upstox_rate_limiter import CandlePriority, candle_priority
 from backend.services.upstox_service import UpstoxService
 
 logger = logging.getLogger(__name__)
@@ -637,9 +638,10 @@ def get_smart_futures_daily(user: User = Depends(_require_user), db: Session = D
                 return m5_session_cache[ikey]
             bars: List[Dict[str, Any]] = []
             try:
-                raw5 = us_exit.get_historical_candles_by_instrument_key(
-                    ikey, interval="minutes/5", days_back=5, range_end_date=sd
-                )
+                with candle_priority(CandlePriority.SCANNER):
+                    raw5 = us_exit.get_historical_candles_by_instrument_key(
+                        ikey, interval="minutes/5", days_back=5, range_end_date=sd
+                    )
                 bars = [
                     b
                     for b in sorted(raw5 or [], key=lambda x: str(x.get("timestamp") or ""))
@@ -683,9 +685,10 @@ def get_smart_futures_daily(user: User = Depends(_require_user), db: Session = D
                     "bars": [],
                 }
                 try:
-                    raw15 = us_exit.get_historical_candles_by_instrument_key(
-                        ikey, interval="minutes/15", days_back=6, range_end_date=sd
-                    )
+                    with candle_priority(CandlePriority.SCANNER):
+                        raw15 = us_exit.get_historical_candles_by_instrument_key(
+                            ikey, interval="minutes/15", days_back=6, range_end_date=sd
+                        )
                     m15 = [
                         b
                         for b in sorted(raw15 or [], key=lambda x: str(x.get("timestamp") or ""))
@@ -21,9 +21,9 @@ from __future__ import annotations
 import argparse
 import logging
 import sys
-from datetime import date, timedelta
+from datetime import date
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List
 
 _ROOT = Path(__file__).resolve().parents[2]
 if str(_ROOT) not in sys.path:
@@ -33,7 +33,7 @@ import backend.env_bootstrap  # noqa: F401,E402
 
 from backend.config import settings  # noqa: E402
 from backend.database import SessionLocal  # noqa: E402
-from backend.services.market_holiday import refresh_holiday_dates_from_db  # noqa: E402
+from backend.services.trading_calendar import get_trading_calendar  # noqa: E402
 from backend.services.upstox_service import UpstoxService  # noqa: E402
 from backend.services.volume_mismatch.backtest import BACKTEST_DEFAULT_FROM  # noqa: E402
 from backend.services.volume_mismatch.backtest_universe import (  # noqa: E402
@@ -49,30 +49,6 @@ from backend.services.volume_mismatch.universe import load_volume_mismatch_unive
 logger = logging.getLogger(__name__)
 
 
-def _load_holiday_dates(upstox: UpstoxService, from_date: date, to_date: date) -> Set[date]:
-    holidays = refresh_holiday_dates_from_db()
-    if holidays:
-        return holidays
-    out: Set[date] = set()
-    for year in range(from_date.year, to_date.year + 1):
-        for dstr in upstox.get_market_holidays(year) or []:
-            try:
-                out.add(date.fromisoformat(str(dstr)[:10]))
-            except ValueError:
-                continue
-    return out
-
-
-def _iter_trading_days(d0: date, d1: date, holiday_dates: Set[date]) -> List[date]:
-    out: List[date] = []
-    d = d0
-    while d <= d1:
-        if d.weekday() < 5 and d not in holiday_dates:
-            out.append(d)
-        d += timedelta(days=1)
-    return out
-
-
 def _dates_with_signals(db, from_date: date, to_date: date) -> Dict[date, int]:
     from sqlalchemy import text
 
@@ -188,9 +164,7 @@ def main() -> int:
         if from_date > to_date:
             print("from_date must be <= to_date", file=sys.stderr)
             return 1
-        upstox = UpstoxService(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET)
-        holidays = _load_holiday_dates(upstox, from_date, to_date)
-        session_dates = _iter_trading_days(from_date, to_date, holidays)
+        session_dates = get_trading_calendar().trading_days(from_date, to_date)
 
     if args.only_missing and session_dates and not args.dry_run:
         db = SessionLocal()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Benchmark: pandas DataFrame ADX vs pandas-free scalar / batched kernels.
+
+Synthetic daily universe (default 200 symbols × 72 bars, the Iron Condor gate
+shape). The pandas path is the ``pandas_ta.adx`` formula written out with
+pandas (``pandas_ta`` itself is used when installed); all three must agree on
+the latest ADX.
+
+    PYTHONPATH=. python backend/scripts/bench_adx.py
+    PYTHONPATH=. python backend/scripts/bench_adx.py --symbols 500 --bars 375 --length 14
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.scripts.bench_indicator_kernels import synth_universe
+from backend.services.indicator_kernels import adx_batch, adx_series
+
+
+def _pandas_adx_last(h, l, c, length):
+    try:
+        import pandas_ta as ta
+
+        df = ta.adx(pd.Series(h), pd.Series(l), pd.Series(c), length=length, lensig=length)
+        return float(df[f"ADX_{length}"].iloc[-1])
+    except ImportError:
+        from backend.test_adx_kernel import _ref_adx
+
+        return float(_ref_adx(h, l, c, length)[0].iloc[-1])
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="ADX kernel benchmark over a synthetic universe.")
+    ap.add_argument("--symbols", type=int, default=200)
+    ap.add_argument("--bars", type=int, default=72)
+    ap.add_argument("--length", type=int, default=10)
+    args = ap.parse_args()
+
+    uni = synth_universe(args.symbols, args.bars)
+    n = args.length
+
+    t0 = time.perf_counter()
+    ref = [_pandas_adx_last(h, l, c, n) for h, l, c in uni]
+    t_pd = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scalar = [adx_series(h, l, c, n)[0][-1] for h, l, c in uni]
+    t_scalar = time.perf_counter() - t0
+
+    H, L, C = (np.array([u[k] for u in uni]) for k in range(3))
+    t0 = time.perf_counter()
+    batch = adx_batch(H, L, C, n)[0][:, -1].tolist()
+    t_batch = time.perf_counter() - t0
+
+    worst = max(max(abs(a - b), abs(a - d)) for a, b, d in zip(ref, scalar, batch))
+    print(f"symbols={args.symbols} bars/symbol={args.bars} length={n} max|diff|={worst:.3g}")
+    print(f"pandas per symbol : {t_pd * 1e3:9.1f} ms")
+    print(f"scalar kernel     : {t_scalar * 1e3:9.1f} ms  ({t_pd / t_scalar:6.1f}x)")
+    print(f"numpy batch       : {t_batch * 1e3:9.1f} ms  ({t_pd / t_batch:6.1f}x)")
+    return 0 if worst <= 1e-9 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Benchmark: shared candle cache as lists of dicts (before) vs ``CandleSeries`` (after).
+
+Synthetic 5m universe (default 200 symbols × 6 sessions × 75 bars, oldest-first
+with OI like the merged intraday series).
+
+* Memory: ``tracemalloc`` of the stored entries, measured on ``--sample``
+  entries and projected to a full 4000-entry cache (``_MAX_ENTRIES``).
+* CPU: one Relative Strength scan — the real ``_compute_symbol_metrics`` over
+  the universe — with the old list-stored cache vs the columnar cache (arrays
+  read via ``get_recent_series``), plus the cache-read + column-extraction step
+  alone. Results of both scans must be identical.
+
+    PYTHONPATH=. python backend/scripts/bench_candle_series.py
+    PYTHONPATH=. python backend/scripts/bench_candle_series.py --symbols 50 --days 3
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import logging
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import pytz
+
+from backend.services.market_data import candle_cache
+from backend.services.market_data.candle_series import CandleSeries
+
+IST = pytz.timezone("Asia/Kolkata")
+BARS_PER_DAY = 75
+
+
+def synth_series(days: int, seed: int, now: datetime) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    px, rows = 100.0 + rnd.random() * 2000, []
+    for d in range(days - 1, -1, -1):
+        day = (now - timedelta(days=d)).date()
+        for i in range(BARS_PER_DAY):
+            t = IST.localize(datetime(day.year, day.month, day.day, 9, 15) + timedelta(minutes=5 * i))
+            if t > now - timedelta(minutes=5):
+                break
+            o = px
+            px = max(1.0, px * (1.0 + rnd.gauss(0, 0.003)))
+            rows.append(
+                {
+                    "timestamp": t.isoformat(),
+                    "open": round(o, 2),
+                    "high": round(max(o, px) * (1 + rnd.random() * 0.0015), 2),
+                    "low": round(min(o, px) * (1 - rnd.random() * 0.0015), 2),
+                    "close": round(px, 2),
+                    "volume": float(rnd.randint(1_000, 90_000)),
+                    "oi": float(rnd.randint(10**5, 10**7)),
+                }
+            )
+    return rows
+
+
+def measure_memory(universe: List[List[Dict[str, Any]]], sample: int) -> Dict[str, float]:
+    out = {}
+    # json round-trip: fresh dict/str/float objects per entry, as a real fetch allocates.
+    for label, build in (("dicts", lambda rows: json.loads(json.dumps(rows))), ("series", CandleSeries.from_dicts)):
+        gc.collect()
+        tracemalloc.start()
+        kept = [build(universe[i % len(universe)]) for i in range(sample)]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        out[label] = size / sample
+        del kept
+    return out
+
+
+def load_cache(universe: List[List[Dict[str, Any]]], *, columnar: bool):
+    c = importlib.reload(candle_cache)
+    if not columnar:
+        c._to_stored = lambda candles: list(candles)
+    for i, rows in enumerate(universe):
+        c.put(f"NSE_FO|{i}", "minutes/5", "2026-01-01", "2026-12-31", rows)
+    return c
+
+
+def run_scan(rs, c, n: int) -> List[Any]:
+    rs.candle_cache = c
+    return [
+        rs._compute_symbol_metrics(None, {"instrument_key": f"NSE_FO|{i}", "stock": f"S{i}"}, 0.1, cache_only=True)
+        for i in range(n)
+    ]
+
+
+def read_columns(rs, c, n: int) -> None:
+    for i in range(n):
+        s = c.get_recent_series(f"NSE_FO|{i}", "minutes/5", 1e9)
+        if s is not None:
+            s = s.sorted()
+            cols = [s.column(f, 0.0).tolist() for f in ("close", "high", "low", "volume")]
+            rs._current_and_prev_day_close_series(s, cols[0])
+        else:
+            rows = rs._sorted_candles(c.get_recent(f"NSE_FO|{i}", "minutes/5", 1e9))
+            cols = [[rs._f(r.get(f)) for r in rows] for f in ("close", "high", "low", "volume")]
+            rs._current_and_prev_day_close(rows)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Candle cache: dict lists vs CandleSeries.")
+    ap.add_argument("--symbols", type=int, default=200)
+    ap.add_argument("--days", type=int, default=6)
+    ap.add_argument("--sample", type=int, default=400, help="entries measured for the memory projection")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    logging.disable(logging.WARNING)
+
+    from backend.services import relative_strength_scanner as rs
+
+    now = datetime.now(IST)
+    universe = [synth_series(args.days, seed, now) for seed in range(args.symbols)]
+    bars = sum(len(u) for u in universe) / len(universe)
+    print(f"universe: {args.symbols} symbols × {bars:.0f} bars (5m, {args.days} sessions)")
+
+    mem = measure_memory(universe, args.sample)
+    full = candle_cache._MAX_ENTRIES
+    print(
+        f"memory / entry: dicts {mem['dicts'] / 1024:7.1f} KiB   series {mem['series'] / 1024:7.1f} KiB   "
+        f"({mem['dicts'] / mem['series']:.1f}x)"
+    )
+    print(
+        f"memory / {full}-entry cache: dicts {mem['dicts'] * full / 2**20:7.0f} MiB   "
+        f"series {mem['series'] * full / 2**20:7.0f} MiB"
+    )
+
+    results = {}
+    for label, columnar in (("before (dict lists)", False), ("after (CandleSeries)", True)):
+        c = load_cache(universe, columnar=columnar)
+        results[label] = run_scan(rs, c, args.symbols)
+        t_scan = best_of(lambda: run_scan(rs, c, args.symbols), args.repeat)
+        t_read = best_of(lambda: read_columns(rs, c, args.symbols), args.repeat)
+        print(f"{label:>22}: RS scan {t_scan * 1e3:8.1f} ms   cache read + columns {t_read * 1e3:7.1f} ms")
+    before, after = results.values()
+    same = before == after
+    print("results identical:", same)
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
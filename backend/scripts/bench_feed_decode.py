@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: direct protobuf decode vs ``MessageToDict`` dict path.
+
+Frames come from a file recorded by the live feed (set
+``UPSTOX_WS_RECORD_FRAMES_PATH``) or, without ``--frames``, are synthesized to
+look like a busy full-mode minute (depth, tbq/tsq, I1 bars).
+
+    PYTHONPATH=. python backend/scripts/bench_feed_decode.py --frames /tmp/feed.bin
+    PYTHONPATH=. python backend/scripts/bench_feed_decode.py --synthetic 2000 --keys 100
+"""
+
+import argparse
+import random
+import sys
+import time
+from typing import List
+
+from google.protobuf.json_format import MessageToDict
+
+from backend.services.upstox_feed_decode import FeedRecord, decode_frame, iter_frames
+from backend.services.upstox_market_feed import _extract_feed_fields
+from backend.services.upstox_proto import MarketDataFeedV3_pb2 as feed_pb
+
+
+def synth_frames(n_frames: int, n_keys: int, seed: int = 7) -> List[bytes]:
+    rnd = random.Random(seed)
+    out: List[bytes] = []
+    for _ in range(n_frames):
+        fr = feed_pb.FeedResponse()
+        fr.type = 1
+        for k in range(n_keys):
+            mff = fr.feeds[f"NSE_FO|{50000 + k}"].fullFeed.marketFF
+            px = 100.0 + rnd.random() * 50
+            mff.ltpc.ltp = px
+            mff.ltpc.ltq = rnd.randint(1, 500)
+            mff.ltpc.cp = px * 0.99
+            mff.oi = float(rnd.randint(10_000, 5_000_000))
+            mff.tbq = float(rnd.randint(0, 100_000))
+            mff.tsq = float(rnd.randint(0, 100_000))
+            for lvl in range(5):
+                q = mff.marketLevel.bidAskQuote.add()
+                q.bidQ = rnd.randint(1, 5000)
+                q.bidP = px - 0.05 * (lvl + 1)
+                q.askQ = rnd.randint(1, 5000)
+                q.askP = px + 0.05 * (lvl + 1)
+            for iv in ("1d", "I1", "I1"):
+                o = mff.marketOHLC.ohlc.add()
+                o.interval = iv
+                o.open, o.high, o.low, o.close = px, px + 1, px - 1, px + 0.5
+                o.vol = rnd.randint(100, 10_000)
+                o.ts = 1_783_000_000_000 + rnd.randint(0, 60_000)
+        out.append(fr.SerializeToString())
+    return out
+
+
+def _dict_path(binary: bytes):
+    fr = feed_pb.FeedResponse()
+    fr.ParseFromString(binary)
+    d = MessageToDict(fr, preserving_proto_field_name=True)
+    return [(k, FeedRecord.from_fields(_extract_feed_fields(v))) for k, v in (d.get("feeds") or {}).items()]
+
+
+def _time(fn, frames: List[bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for f in frames:
+            fn(f)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compare direct vs dict decode of Upstox feed frames.")
+    ap.add_argument("--frames", help="Length-prefixed frame file recorded by the live feed.")
+    ap.add_argument("--synthetic", type=int, default=500, help="Synthetic frame count (no --frames).")
+    ap.add_argument("--keys", type=int, default=100, help="Instruments per synthetic frame.")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    if args.frames:
+        with open(args.frames, "rb") as fh:
+            frames = list(iter_frames(fh))
+    else:
+        frames = synth_frames(args.synthetic, args.keys)
+    if not frames:
+        print("no frames")
+        return 1
+
+    mismatches = sum(1 for f in frames if sorted(decode_frame(f), key=lambda r: r[0]) != sorted(_dict_path(f), key=lambda r: r[0]))
+    n_feeds = sum(len(decode_frame(f)) for f in frames)
+    t_dict = _time(_dict_path, frames, args.repeat)
+    t_direct = _time(decode_frame, frames, args.repeat)
+    print(f"frames={len(frames)} feeds={n_feeds} parity_mismatches={mismatches}")
+    print(f"dict   : {t_dict * 1e3:9.1f} ms  ({t_dict / n_feeds * 1e6:7.2f} us/feed)")
+    print(f"direct : {t_direct * 1e3:9.1f} ms  ({t_direct / n_feeds * 1e6:7.2f} us/feed)")
+    print(f"speedup: {t_dict / t_direct:5.1f}x")
+    return 0 if mismatches == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Benchmark: per-bar ATR recompute vs single-pass Supertrend kernels.
+
+Synthetic 5m universe (default 200 symbols × 6 sessions × 75 bars). Compares the
+old O(n²) ``_supertrend_dir_last_two`` loop (kept here as the reference), the
+scalar kernel per symbol, and the NumPy batch kernel over the whole universe,
+and checks all three agree on the last two directions.
+
+    PYTHONPATH=. python backend/scripts/bench_indicator_kernels.py
+    PYTHONPATH=. python backend/scripts/bench_indicator_kernels.py --symbols 50 --days 3
+"""
+
+import argparse
+import random
+import sys
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from backend.services.indicator_kernels import supertrend_batch, supertrend_series
+from backend.services.smart_futures_picker.indicators import wilder_atr
+
+BARS_PER_DAY = 75
+
+
+def synth_universe(n_symbols: int, n_bars: int, seed: int = 5) -> List[Tuple[List[float], List[float], List[float]]]:
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n_symbols):
+        px = 100.0 + rnd.random() * 2000
+        h, l, c = [], [], []
+        for _ in range(n_bars):
+            o = px
+            px = max(1.0, px * (1.0 + rnd.gauss(0, 0.003)))
+            h.append(round(max(o, px) * (1 + rnd.random() * 0.0015), 2))
+            l.append(round(min(o, px) * (1 - rnd.random() * 0.0015), 2))
+            c.append(round(px, 2))
+        out.append((h, l, c))
+    return out
+
+
+def old_dir_last_two(highs, lows, closes, period=10, multiplier=3.0):
+    """The pre-kernel ``smart_futures_exit._supertrend_dir_last_two`` body."""
+    n = len(closes)
+    fub = [0.0] * n
+    flb = [0.0] * n
+    st = [0.0] * n
+    direction = [1] * n
+    for i in range(n):
+        atr_i = wilder_atr(highs[: i + 1], lows[: i + 1], closes[: i + 1], period)
+        if atr_i is None:
+            continue
+        hl2 = (float(highs[i]) + float(lows[i])) / 2.0
+        bub = hl2 + float(multiplier) * float(atr_i)
+        blb = hl2 - float(multiplier) * float(atr_i)
+        fub[i] = bub if (bub < fub[i - 1] or float(closes[i - 1]) > fub[i - 1]) else fub[i - 1]
+        flb[i] = blb if (blb > flb[i - 1] or float(closes[i - 1]) < flb[i - 1]) else flb[i - 1]
+        if st[i - 1] == fub[i - 1]:
+            st[i] = fub[i] if float(closes[i]) <= fub[i] else flb[i]
+        else:
+            st[i] = flb[i] if float(closes[i]) >= flb[i] else fub[i]
+        direction[i] = 1 if float(closes[i]) >= st[i] else -1
+    return direction[-1], direction[-2]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Supertrend kernel benchmark over a synthetic 5m universe.")
+    ap.add_argument("--symbols", type=int, default=200)
+    ap.add_argument("--days", type=int, default=6)
+    args = ap.parse_args()
+
+    n_bars = args.days * BARS_PER_DAY
+    uni = synth_universe(args.symbols, n_bars)
+    kw = {"seed_first_bar": False, "compare_prev_band": True}
+
+    t0 = time.perf_counter()
+    old = [old_dir_last_two(h, l, c) for h, l, c in uni]
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scalar = []
+    for h, l, c in uni:
+        _, d = supertrend_series(h, l, c, 10, 3.0, **kw)
+        scalar.append((d[-1], d[-2]))
+    t_scalar = time.perf_counter() - t0
+
+    H, L, C = (np.array([u[k] for u in uni]) for k in range(3))
+    t0 = time.perf_counter()
+    _, dirs = supertrend_batch(H, L, C, 10, 3.0, **kw)
+    t_batch = time.perf_counter() - t0
+    batch = [(int(r[-1]), int(r[-2])) for r in dirs]
+
+    mismatches = sum(1 for a, b, c in zip(old, scalar, batch) if not (a == b == c))
+    print(f"symbols={args.symbols} bars/symbol={n_bars} mismatches={mismatches}")
+    print(f"old per-bar ATR : {t_old * 1e3:9.1f} ms")
+    print(f"scalar kernel   : {t_scalar * 1e3:9.1f} ms  ({t_old / t_scalar:6.1f}x)")
+    print(f"numpy batch     : {t_batch * 1e3:9.1f} ms  ({t_old / t_batch:6.1f}x)")
+    return 0 if mismatches == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Benchmark: indexed mmap instrument master vs ``json.load`` + linear scan.
+
+Each variant runs in a fresh (spawned) process so RSS deltas are comparable.
+Uses the real ``nse_instruments.json`` when given, else a synthetic file with
+roughly the production shape (EQ + FUT + a CE/PE strike ladder per underlying).
+
+    PYTHONPATH=. python backend/scripts/bench_instrument_master.py --json data/instruments/nse_instruments.json
+    PYTHONPATH=. python backend/scripts/bench_instrument_master.py --underlyings 200 --strikes 60
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+def synth_instruments(n_underlyings: int, n_strikes: int, n_expiries: int = 3) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for u in range(n_underlyings):
+        sym = f"STK{u:04d}"
+        rows.append({"segment": "NSE_EQ", "instrument_type": "EQ", "trading_symbol": sym, "name": f"{sym} LTD",
+                     "isin": f"INE{u:06d}01", "instrument_key": f"NSE_EQ|INE{u:06d}01", "tick_size": 0.05,
+                     "lot_size": 1, "exchange": "NSE"})
+        for e in range(n_expiries):
+            exp = 1782777599000 + e * 28 * 86_400_000
+            rows.append({"segment": "NSE_FO", "instrument_type": "FUT", "trading_symbol": f"{sym} FUT {e}",
+                         "underlying_symbol": sym, "expiry": exp, "lot_size": 500,
+                         "instrument_key": f"NSE_FO|{len(rows)}", "tick_size": 0.1, "exchange": "NSE"})
+            for s in range(n_strikes):
+                for ot in ("CE", "PE"):
+                    rows.append({"segment": "NSE_FO", "instrument_type": ot, "underlying_symbol": sym,
+                                 "trading_symbol": f"{sym} {100 + 5 * s} {ot} {e}", "expiry": exp,
+                                 "strike_price": float(100 + 5 * s), "lot_size": 500,
+                                 "instrument_key": f"NSE_FO|{len(rows)}", "tick_size": 0.05, "exchange": "NSE"})
+    return rows
+
+
+def _rss_mb() -> Tuple[float, float]:
+    """(resident, private) MB. Mapped artifact pages are shared page cache, not private.
+
+    Reads /proc (ru_maxrss survives fork+exec, so it would report the parent's peak).
+    """
+    with open("/proc/self/statm") as f:
+        _, resident, shared = (int(x) for x in f.read().split()[:3])
+    page = resource.getpagesize() / 1e6
+    return resident * page, (resident - shared) * page
+
+
+def _child(mode: str, path: str, keys: List[str], q: "mp.Queue") -> None:
+    from backend.services.instrument_master import InstrumentMaster, artifact_path_for
+
+    base = _rss_mb()
+    t0 = time.perf_counter()
+    found = 0
+    if mode == "json_scan":
+        with open(path, "rb") as f:
+            data = json.load(f)
+        t_open = time.perf_counter() - t0
+        t1 = time.perf_counter()
+        for k in keys:
+            for r in data:
+                if r.get("instrument_key") == k:
+                    found += 1
+                    break
+    else:
+        m = InstrumentMaster(artifact_path_for(Path(path)))
+        t_open = time.perf_counter() - t0
+        t1 = time.perf_counter()
+        for k in keys:
+            if m.get(k) is not None:
+                found += 1
+    per = (time.perf_counter() - t1) / max(1, len(keys))
+    rss, private = _rss_mb()
+    q.put({"mode": mode, "open_s": t_open, "lookup_us": per * 1e6, "found": found,
+           "rss_mb": rss - base[0], "private_mb": private - base[1]})
+
+
+def _run(mode: str, path: Path, keys: List[str]) -> Dict[str, Any]:
+    ctx = mp.get_context("spawn")
+    q = ctx.Queue()
+    p = ctx.Process(target=_child, args=(mode, str(path), keys, q))
+    p.start()
+    out = q.get()
+    p.join()
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Instrument master lookup latency / RSS benchmark.")
+    ap.add_argument("--json", help="Real nse_instruments.json (default: synthetic).")
+    ap.add_argument("--underlyings", type=int, default=200)
+    ap.add_argument("--strikes", type=int, default=60)
+    ap.add_argument("--lookups", type=int, default=200)
+    args = ap.parse_args()
+
+    from backend.services.instrument_master import build_instrument_master
+
+    tmpdir = None
+    if args.json:
+        src = Path(args.json)
+        rows = json.loads(src.read_text(encoding="utf-8"))
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        src = Path(tmpdir.name) / "nse_instruments.json"
+        rows = synth_instruments(args.underlyings, args.strikes)
+        src.write_text(json.dumps(rows), encoding="utf-8")
+
+    t0 = time.perf_counter()
+    build_instrument_master(src)
+    t_build = time.perf_counter() - t0
+    rnd = random.Random(11)
+    keys = [r["instrument_key"] for r in rnd.sample(rows, min(args.lookups, len(rows))) if isinstance(r, dict)]
+
+    print(f"records={len(rows)} json_mb={src.stat().st_size / 1e6:.1f} build_s={t_build:.2f}")
+    for mode in ("json_scan", "master"):
+        r = _run(mode, src, keys)
+        print(
+            f"{mode:10s}: open {r['open_s'] * 1e3:8.1f} ms  lookup {r['lookup_us']:10.1f} us  "
+            f"rss +{r['rss_mb']:6.1f} MB (private +{r['private_mb']:6.1f} MB)  found {r['found']}/{len(keys)}"
+        )
+    if tmpdir is not None:
+        tmpdir.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark: universe Kavach state + Trade Score, per-symbol scalar vs batch masks.
+
+Random indicator snapshots for N symbols (default 220, the F&O universe) go
+through ``evaluate_kavach`` + ``compute_trade_score`` one row at a time, then
+through ``evaluate_kavach_batch`` + ``trade_score_batch`` once. Results must match.
+
+    PYTHONPATH=. python backend/scripts/bench_kavach_batch.py
+    PYTHONPATH=. python backend/scripts/bench_kavach_batch.py --symbols 5000 --repeat 20
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+from backend.services.kavach_engine import (
+    BULLISH_STATES,
+    RANKING_BEARISH,
+    RANKING_BULLISH,
+    STATE_INDEX,
+    KavachBatch,
+    KavachInput,
+    compute_trade_score,
+    evaluate_kavach,
+    evaluate_kavach_batch,
+    trade_score_batch,
+)
+
+
+def synth(rnd: random.Random, n: int):
+    out = []
+    for _ in range(n):
+        vwap = 100.0 + rnd.gauss(0, 1)
+        out.append(
+            (
+                KavachInput(
+                    price=vwap + rnd.gauss(0, 1),
+                    ema5=vwap + rnd.gauss(0, 0.8),
+                    ema9=vwap + rnd.gauss(0, 0.8),
+                    ema9_slope=rnd.gauss(0, 0.2),
+                    vwap=vwap,
+                    supertrend_bullish=rnd.choice([True, False, None]),
+                    macd=rnd.gauss(0, 1),
+                    macd_signal=rnd.gauss(0, 1),
+                    macd_histogram=rnd.gauss(0, 0.5),
+                    adx=rnd.uniform(5, 45),
+                    volume_ratio=rnd.uniform(0.2, 3.0),
+                ),
+                rnd.gauss(0, 1),
+            )
+        )
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Scalar vs batch Kavach evaluation.")
+    ap.add_argument("--symbols", type=int, default=220)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    rows = synth(random.Random(7), args.symbols)
+    inputs = [i for i, _ in rows]
+    rs = np.array([r for _, r in rows])
+    bull_codes = [STATE_INDEX[s] for s in BULLISH_STATES]
+
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        scalar = []
+        for inp, r in rows:
+            kav = evaluate_kavach(inp)
+            ranking = RANKING_BULLISH if kav.state in BULLISH_STATES else RANKING_BEARISH
+            scalar.append(
+                (
+                    kav.state,
+                    compute_trade_score(
+                        rs=r, state=kav.state, volume_ratio=inp.volume_ratio, adx=inp.adx,
+                        price=inp.price, vwap=inp.vwap, ranking_type=ranking,
+                    ),
+                )
+            )
+    t_scalar = (time.perf_counter() - t0) / args.repeat
+
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        batch = KavachBatch.from_inputs(inputs)
+        res = evaluate_kavach_batch(batch)
+        states = res.states()
+        scores = trade_score_batch(
+            rs=rs, state_code=res.state_code, volume_ratio=batch.volume_ratio, adx=batch.adx,
+            price=batch.price, vwap=batch.vwap, bullish=np.isin(res.state_code, bull_codes),
+        )
+    t_batch = (time.perf_counter() - t0) / args.repeat
+
+    if list(zip(states, scores["trade_score"].tolist())) != scalar:
+        print("MISMATCH between scalar and batch engines", file=sys.stderr)
+        return 1
+    print(f"symbols: {args.symbols}, repeat {args.repeat}")
+    print(f"scalar: {t_scalar * 1e3:8.3f} ms/universe")
+    print(f"batch : {t_batch * 1e3:8.3f} ms/universe  ({t_scalar / max(t_batch, 1e-12):.1f}x, incl. from_inputs)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Benchmark: webhook-processing latency with the old fsync-per-record handler vs the log pipeline.
+
+Each mode points the root logger and ``backend.routers.scan`` (the webhook path
+logs to both) at a fresh file in a temp dir, then replays a synthetic ChartInk
+alert through ``scan._enrich_webhook_stock`` against a zero-latency stub broker
+(see ``replay_webhooks.py``) so logging is the main I/O left. A second phase
+times raw ``logger.info`` calls from several threads.
+
+    PYTHONPATH=. python backend/scripts/bench_log_handlers.py --stocks 25 --runs 40
+    PYTHONPATH=. python backend/scripts/bench_log_handlers.py --log-dir /var/tmp   # measure on the prod disk
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from backend.scripts.replay_webhooks import StubBroker, payload_stocks, replay, stubbed_instruments, synthetic_payload
+from backend.services.log_pipeline import LOG_DATEFMT, LOG_FORMAT, FlushingFileHandler, LogPipeline
+
+_LOGGERS = ("", "backend.routers.scan")
+
+
+@contextmanager
+def log_mode(mode: str, log_dir: Path) -> Iterator[Dict[str, object]]:
+    path = log_dir / f"bench_{mode}.log"
+    pipeline = None
+    if mode == "legacy":
+        handler: logging.Handler = FlushingFileHandler(str(path), mode="a", encoding="utf-8")
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+    else:
+        pipeline = LogPipeline()  # default cadence: flush 0.5 s, fsync 5 s
+        handler = pipeline.handler_for(path)
+    saved = {}
+    for name in _LOGGERS:
+        lg = logging.getLogger(name)
+        saved[name] = (lg.handlers[:], lg.level, lg.propagate)
+        lg.handlers[:] = [handler]
+        lg.setLevel(logging.INFO)
+        lg.propagate = name == ""
+    info: Dict[str, object] = {"path": path}
+    try:
+        yield info
+    finally:
+        t0 = time.perf_counter()
+        if pipeline is not None:
+            pipeline.shutdown()
+            info["stats"] = pipeline.stats()
+        else:
+            handler.close()
+        info["close_ms"] = (time.perf_counter() - t0) * 1e3
+        for name, (handlers, level, propagate) in saved.items():
+            lg = logging.getLogger(name)
+            lg.handlers[:] = handlers
+            lg.setLevel(level)
+            lg.propagate = propagate
+
+
+def _pct(xs: List[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))]
+
+
+def bench_webhooks(mode: str, log_dir: Path, payload, runs: int, workers: int) -> Dict[str, float]:
+    lat: List[float] = []
+    with log_mode(mode, log_dir) as info:
+        for _ in range(runs):
+            _, timer = replay(payload, None, StubBroker(latency=0.0), workers=workers)
+            lat.append(timer.total * 1e3)
+    lines = sum(1 for _ in open(info["path"], encoding="utf-8"))
+    return {"p50": _pct(lat, 0.5), "p95": _pct(lat, 0.95), "mean": statistics.fmean(lat), "lines": lines,
+            "close_ms": info["close_ms"]}
+
+
+def bench_emit(mode: str, log_dir: Path, threads: int, per_thread: int) -> Dict[str, float]:
+    lat: List[float] = []
+    lock = threading.Lock()
+    lg = logging.getLogger("backend.routers.scan")
+
+    def run(tid: int) -> None:
+        mine = []
+        for i in range(per_thread):
+            t0 = time.perf_counter()
+            lg.info("bench thread=%d i=%d ltp=%.2f vwap=%.2f", tid, i, 101.5, 100.25)
+            mine.append((time.perf_counter() - t0) * 1e6)
+        with lock:
+            lat.extend(mine)
+
+    with log_mode(mode, log_dir):
+        t0 = time.perf_counter()
+        ts = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+        wall = time.perf_counter() - t0
+    return {"p50": _pct(lat, 0.5), "p99": _pct(lat, 0.99), "rate": len(lat) / wall}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compare webhook latency under the legacy and queued log handlers.")
+    ap.add_argument("--stocks", type=int, default=25, help="stocks per synthetic alert")
+    ap.add_argument("--runs", type=int, default=40, help="webhook replays per mode")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--threads", type=int, default=4, help="threads for the raw emit phase")
+    ap.add_argument("--records", type=int, default=2000, help="records per thread for the raw emit phase")
+    ap.add_argument("--log-dir", type=Path, default=None, help="directory for the bench log files (default: temp)")
+    args = ap.parse_args()
+
+    payload = synthetic_payload(args.stocks)
+    names = [r["stock_name"] for r in payload_stocks(payload)]
+    with tempfile.TemporaryDirectory(dir=args.log_dir) as d, stubbed_instruments(names):
+        log_dir = Path(d)
+        from backend.routers import scan  # noqa: F401 — import first so log_mode replaces its handler
+
+        with log_mode("warmup", log_dir):  # never into the production logs/smart_future_algo.log
+            replay(payload, None, StubBroker(latency=0.0), workers=args.workers)  # warm imports / caches
+        print(f"webhook replay: {args.stocks} stocks, {args.runs} runs, {args.workers} workers")
+        for mode in ("legacy", "pipeline"):
+            r = bench_webhooks(mode, log_dir, payload, args.runs, args.workers)
+            print(
+                f"  {mode:8s} p50 {r['p50']:8.2f} ms  p95 {r['p95']:8.2f} ms  mean {r['mean']:8.2f} ms  "
+                f"lines {r['lines']:6d}  close {r['close_ms']:6.1f} ms"
+            )
+        print(f"logger.info from {args.threads} threads x {args.records}")
+        for mode in ("legacy", "pipeline"):
+            r = bench_emit(mode, log_dir, args.threads, args.records)
+            print(f"  {mode:8s} p50 {r['p50']:8.1f} us  p99 {r['p99']:8.1f} us  {r['rate']:10.0f} records/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
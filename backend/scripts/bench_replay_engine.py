@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Benchmark: universe VWAP-scan session backfill, slice rescoring vs streaming replay.
+
+Synthetic 5m universe (default 200 symbols × 3 sessions × 75 bars, the window
+``backfill_universe_vwap_scan`` fetches), scored at the 74 RTH stamps of the
+last session. The old path truncates and rescores every slice with
+``_score_row``; the new one walks each symbol once through ``replay_session``.
+Both must produce identical rows. ``get_config`` is served from memory for both
+(the old path read ``rs_conviction_config`` from the DB on every call).
+Statement counts use a recording session: one INSERT per row before, one per
+``ROWS_PER_STATEMENT`` rows now.
+
+    PYTHONPATH=. python backend/scripts/bench_replay_engine.py
+    PYTHONPATH=. python backend/scripts/bench_replay_engine.py --symbols 50 --legacy-symbols 50
+"""
+
+import argparse
+import random
+import sys
+import time
+from copy import deepcopy
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+import pytz
+
+from backend.services import rs_vwap_quality
+from backend.services import kavach_universe_vwap_scan as scan
+from backend.services.replay_engine import BulkRowWriter, replay_session
+from backend.services.rs_conviction_config import DEFAULTS
+
+IST = pytz.timezone("Asia/Kolkata")
+BARS_PER_DAY = 75
+
+
+def synth_symbol(rnd: random.Random, days: List[date]) -> List[Dict[str, Any]]:
+    px = 100.0 + rnd.random() * 2000
+    drift = rnd.gauss(0, 0.0008)
+    out = []
+    for d in days:
+        for i in range(BARS_PER_DAY):
+            o = px
+            px = max(1.0, px * (1.0 + drift + rnd.gauss(0, 0.003)))
+            t = IST.localize(datetime(d.year, d.month, d.day, 9, 15) + timedelta(minutes=5 * i))
+            out.append(
+                {
+                    "timestamp": t.isoformat(),
+                    "open": round(o, 2),
+                    "high": round(max(o, px) * (1 + rnd.random() * 0.0015), 2),
+                    "low": round(min(o, px) * (1 - rnd.random() * 0.0015), 2),
+                    "close": round(px, 2),
+                    "volume": float(rnd.randrange(100, 20000)),
+                }
+            )
+    return out
+
+
+class _RecordingDB:
+    def __init__(self) -> None:
+        self.statements = 0
+
+    def execute(self, stmt, params=None) -> None:
+        self.statements += 1
+
+    def commit(self) -> None:
+        pass
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Streaming replay vs slice rescoring for the universe VWAP backfill.")
+    ap.add_argument("--symbols", type=int, default=200)
+    ap.add_argument("--legacy-symbols", type=int, default=20, help="Symbols timed on the old path (extrapolated)")
+    args = ap.parse_args()
+
+    cfg = deepcopy(DEFAULTS)
+    rs_vwap_quality.get_config = lambda: deepcopy(cfg)
+    scan._ENSURED = True
+
+    days = [date(2026, 7, 13), date(2026, 7, 14), date(2026, 7, 15)]
+    session = days[-1]
+    stamps = scan._rth_5m_timestamps(session)
+    rnd = random.Random(11)
+    universe = [(f"SYM{k:03d}", synth_symbol(rnd, days)) for k in range(args.symbols)]
+    atrs = {sym: 0.2 + rnd.random() for sym, _ in universe}
+    locks = [set() for _ in stamps]
+    sd = session.isoformat()
+
+    n_legacy = max(1, min(args.legacy_symbols, len(universe)))
+    t0 = time.perf_counter()
+    legacy: List[Dict[str, Any]] = []
+    for sym, candles in universe[:n_legacy]:
+        for t in stamps:
+            row = scan._score_row(
+                scan._truncate_candles(candles, t),
+                atr_pct=atrs[sym],
+                in_lock=False,
+                session_date=sd,
+                symbol=sym,
+                source="backfill",
+                logged_at=t,
+            )
+            if row:
+                legacy.append(row)
+    t_legacy = (time.perf_counter() - t0) * len(universe) / n_legacy
+
+    db = _RecordingDB()
+    scorers = {
+        "scan": scan.snapshot_scorer(
+            cfg=cfg, session_date=sd, source="backfill", atr_by_symbol=atrs, lock_by_stamp=locks
+        )
+    }
+    streamed: List[Dict[str, Any]] = []
+
+    def _flush(rows):
+        streamed.extend(rows)
+        return scan.insert_scan_rows(db, rows)
+
+    t0 = time.perf_counter()
+    sink = BulkRowWriter(_flush)
+    for sym, candles in universe:
+        sink.extend(row for _, row in replay_session(candles, stamps, scorers, key=sym))
+    sink.flush()
+    t_stream = time.perf_counter() - t0
+
+    if streamed[: len(legacy)] != legacy:
+        print("MISMATCH between slice rescoring and streaming replay", file=sys.stderr)
+        return 1
+    print(f"universe: {len(universe)} symbols × {len(days) * BARS_PER_DAY} bars, {len(stamps)} stamps")
+    print(f"rows: {sink.written} (identical on the {n_legacy} symbols scored both ways)")
+    print(f"slice rescoring : {t_legacy:8.2f}s  (extrapolated from {n_legacy} symbols)")
+    print(f"streaming replay: {t_stream:8.2f}s  ({t_legacy / max(t_stream, 1e-9):.0f}x)")
+    print(f"INSERT statements: {sink.written} before -> {db.statements} now")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
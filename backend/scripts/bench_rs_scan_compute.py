@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Benchmark: Relative Strength scan compute stage, in-process vs process pool.
+
+Synthetic 5m candles (6 sessions) for N symbols, half as cached ``CandleSeries``
+and half as legacy dict lists, go through ``_compute_all`` once in-process and
+once on a pool (candles shipped as ``CandleSeries`` arrays). The first pooled
+run pays worker start-up; the scan keeps the pool warm, so the second run is
+the steady-state number. Results must match.
+
+    PYTHONPATH=. python backend/scripts/bench_rs_scan_compute.py
+    PYTHONPATH=. python backend/scripts/bench_rs_scan_compute.py --symbols 220 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import pytz
+
+from backend.services import relative_strength_scanner as rs
+from backend.services.market_data.candle_series import CandleSeries
+from backend.test_candle_series import _session_rows
+
+IST = pytz.timezone("Asia/Kolkata")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="RS scan compute stage: serial vs process pool.")
+    ap.add_argument("--symbols", type=int, default=220)
+    ap.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)))
+    ap.add_argument("--chunk", type=int, default=rs.SCAN_CHUNK_SYMBOLS)
+    args = ap.parse_args()
+
+    now = IST.localize(datetime(2026, 10, 16, 14, 2))
+    jobs = []
+    for k in range(args.symbols):
+        rows = _session_rows(seed=k, now=now)
+        candles = CandleSeries.from_dicts(rows) if k % 2 else rows
+        jobs.append(({"instrument_key": f"NSE_FO|{k}", "stock": f"S{k:03d}"}, candles, bool(k % 2)))
+
+    rs._compute_all(jobs[:4], 0.1, now, workers=0)  # warm lazy imports
+    t0 = time.perf_counter()
+    serial, _ = rs._compute_all(jobs, 0.1, now, workers=0)
+    t_serial = time.perf_counter() - t0
+
+    timings = []
+    try:
+        for _ in range(2):
+            t0 = time.perf_counter()
+            pooled, used = rs._compute_all(jobs, 0.1, now, workers=args.workers, chunk_size=args.chunk)
+            timings.append(time.perf_counter() - t0)
+    finally:
+        rs._reset_pool()
+
+    if pooled != serial or used != args.workers:
+        print("MISMATCH between in-process and pooled compute", file=sys.stderr)
+        return 1
+    print(f"symbols: {args.symbols}, cpus: {os.cpu_count()}, workers: {args.workers}, chunk: {args.chunk}")
+    print(f"in-process       : {t_serial:7.2f}s")
+    print(f"pool (cold start): {timings[0]:7.2f}s")
+    print(f"pool (warm)      : {timings[1]:7.2f}s  ({t_serial / max(timings[1], 1e-9):.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
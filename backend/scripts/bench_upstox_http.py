@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Benchmark: per-call ``requests.get`` vs the shared pooled Upstox session.
+
+Runs a local stub of the Upstox REST API and replays one scan cycle for N
+instruments (market-quote batches of 50 + one historical-candle call per
+instrument) through a thread pool, first with module-level ``requests.get``
+(new connection per call — the old behaviour) and then with
+``upstox_http.get_session()``. The stub serves HTTPS with a throwaway
+self-signed certificate (needs the ``openssl`` CLI) so the handshake cost is
+realistic; ``--plain`` uses HTTP.
+
+    PYTHONPATH=. python backend/scripts/bench_upstox_http.py
+    PYTHONPATH=. python backend/scripts/bench_upstox_http.py --instruments 200 --workers 8 --cycles 3 --plain
+"""
+
+import argparse
+import json
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, List
+
+import requests
+import urllib3
+
+from backend.services import upstox_http
+
+
+def _handler(server_ms: float):
+    class _Stub(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if server_ms > 0:
+                time.sleep(server_ms / 1e3)
+            if "/historical-candle/" in self.path:
+                data = {"candles": [["2026-07-24T09:15:00+05:30", 100, 101, 99, 100.5, 1000, 0]] * 75}
+            else:
+                data = {f"NSE_EQ:S{i}": {"last_price": 100.0 + i} for i in range(50)}
+            body = json.dumps({"status": "success", "data": data}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return _Stub
+
+
+def _serve(server_ms: float, tls: bool, tmp: Path) -> ThreadingHTTPServer:
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _handler(server_ms))
+    srv.daemon_threads = True
+    if tls:
+        key, crt = tmp / "k.pem", tmp / "c.pem"
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", str(key), "-out", str(crt),
+             "-days", "1", "-subj", "/CN=127.0.0.1"],
+            check=True, capture_output=True,
+        )
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(str(crt), str(key))
+        srv.socket = ctx.wrap_socket(srv.socket, server_side=True)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def _cycle_urls(base: str, n: int) -> List[str]:
+    keys = [f"NSE_EQ%7CINE{i:06d}01" for i in range(n)]
+    urls = [f"{base}/v2/market-quote/quotes?instrument_key={','.join(keys[i:i + 50])}" for i in range(0, n, 50)]
+    urls += [f"{base}/v3/historical-candle/intraday/{k}/minutes/5" for k in keys]
+    return urls
+
+
+def _run(get: Callable[..., requests.Response], urls: List[str], workers: int) -> float:
+    def one(u: str) -> int:
+        r = get(u, headers={"Accept": "application/json"}, timeout=10, verify=False)
+        r.json()
+        return r.status_code
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        codes = list(pool.map(one, urls))
+    assert all(c == 200 for c in codes)
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Pooled Upstox transport throughput benchmark (local stub).")
+    ap.add_argument("--instruments", type=int, default=200)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--cycles", type=int, default=3)
+    ap.add_argument("--server-ms", type=float, default=2.0, help="Stub processing delay per request.")
+    ap.add_argument("--plain", action="store_true", help="Serve HTTP instead of HTTPS.")
+    args = ap.parse_args()
+    urllib3.disable_warnings()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tls = not args.plain
+        srv = _serve(args.server_ms, tls, Path(tmp))
+        base = f"{'https' if tls else 'http'}://127.0.0.1:{srv.server_address[1]}"
+        urls = _cycle_urls(base, args.instruments)
+
+        t_old = sum(_run(requests.get, urls, args.workers) for _ in range(args.cycles))
+
+        upstox_http.reset_session()
+        upstox_http.reset_stats()
+        session = upstox_http.get_session()
+        t_new = sum(_run(session.get, urls, args.workers) for _ in range(args.cycles))
+        st = upstox_http.stats()
+        srv.shutdown()
+
+    n_req = len(urls) * args.cycles
+    print(f"instruments={args.instruments} requests/cycle={len(urls)} cycles={args.cycles} "
+          f"workers={args.workers} tls={not args.plain}")
+    print(f"per-call requests.get : {t_old:7.3f} s  {n_req / t_old:8.0f} req/s  handshakes {n_req}")
+    print(f"shared session        : {t_new:7.3f} s  {n_req / t_new:8.0f} req/s  handshakes {st['handshakes']}"
+          f"  ({t_old / t_new:4.1f}x)")
+    for e in st["endpoints"]:
+        print(f"  {e['endpoint']:<48s} n={e['count']:5d}  p50 {e['p50_ms']:6.2f} ms  p99 {e['p99_ms']:6.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
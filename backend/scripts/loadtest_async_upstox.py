@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Load test: latency of unrelated endpoints while a webhook is talking to the broker.
+
+Builds a small FastAPI app in-process (driven through ``httpx.ASGITransport``, so
+it shares one event loop exactly like a uvicorn worker) with:
+
+* ``GET /ping`` — an unrelated, cheap endpoint;
+* ``POST /webhook/sync`` — enriches N stocks with the sync ``UpstoxService``
+  straight from the ``async def`` handler (the pre-async pattern);
+* ``POST /webhook/async`` — the same calls through ``AsyncUpstoxService``.
+
+The broker is simulated with a fixed per-request latency (blocking sleep in a
+``requests`` adapter for the sync client, ``asyncio.sleep`` in an httpx mock
+transport for the async one). Webhooks are fired back-to-back while ``/ping``
+is polled every 10 ms; ``/ping`` latency is measured from when it was due, and
+p50/p99 are printed per mode.
+
+    PYTHONPATH=. python backend/scripts/loadtest_async_upstox.py
+    PYTHONPATH=. python backend/scripts/loadtest_async_upstox.py --stocks 20 --broker-ms 120 --seconds 5
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+import requests
+from fastapi import FastAPI
+from requests.adapters import BaseAdapter
+
+from backend.services import upstox_service as us
+from backend.services.upstox_async import AsyncUpstoxService
+
+
+def _quote_body(url: str) -> Dict:
+    key = url.split("instrument_key=", 1)[-1]
+    return {"status": "success", "data": {key: {"last_price": 101.5, "close_price": 100.0, "ohlc": {"open": 100.2}}}}
+
+
+class _SlowAdapter(BaseAdapter):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def send(self, request, **kwargs):
+        time.sleep(self.delay)
+        r = requests.Response()
+        r.status_code = 200
+        r.headers["Content-Type"] = "application/json"
+        r._content = json.dumps(_quote_body(request.url)).encode()
+        r.url = request.url
+        r.request = request
+        return r
+
+    def close(self):
+        pass
+
+
+def build_app(n_stocks: int, delay: float) -> FastAPI:
+    session = requests.Session()
+    session.mount("https://", _SlowAdapter(delay))
+    us._http_session = lambda: session
+    svc = us.UpstoxService(api_key="", api_secret="", access_token="t")
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json=_quote_body(str(request.url)))
+
+    client = AsyncUpstoxService(svc, transport=httpx.MockTransport(handler))
+    keys = [f"NSE_FO|{100000 + i}" for i in range(n_stocks)]
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/webhook/sync")
+    async def webhook_sync():
+        return {"n": sum(1 for k in keys if svc.get_market_quote_by_key(k))}
+
+    @app.post("/webhook/async")
+    async def webhook_async():
+        quotes = await asyncio.gather(*(client.get_market_quote_by_key(k) for k in keys))
+        return {"n": sum(1 for q in quotes if q)}
+
+    return app
+
+
+def _pct(vals: List[float], q: float) -> float:
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(round(q * (len(vals) - 1))))] if vals else 0.0
+
+
+async def run_mode(app: FastAPI, mode: str, seconds: float) -> Dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+        stop = asyncio.Event()
+        webhooks = 0
+
+        async def fire_webhooks():
+            nonlocal webhooks
+            while not stop.is_set():
+                r = await http.post(f"/webhook/{mode}")
+                assert r.status_code == 200
+                webhooks += 1
+                await asyncio.sleep(0.01)  # let the loop run the timer / pings between webhooks
+
+        async def poll_ping(out: List[float], interval: float = 0.01):
+            # Open loop: latency is measured from when the ping was due, so time spent
+            # waiting for a blocked event loop counts (as it would for a real client).
+            due = time.perf_counter()
+            while not stop.is_set():
+                r = await http.get("/ping")
+                out.append(time.perf_counter() - due)
+                assert r.status_code == 200
+                due = max(due + interval, time.perf_counter())
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+
+        lat: List[float] = []
+        tasks = [asyncio.create_task(fire_webhooks()), asyncio.create_task(poll_ping(lat))]
+        await asyncio.sleep(seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+    return {
+        "mode": mode,
+        "pings": len(lat),
+        "webhooks": webhooks,
+        "p50_ms": _pct(lat, 0.50) * 1e3,
+        "p99_ms": _pct(lat, 0.99) * 1e3,
+        "max_ms": max(lat) * 1e3 if lat else 0.0,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="/ping latency while webhooks call the (simulated) broker.")
+    ap.add_argument("--stocks", type=int, default=12, help="broker calls per webhook")
+    ap.add_argument("--broker-ms", type=float, default=80.0, help="simulated broker latency per request")
+    ap.add_argument("--seconds", type=float, default=4.0, help="duration per mode")
+    args = ap.parse_args()
+
+    app = build_app(args.stocks, args.broker_ms / 1e3)
+    print(f"stocks/webhook={args.stocks} broker={args.broker_ms:.0f}ms duration={args.seconds:.0f}s per mode")
+    for mode in ("sync", "async"):
+        r = asyncio.run(run_mode(app, mode, args.seconds))
+        print(
+            f"{r['mode']:>5}: /ping n={r['pings']:5d}  p50={r['p50_ms']:8.1f} ms  p99={r['p99_ms']:8.1f} ms  "
+            f"max={r['max_ms']:8.1f} ms  webhooks={r['webhooks']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
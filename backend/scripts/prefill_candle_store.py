@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Prefill the shared historical candle store (``market_data.candle_store``) for a universe.
+
+Backtests read candles through the store and only ask Upstox for sessions it does
+not hold yet; running this ahead of a backtest makes the run itself fetch-free.
+For each instrument × interval it finds the missing sessions, plans the fewest
+span-capped requests and stores the results. ``--dry-run`` prints the plan only.
+
+Usage::
+
+    PYTHONPATH=. python backend/scripts/prefill_candle_store.py \\
+        --from-date 2026-05-01 --to-date 2026-08-19 --interval minutes/15 --interval days/1
+
+    PYTHONPATH=. python backend/scripts/prefill_candle_store.py \\
+        --universe equity --from-date 2026-07-01 --to-date 2026-07-31 --interval minutes/5 --dry-run
+
+    PYTHONPATH=. python backend/scripts/prefill_candle_store.py \\
+        --keys "NSE_INDEX|Nifty 50" "NSE_INDEX|India VIX" --from-date 2026-07-01 --to-date 2026-07-31
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+_ROOT = Path(__file__).resolve().parents[2]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+import backend.env_bootstrap  # noqa: F401,E402
+
+from backend.config import settings  # noqa: E402
+from backend.services.market_data.candle_store import CandleStore, get_candle_store, upstox_range_fetcher  # noqa: E402
+from backend.services.upstox_service import UpstoxService  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+_UNIVERSE_COLUMNS = {
+    "futures": "currmth_future_instrument_key",
+    "equity": "stock_instrument_key",
+}
+
+
+def load_universe_keys(universe: str) -> List[str]:
+    from sqlalchemy import text
+
+    from backend.database import SessionLocal
+
+    if SessionLocal is None:
+        raise RuntimeError("database not available")
+    col = _UNIVERSE_COLUMNS[universe]
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            text(
+                f"""
+                SELECT DISTINCT TRIM({col}) AS ikey
+                FROM arbitrage_master
+                WHERE {col} IS NOT NULL AND TRIM({col}) <> ''
+                ORDER BY 1
+                """
+            )
+        ).all()
+        return [str(r[0]) for r in rows]
+    finally:
+        db.close()
+
+
+def plan(
+    store: CandleStore, keys: List[str], intervals: List[str], from_date: date, to_date: date, bridge: int
+) -> Dict[Tuple[str, str], List[Tuple[date, date]]]:
+    out: Dict[Tuple[str, str], List[Tuple[date, date]]] = {}
+    for ik in keys:
+        for iv in intervals:
+            missing = store.missing_sessions(ik, iv, from_date, to_date)
+            if missing:
+                out[(ik, iv)] = store.plan_fetches(missing, iv, bridge_sessions=bridge)
+    return out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from-date", required=True, help="First session YYYY-MM-DD")
+    parser.add_argument("--to-date", required=True, help="Last session YYYY-MM-DD (capped at the last completed one)")
+    parser.add_argument(
+        "--interval",
+        action="append",
+        dest="intervals",
+        help="Upstox V3 interval, repeatable (default minutes/15)",
+    )
+    parser.add_argument(
+        "--universe",
+        choices=sorted(_UNIVERSE_COLUMNS),
+        default="futures",
+        help="arbitrage_master instrument keys to fill (ignored with --keys)",
+    )
+    parser.add_argument("--keys", nargs="+", help="Explicit instrument keys instead of a universe")
+    parser.add_argument(
+        "--bridge",
+        type=int,
+        default=0,
+        help="Join missing runs separated by at most this many stored sessions into one request",
+    )
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--dry-run", action="store_true", help="Print gaps and planned requests only")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+    from_date, to_date = date.fromisoformat(args.from_date), date.fromisoformat(args.to_date)
+    if from_date > to_date:
+        print("from_date must be <= to_date", file=sys.stderr)
+        return 1
+    intervals = args.intervals or ["minutes/15"]
+    keys = [k.strip() for k in args.keys or load_universe_keys(args.universe) if k.strip()]
+    store = get_candle_store()
+
+    plans = plan(store, keys, intervals, from_date, to_date, args.bridge)
+    n_requests = sum(len(p) for p in plans.values())
+    print(
+        f"store {store.root}: {len(keys)} instruments × {len(intervals)} intervals, "
+        f"{len(plans)} series with gaps, {n_requests} requests planned"
+    )
+    if args.dry_run:
+        for (ik, iv), windows in sorted(plans.items()):
+            print(f"  {ik:<40} {iv:<11} " + ", ".join(f"{a}..{b}" for a, b in windows))
+        return 0
+    if not plans:
+        return 0
+
+    upstox = UpstoxService(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET)
+    if not getattr(upstox, "access_token", None):
+        print("Upstox token unavailable", file=sys.stderr)
+        return 1
+    fetch = upstox_range_fetcher(upstox)
+
+    t0 = time.monotonic()
+    failed: List[Tuple[str, str]] = []
+    with ThreadPoolExecutor(max_workers=max(1, args.max_workers)) as pool:
+        futs = {
+            pool.submit(store.ensure, ik, iv, from_date, to_date, fetch, bridge_sessions=args.bridge): (ik, iv)
+            for ik, iv in plans
+        }
+        for i, fut in enumerate(as_completed(futs), 1):
+            ik, iv = futs[fut]
+            try:
+                series, ok = fut.result()
+            except Exception as e:
+                logger.warning("prefill %s %s failed: %s", ik, iv, e)
+                ok, series = False, ()
+            if not ok:
+                failed.append((ik, iv))
+            logger.info("[%s/%s] %s %s bars=%s%s", i, len(futs), ik, iv, len(series), "" if ok else " (incomplete)")
+    print(
+        f"done in {time.monotonic() - t0:.1f}s: {store.stats['fetches']} requests, "
+        f"{store.stats['sessions_fetched']} sessions stored, {len(failed)} series incomplete"
+    )
+    return 2 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
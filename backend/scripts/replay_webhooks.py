@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Replay archived ChartInk webhook payloads through the enrichment stage against a stubbed broker.
+
+Input is one or more ``scan_data/webhook_payloads/*.jsonl`` archives (written by
+``_run_webhook_worker``), or ``--synthetic N`` for a generated N-stock alert.
+Each payload is enriched with the real ``scan._enrich_webhook_stock`` code
+path, once sequentially (one worker, the old loop) and once with the
+concurrent pipeline. The broker is a stub with a fixed per-call latency that
+serves LTP/VWAP, option chains, quotes and candles; instruments come from a
+synthetic ``nse_instruments.json`` in a temp dir. Nothing touches the DB or the
+network. Both runs must produce identical rows.
+
+    PYTHONPATH=. python backend/scripts/replay_webhooks.py --synthetic 25
+    PYTHONPATH=. python backend/scripts/replay_webhooks.py backend/scan_data/webhook_payloads/2026-10-16.jsonl
+    PYTHONPATH=. python backend/scripts/replay_webhooks.py --synthetic 25 -v --log-dir /tmp/replay
+
+The scan router logs to ``logs/smart_future_algo.log`` on import; replays never
+write there — with ``-v`` its INFO log goes to ``replay_webhooks.log`` under
+``--log-dir`` (a new temp dir by default).
+"""
+
+import argparse
+import functools
+import json
+import logging
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pytz
+
+from backend.services.upstox_service import UpstoxService
+from backend.services.webhook_enrichment import StageTimer, enrich_webhook_stocks, iter_archived_payloads
+
+IST = pytz.timezone("Asia/Kolkata")
+
+
+def _base_price(name: str) -> float:
+    return 100.0 + (sum(map(ord, name)) * 37) % 2400
+
+
+def _strike_step(px: float) -> float:
+    return 5.0 if px < 500 else 10.0 if px < 1500 else 20.0
+
+
+def _option_key(name: str, strike: float, opt: str) -> str:
+    return f"NSE_FO|{name}{int(strike)}{opt}"
+
+
+def _trading_symbol(name: str, strike: float, opt: str) -> str:
+    return f"{name} {int(strike)} {opt} 27 OCT 26"
+
+
+class StubBroker:
+    """Deterministic stand-in for ``UpstoxService`` with ``latency`` seconds per broker call."""
+
+    extract_bid_ask_from_quote_data = staticmethod(UpstoxService.extract_bid_ask_from_quote_data)
+    NIFTY50_KEY = UpstoxService.NIFTY50_KEY
+    BANKNIFTY_KEY = UpstoxService.BANKNIFTY_KEY
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_instrument_key(self, symbol: str) -> Optional[str]:
+        return f"NSE_EQ|{symbol.upper()}"
+
+    def get_stock_ltp_and_vwap(self, stock_symbol: str) -> Optional[Dict]:
+        self._call("ltp_vwap")
+        px = _base_price(stock_symbol.upper())
+        return {"ltp": px, "vwap": round(px * 0.997, 2)}
+
+    def get_option_chain(self, symbol: str, *args: Any, **kwargs: Any) -> Optional[Dict]:
+        self._call("option_chain")
+        name = symbol.upper()
+        px = _base_price(name)
+        step = _strike_step(px)
+        atm = round(px / step) * step
+        strikes = []
+        for i in range(-12, 13):
+            k = atm + i * step
+            row: Dict[str, Any] = {"strike_price": k}
+            for side, opt in (("call_options", "CE"), ("put_options", "PE")):
+                dist = abs(i) + 1
+                ltp = max(0.5, round((px - k if opt == "CE" else k - px) + 20.0 / dist, 2))
+                row[side] = {
+                    "instrument_key": _option_key(name, k, opt),
+                    "market_data": {
+                        "ltp": ltp,
+                        "volume": 50_000 // dist + (sum(map(ord, name)) % 97) * 11,
+                        "oi": 20_000 // dist + (int(k) % 13) * 100,
+                        "bid_price": round(ltp * 0.998, 2),
+                        "ask_price": round(ltp * 1.002, 2),
+                    },
+                }
+            strikes.append(row)
+        return {"strikes": strikes}
+
+    def get_market_quote_by_key(self, instrument_key: str) -> Optional[Dict]:
+        self._call("quote")
+        lp = 10.0 + (sum(map(ord, instrument_key)) % 400) / 4.0
+        return {"last_price": lp, "close_price": lp * 0.98, "ohlc": {"open": lp * 0.99}}
+
+    def get_historical_candles_by_instrument_key(self, instrument_key: str, **kwargs: Any) -> List[Dict]:
+        self._call("candles")
+        return [{"timestamp": "2026-10-16T10:15:00+05:30", "close": 12.5}]
+
+    def get_option_daily_candles_current_and_previous(self, instrument_key: str) -> Optional[Dict]:
+        self._call("option_candles")
+        return {
+            "current_day_candle": {"open": 10.0, "high": 14.0, "low": 9.5, "close": 12.5},
+            "previous_day_candle": {"open": 11.0, "high": 13.0, "low": 10.0, "close": 10.5},
+        }
+
+    def get_stock_vwap_for_previous_hour(self, stock_symbol: str, reference_time: datetime = None) -> Optional[Dict]:
+        self._call("prev_hour_vwap")
+        ref = reference_time or datetime.now(IST)
+        return {"vwap": round(_base_price(stock_symbol.upper()) * 0.995, 2), "time": ref - timedelta(hours=1)}
+
+
+def synthetic_instruments(names: List[str]) -> List[Dict[str, Any]]:
+    """NSE_FO option rows matching ``StubBroker.get_option_chain`` for ``names``."""
+    expiry_ms = int(IST.localize(datetime(2026, 10, 27, 15, 30)).timestamp() * 1000)
+    rows = []
+    for name in sorted(set(n.upper() for n in names)):
+        px = _base_price(name)
+        step = _strike_step(px)
+        atm = round(px / step) * step
+        for i in range(-12, 13):
+            k = atm + i * step
+            for opt in ("CE", "PE"):
+                rows.append(
+                    {
+                        "segment": "NSE_FO",
+                        "instrument_type": opt,
+                        "underlying_symbol": name,
+                        "instrument_key": _option_key(name, k, opt),
+                        "trading_symbol": _trading_symbol(name, k, opt),
+                        "strike_price": k,
+                        "expiry": expiry_ms,
+                        "lot_size": 250 + (sum(map(ord, name)) % 8) * 125,
+                    }
+                )
+    return rows
+
+
+@contextmanager
+def stubbed_instruments(names: List[str]) -> Iterator[Path]:
+    """Point ``get_instruments_file_path`` at a temp ``nse_instruments.json`` for ``names``."""
+    import backend.config as config
+    from backend.services import instrument_master
+
+    orig = config.get_instruments_file_path
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d) / "nse_instruments.json"
+        path.write_text(json.dumps(synthetic_instruments(names)), encoding="utf-8")
+        config.get_instruments_file_path = lambda: path
+        instrument_master.invalidate_instrument_master()
+        try:
+            yield path
+        finally:
+            config.get_instruments_file_path = orig
+            instrument_master.invalidate_instrument_master()
+
+
+@contextmanager
+def scan_log_redirected(path: Path) -> Iterator[Path]:
+    """Send the scan router's (and root) log records to ``path`` instead of the production log."""
+    from backend.routers import scan  # noqa: F401 — attaches the production handler on import
+
+    handler = logging.FileHandler(str(path), mode="a", encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+    saved = {}
+    for name in ("", "backend.routers.scan"):
+        lg = logging.getLogger(name)
+        saved[name] = (lg.handlers[:], lg.level)
+        lg.handlers[:] = [handler]
+        lg.setLevel(logging.INFO)
+    try:
+        yield path
+    finally:
+        for name, (handlers, level) in saved.items():
+            lg = logging.getLogger(name)
+            lg.handlers[:] = handlers
+            lg.setLevel(level)
+        handler.close()
+
+
+def payload_stocks(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """(stock_name, trigger_price) rows for the Chartink comma-separated and list/dict payload shapes."""
+    stocks, prices = payload.get("stocks", ""), payload.get("trigger_prices", "")
+    if isinstance(stocks, str):
+        names = [s.strip() for s in stocks.split(",") if s.strip()]
+        px = [p.strip() for p in str(prices or "").split(",") if p.strip()]
+        out = []
+        for i, n in enumerate(names):
+            try:
+                out.append({"stock_name": n, "trigger_price": float(px[i])})
+            except (ValueError, IndexError):
+                out.append({"stock_name": n, "trigger_price": 0.0})
+        return out
+    if isinstance(stocks, list):
+        prices = prices if isinstance(prices, dict) else {}
+        return [
+            {"stock_name": s, "trigger_price": float(prices.get(s, 0.0) or 0.0)}
+            if isinstance(s, str)
+            else {"stock_name": s.get("stock_name") or s.get("name"), "trigger_price": s.get("trigger_price", 0.0)}
+            for s in stocks
+        ]
+    if isinstance(stocks, dict):
+        return [{"stock_name": k, "trigger_price": float(v or 0.0)} for k, v in stocks.items()]
+    return []
+
+
+def synthetic_payload(n: int, bearish: bool = False) -> Dict[str, Any]:
+    names = [f"STK{chr(65 + i % 26)}{chr(65 + (i // 26) % 26)}" for i in range(n)]
+    if n > 3:
+        names[-1] = names[0]  # ChartInk occasionally repeats a name in one alert
+    return {
+        "scan_name": "Bearish Breakdown" if bearish else "Bullish Breakout",
+        "alert_name": "Bearish" if bearish else "Bullish",
+        "triggered_at": "10:15 am",
+        "stocks": ",".join(names),
+        "trigger_prices": ",".join(f"{_base_price(x):.2f}" for x in names),
+    }
+
+
+def replay(
+    payload: Dict[str, Any], forced_type: Optional[str], broker: StubBroker, workers: int
+) -> Tuple[List[Dict[str, Any]], StageTimer]:
+    from backend.routers import scan
+
+    text = " ".join(str(payload.get(k, "")) for k in ("alert_name", "scan_name", "scan_url")).lower()
+    bearish = (forced_type or "").lower() == "bearish" or (not forced_type and ("bearish" in text or "put" in text))
+    trig = IST.localize(datetime(2026, 10, 16, 10, 15)).replace(tzinfo=None)
+    timer = StageTimer(f"replay[{workers}w]")
+    rows = enrich_webhook_stocks(
+        payload_stocks(payload),
+        functools.partial(
+            scan._enrich_webhook_stock,
+            forced_option_type="PE" if bearish else "CE",
+            triggered_datetime=trig,
+            vwap_service=broker,
+        ),
+        max_workers=workers,
+        timer=timer,
+    )
+    return rows, timer
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Replay archived webhook payloads against a stubbed broker.")
+    ap.add_argument("archives", nargs="*", type=Path, help="webhook_payloads/*.jsonl files")
+    ap.add_argument("--synthetic", type=int, default=0, help="replay one generated alert with N stocks")
+    ap.add_argument("--latency-ms", type=float, default=50.0, help="stub broker latency per call")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("-v", "--verbose", action="store_true", help="keep the scan router's INFO logging")
+    ap.add_argument("--log-dir", type=Path, default=None, help="directory for the -v log (default: temp)")
+    args = ap.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    entries: List[Dict[str, Any]] = []
+    for path in args.archives:
+        entries.extend(iter_archived_payloads(path))
+    if args.synthetic:
+        entries.append({"forced_type": None, "payload": synthetic_payload(args.synthetic)})
+    if not entries:
+        ap.error("no payloads: pass archive files or --synthetic N")
+
+    names = [r["stock_name"] for e in entries for r in payload_stocks(e["payload"])]
+    mismatches = 0
+    log_dir = args.log_dir or Path(tempfile.mkdtemp(prefix="replay_webhooks_"))
+    log_dir.mkdir(parents=True, exist_ok=True)
+    with stubbed_instruments(names), scan_log_redirected(log_dir / "replay_webhooks.log") as log_path:
+        if args.verbose:
+            print(f"scan log: {log_path}")
+        for e in entries:
+            payload, forced = e["payload"], e.get("forced_type")
+            seq_broker, par_broker = StubBroker(args.latency_ms / 1e3), StubBroker(args.latency_ms / 1e3)
+            seq, t_seq = replay(payload, forced, seq_broker, workers=1)
+            par, t_par = replay(payload, forced, par_broker, workers=args.workers)
+            ok = seq == par
+            mismatches += 0 if ok else 1
+            resolved = sum(1 for r in par if r.get("instrument_key"))
+            print(
+                f"{e.get('received_at', 'synthetic')}: {len(seq)} stocks, {resolved} contracts resolved, "
+                f"broker calls {sum(par_broker.calls.values())}/{sum(seq_broker.calls.values())}  "
+                f"sequential {t_seq.total * 1e3:7.0f} ms  concurrent {t_par.total * 1e3:7.0f} ms  "
+                f"({t_seq.total / max(t_par.total, 1e-9):4.1f}x)  {'OK' if ok else 'MISMATCH'}"
+            )
+    return 0 if mismatches == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -35,6 +35,7 @@ from sqlalchemy import inspect, text
 from backend.config import get_instruments_file_path, settings
 from backend.database import engine
 from backend.services.fno_sector_mapping_csv import load_fno_sector_index_map
+from backend.services.instrument_master import get_instrument_master
 from backend.services.sector_movers import (
     equity_sector_index_instrument_key,
     normalize_sector_instrument_key,
@@ -287,9 +288,13 @@ def _ensure_arbitrage_table() -> None:
 
 
 def _load_instruments() -> List[Dict]:
+    """NSE_EQ + NSE_FO FUT rows — all ``_build_mappings`` looks at (options are skipped)."""
     instruments_file: Path = get_instruments_file_path()
     if not instruments_file.exists():
         raise FileNotFoundError(f"Instruments file not found: {instruments_file}")
+    master = get_instrument_master(instruments_file)
+    if master is not None:
+        return master.by_segment("NSE_EQ") + master.by_segment("NSE_FO", "FUT")
     with instruments_file.open("r", encoding="utf-8") as f:
         data = json.load(f)
     if not isinstance(data, list):
@@ -0,0 +1,187 @@
+"""
+Sorted as-of index over bar timestamps.
+
+Backtests repeatedly ask "the bar at or before T" (benchmark close/VWAP at a
+signal, exit candle at 15:30 with a lookback, VIX as of a cutoff) and used to
+answer it by scanning — and re-parsing — every bar per question. ``AsOfIndex``
+parses once into sorted int64 epoch-ns timestamps with the IST session (calendar
+day) of each bar, then answers with ``np.searchsorted``:
+
+    idx = AsOfIndex.from_values(c["timestamp"] for c in candles)
+    pos = idx.asof(target, same_session=True, max_lookback_ns=20 * NS_PER_MIN)
+    bar = candles[idx.source(pos)] if pos >= 0 else None
+
+``asof_positions`` does the same for a whole array of query times (aligning a
+benchmark series to every bar of a symbol in one call).
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pytz
+
+IST = pytz.timezone("Asia/Kolkata")
+NS_PER_SEC = 1_000_000_000
+NS_PER_MIN = 60 * NS_PER_SEC
+NS_PER_DAY = 86_400 * NS_PER_SEC
+IST_OFFSET_NS = 19_800 * NS_PER_SEC  # +05:30, no DST
+_EPOCH = date(1970, 1, 1)
+
+
+def to_epoch_ns(ts: Any) -> Optional[int]:
+    """
+    Epoch ns for a datetime / ``pd.Timestamp`` / ISO string / epoch seconds or ms.
+    Naive values are IST wall clock (Upstox and the DB store IST-naive times). None if unparseable.
+    """
+    if ts is None:
+        return None
+    if isinstance(ts, (int, float, np.integer, np.floating)) and not isinstance(ts, bool):
+        v = float(ts)
+        if v > 1_000_000_000_000:  # epoch ms
+            v /= 1000.0
+        return int(round(v * NS_PER_SEC))
+    if isinstance(ts, str):
+        s = ts.strip()
+        if not s:
+            return None
+        if s.isdigit():
+            return to_epoch_ns(float(s))
+        try:
+            ts = pd.Timestamp(s.replace(" ", "T") if len(s) > 10 else s)
+        except (ValueError, TypeError):
+            return None
+    try:
+        t = pd.Timestamp(ts)
+    except (ValueError, TypeError):
+        return None
+    if t is pd.NaT:
+        return None
+    if t.tzinfo is None:
+        return int(t.value) - IST_OFFSET_NS
+    return int(t.value)
+
+
+def wall_clock_ns(stamps: Iterable[Any]) -> np.ndarray:
+    """
+    Vectorized parse of ``YYYY-MM-DDTHH:MM:SS`` prefixes read as IST wall clock (offset suffix ignored,
+    like ``datetime.strptime(ts[:19], ...)``). Unparseable entries are ``np.iinfo(int64).min``.
+    """
+    raw = [str(s or "")[:19] for s in stamps]
+    try:
+        arr = np.array(raw, dtype="datetime64[s]")
+    except ValueError:
+        out = np.empty(len(raw), dtype="datetime64[s]")
+        for k, s in enumerate(raw):
+            try:
+                out[k] = np.datetime64(s, "s") if len(s) == 19 else np.datetime64("NaT")
+            except ValueError:
+                out[k] = np.datetime64("NaT")
+        arr = out
+    short = np.fromiter((len(s) != 19 for s in raw), dtype=bool, count=len(raw))
+    ns = arr.astype("datetime64[ns]").astype(np.int64)
+    bad = np.isnat(arr) | short
+    ns = ns - IST_OFFSET_NS
+    ns[bad] = np.iinfo(np.int64).min
+    return ns
+
+
+def session_day(ts_ns) -> Any:
+    """IST calendar day number (days since 1970-01-01) of epoch-ns value(s)."""
+    return (np.asarray(ts_ns, dtype=np.int64) + IST_OFFSET_NS) // NS_PER_DAY
+
+
+def ist_ns(d: date, hh: int = 0, mm: int = 0, ss: int = 0) -> int:
+    return (d - _EPOCH).days * NS_PER_DAY + (hh * 3600 + mm * 60 + ss) * NS_PER_SEC - IST_OFFSET_NS
+
+
+class AsOfIndex:
+    """Sorted timestamps (epoch ns) with source positions and per-session day numbers."""
+
+    __slots__ = ("ts", "order", "day")
+
+    def __init__(self, ts_ns: Any, source_pos: Optional[Any] = None):
+        ts = np.asarray(ts_ns, dtype=np.int64)
+        src = np.arange(len(ts), dtype=np.int64) if source_pos is None else np.asarray(source_pos, dtype=np.int64)
+        order = np.argsort(ts, kind="stable")  # equal stamps keep source order
+        self.ts = ts[order]
+        self.order = src[order]
+        self.day = session_day(self.ts)
+
+    @classmethod
+    def from_values(cls, values: Iterable[Any]) -> "AsOfIndex":
+        """Index over arbitrary timestamp values; unparseable ones are left out (``source`` still maps back)."""
+        pos, ts = [], []
+        for k, v in enumerate(values):
+            ns = to_epoch_ns(v)
+            if ns is not None:
+                pos.append(k)
+                ts.append(ns)
+        return cls(np.array(ts, dtype=np.int64), np.array(pos, dtype=np.int64))
+
+    @classmethod
+    def from_wall_clock(cls, stamps: Iterable[Any]) -> "AsOfIndex":
+        """Index over ``ts[:19]`` IST wall-clock strings (Smart Futures picker convention)."""
+        ns = wall_clock_ns(stamps)
+        ok = np.flatnonzero(ns != np.iinfo(np.int64).min)
+        return cls(ns[ok], ok)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def source(self, pos: int) -> int:
+        """Position in the original sequence for sorted position ``pos``."""
+        return int(self.order[pos])
+
+    def asof_positions(
+        self, query_ns: Any, *, same_session: bool = False, max_lookback_ns: Optional[int] = None
+    ) -> np.ndarray:
+        """Sorted position of the last entry at or before each query time (-1 where none qualifies)."""
+        q = np.asarray(query_ns, dtype=np.int64)
+        pos = np.searchsorted(self.ts, q, side="right") - 1
+        ok = pos >= 0
+        safe = np.where(ok, pos, 0)
+        if len(self.ts):
+            if same_session:
+                ok &= self.day[safe] == session_day(q)
+            if max_lookback_ns is not None:
+                ok &= q - self.ts[safe] <= max_lookback_ns
+        else:
+            ok[:] = False
+        return np.where(ok, pos, -1)
+
+    def asof(self, ts: Any, *, same_session: bool = False, max_lookback_ns: Optional[int] = None) -> int:
+        q = ts if isinstance(ts, (int, np.integer)) else to_epoch_ns(ts)
+        if q is None:
+            return -1
+        return int(self.asof_positions(np.array([q]), same_session=same_session, max_lookback_ns=max_lookback_ns)[0])
+
+    def at_or_after(self, ts: Any, *, same_session: bool = False, max_delay_ns: Optional[int] = None) -> int:
+        """Sorted position of the first entry at or after ``ts`` (-1 if none qualifies)."""
+        q = ts if isinstance(ts, (int, np.integer)) else to_epoch_ns(ts)
+        if q is None:
+            return -1
+        pos = int(np.searchsorted(self.ts, q, side="left"))
+        if pos >= len(self.ts):
+            return -1
+        if same_session and self.day[pos] != session_day(q):
+            return -1
+        if max_delay_ns is not None and self.ts[pos] - q > max_delay_ns:
+            return -1
+        return pos
+
+    def run_start(self, pos: int) -> int:
+        """First sorted position holding the same timestamp as ``pos`` (earliest duplicate in source order)."""
+        return int(np.searchsorted(self.ts, self.ts[pos], side="left"))
+
+    def session_range(self, d: date, upto_ns: Optional[int] = None) -> Tuple[int, int]:
+        """``(lo, hi)`` sorted positions of session ``d``, optionally only entries at or before ``upto_ns``."""
+        k = (d - _EPOCH).days
+        lo = int(np.searchsorted(self.day, k, side="left"))
+        hi = int(np.searchsorted(self.day, k, side="right"))
+        if upto_ns is not None:
+            hi = min(hi, int(np.searchsorted(self.ts, upto_ns, side="right")))
+        return lo, max(lo, hi)
+
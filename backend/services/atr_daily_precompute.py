@@ -127,15 +127,9 @@ def ensure_atr_daily_precompute_tables() -> None:
 
 def next_nse_session_date(from_d: date) -> date:
     """Next weekday that is not an NSE holiday after ``from_d``."""
-    from backend.services import market_holiday as mh
+    from backend.services.trading_calendar import get_trading_calendar
 
-    holidays = mh._holiday_dates_cached()
-    cand = from_d + timedelta(days=1)
-    for _ in range(14):
-        if cand.weekday() < 5 and cand not in holidays:
-            return cand
-        cand += timedelta(days=1)
-    return from_d + timedelta(days=1)
+    return get_trading_calendar().next_trading_day(from_d)
 
 
 def list_currmth_future_universe() -> List[Tuple[str, str]]:
@@ -6,6 +6,7 @@ from datetime import date, datetime
 from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple
 
+from backend.services.instrument_master import get_instrument_master
 from backend.services.oi_heatmap import load_nse_instruments_json
 
 logger = logging.getLogger(__name__)
@@ -47,8 +48,17 @@ def _options_by_underlying() -> Dict[str, List[Dict[str, Any]]]:
     return out
 
 
+@lru_cache(maxsize=512)
+def _options_for_underlying(underlying: str) -> List[Dict[str, Any]]:
+    """Option rows for one underlying via the instrument master index (full scan fallback)."""
+    master = get_instrument_master()
+    if master is None:
+        return _options_by_underlying().get(underlying, [])
+    return [r for r in master.by_underlying(underlying, segment="NSE_FO") if _is_stock_option(r)]
+
+
 def front_monthly_expiry(session_date: date, underlying: str) -> Optional[date]:
-    rows = _options_by_underlying().get(underlying.upper(), [])
+    rows = _options_for_underlying(underlying.upper())
     expiries = sorted(
         {d for r in rows if (d := _expiry_to_date(r)) is not None and d >= session_date}
     )
@@ -74,7 +84,7 @@ def resolve_atm_option(
         return None, None, None, None
     rows = [
         r
-        for r in _options_by_underlying().get(sym, [])
+        for r in _options_for_underlying(sym)
         if _expiry_to_date(r) == expiry and str(r.get("instrument_type") or "").upper() == ot
     ]
     if not rows:
@@ -9,6 +9,7 @@ from typing import List, Optional, Tuple
 
 from backend.config import settings
 from backend.services.btst_backtest.timing import bars_on_session, close_at_or_before, next_trading_day
+from backend.services.market_data.candle_store import historical_candles
 from backend.services.upstox_service import UpstoxService, _upstox_v3_max_calendar_span_days
 
 logger = logging.getLogger(__name__)
@@ -51,7 +52,8 @@ class BtstDataAccess:
     ) -> Tuple[FetchOutcome, List[dict]]:
         for attempt in range(self.retries):
             self._sleep()
-            candles = self.ux.get_historical_candles_by_instrument_key(
+            candles = historical_candles(
+                self.ux,
                 instrument_key,
                 interval=interval,
                 days_back=self._days_back(interval, days_back),
@@ -0,0 +1,418 @@
+"""Single-pass indicator kernels shared by the scanners, exit engine and backtests.
+
+Every function returns the *full* series in one O(n) pass (O(n·p) for the
+weighted averages) and is bit-compatible with the per-module implementations it
+replaces: same operation order, same float coercions, same warm-up rules.
+Several call sites used to recompute Wilder ATR from scratch on a fresh slice
+for every bar, making one symbol O(n²).
+
+``adx_series`` / ``adx_batch`` reproduce ``pandas_ta.adx`` (TradingView-style
+DI/ADX: RMA = pandas' adjusted ``ewm(alpha=1/length, min_periods=length)``)
+without building a DataFrame per call.
+
+Warm-up positions are ``None`` in list outputs and ``NaN`` / ``0`` in the NumPy
+batch outputs (``supertrend_batch`` evaluates a whole universe of equal-length
+series at once, vectorized over symbols).
+"""
+from __future__ import annotations
+
+import math
+import sys
+from operator import mul
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def true_range(high: float, low: float, prev_close: float) -> float:
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+def wilder_atr_series(
+    highs: Sequence[float], lows: Sequence[float], closes: Sequence[float], period: int
+) -> List[Optional[float]]:
+    """Wilder / RMA ATR per bar; ``out[i] == smart_futures_picker.indicators.wilder_atr(prefix[: i + 1])``."""
+    n = len(closes)
+    out: List[Optional[float]] = [None] * n
+    if period < 1 or n < period + 1:
+        return out
+    trs = [true_range(highs[i], lows[i], closes[i - 1]) for i in range(1, n)]
+    atr = sum(trs[:period]) / float(period)
+    out[period] = float(atr)
+    pm1 = float(period - 1)
+    for j in range(period, len(trs)):
+        atr = (atr * pm1 + trs[j]) / float(period)
+        out[j + 1] = float(atr)
+    return out
+
+
+def supertrend_series(
+    highs: Sequence[float],
+    lows: Sequence[float],
+    closes: Sequence[float],
+    period: int = 10,
+    multiplier: float = 3.0,
+    *,
+    seed_first_bar: bool = True,
+    compare_prev_band: bool = False,
+) -> Tuple[List[Optional[float]], List[Optional[int]]]:
+    """Supertrend line and direction (+1 up / -1 down) per bar; ``None`` during ATR warm-up.
+
+    The two historical implementations differ in two details, selected here:
+
+    * ``seed_first_bar`` — True: the first bar with an ATR seeds the bands and
+      starts at +1 (``btst_backtest``). False: bands carry on from 0.0 through the
+      warm-up (``smart_futures_exit``).
+    * ``compare_prev_band`` — True: the previous Supertrend is compared with the
+      previous upper band (``smart_futures_exit``). False: with the band already
+      updated for this bar (``btst_backtest``).
+    """
+    n = len(closes)
+    atr = wilder_atr_series(highs, lows, closes, period)
+    st_out: List[Optional[float]] = [None] * n
+    dir_out: List[Optional[int]] = [None] * n
+    mult = float(multiplier)
+    fub = flb = st = 0.0
+    started = False
+    for i in range(n):
+        a = atr[i]
+        if a is None:
+            continue
+        hl2 = (float(highs[i]) + float(lows[i])) / 2.0
+        bub = hl2 + mult * float(a)
+        blb = hl2 - mult * float(a)
+        if seed_first_bar and not started:
+            started = True
+            fub, flb, st = bub, blb, blb
+            st_out[i] = st
+            dir_out[i] = 1
+            continue
+        pc = float(closes[i - 1])
+        new_fub = bub if (bub < fub or pc > fub) else fub
+        new_flb = blb if (blb > flb or pc < flb) else flb
+        c = float(closes[i])
+        on_upper = st == (fub if compare_prev_band else new_fub)
+        if on_upper:
+            st = new_fub if c <= new_fub else new_flb
+        else:
+            st = new_flb if c >= new_flb else new_fub
+        fub, flb = new_fub, new_flb
+        st_out[i] = st
+        dir_out[i] = 1 if c >= st else -1
+    return st_out, dir_out
+
+
+def ema_series(values: Sequence[float], span: int, *, smooth_first: bool = False) -> List[float]:
+    """EMA seeded with the first value. ``smooth_first`` also applies the update to bar 0 (vajra)."""
+    if not values:
+        return []
+    k = 2.0 / (float(span) + 1.0)
+    e = float(values[0])
+    out: List[float] = []
+    if not smooth_first:
+        out.append(e)
+        values = values[1:]
+    for v in values:
+        e = float(v) * k + e * (1.0 - k)
+        out.append(e)
+    return out
+
+
+def wma_series(values: Sequence[float], period: int) -> List[Optional[float]]:
+    """Linearly weighted MA (weights 1..p, newest heaviest); ``None`` until ``period`` bars."""
+    p = int(period)
+    n = len(values)
+    out: List[Optional[float]] = [None] * n
+    if p < 1:
+        return out
+    vals = [float(v) for v in values]
+    weights = list(range(1, p + 1))
+    denom = float(sum(weights))
+    for i in range(p - 1, n):
+        out[i] = sum(map(mul, vals[i - p + 1 : i + 1], weights)) / denom
+    return out
+
+
+def hma_series(values: Sequence[float], length: int) -> List[Optional[float]]:
+    """Hull MA: WMA(2·WMA(n/2) − WMA(n), round(√n)); ``None`` during warm-up."""
+    n = len(values)
+    out: List[Optional[float]] = [None] * n
+    if length < 1 or n < length:
+        return out
+    half = max(1, length // 2)
+    sqrt_n = max(1, int(round(length**0.5)))
+    w_half = wma_series(values, half)
+    w_full = wma_series(values, length)
+    raw = [2.0 * w_half[k] - w_full[k] for k in range(length - 1, n)]
+    for k, h in enumerate(wma_series(raw, sqrt_n)):
+        out[length - 1 + k] = h
+    return out
+
+
+def cumulative_vwap(
+    highs: Sequence[float],
+    lows: Sequence[float],
+    closes: Sequence[float],
+    volumes: Sequence[float],
+) -> List[float]:
+    """Typical-price VWAP from bar 0 → i (falls back to the close while volume is zero)."""
+    out: List[float] = []
+    cum_pv = 0.0
+    cum_v = 0.0
+    for i in range(len(closes)):
+        tp = (highs[i] + lows[i] + closes[i]) / 3.0
+        v = max(0.0, float(volumes[i]))
+        cum_pv += tp * v
+        cum_v += v
+        out.append(cum_pv / cum_v if cum_v > 0 else closes[i])
+    return out
+
+
+# --- NumPy: one pass over time, vectorized over a universe of symbols ------------
+
+
+def wilder_atr_batch(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int) -> np.ndarray:
+    """``(symbols, bars)`` ATR matrix, NaN during warm-up; row-wise equal to ``wilder_atr_series``."""
+    h = np.asarray(highs, dtype=np.float64)
+    lo = np.asarray(lows, dtype=np.float64)
+    c = np.asarray(closes, dtype=np.float64)
+    out = np.full(c.shape, np.nan)
+    n = c.shape[1]
+    if period < 1 or n < period + 1:
+        return out
+    pc = c[:, :-1]
+    tr = np.maximum(np.maximum(h[:, 1:] - lo[:, 1:], np.abs(h[:, 1:] - pc)), np.abs(lo[:, 1:] - pc))
+    # Left-to-right sum, like Python's sum() (np.sum is pairwise and can differ in the last bit).
+    acc = np.zeros(c.shape[0])
+    for j in range(period):
+        acc = acc + tr[:, j]
+    atr = acc / float(period)
+    out[:, period] = atr
+    pm1 = float(period - 1)
+    for j in range(period, tr.shape[1]):
+        atr = (atr * pm1 + tr[:, j]) / float(period)
+        out[:, j + 1] = atr
+    return out
+
+
+def supertrend_batch(
+    highs: np.ndarray,
+    lows: np.ndarray,
+    closes: np.ndarray,
+    period: int = 10,
+    multiplier: float = 3.0,
+    *,
+    seed_first_bar: bool = True,
+    compare_prev_band: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized ``supertrend_series`` for ``(symbols, bars)`` arrays -> (line NaN-padded, dir int8 0-padded)."""
+    h = np.asarray(highs, dtype=np.float64)
+    lo = np.asarray(lows, dtype=np.float64)
+    c = np.asarray(closes, dtype=np.float64)
+    atr = wilder_atr_batch(h, lo, c, period)
+    st_out = np.full(c.shape, np.nan)
+    dir_out = np.zeros(c.shape, dtype=np.int8)
+    n_sym, n = c.shape
+    mult = float(multiplier)
+    fub = np.zeros(n_sym)
+    flb = np.zeros(n_sym)
+    st = np.zeros(n_sym)
+    started = False
+    for i in range(n):
+        a = atr[:, i]
+        if np.isnan(a[0]):
+            continue
+        hl2 = (h[:, i] + lo[:, i]) / 2.0
+        bub = hl2 + mult * a
+        blb = hl2 - mult * a
+        if seed_first_bar and not started:
+            started = True
+            fub, flb, st = bub, blb, blb.copy()
+            st_out[:, i] = st
+            dir_out[:, i] = 1
+            continue
+        pc = c[:, i - 1]
+        new_fub = np.where((bub < fub) | (pc > fub), bub, fub)
+        new_flb = np.where((blb > flb) | (pc < flb), blb, flb)
+        ci = c[:, i]
+        on_upper = st == (fub if compare_prev_band else new_fub)
+        st = np.where(
+            on_upper,
+            np.where(ci <= new_fub, new_fub, new_flb),
+            np.where(ci >= new_flb, new_flb, new_fub),
+        )
+        fub, flb = new_fub, new_flb
+        st_out[:, i] = st
+        dir_out[:, i] = np.where(ci >= st, 1, -1)
+    return st_out, dir_out
+
+
+# --- DI / ADX (pandas_ta.adx port) --------------------------------------------------
+
+_EPS = sys.float_info.epsilon
+
+
+def _rma_alpha(length: int) -> float:
+    # pandas converts alpha to com and back; keep that rounding.
+    com = 1.0 / (1.0 / float(length)) - 1.0
+    return 1.0 / (1.0 + com)
+
+
+def _rma_row(vals: List[float], length: int) -> List[float]:
+    """``Series.ewm(alpha=1/length, min_periods=length).mean()`` (adjust=True, ignore_na=False)."""
+    n = len(vals)
+    out = [math.nan] * n
+    if n == 0:
+        return out
+    old_wt_factor = 1.0 - _rma_alpha(length)
+    minp = max(int(length), 1)
+    weighted = vals[0]
+    nobs = int(weighted == weighted)
+    if nobs >= minp:
+        out[0] = weighted
+    old_wt = 1.0
+    for i in range(1, n):
+        cur = vals[i]
+        is_obs = cur == cur
+        nobs += is_obs
+        if weighted == weighted:
+            old_wt *= old_wt_factor
+            if is_obs:
+                # pandas skips the update on an exact repeat (constant-series guard)
+                if weighted != cur:
+                    weighted = old_wt * weighted + 1.0 * cur
+                    weighted /= old_wt + 1.0
+                old_wt += 1.0
+        elif is_obs:
+            weighted = cur
+        if nobs >= minp:
+            out[i] = weighted
+    return out
+
+
+def _rma_2d(vals: np.ndarray, length: int) -> np.ndarray:
+    """Row-wise ``_rma_row`` vectorized over symbols."""
+    n_sym, n = vals.shape
+    out = np.full(vals.shape, np.nan)
+    if n == 0:
+        return out
+    old_wt_factor = 1.0 - _rma_alpha(length)
+    minp = max(int(length), 1)
+    weighted = vals[:, 0].copy()
+    nobs = (weighted == weighted).astype(np.int64)
+    out[:, 0] = np.where(nobs >= minp, weighted, np.nan)
+    old_wt = np.ones(n_sym)
+    for i in range(1, n):
+        cur = vals[:, i]
+        is_obs = cur == cur
+        nobs += is_obs
+        has_w = weighted == weighted
+        old_wt = np.where(has_w, old_wt * old_wt_factor, old_wt)
+        upd = has_w & is_obs & (weighted != cur)
+        with np.errstate(invalid="ignore"):
+            blended = (old_wt * weighted + 1.0 * cur) / (old_wt + 1.0)
+        weighted = np.where(upd, blended, weighted)
+        old_wt = np.where(has_w & is_obs, old_wt + 1.0, old_wt)
+        weighted = np.where(~has_w & is_obs, cur, weighted)
+        out[:, i] = np.where(nobs >= minp, weighted, np.nan)
+    return out
+
+
+def _dm_tr(h: np.ndarray, lo: np.ndarray, c: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """True range and +DM / -DM, NaN on each row's first bar (and any NaN left padding)."""
+    nan_col = np.full((h.shape[0], 1), np.nan)
+    pc = np.hstack([nan_col, c[:, :-1]])
+    ph = np.hstack([nan_col, h[:, :-1]])
+    pl = np.hstack([nan_col, lo[:, :-1]])
+    with np.errstate(invalid="ignore"):
+        hl = h - lo
+        # pandas_ta non_zero_range: one zero-range bar nudges the whole series by eps.
+        hl = np.where((hl == 0).any(axis=1, keepdims=True), hl + _EPS, hl)
+        tr = np.fmax(np.fmax(np.abs(hl), np.abs(h - pc)), np.abs(pc - lo))
+        tr = np.where(np.isnan(pc), np.nan, tr)
+        up = h - ph
+        dn = pl - lo
+        pos = np.where((up > dn) & (up > 0), up, 0.0 * up)
+        neg = np.where((dn > up) & (dn > 0), dn, 0.0 * dn)
+        pos = np.where(np.abs(pos) < _EPS, 0.0, pos)
+        neg = np.where(np.abs(neg) < _EPS, 0.0, neg)
+    return tr, pos, neg
+
+
+def _adx_from_rma(rma, tr, pos, neg, length: int, lensig: int):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = 100.0 / np.asarray(rma(tr, length))
+        dmp = k * np.asarray(rma(pos, length))
+        dmn = k * np.asarray(rma(neg, length))
+        dx = 100.0 * np.abs(dmp - dmn) / (dmp + dmn)
+    return np.asarray(rma(dx, lensig)), dmp, dmn
+
+
+def _nan_to_none(a: np.ndarray) -> List[Optional[float]]:
+    return [None if x != x else x for x in a.tolist()]
+
+
+def adx_series(
+    highs: Sequence[float],
+    lows: Sequence[float],
+    closes: Sequence[float],
+    length: int = 14,
+    lensig: Optional[int] = None,
+) -> Tuple[List[Optional[float]], List[Optional[float]], List[Optional[float]]]:
+    """(ADX, +DI, -DI) per bar like ``pandas_ta.adx(length, lensig)``; ``None`` while undefined."""
+    length = int(length) if length and length > 0 else 14
+    lensig = int(lensig) if lensig and lensig > 0 else length
+    h, lo, c = (np.asarray(x, dtype=np.float64).reshape(1, -1) for x in (highs, lows, closes))
+    if h.shape[1] == 0:
+        return [], [], []
+    tr, pos, neg = _dm_tr(h, lo, c)
+
+    def rma(v, n):
+        return _rma_row(np.asarray(v).ravel().tolist(), n)
+
+    adx, dmp, dmn = _adx_from_rma(rma, tr, pos, neg, length, lensig)
+    return _nan_to_none(adx.ravel()), _nan_to_none(dmp.ravel()), _nan_to_none(dmn.ravel())
+
+
+def adx_last_two(
+    highs: Sequence[float],
+    lows: Sequence[float],
+    closes: Sequence[float],
+    length: int = 14,
+    lensig: Optional[int] = None,
+) -> Tuple[Optional[float], Optional[float]]:
+    """Last two defined ADX values (latest first), like ``adx.dropna().iloc[-1], .iloc[-2]``."""
+    vals = [v for v in adx_series(highs, lows, closes, length, lensig)[0] if v is not None]
+    if not vals:
+        return None, None
+    return vals[-1], (vals[-2] if len(vals) > 1 else None)
+
+
+def adx_batch(
+    highs: np.ndarray,
+    lows: np.ndarray,
+    closes: np.ndarray,
+    length: int = 14,
+    lensig: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(ADX, +DI, -DI) for a ``(symbols, bars)`` universe in one call, NaN where undefined.
+
+    Shorter histories may be left-padded with NaN (see ``pad_left``); each row
+    then matches ``adx_series`` on its unpadded bars.
+    """
+    length = int(length) if length and length > 0 else 14
+    lensig = int(lensig) if lensig and lensig > 0 else length
+    h, lo, c = (np.atleast_2d(np.asarray(x, dtype=np.float64)) for x in (highs, lows, closes))
+    tr, pos, neg = _dm_tr(h, lo, c)
+    return _adx_from_rma(_rma_2d, tr, pos, neg, length, lensig)
+
+
+def pad_left(rows: Sequence[Sequence[float]], width: Optional[int] = None) -> np.ndarray:
+    """Stack ragged series into a ``(len(rows), width)`` array, right-aligned, NaN on the left."""
+    width = max((len(r) for r in rows), default=0) if width is None else int(width)
+    out = np.full((len(rows), width), np.nan)
+    for i, r in enumerate(rows):
+        r = list(r)[-width:] if width else []
+        if r:
+            out[i, width - len(r) :] = r
+    return out
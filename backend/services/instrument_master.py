@@ -0,0 +1,429 @@
+"""Memory-mapped, indexed view of the daily Upstox NSE instruments master.
+
+``nse_instruments.json`` is ~100k rows / tens of MB. Many code paths used to
+``json.load`` the whole file (often per call) just to find one row by
+``instrument_key`` or to scan for an underlying's futures, costing hundreds of
+milliseconds and a few hundred MB of transient dicts each time.
+
+The JSON is converted once per download into a binary artifact next to it
+(``nse_instruments.imaster``): one compact JSON blob per record plus
+open-addressing hash indexes (crc32, linear probing) over the lookup keys the
+codebase actually uses. The artifact is ``mmap``-ed read-only, so every worker
+process shares the same page-cache pages and a lookup decodes only the rows it
+returns.
+
+Layout (native little-endian arrays, every section 8-byte aligned)::
+
+    b"IMST" | u32 version | u32 header_len | header JSON | sections...
+
+The header records the source JSON's size / mtime (staleness check) and the
+``(offset, length)`` of every section. Per index ``name``:
+
+    name.slots     u32[M]    0 = empty, else unique-key ordinal + 1
+    name.key_off   u64[K+1]  offsets into name.keys
+    name.keys      bytes     concatenated UTF-8 keys
+    name.post_off  u32[K+1]  offsets into name.post
+    name.post      u32[...]  record ordinals (source order) per key
+"""
+from __future__ import annotations
+
+import array
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"IMST"
+_VERSION = 1
+_ARTIFACT_SUFFIX = ".imaster"
+# Re-stat the source JSON at most this often from get_instrument_master().
+_RECHECK_SEC = 30.0
+
+
+def _upper(v: Any) -> str:
+    return str(v or "").strip().upper()
+
+
+def _strike_str(v: Any) -> str:
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return ""
+    if f <= 0:
+        return ""
+    return str(int(f)) if f.is_integer() else repr(f)
+
+
+def _expiry_str(v: Any) -> str:
+    try:
+        return str(int(v)) if v not in (None, "") else ""
+    except (TypeError, ValueError):
+        return str(v).strip()
+
+
+def contract_key(
+    underlying: Any, segment: Any, instrument_type: Any, expiry: Any = None, strike: Any = None
+) -> str:
+    """Composite key: ``UNDERLYING|SEGMENT|TYPE|expiry_ms|strike`` (type carries CE/PE)."""
+    return "|".join(
+        (_upper(underlying), _upper(segment), _upper(instrument_type), _expiry_str(expiry), _strike_str(strike))
+    )
+
+
+def _trading_symbol(r: Dict[str, Any]) -> str:
+    return _upper(r.get("trading_symbol") or r.get("tradingsymbol"))
+
+
+def _underlying(r: Dict[str, Any]) -> str:
+    return _upper(r.get("underlying_symbol"))
+
+
+# name -> key extractor. Empty string means "not indexed".
+_INDEXES: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "instrument_key": lambda r: str(r.get("instrument_key") or "").strip(),
+    "trading_symbol": _trading_symbol,
+    "isin": lambda r: _upper(r.get("isin")),
+    "underlying": _underlying,
+    "segment": lambda r: _upper(r.get("segment")),
+    "segment_type": lambda r: f"{_upper(r.get('segment'))}|{_upper(r.get('instrument_type'))}",
+    "contract": lambda r: (
+        contract_key(_underlying(r), r.get("segment"), r.get("instrument_type"), r.get("expiry"), r.get("strike_price"))
+        if _underlying(r)
+        else ""
+    ),
+}
+
+
+def artifact_path_for(json_path: Path) -> Path:
+    return Path(json_path).with_suffix(_ARTIFACT_SUFFIX)
+
+
+def _default_json_path() -> Path:
+    from backend.config import get_instruments_file_path
+
+    return get_instruments_file_path()
+
+
+# --- build ---------------------------------------------------------------------
+
+
+def _pad8(buf: bytearray) -> None:
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+
+def _u32(vals: Iterable[int]) -> bytes:
+    a = array.array("I", vals)
+    if a.itemsize != 4:  # pragma: no cover - exotic platforms
+        raise RuntimeError("unsigned int is not 32-bit on this platform")
+    return a.tobytes()
+
+
+def _u64(vals: Iterable[int]) -> bytes:
+    return array.array("Q", vals).tobytes()
+
+
+def _build_index(records: List[Dict[str, Any]], fn: Callable[[Dict[str, Any]], str]) -> Dict[str, bytes]:
+    postings: Dict[str, List[int]] = {}
+    for i, r in enumerate(records):
+        k = fn(r)
+        if k:
+            postings.setdefault(k, []).append(i)
+    keys = list(postings)
+    size = 8
+    while size < 2 * max(1, len(keys)):
+        size <<= 1
+    mask = size - 1
+    slots = [0] * size
+    key_blob = bytearray()
+    key_off = [0]
+    post: List[int] = []
+    post_off = [0]
+    for ordinal, k in enumerate(keys):
+        kb = k.encode("utf-8")
+        key_blob.extend(kb)
+        key_off.append(len(key_blob))
+        post.extend(postings[k])
+        post_off.append(len(post))
+        h = zlib.crc32(kb) & mask
+        while slots[h]:
+            h = (h + 1) & mask
+        slots[h] = ordinal + 1
+    return {
+        "slots": _u32(slots),
+        "key_off": _u64(key_off),
+        "keys": bytes(key_blob),
+        "post_off": _u32(post_off),
+        "post": _u32(post),
+    }
+
+
+def build_instrument_master(json_path: Optional[Path] = None, out_path: Optional[Path] = None) -> Path:
+    """Parse the instruments JSON once and write the indexed artifact (atomic replace)."""
+    src = Path(json_path) if json_path is not None else _default_json_path()
+    dst = Path(out_path) if out_path is not None else artifact_path_for(src)
+    st = src.stat()
+    t0 = time.perf_counter()
+    with open(src, "rb") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("Instruments JSON format invalid: expected list")
+    records = [r for r in data if isinstance(r, dict)]
+
+    sections: Dict[str, bytes] = {}
+    blob = bytearray()
+    offsets = [0]
+    for r in records:
+        blob.extend(json.dumps(r, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        offsets.append(len(blob))
+    sections["records.off"] = _u64(offsets)
+    sections["records.blob"] = bytes(blob)
+    for name, fn in _INDEXES.items():
+        for part, raw in _build_index(records, fn).items():
+            sections[f"{name}.{part}"] = raw
+
+    # Section offsets are relative to the 8-aligned data start after the header,
+    # so the header can be serialized without knowing its own length.
+    rel: Dict[str, Tuple[int, int]] = {}
+    body = bytearray()
+    for name, raw in sections.items():
+        _pad8(body)
+        rel[name] = (len(body), len(raw))
+        body.extend(raw)
+    header = {
+        "source_size": st.st_size,
+        "source_mtime_ns": st.st_mtime_ns,
+        "count": len(records),
+        "indexes": list(_INDEXES),
+        "built_at": time.time(),
+        "sections": rel,
+    }
+    hdr = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    prefix = bytearray(_MAGIC)
+    prefix.extend(struct.pack("<II", _VERSION, len(hdr)))
+    prefix.extend(hdr)
+    _pad8(prefix)
+
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(prefix)
+        f.write(body)
+    os.replace(tmp, dst)
+    logger.info(
+        "instrument_master: built %s (%d records, %.1f MB) in %.2fs",
+        dst,
+        len(records),
+        (len(prefix) + len(body)) / 1e6,
+        time.perf_counter() - t0,
+    )
+    return dst
+
+
+def _read_header(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+            if len(head) < 12 or head[:4] != _MAGIC:
+                return None
+            ver, hlen = struct.unpack("<II", head[4:12])
+            if ver != _VERSION:
+                return None
+            hdr = json.loads(f.read(hlen))
+            hdr["data_start"] = 12 + hlen + (-(12 + hlen) % 8)
+            return hdr
+    except (OSError, ValueError):
+        return None
+
+
+def is_artifact_fresh(json_path: Path, out_path: Optional[Path] = None) -> bool:
+    src = Path(json_path)
+    dst = Path(out_path) if out_path is not None else artifact_path_for(src)
+    hdr = _read_header(dst)
+    if hdr is None:
+        return False
+    try:
+        st = src.stat()
+    except OSError:
+        return False
+    return hdr.get("source_size") == st.st_size and hdr.get("source_mtime_ns") == st.st_mtime_ns
+
+
+# --- read ----------------------------------------------------------------------
+
+
+class _Index:
+    __slots__ = ("slots", "mask", "key_off", "keys", "post_off", "post")
+
+    def __init__(self, slots, key_off, keys, post_off, post) -> None:
+        self.slots = slots
+        self.mask = len(slots) - 1
+        self.key_off = key_off
+        self.keys = keys
+        self.post_off = post_off
+        self.post = post
+
+    def lookup(self, key: str) -> List[int]:
+        kb = key.encode("utf-8")
+        h = zlib.crc32(kb) & self.mask
+        slots, key_off, keys = self.slots, self.key_off, self.keys
+        while True:
+            s = slots[h]
+            if not s:
+                return []
+            k = s - 1
+            if keys[key_off[k] : key_off[k + 1]] == kb:
+                return list(self.post[self.post_off[k] : self.post_off[k + 1]])
+            h = (h + 1) & self.mask
+
+    def __len__(self) -> int:
+        return len(self.key_off) - 1
+
+
+class InstrumentMaster:
+    """Read-only lookups over an ``.imaster`` artifact. Returned dicts are fresh copies."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        hdr = _read_header(self.path)
+        if hdr is None:
+            raise ValueError(f"not an instrument master artifact: {self.path}")
+        self.header = hdr
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mm)
+        base = int(hdr["data_start"])
+
+        def section(name: str, fmt: Optional[str] = None):
+            off, n = hdr["sections"][name]
+            mv = view[base + off : base + off + n]
+            return mv.cast(fmt) if fmt else mv
+
+        self._rec_off = section("records.off", "Q")
+        self._blob = section("records.blob")
+        self._indexes: Dict[str, _Index] = {
+            name: _Index(
+                section(f"{name}.slots", "I"),
+                section(f"{name}.key_off", "Q"),
+                section(f"{name}.keys"),
+                section(f"{name}.post_off", "I"),
+                section(f"{name}.post", "I"),
+            )
+            for name in hdr["indexes"]
+        }
+
+    def __len__(self) -> int:
+        return int(self.header["count"])
+
+    def record(self, i: int) -> Dict[str, Any]:
+        return json.loads(bytes(self._blob[self._rec_off[i] : self._rec_off[i + 1]]))
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.record(i)
+
+    def find(self, index: str, key: str) -> List[Dict[str, Any]]:
+        """All records whose ``index`` key equals ``key`` (already normalized), source order."""
+        return [self.record(i) for i in self._indexes[index].lookup(key)]
+
+    def get(self, instrument_key: str) -> Optional[Dict[str, Any]]:
+        hits = self._indexes["instrument_key"].lookup(str(instrument_key or "").strip())
+        return self.record(hits[0]) if hits else None
+
+    def by_trading_symbol(self, symbol: str, segment: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = self.find("trading_symbol", _upper(symbol))
+        return [r for r in rows if r.get("segment") == segment] if segment else rows
+
+    def by_isin(self, isin: str, segment: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = self.find("isin", _upper(isin))
+        return [r for r in rows if r.get("segment") == segment] if segment else rows
+
+    def by_underlying(
+        self, underlying: str, segment: Optional[str] = None, instrument_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        rows = self.find("underlying", _upper(underlying))
+        if segment:
+            rows = [r for r in rows if r.get("segment") == segment]
+        if instrument_type:
+            rows = [r for r in rows if _upper(r.get("instrument_type")) == _upper(instrument_type)]
+        return rows
+
+    def by_segment(self, segment: str, instrument_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        if instrument_type:
+            return self.find("segment_type", f"{_upper(segment)}|{_upper(instrument_type)}")
+        return self.find("segment", _upper(segment))
+
+    def contract(
+        self,
+        underlying: str,
+        instrument_type: str,
+        expiry: Any = None,
+        strike: Any = None,
+        segment: str = "NSE_FO",
+    ) -> List[Dict[str, Any]]:
+        """F&O contract by (underlying, segment, FUT/CE/PE, expiry epoch-ms, strike)."""
+        return self.find("contract", contract_key(underlying, segment, instrument_type, expiry, strike))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "records": len(self),
+            "bytes": len(self._mm),
+            "built_at": self.header.get("built_at"),
+            "index_keys": {name: len(ix) for name, ix in self._indexes.items()},
+        }
+
+
+# --- process-wide singleton -------------------------------------------------------
+
+_LOCK = threading.Lock()
+_MASTER: Optional[InstrumentMaster] = None
+_MASTER_SRC: Optional[Path] = None
+_LAST_CHECK = 0.0
+
+
+def get_instrument_master(json_path: Optional[Path] = None, refresh: bool = False) -> Optional[InstrumentMaster]:
+    """Shared master for the instruments JSON; (re)builds the artifact when stale.
+
+    Returns None when the JSON is missing or the artifact cannot be built.
+    """
+    global _MASTER, _MASTER_SRC, _LAST_CHECK
+    src = Path(json_path) if json_path is not None else _default_json_path()
+    now = time.monotonic()
+    with _LOCK:
+        if (
+            not refresh
+            and _MASTER is not None
+            and _MASTER_SRC == src
+            and now - _LAST_CHECK < _RECHECK_SEC
+        ):
+            return _MASTER
+        _LAST_CHECK = now
+        if not src.is_file():
+            logger.warning("instrument_master: instruments file missing: %s", src)
+            _MASTER, _MASTER_SRC = None, None
+            return None
+        dst = artifact_path_for(src)
+        if _MASTER is not None and _MASTER_SRC == src and not refresh and is_artifact_fresh(src, dst):
+            return _MASTER
+        try:
+            if refresh or not is_artifact_fresh(src, dst):
+                build_instrument_master(src, dst)
+            _MASTER, _MASTER_SRC = InstrumentMaster(dst), src
+        except Exception as e:
+            logger.error("instrument_master: failed to build/open %s: %s", dst, e)
+            _MASTER, _MASTER_SRC = None, None
+        return _MASTER
+
+
+def invalidate_instrument_master() -> None:
+    """Force the next ``get_instrument_master()`` to re-check the source JSON."""
+    global _LAST_CHECK
+    with _LOCK:
+        _LAST_CHECK = 0.0
@@ -81,6 +81,14 @@ class InstrumentsDownloader:
                 # Build index for quick lookup
                 logger.info("Building index for quick lookup...")
                 self._build_index(instruments_data)
+
+                # Rebuild the shared mmap-ed instrument master (all processes pick it up)
+                try:
+                    from backend.services.instrument_master import build_instrument_master, invalidate_instrument_master
+                    build_instrument_master(self.instruments_file)
+                    invalidate_instrument_master()
+                except Exception as e:
+                    logger.warning(f"Could not build instrument master: {e}")
                 
                 # Reload ISIN cache in symbol_isin_mapping (critical for option chain / Bearish scan)
                 try:
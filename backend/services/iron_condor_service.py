@@ -1003,29 +1003,45 @@ def _universe_adx_period_and_threshold() -> Tuple[int, float]:
     return period, thr
 
 
-def _fetch_one_underlying_daily_adx(sym_upper: str, ik: str, period: int) -> Tuple[str, Optional[float]]:
+def _fetch_one_underlying_daily_hlc(
+    sym_upper: str, ik: str
+) -> Tuple[str, Optional[Tuple[List[float], List[float], List[float]]]]:
     if not ik:
         return sym_upper, None
     try:
-        from backend.services.smart_futures_picker.indicators import adx_value
-
         days_back = int(os.getenv("IRON_CONDOR_UNIVERSE_ADX_DAYS_BACK", "72") or "72")
         days_back = max(45, min(days_back, 400))
         raw = vwap_service.get_historical_candles_by_instrument_key(
             ik, interval="days/1", days_back=days_back
         )
         prepared = _ic_prepare_daily_spot_candles_for_adx(raw, now_ist=datetime.now(IST))
-        h, l, cl = _ic_daily_hlc_for_adx(prepared)
-        av = adx_value(h, l, cl, int(period))
-        return sym_upper, av
+        return sym_upper, _ic_daily_hlc_for_adx(prepared)
     except Exception as ex:
         logger.debug("universe daily ADX %s failed: %s", sym_upper, ex)
         return sym_upper, None
 
 
+def _universe_adx_last(
+    hlc_by_symbol: Dict[str, Optional[Tuple[List[float], List[float], List[float]]]], period: int
+) -> Dict[str, Optional[float]]:
+    """Latest ADX(period) per symbol in one batched pass (same values / min-bar rule as ``adx_value``)."""
+    from backend.services.indicator_kernels import adx_batch, pad_left
+
+    need = max(30, int(period) + 20)
+    out: Dict[str, Optional[float]] = {sym: None for sym in hlc_by_symbol}
+    ready = [(sym, hlc) for sym, hlc in hlc_by_symbol.items() if hlc and len(hlc[2]) >= need]
+    if not ready:
+        return out
+    H, L, C = (pad_left([hlc[k] for _sym, hlc in ready]) for k in range(3))
+    adx, _, _ = adx_batch(H, L, C, int(period), int(period))
+    for (sym, _hlc), v in zip(ready, adx[:, -1].tolist()):
+        out[sym] = None if v != v else v
+    return out
+
+
 def build_universe_daily_adx_by_symbol_cached() -> Tuple[Dict[str, Dict[str, Any]], Optional[str]]:
     """
-    Latest daily-bar ADX(period) per approved underlying (pandas_ta / Wilder).
+    Latest daily-bar ADX(period) per approved underlying (pandas_ta-compatible Wilder, batched).
     Cached briefly — same Upstox token as batch quotes.
 
     ``adx_ok`` True when ADX computed and strictly below threshold (IC range gate).
@@ -1064,14 +1080,16 @@ def build_universe_daily_adx_by_symbol_cached() -> Tuple[Dict[str, Dict[str, Any
         results: Dict[str, Optional[float]] = {}
 
         try:
+            hlc_by_symbol: Dict[str, Optional[Tuple[List[float], List[float], List[float]]]] = {}
             with ThreadPoolExecutor(max_workers=workers) as pool:
                 futs = {
-                    pool.submit(_fetch_one_underlying_daily_adx, sym, ik, period): sym
+                    pool.submit(_fetch_one_underlying_daily_hlc, sym, ik): sym
                     for sym, _sec, ik, _uat in pairs
                 }
                 for fut in as_completed(futs):
-                    sym_key, av = fut.result()
-                    results[sym_key] = av
+                    sym_key, hlc = fut.result()
+                    hlc_by_symbol[sym_key] = hlc
+            results = _universe_adx_last(hlc_by_symbol, period)
         except Exception as ex:
             logger.warning("Iron Condor universe ADX batch failed: %s", ex)
             adx_error = "ADX batch failed — try again shortly."
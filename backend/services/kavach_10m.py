@@ -15,6 +15,8 @@ PARITY vs TWCTO Kavach Pine v3.0 (``TWCTO_Kavach_v3_0``):
 """
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -59,6 +61,26 @@ PINE_MACD_SLOW = 26
 PINE_MACD_SIGNAL = 9
 PINE_EMA_LEN = 9  # input "EMA Length"; script variable ema5Raw
 
+# The same 5m series is paired into 10m bars by the RS scanner, Garuda, checklist
+# live, chop gates, … within one cycle. Pairing parses every timestamp (~4 ms per
+# 6-day series), while fingerprinting the OHLCV content costs ~0.1 ms, so results
+# are memoized by content (bounded LRU).
+_AGG_10M_MEMO_MAX = 1024
+_agg_10m_memo: "OrderedDict[Tuple[int, int], List[Dict[str, Any]]]" = OrderedDict()
+_agg_10m_lock = threading.Lock()
+
+
+def _agg_10m_key(candles: List[Dict]) -> Tuple[int, int]:
+    return (
+        len(candles),
+        hash(
+            tuple(
+                (c.get("timestamp"), c.get("open"), c.get("high"), c.get("low"), c.get("close"), c.get("volume"))
+                for c in candles
+            )
+        ),
+    )
+
 
 def aggregate_10m_bars(candles: List[Dict]) -> List[Dict[str, Any]]:
     """Pair same-day 5m bars → 10m OHLCV (close = 2nd bar close).
@@ -68,7 +90,27 @@ def aggregate_10m_bars(candles: List[Dict]) -> List[Dict[str, Any]]:
     index of 09:15 in the multi-day fetch buffer. (NSE has 75 five-minute bars
     per day — an odd count — so global-index pairing misaligned every other
     prior-day count and dropped 09:15.)
+
+    Memoized on the 5m content; callers get fresh bar dicts they may mutate.
     """
+    try:
+        key = _agg_10m_key(candles or [])
+    except TypeError:  # unhashable field values — just compute
+        return _aggregate_10m_bars_uncached(candles)
+    with _agg_10m_lock:
+        hit = _agg_10m_memo.get(key)
+        if hit is not None:
+            _agg_10m_memo.move_to_end(key)
+    if hit is None:
+        hit = _aggregate_10m_bars_uncached(candles)
+        with _agg_10m_lock:
+            _agg_10m_memo[key] = hit
+            if len(_agg_10m_memo) > _AGG_10M_MEMO_MAX:
+                _agg_10m_memo.popitem(last=False)
+    return [dict(b) for b in hit]
+
+
+def _aggregate_10m_bars_uncached(candles: List[Dict]) -> List[Dict[str, Any]]:
     candles = _sorted_candles(candles)
     out: List[Dict[str, Any]] = []
     n = len(candles)
@@ -9,7 +9,9 @@ values and they return Kavach state / score components.
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
 
 # Kavach states
 STATE_BUY = "BUY"
@@ -26,6 +28,18 @@ BEARISH_STATES = (STATE_SELL, STATE_READY_SHORT, STATE_WATCH_SHORT)
 RANKING_BULLISH = "BULLISH"
 RANKING_BEARISH = "BEARISH"
 
+# Integer codes used by the batch API: ``STATE_CODES[code]`` is the state string.
+STATE_CODES = (
+    STATE_NEUTRAL,
+    STATE_BUY,
+    STATE_READY,
+    STATE_WATCH,
+    STATE_SELL,
+    STATE_READY_SHORT,
+    STATE_WATCH_SHORT,
+)
+STATE_INDEX = {s: i for i, s in enumerate(STATE_CODES)}
+
 
 @dataclass
 class KavachInput:
@@ -246,3 +260,168 @@ def compute_trade_score(
             vwap_steep_persist_bars=vwap_steep_persist_bars,
         )["trade_score"]
     )
+
+
+# --- Batch (universe-wide) evaluation -----------------------------------------
+#
+# Same rules as ``evaluate_kavach`` / ``trade_score_breakdown`` expressed as
+# NumPy masks over one array element per symbol. NaN fails every comparison,
+# exactly like the scalar path, so parity holds for missing indicators too.
+
+
+@dataclass
+class KavachBatch:
+    """Struct-of-arrays ``KavachInput`` for a universe (one element per symbol).
+
+    ``supertrend`` is int8: +1 bullish, -1 bearish, 0 unknown.
+    """
+
+    price: np.ndarray
+    ema5: np.ndarray
+    ema9: np.ndarray
+    ema9_slope: np.ndarray
+    vwap: np.ndarray
+    supertrend: np.ndarray
+    macd: np.ndarray
+    macd_signal: np.ndarray
+    macd_histogram: np.ndarray
+    adx: np.ndarray
+    volume_ratio: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.price.shape[0])
+
+    @classmethod
+    def from_inputs(cls, inputs: Sequence[KavachInput]) -> "KavachBatch":
+        def col(name: str) -> np.ndarray:
+            return np.fromiter((getattr(i, name) for i in inputs), dtype=np.float64, count=len(inputs))
+
+        st = np.fromiter(
+            (1 if i.supertrend_bullish is True else (-1 if i.supertrend_bullish is False else 0) for i in inputs),
+            dtype=np.int8,
+            count=len(inputs),
+        )
+        return cls(
+            price=col("price"),
+            ema5=col("ema5"),
+            ema9=col("ema9"),
+            ema9_slope=col("ema9_slope"),
+            vwap=col("vwap"),
+            supertrend=st,
+            macd=col("macd"),
+            macd_signal=col("macd_signal"),
+            macd_histogram=col("macd_histogram"),
+            adx=col("adx"),
+            volume_ratio=col("volume_ratio"),
+        )
+
+
+@dataclass
+class KavachBatchResult:
+    bullish_count: np.ndarray
+    bearish_count: np.ndarray
+    state_code: np.ndarray  # index into STATE_CODES
+    strength: np.ndarray
+
+    def states(self) -> List[str]:
+        return [STATE_CODES[c] for c in self.state_code.tolist()]
+
+    def result(self, i: int) -> KavachResult:
+        return KavachResult(
+            int(self.bullish_count[i]),
+            int(self.bearish_count[i]),
+            STATE_CODES[int(self.state_code[i])],
+            int(self.strength[i]),
+        )
+
+
+def evaluate_kavach_batch(b: KavachBatch) -> KavachBatchResult:
+    """Vectorised ``evaluate_kavach`` over every symbol in ``b``."""
+    shared = (b.adx > 20).astype(np.int8) + (b.volume_ratio > 1)
+    bull = (
+        shared
+        + (b.ema5 > b.vwap)
+        + (b.ema5 > b.ema9)
+        + (b.ema9_slope > 0)
+        + (b.price > b.ema5)
+        + (b.price > b.vwap)
+        + (b.supertrend == 1)
+        + (b.macd > b.macd_signal)
+        + (b.macd_histogram > 0)
+    ).astype(np.int8)
+    bear = (
+        shared
+        + (b.ema5 < b.vwap)
+        + (b.ema5 < b.ema9)
+        + (b.ema9_slope < 0)
+        + (b.price < b.ema5)
+        + (b.price < b.vwap)
+        + (b.supertrend == -1)
+        + (b.macd < b.macd_signal)
+        + (b.macd_histogram < 0)
+    ).astype(np.int8)
+
+    # np.select takes the first matching branch — same precedence as the scalar ladder.
+    conds = [bull >= 7, bull >= 5, bear >= 7, bear >= 5, bull >= 3, bear >= 3]
+    code = np.select(
+        conds,
+        [STATE_INDEX[s] for s in (STATE_BUY, STATE_READY, STATE_SELL, STATE_READY_SHORT, STATE_WATCH, STATE_WATCH_SHORT)],
+        default=STATE_INDEX[STATE_NEUTRAL],
+    ).astype(np.int8)
+    strength = np.select(conds, [bull, bull, bear, bear, bull, bear], default=np.maximum(bull, bear)).astype(np.int8)
+    return KavachBatchResult(bull, bear, code, strength)
+
+
+_KAVACH_PTS_BY_CODE = np.array([kavach_score(s) for s in STATE_CODES], dtype=np.int64)
+
+
+def trade_score_batch(
+    *,
+    rs: np.ndarray,
+    state_code: np.ndarray,
+    volume_ratio: np.ndarray,
+    adx: np.ndarray,
+    price: np.ndarray,
+    vwap: np.ndarray,
+    bullish: Union[bool, np.ndarray],
+    vwap_steep_persist_bars: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """Vectorised ``trade_score_breakdown``: component arrays plus ``raw_total`` / ``trade_score``.
+
+    ``bullish`` selects the ranking direction per element (scalar broadcasts);
+    False mirrors the directional components like ``RANKING_BEARISH``.
+    """
+    rs = np.asarray(rs, dtype=np.float64)
+    bullish = np.broadcast_to(np.asarray(bullish, dtype=bool), rs.shape)
+    v = np.where(bullish, rs, -rs)
+    rs_pts = np.select([v > 1.0, v >= 0.75, v >= 0.50, v >= 0.25, v >= 0.0], [40, 35, 30, 20, 10], default=0)
+    kav_pts = _KAVACH_PTS_BY_CODE[np.asarray(state_code, dtype=np.intp)]
+    vr = np.asarray(volume_ratio, dtype=np.float64)
+    vol_pts = np.select([vr > 2.0, vr >= 1.5, vr >= 1.0], [15, 12, 8], default=0)
+    a = np.asarray(adx, dtype=np.float64)
+    adx_pts = np.select([a > 30.0, a >= 25.0, a >= 20.0], [10, 8, 5], default=0)
+    p = np.asarray(price, dtype=np.float64)
+    w = np.asarray(vwap, dtype=np.float64)
+    vwap_pts = np.where(np.where(bullish, p > w, p < w), 5, 0)
+    persist_pts = np.zeros(rs.shape, dtype=np.int64)
+    if vwap_steep_persist_bars is not None:
+        steep = np.asarray(vwap_steep_persist_bars) >= 3
+        if steep.any():
+            try:
+                from backend.services.vwap_adx_promotion import vwap_persist_score_bump
+
+                bump = int(vwap_persist_score_bump())
+            except Exception:
+                bump = 5
+            persist_pts = np.where(steep, bump, 0)
+    raw = rs_pts + kav_pts + vol_pts + adx_pts + vwap_pts + persist_pts
+    return {
+        "rs_pts": rs_pts,
+        "kavach_pts": kav_pts,
+        "volume_pts": vol_pts,
+        "adx_pts": adx_pts,
+        "vwap_side_pts": vwap_pts,
+        "vwap_persist_pts": persist_pts,
+        "raw_total": raw,
+        "trade_score": np.minimum(100, raw),
+    }
@@ -14,6 +14,8 @@ import pytz
 from sqlalchemy import text
 
 from backend.database import SessionLocal, engine
+from backend.services.kavach_momentum_ignition_validate import THRESHOLD_VWAP_SLOPE
+from backend.services.replay_engine import BulkRowWriter, Snapshot, bulk_insert, replay_session
 from backend.services.rs_vwap_quality import (
     score_vwap_quality,
     signed_vwap_slope_atr,
@@ -72,6 +74,13 @@ def ensure_universe_vwap_scan() -> None:
     _ENSURED = True
 
 
+def _f(v: Any, default: float = 0.0) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
 def _session_date_ist(now: Optional[datetime] = None) -> str:
     n = now or datetime.now(IST)
     if n.tzinfo is None:
@@ -139,57 +148,85 @@ def _score_row(
     return row
 
 
+def snapshot_scorer(
+    *,
+    cfg: Dict[str, Any],
+    session_date: str,
+    source: str,
+    atr_by_symbol: Dict[str, float],
+    lock_by_stamp: List[Set[str]],
+):
+    """Streaming twin of ``_score_row`` for ``replay_session`` (same fields, rounding and 20-bar floor).
+
+    Reads the incremental session VWAP instead of rescoring a truncated slice;
+    ``lock_by_stamp[i]`` is the lock membership at the replay's i-th stamp.
+    """
+    ref = float(cfg.get("slope_ref_atr_per_30m") or 0.5)
+
+    def score(snap: Snapshot) -> Optional[Dict[str, Any]]:
+        st = snap.state
+        if len(st) < 20:
+            return None
+        atr_pct = atr_by_symbol.get(snap.key, 1.0)
+        atr = atr_pct if atr_pct > 0 else 1.0
+        last = st.last
+        signed = 0.0
+        change = st.vwap_slope(6)
+        if change is not None:
+            atr_abs = _f(last.get("close"), 1.0) * max(atr, 0.001) / 100.0
+            if atr_abs > 0:
+                signed = change / atr_abs
+        slope_score = max(0.0, min(100.0, abs(signed) / ref * 100.0))
+        direction = _direction_from_slope(signed)
+        direction_ok = signed < 0 if direction == "SHORT" else signed > 0
+        vwap = float(st.vwap[-1] or 0.0)
+        ext = round((_f(last.get("close")) - vwap) / vwap, 6) if vwap > 0 else None
+        return {
+            "session_date": session_date,
+            "symbol": snap.key.upper(),
+            "direction": direction,
+            "vwap_slope_score": round(slope_score, 2),
+            "steep_ok": bool(slope_score >= THRESHOLD_VWAP_SLOPE and direction_ok),
+            "vwap_extension_pct": ext,
+            "in_lock_at_time": snap.key in lock_by_stamp[snap.index],
+            "source": source,
+            "logged_at": snap.as_of,
+        }
+
+    return score
+
+
+_SCAN_COLS = (
+    "session_date",
+    "symbol",
+    "direction",
+    "vwap_slope_score",
+    "steep_ok",
+    "vwap_extension_pct",
+    "in_lock_at_time",
+    "source",
+    "logged_at",
+)
+_SCAN_CASTS = {
+    "session_date": "CAST({} AS date)",
+    "logged_at": "COALESCE(CAST({} AS timestamptz), NOW())",
+}
+
+
 def insert_scan_rows(db, rows: List[Dict[str, Any]]) -> int:
+    """Multi-row insert; rows without ``logged_at`` get NOW(). Commits."""
     if not rows:
         return 0
     ensure_universe_vwap_scan()
-    n = 0
-    for r in rows:
-        params = {
-            "d": r.get("session_date"),
-            "sym": r.get("symbol"),
-            "dir": r.get("direction"),
-            "vs": r.get("vwap_slope_score"),
-            "so": r.get("steep_ok"),
-            "ext": r.get("vwap_extension_pct"),
-            "il": bool(r.get("in_lock_at_time")),
-            "src": r.get("source") or "live",
+    params = [
+        {
+            **r,
+            "in_lock_at_time": bool(r.get("in_lock_at_time")),
+            "source": r.get("source") or "live",
         }
-        if r.get("logged_at") is not None:
-            db.execute(
-                text(
-                    """
-                    INSERT INTO kavach_universe_vwap_scan (
-                        session_date, symbol, direction,
-                        vwap_slope_score, steep_ok, vwap_extension_pct,
-                        in_lock_at_time, source, logged_at
-                    ) VALUES (
-                        CAST(:d AS date), :sym, :dir,
-                        :vs, :so, :ext,
-                        :il, :src, :lat
-                    )
-                    """
-                ),
-                {**params, "lat": r["logged_at"]},
-            )
-        else:
-            db.execute(
-                text(
-                    """
-                    INSERT INTO kavach_universe_vwap_scan (
-                        session_date, symbol, direction,
-                        vwap_slope_score, steep_ok, vwap_extension_pct,
-                        in_lock_at_time, source
-                    ) VALUES (
-                        CAST(:d AS date), :sym, :dir,
-                        :vs, :so, :ext,
-                        :il, :src
-                    )
-                    """
-                ),
-                params,
-            )
-        n += 1
+        for r in rows
+    ]
+    n = bulk_insert(db, "kavach_universe_vwap_scan", _SCAN_COLS, params, casts=_SCAN_CASTS)
     db.commit()
     return n
 
@@ -379,17 +416,22 @@ def backfill_universe_vwap_scan(
 ) -> Dict[str, Any]:
     """Historical 5m sweeps via Upstox candles (range_end_date). Shadow-only.
 
-    One historical fetch per symbol per day; slope/extension derived locally at
-    each RTH 5m timestamp. Prefer this over TradingView.
+    One historical fetch per symbol per day (served from the candle store when
+    already held); each symbol's bars are walked once by ``replay_session`` and
+    scored at every RTH 5m timestamp, rows written in multi-row batches.
+    Prefer this over TradingView.
     """
     import time as time_mod
 
     from backend.config import settings
+    from backend.services.market_data.candle_store import historical_candles
+    from backend.services.rs_conviction_config import get_config
     from backend.services.upstox_service import UpstoxService
 
     ensure_universe_vwap_scan()
     upstox = UpstoxService(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET)
     summary: Dict[str, Any] = {"ok": True, "days": {}, "source": "backfill"}
+    cfg = get_config()
 
     db = SessionLocal()
     try:
@@ -400,8 +442,17 @@ def backfill_universe_vwap_scan(
             timeline = _lock_membership_timeline(db, sd)
             # Fallback: EOD snapshot membership if no audit trail
             eod_lock = _lock_set(db, sd)
+            lock_by_stamp = [_locked_at(timeline, t) if timeline else eod_lock for t in stamps]
             atrs = _atr_map_for_date(db, sd, [s for s, _ in universe])
-            day_rows: List[Dict[str, Any]] = []
+            scorers = {
+                "scan": snapshot_scorer(
+                    cfg=cfg,
+                    session_date=sd,
+                    source="backfill",
+                    atr_by_symbol=atrs,
+                    lock_by_stamp=lock_by_stamp,
+                )
+            }
             fetched = 0
             failed = 0
             # Clear prior backfill for this day to allow re-run
@@ -415,14 +466,11 @@ def backfill_universe_vwap_scan(
                 {"d": sd},
             )
             db.commit()
+            sink = BulkRowWriter(lambda rows: insert_scan_rows(db, rows))
+            n = 0
             for i, (sym, ik) in enumerate(universe, start=1):
                 try:
-                    candles = upstox.get_historical_candles_by_instrument_key(
-                        ik,
-                        interval="minutes/5",
-                        days_back=3,
-                        range_end_date=d,
-                    )
+                    candles = historical_candles(upstox, ik, "minutes/5", 3, range_end_date=d)
                 except Exception as exc:
                     logger.debug("backfill fetch %s %s failed: %s", sd, sym, exc)
                     candles = None
@@ -432,27 +480,7 @@ def backfill_universe_vwap_scan(
                     failed += 1
                     continue
                 fetched += 1
-                atr = atrs.get(sym, 1.0)
-                batch: List[Dict[str, Any]] = []
-                for as_of in stamps:
-                    sliced = _truncate_candles(candles, as_of)
-                    lock_set = (
-                        _locked_at(timeline, as_of) if timeline else eod_lock
-                    )
-                    scored = _score_row(
-                        sliced,
-                        atr_pct=atr,
-                        in_lock=sym in lock_set,
-                        session_date=sd,
-                        symbol=sym,
-                        source="backfill",
-                        logged_at=as_of,
-                    )
-                    if scored:
-                        batch.append(scored)
-                if batch:
-                    insert_scan_rows(db, batch)
-                    day_rows.extend(batch)
+                n += sink.extend(row for _, row in replay_session(candles, stamps, scorers, key=sym))
                 if i % 20 == 0 or i == len(universe):
                     logger.info(
                         "universe VWAP backfill %s progress %s/%s fetched=%s failed=%s rows=%s",
@@ -461,14 +489,14 @@ def backfill_universe_vwap_scan(
                         len(universe),
                         fetched,
                         failed,
-                        len(day_rows),
+                        n,
                     )
                     print(
                         f"progress {sd} {i}/{len(universe)} fetched={fetched} "
-                        f"failed={failed} rows={len(day_rows)}",
+                        f"failed={failed} rows={n}",
                         flush=True,
                     )
-            n = len(day_rows)
+            sink.flush()
             summary["days"][sd] = {
                 "rows": n,
                 "symbols_fetched": fetched,
@@ -8,6 +8,7 @@ from pathlib import Path
 from typing import Dict, Any, Optional, List
 from zoneinfo import ZoneInfo
 
+from backend.services.order_state_hub import hub as order_hub
 from backend.services.upstox_service import upstox_service
 
 logger = logging.getLogger(__name__)
@@ -193,6 +194,9 @@ ENTRY_FILL_POLL_SEC = 1.5
 MARKET_FILL_WAIT_SEC = 45.0
 EXIT_FILL_WAIT_SEC = 90.0
 EXIT_FILL_POLL_SEC = 1.5
+# Fill waiters wake on postback / portfolio-stream events; while either is live, REST order
+# details are only re-read this often (catches dropped events).
+ORDER_FILL_FALLBACK_POLL_SEC = 15.0
 
 # System-wide live trading switch (default: NO)
 TRADING_LIVE_FILE = Path("/home/ubuntu/trademanthan/data/trading_live.json")
@@ -806,49 +810,94 @@ def _emit_entry_safety_alert(
     )
 
 
-def wait_for_buy_order_fill(
+def _fill_outcome(row: Dict[str, Any], expected_qty: int, is_complete) -> Optional[Dict[str, Any]]:
+    """Decisive waiter result for a broker order row, or None while the order is still working."""
+    st = (row.get("status") or "").lower()
+    if "cancel" in st or "reject" in st:
+        return {"filled": False, "error": "order_cancelled_or_rejected", "status": st, "row": row}
+    if not is_complete(row):
+        return None
+    fq = int(float(row.get("filled_quantity") or 0))
+    if fq < int(expected_qty) * 0.99:
+        return {
+            "filled": False,
+            "error": "partial_fill_incomplete",
+            "filled_quantity": fq,
+            "row": row,
+        }
+    ap = _broker_buy_row_average_price(row)
+    if ap and ap > 0:
+        return {
+            "filled": True,
+            "average_price": ap,
+            "filled_quantity": fq,
+            "row": row,
+        }
+    return None
+
+
+def _wait_for_order_fill(
     order_id: str,
     expected_qty: int,
-    timeout_sec: float = ENTRY_FILL_WAIT_SEC,
-    poll_interval: float = ENTRY_FILL_POLL_SEC,
+    timeout_sec: float,
+    poll_interval: float,
+    is_complete,
 ) -> Dict[str, Any]:
     """
-    Poll order details until BUY shows complete with filled qty (>= 99% of expected) and average price,
-    or terminal failure / timeout.
+    Wait on the order-state hub for a decisive state of ``order_id``.
+
+    Postbacks and the portfolio stream wake the waiter immediately. REST order details are
+    read once up front and then every ``poll_interval`` while no push channel is live, or
+    every ``ORDER_FILL_FALLBACK_POLL_SEC`` while one is (covers dropped push events).
     """
     if not order_id or not upstox_service:
         return {"filled": False, "error": "missing order_id or service"}
+    oid = str(order_id)
+    try:
+        from backend.services.upstox_portfolio_feed import ensure_portfolio_feed_running
+
+        ensure_portfolio_feed_running()
+    except Exception as e:
+        logger.debug("portfolio feed start skipped: %s", e)
     deadline = time.monotonic() + float(timeout_sec)
-    while time.monotonic() < deadline:
-        det = upstox_service.get_order_details(str(order_id))
-        row = _row_from_order_details_api(det)
-        if not row:
-            time.sleep(poll_interval)
-            continue
-        st = (row.get("status") or "").lower()
-        if "cancel" in st or "reject" in st:
-            return {"filled": False, "error": "order_cancelled_or_rejected", "status": st, "row": row}
-        fq = int(float(row.get("filled_quantity") or 0))
-        ap = _broker_buy_row_average_price(row)
-        if _order_row_is_complete_buy(row):
-            if fq < int(expected_qty) * 0.99:
-                return {
-                    "filled": False,
-                    "error": "partial_fill_incomplete",
-                    "filled_quantity": fq,
-                    "row": row,
-                }
-            if ap and ap > 0:
-                return {
-                    "filled": True,
-                    "average_price": ap,
-                    "filled_quantity": fq,
-                    "row": row,
-                }
-        time.sleep(poll_interval)
+    next_poll = time.monotonic()
+    seen = -1
+    while True:
+        now = time.monotonic()
+        if now >= next_poll:
+            row = _row_from_order_details_api(upstox_service.get_order_details(oid))
+            if row:
+                order_hub.publish(row, source="rest", order_id=oid)
+            slow = order_hub.push_live()
+            next_poll = time.monotonic() + (
+                max(float(poll_interval), ORDER_FILL_FALLBACK_POLL_SEC) if slow else float(poll_interval)
+            )
+        seen = order_hub.version(oid)
+        row = order_hub.get(oid)
+        if row:
+            outcome = _fill_outcome(row, expected_qty, is_complete)
+            if outcome:
+                return outcome
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        order_hub.wait_for_change(oid, seen, min(remaining, max(0.0, next_poll - time.monotonic())))
     return {"filled": False, "error": "timeout_waiting_for_fill", "order_id": order_id}
 
 
+def wait_for_buy_order_fill(
+    order_id: str,
+    expected_qty: int,
+    timeout_sec: float = ENTRY_FILL_WAIT_SEC,
+    poll_interval: float = ENTRY_FILL_POLL_SEC,
+) -> Dict[str, Any]:
+    """
+    Wait until BUY shows complete with filled qty (>= 99% of expected) and average price,
+    or terminal failure / timeout. Woken by broker push events; see ``_wait_for_order_fill``.
+    """
+    return _wait_for_order_fill(order_id, expected_qty, timeout_sec, poll_interval, _order_row_is_complete_buy)
+
+
 def wait_for_sell_order_fill(
     order_id: str,
     expected_qty: int,
@@ -856,40 +905,10 @@ def wait_for_sell_order_fill(
     poll_interval: float = EXIT_FILL_POLL_SEC,
 ) -> Dict[str, Any]:
     """
-    Poll order details until SELL shows complete with filled qty (>= 99% of expected) and average price,
-    or terminal failure / timeout.
+    Wait until SELL shows complete with filled qty (>= 99% of expected) and average price,
+    or terminal failure / timeout. Woken by broker push events; see ``_wait_for_order_fill``.
     """
-    if not order_id or not upstox_service:
-        return {"filled": False, "error": "missing order_id or service"}
-    deadline = time.monotonic() + float(timeout_sec)
-    while time.monotonic() < deadline:
-        det = upstox_service.get_order_details(str(order_id))
-        row = _row_from_order_details_api(det)
-        if not row:
-            time.sleep(poll_interval)
-            continue
-        st = (row.get("status") or "").lower()
-        if "cancel" in st or "reject" in st:
-            return {"filled": False, "error": "order_cancelled_or_rejected", "status": st, "row": row}
-        fq = int(float(row.get("filled_quantity") or 0))
-        ap = _broker_buy_row_average_price(row)
-        if _order_row_is_complete_sell(row):
-            if fq < int(expected_qty) * 0.99:
-                return {
-                    "filled": False,
-                    "error": "partial_fill_incomplete",
-                    "filled_quantity": fq,
-                    "row": row,
-                }
-            if ap and ap > 0:
-                return {
-                    "filled": True,
-                    "average_price": ap,
-                    "filled_quantity": fq,
-                    "row": row,
-                }
-        time.sleep(poll_interval)
-    return {"filled": False, "error": "timeout_waiting_for_fill", "order_id": order_id}
+    return _wait_for_order_fill(order_id, expected_qty, timeout_sec, poll_interval, _order_row_is_complete_sell)
 
 
 def _confirm_existing_sell_order_filled(
@@ -918,10 +937,13 @@ def _confirm_existing_sell_order_filled(
     return {"filled": False, "error": wf.get("error") or "sell_not_complete"}
 
 
-def sync_trade_buy_fill_from_broker(db, trade) -> bool:
+def sync_trade_buy_fill_from_broker(db, trade, order_book: Optional[Dict[str, Any]] = None) -> bool:
     """
     Align trade.buy_price with the broker's average BUY fill (GTT child leg, limit slip, etc.).
     Keeps buy_order_id unchanged when it is GTT-* so legacy exit (cancel GTT + sell) still works.
+
+    ``order_book``: today's order book already fetched by the caller (one fetch for many trades);
+    a complete BUY row for ``buy_order_id`` found there skips the per-order details call.
     """
     from sqlalchemy.orm.attributes import flag_modified
     import pytz
@@ -944,30 +966,36 @@ def sync_trade_buy_fill_from_broker(db, trade) -> bool:
     oid = (getattr(trade, "buy_order_id", None) or "").strip()
     row: Optional[Dict[str, Any]] = None
 
-    ob = upstox_service.get_order_book_today()
+    ob = order_book if order_book is not None else upstox_service.get_order_book_today()
     orders_list: List[Dict[str, Any]] = [
-        o for o in (ob.get("orders") or []) if isinstance(o, dict)
+        o for o in ((ob or {}).get("orders") or []) if isinstance(o, dict)
     ]
 
+    def _book_row_for_oid() -> Optional[Dict[str, Any]]:
+        for o in orders_list:
+            if str(o.get("order_id", "")) != str(oid):
+                continue
+            if not (_order_row_is_complete_buy(o) and _broker_buy_row_average_price(o)):
+                continue
+            fq = int(float(o.get("filled_quantity") or 0))
+            if fq < qty * 0.99:
+                continue
+            return o
+        return None
+
     if oid and not oid.upper().startswith("GTT"):
-        det = upstox_service.get_order_details(oid)
-        cand = _row_from_order_details_api(det)
-        if cand and _order_row_is_complete_buy(cand) and _broker_buy_row_average_price(cand):
-            fq = int(float(cand.get("filled_quantity") or 0))
-            pq = int(float(cand.get("quantity") or 0))
-            if fq >= qty * 0.99 or (fq == 0 and pq >= qty * 0.99):
-                row = cand
-        if row is None and orders_list:
-            for o in orders_list:
-                if str(o.get("order_id", "")) != str(oid):
-                    continue
-                if not (_order_row_is_complete_buy(o) and _broker_buy_row_average_price(o)):
-                    continue
-                fq = int(float(o.get("filled_quantity") or 0))
-                if fq < qty * 0.99:
-                    continue
-                row = o
-                break
+        if order_book is not None:
+            row = _book_row_for_oid()
+        if row is None:
+            det = upstox_service.get_order_details(oid)
+            cand = _row_from_order_details_api(det)
+            if cand and _order_row_is_complete_buy(cand) and _broker_buy_row_average_price(cand):
+                fq = int(float(cand.get("filled_quantity") or 0))
+                pq = int(float(cand.get("quantity") or 0))
+                if fq >= qty * 0.99 or (fq == 0 and pq >= qty * 0.99):
+                    row = cand
+        if row is None:
+            row = _book_row_for_oid()
 
     if row is None and orders_list:
         ist = pytz.timezone("Asia/Kolkata")
@@ -1398,6 +1426,13 @@ def get_broker_net_long_qty_for_instrument(instrument_key: str) -> Optional[int]
 def _load_instrument_dict_by_key(instrument_key: str) -> Optional[Dict[str, Any]]:
     """Return one instruments.json row for this Upstox instrument_key (NSE_FO|…)."""
     try:
+        from backend.services.instrument_master import get_instrument_master
+
+        master = get_instrument_master()
+        if master is not None:
+            return master.get(instrument_key)
+
+        # Index not built / failed to load: scan the instruments JSON.
         import json
         from backend.config import get_instruments_file_path
 
@@ -0,0 +1,515 @@
+"""
+Non-blocking file logging: QueueHandler producers, one writer thread.
+
+Every file handler used to be a ``FlushingFileHandler`` — ``flush()`` plus
+``os.fsync()`` after each record, on the calling (request / scheduler / feed)
+thread. Here producers only enqueue:
+
+* ``get_file_handler(path)`` returns one ``PipelineQueueHandler`` per log file.
+  ``emit`` formats the message and puts the record on a shared ``SimpleQueue``
+  (dropping, and counting, once ``LOG_QUEUE_MAX`` records are pending).
+  Per-logger rate limits (``LOG_RATE_LIMITS``) are applied before enqueue;
+  ERROR and above are never limited.
+* A single ``PipelineListener`` thread drains the queue into
+  ``BufferedRotatingFileHandler`` objects: writes go to a 64 KiB buffer, the
+  buffer is flushed every ``LOG_FLUSH_INTERVAL_SEC`` and fsync'ed every
+  ``LOG_FSYNC_INTERVAL_SEC``; an ERROR record forces flush + fsync. Files
+  rotate on size (``LOG_MAX_BYTES``) and at local midnight.
+* ``shutdown()`` (lifespan shutdown and atexit) drains the queue and syncs. The
+  queue handlers stay attached to their loggers but switch to direct
+  fsync-per-record writes, so records logged after shutdown are not lost.
+* Child processes (``multiprocessing`` fork / forkserver / spawn pools) have no
+  writer thread: inherited handlers switch to direct writes after fork, and
+  ``get_file_handler`` hands out direct handlers. Only the parent process
+  rotates, so several processes never race a rollover of the same file.
+
+``LOG_PIPELINE_ENABLED=false`` restores the old fsync-per-record handler.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import settings
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+_WRITE_BUFFER_BYTES = 64 * 1024
+
+
+class FlushingFileHandler(logging.FileHandler):
+    """FileHandler that flushes after each log entry to ensure immediate writes (legacy mode)"""
+
+    def emit(self, record):
+        super().emit(record)
+        self.flush()
+        # Also force OS-level flush to ensure data is written to disk
+        if hasattr(self.stream, "fileno"):
+            try:
+                os.fsync(self.stream.fileno())
+            except (OSError, AttributeError):
+                pass  # Ignore if fsync fails
+
+
+class BufferedRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    Buffered file handler owned by the writer thread: flush/fsync on a cadence
+    (``tick``), immediately for ERROR+, and size / daily rotation.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        *,
+        max_bytes: int = 0,
+        backup_count: int = 5,
+        rotate_daily: bool = True,
+        flush_interval: float = 0.5,
+        fsync_interval: float = 5.0,
+        encoding: str = "utf-8",
+        clock=time.time,
+    ):
+        self.max_bytes = int(max_bytes)
+        self.backup_count = int(backup_count)
+        self.rotate_daily = rotate_daily
+        self.flush_interval = float(flush_interval)
+        self.fsync_interval = float(fsync_interval)
+        self._clock = clock
+        super().__init__(filename, "a", encoding=encoding, delay=False)
+        self._size = self._current_size()
+        self._rollover_at = self._next_midnight()
+        self._last_flush = self._last_fsync = self._clock()
+        self._unflushed = False
+        self._unsynced = False
+        self.fsyncs = 0
+        self.rotations = 0
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, encoding=self.encoding, buffering=_WRITE_BUFFER_BYTES)
+
+    def _current_size(self) -> int:
+        try:
+            return os.path.getsize(self.baseFilename)
+        except OSError:
+            return 0
+
+    def _next_midnight(self) -> float:
+        now = datetime.fromtimestamp(self._clock())
+        return (datetime(now.year, now.month, now.day) + timedelta(days=1)).timestamp()
+
+    # StreamHandler.emit calls flush() after every record; flushing is driven by tick() instead.
+    def flush(self):
+        pass
+
+    def _flush_stream(self, sync: bool) -> None:
+        if self.stream is None:
+            return
+        now = self._clock()
+        if self._unflushed:
+            self.stream.flush()
+            self._unflushed = False
+            self._unsynced = True
+        self._last_flush = now
+        if sync and self._unsynced:
+            try:
+                os.fsync(self.stream.fileno())
+                self.fsyncs += 1
+            except (OSError, AttributeError, ValueError):
+                pass
+            self._unsynced = False
+            self._last_fsync = now
+
+    def shouldRollover(self, record) -> bool:
+        if self.rotate_daily and self._clock() >= self._rollover_at:
+            return True
+        return self.max_bytes > 0 and self._size >= self.max_bytes
+
+    def doRollover(self) -> None:
+        self._flush_stream(sync=True)
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src, dst = f"{self.baseFilename}.{i}", f"{self.baseFilename}.{i + 1}"
+                if os.path.exists(src):
+                    os.replace(src, dst)
+            if os.path.exists(self.baseFilename):
+                os.replace(self.baseFilename, f"{self.baseFilename}.1")
+        else:
+            open(self.baseFilename, "w").close()
+        self.stream = self._open()
+        self._size = 0
+        self._rollover_at = self._next_midnight()
+        self.rotations += 1
+
+    def emit(self, record) -> None:
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            msg = self.format(record) + self.terminator
+            self.stream.write(msg)
+            self._size += len(msg.encode(self.encoding or "utf-8", "replace"))
+            self._unflushed = True
+        except Exception:
+            self.handleError(record)
+            return
+        if record.levelno >= logging.ERROR:
+            self._flush_stream(sync=True)
+
+    def tick(self) -> None:
+        """Cadence flush/fsync; called by the writer thread between records and when idle."""
+        now = self._clock()
+        if self._unflushed and now - self._last_flush >= self.flush_interval:
+            self._flush_stream(sync=False)
+        if self._unsynced and now - self._last_fsync >= self.fsync_interval:
+            self._flush_stream(sync=True)
+
+    def sync(self) -> None:
+        self._flush_stream(sync=True)
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            self._flush_stream(sync=True)
+        finally:
+            self.release()
+        super().close()
+
+
+def parse_rate_limits(spec: str) -> List[Tuple[str, float]]:
+    """``"backend.services.upstox_market_feed=20,backend.routers.scan=100"`` -> [(prefix, records/sec)]."""
+    rules = []
+    for part in (spec or "").split(","):
+        name, _, rate = part.strip().partition("=")
+        try:
+            if name and float(rate) > 0:
+                rules.append((name.strip(), float(rate)))
+        except ValueError:
+            continue
+    return sorted(rules, key=lambda r: -len(r[0]))
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per logger name (rate from the longest matching prefix rule, burst = 2 s of
+    rate). Records over the limit are dropped on the producer thread; the next record that passes
+    carries a ``rate_limit_note`` attribute ("[N suppressed]") that ``PipelineFormatter`` appends —
+    the record's own message is left alone for other handlers. ERROR and above always pass.
+    """
+
+    def __init__(self, rules: List[Tuple[str, float]], clock=time.monotonic):
+        super().__init__()
+        self.rules = rules
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, List[float]] = {}  # name -> [tokens, last_ts, rate, suppressed]
+        self.suppressed_total = 0
+
+    def _rate_for(self, name: str) -> Optional[float]:
+        for prefix, rate in self.rules:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return None
+
+    def filter(self, record) -> bool:
+        if record.levelno >= logging.ERROR or not self.rules:
+            return True
+        # A propagating record can reach several pipeline handlers; decide once per record.
+        seen = getattr(record, "_rate_limit_ok", None)
+        if seen is not None:
+            return seen
+        ok = self._take(record)
+        record._rate_limit_ok = ok
+        return ok
+
+    def _take(self, record) -> bool:
+        with self._lock:
+            b = self._buckets.get(record.name)
+            if b is None:
+                rate = self._rate_for(record.name)
+                if rate is None:
+                    self._buckets[record.name] = b = [0.0, 0.0, 0.0, 0]
+                else:
+                    self._buckets[record.name] = b = [rate * 2, self._clock(), rate, 0]
+            rate = b[2]
+            if not rate:
+                return True
+            now = self._clock()
+            b[0] = min(rate * 2, b[0] + (now - b[1]) * rate)
+            b[1] = now
+            if b[0] < 1.0:
+                b[3] += 1
+                self.suppressed_total += 1
+                return False
+            b[0] -= 1.0
+            if b[3]:
+                record.rate_limit_note = f" [{int(b[3])} earlier records from this logger suppressed]"
+                b[3] = 0
+            return True
+
+
+class PipelineFormatter(logging.Formatter):
+    """Standard app format plus the rate limiter's suppression note, if the record carries one."""
+
+    def formatMessage(self, record) -> str:
+        return super().formatMessage(record) + getattr(record, "rate_limit_note", "")
+
+
+class PipelineQueueHandler(logging.handlers.QueueHandler):
+    """Producer side: rate-limit, format once, tag with the target file, enqueue without blocking."""
+
+    def __init__(self, pipeline: "LogPipeline", path: str):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+        self.baseFilename = path
+        self._direct: Optional[logging.Handler] = None
+        if pipeline.rate_filter is not None:
+            self.addFilter(pipeline.rate_filter)
+
+    def go_direct(self) -> None:
+        """Write straight to the file from now on (no writer thread left to drain the queue)."""
+        if self._direct is None:
+            self._direct = _direct_handler(self.baseFilename)
+
+    def emit(self, record) -> None:
+        direct = self._direct
+        if direct is not None:
+            direct.handle(record)
+            return
+        super().emit(record)
+
+    def close(self) -> None:
+        if self._direct is not None:
+            self._direct.close()
+        super().close()
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        record.pipeline_file = self.baseFilename
+        return record
+
+    def enqueue(self, record) -> None:
+        if self.queue.qsize() >= self.pipeline.queue_max and record.levelno < logging.ERROR:
+            self.pipeline.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+_TICK = object()
+
+
+class PipelineListener(logging.handlers.QueueListener):
+    """The single writer thread: routes records to their file, ticks flush/fsync when idle."""
+
+    def __init__(self, pipeline: "LogPipeline"):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def dequeue(self, block):
+        try:
+            return self.queue.get(block, timeout=self.pipeline.tick_interval)
+        except queue.Empty:
+            return _TICK
+
+    def handle(self, record) -> None:
+        files = self.pipeline.files
+        if record is not _TICK:
+            target = files.get(getattr(record, "pipeline_file", None))
+            if target is not None:
+                target.acquire()
+                try:
+                    target.emit(record)
+                finally:
+                    target.release()
+            self.pipeline.written += 1
+        for f in list(files.values()):
+            f.acquire()
+            try:
+                f.tick()
+            finally:
+                f.release()
+
+
+class LogPipeline:
+    def __init__(
+        self,
+        *,
+        flush_interval: float = 0.5,
+        fsync_interval: float = 5.0,
+        max_bytes: int = 100 * 1024 * 1024,
+        backup_count: int = 10,
+        rotate_daily: bool = True,
+        queue_max: int = 100_000,
+        rate_limits: str = "",
+    ):
+        self.queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.tick_interval = max(0.05, min(flush_interval, fsync_interval))
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_daily = rotate_daily
+        self.queue_max = queue_max
+        rules = parse_rate_limits(rate_limits)
+        self.rate_filter = RateLimitFilter(rules) if rules else None
+        self.files: Dict[str, BufferedRotatingFileHandler] = {}
+        self.handlers: Dict[str, PipelineQueueHandler] = {}
+        self.dropped = 0
+        self.written = 0
+        self._lock = threading.Lock()
+        self._listener: Optional[PipelineListener] = None
+
+    def handler_for(self, path: str) -> PipelineQueueHandler:
+        path = os.path.abspath(str(path))
+        with self._lock:
+            h = self.handlers.get(path)
+            if h is not None:
+                return h
+            fh = BufferedRotatingFileHandler(
+                path,
+                max_bytes=self.max_bytes,
+                backup_count=self.backup_count,
+                rotate_daily=self.rotate_daily,
+                flush_interval=self.flush_interval,
+                fsync_interval=self.fsync_interval,
+            )
+            fh.setFormatter(logging.Formatter("%(message)s"))  # records arrive already formatted
+            self.files[path] = fh
+            h = self.handlers[path] = PipelineQueueHandler(self, path)
+            h.setFormatter(PipelineFormatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+            if self._listener is None:
+                self._listener = PipelineListener(self)
+                self._listener.start()
+            return h
+
+    def shutdown(self) -> None:
+        """Drain pending records, then flush + fsync + close every file.
+
+        Handlers still attached to loggers switch to direct writes first, so
+        nothing lands in a queue that is no longer drained.
+        """
+        with self._lock:
+            listener, self._listener = self._listener, None
+            for h in self.handlers.values():
+                h.go_direct()
+        if listener is not None:
+            listener.stop()
+        for f in list(self.files.values()):
+            f.close()
+        self.files.clear()
+        self.handlers.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "rate_limited": self.rate_filter.suppressed_total if self.rate_filter else 0,
+            "fsyncs": sum(f.fsyncs for f in self.files.values()),
+            "rotations": sum(f.rotations for f in self.files.values()),
+        }
+
+
+_PIPELINE: Optional[LogPipeline] = None
+_LEGACY: Dict[str, logging.Handler] = {}
+_GUARD = threading.Lock()
+_FORKED_CHILD = False
+
+
+def _direct_handler(path: str) -> logging.Handler:
+    h = FlushingFileHandler(path, mode="a", encoding="utf-8", delay=True)
+    h.setFormatter(PipelineFormatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+    return h
+
+
+def _in_child_process() -> bool:
+    return _FORKED_CHILD or multiprocessing.parent_process() is not None
+
+
+def _after_fork_in_child() -> None:
+    """The writer thread does not survive fork: inherited handlers write directly."""
+    global _PIPELINE, _GUARD, _FORKED_CHILD
+    _FORKED_CHILD = True
+    _GUARD = threading.Lock()  # may have been held by another parent thread
+    p, _PIPELINE = _PIPELINE, None
+    if p is None:
+        return
+    p._listener = None
+    for h in p.handlers.values():
+        h.go_direct()
+    # Buffered bytes not yet flushed are the parent's to write: point this
+    # process's copy of each file descriptor at /dev/null so a later close or
+    # flush here cannot write them a second time.
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        for f in p.files.values():
+            try:
+                os.dup2(devnull, f.stream.fileno())
+            except (OSError, AttributeError, ValueError):
+                pass
+    finally:
+        os.close(devnull)
+    p.files.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _pipeline() -> LogPipeline:
+    global _PIPELINE
+    with _GUARD:
+        if _PIPELINE is None:
+            _PIPELINE = LogPipeline(
+                flush_interval=settings.LOG_FLUSH_INTERVAL_SEC,
+                fsync_interval=settings.LOG_FSYNC_INTERVAL_SEC,
+                max_bytes=settings.LOG_MAX_BYTES,
+                backup_count=settings.LOG_BACKUP_COUNT,
+                rotate_daily=settings.LOG_ROTATE_DAILY,
+                queue_max=settings.LOG_QUEUE_MAX,
+                rate_limits=settings.LOG_RATE_LIMITS,
+            )
+            atexit.register(shutdown)
+        return _PIPELINE
+
+
+def get_file_handler(path, level: int = logging.INFO) -> logging.Handler:
+    """
+    The process-wide handler for log file ``path`` (same instance on every call, so
+    ``logger.addHandler`` never duplicates it). Formatter is the standard app format.
+    The handler is shared, so ``level`` only ever lowers it: it keeps the most
+    verbose level any caller asked for.
+    """
+    if settings.LOG_PIPELINE_ENABLED and not _in_child_process():
+        h = _pipeline().handler_for(path)
+    else:
+        key = os.path.abspath(str(path))
+        with _GUARD:
+            h = _LEGACY.get(key)
+            if h is None:
+                h = _LEGACY[key] = FlushingFileHandler(key, mode="a", encoding="utf-8")
+                h.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+    if h.level == logging.NOTSET or level < h.level:
+        h.setLevel(level)
+    return h
+
+
+def shutdown() -> None:
+    global _PIPELINE
+    with _GUARD:
+        p, _PIPELINE = _PIPELINE, None
+    if p is not None:
+        p.shutdown()
+
+
+def pipeline_stats() -> Dict[str, int]:
+    return _PIPELINE.stats() if _PIPELINE is not None else {}
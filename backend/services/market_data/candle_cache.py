@@ -15,16 +15,45 @@ roughly once per TTL instead of once per job:
   fetch).
 * Callers decide freshness via ``max_age_sec`` at read time, so a tolerant reader
   (e.g. the RS scanner) and a strict reader (signal jobs) can share one entry.
+* Intraday timeframes share one base series: with the V2 candle path the 1m
+  series (history + today's intraday bars) is cached under ``minutes/1`` and
+  5m/15m/30m are aggregated from it via ``derive``, memoized per instrument
+  against the base's tip bar, so one symbol asked for at several timeframes
+  costs one 1m download and one intraday merge.
+* Entries are stored as ``CandleSeries`` (columnar float64 arrays + epoch
+  timestamps, ~90 B/bar instead of ~400 B for a dict). ``get`` / ``get_recent``
+  still return fresh lists of dicts; ``get_series`` / ``get_recent_series`` hand
+  out zero-copy array views for readers that only need columns.
+* Single flight (``get_or_fetch``): when several jobs miss the same key at once
+  (typically right after a TTL expiry), the first registers an in-flight future
+  and fetches; the others wait on it (bounded by ``FLIGHT_WAIT_TIMEOUT_SEC``) and
+  share its result — including a failure — instead of each spending a candle
+  budget slot on an identical request.
+* Stale-while-revalidate (``get_or_fetch(..., stale_sec=…)``): an entry past its
+  TTL by at most ``stale_sec`` is returned at once (``last_read_stale()`` is then
+  True on that thread) and one background refresh is queued on a small pool
+  whose threads draw from the candle rate limiter at background priority. The
+  refresh registers as the key's in-flight fetch, so it is coalesced too.
+* The age of every entry found at read time is bucketed (``stats()["read_age_sec"]``)
+  so TTLs can be tuned against how old the data readers actually get is.
 
 In-memory, thread-safe, shared across the APScheduler jobs + uvicorn request
 handlers that run in the same process.
 """
 from __future__ import annotations
 
+import bisect
+import logging
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from backend.services.market_data.candle_series import CandleSeries
+
+logger = logging.getLogger(__name__)
 
 # Canonical (widest) fetch window per interval. When the shared cache fetches one
 # of these intervals it fetches at least this many days so engine/picker/RS share
@@ -33,7 +62,7 @@ from typing import Any, Dict, List, Optional, Tuple
 # (A wider days_back is a single HTTP call — same request-count — so this is free
 # on the rate-limit dimension.)
 CANONICAL_DAYS_BACK: Dict[str, int] = {
-    "minutes/1": 2,
+    "minutes/1": 6,  # also the base 5m/15m derive from, so match their window
     "minutes/5": 6,
     "minutes/15": 6,
     "days/1": 45,
@@ -41,21 +70,58 @@ CANONICAL_DAYS_BACK: Dict[str, int] = {
 
 _MAX_ENTRIES = 4000
 
+# How long a coalesced reader waits for the in-flight fetch before fetching on its
+# own. Covers a budget-slot wait plus a slow Upstox response with retries.
+FLIGHT_WAIT_TIMEOUT_SEC = 45.0
+
+# Background (stale-while-revalidate) refreshes: pool size, and the minimum gap
+# between attempts on one key so a refresh denied by the rate limiter is not
+# re-queued by every reader that follows.
+SWR_REFRESH_WORKERS = 2
+SWR_RETRY_SEC = 10.0
+
+# Upper bounds (seconds) of the read-age histogram buckets; a last bucket is open.
+READ_AGE_BUCKETS_SEC: Tuple[float, ...] = (15, 30, 60, 120, 150, 300, 600, 900, 1800)
+
+
+class CacheRead(NamedTuple):
+    candles: List[Dict[str, Any]]
+    age_sec: float
+    stale: bool
+
 
 @dataclass
 class _Entry:
     fetched: float       # epoch seconds
     from_date: str       # "YYYY-MM-DD" (inclusive start of cached span)
     to_date: str         # "YYYY-MM-DD" (inclusive end of cached span)
-    candles: List[Dict[str, Any]]
+    # CandleSeries; a plain list only for rows the columnar form cannot hold.
+    candles: Union[CandleSeries, List[Dict[str, Any]]]
 
 
 _LOCK = threading.Lock()
 _CACHE: Dict[Tuple[str, str], _Entry] = {}
+# (instrument_key, interval) -> (base signature, series built from that base).
+_DERIVED: Dict[Tuple[str, str], Tuple[Tuple[Any, ...], List[Dict[str, Any]]]] = {}
+# (instrument_key, interval) -> future of (span from_date, candles) for the fetch in progress.
+_INFLIGHT: Dict[Tuple[str, str], Future] = {}
+# (instrument_key, interval) -> time.time() of the last background refresh queued.
+_REFRESH_QUEUED: Dict[Tuple[str, str], float] = {}
+_REFRESH_POOL: Optional[ThreadPoolExecutor] = None
+_tls = threading.local()
 
 # Best-effort metrics.
 _hits = 0
 _misses = 0
+_derived_hits = 0
+_derived_builds = 0
+_coalesced_waits = 0   # readers that waited on another caller's fetch
+_saved_requests = 0    # ... and were served by it (no request of their own)
+_wait_timeouts = 0     # ... and gave up after FLIGHT_WAIT_TIMEOUT_SEC
+_stale_served = 0      # expired entries returned under stale-while-revalidate
+_refreshes_queued = 0
+_refresh_failures = 0
+_read_age_counts = [0] * (len(READ_AGE_BUCKETS_SEC) + 1)
 
 
 def canonical_days_back(interval: str, requested_days_back: int) -> int:
@@ -85,10 +151,12 @@ def _evict_if_needed() -> None:
         _CACHE.pop(key, None)
 
 
-def tip_timestamp(candles: Optional[List[Dict[str, Any]]]) -> str:
+def tip_timestamp(candles: Union[CandleSeries, List[Dict[str, Any]], None]) -> str:
     """Lexicographically latest candle timestamp string, or empty."""
-    if not candles:
+    if candles is None or len(candles) == 0:
         return ""
+    if isinstance(candles, CandleSeries):
+        return candles.tip_timestamp()
     tip = ""
     for c in candles:
         ts = str(c.get("timestamp") or "")
@@ -97,6 +165,64 @@ def tip_timestamp(candles: Optional[List[Dict[str, Any]]]) -> str:
     return tip
 
 
+def _to_stored(candles: List[Dict[str, Any]]) -> Union[CandleSeries, List[Dict[str, Any]]]:
+    if isinstance(candles, CandleSeries):
+        return candles
+    try:
+        return CandleSeries.from_dicts(candles)
+    except (ValueError, TypeError, AttributeError):
+        return list(candles)
+
+
+def _as_dicts(stored: Union[CandleSeries, List[Dict[str, Any]]], from_date: str) -> List[Dict[str, Any]]:
+    if isinstance(stored, CandleSeries):
+        return stored.since_date(from_date).to_dicts()
+    return filter_from(stored, from_date)
+
+
+def _lookup_aged(
+    instrument_key: str,
+    interval: str,
+    from_date: Optional[str],
+    max_age_sec: float,
+    stale_sec: float = 0.0,
+) -> Tuple[Union[CandleSeries, List[Dict[str, Any]], None], float, bool]:
+    """(stored candles, age, stale) for an entry younger than ``max_age_sec + stale_sec``
+    that covers ``from_date`` (unless None); ``(None, age, False)`` otherwise.
+
+    Counts hit/miss/stale and records the entry's age in the read-age histogram.
+    """
+    global _hits, _misses, _stale_served
+    if not instrument_key or not interval:
+        return None, 0.0, False
+    with _LOCK:
+        entry = _CACHE.get((instrument_key, interval))
+        if entry is None:
+            _misses += 1
+            return None, 0.0, False
+        age = max(0.0, time.time() - entry.fetched)
+        _read_age_counts[bisect.bisect_left(READ_AGE_BUCKETS_SEC, age)] += 1
+        if from_date and entry.from_date and entry.from_date > from_date:
+            # Cached window starts later than requested -> does not cover it.
+            _misses += 1
+            return None, age, False
+        if age <= max_age_sec:
+            _hits += 1
+            return entry.candles, age, False
+        if stale_sec > 0 and age <= max_age_sec + stale_sec:
+            _stale_served += 1
+            return entry.candles, age, True
+        _misses += 1
+        return None, age, False
+
+
+def _lookup(
+    instrument_key: str, interval: str, from_date: Optional[str], max_age_sec: float
+) -> Union[CandleSeries, List[Dict[str, Any]], None]:
+    """Stored candles if fresh (and covering ``from_date`` unless None), counting hit/miss."""
+    return _lookup_aged(instrument_key, interval, from_date, max_age_sec)[0]
+
+
 def put(
     instrument_key: str,
     interval: str,
@@ -111,26 +237,27 @@ def put(
     """
     if not instrument_key or not interval or not candles:
         return
+    stored = _to_stored(candles)
+    new_tip = tip_timestamp(stored)
     with _LOCK:
         key = (instrument_key, interval)
         existing = _CACHE.get(key)
         if existing is not None:
             old_tip = tip_timestamp(existing.candles)
-            new_tip = tip_timestamp(candles)
             if old_tip and new_tip and new_tip < old_tip:
                 return
             if (
                 old_tip
                 and new_tip
                 and new_tip == old_tip
-                and len(candles) < len(existing.candles)
+                and len(stored) < len(existing.candles)
             ):
                 return
         _CACHE[key] = _Entry(
             fetched=time.time(),
             from_date=from_date or "",
             to_date=to_date or "",
-            candles=list(candles),
+            candles=stored,
         )
         _evict_if_needed()
 
@@ -155,24 +282,35 @@ def get(
     (i.e. it covers the requested window); the result is filtered to ``from_date``
     so it matches a direct fetch for that window.
     """
-    global _hits, _misses
-    if not instrument_key or not interval:
+    stored = _lookup(instrument_key, interval, from_date or "", max_age_sec)
+    return None if stored is None else _as_dicts(stored, from_date)
+
+
+def read(
+    instrument_key: str,
+    interval: str,
+    from_date: str,
+    max_age_sec: float,
+    stale_sec: float = 0.0,
+) -> Optional[CacheRead]:
+    """``get`` that also reports the entry's age, accepting entries up to ``stale_sec``
+    past ``max_age_sec`` (flagged ``stale``). Does not queue a refresh."""
+    stored, age, stale = _lookup_aged(instrument_key, interval, from_date or "", max_age_sec, stale_sec)
+    if stored is None:
         return None
+    return CacheRead(_as_dicts(stored, from_date), age, stale)
+
+
+def fetched_at(instrument_key: str, interval: str) -> Optional[float]:
+    """Epoch seconds the entry was stored, or None (does not count as a read)."""
     with _LOCK:
         entry = _CACHE.get((instrument_key, interval))
-        if entry is None:
-            _misses += 1
-            return None
-        if (time.time() - entry.fetched) > max_age_sec:
-            _misses += 1
-            return None
-        if from_date and entry.from_date and entry.from_date > from_date:
-            # Cached window starts later than requested -> does not cover it.
-            _misses += 1
-            return None
-        candles = entry.candles
-    _hits += 1
-    return filter_from(candles, from_date)
+        return entry.fetched if entry is not None else None
+
+
+def last_read_stale() -> bool:
+    """True if this thread's last ``get_or_fetch`` was served a stale entry."""
+    return bool(getattr(_tls, "stale", False))
 
 
 def get_recent(
@@ -183,27 +321,263 @@ def get_recent(
     """Return the full cached candle series for ``(instrument_key, interval)`` if
     fresh, ignoring the date window. For readers that just need the most recent
     bars (e.g. the RS scanner) regardless of exact span."""
-    global _hits, _misses
-    if not instrument_key or not interval:
-        return None
+    stored = _lookup(instrument_key, interval, None, max_age_sec)
+    return None if stored is None else _as_dicts(stored, "")
+
+
+def get_series(
+    instrument_key: str,
+    interval: str,
+    from_date: str,
+    max_age_sec: float,
+) -> Optional[CandleSeries]:
+    """``get`` as a zero-copy ``CandleSeries`` view (None on a miss or for list-stored rows)."""
+    stored = _lookup(instrument_key, interval, from_date or "", max_age_sec)
+    return stored.since_date(from_date) if isinstance(stored, CandleSeries) else None
+
+
+def get_recent_series(
+    instrument_key: str,
+    interval: str,
+    max_age_sec: float,
+) -> Optional[CandleSeries]:
+    """``get_recent`` as a zero-copy ``CandleSeries`` (None on a miss or for list-stored rows)."""
+    stored = _lookup(instrument_key, interval, None, max_age_sec)
+    return stored if isinstance(stored, CandleSeries) else None
+
+
+def _lead_fetch(
+    key: Tuple[str, str],
+    fut: Future,
+    fetch: Callable[[], Optional[List[Dict[str, Any]]]],
+    span_from: str,
+    span_to: str,
+) -> Optional[List[Dict[str, Any]]]:
+    """Run the registered in-flight fetch for ``key``: store, unregister, resolve ``fut``."""
+    try:
+        candles = fetch()
+    except BaseException as e:
+        with _LOCK:
+            _INFLIGHT.pop(key, None)
+        fut.set_exception(e)
+        raise
+    if candles:
+        put(key[0], key[1], span_from, span_to, candles)
     with _LOCK:
-        entry = _CACHE.get((instrument_key, interval))
-        if entry is None or (time.time() - entry.fetched) > max_age_sec:
-            _misses += 1
-            return None
-        candles = list(entry.candles)
-    _hits += 1
+        _INFLIGHT.pop(key, None)
+    fut.set_result((span_from or "", candles))
     return candles
 
 
+def _refresh_pool() -> ThreadPoolExecutor:
+    global _REFRESH_POOL
+    with _LOCK:
+        if _REFRESH_POOL is None:
+            _REFRESH_POOL = ThreadPoolExecutor(
+                max_workers=SWR_REFRESH_WORKERS, thread_name_prefix="candle-swr"
+            )
+        return _REFRESH_POOL
+
+
+def _background_refresh(key: Tuple[str, str], fut: Future, fetch, span_from: str, span_to: str) -> None:
+    global _refresh_failures
+    from backend.services.upstox_rate_limiter import background_candle_worker
+
+    try:
+        with background_candle_worker():
+            candles = _lead_fetch(key, fut, fetch, span_from, span_to)
+        ok = bool(candles)
+    except Exception as e:
+        logger.debug("candle_cache background refresh %s failed: %s", key, e)
+        ok = False
+    if not ok:
+        with _LOCK:
+            _refresh_failures += 1
+
+
+def _queue_refresh(
+    key: Tuple[str, str],
+    fetch: Callable[[], Optional[List[Dict[str, Any]]]],
+    span_from: str,
+    span_to: str,
+) -> bool:
+    """Queue one background refresh of ``key`` unless one is in flight or was just tried."""
+    global _refreshes_queued
+    now = time.time()
+    with _LOCK:
+        if key in _INFLIGHT or now - _REFRESH_QUEUED.get(key, 0.0) < SWR_RETRY_SEC:
+            return False
+        fut: Future = Future()
+        _INFLIGHT[key] = fut
+        _REFRESH_QUEUED[key] = now
+        if len(_REFRESH_QUEUED) > _MAX_ENTRIES:
+            for victim in list(_REFRESH_QUEUED)[: max(1, _MAX_ENTRIES // 10)]:
+                _REFRESH_QUEUED.pop(victim, None)
+        _refreshes_queued += 1
+    try:
+        _refresh_pool().submit(_background_refresh, key, fut, fetch, span_from, span_to)
+    except RuntimeError:  # interpreter shutting down
+        with _LOCK:
+            _INFLIGHT.pop(key, None)
+        fut.set_result((span_from or "", None))
+        return False
+    return True
+
+
+def get_or_fetch(
+    instrument_key: str,
+    interval: str,
+    from_date: str,
+    max_age_sec: float,
+    fetch: Callable[[], Optional[List[Dict[str, Any]]]],
+    *,
+    span_from: str,
+    span_to: str,
+    wait_timeout_sec: Optional[float] = None,
+    stale_sec: float = 0.0,
+) -> Optional[List[Dict[str, Any]]]:
+    """``get``, and on a miss fetch once per key no matter how many threads miss together.
+
+    ``fetch()`` returns the candles for ``[span_from, span_to]`` (the canonical
+    window); a non-empty result is ``put`` and every caller gets it filtered to its
+    own ``from_date``. Concurrent readers of the same key wait for the leader's
+    fetch and share its outcome: an empty/None result is returned as-is and an
+    exception is re-raised, so a failing key costs one request, not N. A waiter
+    whose window starts before the leader's span, or whose wait times out, falls
+    back to fetching on its own (without registering).
+
+    With ``stale_sec`` > 0 an entry at most that far past ``max_age_sec`` is
+    returned immediately and ``fetch`` runs once in the background instead
+    (``last_read_stale()`` reports it to the caller).
+    """
+    global _coalesced_waits, _saved_requests, _wait_timeouts
+
+    def _own_fetch() -> Optional[List[Dict[str, Any]]]:
+        candles = fetch()
+        return filter_from(candles, from_date) if candles else candles
+
+    _tls.stale = False
+    if not instrument_key or not interval:
+        return _own_fetch()
+    key = (instrument_key, interval)
+    stored, _, stale = _lookup_aged(instrument_key, interval, from_date or "", max_age_sec, stale_sec)
+    if stored is not None:
+        if stale:
+            _tls.stale = True
+            _queue_refresh(key, fetch, span_from, span_to)
+        return _as_dicts(stored, from_date)
+
+    with _LOCK:
+        fut = _INFLIGHT.get(key)
+        leader = fut is None
+        if leader:
+            fut = Future()
+            _INFLIGHT[key] = fut
+        else:
+            _coalesced_waits += 1
+
+    if not leader:
+        timeout = FLIGHT_WAIT_TIMEOUT_SEC if wait_timeout_sec is None else wait_timeout_sec
+        try:
+            shared_from, candles = fut.result(timeout=timeout)
+        except FutureTimeout:
+            with _LOCK:
+                _wait_timeouts += 1
+            return _own_fetch()
+        except Exception:
+            with _LOCK:
+                _saved_requests += 1
+            raise
+        if candles and from_date and shared_from and shared_from > from_date:
+            # Leader fetched a narrower window than this reader needs.
+            return _own_fetch()
+        with _LOCK:
+            _saved_requests += 1
+        return filter_from(candles, from_date) if candles else candles
+
+    candles = _lead_fetch(key, fut, fetch, span_from, span_to)
+    return filter_from(candles, from_date) if candles else candles
+
+
+def _base_signature(base: List[Dict[str, Any]]) -> Tuple[Any, ...]:
+    """Identity of a base series for memoization: span plus the (still forming) tip bar."""
+    tip_ts = tip_timestamp(base)
+    first_ts = min(str(c.get("timestamp") or "") for c in base)
+    tip = next((c for c in base if str(c.get("timestamp") or "") == tip_ts), {})
+    return (
+        len(base),
+        first_ts,
+        tip_ts,
+        tip.get("open"),
+        tip.get("high"),
+        tip.get("low"),
+        tip.get("close"),
+        tip.get("volume"),
+        tip.get("oi"),
+    )
+
+
+def derive(
+    instrument_key: str,
+    interval: str,
+    base: List[Dict[str, Any]],
+    build: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """``build(base)`` for ``interval``, memoized per instrument until the base changes.
+
+    Only the tip bar of an intraday series changes between refreshes (or new bars
+    are appended), so the signature is the span plus the tip bar's values. The
+    memo holds one series per ``(instrument_key, interval)``; callers always get
+    their own row dicts, so mutating a returned bar never touches the memo.
+    """
+    global _derived_hits, _derived_builds
+    if not base:
+        return []
+    sig = _base_signature(base)
+    key = (instrument_key, interval)
+    with _LOCK:
+        hit = _DERIVED.get(key)
+        if hit is not None and hit[0] == sig:
+            _derived_hits += 1
+            return [dict(r) for r in hit[1]]
+    out = build(base)
+    with _LOCK:
+        _derived_builds += 1
+        _DERIVED.pop(key, None)
+        _DERIVED[key] = (sig, [dict(r) for r in out])
+        if len(_DERIVED) > _MAX_ENTRIES:
+            for victim in list(_DERIVED)[: max(1, _MAX_ENTRIES // 10)]:
+                _DERIVED.pop(victim, None)
+    return out
+
+
 def stats() -> Dict[str, Any]:
     """Lightweight introspection for diagnostics/logging."""
     with _LOCK:
         entries = len(_CACHE)
+        inflight = len(_INFLIGHT)
     total = _hits + _misses
     return {
         "entries": entries,
         "hits": _hits,
         "misses": _misses,
         "hit_rate": round(_hits / total, 3) if total else 0.0,
+        "inflight": inflight,
+        "derived_hits": _derived_hits,
+        "derived_builds": _derived_builds,
+        "coalesced_waits": _coalesced_waits,
+        "saved_requests": _saved_requests,
+        "wait_timeouts": _wait_timeouts,
+        "stale_served": _stale_served,
+        "refreshes_queued": _refreshes_queued,
+        "refresh_failures": _refresh_failures,
+        "read_age_sec": read_age_histogram(),
     }
+
+
+def read_age_histogram() -> Dict[str, int]:
+    """Entry ages seen at read time, bucketed by ``READ_AGE_BUCKETS_SEC`` (``"<=60"``, …, ``">1800"``)."""
+    with _LOCK:
+        counts = list(_read_age_counts)
+    labels = [f"<={b:g}" for b in READ_AGE_BUCKETS_SEC] + [f">{READ_AGE_BUCKETS_SEC[-1]:g}"]
+    return dict(zip(labels, counts))
@@ -0,0 +1,284 @@
+"""Compact, array-backed candle series stored by the shared candle cache.
+
+Candles travel through the platform as lists of ``{"timestamp": str, "open": …}``
+dicts: ~400 bytes per bar (dict + six boxed floats + the timestamp string), and
+every reader rebuilds ``highs/lows/closes/volumes`` with ``float(c.get(…))``.
+``CandleSeries`` keeps one bar per column instead:
+
+* ``values`` — float64 ``(6, n)`` C-contiguous block, one row per field
+  (``open, high, low, close, volume, oi``); ``series.close`` etc. are row views.
+  Absent fields are NaN and flagged in ``mask`` (bit ``k`` = ``FIELDS[k]``
+  present) so the dict view reproduces the original keys exactly.
+* ``ts`` — int64 epoch seconds; ``day`` — int32 days since epoch of the
+  timestamp's own (IST) calendar date, i.e. exactly ``timestamp[:10]``.
+* ``text`` — the original timestamp strings (``S`` bytes), returned verbatim.
+
+Slicing (``series[i:j]``, ``since_date``, ``between``) uses binary search on
+monotone series and returns views — no copies. Row order is preserved as given
+(Upstox historical rows arrive newest-first, merged intraday series oldest-first),
+so ``to_dicts()`` is a drop-in for the list it was built from.
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pytz
+
+IST = pytz.timezone("Asia/Kolkata")
+
+FIELDS = ("open", "high", "low", "close", "volume", "oi")
+_FIELD_INDEX = {f: i for i, f in enumerate(FIELDS)}
+_ALL_KEYS = frozenset(FIELDS) | {"timestamp"}
+_IST_OFFSET_SEC = 19800
+_SUFFIX_RE = re.compile(r"^(?:\.\d+)?(Z|[+-]\d\d:?\d\d)?$")
+_offset_cache: Dict[str, int] = {}
+
+
+def _suffix_offset(suffix: str) -> Optional[int]:
+    """UTC offset (seconds) for the part of an ISO timestamp after ``HH:MM:SS``; None if unsupported."""
+    off = _offset_cache.get(suffix)
+    if off is not None:
+        return off
+    m = _SUFFIX_RE.match(suffix)
+    if not m:
+        return None
+    tz = m.group(1)
+    if not tz:
+        off = _IST_OFFSET_SEC  # naive Upstox/IST wall-clock time
+    elif tz == "Z":
+        off = 0
+    else:
+        digits = tz[1:].replace(":", "")
+        off = (int(digits[:2]) * 3600 + int(digits[2:]) * 60) * (1 if tz[0] == "+" else -1)
+    _offset_cache[suffix] = off
+    return off
+
+
+def _parse_timestamps(texts: Sequence[str]) -> "tuple[np.ndarray, np.ndarray]":
+    """(epoch seconds int64, local calendar day int32) for ISO timestamp strings."""
+    n = len(texts)
+    local = np.empty(n, dtype="datetime64[s]")
+    offsets = np.empty(n, dtype=np.int64)
+    for i, t in enumerate(texts):
+        head, tail = t[:19], t[19:]
+        if len(head) == 10:
+            head += "T00:00:00"
+        elif len(head) != 19 or head[10] not in "T ":
+            raise ValueError(f"unsupported candle timestamp {t!r}")
+        off = _suffix_offset(tail)
+        if off is None:
+            dt = datetime.fromisoformat(t.replace("Z", "+00:00"))
+            off = int(dt.utcoffset().total_seconds()) if dt.tzinfo else _IST_OFFSET_SEC
+        local[i] = np.datetime64(head.replace(" ", "T"), "s")
+        offsets[i] = off
+    secs = local.astype(np.int64)
+    return secs - offsets, (secs // 86400).astype(np.int32)
+
+
+def _monotone(a: np.ndarray) -> int:
+    """1 non-decreasing, -1 non-increasing, 0 neither (length < 2 counts as 1)."""
+    if len(a) < 2:
+        return 1
+    if bool(np.all(a[1:] >= a[:-1])):
+        return 1
+    if bool(np.all(a[1:] <= a[:-1])):
+        return -1
+    return 0
+
+
+def _day_number(from_date: str) -> int:
+    return int(np.datetime64(from_date[:10], "D").astype(np.int64))
+
+
+class CandleSeries:
+    """Columnar OHLCV(+OI) series; see module docstring. Immutable by convention."""
+
+    __slots__ = ("ts", "day", "text", "values", "mask", "_day_order", "_text_order")
+
+    def __init__(
+        self,
+        ts: np.ndarray,
+        day: np.ndarray,
+        text: np.ndarray,
+        values: np.ndarray,
+        mask: np.ndarray,
+        *,
+        day_order: Optional[int] = None,
+        text_order: Optional[int] = None,
+    ):
+        self.ts = ts
+        self.day = day
+        self.text = text
+        self.values = values
+        self.mask = mask
+        self._day_order = _monotone(day) if day_order is None else day_order
+        self._text_order = _monotone(text) if text_order is None else text_order
+
+    # --- construction ----------------------------------------------------------
+
+    @classmethod
+    def from_dicts(cls, candles: Sequence[Dict[str, Any]]) -> "CandleSeries":
+        """Build from legacy candle dicts. Raises ValueError for rows it cannot represent
+        losslessly (non-string timestamps, unknown keys, non-numeric values)."""
+        n = len(candles)
+        texts: List[str] = []
+        values = np.full((len(FIELDS), n), np.nan, dtype=np.float64)
+        mask = np.zeros(n, dtype=np.uint8)
+        for i, c in enumerate(candles):
+            ts = c.get("timestamp")
+            if not isinstance(ts, str) or not c.keys() <= _ALL_KEYS:
+                raise ValueError("candle row not representable as CandleSeries")
+            texts.append(ts)
+            bits = 0
+            for k, v in c.items():
+                j = _FIELD_INDEX.get(k)
+                if j is None or v is None:
+                    continue
+                values[j, i] = float(v)
+                bits |= 1 << j
+            mask[i] = bits
+        ts_arr, day = _parse_timestamps(texts)
+        text = np.array([t.encode("ascii") for t in texts], dtype="S") if n else np.empty(0, dtype="S1")
+        return cls(ts_arr, day, text, values, mask)
+
+    # --- legacy (list of dicts) view ------------------------------------------
+
+    def __len__(self) -> int:
+        return int(self.ts.shape[0])
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[Dict[str, Any], "CandleSeries"]:
+        if isinstance(idx, slice):
+            return self._take(idx)
+        return self._row(int(idx))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_dicts())
+
+    def _row(self, i: int) -> Dict[str, Any]:
+        bits = int(self.mask[i])
+        row: Dict[str, Any] = {"timestamp": self.text[i].decode()}
+        for j, f in enumerate(FIELDS):
+            if bits >> j & 1:
+                row[f] = float(self.values[j, i])
+        return row
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """The legacy list-of-dicts form (fresh dicts; same keys/values/order as the source rows)."""
+        n = len(self)
+        if n == 0:
+            return []
+        texts = [t.decode() for t in self.text.tolist()]
+        masks = self.mask
+        m0 = int(masks[0])
+        if bool(np.all(masks == m0)):
+            cols = [j for j in range(len(FIELDS)) if m0 >> j & 1]
+            keys = ["timestamp"] + [FIELDS[j] for j in cols]
+            rows = zip(texts, *(self.values[j].tolist() for j in cols))
+            return [dict(zip(keys, r)) for r in rows]
+        return [self._row(i) for i in range(n)]
+
+    # --- columns -----------------------------------------------------------------
+
+    def column(self, name: str, default: Optional[float] = None) -> np.ndarray:
+        """Field as float64 (a view); with ``default`` missing values are filled (a copy)."""
+        col = self.values[_FIELD_INDEX[name]]
+        if default is None:
+            return col
+        present = (self.mask >> _FIELD_INDEX[name]) & 1
+        if bool(present.all()):
+            return col
+        return np.where(present.astype(bool), col, float(default))
+
+    @property
+    def open(self) -> np.ndarray:
+        return self.values[0]
+
+    @property
+    def high(self) -> np.ndarray:
+        return self.values[1]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self.values[2]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.values[3]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.values[4]
+
+    @property
+    def oi(self) -> np.ndarray:
+        return self.values[5]
+
+    def ist_day(self) -> np.ndarray:
+        """IST calendar day (days since epoch) of each bar, from the epoch timestamps."""
+        return (self.ts + _IST_OFFSET_SEC) // 86400
+
+    def last_closed_index(self, now: datetime, bar_seconds: int) -> int:
+        """Index of the last bar with ``start + bar_seconds <= now`` in an oldest-first series, or -1."""
+        cutoff = int(now.timestamp()) - int(bar_seconds)
+        return int(np.searchsorted(self.ts, cutoff, side="right")) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.ts.nbytes + self.day.nbytes + self.text.nbytes + self.values.nbytes + self.mask.nbytes)
+
+    # --- slicing -----------------------------------------------------------------
+
+    def _take(self, idx: Union[slice, np.ndarray]) -> "CandleSeries":
+        view = isinstance(idx, slice)
+        return CandleSeries(
+            self.ts[idx],
+            self.day[idx],
+            self.text[idx],
+            self.values[:, idx],
+            self.mask[idx],
+            day_order=self._day_order if view and (idx.step or 1) > 0 else None,
+            text_order=self._text_order if view and (idx.step or 1) > 0 else None,
+        )
+
+    def since_date(self, from_date: str) -> "CandleSeries":
+        """Rows whose ``timestamp[:10] >= from_date`` (``candle_cache.filter_from``), order kept.
+
+        A view for monotone series (binary search); a copy only for unsorted input.
+        """
+        if not from_date or len(self) == 0:
+            return self
+        d = _day_number(from_date)
+        if self._day_order == 1:
+            return self._take(slice(int(np.searchsorted(self.day, d, side="left")), None))
+        if self._day_order == -1:
+            keep = len(self) - int(np.searchsorted(self.day[::-1], d, side="left"))
+            return self._take(slice(0, keep))
+        return self._take(np.flatnonzero(self.day >= d))
+
+    def between(self, start_epoch: Optional[int] = None, end_epoch: Optional[int] = None) -> "CandleSeries":
+        """Rows with ``start_epoch <= ts < end_epoch`` of an oldest-first series (a view)."""
+        s = self.sorted()
+        lo = 0 if start_epoch is None else int(np.searchsorted(s.ts, start_epoch, side="left"))
+        hi = len(s) if end_epoch is None else int(np.searchsorted(s.ts, end_epoch, side="left"))
+        return s._take(slice(lo, max(lo, hi)))
+
+    def sorted(self) -> "CandleSeries":
+        """Oldest-first by timestamp string, like ``sorted(candles, key=timestamp)`` (stable)."""
+        if self._text_order == 1:
+            return self
+        if len(self) > 1 and bool(np.all(self.text[1:] < self.text[:-1])):
+            return self._take(slice(None, None, -1))
+        return self._take(np.argsort(self.text, kind="stable"))
+
+    def tip_timestamp(self) -> str:
+        """Lexicographically latest timestamp string (``candle_cache.tip_timestamp``)."""
+        if len(self) == 0:
+            return ""
+        if self._text_order == 1:
+            return self.text[-1].decode()
+        if self._text_order == -1:
+            return self.text[0].decode()
+        return max(self.text.tolist()).decode()
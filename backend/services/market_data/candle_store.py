@@ -0,0 +1,520 @@
+"""On-disk historical candle store shared by every backtest.
+
+Backtests used to keep their own candle persistence (``data/candles`` JSON for
+HA Momentum, per-instrument JSON for Volume Mismatch / Open-Low, ``backtest_data``
+for the futures backtester) or re-fetched through Upstox on every run, so the
+same instrument/session was downloaded and parsed many times. ``CandleStore``
+keeps one copy:
+
+* Partitioned ``<root>/<interval>/<instrument>/<YYYY-MM>.npz``. Each partition is
+  an uncompressed NPZ of ``CandleSeries`` columns (``ts``, ``day``, ``text``,
+  ``values``, ``mask``) sorted by time, plus ``sessions`` — the IST session days
+  already fetched for that month (a fetched session with no bars, e.g. before a
+  contract listed, is recorded too so it is not asked for again).
+* Reads memory-map the partition once and view the NPZ members in place (stored
+  zip entries are plain ``.npy`` blobs), so a backtest touching one month of one
+  instrument pages in only that file; a single-month read is a zero-copy
+  ``CandleSeries`` view.
+* Writes are append-only merges: new rows are added (a refetched bar replaces
+  the stored bar with the same timestamp), the partition is rewritten to a temp
+  file and ``os.replace``d, so readers never see a half-written file.
+* Gap detection: ``missing_sessions`` compares stored sessions with the NSE
+  trading calendar up to the last completed session. ``plan_fetches`` turns the
+  gaps into the fewest Upstox windows that respect the per-request span cap;
+  ``ensure`` fetches only those and stores them.
+
+``historical_candles`` is the drop-in used by backtest packages in place of
+``UpstoxService.get_historical_candles_by_instrument_key(..., range_end_date=…)``:
+same window (span clamp included), served from the store; live / today-anchored
+calls still go straight to Upstox. ``stored_candles`` does the same for callers
+with their own range fetcher (V2 1m per session, 15m built from 1m).
+``backend/scripts/prefill_candle_store.py`` fills a universe ahead of a run.
+"""
+from __future__ import annotations
+
+import ast
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pytz
+
+from backend.services.market_data.candle_series import FIELDS, CandleSeries
+
+logger = logging.getLogger(__name__)
+IST = pytz.timezone("Asia/Kolkata")
+
+# fetch(instrument_key, interval, from_d, to_d) -> candles covering [from_d, to_d]; None on failure.
+RangeFetcher = Callable[[str, str, date, date], Optional[List[Dict[str, Any]]]]
+
+SESSION_CLOSE = dt_time(15, 30)
+# Span per request for intervals Upstox does not cap (days/weeks/months: a decade).
+UNCAPPED_SPAN_DAYS = 3650
+_OPEN_PARTITIONS_MAX = 256
+_EPOCH = date(1970, 1, 1)
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def _day_no(d: date) -> int:
+    return (d - _EPOCH).days
+
+
+def _day_date(n: int) -> date:
+    return _EPOCH + timedelta(days=int(n))
+
+
+def _month_of_days(days: np.ndarray) -> np.ndarray:
+    return np.datetime_as_string(np.asarray(days, dtype=np.int64).astype("datetime64[D]"), unit="M")
+
+
+def interval_slug(interval: str) -> str:
+    return (interval or "").strip().lower().replace("/", "_")
+
+
+def instrument_slug(instrument_key: str) -> str:
+    """``NSE_FO|12345`` -> ``NSE_FO__12345``; other unsafe characters become ``~HH``."""
+    ik = (instrument_key or "").strip().replace("|", "__")
+    return _UNSAFE_RE.sub(lambda m: "~%02X" % ord(m.group()), ik)
+
+
+def span_cap_days(interval: str) -> int:
+    from backend.services.upstox_service import _upstox_v3_max_calendar_span_days
+
+    return _upstox_v3_max_calendar_span_days(interval) or UNCAPPED_SPAN_DAYS
+
+
+def default_store_dir() -> Path:
+    """``CANDLE_STORE_DIR``, else ``data/candle_store`` (the bind-mounted data dir on EC2)."""
+    from backend.config import settings
+
+    configured = str(getattr(settings, "CANDLE_STORE_DIR", "") or "").strip()
+    if configured:
+        return Path(configured)
+    ec2 = Path("/home/ubuntu/trademanthan/data")
+    if ec2.is_dir():
+        return ec2 / "candle_store"
+    return Path(__file__).resolve().parents[3] / "data" / "candle_store"
+
+
+# --- NPZ partitions -------------------------------------------------------------
+
+
+def _mmap_npz(path: Path) -> Dict[str, np.ndarray]:
+    """Members of an NPZ as read-only views of one ``mmap`` of the file (copies only for compressed members)."""
+    out: Dict[str, np.ndarray] = {}
+    with open(path, "rb") as fh, zipfile.ZipFile(fh) as zf:
+        infos = zf.infolist()
+        if not infos:
+            return out
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        for info in infos:
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as member:
+                    out[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+            name_len, extra_len = struct.unpack_from("<HH", mm, info.header_offset + 26)
+            pos = info.header_offset + 30 + name_len + extra_len
+            if mm[pos : pos + 6] != b"\x93NUMPY":
+                raise ValueError(f"{name} in {path} is not an npy member")
+            major = mm[pos + 6]
+            if major == 1:
+                (hlen,), pos = struct.unpack_from("<H", mm, pos + 8), pos + 10
+            else:
+                (hlen,), pos = struct.unpack_from("<I", mm, pos + 8), pos + 12
+            header = ast.literal_eval(mm[pos : pos + hlen].decode("latin1"))
+            dtype = np.dtype(header["descr"])
+            if dtype.hasobject:
+                raise ValueError(f"object array {name} in {path}")
+            shape = tuple(header["shape"])
+            count = int(np.prod(shape))
+            arr = np.frombuffer(mm, dtype=dtype, count=count, offset=pos + hlen) if count else np.empty(0, dtype)
+            out[name] = arr.reshape(shape, order="F" if header["fortran_order"] else "C")
+    return out
+
+
+def _write_npz(path: Path, arrays: Dict[str, np.ndarray]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _series_of(part: Dict[str, np.ndarray]) -> CandleSeries:
+    return CandleSeries(part["ts"], part["day"], part["text"], part["values"], part["mask"], day_order=1)
+
+
+def _empty_series() -> CandleSeries:
+    return CandleSeries.from_dicts([])
+
+
+def _concat(series: Sequence[CandleSeries]) -> CandleSeries:
+    if not series:
+        return _empty_series()
+    if len(series) == 1:
+        return series[0]
+    return CandleSeries(
+        np.concatenate([s.ts for s in series]),
+        np.concatenate([s.day for s in series]),
+        np.concatenate([s.text for s in series]),
+        np.concatenate([s.values for s in series], axis=1),
+        np.concatenate([s.mask for s in series]),
+        day_order=1,
+    )
+
+
+def _normalize(candles: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows reduced to ``timestamp`` + numeric ``FIELDS`` (anything else is not stored)."""
+    rows: List[Dict[str, Any]] = []
+    for c in candles or []:
+        if not isinstance(c, dict):
+            continue
+        ts = c.get("timestamp")
+        if not isinstance(ts, str) or len(ts) < 10:
+            continue
+        row: Dict[str, Any] = {"timestamp": ts}
+        for f in FIELDS:
+            v = c.get(f)
+            if v is None:
+                continue
+            try:
+                row[f] = float(v)
+            except (TypeError, ValueError):
+                continue
+        rows.append(row)
+    return rows
+
+
+def _merge_partition(
+    old: Optional[Dict[str, np.ndarray]], fresh: Optional[CandleSeries], sessions: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Stored rows + fresh rows sorted by time; on equal timestamps the fresh row wins."""
+    parts = ([_series_of(old)] if old is not None else []) + ([fresh] if fresh is not None and len(fresh) else [])
+    merged = _concat(parts)
+    order = np.argsort(merged.ts, kind="stable")
+    ts = merged.ts[order]
+    keep = np.ones(len(ts), dtype=bool)
+    keep[:-1] = ts[1:] != ts[:-1]  # last of each equal-ts run = latest write
+    idx = order[keep]
+    old_sessions = old["sessions"] if old is not None else np.empty(0, dtype=np.int32)
+    return {
+        "ts": np.ascontiguousarray(merged.ts[idx]),
+        "day": np.ascontiguousarray(merged.day[idx]),
+        "text": np.ascontiguousarray(merged.text[idx]),
+        "values": np.ascontiguousarray(merged.values[:, idx]),
+        "mask": np.ascontiguousarray(merged.mask[idx]),
+        "sessions": np.union1d(old_sessions, sessions).astype(np.int32),
+    }
+
+
+# --- store ----------------------------------------------------------------------
+
+
+class CandleStore:
+    """Partitioned columnar candle store; see module docstring. Thread-safe within a process."""
+
+    def __init__(self, root: Optional[Path] = None, *, calendar: Any = None):
+        self.root = Path(root) if root is not None else default_store_dir()
+        self._calendar = calendar
+        self._lock = threading.Lock()
+        self._series_locks: Dict[Tuple[str, str], threading.RLock] = {}
+        self._open: "OrderedDict[Path, Tuple[Tuple[int, int], Dict[str, np.ndarray]]]" = OrderedDict()
+        self.stats: Dict[str, int] = {
+            "partitions_read": 0,
+            "partitions_written": 0,
+            "store_hits": 0,
+            "fetches": 0,
+            "fetch_failures": 0,
+            "sessions_fetched": 0,
+        }
+
+    @property
+    def calendar(self) -> Any:
+        if self._calendar is None:
+            from backend.services.trading_calendar import get_trading_calendar
+
+            self._calendar = get_trading_calendar()
+        return self._calendar
+
+    def _series_lock(self, instrument_key: str, interval: str) -> threading.RLock:
+        key = (instrument_key, interval)
+        with self._lock:
+            lk = self._series_locks.get(key)
+            if lk is None:
+                lk = self._series_locks[key] = threading.RLock()
+            return lk
+
+    def _bump(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += n
+
+    # --- layout ---
+
+    def series_dir(self, instrument_key: str, interval: str) -> Path:
+        return self.root / interval_slug(interval) / instrument_slug(instrument_key)
+
+    def partition_path(self, instrument_key: str, interval: str, month: str) -> Path:
+        return self.series_dir(instrument_key, interval) / f"{month}.npz"
+
+    def _partition_paths(
+        self, instrument_key: str, interval: str, from_d: Optional[date], to_d: Optional[date]
+    ) -> List[Path]:
+        d = self.series_dir(instrument_key, interval)
+        if not d.is_dir():
+            return []
+        lo = from_d.strftime("%Y-%m") if from_d else ""
+        hi = to_d.strftime("%Y-%m") if to_d else "9999-99"
+        return [p for p in sorted(d.glob("*.npz")) if lo <= p.stem <= hi]
+
+    def _load(self, path: Path) -> Optional[Dict[str, np.ndarray]]:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        sig = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            hit = self._open.get(path)
+            if hit is not None and hit[0] == sig:
+                self._open.move_to_end(path)
+                return hit[1]
+        try:
+            arrays = _mmap_npz(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            logger.warning("candle_store: unreadable partition %s: %s", path, e)
+            return None
+        with self._lock:
+            self._open[path] = (sig, arrays)
+            self._open.move_to_end(path)
+            while len(self._open) > _OPEN_PARTITIONS_MAX:
+                self._open.popitem(last=False)
+            self.stats["partitions_read"] += 1
+        return arrays
+
+    # --- reads ---
+
+    def read(
+        self, instrument_key: str, interval: str, from_d: Optional[date] = None, to_d: Optional[date] = None
+    ) -> CandleSeries:
+        """Stored bars with IST session day in ``[from_d, to_d]``, oldest first (views when one month)."""
+        parts = [self._load(p) for p in self._partition_paths(instrument_key, interval, from_d, to_d)]
+        s = _concat([_series_of(p) for p in parts if p is not None])
+        if not len(s):
+            return s
+        lo = int(np.searchsorted(s.day, _day_no(from_d), side="left")) if from_d else 0
+        hi = int(np.searchsorted(s.day, _day_no(to_d), side="right")) if to_d else len(s)
+        return s if (lo, hi) == (0, len(s)) else s[lo:max(lo, hi)]
+
+    def candles(self, instrument_key: str, interval: str, from_d: date, to_d: date) -> List[Dict[str, Any]]:
+        return self.read(instrument_key, interval, from_d, to_d).to_dicts()
+
+    def covered_sessions(self, instrument_key: str, interval: str, from_d: date, to_d: date) -> List[date]:
+        days: List[int] = []
+        for p in self._partition_paths(instrument_key, interval, from_d, to_d):
+            part = self._load(p)
+            if part is not None:
+                days.extend(int(x) for x in part["sessions"])
+        lo, hi = _day_no(from_d), _day_no(to_d)
+        return [_day_date(x) for x in days if lo <= x <= hi]
+
+    # --- gaps / planning ---
+
+    def last_complete_session(self, now: Optional[datetime] = None) -> date:
+        """Latest session whose bars are final (today only after the 15:30 close)."""
+        if now is None:
+            now = datetime.now(IST)
+        now = IST.localize(now) if now.tzinfo is None else now.astimezone(IST)
+        return self.calendar.previous_trading_day(now.date(), include_self=now.time() >= SESSION_CLOSE)
+
+    def missing_sessions(
+        self, instrument_key: str, interval: str, from_d: date, to_d: date, *, now: Optional[datetime] = None
+    ) -> List[date]:
+        """Trading sessions in ``[from_d, to_d]`` (up to the last completed one) not yet stored."""
+        to_d = min(to_d, self.last_complete_session(now))
+        if to_d < from_d:
+            return []
+        have = {_day_no(d) for d in self.covered_sessions(instrument_key, interval, from_d, to_d)}
+        return [d for d in self.calendar.trading_days(from_d, to_d) if _day_no(d) not in have]
+
+    def plan_fetches(
+        self,
+        missing: Sequence[date],
+        interval: str,
+        *,
+        bridge_sessions: int = 0,
+        max_span_days: Optional[int] = None,
+    ) -> List[Tuple[date, date]]:
+        """
+        Fewest ``(from, to)`` windows covering ``missing`` within the Upstox span cap.
+
+        Consecutive missing sessions (holidays/weekends in between don't count) share
+        a window; two runs separated by at most ``bridge_sessions`` stored sessions
+        are joined too, trading a small re-download for one request fewer.
+        """
+        days = sorted(set(missing))
+        if not days:
+            return []
+        cap = max_span_days or span_cap_days(interval)
+        plans: List[Tuple[date, date]] = []
+        start = prev = days[0]
+        for d in days[1:]:
+            stored_between = self.calendar.trading_days_between(prev + timedelta(days=1), d - timedelta(days=1))
+            if stored_between <= bridge_sessions and (d - start).days <= cap:
+                prev = d
+                continue
+            plans.append((start, prev))
+            start = prev = d
+        plans.append((start, prev))
+        return plans
+
+    # --- writes ---
+
+    def append(
+        self,
+        instrument_key: str,
+        interval: str,
+        candles: Iterable[Dict[str, Any]],
+        sessions: Iterable[date] = (),
+    ) -> int:
+        """Merge ``candles`` into their month partitions and mark ``sessions`` fetched. Returns rows stored."""
+        rows = _normalize(candles)
+        try:
+            fresh = CandleSeries.from_dicts(rows) if rows else None
+        except ValueError as e:
+            logger.warning("candle_store: unparseable candles for %s %s: %s", instrument_key, interval, e)
+            return 0
+        session_days = np.array(sorted({_day_no(d) for d in sessions}), dtype=np.int32)
+        row_months = _month_of_days(fresh.day) if fresh is not None else np.empty(0, dtype="U7")
+        session_months = _month_of_days(session_days)
+        months = sorted(set(row_months.tolist()) | set(session_months.tolist()))
+        with self._series_lock(instrument_key, interval):
+            for month in months:
+                path = self.partition_path(instrument_key, interval, month)
+                in_month = np.flatnonzero(row_months == month)
+                part = fresh._take(in_month) if fresh is not None and len(in_month) else None
+                merged = _merge_partition(self._load(path), part, session_days[session_months == month])
+                _write_npz(path, merged)
+                self._bump("partitions_written")
+        return len(rows)
+
+    def ensure(
+        self,
+        instrument_key: str,
+        interval: str,
+        from_d: date,
+        to_d: date,
+        fetch: RangeFetcher,
+        *,
+        bridge_sessions: int = 0,
+        now: Optional[datetime] = None,
+    ) -> Tuple[CandleSeries, bool]:
+        """Fetch the missing sessions of ``[from_d, to_d]`` and return the stored range (``ok`` False if a fetch failed)."""
+        ok = True
+        with self._series_lock(instrument_key, interval):
+            missing = self.missing_sessions(instrument_key, interval, from_d, to_d, now=now)
+            if not missing:
+                self._bump("store_hits")
+            last = self.last_complete_session(now)
+            for a, b in self.plan_fetches(missing, interval, bridge_sessions=bridge_sessions):
+                self._bump("fetches")
+                got = fetch(instrument_key, interval, a, b)
+                if got is None:
+                    ok = False
+                    self._bump("fetch_failures")
+                    logger.debug("candle_store: fetch failed %s %s %s..%s", instrument_key, interval, a, b)
+                    continue
+                sessions = self.calendar.trading_days(a, min(b, last))
+                self.append(instrument_key, interval, got, sessions)
+                self._bump("sessions_fetched", len(sessions))
+        return self.read(instrument_key, interval, from_d, to_d), ok
+
+
+def upstox_range_fetcher(upstox: Any) -> RangeFetcher:
+    """``RangeFetcher`` over ``UpstoxService.get_historical_candles_by_instrument_key`` (None on API failure)."""
+
+    def fetch(instrument_key: str, interval: str, from_d: date, to_d: date) -> Optional[List[Dict[str, Any]]]:
+        return upstox.get_historical_candles_by_instrument_key(
+            instrument_key, interval=interval, days_back=(to_d - from_d).days, range_end_date=to_d
+        )
+
+    return fetch
+
+
+_store: Optional[CandleStore] = None
+_store_lock = threading.Lock()
+
+
+def get_candle_store() -> CandleStore:
+    """Process-wide store at ``default_store_dir()``."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CandleStore()
+    return _store
+
+
+def store_enabled() -> bool:
+    from backend.config import settings
+
+    return bool(getattr(settings, "CANDLE_STORE_ENABLED", True))
+
+
+def stored_candles(
+    instrument_key: str, interval: str, from_d: date, to_d: date, fetch: RangeFetcher
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Bars for ``[from_d, to_d]`` through the store, oldest first; None if a gap fetch failed.
+
+    Ranges reaching a session that is still trading (and store errors) call ``fetch`` directly.
+    """
+    if store_enabled():
+        try:
+            store = get_candle_store()
+            if to_d <= store.last_complete_session():
+                series, ok = store.ensure(instrument_key, interval, from_d, to_d, fetch)
+                return series.to_dicts() if ok else None
+        except Exception as e:
+            logger.warning("candle_store: %s %s via store failed, fetching directly: %s", instrument_key, interval, e)
+    return fetch(instrument_key, interval, from_d, to_d)
+
+
+def historical_candles(
+    upstox: Any,
+    instrument_key: str,
+    interval: str,
+    days_back: int,
+    *,
+    range_end_date: Optional[date] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Drop-in for ``upstox.get_historical_candles_by_instrument_key(ik, interval, days_back, range_end_date=…)``.
+
+    Same window (Upstox span clamp included) served by ``stored_candles``; live calls
+    without an end date go straight to Upstox.
+    """
+    if range_end_date is None:
+        return upstox.get_historical_candles_by_instrument_key(
+            instrument_key, interval=interval, days_back=days_back
+        )
+    eff_days = min(max(0, int(days_back)), span_cap_days(interval))
+    return stored_candles(
+        instrument_key,
+        interval,
+        range_end_date - timedelta(days=eff_days),
+        range_end_date,
+        upstox_range_fetcher(upstox),
+    )
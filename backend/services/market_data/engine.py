@@ -14,6 +14,7 @@ from __future__ import annotations
 
 import logging
 import threading
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
@@ -21,6 +22,7 @@ from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 import pytz
 
 from backend.config import settings
+from backend.services.market_data import candle_cache
 from backend.services.market_data.constants import (
     BATCH_QUOTE_CHUNK,
     CANDLE_DAYS_BACK,
@@ -36,6 +38,7 @@ from backend.services.market_data.indicators import indicators_from_5m_candles
 from backend.services.market_data.repository import bulk_update_market_data, load_universe_rows
 from backend.services.market_data.schema import ensure_market_data_columns
 from backend.services.upstox_rate_limiter import (
+    background_candle_worker,
     candle_warm_execution,
     is_scheduled_warm_execution,
     scheduled_candle_worker,
@@ -171,7 +174,7 @@ def _ensure_ws_universe(rows: List[Dict[str, Any]]) -> None:
 
         keys = _collect_all_instrument_keys(rows)
         # Cap matches prior behavior; full FO universe is typically ~600 keys.
-        ensure_market_feed_running(keys[:2000])
+        ensure_market_feed_running(keys[:2000], consumer="market_data")
     except Exception:
         pass
 
@@ -183,10 +186,12 @@ def _fetch_5m_indicators(upstox: Any, instrument_key: str) -> Optional[Dict[str,
         # Candles are shared automatically via the transparent cache inside
         # get_historical_candles_by_instrument_key, so in-process consumers
         # (e.g. the Relative Strength Scanner) reuse them with no extra fetch.
+        # Persisted indicators must come from fresh bars: strict TTL, no SWR.
         candles = upstox.get_historical_candles_by_instrument_key(
             instrument_key,
             interval=CANDLE_INTERVAL,
             days_back=CANDLE_DAYS_BACK,
+            cache_max_age_sec=float(getattr(settings, "UPSTOX_CANDLE_CACHE_TTL_INTRADAY_SEC", 150)),
         )
         return indicators_from_5m_candles(candles or [])
     except Exception as e:
@@ -428,6 +433,85 @@ def refresh_curr_month_aux_candles(
     return summary
 
 
+def _last_bar_close_epoch(now: datetime, bar_minutes: int = 5) -> float:
+    """Epoch seconds of the most recent ``bar_minutes`` boundary at or before ``now``."""
+    floored = now.replace(minute=now.minute - now.minute % bar_minutes, second=0, microsecond=0)
+    return floored.timestamp()
+
+
+def prefetch_curr_month_5m_candles(
+    *,
+    execution: str = "prefetch_5m",
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Refresh the curr-month 5m series into shared candle_cache right after a bar close.
+
+    Keys whose cache entry was stored after the last 5m boundary (another job
+    already fetched the new bar) are skipped; the rest are refetched with
+    ``cache_max_age_sec`` = seconds since the boundary, so the shared 1m base is
+    refreshed too. Runs at background rate-limit priority and stands aside while
+    a scheduled warm holds the candle budget. Nothing is persisted — scanners and
+    signal jobs read the warm cache.
+    """
+    started = now or _now_ist()
+    t0 = time.monotonic()
+    with _ACTIVE_WARM_LOCK:
+        active = sorted(_ACTIVE_WARM_EXECUTIONS)
+    if active:
+        return {"success": True, "execution": execution, "skipped": "warm_active", "active": active}
+
+    rows = load_universe_rows()
+    keys = _collect_instrument_keys_for_legs(rows, DEFAULT_CANDLE_LEGS)
+    bar_close = _last_bar_close_epoch(started)
+    due = [ik for ik in keys if (candle_cache.fetched_at(ik, CANDLE_INTERVAL) or 0.0) < bar_close]
+    summary: Dict[str, Any] = {
+        "success": True,
+        "execution": execution,
+        "bar_close_ist": datetime.fromtimestamp(bar_close, IST).strftime("%H:%M"),
+        "keys": len(keys),
+        "already_fresh": len(keys) - len(due),
+        "refreshed": 0,
+        "errors": 0,
+    }
+    if not due:
+        return summary
+
+    try:
+        from backend.services.upstox_service import UpstoxService
+
+        upstox = UpstoxService(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET)
+    except Exception as e:
+        return {**summary, "success": False, "error": str(e)}
+    if not getattr(upstox, "access_token", None):
+        return {**summary, "success": False, "error": "upstox_not_connected"}
+
+    def _one(ik: str) -> bool:
+        with background_candle_worker():
+            try:
+                bars = upstox.get_historical_candles_by_instrument_key(
+                    ik,
+                    interval=CANDLE_INTERVAL,
+                    days_back=CANDLE_DAYS_BACK,
+                    cache_max_age_sec=max(0.0, time.time() - bar_close),
+                )
+            except Exception:
+                return False
+        return bool(bars) and (candle_cache.fetched_at(ik, CANDLE_INTERVAL) or 0.0) >= bar_close
+
+    cache_before = candle_cache.stats()
+    with ThreadPoolExecutor(max_workers=CANDLE_FETCH_WORKERS) as pool:
+        for ok in pool.map(_one, due):
+            summary["refreshed" if ok else "errors"] += 1
+    cache_after = candle_cache.stats()
+    summary["candle_cache"] = {
+        k: cache_after[k] - cache_before.get(k, 0) for k in ("hits", "misses", "coalesced_waits", "saved_requests")
+    }
+    summary["elapsed_sec"] = round(time.monotonic() - t0, 2)
+    logger.info("market_data 5m prefetch: %s", summary)
+    return summary
+
+
 def refresh_arbitrage_master_market_data(
     *,
     execution: str = "scheduled",
@@ -448,6 +532,7 @@ def refresh_arbitrage_master_market_data(
     ensure_market_data_columns()
     started = _now_ist()
     started_at_ist = started.strftime("%Y-%m-%d %H:%M:%S")
+    cache_before = candle_cache.stats()
     rows = load_universe_rows()
     if stocks:
         want = {str(s or "").strip().upper() for s in stocks if str(s or "").strip()}
@@ -669,6 +754,13 @@ def refresh_arbitrage_master_market_data(
     except Exception:
         rl_stats = {}
 
+    cache_after = candle_cache.stats()
+    cache_stats = {
+        k: cache_after[k] - cache_before.get(k, 0)
+        for k in ("hits", "misses", "coalesced_waits", "saved_requests", "wait_timeouts", "stale_served")
+    }
+    cache_stats["read_age_sec"] = cache_after["read_age_sec"]
+
     summary = {
         "success": True,
         "execution": execution,
@@ -686,6 +778,7 @@ def refresh_arbitrage_master_market_data(
         "candle_denied_symbols": denied_symbols,
         "candle_denied_by_stock": denied_by_stock,
         "candle_rl": rl_stats,
+        "candle_cache": cache_stats,
         "symbol_rotate_offset": rotate_offset,
         "concurrent_job_overlap_detected": overlap_detected,
         "overlapping_with": overlapping_with,
@@ -5,6 +5,7 @@ import logging
 from typing import Optional
 
 from backend.services.market_data.engine import (
+    prefetch_curr_month_5m_candles,
     refresh_arbitrage_master_market_data,
     refresh_curr_month_aux_candles,
     refresh_stock_next_ltp_from_ws,
@@ -87,3 +88,17 @@ def run_curr_month_aux_candle_warm_job() -> dict:
         execution="scheduled_aux_0905",
         intervals=[("days/1", 45)],
     )
+
+
+def run_candle_prefetch_5m_job() -> dict:
+    """
+    Curr-month 5m candles into shared candle_cache shortly after each 5m bar close.
+
+    Keeps scanners/signal jobs on warm data between the 10m warms; low
+    rate-limit priority, skipped while a scheduled warm runs.
+    """
+    skipped = _scheduler_window_ok()
+    if skipped is not None:
+        return skipped
+
+    return prefetch_curr_month_5m_candles(execution="prefetch_5m")
@@ -29,6 +29,7 @@ from typing import Any, Dict, List, Optional, Tuple
 import pytz
 
 from backend.config import get_instruments_file_path, settings
+from backend.services.instrument_master import get_instrument_master
 from backend.services.upstox_service import UpstoxService
 
 logger = logging.getLogger(__name__)
@@ -276,6 +277,10 @@ def _load_instruments() -> List[Dict[str, Any]]:
     if not path.is_file():
         logger.warning("nks_intraday_backtest: instruments file missing: %s", path)
         return []
+    master = get_instrument_master(path)
+    if master is not None:
+        # Only FUT and EQ rows are indexed below; skip decoding the option chain.
+        return master.by_segment("NSE_FO", "FUT") + master.by_segment("NSE_EQ", "EQ")
     with open(path, encoding="utf-8") as f:
         data = json.load(f)
     return data if isinstance(data, list) else []
@@ -668,11 +673,13 @@ def _session_vwap_upto(
 def fetch_intraday_1m_candles(
     upstox: UpstoxService, instrument_key: str, session_date: date
 ) -> Optional[List[Dict[str, Any]]]:
-    """Fetch 1-minute candles for the given session date via Upstox V2 API."""
-    day_str = session_date.strftime("%Y-%m-%d")
-    return upstox._fetch_historical_v2_candles(
-        instrument_key, "1minute", day_str, day_str
-    )
+    """Fetch 1-minute candles for the given session date via Upstox V2 API (through the candle store)."""
+    from backend.services.market_data.candle_store import stored_candles
+
+    def _v2(ik: str, _interval: str, from_d: date, to_d: date) -> Optional[List[Dict[str, Any]]]:
+        return upstox._fetch_historical_v2_candles(ik, "1minute", to_d.isoformat(), from_d.isoformat())
+
+    return stored_candles(instrument_key, "minutes/1", session_date, session_date, _v2)
 
 
 def _find_next_trading_day_with_candles(
@@ -23,6 +23,7 @@ from sqlalchemy.exc import OperationalError, ProgrammingError
 from backend.config import settings
 from backend.database import SessionLocal
 from backend.services.market_holiday import should_skip_scheduled_market_jobs_ist
+from backend.services.replay_engine import bulk_insert
 
 logger = logging.getLogger(__name__)
 
@@ -223,6 +224,45 @@ def load_nse_instruments_json() -> List[Dict[str, Any]]:
         return []
 
 
+def load_nse_instrument_rows(segment: str, instrument_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Rows for one segment (and optional instrument_type) via the indexed instrument master."""
+    from backend.services.instrument_master import get_instrument_master
+
+    master = get_instrument_master(_instruments_path())
+    if master is not None:
+        return master.by_segment(segment, instrument_type)
+    it = (instrument_type or "").upper()
+    return [
+        r
+        for r in load_nse_instruments_json()
+        if isinstance(r, dict)
+        and r.get("segment") == segment
+        and (not it or str(r.get("instrument_type") or "").upper() == it)
+    ]
+
+
+def load_nse_instruments_by_key(keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """``{instrument_key: row}`` for just ``keys`` (missing keys are omitted)."""
+    from backend.services.instrument_master import get_instrument_master
+
+    master = get_instrument_master(_instruments_path())
+    if master is None:
+        want = {(k or "").strip() for k in keys}
+        return {
+            ik: r
+            for r in load_nse_instruments_json()
+            if isinstance(r, dict) and (ik := (r.get("instrument_key") or "").strip()) in want
+        }
+    out: Dict[str, Dict[str, Any]] = {}
+    for k in keys:
+        ik = (k or "").strip()
+        if ik and ik not in out:
+            row = master.get(ik)
+            if row is not None:
+                out[ik] = row
+    return out
+
+
 def _expiry_sort_key(inst: Dict[str, Any]) -> int:
     ex = inst.get("expiry")
     try:
@@ -271,8 +311,7 @@ def build_liquidity_universe_instrument_keys(top_n: int) -> List[str]:
     """
     After filtering + one contract per underlying, batch-quote all keys and keep top ``top_n`` by volume.
     """
-    raw = load_nse_instruments_json()
-    fut_rows = filter_stock_futures_rows(raw)
+    fut_rows = filter_stock_futures_rows(load_nse_instrument_rows("NSE_FO", "FUT"))
     per_u = pick_nearest_expiry_future_per_underlying(fut_rows)
     keys = [(r.get("instrument_key") or "").strip() for r in per_u if (r.get("instrument_key") or "").strip()]
     if not keys:
@@ -569,14 +608,13 @@ def refresh_oi_heatmap_live() -> Dict[str, Any]:
                 get_ws_quote_for_instrument,
             )
 
-            ensure_market_feed_running(keys)
+            ensure_market_feed_running(keys, consumer="oi_heatmap")
             _feed_get_ws = get_ws_quote_for_instrument
         except Exception as e:
             logger.warning("oi_heatmap: market feed start skipped: %s", e)
 
     # Reload instrument meta for underlying / symbol labels
-    raw = load_nse_instruments_json()
-    ik_meta = {((r.get("instrument_key") or "").strip()): r for r in raw if isinstance(r, dict)}
+    ik_meta = load_nse_instruments_by_key(keys)
 
     ws_session_volumes = _load_ws_session_volumes(keys)
     rows: List[Dict[str, Any]] = []
@@ -672,23 +710,33 @@ def refresh_oi_heatmap_live() -> Dict[str, Any]:
     return {"success": True, "count": len(rows), "updated_at": now_iso}
 
 
+_SNAPSHOT_COLS = (
+    "rank",
+    "instrument_key",
+    "underlying_symbol",
+    "trading_symbol",
+    "expiry",
+    "ltp",
+    "chg_pct",
+    "oi",
+    "oi_chg",
+    "oi_chg_pct",
+    "oi_signal",
+    "volume",
+    "score",
+    "updated_at",
+)
+
+
 def _persist_snapshot(rows: List[Dict[str, Any]], updated_at: datetime) -> None:
     db = None
     try:
         db = SessionLocal()
-        for r in rows:
-            db.execute(
-                text(
-                    """
-                    INSERT INTO oi_heatmap_latest (
-                        rank, instrument_key, underlying_symbol, trading_symbol, expiry,
-                        ltp, chg_pct, oi, oi_chg, oi_chg_pct, oi_signal, volume, score, updated_at
-                    ) VALUES (
-                        :rank, :instrument_key, :underlying_symbol, :trading_symbol, :expiry,
-                        :ltp, :chg_pct, :oi, :oi_chg, :oi_chg_pct, :oi_signal, :volume, :score, :updated_at
-                    )
-                    """
-                ),
+        bulk_insert(
+            db,
+            "oi_heatmap_latest",
+            _SNAPSHOT_COLS,
+            [
                 {
                     "rank": int(r["rank"]),
                     "instrument_key": r.get("instrument_key"),
@@ -704,8 +752,10 @@ def _persist_snapshot(rows: List[Dict[str, Any]], updated_at: datetime) -> None:
                     "volume": int(r.get("volume") or 0),
                     "score": float(r.get("score") or 0),
                     "updated_at": updated_at,
-                },
-            )
+                }
+                for r in rows
+            ],
+        )
         db.commit()
     except Exception as e:
         logger.warning("oi_heatmap: persist skipped: %s", e)
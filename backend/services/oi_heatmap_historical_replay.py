@@ -16,12 +16,13 @@ from sqlalchemy import text
 
 from backend.config import settings
 from backend.database import SessionLocal
+from backend.services.market_data.candle_store import historical_candles
 from backend.services.oi_heatmap import (
     _interpret_signal,
     _persist_snapshot,
     _score_row,
     finalize_heatmap_rows_for_store,
-    load_nse_instruments_json,
+    load_nse_instruments_by_key,
     replace_cache_with_rows,
 )
 from backend.services.premarket_scoring import parse_candle_date_ist
@@ -70,14 +71,10 @@ def _find_candle_at_minute(
 def _fetch_candles_for_day(
     ux: UpstoxService, instrument_key: str, session_d: date, interval: str
 ) -> Optional[List[Dict[str, Any]]]:
-    raw = ux.get_historical_candles_by_instrument_key(
-        instrument_key, interval=interval, days_back=0, range_end_date=session_d
-    )
+    raw = historical_candles(ux, instrument_key, interval, 0, range_end_date=session_d)
     if raw:
         return raw
-    return ux.get_historical_candles_by_instrument_key(
-        instrument_key, interval=interval, days_back=1, range_end_date=session_d
-    )
+    return historical_candles(ux, instrument_key, interval, 1, range_end_date=session_d)
 
 
 def _candles_for_session_date(candles: List[dict], session_d: date) -> List[dict]:
@@ -105,8 +102,7 @@ def load_arbitrage_master_fut_universe(limit: int) -> List[Tuple[str, str, str,
             ),
             {"lim": int(limit)},
         ).fetchall()
-        raw_inst = load_nse_instruments_json()
-        ik_meta = {((r.get("instrument_key") or "").strip()): r for r in raw_inst if isinstance(r, dict)}
+        ik_meta = load_nse_instruments_by_key([str(ik or "") for _, ik in q])
         for stock, ik in q:
             st = str(stock or "").strip().upper()
             ikey = str(ik or "").strip()
@@ -3,14 +3,14 @@ from __future__ import annotations
 
 import json
 import logging
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import pytz
 
 from backend.config import settings
-from backend.services.market_holiday import refresh_holiday_dates_from_db
+from backend.services.trading_calendar import get_trading_calendar
 from backend.services.open_low_15m.config import (
     ARTIFACT_NAME,
     DATE_FROM,
@@ -42,30 +42,6 @@ STRATEGY_CRITERIA = (
 )
 
 
-def _load_holiday_dates(upstox: UpstoxService, d0: date, d1: date) -> set[date]:
-    holidays = refresh_holiday_dates_from_db()
-    if holidays:
-        return holidays
-    out: set[date] = set()
-    for year in range(d0.year, d1.year + 1):
-        for dstr in upstox.get_market_holidays(year) or []:
-            try:
-                out.add(date.fromisoformat(str(dstr)[:10]))
-            except ValueError:
-                continue
-    return out
-
-
-def _iter_trading_days(d0: date, d1: date, holidays: set[date]) -> List[date]:
-    out: List[date] = []
-    d = d0
-    while d <= d1:
-        if d.weekday() < 5 and d not in holidays:
-            out.append(d)
-        d += timedelta(days=1)
-    return out
-
-
 def _first_bar_ohlc(first: Dict[str, Any]) -> Dict[str, float]:
     def _fx(v: Any) -> float:
         try:
@@ -212,8 +188,7 @@ def run_open_low_15m_backtest(
 
     reset_fetch_caches()
     rid = run_id or f"open_low_15m_{datetime.now(IST).strftime('%Y%m%d_%H%M%S')}"
-    holidays = _load_holiday_dates(upstox, from_date, to_date)
-    session_days = _iter_trading_days(from_date, to_date, holidays)
+    session_days = get_trading_calendar().trading_days(from_date, to_date)
     if reverse_order:
         session_days = list(reversed(session_days))
     persistent = VolumeMismatchCandleCache(cache_dir=default_cache_dir())
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 from typing import List, Optional, Sequence, Tuple
 
+from backend.services.indicator_kernels import ema_series as kernel_ema_series
 from backend.services.open_low_15m.config import EMA_FAST, EMA_SLOW, ST_MULT, ST_PERIOD
 from backend.services.smart_futures_exit import _ema_last, _supertrend_dir_last_two
 from backend.services.smart_futures_picker.indicators import session_vwap, wilder_atr
@@ -11,11 +12,7 @@ from backend.services.smart_futures_picker.indicators import session_vwap, wilde
 def ema_series(values: Sequence[float], span: int) -> List[float]:
     if not values or span < 1:
         return []
-    k = 2.0 / (float(span) + 1.0)
-    out = [float(values[0])]
-    for v in values[1:]:
-        out.append(float(v) * k + out[-1] * (1.0 - k))
-    return out
+    return kernel_ema_series(values, span)
 
 
 def daily_ema10_as_of(closes_before_session: Sequence[float]) -> Optional[float]:
@@ -0,0 +1,173 @@
+"""
+In-process order-state hub fed by broker push channels.
+
+Upstox reports order transitions on two push channels: the postback webhook
+(``POST /scan/upstox/postback``) and the portfolio-stream websocket
+(``upstox_portfolio_feed``). Both publish here, as do the REST order-details
+polls the fill waiters still make as a fallback. Waiters block on
+``wait_for_change`` and wake as soon as a new state for their order lands,
+instead of spinning on ``get_order_details``.
+
+Push events can arrive out of order (stream and postback race, a late "open"
+after "complete") or not at all. Each order's state only moves forward:
+an update is applied when its (terminal?, filled_quantity) rank is at least the
+stored one, otherwise it is counted as stale and dropped. Missing events are
+covered by the waiter's REST fallback poll.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_TERMINAL_WORDS = ("complete", "filled", "cancel", "reject")
+_MAX_ORDERS = 2000
+_ORDER_TTL_SEC = 86400.0
+# Push is live while the portfolio stream is connected, or for this long after a
+# postback (the webhook has no connection state of its own). Stream events only
+# count while the stream is connected.
+PUSH_FRESH_SEC = 90.0
+
+
+def order_status_is_terminal(status: Any) -> bool:
+    s = str(status or "").lower().strip()
+    if s in ("cancel pending", "not cancelled"):
+        return False
+    return any(w in s for w in _TERMINAL_WORDS)
+
+
+def _filled_qty(row: Dict[str, Any]) -> int:
+    try:
+        return int(float(row.get("filled_quantity") or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _rank(row: Dict[str, Any]) -> Tuple[int, int]:
+    return (1 if order_status_is_terminal(row.get("status")) else 0, _filled_qty(row))
+
+
+class OrderStateHub:
+    """Latest known broker row per order id, with blocking waiters; thread-safe."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._touched: Dict[str, float] = {}
+        self._stream_connected = False
+        self._last_push: Optional[float] = None
+        self._stats: Dict[str, int] = {
+            "applied": 0,
+            "stale_dropped": 0,
+            "waiter_wakeups": 0,
+            "waits": 0,
+        }
+        self._by_source: Dict[str, int] = {}
+
+    # --- publishing -----------------------------------------------------------
+
+    def publish(self, row: Dict[str, Any], source: str, order_id: Optional[str] = None) -> bool:
+        """Merge a broker order row (postback / stream / rest). Returns False if ignored as stale."""
+        if not isinstance(row, dict):
+            return False
+        raw = order_id if order_id is not None else (row.get("order_id") or row.get("order_ref_id"))
+        oid = str(raw or "").strip()
+        if not oid:
+            return False
+        with self._cond:
+            self._by_source[source] = self._by_source.get(source, 0) + 1
+            if source not in ("rest", "stream"):
+                self._last_push = self._clock()
+            cur = self._rows.get(oid)
+            if cur is not None and _rank(row) < _rank(cur):
+                self._stats["stale_dropped"] += 1
+                return False
+            merged = dict(cur or {})
+            # Keep known fields (e.g. average_price) when a later event omits them.
+            merged.update({k: v for k, v in row.items() if v not in (None, "")})
+            merged["order_id"] = oid
+            merged["_source"] = source
+            self._rows[oid] = merged
+            self._versions[oid] = self._versions.get(oid, 0) + 1
+            self._touched[oid] = self._clock()
+            self._stats["applied"] += 1
+            if len(self._rows) > _MAX_ORDERS:
+                self._prune()
+            self._cond.notify_all()
+            return True
+
+    def _prune(self) -> None:
+        cutoff = self._clock() - _ORDER_TTL_SEC
+        old = [k for k, t in self._touched.items() if t < cutoff]
+        if len(self._rows) - len(old) > _MAX_ORDERS:
+            old = sorted(self._touched, key=self._touched.get)[: len(self._rows) - _MAX_ORDERS // 2]
+        for k in old:
+            self._rows.pop(k, None)
+            self._versions.pop(k, None)
+            self._touched.pop(k, None)
+
+    def set_stream_connected(self, connected: bool) -> None:
+        with self._cond:
+            self._stream_connected = bool(connected)
+
+    # --- reading / waiting ----------------------------------------------------
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            row = self._rows.get(str(order_id))
+            return dict(row) if row else None
+
+    def version(self, order_id: str) -> int:
+        with self._cond:
+            return self._versions.get(str(order_id), 0)
+
+    def wait_for_change(self, order_id: str, since_version: int, timeout: float) -> int:
+        """Block until ``order_id`` moves past ``since_version`` or ``timeout``; returns the current version."""
+        oid = str(order_id)
+        with self._cond:
+            self._stats["waits"] += 1
+            if self._versions.get(oid, 0) != since_version:
+                return self._versions.get(oid, 0)
+            self._cond.wait_for(lambda: self._versions.get(oid, 0) != since_version, timeout=max(0.0, timeout))
+            v = self._versions.get(oid, 0)
+            if v != since_version:
+                self._stats["waiter_wakeups"] += 1
+            return v
+
+    def push_live(self) -> bool:
+        """True when a push channel is delivering, so waiters may poll REST slowly."""
+        with self._cond:
+            return self._push_live_locked()
+
+    def _push_live_locked(self) -> bool:
+        if self._stream_connected:
+            return True
+        return self._last_push is not None and self._clock() - self._last_push < PUSH_FRESH_SEC
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                "by_source": dict(self._by_source),
+                "orders": len(self._rows),
+                "stream_connected": self._stream_connected,
+                "push_live": self._push_live_locked(),
+            }
+
+
+hub = OrderStateHub()
+
+
+def publish_order_update(payload: Dict[str, Any], source: str) -> bool:
+    """Publish a postback / stream payload (nested ``data`` merged to top level) to the shared hub."""
+    if not isinstance(payload, dict):
+        return False
+    row = dict(payload)
+    inner = row.pop("data", None)
+    if isinstance(inner, dict):
+        for k, v in inner.items():
+            if v is not None and (k not in row or row.get(k) in (None, "", 0)):
+                row[k] = v
+    return hub.publish(row, source=source)
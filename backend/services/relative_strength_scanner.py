@@ -6,7 +6,9 @@ Pipeline (run once every 5 min by the scheduler, never by the dashboard):
      fetched (shared in-process ``candle_cache``); only fall back to a direct
      Upstox fetch on a cache miss. This keeps the scanner off the Upstox
      rate-limit (429) hot path at market open.
-  3. Compute indicators (EMA 5/9/10, VWAP, Supertrend, MACD, ADX, Volume Ratio).
+  3. Compute indicators (EMA 5/9/10, VWAP, Supertrend, MACD, ADX, Volume Ratio)
+     per symbol on a process pool (candles shipped as ``CandleSeries`` arrays);
+     load, ranking and persistence stay in the calling process.
   4. Compute Relative Strength = Stock %% - NIFTY %%.
   5. Evaluate Kavach state + composite Trade Score (see ``kavach_engine``).
   6. Rank Top-N Bullish / Bearish (persist Top-10 for lock-removal hysteresis;
@@ -19,10 +21,16 @@ never recalculates indicators.
 from __future__ import annotations
 
 import logging
+import multiprocessing
+import os
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import numpy as np
 import pytz
 from sqlalchemy import text
 
@@ -45,15 +53,20 @@ from backend.services.kavach_engine import (
     BULLISH_STATES,
     RANKING_BEARISH,
     RANKING_BULLISH,
+    STATE_CODES,
+    STATE_INDEX,
+    KavachBatch,
     KavachInput,
-    compute_trade_score,
     evaluate_kavach,
+    evaluate_kavach_batch,
+    trade_score_batch,
 )
 from backend.services.rs_scanner_maturity import (
     default_maturity_fields,
     load_today_maturity_map,
 )
 from backend.services.market_data import candle_cache
+from backend.services.market_data.candle_series import CandleSeries
 from backend.services.smart_futures_exit import _supertrend_dir_last_two
 from backend.services.smart_futures_picker.indicators import adx_value
 from backend.services.upstox_service import UpstoxService
@@ -69,6 +82,10 @@ CANDLE_DAYS_BACK = 5
 # can take ~8-9 min under Upstox rate limits, so use a window wide enough to
 # accumulate symbols across consecutive cycles rather than expiring them early.
 CACHE_MAX_AGE_SEC = 900
+# Manual / off-hours runs that fetch through the shared cache accept an entry up
+# to this far past its TTL (refreshed in the background) instead of blocking on
+# Upstox; such reads are counted as ``stale_reads`` in the cycle log.
+CACHE_STALE_SEC = 120
 VOLUME_EMA_PERIOD = 20
 ADX_LENGTH = 14
 TOP_N = 5
@@ -82,6 +99,9 @@ _NIFTY_DAILY_CACHE: Optional[Tuple[str, List[Tuple[str, float]]]] = None  # (fet
 _LAST_GOOD_NIFTY_PCT: Optional[float] = None
 # Minimum bars to compute MACD(12,26,9) / ADX(14) reliably.
 MIN_BARS = 40
+# Per-symbol compute stage runs on a process pool of RS_SCAN_WORKERS (unset: up to
+# 4, leaving one core for the server; 0 = in-process), in chunks of this many symbols.
+SCAN_CHUNK_SYMBOLS = 16
 
 
 # --- candle helpers ----------------------------------------------------------
@@ -143,6 +163,23 @@ def _current_and_prev_day_close(
     return current_price, previous_day_close, first_today
 
 
+def _current_and_prev_day_close_series(
+    series: CandleSeries, closes: List[float]
+) -> Optional[Tuple[float, float, int]]:
+    """``_current_and_prev_day_close`` for an oldest-first ``CandleSeries`` (no timestamp parsing)."""
+    if len(series) == 0:
+        return None
+    days = series.ist_day()
+    first_today = int(np.flatnonzero(days == days[-1])[0])
+    if first_today == 0:
+        return None
+    previous_day_close = closes[first_today - 1]
+    current_price = closes[-1]
+    if previous_day_close <= 0 or current_price <= 0:
+        return None
+    return current_price, previous_day_close, first_today
+
+
 def _macd_last(
     closes: List[float],
     fast: int = 12,
@@ -163,58 +200,113 @@ def _macd_last(
 
 def _candles_for_symbol(
     upstox: UpstoxService, instrument_key: str, *, cache_only: bool
-) -> Tuple[Optional[List[Dict]], bool]:
+) -> Tuple[Union[CandleSeries, List[Dict], None], bool]:
     """Return (candles, from_cache). Prefer the shared market-data cache.
 
     When ``cache_only`` (scheduled market-hours runs) we never issue our own
     Upstox fetch — the platform's historical-candle quota is shared and heavily
     rate-limited, so adding 200 fetches just starves the core refresh. Manual /
     off-hours runs may fall back to a direct fetch (and warm the cache)."""
-    cached = candle_cache.get_recent(instrument_key, CANDLE_INTERVAL, CACHE_MAX_AGE_SEC)
-    if cached and len(cached) >= MIN_BARS:
+    cached = candle_cache.get_recent_series(instrument_key, CANDLE_INTERVAL, CACHE_MAX_AGE_SEC)
+    if cached is None:
+        cached = candle_cache.get_recent(instrument_key, CANDLE_INTERVAL, CACHE_MAX_AGE_SEC)
+    if cached is not None and len(cached) >= MIN_BARS:
         return cached, True
     if cache_only:
         return None, False
     # Off-hours / manual run: a direct fetch auto-populates the shared cache.
     fetched = upstox.get_historical_candles_by_instrument_key(
-        instrument_key, interval=CANDLE_INTERVAL, days_back=CANDLE_DAYS_BACK
+        instrument_key, interval=CANDLE_INTERVAL, days_back=CANDLE_DAYS_BACK, cache_stale_sec=CACHE_STALE_SEC
     )
     return fetched, False
 
 
 def _compute_symbol_metrics(
-    upstox: UpstoxService, entry: Dict[str, str], nifty_pct: float, *, cache_only: bool
+    upstox: UpstoxService,
+    entry: Dict[str, str],
+    nifty_pct: float,
+    *,
+    cache_only: bool,
+    defer_kavach: bool = False,
 ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     """Compute all indicators + RS + Kavach for one symbol (cache-first candles).
 
     Returns ``(metrics, exclusion_reason)``. On success ``exclusion_reason`` is
     None; on failure ``metrics`` is None and reason is a canonical code from
     ``rs_exclusion_audit``.
+
+    ``defer_kavach`` leaves ``kavach_state`` / ``kavach_strength`` /
+    ``vwap_purity_pct`` unset so a universe scan can fill them for every row in
+    one ``_apply_kavach`` batch.
     """
-    from backend.services.rs_exclusion_audit import (
-        REASON_MISSING_CANDLES,
-        REASON_MISSING_KEY,
-        REASON_NO_CLOSED_BAR,
-        REASON_NO_PREV_CLOSE,
+    candles, from_cache, reason = _load_symbol_candles(upstox, entry, cache_only=cache_only)
+    if reason:
+        return None, reason
+    m, reason = _metrics_from_candles(
+        entry, candles, nifty_pct, from_cache=from_cache, defer_kavach=defer_kavach
     )
+    if m:
+        _overlay_live_rocket(m)
+    return m, reason
+
+
+def _load_symbol_candles(
+    upstox: UpstoxService, entry: Dict[str, str], *, cache_only: bool
+) -> Tuple[Union[CandleSeries, List[Dict], None], bool, Optional[str]]:
+    """Scan load stage: ``(candles, from_cache, exclusion_reason)`` for one universe entry."""
+    from backend.services.rs_exclusion_audit import REASON_MISSING_CANDLES, REASON_MISSING_KEY
+
+    if not (entry.get("instrument_key") or "") or not (entry.get("stock") or ""):
+        return None, False, REASON_MISSING_KEY
+    candles, from_cache = _candles_for_symbol(upstox, entry["instrument_key"], cache_only=cache_only)
+    if candles is None or len(candles) < MIN_BARS:
+        return None, from_cache, REASON_MISSING_CANDLES
+    return candles, from_cache, None
+
+
+def _metrics_from_candles(
+    entry: Dict[str, str],
+    candles: Union[CandleSeries, List[Dict]],
+    nifty_pct: float,
+    *,
+    from_cache: bool,
+    now: Optional[datetime] = None,
+    defer_kavach: bool = False,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Scan compute stage: indicators + RS (+ Kavach) from already-loaded candles.
+
+    Pure CPU — no cache, DB or live-feed reads — so it can run in a pool worker.
+    ``now`` (default wall clock) decides which bars are closed. Rocket / Crash
+    come from confirmed 10m bars only; ``_overlay_live_rocket`` adds the live
+    feed in the parent.
+    """
+    from backend.services.rs_exclusion_audit import REASON_NO_CLOSED_BAR, REASON_NO_PREV_CLOSE
 
     instrument_key = entry.get("instrument_key") or ""
     symbol = entry.get("stock") or ""
-    if not instrument_key or not symbol:
-        return None, REASON_MISSING_KEY
-
-    candles, from_cache = _candles_for_symbol(upstox, instrument_key, cache_only=cache_only)
-    if not candles or len(candles) < MIN_BARS:
-        return None, REASON_MISSING_CANDLES
-    candles = _sorted_candles(candles)
-
-    closes = [_f(c.get("close")) for c in candles]
-    highs = [_f(c.get("high")) for c in candles]
-    lows = [_f(c.get("low")) for c in candles]
-    volumes = [_f(c.get("volume")) for c in candles]
+    now = now or datetime.now(IST)
+    series: Optional[CandleSeries] = None
+    if isinstance(candles, CandleSeries):
+        # Columns straight from the cached arrays; dicts only for the helpers below.
+        series = candles.sorted()
+        candles = series.to_dicts()
+        closes = series.column("close", 0.0).tolist()
+        highs = series.column("high", 0.0).tolist()
+        lows = series.column("low", 0.0).tolist()
+        volumes = series.column("volume", 0.0).tolist()
+    else:
+        candles = _sorted_candles(candles)
+        closes = [_f(c.get("close")) for c in candles]
+        highs = [_f(c.get("high")) for c in candles]
+        lows = [_f(c.get("low")) for c in candles]
+        volumes = [_f(c.get("volume")) for c in candles]
 
     # Stock %% basis = (current price - previous DAY close) / previous DAY close.
-    split = _current_and_prev_day_close(candles)
+    split = (
+        _current_and_prev_day_close_series(series, closes)
+        if series is not None
+        else _current_and_prev_day_close(candles)
+    )
     if split is None:
         return None, REASON_NO_PREV_CLOSE
     current_price, previous_close, first_today = split
@@ -237,12 +329,16 @@ def _compute_symbol_metrics(
 
     adx = adx_value(highs, lows, closes, ADX_LENGTH) or 0.0
 
-    closed_idx = last_closed_bar_index(candles)
+    closed_idx = (
+        series.last_closed_index(now, 5 * 60)
+        if series is not None
+        else last_closed_bar_index(candles, now=now)
+    )
     if closed_idx < 0:
         return None, REASON_NO_CLOSED_BAR
     closed_price = closes[closed_idx]
     cur_volume, vol_ema, volume_ratio = closed_bar_volume_ratio(volumes, closed_idx=closed_idx)
-    volume_tod_ratio = cumulative_volume_tod_ratio(candles, closed_idx=closed_idx)
+    volume_tod_ratio = cumulative_volume_tod_ratio(candles, closed_idx=closed_idx, now=now)
     vol_label = volume_participation_label(volume_ratio, volume_tod_ratio)
 
     # Session VWAP series for today (for purity on 10m-equivalent bars).
@@ -280,28 +376,21 @@ def _compute_symbol_metrics(
     stock_pct = (closed_price - previous_close) / previous_close * 100.0
     relative_strength = stock_pct - nifty_pct
 
-    kav = evaluate_kavach(
-        KavachInput(
-            price=closed_price,
-            ema5=ema5,
-            ema9=ema9,
-            ema9_slope=ema9_slope,
-            vwap=vwap,
-            supertrend_bullish=st_curr,
-            macd=macd,
-            macd_signal=macd_signal,
-            macd_histogram=macd_hist,
-            adx=adx,
-            volume_ratio=volume_ratio,
-        )
+    kav_input = KavachInput(
+        price=closed_price,
+        ema5=ema5,
+        ema9=ema9,
+        ema9_slope=ema9_slope,
+        vwap=vwap,
+        supertrend_bullish=st_curr,
+        macd=macd,
+        macd_signal=macd_signal,
+        macd_histogram=macd_hist,
+        adx=adx,
+        volume_ratio=volume_ratio,
     )
 
-    purity_dir = "SHORT" if kav.state in BEARISH_STATES else "LONG"
-    vwap_purity = compute_vwap_purity_pct(
-        t_closes_full, vwap_series_today, direction=purity_dir
-    )
-
-    from backend.services.rocket_pre_ignition import compute_rocket_crash, empty_rocket_crash, log_crash, log_rocket
+    from backend.services.rocket_pre_ignition import compute_rocket_crash, empty_rocket_crash
 
     rocket = empty_rocket_crash()
     try:
@@ -310,50 +399,17 @@ def _compute_symbol_metrics(
             last_closed_10m_pair_end_idx,
         )
 
-        closed_end = last_closed_10m_pair_end_idx(candles)
+        closed_end = last_closed_10m_pair_end_idx(candles, now=now)
         bars_10m = (
             [b for b in aggregate_10m_bars(candles) if b["end_5m_idx"] <= closed_end]
             if closed_end >= 0
             else []
         )
         rocket = compute_rocket_crash(bars_10m)
-        try:
-            from backend.services.rocket_ws_live import get_live_10m
-
-            live = get_live_10m(symbol)
-            if live:
-                lookback = int(live.get("lookback_used") or 0)
-                live_r = int(live.get("rocket_score") or 0)
-                live_c = int(live.get("crash_score") or 0)
-                if lookback >= 8 or live_r >= 1 or live_c >= 1:
-                    rocket["rocket_score"] = live_r
-                    rocket["rocket_signals"] = [
-                        p.strip()
-                        for p in str(live.get("rocket_signals") or "").split(",")
-                        if p.strip()
-                    ] or list(rocket.get("rocket_signals") or [])
-                    rocket["rocket_label"] = live.get("rocket_label") or rocket.get("rocket_label") or ""
-                    rocket["crash_score"] = live_c
-                    rocket["crash_signals"] = [
-                        p.strip()
-                        for p in str(live.get("crash_signals") or "").split(",")
-                        if p.strip()
-                    ]
-                    rocket["crash_label"] = live.get("crash_label") or ""
-        except Exception:
-            pass
-        if int(rocket.get("rocket_score") or 0) >= 3:
-            log_rocket(symbol, rocket, level=logging.INFO)
-        else:
-            log_rocket(symbol, rocket)
-        if int(rocket.get("crash_score") or 0) >= 3:
-            log_crash(symbol, rocket, level=logging.INFO)
-        else:
-            log_crash(symbol, rocket)
     except Exception as exc:
         logger.debug("rocket score skipped %s: %s", symbol, exc)
 
-    return {
+    row = {
         "symbol": symbol,
         "instrument_key": instrument_key,
         "future_symbol": entry.get("future_symbol") or "",
@@ -377,17 +433,108 @@ def _compute_symbol_metrics(
         "volume_ratio": volume_ratio,
         "volume_tod_ratio": volume_tod_ratio,
         "volume_label": vol_label,
-        "vwap_purity_pct": vwap_purity,
+        "vwap_purity_pct": None,
         "market_regime": regime,
-        "kavach_state": kav.state,
-        "kavach_strength": kav.strength,
+        "kavach_state": None,
+        "kavach_strength": None,
         "rocket_score": rocket.get("rocket_score") or 0,
         "rocket_signals": rocket.get("rocket_signals") or [],
         "rocket_label": rocket.get("rocket_label") or "",
         "crash_score": rocket.get("crash_score") or 0,
         "crash_signals": rocket.get("crash_signals") or [],
         "crash_label": rocket.get("crash_label") or "",
-    }, None
+        "_kavach_input": kav_input,
+        "_purity_series": (t_closes_full, vwap_series_today),
+    }
+    if not defer_kavach:
+        failed = _apply_kavach([row])
+        if failed:
+            raise failed[0][1]
+    return row, None
+
+
+def _overlay_live_rocket(row: Dict[str, Any]) -> None:
+    """Prefer the live 10m Rocket / Crash feed over bar-derived scores (parent process), then log."""
+    from backend.services.rocket_pre_ignition import log_crash, log_rocket
+
+    symbol = row.get("symbol") or ""
+    try:
+        from backend.services.rocket_ws_live import get_live_10m
+
+        live = get_live_10m(symbol)
+        if live:
+            lookback = int(live.get("lookback_used") or 0)
+            live_r = int(live.get("rocket_score") or 0)
+            live_c = int(live.get("crash_score") or 0)
+            if lookback >= 8 or live_r >= 1 or live_c >= 1:
+                row["rocket_score"] = live_r
+                row["rocket_signals"] = [
+                    p.strip()
+                    for p in str(live.get("rocket_signals") or "").split(",")
+                    if p.strip()
+                ] or list(row.get("rocket_signals") or [])
+                row["rocket_label"] = live.get("rocket_label") or row.get("rocket_label") or ""
+                row["crash_score"] = live_c
+                row["crash_signals"] = [
+                    p.strip()
+                    for p in str(live.get("crash_signals") or "").split(",")
+                    if p.strip()
+                ]
+                row["crash_label"] = live.get("crash_label") or ""
+    except Exception:
+        pass
+    try:
+        if int(row.get("rocket_score") or 0) >= 3:
+            log_rocket(symbol, row, level=logging.INFO)
+        else:
+            log_rocket(symbol, row)
+        if int(row.get("crash_score") or 0) >= 3:
+            log_crash(symbol, row, level=logging.INFO)
+        else:
+            log_crash(symbol, row)
+    except Exception as exc:
+        logger.debug("rocket log skipped %s: %s", symbol, exc)
+
+
+def _apply_kavach(rows: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Exception]]:
+    """Fill Kavach state / strength and direction-aware VWAP purity for deferred rows, in place.
+
+    Evaluates every row's ``KavachInput`` in one ``evaluate_kavach_batch`` call. If the
+    batch raises, rows are evaluated one by one instead. Rows that still fail are
+    removed from ``rows`` and returned with their error, so one bad symbol is
+    excluded rather than failing the scan.
+    """
+    if not rows:
+        return []
+    states: Optional[List[Tuple[str, int]]] = None
+    try:
+        res = evaluate_kavach_batch(KavachBatch.from_inputs([r["_kavach_input"] for r in rows]))
+        states = [(STATE_CODES[c], s) for c, s in zip(res.state_code.tolist(), res.strength.tolist())]
+    except Exception as exc:
+        logger.warning("Kavach batch evaluation failed (%s) — evaluating per symbol", exc)
+    kept: List[Dict[str, Any]] = []
+    failed: List[Tuple[Dict[str, Any], Exception]] = []
+    for i, r in enumerate(rows):
+        try:
+            if states is None:
+                kr = evaluate_kavach(r["_kavach_input"])
+                state, strength = kr.state, kr.strength
+            else:
+                state, strength = states[i]
+            t_closes, vwap_series = r["_purity_series"]
+            purity = compute_vwap_purity_pct(
+                t_closes, vwap_series, direction="SHORT" if state in BEARISH_STATES else "LONG"
+            )
+        except Exception as exc:
+            failed.append((r, exc))
+            continue
+        del r["_kavach_input"], r["_purity_series"]
+        r["kavach_state"] = state
+        r["kavach_strength"] = strength
+        r["vwap_purity_pct"] = purity
+        kept.append(r)
+    rows[:] = kept
+    return failed
 
 
 def _is_market_live_ist() -> bool:
@@ -514,9 +661,133 @@ def _nifty_change_pct(upstox: UpstoxService) -> Optional[float]:
     return _LAST_GOOD_NIFTY_PCT
 
 
+# --- parallel compute stage --------------------------------------------------
+
+_POOL: Optional[Tuple[int, ProcessPoolExecutor]] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _scan_workers() -> int:
+    raw = (os.getenv("RS_SCAN_WORKERS") or "").strip()
+    if not raw:
+        return max(0, min(4, (os.cpu_count() or 1) - 1))
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        return 0
+
+
+def _compute_pool(workers: int) -> ProcessPoolExecutor:
+    """Long-lived pool reused across scans (worker imports are paid once).
+
+    forkserver, not fork: the server process runs scheduler / feed threads, and
+    forking it mid-lock can deadlock the child.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None or _POOL[0] != workers:
+            if _POOL is not None:
+                _POOL[1].shutdown(wait=False, cancel_futures=True)
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _POOL = (
+                workers,
+                ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method)),
+            )
+        return _POOL[1]
+
+
+def _reset_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL[1].shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+
+def _compact_candles(candles: Union[CandleSeries, List[Dict]]) -> Union[CandleSeries, List[Dict]]:
+    """Oldest-first ``CandleSeries`` for shipping to a worker (arrays pickle as flat buffers)."""
+    if isinstance(candles, CandleSeries):
+        return candles.sorted()
+    try:
+        return CandleSeries.from_dicts(_sorted_candles(candles))
+    except ValueError:
+        return candles
+
+
+def _compute_chunk(
+    jobs: List[Tuple[Dict[str, str], Any, bool]], nifty_pct: float, now: datetime
+) -> List[Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]]:
+    """``(metrics, exclusion_reason, error)`` per job; Kavach is left for the parent's batch."""
+    out: List[Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]] = []
+    for entry, candles, from_cache in jobs:
+        try:
+            m, reason = _metrics_from_candles(
+                entry, candles, nifty_pct, from_cache=from_cache, now=now, defer_kavach=True
+            )
+            out.append((m, reason, None))
+        except Exception as exc:  # one bad symbol must not abort the scan
+            out.append((None, None, str(exc)))
+    return out
+
+
+def _compute_all(
+    jobs: List[Tuple[Dict[str, str], Any, bool]],
+    nifty_pct: float,
+    now: datetime,
+    *,
+    workers: int,
+    chunk_size: int = SCAN_CHUNK_SYMBOLS,
+) -> Tuple[List[Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]], int]:
+    """Run the compute stage for every job, in job order. Returns ``(results, workers_used)``.
+
+    Falls back to in-process when the pool is disabled, the universe fits one
+    chunk, or the pool fails.
+    """
+    chunk_size = max(1, int(chunk_size))
+    if workers >= 1 and len(jobs) > chunk_size:
+        try:
+            pool = _compute_pool(workers)
+            shipped = [(e, _compact_candles(c), fc) for e, c, fc in jobs]
+            chunks = [shipped[k : k + chunk_size] for k in range(0, len(shipped), chunk_size)]
+            out: List[Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]] = []
+            for part in pool.map(_compute_chunk, chunks, repeat(nifty_pct), repeat(now)):
+                out.extend(part)
+            return out, workers
+        except Exception as exc:
+            logger.warning("Relative Strength scan: compute pool failed (%s) — running in-process", exc)
+            _reset_pool()
+    return _compute_chunk(jobs, nifty_pct, now), 0
+
+
 # --- ranking -----------------------------------------------------------------
 
 
+def raw_trade_scores(rows: List[Dict[str, Any]]) -> List[int]:
+    """Pre-resolve Trade Score for scanner rows carrying ``ranking_type``, one batch call.
+
+    Reads ``relative_strength`` / ``kavach_state`` / ``volume_ratio`` / ``adx`` /
+    ``current_price`` / ``vwap``; same values as ``compute_trade_score`` per row.
+    """
+    if not rows:
+        return []
+
+    def col(key: str) -> np.ndarray:
+        return np.fromiter((r[key] for r in rows), dtype=np.float64, count=len(rows))
+
+    scores = trade_score_batch(
+        rs=col("relative_strength"),
+        state_code=np.fromiter(
+            (STATE_INDEX.get(r["kavach_state"], 0) for r in rows), dtype=np.intp, count=len(rows)
+        ),
+        volume_ratio=col("volume_ratio"),
+        adx=col("adx"),
+        price=col("current_price"),
+        vwap=col("vwap"),
+        bullish=np.fromiter((r["ranking_type"] == RANKING_BULLISH for r in rows), dtype=bool, count=len(rows)),
+    )
+    return scores["trade_score"].tolist()
+
+
 def _rank(
     rows: List[Dict[str, Any]],
 ) -> Tuple[List[Dict], List[Dict], List[Dict], List[Dict], List[Dict]]:
@@ -534,14 +805,13 @@ def _rank(
     bullish: List[Dict] = []
     bearish: List[Dict] = []
     exclusions: List[Dict] = []
+    directional: List[Dict] = []
     for r in rows:
         state = r["kavach_state"]
         if state in BULLISH_STATES:
             ranking_type = RANKING_BULLISH
-            bucket = bullish
         elif state in BEARISH_STATES:
             ranking_type = RANKING_BEARISH
-            bucket = bearish
         else:
             exclusions.append(
                 exclusion_row(
@@ -560,15 +830,9 @@ def _rank(
             continue
         r = dict(r)
         r["ranking_type"] = ranking_type
-        raw_score = compute_trade_score(
-            rs=r["relative_strength"],
-            state=state,
-            volume_ratio=r["volume_ratio"],
-            adx=r["adx"],
-            price=r["current_price"],
-            vwap=r["vwap"],
-            ranking_type=ranking_type,
-        )
+        directional.append(r)
+
+    for r, raw_score in zip(directional, raw_trade_scores(directional)):
         resolved = resolve_score_and_grade(
             raw_score,
             r.get("volume_label") or "Low",
@@ -582,7 +846,7 @@ def _rank(
         r["trade_score_raw"] = raw_score
         r["confidence_grade"] = resolved["confidence_grade"]
         r["stretch"] = resolved.get("stretch") or {}
-        bucket.append(r)
+        (bullish if r["ranking_type"] == RANKING_BULLISH else bearish).append(r)
 
     # Bullish: highest RS%% on top. Bearish: lowest RS%% on top. Trade Score breaks ties.
     # Persist PERSIST_TOP_N so removal hysteresis can see ranks 6..band; actionable Top-N stays TOP_N.
@@ -706,6 +970,9 @@ def run_relative_strength_scan(
     started = time.time()
     upstox = UpstoxService(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET)
 
+    # Phase timings (perf counter) for the score-cycle log: load / compute / rank / persist.
+    phase_sec: Dict[str, float] = {}
+    t_phase = time.perf_counter()
     nifty_pct = _nifty_change_pct(upstox)
     if nifty_pct is None:
         logger.warning("Relative Strength scan (%s): NIFTY %% unavailable — aborting", scan_trigger)
@@ -718,43 +985,83 @@ def run_relative_strength_scan(
     rows: List[Dict[str, Any]] = []
     exclusions: List[Dict[str, Any]] = []
     cache_hits = 0
+    stale_reads = 0
     from backend.services.rs_exclusion_audit import (
         REASON_EXCEPTION,
         exclusion_row,
         write_exclusion_log,
     )
 
-    for entry in universe:
+    def _exception_row(entry: Dict[str, str], exc: Any) -> Dict[str, Any]:
+        logger.warning("Relative Strength scan: %s failed: %s", entry.get("stock"), exc)
+        return exclusion_row(
+            symbol=entry.get("stock") or "",
+            exclusion_reason=REASON_EXCEPTION,
+            instrument_key=entry.get("instrument_key"),
+            detail=str(exc)[:500],
+        )
+
+    # Load (parent: shared candle cache / Upstox) -> compute (pool) -> rank + persist (parent).
+    # Per-entry outcomes are kept in universe order so rows and exclusions match the serial scan.
+    outcomes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]] = [(None, None)] * len(universe)
+    jobs: List[Tuple[Dict[str, str], Any, bool]] = []
+    job_slots: List[int] = []
+    for i, entry in enumerate(universe):
         try:
-            m, excl_reason = _compute_symbol_metrics(
-                upstox, entry, nifty_pct, cache_only=cache_only
-            )
-            if m:
-                if m.pop("from_cache", False):
-                    cache_hits += 1
-                rows.append(m)
-            elif excl_reason:
-                exclusions.append(
-                    exclusion_row(
-                        symbol=entry.get("stock") or "",
-                        exclusion_reason=excl_reason,
-                        instrument_key=entry.get("instrument_key"),
-                        detail=f"cache_only={cache_only}",
-                    )
-                )
+            candles, from_cache, excl_reason = _load_symbol_candles(upstox, entry, cache_only=cache_only)
         except Exception as exc:  # one bad symbol must not abort the scan
-            logger.warning(
-                "Relative Strength scan: %s failed: %s", entry.get("stock"), exc
+            outcomes[i] = (None, _exception_row(entry, exc))
+            continue
+        if excl_reason:
+            outcomes[i] = (
+                None,
+                exclusion_row(
+                    symbol=entry.get("stock") or "",
+                    exclusion_reason=excl_reason,
+                    instrument_key=entry.get("instrument_key"),
+                    detail=f"cache_only={cache_only}",
+                ),
             )
-            exclusions.append(
+            continue
+        if not from_cache and candle_cache.last_read_stale():
+            stale_reads += 1
+        jobs.append((entry, candles, from_cache))
+        job_slots.append(i)
+    now = datetime.now(IST)
+    phase_sec["load"] = time.perf_counter() - t_phase
+
+    t_phase = time.perf_counter()
+    results, workers_used = _compute_all(jobs, nifty_pct, now, workers=_scan_workers())
+    for slot, (entry, _, _), (m, excl_reason, err) in zip(job_slots, jobs, results):
+        if err is not None:
+            outcomes[slot] = (None, _exception_row(entry, err))
+        elif m:
+            _overlay_live_rocket(m)
+            outcomes[slot] = (m, None)
+        elif excl_reason:
+            outcomes[slot] = (
+                None,
                 exclusion_row(
                     symbol=entry.get("stock") or "",
-                    exclusion_reason=REASON_EXCEPTION,
+                    exclusion_reason=excl_reason,
                     instrument_key=entry.get("instrument_key"),
-                    detail=str(exc)[:500],
-                )
+                    detail=f"cache_only={cache_only}",
+                ),
             )
-
+    for m, excl in outcomes:
+        if m:
+            if m.pop("from_cache", False):
+                cache_hits += 1
+            rows.append(m)
+        elif excl:
+            exclusions.append(excl)
+    phase_sec["compute"] = time.perf_counter() - t_phase
+
+    t_phase = time.perf_counter()
+    for r, exc in _apply_kavach(rows):
+        exclusions.append(
+            _exception_row({"stock": r.get("symbol"), "instrument_key": r.get("instrument_key")}, exc)
+        )
     bullish, bearish, rank_exclusions, full_bull, full_bear = _rank(rows)
     exclusions.extend(rank_exclusions)
     ranked = bullish + bearish
@@ -766,6 +1073,9 @@ def run_relative_strength_scan(
         if sym and sym not in bull_bear_syms:
             neutrals.append(dict(r))
     scored_for_shadow = full_bull + full_bear + neutrals
+    phase_sec["rank"] = time.perf_counter() - t_phase
+
+    t_phase = time.perf_counter()  # persist: maturity enrichment + snapshot + exclusions + shadow
     try:
         from backend.services.rs_scanner_maturity import enrich_ranked_with_maturity
 
@@ -787,7 +1097,6 @@ def run_relative_strength_scan(
             persist_universe_shadow,
             shadow_enabled,
         )
-        from backend.services.rs_score_cycle_log import record_rs_score_cycle
 
         if shadow_enabled():
             unscored = [
@@ -821,34 +1130,48 @@ def run_relative_strength_scan(
                     if u.get("symbol")
                 }
             )
-            record_rs_score_cycle(
-                {
-                    "scan_time_ist": scan_time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "scan_trigger": scan_trigger,
-                    "cache_only": cache_only,
-                    "universe": len(universe),
-                    "scored": len(rows),
-                    "cache_hits": cache_hits,
-                    "rs_skipped_count": len(skip_syms),
-                    "rs_skipped_symbols": skip_syms[:80],
-                    "rs_skipped_truncated": len(skip_syms) > 80,
-                    "shadow_ok": bool(universe_shadow.get("ok")),
-                    "shadow_rows": universe_shadow.get("n_rows"),
-                    "duration_sec": round(time.time() - started, 1),
-                    "incumbent_rs_bonus": universe_shadow.get("bonus"),
-                }
-            )
     except Exception as exc:
         logger.warning("RS universe shadow persist failed: %s", exc)
         universe_shadow = {"ok": False, "reason": str(exc)[:200]}
+    phase_sec["persist"] = time.perf_counter() - t_phase
+    phases = {k: round(v, 3) for k, v in phase_sec.items()}
+
+    # Every cycle is logged (not only shadow runs) so phase-time regressions show up.
+    try:
+        from backend.services.rs_score_cycle_log import record_rs_score_cycle
+
+        record_rs_score_cycle(
+            {
+                "scan_time_ist": scan_time.strftime("%Y-%m-%d %H:%M:%S"),
+                "scan_trigger": scan_trigger,
+                "cache_only": cache_only,
+                "universe": len(universe),
+                "scored": len(rows),
+                "cache_hits": cache_hits,
+                "stale_reads": stale_reads,
+                "rs_skipped_count": len(skip_syms),
+                "rs_skipped_symbols": skip_syms[:80],
+                "rs_skipped_truncated": len(skip_syms) > 80,
+                "shadow_ok": bool(universe_shadow.get("ok")),
+                "shadow_rows": universe_shadow.get("n_rows"),
+                "duration_sec": round(time.time() - started, 1),
+                "phase_sec": phases,
+                "compute_workers": workers_used,
+                "incumbent_rs_bonus": universe_shadow.get("bonus"),
+            }
+        )
+    except Exception as exc:
+        logger.debug("RS score cycle log failed: %s", exc)
 
     duration = time.time() - started
     logger.info(
-        "Relative Strength scan (%s, cache_only=%s): %d/%d symbols (%d from cache), "
+        "Relative Strength scan (%s, cache_only=%s): %d/%d symbols (%d from cache, %d stale), "
         "NIFTY %+.2f%%, %d bullish / %d bearish, %d exclusions logged in %.1fs "
-        "(universe_shadow ok=%s rows=%s skips=%d)",
-        scan_trigger, cache_only, len(rows), len(universe), cache_hits, nifty_pct,
+        "(load %.2fs, compute %.2fs on %d workers, rank %.2fs, persist %.2fs; "
+        "universe_shadow ok=%s rows=%s skips=%d)",
+        scan_trigger, cache_only, len(rows), len(universe), cache_hits, stale_reads, nifty_pct,
         len(bullish), len(bearish), excl_n, duration,
+        phase_sec["load"], phase_sec["compute"], workers_used, phase_sec["rank"], phase_sec["persist"],
         universe_shadow.get("ok"), universe_shadow.get("n_rows"), len(skip_syms),
     )
     return {
@@ -857,11 +1180,14 @@ def run_relative_strength_scan(
         "universe": len(universe),
         "cache_only": cache_only,
         "cache_hits": cache_hits,
+        "stale_reads": stale_reads,
         "nifty_percent": nifty_pct,
         "bullish": len(bullish),
         "bearish": len(bearish),
         "exclusions_logged": excl_n,
         "duration_sec": round(duration, 1),
+        "phase_sec": phases,
+        "compute_workers": workers_used,
         "universe_shadow": universe_shadow,
         "rs_skipped_count": len(skip_syms),
     }
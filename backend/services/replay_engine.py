@@ -0,0 +1,262 @@
+"""
+Point-in-time streaming replay for shadow / backfill scorers.
+
+Backfills used to rebuild "what did the scanner see at T" by truncating a day's
+candles at every as-of timestamp and rescoring the slice from scratch — O(bars²)
+per symbol, plus one INSERT per output row. ``replay_session`` instead walks a
+symbol's bars forward once, keeping incremental indicator state (session VWAP,
+EMAs, Wilder ATR, VWAP slope) in a ``SymbolState``, and hands an as-of
+``Snapshot`` to each pluggable scorer at every requested timestamp::
+
+    def score(snap: Snapshot) -> Optional[Dict[str, Any]]:
+        slope = snap.state.vwap_slope(6)
+        return None if slope is None else {"symbol": snap.key, "at": snap.as_of, "slope": slope}
+
+    sink = BulkRowWriter(lambda rows: insert_my_rows(db, rows))
+    for sym, candles in universe:
+        sink.extend(row for _, row in replay_session(candles, stamps, {"slope": score}, key=sym))
+    sink.flush()
+
+As-of semantics match the old ``_truncate_candles``: a snapshot at T sees every
+bar stamped at or before T, and every bar it sees counts as closed (historical
+sessions). The session is the IST date of the latest bar seen, like
+``rs_conviction_signals._today_slice``. State math reproduces
+``indicator_kernels`` (``cumulative_vwap``, ``ema_series``,
+``wilder_atr_series``) bit for bit.
+
+``bulk_insert`` / ``BulkRowWriter`` write scorer output as multi-row INSERTs.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from sqlalchemy import text
+
+from backend.services.asof_index import IST_OFFSET_NS, NS_PER_DAY, to_epoch_ns
+from backend.services.indicator_kernels import true_range
+
+# Rows per INSERT statement; keeps bind-parameter count well under Postgres' 65535.
+ROWS_PER_STATEMENT = 400
+
+
+def _f(v: Any, default: float = 0.0) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+class SymbolState:
+    """Incremental indicator state for one symbol, advanced one bar at a time.
+
+    ``candles`` is the as-of slice (ascending, original dicts); scorers that still
+    need legacy list-based helpers can read it but must not mutate or keep it —
+    it grows on the next ``update``.
+    """
+
+    def __init__(self, *, ema_spans: Sequence[int] = (5, 10, 20), atr_period: int = 14) -> None:
+        self.candles: List[Dict[str, Any]] = []
+        self.session_day: Optional[int] = None
+        self.session_start = 0
+        self.vwap: List[float] = []
+        self._cum_pv = 0.0
+        self._cum_v = 0.0
+        self._ema_k = {int(s): 2.0 / (float(s) + 1.0) for s in ema_spans}
+        self.ema: Dict[int, float] = {}
+        self.atr_period = int(atr_period)
+        self.atr: Optional[float] = None
+        self._tr_sum = 0.0
+        self._tr_n = 0
+        self.close = 0.0
+        self._prev_close: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.candles)
+
+    @property
+    def last(self) -> Optional[Dict[str, Any]]:
+        return self.candles[-1] if self.candles else None
+
+    @property
+    def session_bars(self) -> int:
+        return len(self.candles) - self.session_start
+
+    def update(self, candle: Dict[str, Any], ts_ns: int) -> None:
+        day = (ts_ns + IST_OFFSET_NS) // NS_PER_DAY
+        if day != self.session_day:
+            self.session_day = day
+            self.session_start = len(self.candles)
+            self.vwap = []
+            self._cum_pv = self._cum_v = 0.0
+        self.candles.append(candle)
+
+        h = _f(candle.get("high"))
+        lo = _f(candle.get("low"))
+        c = _f(candle.get("close"))
+        v = max(0.0, _f(candle.get("volume")))
+        self._cum_pv += (h + lo + c) / 3.0 * v
+        self._cum_v += v
+        self.vwap.append(self._cum_pv / self._cum_v if self._cum_v > 0 else c)
+
+        for span, k in self._ema_k.items():
+            e = self.ema.get(span)
+            self.ema[span] = c if e is None else c * k + e * (1.0 - k)
+
+        if self._prev_close is not None and self.atr_period >= 1:
+            tr = true_range(h, lo, self._prev_close)
+            if self._tr_n < self.atr_period:
+                self._tr_sum += tr
+                self._tr_n += 1
+                if self._tr_n == self.atr_period:
+                    self.atr = float(self._tr_sum / float(self.atr_period))
+            else:
+                self.atr = float((self.atr * float(self.atr_period - 1) + tr) / float(self.atr_period))
+        self._prev_close = c
+        self.close = c
+
+    def vwap_slope(self, lookback: int) -> Optional[float]:
+        """Session VWAP change over the last ``lookback`` bars; None until the session has them."""
+        if len(self.vwap) <= lookback:
+            return None
+        return self.vwap[-1] - self.vwap[-1 - lookback]
+
+
+@dataclass
+class Snapshot:
+    """What a scorer sees at one as-of timestamp (``index`` into the replay's stamps)."""
+
+    key: str
+    as_of: Any
+    index: int
+    state: SymbolState
+    ctx: Any = None
+
+
+Scorer = Callable[[Snapshot], Optional[Dict[str, Any]]]
+
+
+def _sorted_bars(candles: Iterable[Dict[str, Any]]) -> List[Tuple[int, Dict[str, Any]]]:
+    out = []
+    for c in candles or ():
+        ns = to_epoch_ns(c.get("timestamp"))
+        if ns is not None:
+            out.append((ns, c))
+    out.sort(key=lambda x: x[0])
+    return out
+
+
+def replay_session(
+    candles: Iterable[Dict[str, Any]],
+    stamps: Sequence[Any],
+    scorers: Mapping[str, Scorer],
+    *,
+    key: str = "",
+    ctx: Any = None,
+    state: Optional[SymbolState] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Walk ``candles`` once, yielding ``(scorer_name, row)`` for each non-empty score at each stamp.
+
+    ``stamps`` must be ascending (datetimes / ISO strings / anything ``to_epoch_ns`` reads).
+    Unparseable candle timestamps are dropped; candles may arrive in any order.
+    """
+    bars = _sorted_bars(candles)
+    st = state if state is not None else SymbolState()
+    j = 0
+    for i, as_of in enumerate(stamps):
+        cutoff = to_epoch_ns(as_of)
+        if cutoff is None:
+            continue
+        while j < len(bars) and bars[j][0] <= cutoff:
+            st.update(bars[j][1], bars[j][0])
+            j += 1
+        if not st.candles:
+            continue
+        snap = Snapshot(key=key, as_of=as_of, index=i, state=st, ctx=ctx)
+        for name, scorer in scorers.items():
+            row = scorer(snap)
+            if row is not None:
+                yield name, row
+
+
+def _values_clause(n: int, cols: Sequence[str], casts: Mapping[str, str]) -> str:
+    parts = []
+    for i in range(n):
+        binds = ", ".join(casts.get(c, "{}").format(f":{c}_{i}") for c in cols)
+        parts.append(f"({binds})")
+    return ",\n".join(parts)
+
+
+def bulk_insert(
+    db,
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Mapping[str, Any]],
+    *,
+    casts: Optional[Mapping[str, str]] = None,
+    rows_per_statement: int = ROWS_PER_STATEMENT,
+) -> int:
+    """Multi-row ``INSERT INTO table (columns) VALUES (...), (...)``. Caller commits.
+
+    ``casts`` wraps a column's bind, e.g. ``{"session_date": "CAST({} AS date)"}``.
+    Missing keys insert NULL.
+    """
+    casts = casts or {}
+    n = 0
+    step = max(1, int(rows_per_statement))
+    for start in range(0, len(rows), step):
+        chunk = rows[start : start + step]
+        params: Dict[str, Any] = {}
+        for i, r in enumerate(chunk):
+            for c in columns:
+                params[f"{c}_{i}"] = r.get(c)
+        db.execute(
+            text(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES\n"
+                f"{_values_clause(len(chunk), columns, casts)}"
+            ),
+            params,
+        )
+        n += len(chunk)
+    return n
+
+
+class BulkRowWriter:
+    """Buffer scorer rows and hand them to ``flush_fn(rows) -> int`` every ``batch_rows``."""
+
+    def __init__(self, flush_fn: Callable[[List[Dict[str, Any]]], int], *, batch_rows: int = 2000) -> None:
+        self.flush_fn = flush_fn
+        self.batch_rows = max(1, int(batch_rows))
+        self.written = 0
+        self._buf: List[Dict[str, Any]] = []
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self._buf.append(row)
+        if len(self._buf) >= self.batch_rows:
+            self.flush()
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> int:
+        n = 0
+        for r in rows:
+            self.add(r)
+            n += 1
+        return n
+
+    def flush(self) -> int:
+        if not self._buf:
+            return 0
+        rows, self._buf = self._buf, []
+        n = int(self.flush_fn(rows) or 0)
+        self.written += n
+        return n
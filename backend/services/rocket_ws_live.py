@@ -717,5 +717,5 @@ def ensure_rocket_feed_running() -> None:
     if not keys:
         logger.warning("rocket_ws_live: no arbitrage_master current-month keys")
         return
-    ensure_market_feed_running(keys)
+    ensure_market_feed_running(keys, consumer="rocket_live")
     logger.info("rocket_ws_live: ensured feed for %s current-month futures", len(keys))
@@ -20,6 +20,7 @@ from backend.services.kavach_confidence import REGIME_TREND
 from backend.services.kavach_engine import RANKING_BEARISH, RANKING_BULLISH
 from backend.services.rs_conviction_candles import candles_cache_only, load_instrument_atr_maps
 from backend.services.rs_conviction_config import get_config
+from backend.services.replay_engine import bulk_insert
 from backend.services.rs_conviction_signals import normalized_vwap_slope
 from backend.services.rs_fast_watch import is_edge_flip, kavach_direction, _is_reversal
 from backend.services.smart_futures_picker.position_sizing import get_futures_lot_size_by_instrument_key
@@ -141,8 +142,29 @@ def evaluate_go_candidate(
     return True, "shown", detail
 
 
-def _log_shadow(
-    db,
+_SHADOW_LOG_COLS = (
+    "session_date",
+    "evaluated_at",
+    "symbol",
+    "side",
+    "outcome",
+    "filter_reason",
+    "is_reversal",
+    "confidence_grade",
+    "kavach_state",
+    "price",
+    "freshness_pct",
+    "stop_pct",
+    "stop_inr_1lot",
+    "vwap_slope",
+    "adx",
+    "regime",
+    "window_label",
+    "detail_json",
+)
+
+
+def _shadow_log_row(
     session_date: str,
     evaluated_at: datetime,
     symbol: str,
@@ -151,44 +173,32 @@ def _log_shadow(
     filter_reason: str,
     detail: Dict[str, Any],
     window_label: Optional[str],
-) -> None:
-    db.execute(
-        text(
-            """
-            INSERT INTO rs_go_board_shadow_log (
-                session_date, evaluated_at, symbol, side, outcome, filter_reason,
-                is_reversal, confidence_grade, kavach_state, price,
-                freshness_pct, stop_pct, stop_inr_1lot, vwap_slope, adx, regime,
-                window_label, detail_json
-            ) VALUES (
-                :sd, :at, :sym, :side, :outcome, :reason,
-                :rev, :grade, :kav, :price,
-                :fresh, :stop_pct, :stop_inr, :slope, :adx, :regime,
-                :win, :detail
-            )
-            """
-        ),
-        {
-            "sd": session_date,
-            "at": evaluated_at,
-            "sym": symbol,
-            "side": side,
-            "outcome": outcome,
-            "reason": filter_reason,
-            "rev": detail.get("is_reversal"),
-            "grade": detail.get("confidence_grade"),
-            "kav": detail.get("kavach_state"),
-            "price": detail.get("price"),
-            "fresh": detail.get("freshness_pct"),
-            "stop_pct": detail.get("stop_pct"),
-            "stop_inr": detail.get("stop_inr_1lot"),
-            "slope": detail.get("vwap_slope"),
-            "adx": detail.get("adx"),
-            "regime": detail.get("regime"),
-            "win": window_label,
-            "detail": json.dumps(detail),
-        },
-    )
+) -> Dict[str, Any]:
+    return {
+        "session_date": session_date,
+        "evaluated_at": evaluated_at,
+        "symbol": symbol,
+        "side": side,
+        "outcome": outcome,
+        "filter_reason": filter_reason,
+        "is_reversal": detail.get("is_reversal"),
+        "confidence_grade": detail.get("confidence_grade"),
+        "kavach_state": detail.get("kavach_state"),
+        "price": detail.get("price"),
+        "freshness_pct": detail.get("freshness_pct"),
+        "stop_pct": detail.get("stop_pct"),
+        "stop_inr_1lot": detail.get("stop_inr_1lot"),
+        "vwap_slope": detail.get("vwap_slope"),
+        "adx": detail.get("adx"),
+        "regime": detail.get("regime"),
+        "window_label": window_label,
+        "detail_json": json.dumps(detail),
+    }
+
+
+def _log_shadow_rows(db, rows: List[Dict[str, Any]]) -> int:
+    """One multi-row INSERT per batch into ``rs_go_board_shadow_log``. Caller commits."""
+    return bulk_insert(db, "rs_go_board_shadow_log", _SHADOW_LOG_COLS, rows)
 
 
 def get_go_board(session_date: Optional[str] = None) -> Dict[str, Any]:
@@ -226,6 +236,7 @@ def _build_panel_at(
     db = SessionLocal()
     shown: List[Dict[str, Any]] = []
     shadow_rows: List[Dict[str, Any]] = []
+    log_rows: List[Dict[str, Any]] = []
     try:
         locked = set(get_locked_symbols(db, session_date))
         lock_dirs = locked_direction_map(db, session_date)
@@ -275,12 +286,13 @@ def _build_panel_at(
             row = {**detail, "filter_reason": reason, "outcome": "shown" if ok else "filtered"}
             shadow_rows.append(row)
             if persist_shadow:
-                _log_shadow(db, session_date, now, sym, side, row["outcome"], reason, detail, wl)
+                log_rows.append(_shadow_log_row(session_date, now, sym, side, row["outcome"], reason, detail, wl))
             if ok:
                 shown.append(detail)
 
         shown = sorted(shown, key=lambda x: (-float(x.get("vwap_slope") or 0), x.get("symbol", "")))[:max_syms]
         if persist_shadow:
+            _log_shadow_rows(db, log_rows)
             db.commit()
     finally:
         db.close()
@@ -288,45 +300,52 @@ def _build_panel_at(
 
 
 def replay_go_board_day(session_date: str) -> Dict[str, Any]:
-    """Replay GO Board decisions at key timestamps for verification."""
+    """Replay GO Board decisions at key timestamps for verification.
+
+    Per symbol the candles, lock direction and 10m Kavach timeline are built
+    once and every checkpoint reads from them (they used to be rebuilt per
+    checkpoint).
+    """
     cfg = get_config()
     checkpoints = ["09:45", "10:00", "10:35", "11:05"]
     db = SessionLocal()
     results: Dict[str, Any] = {"session_date": session_date, "checkpoints": {}}
     try:
         ikey_map, atr_map = load_instrument_atr_maps(db, {"TRENT", "LAURUSLABS"})
+        lock_dirs = locked_direction_map(db, session_date)
+        ck_times = {}
         for ck in checkpoints:
             h, m = map(int, ck.split(":"))
             now = IST.localize(datetime.strptime(session_date, "%Y-%m-%d").replace(hour=h, minute=m))
-            wl = _window_label(now)
-            ck_out: Dict[str, Any] = {"window": wl, "symbols": {}}
-            for sym in ("TRENT", "LAURUSLABS"):
-                ikey = ikey_map.get(sym)
-                candles = candles_cache_only(ikey) if ikey else None
+            ck_times[ck] = now
+            results["checkpoints"][ck] = {"window": _window_label(now), "symbols": {}}
+        for sym in ("TRENT", "LAURUSLABS"):
+            ikey = ikey_map.get(sym)
+            candles = candles_cache_only(ikey) if ikey else None
+            lock = lock_dirs.get(sym, "SHORT")
+            side = "LONG" if sym == "TRENT" else "SHORT"
+            ranking = RANKING_BULLISH if side == "LONG" else RANKING_BEARISH
+            rows = timeline_states(candles, ranking_type=ranking) if candles else []
+            for ck, now in ck_times.items():
+                out = results["checkpoints"][ck]["symbols"]
                 if not candles:
-                    ck_out["symbols"][sym] = {"error": "no_candles"}
+                    out[sym] = {"error": "no_candles"}
                     continue
-                lock_dirs = locked_direction_map(db, session_date)
-                lock = lock_dirs.get(sym, "SHORT")
-                side = "LONG" if sym == "TRENT" else "SHORT"
-                ranking = RANKING_BULLISH if side == "LONG" else RANKING_BEARISH
                 metrics = metrics_from_10m_candles(candles, ranking_type=ranking, nifty_pct=0.0, now=now)
                 if not metrics:
-                    ck_out["symbols"][sym] = {"error": "no_metrics"}
+                    out[sym] = {"error": "no_metrics"}
                     continue
-                rows = timeline_states(candles, ranking_type=ranking)
                 prev, new = None, None
                 for row in rows:
                     if row["bar_end_ist"] <= ck:
                         new = row["kavach_state"]
-                for row in rows:
                     if row["bar_end_ist"] < ck:
                         prev = row["kavach_state"]
                 is_rev = _is_reversal(new, lock) if new else False
                 flip_price = metrics.get("price")
                 ok, reason, detail = evaluate_go_candidate(
                     symbol=sym,
-                    side=side if sym == "TRENT" else "SHORT",
+                    side=side,
                     metrics=metrics,
                     flip_price=float(flip_price or 0),
                     is_reversal=is_rev,
@@ -337,14 +356,13 @@ def replay_go_board_day(session_date: str) -> Dict[str, Any]:
                     cfg=cfg,
                     evaluated_at=now,
                 )
-                ck_out["symbols"][sym] = {
+                out[sym] = {
                     "show": ok,
                     "reason": reason,
                     "kavach": metrics.get("kavach_state"),
                     "prev": prev,
                     "detail": detail,
                 }
-            results["checkpoints"][ck] = ck_out
     finally:
         db.close()
     return results
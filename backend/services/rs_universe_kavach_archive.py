@@ -24,12 +24,13 @@ from backend.services.kavach_engine import (
     BULLISH_STATES,
     RANKING_BEARISH,
     RANKING_BULLISH,
-    compute_trade_score,
 )
 from backend.services.relative_strength_scanner import (
     TOP_N,
+    _apply_kavach,
     _compute_symbol_metrics,
     _nifty_change_pct,
+    raw_trade_scores,
 )
 from backend.services.upstox_service import UpstoxService
 from backend.services.arbitrage_universe import load_arbitrage_curr_mth_universe
@@ -120,27 +121,19 @@ def _score_directional(rows: List[Dict[str, Any]]) -> Tuple[List[Dict], List[Dic
     """Score all Kavach-directional rows (no TOP_N slice) — shadow of _rank()."""
     bullish: List[Dict] = []
     bearish: List[Dict] = []
+    directional: List[Dict] = []
     for r in rows:
         state = r.get("kavach_state")
         if state in BULLISH_STATES:
             ranking_type = RANKING_BULLISH
-            bucket = bullish
         elif state in BEARISH_STATES:
             ranking_type = RANKING_BEARISH
-            bucket = bearish
         else:
             continue
         row = dict(r)
         row["ranking_type"] = ranking_type
-        raw_score = compute_trade_score(
-            rs=row["relative_strength"],
-            state=state,
-            volume_ratio=row["volume_ratio"],
-            adx=row["adx"],
-            price=row["current_price"],
-            vwap=row["vwap"],
-            ranking_type=ranking_type,
-        )
+        directional.append(row)
+    for row, raw_score in zip(directional, raw_trade_scores(directional)):
         resolved = resolve_score_and_grade(
             raw_score,
             row.get("volume_label") or "Low",
@@ -153,7 +146,7 @@ def _score_directional(rows: List[Dict[str, Any]]) -> Tuple[List[Dict], List[Dic
         row["trade_score"] = resolved["trade_score"]
         row["confidence_grade"] = resolved["confidence_grade"]
         row["stretch"] = resolved.get("stretch") or {}
-        bucket.append(row)
+        (bullish if row["ranking_type"] == RANKING_BULLISH else bearish).append(row)
     bullish.sort(key=lambda x: (-x["relative_strength"], -x["trade_score"]))
     bearish.sort(key=lambda x: (x["relative_strength"], -x["trade_score"]))
     for i, row in enumerate(bullish, start=1):
@@ -197,7 +190,9 @@ def run_universe_kavach_archive(*, force: bool = False) -> Dict[str, Any]:
     errors = 0
     for entry in universe:
         try:
-            m, _excl = _compute_symbol_metrics(upstox, entry, nifty_pct, cache_only=False)
+            m, _excl = _compute_symbol_metrics(
+                upstox, entry, nifty_pct, cache_only=False, defer_kavach=True
+            )
             if m:
                 m.pop("from_cache", None)
                 rows.append(m)
@@ -205,6 +200,9 @@ def run_universe_kavach_archive(*, force: bool = False) -> Dict[str, Any]:
             errors += 1
             logger.debug("archive metrics failed %s: %s", entry.get("stock"), exc)
 
+    for r, exc in _apply_kavach(rows):
+        errors += 1
+        logger.debug("archive kavach failed %s: %s", r.get("symbol"), exc)
     bull_scored, bear_scored = _score_directional(rows)
     rank_bull = {r["symbol"]: r.get("would_be_rank_bull") for r in bull_scored}
     rank_bear = {r["symbol"]: r.get("would_be_rank_bear") for r in bear_scored}
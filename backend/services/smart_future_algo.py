@@ -40,26 +40,11 @@ log_dir = Path(__file__).parent.parent.parent / 'logs'
 log_dir.mkdir(exist_ok=True)
 log_file = log_dir / 'smart_future_algo.log'
 
-# Create file handler for smart_future_algo.log with immediate flushing
-class FlushingFileHandler(logging.FileHandler):
-    """FileHandler that flushes after each log entry to ensure immediate writes"""
-    def emit(self, record):
-        super().emit(record)
-        self.flush()
-        # Also force OS-level flush to ensure data is written to disk
-        if hasattr(self.stream, 'fileno'):
-            try:
-                import os
-                os.fsync(self.stream.fileno())
-            except (OSError, AttributeError):
-                pass  # Ignore if fsync fails
-
-file_handler = FlushingFileHandler(log_file, mode='a', encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter(
-    '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-))
+# One queue-backed handler per log file, shared by every logger below (buffered writes,
+# fsync on a cadence / on ERROR, rotation) — see services/log_pipeline.py
+from backend.services.log_pipeline import get_file_handler
+
+file_handler = get_file_handler(log_file, level=logging.INFO)
 
 # Create logger for smart_future_algo (does NOT propagate to root logger)
 logger = logging.getLogger('smart_future_algo')
@@ -154,21 +139,14 @@ for job_logger in job_loggers:
     # Check if handler already exists to avoid duplicates by checking baseFilename attribute
     handler_exists = False
     for h in job_logger.handlers:
-        if isinstance(h, logging.FileHandler):
-            # Check if this handler points to our log file
-            handler_path = getattr(h, 'baseFilename', None) or getattr(h, 'stream', {}).name if hasattr(getattr(h, 'stream', None), 'name') else None
-            if handler_path and 'smart_future_algo.log' in str(handler_path):
-                handler_exists = True
-                break
+        # Check if this handler points to our log file
+        handler_path = getattr(h, 'baseFilename', None)
+        if handler_path and 'smart_future_algo.log' in str(handler_path):
+            handler_exists = True
+            break
     
     if not handler_exists:
-        # Create a new handler instance for this logger
-        job_file_handler = FlushingFileHandler(log_file, mode='a', encoding='utf-8')
-        job_file_handler.setLevel(logging.INFO)
-        job_file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        ))
+        job_file_handler = get_file_handler(log_file, level=logging.INFO)
         job_logger.addHandler(job_file_handler)
         # Disable propagation to root logger so logs ONLY go to smart_future_algo.log
         # This prevents duplicate logs in trademanthan.log
@@ -188,23 +166,13 @@ def _attach_smart_future_mirror_loggers() -> None:
         ml = logging.getLogger(name)
         handler_exists = False
         for h in ml.handlers:
-            if isinstance(h, logging.FileHandler):
-                handler_path = getattr(h, "baseFilename", None) or (
-                    getattr(h.stream, "name", None) if getattr(h, "stream", None) else None
-                )
-                if handler_path and "smart_future_algo.log" in str(handler_path):
-                    handler_exists = True
-                    break
+            handler_path = getattr(h, "baseFilename", None)
+            if handler_path and "smart_future_algo.log" in str(handler_path):
+                handler_exists = True
+                break
         if handler_exists:
             continue
-        mirror_handler = FlushingFileHandler(log_file, mode="a", encoding="utf-8")
-        mirror_handler.setLevel(logging.INFO)
-        mirror_handler.setFormatter(
-            logging.Formatter(
-                "%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-                datefmt="%Y-%m-%d %H:%M:%S",
-            )
-        )
+        mirror_handler = get_file_handler(log_file, level=logging.INFO)
         ml.addHandler(mirror_handler)
         # propagate stays True: logs go to smart_future_algo.log AND root/trademanthan.log
 
@@ -715,6 +683,48 @@ class SmartFutureAlgoScheduler:
                 "✅ Scheduled: Centralized curr-month market data (every 10 min at :05/:15/… IST)"
             )
 
+            # Bar-close prefetch: curr-month 5m into the shared candle cache ~20 s
+            # after every 5m close so scanners read warm data (background RL priority).
+            def run_candle_prefetch_5m():
+                if _skip_ist_non_trading_job("5m candle prefetch"):
+                    return
+                ist = pytz.timezone("Asia/Kolkata")
+                t = datetime.now(ist).time()
+                if t < dt_time(9, 20) or t > dt_time(15, 31):
+                    return
+                try:
+                    from backend.services.market_data.scheduler import run_candle_prefetch_5m_job
+
+                    out = run_candle_prefetch_5m_job()
+                    logger.debug("5m candle prefetch: %s", out)
+                except Exception as e:
+                    logger.error("❌ 5m candle prefetch failed: %s", e, exc_info=True)
+
+            if getattr(settings, "CANDLE_PREFETCH_5M_ENABLED", True):
+                self.scheduler.add_job(
+                    run_candle_prefetch_5m,
+                    trigger=CronTrigger(
+                        day_of_week="mon-fri",
+                        hour="9-15",
+                        minute="*/5",
+                        second=max(0, min(59, int(getattr(settings, "CANDLE_PREFETCH_5M_DELAY_SEC", 20)))),
+                        timezone="Asia/Kolkata",
+                    ),
+                    id="candle_prefetch_5m",
+                    name="Curr-month 5m candle prefetch (after each 5m bar close)",
+                    replace_existing=True,
+                    max_instances=1,
+                    misfire_grace_time=60,
+                    coalesce=True,
+                )
+                logger.info("✅ Scheduled: Curr-month 5m candle prefetch (every 5m bar close)")
+            else:
+                try:
+                    if self.scheduler.get_job("candle_prefetch_5m"):
+                        self.scheduler.remove_job("candle_prefetch_5m")
+                except Exception:
+                    pass
+
             # 2a — Stock/next LTP via WebSocket every 30 minutes (unchanged parallel flow).
             def run_stock_next_ws_ltp_refresh():
                 if _skip_ist_non_trading_job("stock/next WS LTP"):
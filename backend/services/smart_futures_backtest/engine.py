@@ -15,6 +15,8 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from backend.config import settings
+from backend.services.asof_index import AsOfIndex, to_epoch_ns
+from backend.services.market_data.candle_store import historical_candles
 from backend.services.smart_futures_backtest.april_2026_universe import (
     APRIL_2026_FUT_SESSION_END,
     load_april_2026_futures_by_underlying,
@@ -52,7 +54,6 @@ from backend.services.smart_futures_picker.indicators import (
 from backend.services.smart_futures_picker.job import (
     SECTOR_ALIGN_MIN,
     ScoredPick,
-    _ist_date_from_ts,
     _session_elapsed_fraction,
     _sort_candles,
 )
@@ -95,7 +96,8 @@ def _parse_bar_end_ist(ts: str) -> Optional[datetime]:
     if not ts or len(ts) < 19:
         return None
     try:
-        return datetime.strptime(ts[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=IST)
+        # localize, not replace(tzinfo=IST): pytz's bare zone is LMT +05:53
+        return IST.localize(datetime.strptime(ts[:19], "%Y-%m-%dT%H:%M:%S"))
     except ValueError:
         return None
 
@@ -116,30 +118,21 @@ def _daily_last_n_upto(daily_raw: Optional[List[dict]], session_date: date, n: i
     return acc[-n:]
 
 
+def _bars_session_upto(bars_sorted: List[dict], session_date: date, cutoff_ist: datetime) -> List[dict]:
+    """Bars of ``session_date`` whose end time is at or before ``cutoff_ist`` (one as-of index, no per-bar parse)."""
+    if not bars_sorted:
+        return []
+    idx = AsOfIndex.from_wall_clock(b.get("timestamp") for b in bars_sorted)
+    lo, hi = idx.session_range(session_date, upto_ns=to_epoch_ns(cutoff_ist))
+    return [bars_sorted[k] for k in sorted(idx.order[lo:hi].tolist())]
+
+
 def _m5_session_upto(m5_sorted: List[dict], session_date: date, cutoff_ist: datetime) -> List[dict]:
-    out: List[dict] = []
-    for b in m5_sorted:
-        ts = str(b.get("timestamp") or "")
-        if _ist_date_from_ts(ts) != session_date:
-            continue
-        t_end = _parse_bar_end_ist(ts)
-        if t_end is None or t_end > cutoff_ist:
-            continue
-        out.append(b)
-    return out
+    return _bars_session_upto(m5_sorted, session_date, cutoff_ist)
 
 
 def _m15_session_upto(m15_sorted: List[dict], session_date: date, cutoff_ist: datetime) -> List[dict]:
-    out: List[dict] = []
-    for b in m15_sorted:
-        ts = str(b.get("timestamp") or "")
-        if _ist_date_from_ts(ts) != session_date:
-            continue
-        t_end = _parse_bar_end_ist(ts)
-        if t_end is None or t_end > cutoff_ist:
-            continue
-        out.append(b)
-    return out
+    return _bars_session_upto(m15_sorted, session_date, cutoff_ist)
 
 
 def _aggregate_m5_to_m15_session(
@@ -200,21 +193,16 @@ def _required_m5_bars_for_cutoff(cutoff_ist: datetime) -> int:
 def _entry_price_at_cutoff(upstox: UpstoxService, fut_key: str, cutoff_ist: datetime) -> Optional[float]:
     try:
         end_d = cutoff_ist.astimezone(IST).date()
-        c = upstox.get_historical_candles_by_instrument_key(
-            fut_key, interval="minutes/1", days_back=120, range_end_date=end_d
+        c = historical_candles(
+            upstox, fut_key, interval="minutes/1", days_back=120, range_end_date=end_d
         )
         s = _sort_candles(c)
         if not s:
             return None
-        for bar in reversed(s):
-            ts = str(bar.get("timestamp") or "")
-            t_end = _parse_bar_end_ist(ts)
-            if t_end is None:
-                continue
-            if t_end <= cutoff_ist:
-                cl = float(bar.get("close") or 0)
-                return cl if cl > 0 else None
-        cl = float(s[-1].get("close") or 0)
+        idx = AsOfIndex.from_wall_clock(bar.get("timestamp") for bar in s)
+        pos = idx.asof(to_epoch_ns(cutoff_ist))
+        bar = s[idx.source(pos)] if pos >= 0 else s[-1]
+        cl = float(bar.get("close") or 0)
         return cl if cl > 0 else None
     except Exception:
         return None
@@ -222,25 +210,21 @@ def _entry_price_at_cutoff(upstox: UpstoxService, fut_key: str, cutoff_ist: date
 
 def _vix_at_cutoff(upstox: UpstoxService, session_date: date, cutoff_ist: datetime) -> Optional[float]:
     try:
-        c = upstox.get_historical_candles_by_instrument_key(
+        c = historical_candles(
+            upstox,
             INDIA_VIX_KEY,
             interval="minutes/5",
             days_back=120,
             range_end_date=session_date,
         )
         s = _sort_candles(c)
-        last: Optional[float] = None
-        for bar in s:
-            ts = str(bar.get("timestamp") or "")
-            if _ist_date_from_ts(ts) != session_date:
-                continue
-            t_end = _parse_bar_end_ist(ts)
-            if t_end is None or t_end > cutoff_ist:
-                continue
-            lp = float(bar.get("close") or 0)
+        idx = AsOfIndex.from_wall_clock(bar.get("timestamp") for bar in s)
+        lo, hi = idx.session_range(session_date, upto_ns=to_epoch_ns(cutoff_ist))
+        for k in sorted(idx.order[lo:hi].tolist(), reverse=True):
+            lp = float(s[k].get("close") or 0)
             if lp > 0:
-                last = lp
-        return last
+                return lp
+        return None
     except Exception:
         return None
 
@@ -258,8 +242,8 @@ def score_symbol_backtest(
     index_long_ok: bool = False,
     index_short_ok: bool = False,
 ) -> Optional[ScoredPick]:
-    daily_raw = upstox.get_historical_candles_by_instrument_key(
-        fut_key, interval="days/1", days_back=120, range_end_date=session_date
+    daily_raw = historical_candles(
+        upstox, fut_key, interval="days/1", days_back=120, range_end_date=session_date
     )
     daily = _daily_last_n_upto(daily_raw, session_date, 10)
     if len(daily) < 10:
@@ -269,8 +253,8 @@ def score_symbol_backtest(
     avg_daily_vol = sum(vols_d) / 10.0
     obv_slope = compute_obv_slope_daily(closes_d, vols_d)
 
-    m5_raw = upstox.get_historical_candles_by_instrument_key(
-        fut_key, interval="minutes/5", days_back=120, range_end_date=session_date
+    m5_raw = historical_candles(
+        upstox, fut_key, interval="minutes/5", days_back=120, range_end_date=session_date
     )
     m5 = _sort_candles(m5_raw)
     m5_today = _m5_session_upto(m5, session_date, cutoff_ist)
@@ -299,8 +283,8 @@ def score_symbol_backtest(
     ):
         return None
 
-    m15_raw = upstox.get_historical_candles_by_instrument_key(
-        fut_key, interval="minutes/15", days_back=120, range_end_date=session_date
+    m15_raw = historical_candles(
+        upstox, fut_key, interval="minutes/15", days_back=120, range_end_date=session_date
     )
     m15 = _sort_candles(m15_raw)
     m15_today = _m15_session_upto(m15, session_date, cutoff_ist)
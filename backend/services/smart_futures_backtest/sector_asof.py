@@ -7,6 +7,7 @@ import logging
 from datetime import date, datetime
 from typing import List, Optional, Tuple
 
+from backend.services.market_data.candle_store import historical_candles
 from backend.services.smart_futures_picker.sector_score import resolve_sector_instrument_key_for_stock
 from backend.services.upstox_service import UpstoxService
 
@@ -43,8 +44,8 @@ def sector_score_as_of(
     if not ikey:
         return 0.0
     try:
-        candles = upstox.get_historical_candles_by_instrument_key(
-            ikey, interval="days/1", days_back=160, range_end_date=as_of
+        candles = historical_candles(
+            upstox, ikey, interval="days/1", days_back=160, range_end_date=as_of
         )
     except Exception as e:
         logger.debug("sector_asof fetch failed %s: %s", ikey, e)
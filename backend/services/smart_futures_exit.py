@@ -19,6 +19,7 @@ from backend.services.smart_futures_config import (
     TRAIL_STAGE2_ATR_MULT,
     TRAILING_STOP_ENABLED,
 )
+from backend.services.indicator_kernels import ema_series, supertrend_series
 from backend.services.smart_futures_picker.indicators import (
     adx_last_two,
     divergence_bundle,
@@ -37,11 +38,7 @@ BANKNIFTY_KEY = "NSE_INDEX|Nifty Bank"
 def _ema_last(series: Sequence[float], span: int) -> Optional[float]:
     if not series:
         return None
-    k = 2.0 / (float(span) + 1.0)
-    e = float(series[0])
-    for v in series[1:]:
-        e = float(v) * k + e * (1.0 - k)
-    return float(e)
+    return float(ema_series(series, span)[-1])
 
 
 def _supertrend_dir_last_two(
@@ -58,28 +55,12 @@ def _supertrend_dir_last_two(
     n = len(closes)
     if n < max(20, period + 3):
         return None, None
-    fub: List[float] = [0.0] * n
-    flb: List[float] = [0.0] * n
-    st: List[float] = [0.0] * n
-    direction: List[int] = [1] * n
-    for i in range(n):
-        atr_i = wilder_atr(highs[: i + 1], lows[: i + 1], closes[: i + 1], period)
-        if atr_i is None:
-            continue
-        hl2 = (float(highs[i]) + float(lows[i])) / 2.0
-        bub = hl2 + float(multiplier) * float(atr_i)
-        blb = hl2 - float(multiplier) * float(atr_i)
-        if i == 0:
-            fub[i], flb[i], st[i], direction[i] = bub, blb, blb, 1
-            continue
-        fub[i] = bub if (bub < fub[i - 1] or float(closes[i - 1]) > fub[i - 1]) else fub[i - 1]
-        flb[i] = blb if (blb > flb[i - 1] or float(closes[i - 1]) < flb[i - 1]) else flb[i - 1]
-        if st[i - 1] == fub[i - 1]:
-            st[i] = fub[i] if float(closes[i]) <= fub[i] else flb[i]
-        else:
-            st[i] = flb[i] if float(closes[i]) >= flb[i] else fub[i]
-        direction[i] = 1 if float(closes[i]) >= st[i] else -1
-    return int(direction[-1]), int(direction[-2])
+    _, direction = supertrend_series(
+        highs, lows, closes, period, multiplier, seed_first_bar=False, compare_prev_band=True
+    )
+    # Bars without an ATR (period < 1) read as +1, as the old preallocated arrays did.
+    cur, prev = direction[-1], direction[-2]
+    return (1 if cur is None else cur), (1 if prev is None else prev)
 
 
 def _supertrend_dir_last(
@@ -94,13 +75,7 @@ def _supertrend_dir_last(
 
 
 def _ema_series_last(series: Sequence[float], span: int) -> Optional[float]:
-    if not series:
-        return None
-    k = 2.0 / (float(span) + 1.0)
-    e = float(series[0])
-    for v in series[1:]:
-        e = float(v) * k + e * (1.0 - k)
-    return float(e)
+    return _ema_last(series, span)
 
 
 def _to_dt(ts: str) -> Optional[datetime]:
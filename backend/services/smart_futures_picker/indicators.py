@@ -8,6 +8,8 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Dict, List, Optional, Sequence, Tuple
 
+from backend.services.indicator_kernels import adx_last_two as kernel_adx_last_two
+from backend.services.indicator_kernels import adx_series
 from backend.services.smart_futures_config import ADX_SLOW_LENGTH, cms_weights_active
 
 # --- OBV slope (exact user spec, linregress slope only) ---
@@ -129,48 +131,19 @@ def volume_surge_ratio(
     return cum / max(1e-6, exp)
 
 
-# --- ADX via pandas_ta (Wilder-compatible); length from config ---
-
-
-def _adx_column_name(adx_df, length: int) -> Optional[str]:
-    for candidate in (f"ADX_{length}", f"ADX_{int(length)}"):
-        if candidate in adx_df.columns:
-            return candidate
-    # Fallback: pandas_ta may emit multiple ADX*-prefixed cols; skip ADXR (different indicator).
-    for c in adx_df.columns:
-        cs = str(c).upper()
-        if cs.startswith("ADX") and "ADXR" not in cs:
-            return str(c)
-    return None
+# --- ADX (pandas_ta-compatible, Wilder/TradingView); length from config ---
 
 
 def adx_value(
     highs: Sequence[float], lows: Sequence[float], closes: Sequence[float], length: int
 ) -> Optional[float]:
     try:
-        import pandas as pd
-        import pandas_ta as ta
-
         need = max(30, length + 20)
         if len(closes) < need:
             return None
-        df = pd.DataFrame({"high": list(highs), "low": list(lows), "close": list(closes)})
         # TradingView default ADX: DI length == ADX smoothing length.
-        adx_df = ta.adx(
-            df["high"], df["low"], df["close"], length=int(length), lensig=int(length)
-        )
-        if adx_df is None or adx_df.empty:
-            return None
-        col = _adx_column_name(adx_df, int(length))
-        if not col:
-            return None
-        v = adx_df[col].iloc[-1]
-        try:
-            if v is None or v != v:  # NaN
-                return None
-        except Exception:
-            return None
-        return float(v)
+        adx, _, _ = adx_series(highs, lows, closes, int(length), int(length))
+        return adx[-1] if adx else None
     except Exception:
         return None
 
@@ -307,25 +280,13 @@ def adx_last_two(
 ) -> Tuple[Optional[float], Optional[float]]:
     """Latest ADX(length) and previous bar ADX, or (None, None) if unavailable."""
     try:
-        import pandas as pd
-        import pandas_ta as ta
-
         need = max(32, int(length) + 20)
         if len(closes) < need:
             return None, None
-        df = pd.DataFrame({"high": list(highs), "low": list(lows), "close": list(closes)})
-        adx_df = ta.adx(
-            df["high"], df["low"], df["close"], length=int(length), lensig=int(length)
-        )
-        if adx_df is None or adx_df.empty:
-            return None, None
-        col = _adx_column_name(adx_df, int(length))
-        if not col:
-            return None, None
-        series = adx_df[col].dropna()
-        if len(series) < 2:
+        last, prev = kernel_adx_last_two(highs, lows, closes, int(length), int(length))
+        if last is None or prev is None:
             return None, None
-        return float(series.iloc[-1]), float(series.iloc[-2])
+        return last, prev
     except Exception:
         return None, None
 
@@ -89,6 +89,7 @@ from backend.services.smart_futures_signal_gates import (
     sentiment_blocks_side,
     vwap_side_confirmed,
 )
+from backend.services.upstox_rate_limiter import CandlePriority, candle_priority
 from backend.services.upstox_service import UpstoxService
 
 logger = logging.getLogger(__name__)
@@ -1763,9 +1764,11 @@ def run_smart_futures_picker_job(scan_trigger: str = "") -> Dict[str, Any]:
             if not entry or entry <= 0:
                 logger.warning("smart_futures_picker: no entry for %s", pick.stock)
                 continue
-            m5_raw = upstox.get_historical_candles_by_instrument_key(
-                pick.fut_instrument_key, interval="minutes/5", days_back=6
-            )
+            # Entry confirmation: outranks the 10m warm in the candle queue.
+            with candle_priority(CandlePriority.ORDER):
+                m5_raw = upstox.get_historical_candles_by_instrument_key(
+                    pick.fut_instrument_key, interval="minutes/5", days_back=6
+                )
             m5_sess = [
                 b
                 for b in _sort_candles(m5_raw)
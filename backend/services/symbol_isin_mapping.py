@@ -211,6 +211,19 @@ SYMBOL_TO_ISIN_FALLBACK = {
     "PERSISTENTSYS": "INE262H01021",  # Alias for Persistent Systems
 }
 
+def _instrument_master():
+    from backend.services.instrument_master import get_instrument_master
+    return get_instrument_master(INSTRUMENTS_FILE)
+
+def _nse_eq_rows() -> list:
+    """NSE_EQ rows from the indexed instrument master (falls back to parsing the JSON)."""
+    master = _instrument_master()
+    if master is not None:
+        return master.by_segment('NSE_EQ')
+    with open(INSTRUMENTS_FILE, 'r') as f:
+        instruments = json.load(f)
+    return [inst for inst in instruments if isinstance(inst, dict) and inst.get('segment') == 'NSE_EQ']
+
 def load_isin_from_instruments() -> Dict[str, str]:
     """
     Load ISIN mappings from the instruments JSON file
@@ -235,8 +248,7 @@ def load_isin_from_instruments() -> Dict[str, str]:
         
         logger.info(f"Loading ISIN mappings from {INSTRUMENTS_FILE}")
         
-        with open(INSTRUMENTS_FILE, 'r') as f:
-            instruments = json.load(f)
+        instruments = _nse_eq_rows()
         
         # Filter equity instruments (segment == NSE_EQ and has ISIN)
         isin_map = {}
@@ -328,13 +340,15 @@ def _get_instrument_key_from_file(symbol: str) -> Optional[str]:
     symbol_upper = symbol.strip().upper().replace("-EQ", "").replace(".NS", "").replace(".BO", "")
     variations = [symbol_upper, symbol_upper + "-EQ", symbol_upper + "-FUT", symbol_upper + "-OPT"]
     try:
-        with open(INSTRUMENTS_FILE, 'r') as f:
-            instruments = json.load(f)
-        if not isinstance(instruments, list):
-            return None
-        for inst in instruments:
-            if inst.get('segment') != 'NSE_EQ':
-                continue
+        master = _instrument_master()
+        if master is not None:
+            for v in variations:
+                for inst in master.by_trading_symbol(v, segment='NSE_EQ'):
+                    ik = inst.get('instrument_key')
+                    if ik:
+                        logger.info(f"✅ Found instrument_key from file for {symbol}: {ik}")
+                        return ik
+        for inst in _nse_eq_rows():
             ts = (inst.get('trading_symbol') or inst.get('tradingsymbol') or '').strip().upper()
             ts_clean = ts.replace("-EQ", "").replace("-FUT", "").replace("-OPT", "")
             if ts in variations or ts_clean == symbol_upper:
@@ -400,10 +414,8 @@ def _load_names_cache() -> Dict[str, str]:
             _NAMES_CACHE_LOADED = True
             return _NAMES_CACHE
         logger.info(f"Loading stock names cache from {INSTRUMENTS_FILE}")
-        with open(INSTRUMENTS_FILE, 'r') as f:
-            instruments = json.load(f)
         names_map = {}
-        for inst in instruments:
+        for inst in _nse_eq_rows():
             if inst.get('segment') == 'NSE_EQ':
                 trading_symbol = (inst.get('trading_symbol') or inst.get('tradingsymbol') or '').strip().upper()
                 if trading_symbol:
@@ -452,9 +464,12 @@ def get_stock_name(symbol: str) -> Optional[str]:
     try:
         if not INSTRUMENTS_FILE.exists():
             return symbol_upper
-        with open(INSTRUMENTS_FILE, 'r') as f:
-            instruments = json.load(f)
-        for inst in instruments:
+        master = _instrument_master()
+        if master is not None:
+            rows = master.by_trading_symbol(symbol_upper, segment='NSE_EQ')
+            name = (rows[0].get('name') or '').strip() if rows else ''
+            return name if name else symbol_upper
+        for inst in _nse_eq_rows():
             if inst.get('segment') == 'NSE_EQ':
                 trading_symbol = (inst.get('trading_symbol') or inst.get('tradingsymbol') or '').strip().upper()
                 if trading_symbol == symbol_upper:
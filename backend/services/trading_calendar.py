@@ -0,0 +1,316 @@
+"""
+Process-wide NSE trading calendar (IST calendar dates): weekends + holidays.
+
+Holidays are the union of ``NSE_KNOWN_HOLIDAYS`` (exchange circulars),
+``backend/nse_holidays_*.csv``, the ``holiday`` table (``market_holiday``) and any
+registered extra source (``upstox_service`` registers the Upstox holiday API).
+Registered sources are polled only by the background refresher, never on the
+request path.
+
+Each year is built once into a dense per-day index (memoized), so
+``is_trading_day`` / ``previous_trading_day`` / ``next_trading_day`` /
+``trading_days_between`` are O(1) array reads.
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import threading
+from array import array
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+# Known NSE equity/derivative holidays (fallback when API omits or returns wrong format).
+# Used so monthly expiry correctly uses previous trading day when last Tuesday is a holiday.
+# Source: NSE holiday circulars. Add new years as they are published.
+NSE_KNOWN_HOLIDAYS = {
+    2025: [
+        "2025-01-26", "2025-02-26", "2025-03-14", "2025-03-26", "2025-04-18", "2025-04-21",
+        "2025-05-01", "2025-06-06", "2025-08-15", "2025-10-02", "2025-10-20", "2025-11-01",
+        "2025-11-04", "2025-11-14", "2025-12-25",
+    ],
+    2026: [
+        "2026-01-15", "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31",  # Mar 31 = Mahavir Jayanti (expiry day)
+        "2026-04-03", "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26",
+        "2026-09-14", "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24", "2026-12-25",
+    ],
+}
+
+IST = pytz.timezone("Asia/Kolkata")
+DEFAULT_CSV_DIR = Path(__file__).resolve().parent.parent
+REFRESH_SEC = float(os.getenv("TRADING_CALENDAR_REFRESH_SEC", "21600") or "21600")
+
+DateLike = Union[date, datetime]
+HolidaySource = Callable[[int], Iterable[Any]]
+
+
+def _to_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    s = str(value or "").strip()
+    if not s:
+        return None
+    try:
+        return date.fromisoformat(s[:10])
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(s, "%d-%b-%Y").date()
+    except ValueError:
+        return None
+
+
+def _ist_date(d: DateLike) -> date:
+    if isinstance(d, datetime):
+        return (IST.localize(d) if d.tzinfo is None else d.astimezone(IST)).date()
+    return d
+
+
+def _db_holidays(cached: bool) -> Set[date]:
+    # Imported lazily: keeps this module (and upstox_service) free of the DB import at load time.
+    from backend.services import market_holiday
+
+    if cached:
+        return set(market_holiday._holiday_dates_cached())
+    return set(market_holiday.refresh_holiday_dates_from_db())
+
+
+def load_csv_holidays(csv_dir: Optional[Path] = None) -> Set[date]:
+    """Dates from every ``nse_holidays_*.csv`` (``Date,Description``; ``15-Jan-2026``)."""
+    out: Set[date] = set()
+    for path in sorted(Path(csv_dir or DEFAULT_CSV_DIR).glob("nse_holidays_*.csv")):
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    d = _to_date(row.get("Date"))
+                    if d is not None:
+                        out.add(d)
+        except OSError as e:
+            logger.warning("trading_calendar: cannot read %s: %s", path, e)
+    return out
+
+
+class _Year:
+    """Dense per-day index for one calendar year (day ``i`` = Jan 1 + i)."""
+
+    __slots__ = ("start", "holidays", "is_open", "cum", "prev", "next", "total")
+
+    def __init__(self, year: int, holidays: Set[date]):
+        self.start = date(year, 1, 1).toordinal()
+        n = date(year, 12, 31).toordinal() - self.start + 1
+        self.holidays = frozenset(d for d in holidays if d.year == year)
+        self.is_open = bytearray(n)
+        self.cum = array("i", [0] * n)  # trading days in [Jan 1, day i]
+        self.prev = array("i", [-1] * n)  # ordinal of last trading day <= day i (-1: none this year)
+        self.next = array("i", [-1] * n)  # ordinal of first trading day >= day i
+        count, last = 0, -1
+        for i in range(n):
+            d = date.fromordinal(self.start + i)
+            if d.weekday() < 5 and d not in self.holidays:
+                self.is_open[i] = 1
+                count += 1
+                last = self.start + i
+            self.cum[i] = count
+            self.prev[i] = last
+        nxt = -1
+        for i in range(n - 1, -1, -1):
+            if self.is_open[i]:
+                nxt = self.start + i
+            self.next[i] = nxt
+        self.total = count
+
+
+class TradingCalendar:
+    """NSE trading days with memoized per-year indexes; see module docstring."""
+
+    def __init__(
+        self,
+        *,
+        known: Optional[Dict[int, List[str]]] = None,
+        csv_dir: Optional[Path] = None,
+        use_db: bool = True,
+    ):
+        self._lock = threading.Lock()
+        self._known: Set[date] = {
+            d for days in (NSE_KNOWN_HOLIDAYS if known is None else known).values() for d in map(_to_date, days) if d
+        }
+        self._csv: Set[date] = load_csv_holidays(csv_dir)
+        self._use_db = use_db
+        self._db: Set[date] = _db_holidays(cached=True) if use_db else set()
+        self._sources: Dict[str, HolidaySource] = {}
+        self._extra: Dict[str, Set[date]] = {}
+        self._years: Dict[int, _Year] = {}
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # --- sources / refresh ---
+
+    def register_source(self, name: str, fetch: HolidaySource) -> None:
+        """Add ``fetch(year) -> dates``; polled by :meth:`refresh` only."""
+        with self._lock:
+            self._sources[name] = fetch
+
+    def refresh(self, years: Optional[Iterable[int]] = None) -> None:
+        """Reload the DB table and registered sources, then drop memoized years."""
+        with self._lock:
+            sources = dict(self._sources)
+            loaded = set(self._years)
+        if years is None:
+            this_year = datetime.now(IST).year
+            years = loaded | {this_year, this_year + 1}
+        db = _db_holidays(cached=False) if self._use_db else set()
+        extra: Dict[str, Set[date]] = {}
+        for name, fetch in sources.items():
+            got: Set[date] = set()
+            for y in sorted(set(years)):
+                try:
+                    got.update(d for d in map(_to_date, fetch(y) or []) if d is not None)
+                except Exception as e:
+                    logger.warning("trading_calendar: source %s failed for %s: %s", name, y, e)
+            extra[name] = got
+        with self._lock:
+            self._db = db
+            for name, got in extra.items():
+                if got or name not in self._extra:
+                    self._extra[name] = got
+            self._years = {}
+
+    def start_background_refresh(self, interval_sec: float = REFRESH_SEC) -> None:
+        """Daemon thread: ``refresh()`` now and every ``interval_sec`` (no-op if already running / <= 0)."""
+        if interval_sec <= 0:
+            return
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._stop.clear()
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, args=(float(interval_sec),), name="trading-calendar-refresh", daemon=True
+            )
+            self._refresher.start()
+
+    def stop_background_refresh(self) -> None:
+        self._stop.set()
+
+    def _refresh_loop(self, interval_sec: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("trading_calendar: refresh failed: %s", e)
+            self._stop.wait(interval_sec)
+
+    # --- index ---
+
+    def _year(self, year: int) -> _Year:
+        y = self._years.get(year)
+        if y is not None:
+            return y
+        with self._lock:
+            y = self._years.get(year)
+            if y is None:
+                merged = self._known | self._csv | self._db
+                for got in self._extra.values():
+                    merged |= got
+                y = _Year(year, merged)
+                self._years[year] = y
+        return y
+
+    def holidays(self, year: int) -> List[date]:
+        """Holiday dates for ``year`` (all sources merged), sorted."""
+        return sorted(self._year(year).holidays)
+
+    def is_trading_day(self, d: DateLike) -> bool:
+        d = _ist_date(d)
+        y = self._year(d.year)
+        return bool(y.is_open[d.toordinal() - y.start])
+
+    def previous_trading_day(self, d: DateLike, *, include_self: bool = False) -> date:
+        """Latest trading day before ``d`` (or on ``d`` when ``include_self``)."""
+        d = _ist_date(d)
+        if not include_self:
+            d -= timedelta(days=1)
+        year = d.year
+        y = self._year(year)
+        o = y.prev[d.toordinal() - y.start]
+        while o < 0:
+            year -= 1
+            y = self._year(year)
+            o = y.prev[-1]
+        return date.fromordinal(o)
+
+    def next_trading_day(self, d: DateLike, *, include_self: bool = False) -> date:
+        """Earliest trading day after ``d`` (or on ``d`` when ``include_self``)."""
+        d = _ist_date(d)
+        if not include_self:
+            d += timedelta(days=1)
+        year = d.year
+        y = self._year(year)
+        o = y.next[d.toordinal() - y.start]
+        while o < 0:
+            year += 1
+            y = self._year(year)
+            o = y.next[0]
+        return date.fromordinal(o)
+
+    def trading_days_between(self, start: DateLike, end: DateLike) -> int:
+        """Number of trading days in ``[start, end]`` (0 when ``end < start``)."""
+        a, b = _ist_date(start), _ist_date(end)
+        if b < a:
+            return 0
+        ya, yb = self._year(a.year), self._year(b.year)
+        ia, ib = a.toordinal() - ya.start, b.toordinal() - yb.start
+        before_a = ya.cum[ia - 1] if ia > 0 else 0
+        if a.year == b.year:
+            return yb.cum[ib] - before_a
+        middle = sum(self._year(yr).total for yr in range(a.year + 1, b.year))
+        return (ya.total - before_a) + middle + yb.cum[ib]
+
+    def trading_days(self, start: DateLike, end: DateLike) -> List[date]:
+        """Trading days in ``[start, end]``, oldest first."""
+        a, b = _ist_date(start), _ist_date(end)
+        out: List[date] = []
+        for year in range(a.year, b.year + 1):
+            y = self._year(year)
+            lo = max(a.toordinal(), y.start) - y.start
+            hi = min(b.toordinal(), y.start + len(y.is_open) - 1) - y.start
+            out.extend(date.fromordinal(y.start + i) for i in range(lo, hi + 1) if y.is_open[i])
+        return out
+
+
+_calendar: Optional[TradingCalendar] = None
+_calendar_lock = threading.Lock()
+_pending_sources: Dict[str, HolidaySource] = {}
+
+
+def get_trading_calendar() -> TradingCalendar:
+    """Process-wide calendar; first call loads sources and starts the background refresher."""
+    global _calendar
+    cal = _calendar
+    if cal is not None:
+        return cal
+    with _calendar_lock:
+        if _calendar is None:
+            cal = TradingCalendar()
+            for name, fetch in _pending_sources.items():
+                cal.register_source(name, fetch)
+            cal.start_background_refresh()
+            _calendar = cal
+        return _calendar
+
+
+def register_holiday_source(name: str, fetch: HolidaySource) -> None:
+    """Register an extra holiday source on the process calendar (lazily, without building it)."""
+    with _calendar_lock:
+        _pending_sources[name] = fetch
+        cal = _calendar
+    if cal is not None:
+        cal.register_source(name, fetch)
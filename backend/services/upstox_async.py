@@ -0,0 +1,352 @@
+"""Async Upstox client for FastAPI ``async def`` handlers.
+
+``upstox_service`` is synchronous (``requests``); calling it from an ``async def``
+route blocks the event loop, so one slow broker call (a webhook enriching a
+dozen option chains) stalls every other request on the worker. This module
+gives handlers an awaitable surface:
+
+* Native ``httpx.AsyncClient`` calls for the latency-sensitive single-request
+  endpoints: quotes (single / batch LTP), place order, order details, order
+  book and short-term positions. Status handling (401 token reload, 429 /
+  5xx back-off, HTML error pages) is ``UpstoxService._classify_api_response``,
+  and the response shaping is the same helpers the sync methods use, so both
+  clients return identical dicts.
+* ``run_sync(fn, ...)`` for the composite calls (historical candles with their
+  cache, option chain, index trends, reconcile jobs …): they run on a bounded
+  offload pool instead of the event loop.
+
+Requests draw from the same process-wide endpoint-family budgets
+(``upstox_rate_limiter.acquire_api_slot``) as the sync client, and report
+responses back so 429s adapt them. One ``AsyncClient`` is kept per event loop (HTTP/2 when
+``h2`` is installed and ``UPSTOX_HTTP2`` is not ``0``; pool size from
+``UPSTOX_HTTP_POOL_MAXSIZE``); requests are recorded in ``upstox_http.stats()``.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import importlib.util
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from urllib.parse import quote
+
+import httpx
+
+from backend.services import upstox_http, upstox_rate_limiter
+from backend.services.upstox_service import (
+    UpstoxService,
+    _listing_result,
+    _place_order_payload,
+    _place_order_result,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+OFFLOAD_WORKERS = max(1, upstox_http._env_int("UPSTOX_ASYNC_OFFLOAD_WORKERS", 16))
+
+
+def _http2_enabled() -> bool:
+    if (os.getenv("UPSTOX_HTTP2", "1") or "1").strip().lower() in ("0", "false", "no", "off"):
+        return False
+    return importlib.util.find_spec("h2") is not None
+
+
+def build_async_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """An ``AsyncClient`` with the same pool size / timeouts as the sync session."""
+    maxsize = max(1, upstox_http._env_int("UPSTOX_HTTP_POOL_MAXSIZE", 32))
+    timeout = httpx.Timeout(
+        upstox_http._env_float("UPSTOX_HTTP_READ_TIMEOUT", 15.0),
+        connect=upstox_http._env_float("UPSTOX_HTTP_CONNECT_TIMEOUT", 5.0),
+    )
+    kwargs: Dict[str, Any] = {
+        "timeout": timeout,
+        "limits": httpx.Limits(max_connections=maxsize, max_keepalive_connections=maxsize),
+    }
+    if transport is not None:
+        kwargs["transport"] = transport
+    else:
+        kwargs["http2"] = _http2_enabled()
+    return httpx.AsyncClient(**kwargs)
+
+
+class AsyncUpstoxService:
+    """Awaitable counterpart of ``UpstoxService``; see module docstring."""
+
+    def __init__(
+        self,
+        sync: Optional[UpstoxService] = None,
+        *,
+        offload_workers: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._sync = sync
+        self._transport = transport
+        self._workers = int(offload_workers or OFFLOAD_WORKERS)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def sync(self) -> UpstoxService:
+        """The wrapped sync service (token, headers, composite methods); defaults to ``upstox_service``."""
+        if self._sync is None:
+            from backend.services.upstox_service import upstox_service
+
+            self._sync = upstox_service
+        return self._sync
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.sync.access_token
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = build_async_client(self._transport)
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close this loop's client (app shutdown / tests)."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # --- offload ---
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._workers, thread_name_prefix="upstox-async-offload"
+                    )
+        return self._executor
+
+    async def run_sync(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking call (sync Upstox method, DB-heavy job) on the offload pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), functools.partial(fn, *args, **kwargs))
+
+    # --- transport ---
+
+    async def request(
+        self,
+        url: str,
+        method: str = "GET",
+        params: Optional[Dict] = None,
+        data: Optional[Dict] = None,
+        timeout: float = 10,
+        max_retries: int = 2,
+    ) -> Optional[Dict]:
+        """Async ``make_api_request``: same retry / token-reload / rate-budget semantics."""
+        svc = self.sync
+        method = method.upper()
+        if method not in ("GET", "POST", "DELETE"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        family = upstox_rate_limiter.endpoint_family(method, url)
+        last_error = None
+
+        for attempt in range(max_retries):
+            if family and not await self.run_sync(upstox_rate_limiter.acquire_api_slot, family, method):
+                return None
+            t0 = time.perf_counter()
+            try:
+                response = await self._client().request(
+                    method,
+                    url,
+                    headers=svc.get_headers(),
+                    params=params,
+                    json=data if method != "GET" else None,
+                    timeout=timeout,
+                )
+            except httpx.TimeoutException:
+                upstox_http.observe(method, url, time.perf_counter() - t0, error=True)
+                logger.warning(f"⏱️ Request timeout (attempt {attempt + 1}/{max_retries}) for {url}")
+                last_error = "Timeout"
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(1)
+                    continue
+                break
+            except httpx.TransportError:
+                upstox_http.observe(method, url, time.perf_counter() - t0, error=True)
+                logger.warning(f"🔌 Connection error (attempt {attempt + 1}/{max_retries}) for {url}")
+                last_error = "Connection error"
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(2)
+                    continue
+                break
+            except Exception as e:
+                upstox_http.observe(method, url, time.perf_counter() - t0, error=True)
+                logger.error(f"❌ Unexpected error for {url}: {str(e)}")
+                last_error = str(e)
+                break
+            upstox_http.observe(method, url, time.perf_counter() - t0)
+            upstox_rate_limiter.note_api_response(family, response.status_code)
+
+            try:
+                outcome, value = svc._classify_api_response(response, url, attempt, max_retries)
+            except Exception as e:
+                logger.error(f"❌ Unexpected error for {url}: {str(e)}")
+                last_error = str(e)
+                break
+            if outcome == "return":
+                return value
+            if outcome == "reload":
+                if await self.run_sync(svc.reload_token_from_storage):
+                    logger.info("✅ Token reloaded from storage, retrying...")
+                    await asyncio.sleep(0.5)
+                    continue
+                logger.error("❌ Token reload failed - manual token refresh needed")
+                last_error = "Token expired and reload failed"
+                break
+            if outcome == "retry":
+                last_error, wait = value
+                await asyncio.sleep(wait)
+                continue
+            last_error = value
+            break
+
+        if last_error:
+            logger.error(f"❌ API request failed after {max_retries} attempts: {last_error}")
+        return None
+
+    # --- quotes ---
+
+    async def get_market_quote_by_key(self, instrument_key: str) -> Optional[Dict]:
+        """Async ``UpstoxService.get_market_quote_by_key`` (same result dict)."""
+        try:
+            url = f"https://api.upstox.com/v2/market-quote/quotes?instrument_key={instrument_key}"
+            data = await self.request(url, method="GET", timeout=10, max_retries=2)
+            return self.sync._quote_from_response(instrument_key, data)
+        except Exception as e:
+            logger.error(f"❌ Error fetching market quote for {instrument_key}: {str(e)}")
+        return None
+
+    async def get_market_quotes_batch_by_keys(
+        self, instrument_keys: List[str], max_per_request: int = 500
+    ) -> Dict[str, float]:
+        """Async ``UpstoxService.get_market_quotes_batch_by_keys`` (instrument_key -> LTP)."""
+        if not instrument_keys:
+            return {}
+        keys_batch = instrument_keys[:max_per_request]
+        try:
+            url = (
+                "https://api.upstox.com/v2/market-quote/quotes"
+                f"?instrument_key={quote(','.join(keys_batch), safe=',')}"
+            )
+            data = await self.request(url, method="GET", timeout=15, max_retries=2)
+            return UpstoxService._batch_ltp_from_response(keys_batch, data)
+        except Exception as e:
+            logger.error(f"❌ Error fetching batch market quotes: {str(e)}")
+        return {}
+
+    # --- orders / positions ---
+
+    async def place_order(
+        self,
+        instrument_key: str,
+        quantity: int,
+        transaction_type: str,
+        order_type: str = "MARKET",
+        product: str = "D",
+        validity: str = "DAY",
+        price: Optional[float] = None,
+        trigger_price: Optional[float] = None,
+        tag: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Async ``UpstoxService.place_order``; single attempt (a replayed POST can double-fill)."""
+        if not self.access_token:
+            return {"success": False, "error": "Missing access token"}
+        payload, err = _place_order_payload(
+            instrument_key, quantity, transaction_type, order_type, product, validity, price, trigger_price, tag
+        )
+        if err:
+            return err
+        try:
+            response = await self.request(
+                "https://api.upstox.com/v2/order/place", method="POST", data=payload, timeout=10, max_retries=1
+            )
+            return _place_order_result(response)
+        except Exception as e:
+            logger.error(f"❌ Exception placing order: {str(e)}")
+            return {"success": False, "error": str(e)}
+
+    async def get_order_details(self, order_id: str) -> Dict[str, Any]:
+        if not self.access_token:
+            return {"success": False, "error": "Missing access token"}
+        if not order_id:
+            return {"success": False, "error": "Missing order_id"}
+        url = f"https://api.upstox.com/v2/order/details?order_id={order_id}"
+        try:
+            response = await self.request(url, method="GET", timeout=10, max_retries=2)
+            if response and response.get("status") == "success":
+                return {"success": True, "data": response}
+            return {
+                "success": False,
+                "error": response.get("message") if isinstance(response, dict) else "Order details failed",
+                "data": response,
+            }
+        except Exception as e:
+            logger.error(f"❌ Exception fetching order details: {str(e)}")
+            return {"success": False, "error": str(e)}
+
+    async def get_order_book_today(self) -> Dict[str, Any]:
+        if not self.access_token:
+            return {"success": False, "error": "Missing access token", "orders": []}
+        try:
+            response = await self.request(
+                "https://api.upstox.com/v2/order/retrieve-all", method="GET", timeout=15, max_retries=2
+            )
+            return _listing_result(response, "orders", "Order book failed")
+        except Exception as e:
+            logger.error(f"❌ Exception fetching order book: {str(e)}")
+            return {"success": False, "error": str(e), "orders": []}
+
+    async def get_short_term_positions(self) -> Dict[str, Any]:
+        if not self.access_token:
+            return {"success": False, "error": "Missing access token", "positions": []}
+        try:
+            response = await self.request(
+                "https://api.upstox.com/v2/portfolio/short-term-positions", method="GET", timeout=15, max_retries=2
+            )
+            return _listing_result(response, "positions", "Positions failed")
+        except Exception as e:
+            logger.error(f"❌ Exception fetching short-term positions: {str(e)}")
+            return {"success": False, "error": str(e), "positions": []}
+
+    # --- composite calls (offloaded) ---
+
+    async def get_option_chain(self, *args: Any, **kwargs: Any) -> Any:
+        """``UpstoxService.get_option_chain`` on the offload pool (multi-request, cached)."""
+        return await self.run_sync(self.sync.get_option_chain, *args, **kwargs)
+
+    async def get_historical_candles_by_instrument_key(self, *args: Any, **kwargs: Any) -> Any:
+        """``UpstoxService.get_historical_candles_by_instrument_key`` on the offload pool (candle cache + budget)."""
+        return await self.run_sync(self.sync.get_historical_candles_by_instrument_key, *args, **kwargs)
+
+
+_async_service: Optional[AsyncUpstoxService] = None
+_async_service_lock = threading.Lock()
+
+
+def get_async_upstox_service() -> AsyncUpstoxService:
+    """Process-wide async client wrapping the default ``upstox_service``."""
+    global _async_service
+    svc = _async_service
+    if svc is not None:
+        return svc
+    with _async_service_lock:
+        if _async_service is None:
+            _async_service = AsyncUpstoxService()
+        return _async_service
@@ -0,0 +1,186 @@
+"""Direct (zero-dict) decoder for Upstox MarketDataFeedV3 frames.
+
+The original path runs ``MessageToDict`` on every ``FeedResponse`` and then walks
+nested string-keyed dicts for ltp / oi / depth / tbq / tsq / I1 bars. That
+reflection-based conversion dominated CPU on the feed thread in busy minutes.
+
+``records_from_feed_response`` reads the same fields straight off the generated
+message objects into a compact ``FeedRecord`` per instrument. Semantics mirror
+``upstox_market_feed._extract_feed_fields`` exactly, including proto3's
+"default value == absent" rule that ``MessageToDict`` applies (e.g. ``oi == 0``
+is reported as ``None``), so either path feeds identical state downstream.
+"""
+from __future__ import annotations
+
+import struct
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from backend.services.upstox_proto import MarketDataFeedV3_pb2 as feed_pb
+
+_I1_INTERVALS = ("I1", "1MIN", "1M")
+_DEPTH_LEVELS = 5
+
+_FIELDS = (
+    "oi",
+    "ltp",
+    "ltq",
+    "best_bid",
+    "best_ask",
+    "bid_depth_qty",
+    "ask_depth_qty",
+    "depth_imbalance_ratio",
+    "tbq",
+    "tsq",
+    "pressure_ratio",
+    "i1_bars",
+)
+
+
+class FeedRecord:
+    """Parsed fields for one instrument in one frame."""
+
+    __slots__ = _FIELDS
+
+    def __init__(
+        self,
+        oi: Optional[int] = None,
+        ltp: Optional[float] = None,
+        ltq: int = 0,
+        best_bid: Optional[float] = None,
+        best_ask: Optional[float] = None,
+        bid_depth_qty: int = 0,
+        ask_depth_qty: int = 0,
+        depth_imbalance_ratio: float = 1.0,
+        tbq: int = 0,
+        tsq: int = 0,
+        pressure_ratio: float = 1.0,
+        i1_bars: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        self.oi = oi
+        self.ltp = ltp
+        self.ltq = ltq
+        self.best_bid = best_bid
+        self.best_ask = best_ask
+        self.bid_depth_qty = bid_depth_qty
+        self.ask_depth_qty = ask_depth_qty
+        self.depth_imbalance_ratio = depth_imbalance_ratio
+        self.tbq = tbq
+        self.tsq = tsq
+        self.pressure_ratio = pressure_ratio
+        self.i1_bars = i1_bars if i1_bars is not None else []
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, Any]) -> "FeedRecord":
+        """Adapter for the dict path (``_extract_feed_fields`` output)."""
+        return cls(**{k: fields[k] for k in _FIELDS if k in fields})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in _FIELDS}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FeedRecord):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self) -> str:
+        return f"FeedRecord({self.as_dict()!r})"
+
+
+def _i1_bars(mff: Any) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for row in mff.marketOHLC.ohlc:
+        if row.interval.strip().upper() not in _I1_INTERVALS:
+            continue
+        o = row.open
+        cl = row.close
+        if o <= 0 or cl <= 0:
+            continue
+        out.append(
+            {
+                # MessageToDict renders int64 as a decimal string; keep that shape.
+                "timestamp": str(row.ts) if row.ts else None,
+                "open": o,
+                "high": row.high or cl,
+                "low": row.low or o,
+                "close": cl,
+                "volume": int(row.vol),
+            }
+        )
+    return out
+
+
+def record_from_feed(feed: Any) -> FeedRecord:
+    """Build a ``FeedRecord`` from one ``Feed`` message (no dict conversion)."""
+    rec = FeedRecord()
+    if feed.HasField("fullFeed") and feed.fullFeed.HasField("marketFF"):
+        mff = feed.fullFeed.marketFF
+        if mff.oi:
+            rec.oi = int(mff.oi)
+        ltpc = mff.ltpc
+        if ltpc.ltp:
+            rec.ltp = float(ltpc.ltp)
+        rec.ltq = int(ltpc.ltq)
+        quotes = mff.marketLevel.bidAskQuote
+        if quotes:
+            q0 = quotes[0]
+            rec.best_bid = q0.bidP or None
+            rec.best_ask = q0.askP or None
+            bid_q = ask_q = 0
+            for q in quotes[:_DEPTH_LEVELS]:
+                bid_q += q.bidQ
+                ask_q += q.askQ
+            rec.bid_depth_qty = int(bid_q)
+            rec.ask_depth_qty = int(ask_q)
+            if ask_q <= 0:
+                rec.depth_imbalance_ratio = 2.0 if bid_q > 0 else 1.0
+            else:
+                rec.depth_imbalance_ratio = bid_q / ask_q
+        rec.tbq = int(mff.tbq)
+        rec.tsq = int(mff.tsq)
+        rec.i1_bars = _i1_bars(mff)
+    elif feed.HasField("ltpc") and feed.ltpc.ltp:
+        # ``ltpc`` mode carries just the top-level LTPC.
+        rec.ltp = float(feed.ltpc.ltp)
+    if (rec.oi is None or rec.ltp is None) and feed.HasField("firstLevelWithGreeks"):
+        flg = feed.firstLevelWithGreeks
+        if rec.oi is None and flg.oi:
+            rec.oi = int(flg.oi)
+        if rec.ltp is None and flg.ltpc.ltp:
+            rec.ltp = float(flg.ltpc.ltp)
+    tbq, tsq = rec.tbq, rec.tsq
+    rec.pressure_ratio = (tbq / tsq) if tsq > 0 else (2.0 if tbq > 0 else 1.0)
+    return rec
+
+
+def records_from_feed_response(fr: Any) -> List[Tuple[str, FeedRecord]]:
+    """``[(raw_instrument_key, FeedRecord), …]`` for every feed in a ``FeedResponse``."""
+    return [(key, record_from_feed(feed)) for key, feed in fr.feeds.items()]
+
+
+def decode_frame(binary: bytes) -> List[Tuple[str, FeedRecord]]:
+    fr = feed_pb.FeedResponse()
+    fr.ParseFromString(binary)
+    return records_from_feed_response(fr)
+
+
+# --- recorded frames (benchmark / replay) -------------------------------------
+# Simple length-prefixed container: 4-byte big-endian length + raw frame bytes.
+
+_LEN = struct.Struct(">I")
+
+
+def write_frame(fh: BinaryIO, binary: bytes) -> None:
+    fh.write(_LEN.pack(len(binary)))
+    fh.write(binary)
+
+
+def iter_frames(fh: BinaryIO) -> Iterator[bytes]:
+    while True:
+        head = fh.read(_LEN.size)
+        if len(head) < _LEN.size:
+            return
+        (n,) = _LEN.unpack(head)
+        body = fh.read(n)
+        if len(body) < n:
+            return
+        yield body
@@ -0,0 +1,148 @@
+"""Reference-counted subscription bookkeeping for the shared Upstox market feed.
+
+Several consumers (market-data jobs, OI heatmap, rocket live, the chart modal)
+want live ticks for overlapping instrument sets. Previously any change to the
+requested universe tore the websocket down and re-subscribed everything, which
+left tick gaps and bursts of authorize calls.
+
+``SubscriptionManager`` keeps, per consumer, a refcount per instrument key plus
+the mode that consumer needs. ``desired()`` folds that into one ``{key: mode}``
+map (highest mode wins) and ``plan()`` diffs it against what is currently
+subscribed on the socket, yielding only the ``sub`` / ``unsub`` / ``change_mode``
+messages needed. Pure bookkeeping — no I/O — so the feed thread owns the socket.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Upstox v3 feed modes, lowest -> richest. ``full`` carries everything ``ltpc`` does.
+MODE_RANK: Dict[str, int] = {"ltpc": 0, "option_greeks": 1, "full": 2, "full_d30": 3}
+DEFAULT_MODE = "full"
+
+
+def _norm_mode(mode: Optional[str]) -> str:
+    m = (mode or DEFAULT_MODE).strip().lower()
+    if m not in MODE_RANK:
+        raise ValueError(f"unknown feed mode: {mode!r}")
+    return m
+
+
+def _norm_keys(keys: Iterable[str]) -> List[str]:
+    out: List[str] = []
+    for k in keys:
+        k = (k or "").strip().replace(":", "|")
+        if k:
+            out.append(k)
+    return out
+
+
+class SubscriptionManager:
+    """Thread-safe refcounts: consumer -> instrument_key -> count (+ consumer mode)."""
+
+    def __init__(self, max_keys: Optional[int] = None) -> None:
+        self._lock = threading.Lock()
+        self._refs: Dict[str, Dict[str, int]] = {}
+        self._modes: Dict[str, str] = {}
+        self._max_keys = max_keys
+        self.version = 0
+        self.truncated = 0
+
+    def set_keys(self, consumer: str, keys: Iterable[str], mode: str = DEFAULT_MODE) -> bool:
+        """Replace ``consumer``'s whole key set (refcount 1 each). Returns True if changed."""
+        mode = _norm_mode(mode)
+        new = {k: 1 for k in _norm_keys(keys)}
+        with self._lock:
+            if self._refs.get(consumer) == new and self._modes.get(consumer) == mode:
+                return False
+            if new:
+                self._refs[consumer] = new
+                self._modes[consumer] = mode
+            else:
+                self._refs.pop(consumer, None)
+                self._modes.pop(consumer, None)
+            self.version += 1
+            return True
+
+    def acquire(self, consumer: str, keys: Iterable[str], mode: str = DEFAULT_MODE) -> Dict[str, int]:
+        """Increment ``consumer``'s refcount for each key. Returns the new counts."""
+        mode = _norm_mode(mode)
+        out: Dict[str, int] = {}
+        with self._lock:
+            refs = self._refs.setdefault(consumer, {})
+            self._modes[consumer] = mode
+            for k in _norm_keys(keys):
+                refs[k] = refs.get(k, 0) + 1
+                out[k] = refs[k]
+            self.version += 1
+        return out
+
+    def release(self, consumer: str, keys: Iterable[str]) -> Dict[str, int]:
+        """Decrement refcounts (dropping keys at zero). Returns the new counts."""
+        out: Dict[str, int] = {}
+        with self._lock:
+            refs = self._refs.get(consumer)
+            if not refs:
+                return {k: 0 for k in _norm_keys(keys)}
+            for k in _norm_keys(keys):
+                n = refs.get(k, 0) - 1
+                if n <= 0:
+                    refs.pop(k, None)
+                    n = 0
+                else:
+                    refs[k] = n
+                out[k] = n
+            if not refs:
+                self._refs.pop(consumer, None)
+                self._modes.pop(consumer, None)
+            self.version += 1
+        return out
+
+    def refcount(self, consumer: str, key: str) -> int:
+        k = (_norm_keys([key]) or [""])[0]
+        with self._lock:
+            return int((self._refs.get(consumer) or {}).get(k, 0))
+
+    def consumer_keys(self, consumer: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._refs.get(consumer) or {})
+
+    def consumer_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {c: len(r) for c, r in self._refs.items()}
+
+    def desired(self) -> Dict[str, str]:
+        """``{instrument_key: mode}`` over all consumers (richest mode per key)."""
+        with self._lock:
+            out: Dict[str, str] = {}
+            for consumer, refs in self._refs.items():
+                mode = self._modes.get(consumer, DEFAULT_MODE)
+                for k in refs:
+                    cur = out.get(k)
+                    if cur is None or MODE_RANK[mode] > MODE_RANK[cur]:
+                        out[k] = mode
+            if self._max_keys is not None and len(out) > self._max_keys:
+                # Keep richest modes first, then key order, so truncation is deterministic.
+                ranked = sorted(out.items(), key=lambda kv: (-MODE_RANK[kv[1]], kv[0]))
+                self.truncated = len(out) - self._max_keys
+                out = dict(ranked[: self._max_keys])
+            else:
+                self.truncated = 0
+            return out
+
+    def plan(
+        self, subscribed: Dict[str, str]
+    ) -> Tuple[Dict[str, List[str]], List[str], Dict[str, List[str]]]:
+        """Diff desired vs ``subscribed`` -> (sub by mode, unsub keys, change_mode by mode)."""
+        want = self.desired()
+        sub: Dict[str, List[str]] = {}
+        change: Dict[str, List[str]] = {}
+        for k in sorted(want):
+            mode = want[k]
+            have = subscribed.get(k)
+            if have is None:
+                sub.setdefault(mode, []).append(k)
+            elif have != mode:
+                change.setdefault(mode, []).append(k)
+        unsub = sorted(k for k in subscribed if k not in want)
+        return sub, unsub, change
@@ -0,0 +1,283 @@
+"""Process-wide pooled HTTP transport for Upstox REST calls.
+
+Every ``UpstoxService`` instance (scheduler jobs create their own on the fly) and
+the market-feed authorize call share one ``requests.Session``, so connections to
+api.upstox.com are kept alive and reused instead of paying a TCP+TLS handshake
+per request.
+
+* Pool: ``UPSTOX_HTTP_POOL_MAXSIZE`` keep-alive connections per host (default 32),
+  ``UPSTOX_HTTP_POOL_BLOCK=1`` makes callers wait for a free connection instead
+  of opening throwaway overflow connections.
+* Timeouts: applied when the caller passes none (``UPSTOX_HTTP_CONNECT_TIMEOUT`` /
+  ``UPSTOX_HTTP_READ_TIMEOUT``).
+* Retries: connection-level only (``UPSTOX_HTTP_CONNECT_RETRIES``); status-code
+  retries (401 reload, 429 back-off) stay in ``UpstoxService.make_api_request``
+  so order POSTs are never replayed by the transport.
+* Budgets: requests to the Upstox API host take a slot from their endpoint
+  family's shared budget (``upstox_rate_limiter.acquire_api_slot``) before they
+  are sent — including raw ``session.get`` call sites — and every response is
+  reported back (429 adapts the family's caps). A request the budget cannot fit
+  raises ``BudgetDenied`` without touching the network.
+
+``requests`` / urllib3 speak HTTP/1.1 only; keep-alive reuse is where the
+handshake savings come from.
+
+Metrics (``stats()``): new connections (handshakes) per host, requests,
+in-flight peak and pool saturation, and per-endpoint latency percentiles.
+The async client (``upstox_async``) reports its requests/latency via ``observe()``.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from backend.services import upstox_rate_limiter
+
+_LATENCY_SAMPLES = 512  # ring per endpoint
+BUDGET_HOSTS = ("api.upstox.com", "api-hft.upstox.com")
+
+
+class BudgetDenied(requests.exceptions.RequestException):
+    """The endpoint family's shared budget had no slot in time; the request was not sent."""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+# --- metrics ------------------------------------------------------------------
+
+_metrics_lock = threading.Lock()
+_connects: Dict[str, int] = defaultdict(int)
+_requests = 0
+_errors = 0
+_inflight: Dict[str, int] = defaultdict(int)
+_inflight_peak: Dict[str, int] = defaultdict(int)
+_saturated = 0
+_latency: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=_LATENCY_SAMPLES))
+_latency_count: Dict[str, int] = defaultdict(int)
+
+_ID_SEGMENT = re.compile(r"[0-9|]|%7C", re.IGNORECASE)
+
+
+def endpoint_key(method: str, path: str) -> str:
+    """``GET /v3/historical-candle/:id/minutes/:id/...`` — path segments with ids/dates collapsed."""
+    segs = [":id" if _ID_SEGMENT.search(s) and not re.fullmatch(r"v\d+", s) else s for s in path.split("/")]
+    return f"{method.upper()} {'/'.join(segs)}"
+
+
+def _record_connect(host: str) -> None:
+    with _metrics_lock:
+        _connects[host] += 1
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _record_connect(str(self.host))
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _record_connect(str(self.host))
+        return super()._new_conn()
+
+
+class _InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter that counts handshakes, tracks in-flight per host and times each request."""
+
+    def __init__(self, *, pool_maxsize: int, timeout: tuple, budget_hosts: tuple = BUDGET_HOSTS, **kwargs: Any):
+        self._maxsize = int(pool_maxsize)
+        self._default_timeout = timeout
+        self._budget_hosts = frozenset(budget_hosts)
+        super().__init__(pool_maxsize=pool_maxsize, **kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        global _requests, _errors, _saturated
+        parts = urlsplit(request.url)
+        host = parts.hostname or ""
+        key = endpoint_key(request.method or "GET", parts.path)
+        family = (
+            upstox_rate_limiter.endpoint_family(request.method or "GET", parts.path)
+            if host in self._budget_hosts
+            else None
+        )
+        if family and not upstox_rate_limiter.acquire_api_slot(family, request.method or "GET"):
+            raise BudgetDenied(f"{family} budget exhausted: {key}", request=request)
+        with _metrics_lock:
+            _requests += 1
+            if _inflight[host] >= self._maxsize:
+                _saturated += 1
+            _inflight[host] += 1
+            if _inflight[host] > _inflight_peak[host]:
+                _inflight_peak[host] = _inflight[host]
+        t0 = time.perf_counter()
+        try:
+            response = super().send(
+                request,
+                stream=stream,
+                timeout=self._default_timeout if timeout is None else timeout,
+                verify=verify,
+                cert=cert,
+                proxies=proxies,
+            )
+            upstox_rate_limiter.note_api_response(family, response.status_code)
+            return response
+        except Exception:
+            with _metrics_lock:
+                _errors += 1
+            raise
+        finally:
+            dt = time.perf_counter() - t0
+            with _metrics_lock:
+                _inflight[host] -= 1
+                _latency[key].append(dt)
+                _latency_count[key] += 1
+
+
+# --- session ------------------------------------------------------------------
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def build_session(
+    *,
+    pool_maxsize: Optional[int] = None,
+    pool_block: Optional[bool] = None,
+    connect_retries: Optional[int] = None,
+    timeout: Optional[tuple] = None,
+    budget_hosts: tuple = BUDGET_HOSTS,
+) -> requests.Session:
+    """A keep-alive session with the instrumented adapter mounted for http/https."""
+    maxsize = pool_maxsize if pool_maxsize is not None else max(1, _env_int("UPSTOX_HTTP_POOL_MAXSIZE", 32))
+    if pool_block is None:
+        pool_block = (os.getenv("UPSTOX_HTTP_POOL_BLOCK", "0") or "0").strip().lower() in ("1", "true", "yes", "on")
+    retries = connect_retries if connect_retries is not None else max(0, _env_int("UPSTOX_HTTP_CONNECT_RETRIES", 2))
+    if timeout is None:
+        timeout = (_env_float("UPSTOX_HTTP_CONNECT_TIMEOUT", 5.0), _env_float("UPSTOX_HTTP_READ_TIMEOUT", 15.0))
+    retry = Retry(total=retries, connect=retries, read=0, status=0, other=0, backoff_factor=0.2, raise_on_status=False)
+    adapter = _InstrumentedAdapter(
+        pool_connections=8,
+        pool_maxsize=maxsize,
+        pool_block=bool(pool_block),
+        max_retries=retry,
+        timeout=timeout,
+        budget_hosts=budget_hosts,
+    )
+    s = requests.Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+def get_session() -> requests.Session:
+    """Process-wide shared session (lazily built)."""
+    global _session
+    s = _session
+    if s is not None:
+        return s
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+
+def reset_session() -> None:
+    """Close pooled connections and rebuild on next use (tests / config changes)."""
+    global _session
+    with _session_lock:
+        old, _session = _session, None
+    if old is not None:
+        old.close()
+
+
+def observe(method: str, url: str, seconds: float, *, error: bool = False) -> None:
+    """Record one request made outside the shared session (the async httpx client) in the same metrics."""
+    global _requests, _errors
+    key = endpoint_key(method or "GET", urlsplit(url).path)
+    with _metrics_lock:
+        _requests += 1
+        if error:
+            _errors += 1
+        _latency[key].append(seconds)
+        _latency_count[key] += 1
+
+
+# --- reporting ------------------------------------------------------------------
+
+
+def _percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+def stats(top: Optional[int] = None) -> Dict[str, Any]:
+    """Handshakes, saturation and per-endpoint latency (ms) percentiles over recent samples."""
+    with _metrics_lock:
+        connects = dict(_connects)
+        peaks = dict(_inflight_peak)
+        samples = {k: sorted(v) for k, v in _latency.items()}
+        counts = dict(_latency_count)
+        out: Dict[str, Any] = {
+            "requests": _requests,
+            "errors": _errors,
+            "handshakes": sum(connects.values()),
+            "handshakes_by_host": connects,
+            "inflight_peak_by_host": peaks,
+            "saturated": _saturated,
+        }
+    endpoints = []
+    for key, vals in samples.items():
+        endpoints.append(
+            {
+                "endpoint": key,
+                "count": counts.get(key, 0),
+                "p50_ms": round(_percentile(vals, 0.50) * 1e3, 2),
+                "p90_ms": round(_percentile(vals, 0.90) * 1e3, 2),
+                "p99_ms": round(_percentile(vals, 0.99) * 1e3, 2),
+            }
+        )
+    endpoints.sort(key=lambda e: -e["count"])
+    out["endpoints"] = endpoints[:top] if top else endpoints
+    out["reuse_ratio"] = round(1.0 - out["handshakes"] / out["requests"], 4) if out["requests"] else 0.0
+    return out
+
+
+def reset_stats() -> None:
+    global _requests, _errors, _saturated
+    with _metrics_lock:
+        _connects.clear()
+        _inflight_peak.clear()
+        _latency.clear()
+        _latency_count.clear()
+        _requests = _errors = _saturated = 0
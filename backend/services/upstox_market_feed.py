@@ -9,6 +9,12 @@ Flow (official sample):
   Connect WebSocket -> JSON subscribe { method: sub, data: { mode: full, instrumentKeys: [...] } }
   Receive binary protobuf FeedResponse messages.
 
+One long-lived connection is shared by every consumer (market-data jobs, OI
+heatmap, rocket live, chart modal). Consumers declare keys through
+``ensure_market_feed_running`` / ``acquire_feed_keys``; a reference-counted
+``SubscriptionManager`` diffs the union against the open socket and only
+``sub`` / ``unsub`` / ``change_mode`` messages are sent — no reconnect.
+
 See: https://upstox.com/developer/api-documentation/get-market-data-feed
 """
 from __future__ import annotations
@@ -24,25 +30,49 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
 import pytz
-import requests
 import websockets
 from google.protobuf.json_format import MessageToDict
-from sqlalchemy import text
 
 from backend.config import settings
 from backend.database import SessionLocal
+from backend.services.upstox_feed_decode import FeedRecord, records_from_feed_response, write_frame
+from backend.services.upstox_feed_subscriptions import MODE_RANK, SubscriptionManager
+from backend.services.upstox_http import get_session as get_upstox_http_session
 from backend.services.upstox_proto import MarketDataFeedV3_pb2 as feed_pb
 from backend.services.upstox_service import UpstoxService
+from backend.services.upstox_ws_writer import (
+    enqueue_1m,
+    enqueue_orderflow_latest,
+    ensure_writer_running,
+    upsert_orderflow_1m_rows,
+    upsert_orderflow_latest_rows,
+    upsert_ws_1m_rows,
+    writer_enabled,
+    writer_stats,
+)
 
 logger = logging.getLogger(__name__)
 
 _CACHE_LOCK = threading.Lock()
 _OI_LTP_BY_KEY: Dict[str, Dict[str, Any]] = {}
 _FEED_THREAD: Optional[threading.Thread] = None
+_THREAD_LOCK = threading.Lock()
 _STOP_EVENT = threading.Event()
-_LAST_KEYS_SIG: Optional[Tuple[str, ...]] = None
 _FEED_LAST_ERROR: Optional[str] = None
 
+# Upstox v3 allows up to 2000 instruments in full mode on one connection.
+_SUBS = SubscriptionManager(max_keys=2000)
+# Keys (-> mode) currently subscribed on the open socket; owned by the feed thread.
+_SUBSCRIBED: Dict[str, str] = {}
+_LAST_SYNC_VERSION = -1
+_SUB_SYNC_POLL_SEC = 0.5
+_SUB_MSG_GAP_SEC = 0.15
+_SUB_MSGS = 0
+_UNSUB_MSGS = 0
+_CHANGE_MODE_MSGS = 0
+_AUTHORIZE_CALLS = 0
+_CONNECTS = 0
+
 _CHUNK = 100
 _CANDLE_LOCK = threading.Lock()
 _WS_1M_STATE: Dict[Tuple[str, str], Dict[str, Any]] = {}
@@ -89,85 +119,10 @@ def _reset_ltq_volume_caches_if_new_ist_day() -> None:
 
 
 def _persist_ws_1m_candle(ik: str, minute_iso: str, candle: Dict[str, Any]) -> None:
+    """Synchronous single-row write (legacy path when the batched writer is off)."""
     db = SessionLocal()
     try:
-        db.execute(
-            text(
-                """
-                INSERT INTO upstox_ws_intraday_1m (
-                    instrument_key,
-                    candle_time,
-                    open,
-                    high,
-                    low,
-                    close,
-                    oi_open,
-                    oi_high,
-                    oi_low,
-                    oi_close,
-                    volume,
-                    bid_depth_qty,
-                    ask_depth_qty,
-                    tbq,
-                    tsq,
-                    candle_source,
-                    updated_at
-                )
-                VALUES (
-                    :ik,
-                    :candle_time,
-                    :open,
-                    :high,
-                    :low,
-                    :close,
-                    :oi_open,
-                    :oi_high,
-                    :oi_low,
-                    :oi_close,
-                    :volume,
-                    :bid_q,
-                    :ask_q,
-                    :tbq,
-                    :tsq,
-                    :source,
-                    NOW()
-                )
-                ON CONFLICT (instrument_key, candle_time)
-                DO UPDATE SET
-                    high = GREATEST(upstox_ws_intraday_1m.high, EXCLUDED.high),
-                    low = LEAST(upstox_ws_intraday_1m.low, EXCLUDED.low),
-                    close = EXCLUDED.close,
-                    oi_high = GREATEST(upstox_ws_intraday_1m.oi_high, EXCLUDED.oi_high),
-                    oi_low = LEAST(upstox_ws_intraday_1m.oi_low, EXCLUDED.oi_low),
-                    oi_close = EXCLUDED.oi_close,
-                    volume = GREATEST(COALESCE(upstox_ws_intraday_1m.volume, 0), EXCLUDED.volume),
-                    bid_depth_qty = EXCLUDED.bid_depth_qty,
-                    ask_depth_qty = EXCLUDED.ask_depth_qty,
-                    tbq = EXCLUDED.tbq,
-                    tsq = EXCLUDED.tsq,
-                    candle_source = EXCLUDED.candle_source,
-                    updated_at = NOW()
-                """
-            ),
-            {
-                "ik": ik,
-                "candle_time": minute_iso,
-                "open": float(candle["open"]),
-                "high": float(candle["high"]),
-                "low": float(candle["low"]),
-                "close": float(candle["close"]),
-                "oi_open": int(candle["oi_open"]),
-                "oi_high": int(candle["oi_high"]),
-                "oi_low": int(candle["oi_low"]),
-                "oi_close": int(candle["oi_close"]),
-                "volume": int(candle.get("volume") or 0),
-                "bid_q": int(candle.get("bid_depth_qty") or 0),
-                "ask_q": int(candle.get("ask_depth_qty") or 0),
-                "tbq": int(candle.get("tbq") or 0),
-                "tsq": int(candle.get("tsq") or 0),
-                "source": str(candle.get("candle_source") or "ltp_tick"),
-            },
-        )
+        upsert_ws_1m_rows(db, [(ik, minute_iso, candle)])
         db.commit()
     except Exception as e:
         db.rollback()
@@ -179,56 +134,9 @@ def _persist_ws_1m_candle(ik: str, minute_iso: str, candle: Dict[str, Any]) -> N
 
 def _persist_orderflow_1m(ik: str, minute_iso: str, candle: Dict[str, Any]) -> None:
     """1-minute order-flow archive (OI, depth, TBQ/TSQ) for backtest / silent accumulation."""
-    bid = int(candle.get("bid_depth_qty") or 0)
-    ask = int(candle.get("ask_depth_qty") or 0)
-    tbq = int(candle.get("tbq") or 0)
-    tsq = int(candle.get("tsq") or 0)
-    depth_ratio = bid / max(ask, 1)
-    pressure = tbq / max(tsq, 1)
-    oi_close = int(candle.get("oi_close") or 0)
-    oi_open = int(candle.get("oi_open") or oi_close)
-    oi_change = oi_close - oi_open
-    ltp = float(candle.get("close") or 0)
     db = SessionLocal()
     try:
-        db.execute(
-            text(
-                """
-                INSERT INTO upstox_ws_orderflow_1m (
-                    instrument_key, bucket_time, oi, oi_change,
-                    bid_depth_qty, ask_depth_qty, depth_imbalance_ratio,
-                    tbq, tsq, pressure_ratio, ltp, updated_at
-                ) VALUES (
-                    :ik, :bt, :oi, :oic, :bid, :ask, :dr, :tbq, :tsq, :pr, :ltp, NOW()
-                )
-                ON CONFLICT (instrument_key, bucket_time)
-                DO UPDATE SET
-                    oi = EXCLUDED.oi,
-                    oi_change = EXCLUDED.oi_change,
-                    bid_depth_qty = EXCLUDED.bid_depth_qty,
-                    ask_depth_qty = EXCLUDED.ask_depth_qty,
-                    depth_imbalance_ratio = EXCLUDED.depth_imbalance_ratio,
-                    tbq = EXCLUDED.tbq,
-                    tsq = EXCLUDED.tsq,
-                    pressure_ratio = EXCLUDED.pressure_ratio,
-                    ltp = EXCLUDED.ltp,
-                    updated_at = NOW()
-                """
-            ),
-            {
-                "ik": ik,
-                "bt": minute_iso,
-                "oi": oi_close,
-                "oic": oi_change,
-                "bid": bid,
-                "ask": ask,
-                "dr": depth_ratio,
-                "tbq": tbq,
-                "tsq": tsq,
-                "pr": pressure,
-                "ltp": ltp,
-            },
-        )
+        upsert_orderflow_1m_rows(db, [(ik, minute_iso, candle)])
         db.commit()
     except Exception as e:
         db.rollback()
@@ -237,6 +145,14 @@ def _persist_orderflow_1m(ik: str, minute_iso: str, candle: Dict[str, Any]) -> N
         db.close()
 
 
+def _queue_ws_1m_candle(ik: str, minute_iso: str, candle: Dict[str, Any]) -> None:
+    """Hand a 1m candle to the batched writer, or write it inline when the writer is off."""
+    if writer_enabled():
+        enqueue_1m(ik, minute_iso, candle)
+    else:
+        _persist_ws_1m_candle(ik, minute_iso, candle)
+
+
 def _update_ws_1m_candle(
     ik: str,
     ltp: float,
@@ -293,6 +209,10 @@ def _update_ws_1m_candle(
                 c["tsq"] = int(tsq)
             if candle_source == "i1":
                 c["candle_source"] = "i1"
+        if writer_enabled():
+            # Flusher cadence coalesces ticks; no per-key debounce needed.
+            enqueue_1m(ik, minute_iso, c)
+            return
         last_flush = float(_WS_1M_LAST_FLUSH.get(k) or 0.0)
         if now_mono - last_flush >= _flush_debounce_sec():
             _persist_ws_1m_candle(ik, minute_iso, c)
@@ -302,41 +222,7 @@ def _update_ws_1m_candle(
 def _persist_orderflow_latest(ik: str, fields: Dict[str, Any]) -> None:
     db = SessionLocal()
     try:
-        db.execute(
-            text(
-                """
-                INSERT INTO upstox_ws_orderflow_latest (
-                    instrument_key, bid_depth_qty, ask_depth_qty, depth_imbalance_ratio,
-                    tbq, tsq, pressure_ratio, oi, ltp, oi_change, updated_at
-                ) VALUES (
-                    :ik, :bid, :ask, :dr, :tbq, :tsq, :pr, :oi, :ltp, :oic, NOW()
-                )
-                ON CONFLICT (instrument_key) DO UPDATE SET
-                    bid_depth_qty = EXCLUDED.bid_depth_qty,
-                    ask_depth_qty = EXCLUDED.ask_depth_qty,
-                    depth_imbalance_ratio = EXCLUDED.depth_imbalance_ratio,
-                    tbq = EXCLUDED.tbq,
-                    tsq = EXCLUDED.tsq,
-                    pressure_ratio = EXCLUDED.pressure_ratio,
-                    oi = EXCLUDED.oi,
-                    ltp = EXCLUDED.ltp,
-                    oi_change = EXCLUDED.oi_change,
-                    updated_at = NOW()
-                """
-            ),
-            {
-                "ik": ik,
-                "bid": int(fields.get("bid_depth_qty") or 0),
-                "ask": int(fields.get("ask_depth_qty") or 0),
-                "dr": float(fields.get("depth_imbalance_ratio") or 1.0),
-                "tbq": int(fields.get("tbq") or 0),
-                "tsq": int(fields.get("tsq") or 0),
-                "pr": float(fields.get("pressure_ratio") or 1.0),
-                "oi": fields.get("oi"),
-                "ltp": fields.get("ltp"),
-                "oic": int(fields.get("oi_change") or 0),
-            },
-        )
+        upsert_orderflow_latest_rows(db, [(ik, fields)])
         db.commit()
     except Exception as e:
         db.rollback()
@@ -345,6 +231,13 @@ def _persist_orderflow_latest(ik: str, fields: Dict[str, Any]) -> None:
         db.close()
 
 
+def _queue_orderflow_latest(ik: str, fields: Dict[str, Any]) -> None:
+    if writer_enabled():
+        enqueue_orderflow_latest(ik, fields)
+    else:
+        _persist_orderflow_latest(ik, fields)
+
+
 def _stale_after_sec() -> float:
     return float(getattr(settings, "UPSTOX_MARKET_FEED_STALE_SEC", 120.0) or 120.0)
 
@@ -505,6 +398,15 @@ def _extract_oi_ltp_from_feed_value(feed_val: Any) -> Tuple[Optional[int], Optio
                 except (TypeError, ValueError):
                     pass
 
+    if ltp is None:
+        # ``ltpc`` mode (e.g. chart-only keys) carries just the top-level LTPC.
+        top = feed_val.get("ltpc")
+        if isinstance(top, dict) and top.get("ltp") is not None and not isinstance(ff, dict):
+            try:
+                ltp = float(top["ltp"])
+            except (TypeError, ValueError):
+                pass
+
     if oi is None or ltp is None:
         flg = feed_val.get("firstLevelWithGreeks") or feed_val.get("first_level_with_greeks")
         if isinstance(flg, dict):
@@ -524,20 +426,28 @@ def _extract_oi_ltp_from_feed_value(feed_val: Any) -> Tuple[Optional[int], Optio
 
 
 def _ingest_feed_response_dict(d: Dict[str, Any]) -> None:
+    """Dict path: ``MessageToDict`` output -> records (fallback for the direct decoder)."""
     feeds = d.get("feeds")
     if not isinstance(feeds, dict):
         return
+    _ingest_feed_records(
+        [(raw_key, FeedRecord.from_fields(_extract_feed_fields(feed_val))) for raw_key, feed_val in feeds.items()]
+    )
+
+
+def _ingest_feed_records(records: List[Tuple[str, FeedRecord]]) -> None:
+    if not records:
+        return
     _reset_ltq_volume_caches_if_new_ist_day()
     now = time.monotonic()
     now_ist = datetime.now(IST)
     minute_iso = now_ist.replace(second=0, microsecond=0).isoformat()
     with _CACHE_LOCK:
-        for raw_key, feed_val in feeds.items():
+        for raw_key, parsed in records:
             ik = _normalize_ik(str(raw_key))
-            parsed = _extract_feed_fields(feed_val)
-            oi = parsed.get("oi")
-            ltp = parsed.get("ltp")
-            if oi is None and ltp is None and not parsed.get("i1_bars"):
+            oi = parsed.oi
+            ltp = parsed.ltp
+            if oi is None and ltp is None and not parsed.i1_bars:
                 continue
             prev = _OI_LTP_BY_KEY.get(ik, {})
             eff_oi = int(oi) if oi is not None else prev.get("oi")
@@ -552,18 +462,18 @@ def _ingest_feed_response_dict(d: Dict[str, Any]) -> None:
                 "oi": eff_oi,
                 "ltp": eff_ltp,
                 "oi_change": oi_chg_tick,
-                "bid_depth_qty": parsed.get("bid_depth_qty", prev.get("bid_depth_qty", 0)),
-                "ask_depth_qty": parsed.get("ask_depth_qty", prev.get("ask_depth_qty", 0)),
-                "depth_imbalance_ratio": parsed.get("depth_imbalance_ratio", prev.get("depth_imbalance_ratio", 1.0)),
-                "tbq": parsed.get("tbq", prev.get("tbq", 0)),
-                "tsq": parsed.get("tsq", prev.get("tsq", 0)),
-                "pressure_ratio": parsed.get("pressure_ratio", prev.get("pressure_ratio", 1.0)),
+                "bid_depth_qty": parsed.bid_depth_qty,
+                "ask_depth_qty": parsed.ask_depth_qty,
+                "depth_imbalance_ratio": parsed.depth_imbalance_ratio,
+                "tbq": parsed.tbq,
+                "tsq": parsed.tsq,
+                "pressure_ratio": parsed.pressure_ratio,
                 "ts_mono": now,
             }
             if row.get("oi") is None and row.get("ltp") is None:
                 continue
             _OI_LTP_BY_KEY[ik] = row
-            tick_vol = _accumulate_ltq_volume(ik, minute_iso, int(parsed.get("ltq") or 0))
+            tick_vol = _accumulate_ltq_volume(ik, minute_iso, int(parsed.ltq or 0))
             if eff_oi is not None and eff_ltp is not None:
                 _update_ws_1m_candle(
                     ik,
@@ -577,7 +487,7 @@ def _ingest_feed_response_dict(d: Dict[str, Any]) -> None:
                     tsq=int(row.get("tsq") or 0),
                     candle_source="ltp_tick" if tick_vol <= 0 else "ltp_ltq",
                 )
-            for i1 in parsed.get("i1_bars") or []:
+            for i1 in parsed.i1_bars:
                 ts_raw = i1.get("timestamp")
                 if not ts_raw:
                     continue
@@ -609,11 +519,13 @@ def _ingest_feed_response_dict(d: Dict[str, Any]) -> None:
                 }
                 with _CANDLE_LOCK:
                     _WS_1M_STATE[(ik, minute_iso)] = candle
-                _persist_ws_1m_candle(ik, minute_iso, candle)
-            try:
-                _persist_orderflow_latest(ik, {**row, "oi": eff_oi, "ltp": eff_ltp})
-            except Exception:
-                pass
+                _queue_ws_1m_candle(ik, minute_iso, candle)
+            # ltpc / option_greeks ticks carry no depth; orderflow rows need full mode.
+            if MODE_RANK.get(_SUBSCRIBED.get(ik, ""), -1) >= MODE_RANK["full"]:
+                try:
+                    _queue_orderflow_latest(ik, {**row, "oi": eff_oi, "ltp": eff_ltp})
+                except Exception:
+                    pass
             if eff_ltp is not None:
                 try:
                     from backend.services.rocket_ws_live import on_upstox_tick
@@ -621,29 +533,45 @@ def _ingest_feed_response_dict(d: Dict[str, Any]) -> None:
                     on_upstox_tick(
                         ik,
                         ltp=float(eff_ltp),
-                        ltq=int(parsed.get("ltq") or 0),
-                        best_bid=parsed.get("best_bid"),
-                        best_ask=parsed.get("best_ask"),
+                        ltq=int(parsed.ltq or 0),
+                        best_bid=parsed.best_bid,
+                        best_ask=parsed.best_ask,
                         now=now_ist,
                     )
                 except Exception as rocket_exc:
                     logger.debug("upstox_market_feed: rocket tick skipped %s: %s", ik, rocket_exc)
 
 
+def _direct_decode_enabled() -> bool:
+    return bool(getattr(settings, "UPSTOX_WS_DIRECT_DECODE", True))
+
+
 def _decode_and_ingest(binary: bytes) -> None:
     try:
         fr = feed_pb.FeedResponse()
         fr.ParseFromString(binary)
-        d = MessageToDict(fr, preserving_proto_field_name=True)
-        _ingest_feed_response_dict(d)
     except Exception as e:
         logger.debug("upstox_market_feed: decode skip: %s", e)
+        return
+    records = None
+    if _direct_decode_enabled():
+        try:
+            records = records_from_feed_response(fr)
+        except Exception as e:
+            logger.debug("upstox_market_feed: direct decode failed, using dict path: %s", e)
+    try:
+        if records is not None:
+            _ingest_feed_records(records)
+        else:
+            _ingest_feed_response_dict(MessageToDict(fr, preserving_proto_field_name=True))
+    except Exception as e:
+        logger.debug("upstox_market_feed: ingest skip: %s", e)
 
 
 def _authorize_ws_url(access_token: str) -> Optional[str]:
     global _FEED_LAST_ERROR
     try:
-        r = requests.get(
+        r = get_upstox_http_session().get(
             "https://api.upstox.com/v3/feed/market-data-feed/authorize",
             headers={
                 "Accept": "application/json",
@@ -677,7 +605,66 @@ def _authorize_ws_url(access_token: str) -> Optional[str]:
         return None
 
 
-async def _subscribe_and_listen(ws_url: str, batches: List[List[str]]) -> None:
+def _send_json(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload).encode("utf-8")
+
+
+async def _sync_subscriptions(ws: Any) -> None:
+    """Send only the sub / unsub / change_mode messages needed to match desired keys."""
+    global _SUB_MSGS, _UNSUB_MSGS, _CHANGE_MODE_MSGS, _LAST_SYNC_VERSION
+    version = _SUBS.version
+    sub, unsub, change = _SUBS.plan(_SUBSCRIBED)
+    for i in range(0, len(unsub), _CHUNK):
+        batch = unsub[i : i + _CHUNK]
+        await ws.send(
+            _send_json({"guid": str(uuid.uuid4()), "method": "unsub", "data": {"instrumentKeys": batch}})
+        )
+        for k in batch:
+            _SUBSCRIBED.pop(k, None)
+        _UNSUB_MSGS += 1
+        await asyncio.sleep(_SUB_MSG_GAP_SEC)
+    for method, by_mode in (("sub", sub), ("change_mode", change)):
+        for mode, keys in by_mode.items():
+            for i in range(0, len(keys), _CHUNK):
+                if _STOP_EVENT.is_set():
+                    return
+                batch = keys[i : i + _CHUNK]
+                await ws.send(
+                    _send_json(
+                        {
+                            "guid": str(uuid.uuid4()),
+                            "method": method,
+                            "data": {"mode": mode, "instrumentKeys": batch},
+                        }
+                    )
+                )
+                for k in batch:
+                    _SUBSCRIBED[k] = mode
+                if method == "sub":
+                    _SUB_MSGS += 1
+                else:
+                    _CHANGE_MODE_MSGS += 1
+                await asyncio.sleep(_SUB_MSG_GAP_SEC)
+    _LAST_SYNC_VERSION = version
+    if sub or unsub or change:
+        logger.info(
+            "upstox_market_feed: subscriptions synced (+%s -%s ~%s, now %s keys)",
+            sum(len(v) for v in sub.values()),
+            len(unsub),
+            sum(len(v) for v in change.values()),
+            len(_SUBSCRIBED),
+        )
+
+
+async def _subscription_sync_loop(ws: Any) -> None:
+    """Push consumer changes onto the open socket without reconnecting."""
+    while not _STOP_EVENT.is_set():
+        await asyncio.sleep(_SUB_SYNC_POLL_SEC)
+        if _SUBS.version != _LAST_SYNC_VERSION:
+            await _sync_subscriptions(ws)
+
+
+async def _subscribe_and_listen(ws_url: str) -> None:
     ssl_context = ssl.create_default_context()
     async with websockets.connect(
         ws_url,
@@ -686,24 +673,32 @@ async def _subscribe_and_listen(ws_url: str, batches: List[List[str]]) -> None:
         ping_interval=20,
         ping_timeout=120,
     ) as ws:
-        for batch in batches:
-            if _STOP_EVENT.is_set():
-                return
-            msg = {
-                "guid": str(uuid.uuid4()),
-                "method": "sub",
-                "data": {"mode": "full", "instrumentKeys": batch},
-            }
-            await ws.send(json.dumps(msg).encode("utf-8"))
-            await asyncio.sleep(0.15)
-        logger.info("upstox_market_feed: subscribed %s chunks, listening", len(batches))
-        while not _STOP_EVENT.is_set():
-            raw = await asyncio.wait_for(ws.recv(), timeout=180)
-            if isinstance(raw, bytes):
-                _decode_and_ingest(raw)
-
-
-async def _run_connection_loop(batches: List[List[str]]) -> None:
+        # Fresh socket: nothing is subscribed server-side yet.
+        _SUBSCRIBED.clear()
+        await _sync_subscriptions(ws)
+        logger.info("upstox_market_feed: subscribed %s keys, listening", len(_SUBSCRIBED))
+        sync_task = asyncio.create_task(_subscription_sync_loop(ws))
+        record_path = str(getattr(settings, "UPSTOX_WS_RECORD_FRAMES_PATH", "") or "").strip()
+        record_fh = open(record_path, "ab") if record_path else None
+        try:
+            while not _STOP_EVENT.is_set():
+                if sync_task.done():
+                    # Surface send failures so the connection loop reconnects.
+                    sync_task.result()
+                    return
+                raw = await asyncio.wait_for(ws.recv(), timeout=180)
+                if isinstance(raw, bytes):
+                    if record_fh is not None:
+                        write_frame(record_fh, raw)
+                    _decode_and_ingest(raw)
+        finally:
+            sync_task.cancel()
+            if record_fh is not None:
+                record_fh.close()
+
+
+async def _run_connection_loop() -> None:
+    global _AUTHORIZE_CALLS, _CONNECTS
     backoff = 2.0
     ux = UpstoxService(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET)
     ux.reload_token_from_storage()
@@ -717,6 +712,7 @@ async def _run_connection_loop(batches: List[List[str]]) -> None:
             await asyncio.sleep(60)
             ux.reload_token_from_storage()
             continue
+        _AUTHORIZE_CALLS += 1
         ws_url = _authorize_ws_url(token)
         if not ws_url:
             ux.reload_token_from_storage()
@@ -726,13 +722,14 @@ async def _run_connection_loop(batches: List[List[str]]) -> None:
         backoff = 2.0
         try:
             logger.info("upstox_market_feed: websocket connecting")
+            _CONNECTS += 1
             try:
                 from backend.services.rocket_ws_live import mark_feed_reconnect
 
                 mark_feed_reconnect()
             except Exception:
                 pass
-            await _subscribe_and_listen(ws_url, batches)
+            await _subscribe_and_listen(ws_url)
         except asyncio.CancelledError:
             raise
         except Exception as e:
@@ -744,67 +741,101 @@ async def _run_connection_loop(batches: List[List[str]]) -> None:
         ux.reload_token_from_storage()
 
 
-def _thread_main(batches: List[List[str]]) -> None:
+def _thread_main() -> None:
     try:
-        asyncio.run(_run_connection_loop(batches))
+        asyncio.run(_run_connection_loop())
     except Exception as e:
         logger.error("upstox_market_feed: thread fatal: %s", e, exc_info=True)
 
 
-def ensure_market_feed_running(instrument_keys: List[str]) -> None:
+def _ensure_feed_thread() -> None:
+    """Start the long-lived feed thread once; key changes never restart it."""
+    global _FEED_THREAD, _STOP_EVENT
+    if writer_enabled():
+        ensure_writer_running()
+    with _THREAD_LOCK:
+        if _FEED_THREAD is not None and _FEED_THREAD.is_alive():
+            return
+        _STOP_EVENT = threading.Event()
+        _FEED_THREAD = threading.Thread(
+            target=_thread_main,
+            name="upstox-market-feed-v3",
+            daemon=True,
+        )
+        _FEED_THREAD.start()
+    logger.info("upstox_market_feed: started WebSocket feed (%s keys requested)", len(_SUBS.desired()))
+
+
+def ensure_market_feed_running(instrument_keys: List[str], consumer: str = "default") -> None:
     """
-    Start or restart background WebSocket if instrument universe changed.
+    Declare ``consumer``'s instrument universe on the shared feed (replacing its
+    previous set) and make sure the feed thread is running. Changes are applied
+    on the open socket as incremental sub/unsub messages — no reconnect.
     No-op when UPSTOX_MARKET_FEED_ENABLED is false or list empty.
     """
-    global _FEED_THREAD, _LAST_KEYS_SIG, _STOP_EVENT
-
     if not getattr(settings, "UPSTOX_MARKET_FEED_ENABLED", True):
         return
     keys = [k.strip() for k in instrument_keys if (k or "").strip()]
     if not keys:
         return
+    _SUBS.set_keys(consumer, keys, mode="full")
+    _ensure_feed_thread()
 
-    sig = tuple(sorted(keys))
-    if _FEED_THREAD is not None and _FEED_THREAD.is_alive() and sig == _LAST_KEYS_SIG:
-        return
 
-    _STOP_EVENT.set()
-    if _FEED_THREAD is not None:
-        _FEED_THREAD.join(timeout=3.0)
-
-    _STOP_EVENT = threading.Event()
-    _LAST_KEYS_SIG = sig
-    batches = [keys[i : i + _CHUNK] for i in range(0, len(keys), _CHUNK)]
-    _FEED_THREAD = threading.Thread(
-        target=_thread_main,
-        args=(batches,),
-        name="upstox-market-feed-v3",
-        daemon=True,
-    )
-    _FEED_THREAD.start()
-    logger.info(
-        "upstox_market_feed: started WebSocket feed for %s instruments in %s chunks",
-        len(keys),
-        len(batches),
-    )
+def acquire_feed_keys(consumer: str, instrument_keys: List[str], mode: str = "full") -> Dict[str, int]:
+    """Add one reference per key for ``consumer`` (e.g. a chart modal). Returns new refcounts."""
+    counts = _SUBS.acquire(consumer, instrument_keys, mode=mode)
+    _ensure_feed_thread()
+    return counts
 
 
-def get_ws_feed_row(instrument_key: str) -> Optional[Dict[str, Any]]:
-    """Latest full WS row (OI/LTP/depth/tbq/tsq) if fresh."""
-    if not getattr(settings, "UPSTOX_MARKET_FEED_ENABLED", True):
-        return None
+def release_feed_keys(consumer: str, instrument_keys: List[str]) -> Dict[str, int]:
+    """Drop one reference per key; keys unsubscribe once no consumer holds them."""
+    return _SUBS.release(consumer, instrument_keys)
+
+
+def feed_consumer_refcount(consumer: str, instrument_key: str) -> int:
+    return _SUBS.refcount(consumer, instrument_key)
+
+
+def feed_consumer_keys(consumer: str) -> Dict[str, int]:
+    return _SUBS.consumer_keys(consumer)
+
+
+def feed_thread_alive() -> bool:
+    return _FEED_THREAD is not None and _FEED_THREAD.is_alive()
+
+
+def feed_last_error() -> Optional[str]:
+    return _FEED_LAST_ERROR
+
+
+def peek_ws_row(instrument_key: str, max_age_sec: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Latest cached WS row if younger than ``max_age_sec`` (default stale cutoff).
+
+    Ignores UPSTOX_MARKET_FEED_ENABLED: keys acquired explicitly (chart modal)
+    are served even when the scheduled universe feed is switched off.
+    """
     ik = _normalize_ik(instrument_key)
+    limit = _stale_after_sec() if max_age_sec is None else float(max_age_sec)
     with _CACHE_LOCK:
         row = _OI_LTP_BY_KEY.get(ik)
         if not row:
             return None
         ts = float(row.get("ts_mono") or 0)
         age = time.monotonic() - ts
-        if age > _stale_after_sec():
+        if age > limit:
             return None
         return dict(row, age_sec=round(age, 2))
 
 
+def get_ws_feed_row(instrument_key: str) -> Optional[Dict[str, Any]]:
+    """Latest full WS row (OI/LTP/depth/tbq/tsq) if fresh."""
+    if not getattr(settings, "UPSTOX_MARKET_FEED_ENABLED", True):
+        return None
+    return peek_ws_row(instrument_key)
+
+
 def get_ws_quote_for_instrument(instrument_key: str) -> Optional[Dict[str, Any]]:
     """
     Latest OI/LTP from WebSocket cache if fresh (<= ~2 min).
@@ -838,13 +869,26 @@ def feed_status() -> Dict[str, Any]:
     with _CACHE_LOCK:
         n = len(_OI_LTP_BY_KEY)
     alive = _FEED_THREAD is not None and _FEED_THREAD.is_alive()
+    desired = _SUBS.desired()
     return {
         "enabled": getattr(settings, "UPSTOX_MARKET_FEED_ENABLED", True),
         "stale_after_sec": _stale_after_sec(),
         "thread_alive": alive,
         "cached_instruments": n,
         "last_error": _FEED_LAST_ERROR,
-        "universe_keys": len(_LAST_KEYS_SIG or ()),
+        "universe_keys": len(desired),
+        "subscriptions": {
+            "consumers": _SUBS.consumer_counts(),
+            "subscribed_keys": len(_SUBSCRIBED),
+            "pending_sync": _SUBS.version != _LAST_SYNC_VERSION,
+            "truncated_keys": _SUBS.truncated,
+            "sub_msgs": _SUB_MSGS,
+            "unsub_msgs": _UNSUB_MSGS,
+            "change_mode_msgs": _CHANGE_MODE_MSGS,
+            "authorize_calls": _AUTHORIZE_CALLS,
+            "connects": _CONNECTS,
+        },
+        "writer": writer_stats(),
     }
 
 
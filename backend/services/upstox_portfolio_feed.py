@@ -0,0 +1,175 @@
+"""
+Upstox portfolio stream feed (order updates) -> ``order_state_hub``.
+
+Flow:
+  GET https://api.upstox.com/v2/feed/portfolio-stream-feed/authorize?update_types=order
+      -> wss URL
+  Connect WebSocket -> JSON text messages, one per order transition
+  ({"update_type": "order", "order_id": ..., "status": ..., "filled_quantity": ..., ...}).
+
+Started lazily by the live fill waiters (``ensure_portfolio_feed_running``); the
+postback webhook remains the other push channel, and waiters poll REST slowly
+when either is live. DB sync of fills stays with the postback handler and the
+waiters' callers — this feed only updates the in-memory hub.
+
+See: https://upstox.com/developer/api-documentation/get-portfolio-stream-feed
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import ssl
+import threading
+from typing import Any, Dict, Optional
+
+import websockets
+
+from backend.config import settings
+from backend.services.order_state_hub import hub, publish_order_update
+from backend.services.upstox_http import get_session as get_upstox_http_session
+from backend.services.upstox_service import UpstoxService
+
+logger = logging.getLogger(__name__)
+
+_AUTHORIZE_URL = "https://api.upstox.com/v2/feed/portfolio-stream-feed/authorize"
+_FEED_THREAD: Optional[threading.Thread] = None
+_THREAD_LOCK = threading.Lock()
+_STOP_EVENT = threading.Event()
+_FEED_LAST_ERROR: Optional[str] = None
+_MESSAGES = 0
+_CONNECTS = 0
+
+
+def _authorize_ws_url(access_token: str) -> Optional[str]:
+    global _FEED_LAST_ERROR
+    try:
+        r = get_upstox_http_session().get(
+            _AUTHORIZE_URL,
+            params={"update_types": "order"},
+            headers={
+                "Accept": "application/json",
+                "Authorization": f"Bearer {access_token}",
+            },
+            timeout=20,
+        )
+        data = r.json() if r.content else {}
+        if r.status_code != 200 or (data.get("status") or "").lower() != "success":
+            _FEED_LAST_ERROR = str(data.get("message") or data.get("error") or r.text)[:300]
+            logger.warning("upstox_portfolio_feed: authorize failed (%s): %s", r.status_code, _FEED_LAST_ERROR)
+            return None
+        inner = data.get("data") or {}
+        uri = inner.get("authorized_redirect_uri") or inner.get("authorizedRedirectUri")
+        if not uri:
+            _FEED_LAST_ERROR = "authorize: missing redirect URI"
+            return None
+        _FEED_LAST_ERROR = None
+        return str(uri).strip()
+    except Exception as e:
+        _FEED_LAST_ERROR = str(e)
+        logger.warning("upstox_portfolio_feed: authorize exception: %s", e)
+        return None
+
+
+def _ingest_message(raw: Any) -> None:
+    global _MESSAGES
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8", errors="replace")
+    try:
+        msg = json.loads(raw)
+    except (TypeError, ValueError):
+        return
+    if not isinstance(msg, dict):
+        return
+    _MESSAGES += 1
+    if (msg.get("update_type") or "order") == "order":
+        publish_order_update(msg, source="stream")
+
+
+async def _listen(ws_url: str) -> None:
+    async with websockets.connect(
+        ws_url,
+        ssl=ssl.create_default_context(),
+        ping_interval=20,
+        ping_timeout=120,
+    ) as ws:
+        hub.set_stream_connected(True)
+        logger.info("upstox_portfolio_feed: connected, listening for order updates")
+        try:
+            while not _STOP_EVENT.is_set():
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=60)
+                except asyncio.TimeoutError:
+                    continue  # quiet market; pings keep the socket alive
+                _ingest_message(raw)
+        finally:
+            hub.set_stream_connected(False)
+
+
+async def _run_connection_loop() -> None:
+    global _CONNECTS
+    backoff = 2.0
+    ux = UpstoxService(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET)
+    ux.reload_token_from_storage()
+    while not _STOP_EVENT.is_set():
+        token = ux.access_token
+        ws_url = _authorize_ws_url(token) if token else None
+        if not ws_url:
+            await asyncio.sleep(min(backoff, 60.0))
+            backoff = min(backoff * 1.5, 120.0)
+            ux.reload_token_from_storage()
+            continue
+        backoff = 2.0
+        try:
+            _CONNECTS += 1
+            await _listen(ws_url)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("upstox_portfolio_feed: stream ended: %s", e)
+        if _STOP_EVENT.is_set():
+            break
+        await asyncio.sleep(min(backoff, 30.0))
+        backoff = min(backoff * 1.5, 60.0)
+        ux.reload_token_from_storage()
+
+
+def _thread_main() -> None:
+    try:
+        asyncio.run(_run_connection_loop())
+    except Exception as e:
+        logger.error("upstox_portfolio_feed: thread fatal: %s", e, exc_info=True)
+    finally:
+        hub.set_stream_connected(False)
+
+
+def ensure_portfolio_feed_running() -> None:
+    """Start the order-update stream thread once. No-op when UPSTOX_PORTFOLIO_STREAM_ENABLED is false."""
+    global _FEED_THREAD, _STOP_EVENT
+    if not getattr(settings, "UPSTOX_PORTFOLIO_STREAM_ENABLED", True):
+        return
+    with _THREAD_LOCK:
+        if _FEED_THREAD is not None and _FEED_THREAD.is_alive():
+            return
+        _STOP_EVENT = threading.Event()
+        _FEED_THREAD = threading.Thread(target=_thread_main, name="upstox-portfolio-feed", daemon=True)
+        _FEED_THREAD.start()
+    logger.info("upstox_portfolio_feed: started order-update stream")
+
+
+def stop_portfolio_feed(timeout: float = 5.0) -> None:
+    """Stop reconnecting and close the stream (lifespan shutdown); waits up to ``timeout`` s."""
+    _STOP_EVENT.set()
+    t = _FEED_THREAD
+    if t is not None and t.is_alive() and t is not threading.current_thread():
+        t.join(timeout)
+
+
+def portfolio_feed_status() -> Dict[str, Any]:
+    return {
+        "enabled": bool(getattr(settings, "UPSTOX_PORTFOLIO_STREAM_ENABLED", True)),
+        "thread_alive": _FEED_THREAD is not None and _FEED_THREAD.is_alive(),
+        "connects": _CONNECTS,
+        "messages": _MESSAGES,
+        "last_error": _FEED_LAST_ERROR,
+    }
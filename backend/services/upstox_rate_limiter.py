@@ -1,4 +1,4 @@
-"""Process-wide budget for Upstox historical/intraday candle requests.
+"""Process-wide budgets for Upstox REST requests (candles, quotes, option chains, orders).
 
 Upstox enforces per-user rate limits on the historical-candle APIs (documented
 ~50 req/s, 500 req/min, 2000 req/30-min — and as low as 10 req/s for the algo
@@ -13,13 +13,40 @@ thrash into orderly, predictable throughput. It is intentionally simple and
 self-contained (no external deps) and thread-safe for use from ThreadPoolExecutor
 workers.
 
-Scope: only the candle endpoints are gated (that is where the storm is); order,
-position and quote calls are unaffected.
-
-Priority: ``scheduled_10m`` (and other scheduled warm executions) run with a
-longer per-slot wait and block discretionary callers while active. Discretionary
-callers also yield when the 30-min window is near cap (headroom reserved for the
-next scheduled warm).
+Scope: every call to the Upstox API host is classified into an endpoint family
+(``endpoint_family``): ``candle``, ``quote``, ``option_chain``, ``order``,
+``portfolio``. Each family has its own limiter (same scheduler, caps from
+``UPSTOX_<FAMILY>_RL_PER_SEC`` / ``_PER_MIN``) so a quote burst cannot eat the
+candle budget and vice versa. The shared HTTP transport (``upstox_http``) and the
+async client gate on ``acquire_api_slot`` and report responses through
+``note_api_response``:
+
+* Order placement / modify / cancel run in the ORDER class, and every non-candle
+  family keeps ``UPSTOX_API_RL_ORDER_RESERVE`` of each cap for ORDER requests
+  (exits and entries on live positions), so status polling and quote bursts
+  cannot crowd them out.
+* A 429 from Upstox halves that family's effective caps; they recover by 10%
+  every 30 s without another 429 — budgets converge on what Upstox actually
+  accepts instead of feeding a retry storm.
+
+Scheduling: the limiter is a priority/deadline queue, not a polling loop. Each
+request belongs to a ``CandlePriority`` class — order (exit/entry checks) >
+scheduled warm > scanner > backfill — chosen from the calling thread's context
+(``candle_priority``, ``scheduled_candle_worker``, ``background_candle_worker``).
+Classes share free slots by weight, FIFO within a class; a request whose
+deadline (its max wait) passes is dropped without consuming budget. Per-class
+wait histograms are in ``stats()["classes"]``.
+
+Admission on top of the queue: ``scheduled_10m`` (and other scheduled warm
+executions) run with a longer per-slot wait and block discretionary callers
+while active. Discretionary callers also yield when the 30-min window is near
+cap (headroom reserved for the next scheduled warm). Order-class requests skip
+both gates — they only compete in the queue, where they outrank the warm.
+
+Background refreshes (candle-cache stale-while-revalidate, 5m bar-close
+prefetch) run below discretionary callers: they wait at most
+``UPSTOX_CANDLE_RL_BACKGROUND_MAX_WAIT`` for a slot and start yielding at twice
+the scheduled headroom, so they only spend budget nobody else is asking for.
 """
 from __future__ import annotations
 
@@ -27,8 +54,11 @@ import bisect
 import logging
 import threading
 import time
+from collections import deque
 from contextlib import contextmanager
-from typing import Iterator, List, Tuple
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -46,14 +76,100 @@ def is_scheduled_warm_execution(execution: str) -> bool:
     return str(execution or "") in SCHEDULED_WARM_EXECUTIONS
 
 
-class SlidingWindowRateLimiter:
-    """Enforces several (max_count, window_seconds) caps simultaneously.
+class CandlePriority(IntEnum):
+    """Scheduling classes, most urgent first (lower value wins ties)."""
+
+    ORDER = 0      # exit checks / entry confirmation on live positions
+    SCHEDULED = 1  # scheduled_10m and other scheduled warms
+    SCANNER = 2    # discretionary: scanners, UI routes, signal jobs
+    BACKFILL = 3   # background refresh, prefetch, backtest bulk fetches
+
+
+# Share of grants each class receives while several classes are queued (smooth
+# weighted round robin), so urgent work jumps a 200-request warm without the warm
+# ever starving scanners completely.
+PRIORITY_WEIGHTS: Dict[CandlePriority, int] = {
+    CandlePriority.ORDER: 16,
+    CandlePriority.SCHEDULED: 6,
+    CandlePriority.SCANNER: 3,
+    CandlePriority.BACKFILL: 1,
+}
+
+# Upper bounds (seconds) of the per-class wait histogram; a last bucket is open.
+WAIT_BUCKETS_SEC: Tuple[float, ...] = (0.05, 0.25, 1, 2, 5, 10, 30, 60, 120, 300)
+
+_WAITING, _GRANTED, _DROPPED = "waiting", "granted", "dropped"
+
+
+@dataclass(eq=False)
+class SlotTicket:
+    """One queued request for a slot; ``state`` ends as ``granted`` or ``dropped``."""
+
+    priority: CandlePriority
+    seq: int
+    enqueued_at: float
+    deadline: float
+    state: str = _WAITING
+    decided_at: Optional[float] = None
+    cond: Optional[threading.Condition] = field(default=None, repr=False)
+
+    @property
+    def waited(self) -> float:
+        return (self.decided_at if self.decided_at is not None else self.enqueued_at) - self.enqueued_at
+
 
-    ``acquire`` blocks until a request slot is available under *all* configured
-    windows, then records the grant. Returns the seconds it waited (for metrics).
+class _ClassStats:
+    __slots__ = ("granted", "dropped", "wait_total", "wait_max", "hist")
+
+    def __init__(self) -> None:
+        self.granted = 0
+        self.dropped = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hist = [0] * (len(WAIT_BUCKETS_SEC) + 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = [f"<={b:g}" for b in WAIT_BUCKETS_SEC] + [f">{WAIT_BUCKETS_SEC[-1]:g}"]
+        return {
+            "granted": self.granted,
+            "dropped": self.dropped,
+            "avg_wait_sec": round(self.wait_total / self.granted, 3) if self.granted else 0.0,
+            "max_wait_sec": round(self.wait_max, 3),
+            "wait_sec": dict(zip(labels, self.hist)),
+        }
+
+
+class SlidingWindowRateLimiter:
+    """Priority/deadline scheduler over several (max_count, window_seconds) caps.
+
+    Requests queue per ``CandlePriority`` class, FIFO within a class; whenever the
+    windows (and ``min_interval`` spacing) allow a grant, the next class is chosen
+    by smooth weighted round robin over the classes with waiters
+    (``PRIORITY_WEIGHTS``). Every request carries a deadline: once it has passed,
+    or the next free slot is already later than it, the request is dropped without
+    consuming budget.
+
+    Blocking callers (``acquire``) sleep on their own condition variable. The one
+    waiter holding the "timer" sleeps until the next slot frees and then runs
+    ``dispatch``, which wakes exactly the tickets it granted or dropped (and hands
+    the timer on), so there is no polling and no thundering herd. A submit whose
+    slot frees before the timer's wake time (an ORDER request under the reserve)
+    wakes the timer early, so the newcomer is granted at its own slot time.
+
+    ``submit`` / ``dispatch`` are the non-blocking core; with an injected ``clock``
+    they drive deterministic simulations.
     """
 
-    def __init__(self, limits: List[Tuple[int, float]], min_interval: float = 0.0):
+    def __init__(
+        self,
+        limits: List[Tuple[int, float]],
+        min_interval: float = 0.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        order_reserve: float = 0.0,
+        min_scale: float = 0.25,
+        recover_sec: float = 30.0,
+    ):
         # Keep only positive caps; sort by window for readability.
         self._limits = sorted(
             ((int(m), float(w)) for m, w in limits if int(m) > 0 and float(w) > 0),
@@ -64,9 +180,27 @@ class SlidingWindowRateLimiter:
         # of worker threads can't fire N requests in the same instant and trip
         # Upstox's per-second limit.
         self._min_interval = max(0.0, float(min_interval))
-        self._events: List[float] = []  # monotonic grant timestamps, ascending
-        self._last_grant: float = 0.0
+        self._clock = clock
+        self._events: List[float] = []  # grant timestamps (clock), ascending
+        self._last_grant: Optional[float] = None
         self._lock = threading.Lock()
+        self._queues: Dict[CandlePriority, Deque[SlotTicket]] = {p: deque() for p in CandlePriority}
+        self._credit: Dict[CandlePriority, int] = {p: 0 for p in CandlePriority}
+        self._waiting = 0
+        self._seq = 0
+        self._timer: Optional[SlotTicket] = None
+        self._timer_wake = float("inf")  # when the timer waiter will next run dispatch
+        self._class_stats: Dict[CandlePriority, _ClassStats] = {p: _ClassStats() for p in CandlePriority}
+        self._next_at = float("inf")
+        # Share of every cap only ORDER-class requests may use.
+        self._order_reserve = min(0.9, max(0.0, float(order_reserve)))
+        # 429 adaptation: caps are multiplied by ``_scale`` (halved per throttle
+        # response, floor ``min_scale``; +0.1 per ``recover_sec`` without one).
+        self._scale = 1.0
+        self._scale_at = 0.0
+        self._min_scale = min(1.0, max(0.05, float(min_scale)))
+        self._recover_sec = max(1.0, float(recover_sec))
+        self._throttle_responses = 0
 
     def _prune(self, now: float) -> None:
         cutoff = now - self._max_window
@@ -74,56 +208,248 @@ class SlidingWindowRateLimiter:
         if drop:
             del self._events[:drop]
 
-    def _wait_needed(self, now: float) -> float:
-        """Seconds to wait before a slot frees up (0.0 if free now). Caller holds lock."""
+    def _cap(self, max_count: int, reserved: bool) -> int:
+        cap = max(1, int(max_count * self._scale))
+        if reserved and self._order_reserve:
+            cap = max(1, cap - int(cap * self._order_reserve))
+        return cap
+
+    def _recover(self, now: float) -> None:
+        if self._scale >= 1.0:
+            return
+        steps = int((now - self._scale_at) // self._recover_sec)
+        if steps > 0:
+            self._scale = min(1.0, self._scale + 0.1 * steps)
+            self._scale_at += steps * self._recover_sec
+
+    def _wait_needed(self, now: float, reserved: bool = False) -> float:
+        """Seconds to wait before a slot frees up (0.0 if free now). Caller holds lock.
+
+        ``reserved``: under the caps left after the ORDER reserve (non-ORDER classes).
+        """
         self._prune(now)
+        self._recover(now)
 
         wait = 0.0
-        if self._min_interval > 0.0 and self._last_grant:
-            wait = max(wait, self._last_grant + self._min_interval - now)
+        if self._min_interval > 0.0 and self._last_grant is not None:
+            wait = max(wait, self._last_grant + self._min_interval / self._scale - now)
         for max_count, window in self._limits:
+            cap = self._cap(max_count, reserved)
             start = now - window
             j = bisect.bisect_left(self._events, start)
             count = len(self._events) - j
-            if count >= max_count:
+            if count >= cap:
                 # The event at this index must exit its window before we may proceed.
-                exit_event = self._events[len(self._events) - max_count]
+                exit_event = self._events[len(self._events) - cap]
                 wait = max(wait, exit_event + window - now)
         return wait
 
+    def note_throttled(self) -> float:
+        """Upstox answered 429: halve the effective caps (down to ``min_scale``). Returns the new scale."""
+        with self._lock:
+            now = self._clock()
+            self._recover(now)
+            self._scale = max(self._min_scale, self._scale * 0.5)
+            self._scale_at = now
+            self._throttle_responses += 1
+            return self._scale
+
+    @property
+    def scale(self) -> float:
+        with self._lock:
+            self._recover(self._clock())
+            return self._scale
+
     def count_in_window(self, window_seconds: float) -> int:
         """Grants recorded in the last ``window_seconds`` (for headroom checks)."""
         with self._lock:
-            now = time.monotonic()
+            now = self._clock()
             self._prune(now)
             start = now - float(window_seconds)
             j = bisect.bisect_left(self._events, start)
             return len(self._events) - j
 
-    def acquire(self, max_wait: float = 90.0) -> Tuple[bool, float]:
-        """Try to reserve a slot, waiting up to ``max_wait`` s.
+    # --- scheduling core (caller holds the lock) ------------------------------
+
+    def _pick_class(self, active: List[CandlePriority]) -> CandlePriority:
+        total = 0
+        for p in active:
+            w = PRIORITY_WEIGHTS[p]
+            self._credit[p] += w
+            total += w
+        best = max(active, key=lambda p: (self._credit[p], -p))
+        self._credit[best] -= total
+        return best
+
+    def _decide(self, t: SlotTicket, state: str, now: float) -> None:
+        t.state = state
+        t.decided_at = now
+        self._waiting -= 1
+        st = self._class_stats[t.priority]
+        if state == _GRANTED:
+            waited = max(0.0, now - t.enqueued_at)
+            st.granted += 1
+            st.wait_total += waited
+            st.wait_max = max(st.wait_max, waited)
+            st.hist[bisect.bisect_left(WAIT_BUCKETS_SEC, waited)] += 1
+        else:
+            st.dropped += 1
+        if t.cond is not None:
+            t.cond.notify()
+
+    def _dispatch_locked(self, now: float) -> float:
+        # Expired requests never receive a slot.
+        for q in self._queues.values():
+            if q and any(t.deadline < now for t in q):
+                keep = deque()
+                for t in q:
+                    if t.deadline < now:
+                        self._decide(t, _DROPPED, now)
+                    else:
+                        keep.append(t)
+                q.clear()
+                q.extend(keep)
+        wait_order = wait_other = 0.0
+        while self._waiting:
+            wait_order = self._wait_needed(now)
+            if wait_order > 0.0:
+                wait_other = max(wait_order, self._wait_needed(now, reserved=True))
+                break
+            wait_other = self._wait_needed(now, reserved=True) if self._order_reserve else 0.0
+            active = [
+                p
+                for p in CandlePriority
+                if self._queues[p] and (p == CandlePriority.ORDER or wait_other <= 0.0)
+            ]
+            if not active:
+                break  # only non-ORDER requests queued and the unreserved share is used up
+            t = self._queues[self._pick_class(active)].popleft()
+            self._events.append(now)
+            self._last_grant = now
+            self._decide(t, _GRANTED, now)
+        if not self._waiting:
+            self._next_at = float("inf")
+            return self._next_at
+        # Requests that could not be served before their deadline even at the head
+        # of the line are shed now instead of holding a thread until they expire.
+        for p, q in self._queues.items():
+            slot_at = now + (wait_order if p == CandlePriority.ORDER else wait_other)
+            if q and any(t.deadline < slot_at for t in q):
+                keep = deque()
+                for t in q:
+                    if t.deadline < slot_at:
+                        self._decide(t, _DROPPED, now)
+                    else:
+                        keep.append(t)
+                q.clear()
+                q.extend(keep)
+        if not self._waiting:
+            self._next_at = float("inf")
+        elif self._queues[CandlePriority.ORDER]:
+            self._next_at = now + wait_order
+        else:
+            self._next_at = now + wait_other
+        return self._next_at
+
+    def _first_waiting(self) -> Optional[SlotTicket]:
+        for p in CandlePriority:
+            if self._queues[p]:
+                return self._queues[p][0]
+        return None
+
+    # --- public API -------------------------------------------------------------
+
+    def submit(
+        self,
+        priority: CandlePriority = CandlePriority.SCANNER,
+        *,
+        deadline: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> SlotTicket:
+        """Queue a request (deadline in clock time) and dispatch; never blocks."""
+        with self._lock:
+            return self._submit_locked(CandlePriority(priority), deadline, self._clock() if now is None else now)
+
+    def _submit_locked(self, priority: CandlePriority, deadline: Optional[float], now: float) -> SlotTicket:
+        self._seq += 1
+        t = SlotTicket(priority, self._seq, now, float("inf") if deadline is None else float(deadline))
+        self._queues[priority].append(t)
+        self._waiting += 1
+        self._dispatch_locked(now)
+        # A newcomer whose class frees earlier (ORDER under the reserve) must not
+        # wait for the wake time the sleeping timer computed for its own class.
+        timer = self._timer
+        if (
+            t.state == _WAITING
+            and timer is not None
+            and timer.state == _WAITING
+            and timer.cond is not None
+            and self._next_at < self._timer_wake
+        ):
+            self._timer_wake = self._next_at
+            timer.cond.notify()
+        return t
+
+    def dispatch(self, now: Optional[float] = None) -> float:
+        """Grant/drop whatever is due at ``now``; returns when the next slot frees (inf if idle)."""
+        with self._lock:
+            return self._dispatch_locked(self._clock() if now is None else now)
+
+    def acquire(
+        self,
+        max_wait: float = 90.0,
+        *,
+        priority: CandlePriority = CandlePriority.SCANNER,
+        deadline: Optional[float] = None,
+    ) -> Tuple[bool, float]:
+        """Try to reserve a slot, waiting up to ``max_wait`` s (or until ``deadline``).
 
         Returns ``(granted, waited_seconds)``. When the budget can't free a slot
-        within ``max_wait`` the request is **denied** (``granted=False``) and *no*
-        slot is consumed — the caller should skip the request entirely rather than
+        in time the request is **denied** (``granted=False``) and *no* slot is
+        consumed — the caller should skip the request entirely rather than
         sending it to Upstox. This sheds excess demand cleanly instead of bursting
         over the limit and triggering 429s.
         """
         if not self._limits:
             return True, 0.0
-        start_ts = time.monotonic()
-        while True:
-            with self._lock:
-                now = time.monotonic()
-                wait = self._wait_needed(now)
-                if wait <= 0.0:
-                    self._events.append(now)
-                    self._last_grant = now
-                    return True, now - start_ts
-            if (time.monotonic() - start_ts) + wait > max_wait:
-                # Budget exhausted: deny without sending (caller skips this request).
-                return False, time.monotonic() - start_ts
-            time.sleep(min(wait, 0.25))
+        with self._lock:
+            now = self._clock()
+            limit = now + max(0.0, float(max_wait))
+            t = self._submit_locked(
+                CandlePriority(priority), limit if deadline is None else min(limit, deadline), now
+            )
+            if t.state != _WAITING:
+                return t.state == _GRANTED, t.waited
+            t.cond = threading.Condition(self._lock)
+            while t.state == _WAITING:
+                if self._timer is None or self._timer.state != _WAITING:
+                    self._timer = t
+                wake = t.deadline
+                if self._timer is t:
+                    wake = min(wake, self._next_at)
+                    self._timer_wake = wake
+                t.cond.wait(max(0.0, wake - now) + 1e-4)
+                now = self._clock()
+                self._dispatch_locked(now)
+            if self._timer is t:
+                self._timer = None
+                self._timer_wake = float("inf")
+                nxt = self._first_waiting()
+                if nxt is not None and nxt.cond is not None:
+                    nxt.cond.notify()  # hand the timer to the next waiter
+            return t.state == _GRANTED, t.waited
+
+    def waiting(self) -> int:
+        with self._lock:
+            return self._waiting
+
+    def class_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-class grants, drops and wait-time histogram."""
+        with self._lock:
+            out = {p.name.lower(): self._class_stats[p].as_dict() for p in CandlePriority}
+            for p in CandlePriority:
+                out[p.name.lower()]["waiting"] = len(self._queues[p])
+        return out
 
 
 # --- process-wide singleton -------------------------------------------------
@@ -139,6 +465,8 @@ _denied = 0
 _denied_yield_scheduled = 0
 _denied_yield_headroom = 0
 _scheduled_acquired = 0
+_background_acquired = 0
+_denied_background = 0
 
 # Thread-local: worker threads inside a scheduled warm pool mark themselves.
 _tls = threading.local()
@@ -170,6 +498,28 @@ def scheduled_candle_worker() -> Iterator[None]:
         _tls.scheduled_worker = prev
 
 
+@contextmanager
+def candle_priority(priority: CandlePriority) -> Iterator[None]:
+    """Run the enclosed candle fetches on this thread in ``priority`` (e.g. ORDER for exits)."""
+    prev = getattr(_tls, "priority", None)
+    _tls.priority = CandlePriority(priority)
+    try:
+        yield
+    finally:
+        _tls.priority = prev
+
+
+@contextmanager
+def background_candle_worker() -> Iterator[None]:
+    """Mark the current thread as a low-priority background refresher (SWR / prefetch)."""
+    prev = getattr(_tls, "background_worker", False)
+    _tls.background_worker = True
+    try:
+        yield
+    finally:
+        _tls.background_worker = prev
+
+
 @contextmanager
 def candle_warm_execution(execution: str) -> Iterator[None]:
     """Wrap a scheduled candle warm: priority mode + long max_wait for workers."""
@@ -197,6 +547,22 @@ def _is_scheduled_worker() -> bool:
     return bool(getattr(_tls, "scheduled_worker", False))
 
 
+def _is_background_worker() -> bool:
+    return bool(getattr(_tls, "background_worker", False)) and not _is_scheduled_worker()
+
+
+def current_candle_priority() -> CandlePriority:
+    """Scheduling class for a candle request issued from the current thread."""
+    explicit = getattr(_tls, "priority", None)
+    if explicit is not None:
+        return explicit
+    if _is_scheduled_worker():
+        return CandlePriority.SCHEDULED
+    if _is_background_worker() or _is_backtest_bulk_prefetch():
+        return CandlePriority.BACKFILL
+    return CandlePriority.SCANNER
+
+
 def _build_limiter() -> SlidingWindowRateLimiter:
     from backend.config import settings
 
@@ -229,6 +595,18 @@ def _scheduled_max_wait() -> float:
     return float(getattr(settings, "UPSTOX_CANDLE_RL_SCHEDULED_MAX_WAIT", 300) or 300)
 
 
+def _background_max_wait() -> float:
+    from backend.config import settings
+
+    return float(getattr(settings, "UPSTOX_CANDLE_RL_BACKGROUND_MAX_WAIT", 20) or 20)
+
+
+def _order_max_wait() -> float:
+    from backend.config import settings
+
+    return float(getattr(settings, "UPSTOX_CANDLE_RL_ORDER_MAX_WAIT", 10) or 10)
+
+
 def _default_max_wait() -> float:
     from backend.config import settings
 
@@ -237,12 +615,15 @@ def _default_max_wait() -> float:
     return float(getattr(settings, "UPSTOX_CANDLE_RL_MAX_WAIT", 90) or 90)
 
 
-def _headroom_exhausted() -> bool:
-    """True when discretionary callers should yield to the next scheduled_10m."""
+def _headroom_exhausted(factor: int = 1) -> bool:
+    """True when discretionary callers should yield to the next scheduled_10m.
+
+    ``factor`` scales the reserved headroom (background refreshers yield at 2x).
+    """
     from backend.config import settings
 
     cap = int(getattr(settings, "UPSTOX_CANDLE_RL_PER_30MIN", 1500))
-    headroom = int(getattr(settings, "SCHEDULED_CANDLE_RL_HEADROOM", 220))
+    headroom = int(getattr(settings, "SCHEDULED_CANDLE_RL_HEADROOM", 220)) * max(1, int(factor))
     if cap <= 0 or headroom <= 0:
         return False
     used = _get_limiter().count_in_window(1800.0)
@@ -271,6 +652,7 @@ def acquire_candle_slot() -> bool:
     """
     global _acquired, _total_wait, _throttled, _denied
     global _denied_yield_scheduled, _denied_yield_headroom, _scheduled_acquired
+    global _background_acquired, _denied_background
     try:
         from backend.config import settings
 
@@ -279,37 +661,52 @@ def acquire_candle_slot() -> bool:
     except Exception:
         pass
 
-    scheduled_worker = _is_scheduled_worker()
-    if _scheduled_warm_active() and not scheduled_worker:
+    priority = current_candle_priority()
+    order = priority == CandlePriority.ORDER
+    scheduled_worker = _is_scheduled_worker() and not order
+    background = _is_background_worker() and not order
+    if _scheduled_warm_active() and not (scheduled_worker or order):
         _denied += 1
         _denied_yield_scheduled += 1
+        if background:
+            _denied_background += 1
         return False
 
-    if not scheduled_worker and _headroom_exhausted():
+    if not (scheduled_worker or order) and _headroom_exhausted(2 if background else 1):
         _denied += 1
         _denied_yield_headroom += 1
+        if background:
+            _denied_background += 1
         return False
 
     try:
         with _max_wait_override_lock:
             override = _max_wait_override
-        if override is not None and override > 0:
+        if order:
+            max_wait = _order_max_wait()
+        elif override is not None and override > 0:
             max_wait = float(override)
         elif scheduled_worker:
             max_wait = _scheduled_max_wait()
+        elif background:
+            max_wait = _background_max_wait()
         else:
             max_wait = _default_max_wait()
     except Exception:
         max_wait = _scheduled_max_wait() if scheduled_worker else 90.0
 
-    granted, waited = _get_limiter().acquire(max_wait=max_wait)
+    granted, waited = _get_limiter().acquire(max_wait=max_wait, priority=priority)
     _total_wait += waited
     if not granted:
         _denied += 1
+        if background:
+            _denied_background += 1
     else:
         _acquired += 1
         if scheduled_worker:
             _scheduled_acquired += 1
+        elif background:
+            _background_acquired += 1
         if waited > 0.01:
             _throttled += 1
     # Periodic visibility into pacing + how much demand is being shed.
@@ -328,6 +725,132 @@ def acquire_candle_slot() -> bool:
     return granted
 
 
+# --- endpoint families (non-candle budgets) ------------------------------------
+
+API_FAMILIES: Tuple[str, ...] = ("candle", "quote", "option_chain", "order", "portfolio")
+
+# (per-second, per-minute) defaults; overridable via UPSTOX_<FAMILY>_RL_PER_SEC / _PER_MIN.
+_FAMILY_DEFAULT_CAPS: Dict[str, Tuple[int, int]] = {
+    "quote": (25, 400),
+    "option_chain": (10, 150),
+    "order": (10, 250),
+    "portfolio": (10, 200),
+}
+
+_FAMILY_LIMITERS: Dict[str, SlidingWindowRateLimiter] = {}
+_FAMILY_LOCK = threading.Lock()
+_FAMILY_COUNTERS: Dict[str, Dict[str, int]] = {
+    f: {"granted": 0, "denied": 0, "responses": 0, "http_429": 0} for f in API_FAMILIES
+}
+
+
+def endpoint_family(method: str, url: str) -> Optional[str]:
+    """Budget family for an Upstox REST URL, or None when the call is not budgeted."""
+    u = str(url or "").split("?", 1)[0].lower()
+    if "/historical-candle" in u:
+        return "candle"
+    if "/market-quote/" in u:
+        return "quote"
+    if "/option/" in u:
+        return "option_chain"
+    if "/order/" in u or u.endswith("/order"):
+        return "order"
+    if "/portfolio/" in u or "/user/get-funds" in u:
+        return "portfolio"
+    return None
+
+
+def _family_caps(family: str) -> Tuple[int, int]:
+    from backend.config import settings
+
+    per_sec, per_min = _FAMILY_DEFAULT_CAPS[family]
+    prefix = f"UPSTOX_{family.upper()}_RL"
+    return (
+        int(getattr(settings, f"{prefix}_PER_SEC", per_sec) or per_sec),
+        int(getattr(settings, f"{prefix}_PER_MIN", per_min) or per_min),
+    )
+
+
+def _family_limiter(family: str) -> SlidingWindowRateLimiter:
+    if family == "candle":
+        return _get_limiter()
+    lim = _FAMILY_LIMITERS.get(family)
+    if lim is not None:
+        return lim
+    with _FAMILY_LOCK:
+        lim = _FAMILY_LIMITERS.get(family)
+        if lim is None:
+            from backend.config import settings
+
+            per_sec, per_min = _family_caps(family)
+            lim = SlidingWindowRateLimiter(
+                [(per_sec, 1.0), (per_min, 60.0)],
+                order_reserve=float(getattr(settings, "UPSTOX_API_RL_ORDER_RESERVE", 0.2) or 0.0),
+            )
+            _FAMILY_LIMITERS[family] = lim
+    return lim
+
+
+def _api_priority(family: str, method: str) -> CandlePriority:
+    if family == "order" and str(method or "GET").upper() != "GET":
+        return CandlePriority.ORDER
+    return current_candle_priority()
+
+
+def acquire_api_slot(family: Optional[str], method: str = "GET") -> bool:
+    """Reserve a request slot in ``family``'s budget (candles use ``acquire_candle_slot``).
+
+    True when the request may be sent, False when it should be skipped (the
+    family's budget cannot free a slot within its max wait). Unbudgeted calls
+    (``family`` None) and disabled budgets always pass.
+    """
+    if not family:
+        return True
+    if family == "candle":
+        return acquire_candle_slot()
+    try:
+        from backend.config import settings
+
+        if not getattr(settings, "UPSTOX_API_RATE_LIMIT_ENABLED", True):
+            return True
+        max_wait = float(getattr(settings, "UPSTOX_API_RL_MAX_WAIT", 10) or 10)
+    except Exception:
+        max_wait = 10.0
+    granted, _ = _family_limiter(family).acquire(max_wait=max_wait, priority=_api_priority(family, method))
+    counters = _FAMILY_COUNTERS[family]
+    counters["granted" if granted else "denied"] += 1
+    return granted
+
+
+def note_api_response(family: Optional[str], status_code: int) -> None:
+    """Feed one Upstox response back into ``family``'s budget (429 → scale caps down)."""
+    if not family:
+        return
+    counters = _FAMILY_COUNTERS[family]
+    counters["responses"] += 1
+    if int(status_code or 0) == 429:
+        counters["http_429"] += 1
+        scale = _family_limiter(family).note_throttled()
+        logger.warning("upstox %s budget: 429 received, caps scaled to %.0f%%", family, scale * 100)
+
+
+def family_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-family counters, current cap scale and per-class scheduler stats."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for family in API_FAMILIES:
+        row: Dict[str, Any] = dict(_FAMILY_COUNTERS[family])
+        if family == "candle":
+            row["granted"], row["denied"] = _acquired, _denied
+        lim = _get_limiter() if family == "candle" else _FAMILY_LIMITERS.get(family)
+        if lim is not None:
+            row["cap_scale"] = round(lim.scale, 3)
+            row["waiting"] = lim.waiting()
+            if family != "candle":
+                row["classes"] = lim.class_stats()
+        out[family] = row
+    return out
+
+
 def stats() -> dict:
     out = {
         "acquired": _acquired,
@@ -337,11 +860,16 @@ def stats() -> dict:
         "denied_yield_to_scheduled": _denied_yield_scheduled,
         "denied_yield_headroom": _denied_yield_headroom,
         "scheduled_acquired": _scheduled_acquired,
+        "background_acquired": _background_acquired,
+        "denied_background": _denied_background,
         "scheduled_warm_active": _scheduled_warm_active(),
     }
     try:
         lim = _get_limiter()
         out["window_30min_used"] = lim.count_in_window(1800.0)
+        out["waiting"] = lim.waiting()
+        out["classes"] = lim.class_stats()
+        out["families"] = family_stats()
     except Exception:
         pass
     return out
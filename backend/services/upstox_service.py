@@ -9,6 +9,14 @@ from typing import Dict, Optional, List, Any, Tuple, Union
 from urllib.parse import quote
 import pytz
 
+from backend.services.trading_calendar import (  # noqa: F401 - NSE_KNOWN_HOLIDAYS re-exported
+    NSE_KNOWN_HOLIDAYS,
+    get_trading_calendar,
+    register_holiday_source,
+)
+from backend.services.upstox_http import BudgetDenied
+from backend.services.upstox_http import get_session as _http_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -146,7 +154,10 @@ def _aggregate_1m_to_n_minute(candles: List[Dict[str, Any]], n: int) -> List[Dic
 
 
 # V3 intraday endpoint has today's session; historical minute/hour bars lag for F&O.
-_INTRADAY_MERGE_INTERVALS = frozenset({"minutes/5", "minutes/15", "minutes/30", "hours/1"})
+_INTRADAY_MERGE_INTERVALS = frozenset({"minutes/1", "minutes/5", "minutes/15", "minutes/30", "hours/1"})
+
+# With the V2 candle path these are aggregated from the shared 1m base series.
+_DERIVED_FROM_1M = {"minutes/5": 5, "minutes/15": 15, "minutes/30": 30}
 
 
 def _merge_historical_with_intraday(
@@ -199,23 +210,6 @@ def _v3_interval_to_v2_token(interval: str) -> Optional[str]:
     }.get(iv)
 
 
-# Known NSE equity/derivative holidays (fallback when API omits or returns wrong format).
-# Used so monthly expiry correctly uses previous trading day when last Tuesday is a holiday.
-# Source: NSE holiday circulars. Add new years as they are published.
-NSE_KNOWN_HOLIDAYS = {
-    2025: [
-        "2025-01-26", "2025-02-26", "2025-03-14", "2025-03-26", "2025-04-18", "2025-04-21",
-        "2025-05-01", "2025-06-06", "2025-08-15", "2025-10-02", "2025-10-20", "2025-11-01",
-        "2025-11-04", "2025-11-14", "2025-12-25",
-    ],
-    2026: [
-        "2026-01-15", "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31",  # Mar 31 = Mahavir Jayanti (expiry day)
-        "2026-04-03", "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26",
-        "2026-09-14", "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24", "2026-12-25",
-    ],
-}
-
-
 def _normalize_holiday_date(value: Any) -> Optional[str]:
     """Normalize holiday date from API (various formats) to YYYY-MM-DD. Returns None if unparseable."""
     if not value:
@@ -272,6 +266,91 @@ def _format_upstox_place_order_error(response: Any) -> str:
     return str(response.get("status") or "Order failed")[:500]
 
 
+def _place_order_payload(
+    instrument_key: str,
+    quantity: int,
+    transaction_type: str,
+    order_type: str,
+    product: str,
+    validity: str,
+    price: Optional[float],
+    trigger_price: Optional[float],
+    tag: Optional[str],
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """(payload, None) for POST /v2/order/place, or (None, error result) when the inputs are invalid."""
+    if not instrument_key:
+        return None, {"success": False, "error": "Missing instrument_key"}
+    if not quantity or quantity <= 0:
+        return None, {"success": False, "error": "Invalid quantity"}
+
+    payload: Dict[str, Any] = {
+        "instrument_token": instrument_key,
+        "quantity": int(quantity),
+        "transaction_type": transaction_type.upper(),
+        "order_type": order_type.upper(),
+        "product": product.upper(),
+        "validity": validity.upper(),
+        "disclosed_quantity": 0,
+        "is_amo": False
+    }
+
+    if tag:
+        payload["tag"] = tag
+
+    if payload["order_type"] == "MARKET":
+        payload["price"] = float(price) if price is not None else 0.0
+        payload["trigger_price"] = float(trigger_price) if trigger_price is not None else 0.0
+    else:
+        payload["price"] = float(price) if price is not None else 0.0
+        if trigger_price is not None:
+            payload["trigger_price"] = float(trigger_price)
+        elif payload["order_type"] == "LIMIT":
+            payload["trigger_price"] = float(payload["price"])
+    return payload, None
+
+
+def _place_order_result(response: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Shape the place-order API response (shared by the sync and async clients)."""
+    if response and response.get("status") == "success":
+        order_id = None
+        if isinstance(response, dict):
+            data = response.get("data") or {}
+            if isinstance(data, dict):
+                order_id = data.get("order_id") or data.get("orderId")
+        return {"success": True, "data": response, "order_id": order_id}
+    if not response:
+        return {
+            "success": False,
+            "error": "no_response_from_broker",
+            "ambiguous": True,
+            "data": None,
+        }
+    err_msg = _format_upstox_place_order_error(response) if isinstance(response, dict) else "Order failed"
+    return {
+        "success": False,
+        "error": err_msg,
+        "data": response if isinstance(response, dict) else None,
+    }
+
+
+def _listing_result(response: Optional[Dict[str, Any]], key: str, failure: str) -> Dict[str, Any]:
+    """Shape an order-book / positions response: ``data`` is a list or ``{key: [...]}``."""
+    if response and response.get("status") == "success":
+        raw = response.get("data")
+        rows: List[Any] = []
+        if isinstance(raw, list):
+            rows = raw
+        elif isinstance(raw, dict) and isinstance(raw.get(key), list):
+            rows = raw[key]
+        return {"success": True, key: rows, "data": response}
+    return {
+        "success": False,
+        "error": response.get("message") if isinstance(response, dict) else failure,
+        key: [],
+        "data": response,
+    }
+
+
 class UpstoxService:
     """Service to interact with Upstox API"""
     
@@ -405,6 +484,88 @@ class UpstoxService:
             timeout=timeout,
         )
 
+    def _classify_api_response(
+        self, response: Any, url: str, attempt: int, max_retries: int
+    ) -> Tuple[str, Any]:
+        """
+        Decide what ``make_api_request`` (and the async client) does with one HTTP response.
+
+        Returns ``("return", data)``, ``("reload", None)`` (401: reload token and retry),
+        ``("retry", (last_error, wait_seconds))`` or ``("fail", last_error)``.
+        Works for ``requests`` and ``httpx`` responses alike.
+        """
+        if response.status_code == 200:
+            # Check if response is actually JSON (not HTML error page)
+            content_type = response.headers.get('Content-Type', '').lower()
+            if 'application/json' not in content_type:
+                # Check if response body looks like HTML
+                response_text = response.text[:100] if response.text else ""
+                if response_text.strip().startswith('<!DOCTYPE') or response_text.strip().startswith('<html'):
+                    logger.error(f"❌ API returned HTML instead of JSON for {url}: {response_text[:200]}")
+                    if attempt < max_retries - 1:
+                        return "retry", ("HTML response instead of JSON", 1.0)
+                    return "fail", "HTML response instead of JSON"
+            try:
+                # Return data (let caller validate success status)
+                return "return", response.json()
+            except ValueError as json_err:
+                # Response is not valid JSON
+                logger.error(f"❌ Invalid JSON response for {url}: {str(json_err)}")
+                logger.error(f"   Response preview: {response.text[:200]}")
+                return "fail", "Invalid JSON response"
+
+        if response.status_code == 401:
+            # Token expired
+            logger.warning(f"🔑 Token expired (attempt {attempt + 1}/{max_retries}) for {url}")
+            return "reload", None
+
+        if response.status_code == 429:
+            # Rate limit exceeded
+            wait_time = min(2 ** attempt, 8)  # Exponential backoff, max 8s
+            logger.warning(f"⏱️ Rate limit (429) for {url}, waiting {wait_time}s...")
+            return "retry", ("Rate limited (429)", float(wait_time))
+
+        if response.status_code == 400:
+            # Bad request - don't retry; return parsed JSON so callers can extract error message
+            try:
+                body = response.json()
+                if isinstance(body, dict):
+                    logger.error(f"❌ Bad request (400) for {url}: {body.get('message') or body.get('error') or response.text[:200]}")
+                    return "return", body
+            except Exception:
+                pass
+            logger.error(f"❌ Bad request (400) for {url}: {response.text[:200]}")
+            return "fail", response.text[:300] if response.text else "Bad request"
+
+        if response.status_code == 404:
+            # Not found - don't retry
+            logger.error(f"❌ Resource not found (404): {url}")
+            return "fail", "Resource not found"
+
+        if response.status_code == 409:
+            # Conflict - typically means API endpoint unavailable (e.g., after market hours)
+            # Don't retry, just return None gracefully
+            response_preview = response.text[:200] if response.text else "No response body"
+            # Check if response is HTML (error page) instead of JSON
+            if response_preview.strip().startswith('<!DOCTYPE') or response_preview.strip().startswith('<html'):
+                logger.warning(f"⚠️ HTTP 409 Conflict for {url}: API returned HTML error page (likely unavailable after market hours)")
+            else:
+                logger.warning(f"⚠️ HTTP 409 Conflict for {url}: {response_preview}")
+            return "fail", "Conflict (API unavailable)"
+
+        if response.status_code >= 500:
+            # Server error - retry
+            logger.warning(f"⚠️ Server error ({response.status_code}) for {url}, retrying...")
+            return "retry", (f"HTTP {response.status_code}", 1.0)
+
+        # Other errors - check if response is HTML (error page)
+        response_preview = response.text[:200] if response.text else "No response body"
+        if response_preview.strip().startswith('<!DOCTYPE') or response_preview.strip().startswith('<html'):
+            logger.error(f"❌ HTTP {response.status_code} for {url}: API returned HTML error page instead of JSON")
+            return "fail", f"HTTP {response.status_code} (HTML error page)"
+        logger.error(f"❌ HTTP {response.status_code} for {url}: {response_preview}")
+        return "fail", f"HTTP {response.status_code}"
+
     def make_api_request(
         self,
         url: str,
@@ -430,42 +591,29 @@ class UpstoxService:
         """
         last_error = None
 
-        # Pace candle requests through the shared process-wide budget so all jobs
-        # don't collectively blow Upstox's per-user historical-candle rate limit.
-        _rate_limited_url = "/historical-candle" in url
-
+        # Every attempt takes a slot from its endpoint family's shared budget in
+        # the transport (upstox_http); a denied slot raises BudgetDenied.
         for attempt in range(max_retries):
             try:
-                if _rate_limited_url:
-                    try:
-                        from backend.services.upstox_rate_limiter import acquire_candle_slot
-
-                        if not acquire_candle_slot():
-                            # Shared candle budget exhausted — skip rather than blow
-                            # the per-user limit. Caller treats None as "no data".
-                            return None
-                    except Exception:
-                        pass
-
                 headers = self.get_headers()
                 
                 # Make request
                 if method.upper() == "GET":
-                    response = requests.get(
+                    response = _http_session().get(
                         url,
                         headers=headers,
                         params=params,
                         timeout=timeout
                     )
                 elif method.upper() == "POST":
-                    response = requests.post(
+                    response = _http_session().post(
                         url,
                         headers=headers,
                         json=data,
                         timeout=timeout
                     )
                 elif method.upper() == "DELETE":
-                    response = requests.delete(
+                    response = _http_session().delete(
                         url,
                         headers=headers,
                         json=data,
@@ -474,102 +622,30 @@ class UpstoxService:
                 else:
                     raise ValueError(f"Unsupported HTTP method: {method}")
                 
-                # Handle different status codes
-                if response.status_code == 200:
-                    # Check if response is actually JSON (not HTML error page)
-                    content_type = response.headers.get('Content-Type', '').lower()
-                    if 'application/json' not in content_type:
-                        # Check if response body looks like HTML
-                        response_text = response.text[:100] if response.text else ""
-                        if response_text.strip().startswith('<!DOCTYPE') or response_text.strip().startswith('<html'):
-                            logger.error(f"❌ API returned HTML instead of JSON for {url}: {response_text[:200]}")
-                            last_error = "HTML response instead of JSON"
-                            if attempt < max_retries - 1:
-                                time.sleep(1)
-                                continue
-                            break
-                    
-                    try:
-                        response_data = response.json()
-                        # Return data (let caller validate success status)
-                        return response_data
-                    except ValueError as json_err:
-                        # Response is not valid JSON
-                        logger.error(f"❌ Invalid JSON response for {url}: {str(json_err)}")
-                        logger.error(f"   Response preview: {response.text[:200]}")
-                        last_error = "Invalid JSON response"
-                        break
-                
-                elif response.status_code == 401:
-                    # Token expired
-                    logger.warning(f"🔑 Token expired (attempt {attempt + 1}/{max_retries}) for {url}")
-                    
+                outcome, value = self._classify_api_response(response, url, attempt, max_retries)
+                if outcome == "return":
+                    return value
+                if outcome == "reload":
                     # Try to reload token from storage (faster)
                     if self.reload_token_from_storage():
                         logger.info("✅ Token reloaded from storage, retrying...")
                         time.sleep(0.5)  # Small delay before retry
                         continue
-                    
-                    # If not available in storage, log warning
                     logger.error("❌ Token reload failed - manual token refresh needed")
                     last_error = "Token expired and reload failed"
                     break
-                
-                elif response.status_code == 429:
-                    # Rate limit exceeded
-                    wait_time = min(2 ** attempt, 8)  # Exponential backoff, max 8s
-                    logger.warning(f"⏱️ Rate limit (429) for {url}, waiting {wait_time}s...")
-                    time.sleep(wait_time)
+                if outcome == "retry":
+                    last_error, wait = value
+                    time.sleep(wait)
                     continue
-                
-                elif response.status_code == 400:
-                    # Bad request - don't retry; return parsed JSON so callers can extract error message
-                    try:
-                        body = response.json()
-                        if isinstance(body, dict):
-                            logger.error(f"❌ Bad request (400) for {url}: {body.get('message') or body.get('error') or response.text[:200]}")
-                            return body
-                    except Exception:
-                        pass
-                    logger.error(f"❌ Bad request (400) for {url}: {response.text[:200]}")
-                    last_error = response.text[:300] if response.text else "Bad request"
-                    break
-                
-                elif response.status_code == 404:
-                    # Not found - don't retry
-                    logger.error(f"❌ Resource not found (404): {url}")
-                    last_error = "Resource not found"
-                    break
-                
-                elif response.status_code == 409:
-                    # Conflict - typically means API endpoint unavailable (e.g., after market hours)
-                    # Don't retry, just return None gracefully
-                    response_preview = response.text[:200] if response.text else "No response body"
-                    # Check if response is HTML (error page) instead of JSON
-                    if response_preview.strip().startswith('<!DOCTYPE') or response_preview.strip().startswith('<html'):
-                        logger.warning(f"⚠️ HTTP 409 Conflict for {url}: API returned HTML error page (likely unavailable after market hours)")
-                    else:
-                        logger.warning(f"⚠️ HTTP 409 Conflict for {url}: {response_preview}")
-                    last_error = "Conflict (API unavailable)"
-                    break
-                
-                elif response.status_code >= 500:
-                    # Server error - retry
-                    logger.warning(f"⚠️ Server error ({response.status_code}) for {url}, retrying...")
-                    time.sleep(1)
-                    continue
-                
-                else:
-                    # Other errors - check if response is HTML (error page)
-                    response_preview = response.text[:200] if response.text else "No response body"
-                    if response_preview.strip().startswith('<!DOCTYPE') or response_preview.strip().startswith('<html'):
-                        logger.error(f"❌ HTTP {response.status_code} for {url}: API returned HTML error page instead of JSON")
-                        last_error = f"HTTP {response.status_code} (HTML error page)"
-                    else:
-                        logger.error(f"❌ HTTP {response.status_code} for {url}: {response_preview}")
-                        last_error = f"HTTP {response.status_code}"
-                    break
+                last_error = value
+                break
             
+            except BudgetDenied:
+                # Shared budget exhausted — skip rather than blow the per-user
+                # limit. Caller treats None as "no data".
+                return None
+
             except requests.exceptions.Timeout:
                 logger.warning(f"⏱️ Request timeout (attempt {attempt + 1}/{max_retries}) for {url}")
                 last_error = "Timeout"
@@ -618,36 +694,13 @@ class UpstoxService:
         """
         if not self.access_token:
             return {"success": False, "error": "Missing access token"}
-        if not instrument_key:
-            return {"success": False, "error": "Missing instrument_key"}
-        if not quantity or quantity <= 0:
-            return {"success": False, "error": "Invalid quantity"}
+        payload, err = _place_order_payload(
+            instrument_key, quantity, transaction_type, order_type, product, validity, price, trigger_price, tag
+        )
+        if err:
+            return err
 
         url = "https://api.upstox.com/v2/order/place"
-        payload: Dict[str, Any] = {
-            "instrument_token": instrument_key,
-            "quantity": int(quantity),
-            "transaction_type": transaction_type.upper(),
-            "order_type": order_type.upper(),
-            "product": product.upper(),
-            "validity": validity.upper(),
-            "disclosed_quantity": 0,
-            "is_amo": False
-        }
-
-        if tag:
-            payload["tag"] = tag
-
-        if payload["order_type"] == "MARKET":
-            payload["price"] = float(price) if price is not None else 0.0
-            payload["trigger_price"] = float(trigger_price) if trigger_price is not None else 0.0
-        else:
-            payload["price"] = float(price) if price is not None else 0.0
-            if trigger_price is not None:
-                payload["trigger_price"] = float(trigger_price)
-            elif payload["order_type"] == "LIMIT":
-                payload["trigger_price"] = float(payload["price"])
-
         try:
             # Single attempt: retrying POST on timeout can place a duplicate order if the first
             # request actually reached the broker but the response was lost.
@@ -658,26 +711,7 @@ class UpstoxService:
                 timeout=10,
                 max_retries=1,
             )
-            if response and response.get("status") == "success":
-                order_id = None
-                if isinstance(response, dict):
-                    data = response.get("data") or {}
-                    if isinstance(data, dict):
-                        order_id = data.get("order_id") or data.get("orderId")
-                return {"success": True, "data": response, "order_id": order_id}
-            if not response:
-                return {
-                    "success": False,
-                    "error": "no_response_from_broker",
-                    "ambiguous": True,
-                    "data": None,
-                }
-            err_msg = _format_upstox_place_order_error(response) if isinstance(response, dict) else "Order failed"
-            return {
-                "success": False,
-                "error": err_msg,
-                "data": response if isinstance(response, dict) else None,
-            }
+            return _place_order_result(response)
         except Exception as e:
             logger.error(f"❌ Exception placing order: {str(e)}")
             return {"success": False, "error": str(e)}
@@ -843,20 +877,7 @@ class UpstoxService:
                 timeout=15,
                 max_retries=2,
             )
-            if response and response.get("status") == "success":
-                raw = response.get("data")
-                orders: List[Any] = []
-                if isinstance(raw, list):
-                    orders = raw
-                elif isinstance(raw, dict) and isinstance(raw.get("orders"), list):
-                    orders = raw["orders"]
-                return {"success": True, "orders": orders, "data": response}
-            return {
-                "success": False,
-                "error": response.get("message") if isinstance(response, dict) else "Order book failed",
-                "orders": [],
-                "data": response,
-            }
+            return _listing_result(response, "orders", "Order book failed")
         except Exception as e:
             logger.error(f"❌ Exception fetching order book: {str(e)}")
             return {"success": False, "error": str(e), "orders": []}
@@ -904,20 +925,7 @@ class UpstoxService:
                 timeout=15,
                 max_retries=2,
             )
-            if response and response.get("status") == "success":
-                raw = response.get("data")
-                positions: List[Any] = []
-                if isinstance(raw, list):
-                    positions = raw
-                elif isinstance(raw, dict) and isinstance(raw.get("positions"), list):
-                    positions = raw["positions"]
-                return {"success": True, "positions": positions, "data": response}
-            return {
-                "success": False,
-                "error": response.get("message") if isinstance(response, dict) else "Positions failed",
-                "positions": [],
-                "data": response,
-            }
+            return _listing_result(response, "positions", "Positions failed")
         except Exception as e:
             logger.error(f"❌ Exception fetching short-term positions: {str(e)}")
             return {"success": False, "error": str(e), "positions": []}
@@ -958,15 +966,26 @@ class UpstoxService:
         Lookup tick size from instruments.json by instrument_key.
         """
         try:
-            from pathlib import Path
-            import json as json_lib
+            from backend.services.instrument_master import get_instrument_master
 
             if not instrument_key:
                 return None
 
-            instruments_file = Path("/home/ubuntu/trademanthan/data/instruments/nse_instruments.json")
-            if not instruments_file.exists():
-                instruments_file = Path(__file__).resolve().parent.parent.parent / "data" / "instruments" / "nse_instruments.json"
+            master = get_instrument_master()
+            if master is not None:
+                inst = master.get(instrument_key)
+                if inst is None:
+                    return None
+                tick = inst.get("tick_size") or inst.get("tickSize")
+                if tick and float(tick) > 0:
+                    return float(tick)
+                return None
+
+            # Index not built / failed to load: scan the instruments JSON.
+            import json as json_lib
+            from backend.config import get_instruments_file_path
+
+            instruments_file = get_instruments_file_path()
             if not instruments_file.exists():
                 return None
 
@@ -997,49 +1016,39 @@ class UpstoxService:
         market_close = dtime(15, 30)
         return market_open <= now.time() <= market_close
     
+    def fetch_market_holidays_api(self, year: int) -> List[str]:
+        """
+        Holiday dates for ``year`` from the Upstox API, as 'YYYY-MM-DD'.
+
+        Network call — only the trading calendar's background refresher should use this.
+        Returns [] when not connected.
+        """
+        if not (self.access_token or "").strip():
+            return []
+        url = f"https://api.upstox.com/v2/market/holidays/{int(year)}-01-01"
+        response = _http_session().get(url, headers=self.get_headers(), timeout=10)
+        out: List[str] = []
+        if response.status_code == 200:
+            data = response.json()
+            if data.get('status') == 'success' and 'data' in data:
+                for holiday in data['data']:
+                    raw = holiday.get('date') if isinstance(holiday, dict) else None
+                    normalized = _normalize_holiday_date(raw)
+                    if normalized:
+                        out.append(normalized)
+        return out
+
     def get_market_holidays(self, year: int = None) -> List[str]:
         """
-        Get list of market holidays from Upstox API, with fallback to known NSE holidays.
-        Dates are always returned in 'YYYY-MM-DD' format so is_trading_day and
-        get_monthly_expiry correctly treat days like 31-Mar-2026 (Mahavir Jayanti) as holiday.
-        
-        Args:
-            year: Year for which to fetch holidays (default: current year)
-            
-        Returns:
-            List of holiday dates in 'YYYY-MM-DD' format
+        Market holidays for ``year`` (default: current IST year) in 'YYYY-MM-DD' format.
+
+        Served from the process trading calendar (known NSE holidays, holiday CSV, ``holiday``
+        table, Upstox API via background refresh), so days like 31-Mar-2026 (Mahavir Jayanti)
+        are treated as holidays by is_trading_day and get_monthly_expiry.
         """
-        try:
-            if year is None:
-                ist = pytz.timezone('Asia/Kolkata')
-                year = datetime.now(ist).year
-            
-            holiday_set = set()
-            # 1) Known NSE holidays (fallback so expiry-day holidays like 2026-03-31 are never missed)
-            for d in NSE_KNOWN_HOLIDAYS.get(year, []):
-                holiday_set.add(d)
-            
-            # 2) Upstox API (may use different date format or omit future years)
-            date_param = f"{year}-01-01"
-            url = f"https://api.upstox.com/v2/market/holidays/{date_param}"
-            response = requests.get(url, headers=self.get_headers(), timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('status') == 'success' and 'data' in data:
-                    for holiday in data['data']:
-                        raw = holiday.get('date') if isinstance(holiday, dict) else None
-                        normalized = _normalize_holiday_date(raw)
-                        if normalized:
-                            holiday_set.add(normalized)
-            
-            holidays = sorted(holiday_set)
-            logger.info(f"Market holidays for {year}: {len(holidays)} dates (API + known NSE fallback)")
-            return holidays
-                
-        except Exception as e:
-            logger.error(f"Error fetching market holidays: {str(e)}")
-            return list(NSE_KNOWN_HOLIDAYS.get(year, []))
+        if year is None:
+            year = datetime.now(pytz.timezone('Asia/Kolkata')).year
+        return [d.isoformat() for d in get_trading_calendar().holidays(int(year))]
     
     def get_last_trading_date(self, reference_date: datetime = None) -> datetime:
         """
@@ -1049,40 +1058,18 @@ class UpstoxService:
             reference_date: Date to check from (default: today)
             
         Returns:
-            Last trading date as datetime object
+            Last trading date as datetime object (midnight, same tz as reference)
         """
+        ist = pytz.timezone('Asia/Kolkata')
         try:
-            ist = pytz.timezone('Asia/Kolkata')
-            
             if reference_date is None:
                 reference_date = datetime.now(ist)
             elif reference_date.tzinfo is None:
                 reference_date = ist.localize(reference_date)
-            
-            # Get market holidays for current year
-            holidays = self.get_market_holidays(reference_date.year)
-            holiday_dates = set(holidays)
-            
-            # Start from reference date and go backwards
-            current_date = reference_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            # Go back maximum 10 days to find last trading day
-            for _ in range(10):
-                # Check if it's a weekday (Monday=0, Sunday=6)
-                if current_date.weekday() < 5:  # Monday to Friday
-                    # Check if it's not a holiday
-                    date_str = current_date.strftime('%Y-%m-%d')
-                    if date_str not in holiday_dates:
-                        logger.info(f"Last trading date: {date_str} (from {reference_date.strftime('%Y-%m-%d')})")
-                        return current_date
-                
-                # Go to previous day
-                current_date = current_date - timedelta(days=1)
-            
-            # If we couldn't find a trading day in last 10 days, return reference date
-            logger.warning(f"Could not find trading day in last 10 days, using reference date")
-            return reference_date
-            
+            d = get_trading_calendar().previous_trading_day(reference_date, include_self=True)
+            return reference_date.replace(
+                year=d.year, month=d.month, day=d.day, hour=0, minute=0, second=0, microsecond=0
+            )
         except Exception as e:
             logger.error(f"Error getting last trading date: {str(e)}")
             return reference_date if reference_date else datetime.now(ist)
@@ -1098,27 +1085,9 @@ class UpstoxService:
             True if trading day, False otherwise
         """
         try:
-            ist = pytz.timezone('Asia/Kolkata')
-            
             if date is None:
-                date = datetime.now(ist)
-            elif date.tzinfo is None:
-                date = ist.localize(date)
-            
-            # Check if weekend
-            if date.weekday() >= 5:  # Saturday or Sunday
-                return False
-            
-            # Check if holiday
-            holidays = self.get_market_holidays(date.year)
-            date_str = date.strftime('%Y-%m-%d')
-            
-            if date_str in holidays:
-                logger.info(f"{date_str} is a market holiday")
-                return False
-            
-            return True
-            
+                date = datetime.now(pytz.timezone('Asia/Kolkata'))
+            return get_trading_calendar().is_trading_day(date)
         except Exception as e:
             logger.error(f"Error checking if trading day: {str(e)}")
             # Default to True if we can't determine (conservative approach)
@@ -1301,7 +1270,7 @@ class UpstoxService:
             url = f"https://api.upstox.com/v2/market-quote/ltp"
             params = {'instrument_key': option_key}
             
-            response = requests.get(url, headers=self.get_headers(), params=params, timeout=10)
+            response = _http_session().get(url, headers=self.get_headers(), params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -1441,6 +1410,113 @@ class UpstoxService:
             return structured
         return None
 
+    def _fetch_base_1m_span(
+        self,
+        instrument_key: str,
+        to_date: str,
+        from_date: str,
+        end_d: date,
+        range_end_date: Optional[date],
+    ) -> Optional[List[Dict]]:
+        """V2 1m history for ``[from_date, to_date]`` plus today's V3 intraday 1m bars when live."""
+        one = self._fetch_historical_v2_candles(instrument_key, "1minute", to_date, from_date)
+        if not one:
+            return one
+        today_ist = datetime.now(pytz.timezone("Asia/Kolkata")).date()
+        if range_end_date is None or range_end_date >= today_ist:
+            intra = self._fetch_intraday_candles_v3(instrument_key, "minutes/1")
+            if intra:
+                one = _merge_historical_with_intraday(one, intra, session_date=end_d)
+        return one
+
+    def _fetch_candle_span(
+        self,
+        instrument_key: str,
+        interval: str,
+        to_date: str,
+        from_date: str,
+        end_d: date,
+        range_end_date: Optional[date],
+        use_v2: bool,
+        *,
+        shared_base: bool = False,
+        base_max_age_sec: Optional[float] = None,
+    ) -> Optional[List[Dict]]:
+        """Fetch ``[from_date, to_date]`` from Upstox (V2 1m aggregation / V2 / V3) plus today's intraday merge.
+
+        On the V2 path 1m/5m/15m/30m come from one 1m base series that already
+        includes today's intraday bars. With ``shared_base`` that series is read
+        through the shared candle cache (key ``minutes/1``) and the aggregation is
+        memoized against its tip, so several timeframes of one symbol cost a
+        single 1m download and intraday merge. ``base_max_age_sec`` overrides the
+        base's intraday TTL (the bar-close prefetch needs a post-close base).
+        """
+        iv = (interval or "").strip().lower()
+        ist = pytz.timezone("Asia/Kolkata")
+        candles: Optional[List[Dict]] = None
+        intraday_merged = False
+        if use_v2:
+            n_min = _DERIVED_FROM_1M.get(iv)
+            if iv == "minutes/1":
+                candles = self._fetch_base_1m_span(instrument_key, to_date, from_date, end_d, range_end_date)
+                intraday_merged = bool(candles)
+            elif n_min:
+                from backend.services.market_data import candle_cache
+
+                if shared_base:
+                    from backend.config import settings
+
+                    base = candle_cache.get_or_fetch(
+                        instrument_key,
+                        "minutes/1",
+                        from_date,
+                        base_max_age_sec
+                        if base_max_age_sec is not None
+                        else getattr(settings, "UPSTOX_CANDLE_CACHE_TTL_INTRADAY_SEC", 150),
+                        lambda: self._fetch_base_1m_span(
+                            instrument_key, to_date, from_date, end_d, range_end_date
+                        ),
+                        span_from=from_date,
+                        span_to=to_date,
+                    )
+                    if base:
+                        candles = candle_cache.derive(
+                            instrument_key, iv, base, lambda b: _aggregate_1m_to_n_minute(b, n_min)
+                        )
+                else:
+                    base = self._fetch_base_1m_span(instrument_key, to_date, from_date, end_d, range_end_date)
+                    candles = _aggregate_1m_to_n_minute(base, n_min) if base else None
+                if candles:
+                    candles = candle_cache.filter_from(candles, from_date)
+                    intraday_merged = True
+                else:
+                    candles = None
+            else:
+                v2_tok = _v3_interval_to_v2_token(interval)
+                if v2_tok:
+                    candles = self._fetch_historical_v2_candles(
+                        instrument_key, v2_tok, to_date, from_date
+                    )
+        if candles is None:
+            candles = self._fetch_historical_v3_candles(
+                instrument_key, interval, to_date, from_date
+            )
+
+        # Intraday V3 has today's session; historical minute/hour bars lag for F&O.
+        # Merge when end anchor is "today" (live scan passes range_end_date=today) or
+        # unset (default live fetches). Skip for past range_end_date (backtest/backfill).
+        today_ist = datetime.now(ist).date()
+        if not intraday_merged and iv in _INTRADAY_MERGE_INTERVALS and (
+            range_end_date is None or range_end_date >= today_ist
+        ):
+            intra = self._fetch_intraday_candles_v3(instrument_key, iv)
+            if intra:
+                candles = _merge_historical_with_intraday(
+                    candles, intra, session_date=end_d
+                )
+
+        return candles
+
     def get_historical_candles_by_instrument_key(
         self,
         instrument_key: str,
@@ -1448,6 +1524,8 @@ class UpstoxService:
         days_back: int = 2,
         *,
         range_end_date: Optional[date] = None,
+        cache_max_age_sec: Optional[float] = None,
+        cache_stale_sec: Optional[float] = None,
     ) -> Optional[List[Dict]]:
         """
         Fetch historical candle data using instrument key directly
@@ -1461,6 +1539,11 @@ class UpstoxService:
                 (end of the window) instead of today. Use for historical backtests so
                 minute/daily ranges include the replay session and stay consistent when
                 ``days_back`` is anchored from that date.
+            cache_max_age_sec: Strict freshness for the shared cache instead of the
+                interval TTL; stale entries are not served (bar-close prefetch).
+            cache_stale_sec: Accept a shared-cache entry up to this many seconds
+                past its TTL while it is refreshed in the background (default
+                ``UPSTOX_CANDLE_CACHE_SWR_SEC``, 0 = never serve stale).
             
         Returns:
             List of candle data or None
@@ -1510,56 +1593,39 @@ class UpstoxService:
                     if iv in _INTRADAY_MERGE_INTERVALS
                     else getattr(settings, "UPSTOX_CANDLE_CACHE_TTL_DAILY_SEC", 900)
                 )
-                cached = candle_cache.get(instrument_key, iv, req_from_date, ttl)
-                if cached is not None:
-                    return cached
+                # Stale-while-revalidate: just-expired entries are served now and
+                # refreshed in the background at low rate-limit priority.
+                if cache_stale_sec is None:
+                    cache_stale_sec = getattr(settings, "UPSTOX_CANDLE_CACHE_SWR_SEC", 0)
+                stale_sec = max(0.0, float(cache_stale_sec or 0))
+                if cache_max_age_sec is not None:
+                    ttl, stale_sec = float(cache_max_age_sec), 0.0
+                # Single flight: concurrent misses on this key (engine warm, Vajra,
+                # picker, RS scanner after a TTL expiry) share one fetch.
                 from_date = (end_d - timedelta(days=fetch_days)).strftime("%Y-%m-%d")
-            else:
-                from_date = req_from_date
-
-            candles: Optional[List[Dict]] = None
-            if use_v2:
-                if iv == "minutes/5":
-                    one = self._fetch_historical_v2_candles(instrument_key, "1minute", to_date, from_date)
-                    candles = _aggregate_1m_to_n_minute(one, 5) if one else None
-                elif iv == "minutes/15":
-                    one = self._fetch_historical_v2_candles(instrument_key, "1minute", to_date, from_date)
-                    candles = _aggregate_1m_to_n_minute(one, 15) if one else None
-                elif iv == "minutes/30":
-                    one = self._fetch_historical_v2_candles(instrument_key, "1minute", to_date, from_date)
-                    candles = _aggregate_1m_to_n_minute(one, 30) if one else None
-                else:
-                    v2_tok = _v3_interval_to_v2_token(interval)
-                    if v2_tok:
-                        candles = self._fetch_historical_v2_candles(
-                            instrument_key, v2_tok, to_date, from_date
-                        )
-            if candles is None:
-                candles = self._fetch_historical_v3_candles(
-                    instrument_key, interval, to_date, from_date
+                return candle_cache.get_or_fetch(
+                    instrument_key,
+                    iv,
+                    req_from_date,
+                    ttl,
+                    lambda: self._fetch_candle_span(
+                        instrument_key,
+                        interval,
+                        to_date,
+                        from_date,
+                        end_d,
+                        range_end_date,
+                        use_v2,
+                        shared_base=True,
+                        base_max_age_sec=cache_max_age_sec,
+                    ),
+                    span_from=from_date,
+                    span_to=to_date,
+                    stale_sec=stale_sec,
                 )
-
-            # Intraday V3 has today's session; historical minute/hour bars lag for F&O.
-            # Merge when end anchor is "today" (live scan passes range_end_date=today) or
-            # unset (default live fetches). Skip for past range_end_date (backtest/backfill).
-            today_ist = datetime.now(ist).date()
-            if iv in _INTRADAY_MERGE_INTERVALS and (
-                range_end_date is None or range_end_date >= today_ist
-            ):
-                intra = self._fetch_intraday_candles_v3(instrument_key, iv)
-                if intra:
-                    candles = _merge_historical_with_intraday(
-                        candles, intra, session_date=end_d
-                    )
-
-            # Populate the shared cache with the full (canonical) fetched span and
-            # return only the caller's requested slice.
-            if cache_ok and candles:
-                from backend.services.market_data import candle_cache
-
-                candle_cache.put(instrument_key, iv, from_date, to_date, candles)
-                return candle_cache.filter_from(candles, req_from_date)
-            return candles
+            return self._fetch_candle_span(
+                instrument_key, interval, to_date, req_from_date, end_d, range_end_date, use_v2
+            )
 
         except Exception as e:
             logger.error(f"❌ Error fetching candles for {instrument_key}: {str(e)}")
@@ -1675,7 +1741,7 @@ class UpstoxService:
             }
             
             logger.info(f"Fetching option chain for {symbol} with instrument_key={str(instrument_key)[:50]}, expiry={expiry_date_str}")
-            response = requests.get(url, headers=self.get_headers(), params=params, timeout=10)
+            response = _http_session().get(url, headers=self.get_headers(), params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -1775,12 +1841,9 @@ class UpstoxService:
             # If expiry date is a trading holiday, use previous trading day
             if not self.is_trading_day(expiry_date):
                 logger.info(f"Monthly expiry {expiry_date.strftime('%d %b %Y')} is a trading holiday, using previous trading day")
-                # Go backwards up to 10 days to find previous trading day
-                for _ in range(10):
-                    expiry_date = expiry_date - timedelta(days=1)
-                    if self.is_trading_day(expiry_date):
-                        logger.info(f"Adjusted expiry to previous trading day: {expiry_date.strftime('%d %b %Y %A')}")
-                        break
+                prev = get_trading_calendar().previous_trading_day(expiry_date)
+                expiry_date = ist.localize(datetime(prev.year, prev.month, prev.day))
+                logger.info(f"Adjusted expiry to previous trading day: {expiry_date.strftime('%d %b %Y %A')}")
             
             logger.info(f"Monthly expiry: {expiry_date.strftime('%d %b %Y %A')} (from reference: {reference_date.strftime('%d %b %Y')})")
             
@@ -1987,7 +2050,7 @@ class UpstoxService:
             # Fetch daily candles (V3 API uses days/1 format)
             url = f"{self.base_url}/historical-candle/{instrument_key}/days/1/{to_date}/{from_date}"
             
-            response = requests.get(url, headers=self.get_headers(), timeout=10)
+            response = _http_session().get(url, headers=self.get_headers(), timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -2023,7 +2086,7 @@ class UpstoxService:
             url = f"https://api.upstox.com/v2/market-quote/ohlc?instrument_key={instrument_key}&interval=1d"
             
             # Make request
-            response = requests.get(url, headers=self.get_headers(), timeout=10)
+            response = _http_session().get(url, headers=self.get_headers(), timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -2063,7 +2126,7 @@ class UpstoxService:
                 # Try to refresh token and retry once
                 if self.refresh_access_token():
                     logger.info(f"Token refreshed, retrying OHLC request for {instrument_key}")
-                    response = requests.get(url, headers=self.get_headers(), timeout=10)
+                    response = _http_session().get(url, headers=self.get_headers(), timeout=10)
                     if response.status_code == 200:
                         data = response.json()
                         if data.get('status') == 'success' and 'data' in data:
@@ -2144,6 +2207,157 @@ class UpstoxService:
                         pass
         return bid, ask
 
+    def _quote_from_response(self, instrument_key: str, data: Optional[Dict]) -> Optional[Dict]:
+        """Parse a /v2/market-quote/quotes response for one key (see ``get_market_quote_by_key``)."""
+        if data and data.get('status') == 'success' and 'data' in data:
+            if not isinstance(data.get('data'), dict):
+                logger.error(f"❌ Invalid market quote data type for {instrument_key}: {type(data.get('data'))}")
+                return None
+            # Try different key formats to find exact match
+            # Upstox API may return keys in different formats than requested:
+            # - Request: "NSE_FO|104500" (pipe separator)
+            # - Response: "NSE_FO|104500" or "NSE_FO:104500" (colon separator) or other formats
+            quote_data = None
+            available_keys = list(data['data'].keys())
+
+            # Strategy 1: Exact match
+            if instrument_key in data['data']:
+                quote_data = data['data'][instrument_key]
+                logger.debug(f"✅ Found exact match for {instrument_key}")
+
+            # Strategy 2: Handle pipe vs colon separator mismatch
+            # Convert pipe to colon and vice versa for comparison
+            if not quote_data:
+                # Try with colon instead of pipe
+                alt_key1 = instrument_key.replace('|', ':')
+                if alt_key1 in data['data']:
+                    quote_data = data['data'][alt_key1]
+                    logger.info(f"✅ Found match with colon separator: {alt_key1} (requested: {instrument_key})")
+
+                # Try with pipe instead of colon
+                if not quote_data:
+                    alt_key2 = instrument_key.replace(':', '|')
+                    if alt_key2 in data['data']:
+                        quote_data = data['data'][alt_key2]
+                        logger.info(f"✅ Found match with pipe separator: {alt_key2} (requested: {instrument_key})")
+
+            # Strategy 3: Case-insensitive normalized match (handles spaces, case differences)
+            if not quote_data:
+                # Normalize: remove spaces, convert to uppercase, normalize separators to pipe
+                def normalize_key(key):
+                    return key.replace(' ', '').replace(':', '|').upper()
+
+                normalized_request = normalize_key(instrument_key)
+                for key in data['data']:
+                    normalized_response = normalize_key(key)
+                    if normalized_request == normalized_response:
+                        quote_data = data['data'][key]
+                        logger.info(f"✅ Found normalized match for {instrument_key} (response key: {key})")
+                        break
+
+            # Strategy 4: Extract core identifier and match (e.g., "NSE_FO|104500" -> "104500")
+            if not quote_data:
+                # Extract the core identifier (token/number after separator)
+                core_id = None
+                for sep in ['|', ':']:
+                    if sep in instrument_key:
+                        core_id = instrument_key.split(sep)[-1]
+                        break
+                if not core_id:
+                    core_id = instrument_key.split()[-1] if ' ' in instrument_key else instrument_key
+
+                if core_id:
+                    for key in data['data']:
+                        # Check if core_id appears in the key (at end or as substring)
+                        if core_id in key or key.endswith(core_id) or key.endswith(f'|{core_id}') or key.endswith(f':{core_id}'):
+                            quote_data = data['data'][key]
+                            logger.info(f"✅ Found core ID match for {instrument_key} (core: {core_id}, response key: {key})")
+                            break
+
+            # Strategy 5: If still no match, use the first (and likely only) entry if response has exactly one key
+            # This handles cases where API returns data in a different format but it's the correct instrument
+            if not quote_data and len(data['data']) == 1:
+                # Only use this if we have exactly one response - it's likely the correct one
+                single_key = list(data['data'].keys())[0]
+                quote_data = data['data'][single_key]
+                logger.warning(f"⚠️ Using single response entry for {instrument_key} (response key: {single_key})")
+                logger.warning(f"   This assumes the API returned the correct instrument despite key format mismatch")
+
+            # CRITICAL FIX: Remove dangerous fallback that uses first value
+            # If we can't find a match, return None instead of using wrong data
+            if not quote_data:
+                logger.error(f"❌ CRITICAL: No match found for instrument_key '{instrument_key}'")
+                logger.error(f"   Requested format: {instrument_key}")
+                logger.error(f"   Available keys in response ({len(available_keys)} total):")
+                for i, key in enumerate(available_keys[:10]):  # Show first 10 keys
+                    logger.error(f"     [{i+1}] {key}")
+                if len(available_keys) > 10:
+                    logger.error(f"     ... and {len(available_keys) - 10} more")
+                logger.error(f"   This prevents using wrong data for different instruments")
+                logger.error(f"   Possible causes:")
+                logger.error(f"     1. Instrument expired or no longer traded")
+                logger.error(f"     2. Format mismatch (pipe vs colon separator)")
+                logger.error(f"     3. Stale instrument_key in database")
+                logger.error(f"     4. API returned data for different instrument")
+                return None
+
+            if quote_data:
+                ohlc = quote_data.get('ohlc', {})
+                ltp = float(quote_data.get('last_price', 0))
+                close_price = float(ohlc.get('close', ltp))
+
+                # Additional validation: Ensure LTP is reasonable (not zero or negative)
+                if ltp <= 0:
+                    logger.warning(f"⚠️ Invalid LTP (₹{ltp}) for {instrument_key} - returning None")
+                    return None
+
+                bid_px, ask_px = self.extract_bid_ask_from_quote_data(quote_data)
+                out = {
+                    'last_price': ltp,
+                    'close_price': close_price,
+                    'ohlc': ohlc,
+                    'open': float(ohlc.get('open', 0)),
+                    'high': float(ohlc.get('high', 0)),
+                    'low': float(ohlc.get('low', 0)),
+                }
+                if bid_px is not None and ask_px is not None and ask_px > 0 and bid_px <= ask_px:
+                    out['bid_price'] = bid_px
+                    out['ask_price'] = ask_px
+                    out['spread_pct'] = (ask_px - bid_px) / ask_px * 100.0
+
+                # F&O: open interest (dashboard OI heatmap, diagnostics) — equities often omit these
+                def _qi(*keys: str) -> int:
+                    for k in keys:
+                        v = quote_data.get(k)
+                        if v is not None and v != "":
+                            try:
+                                return int(float(v))
+                            except (TypeError, ValueError):
+                                continue
+                    return 0
+
+                oi_v = _qi("oi", "open_interest", "openInterest")
+                oi_chg = _qi(
+                    "change_in_oi",
+                    "changeInOi",
+                    "chgoi",
+                    "chg_oi",
+                    "pchangeinOpenInterest",
+                )
+                out["oi"] = oi_v
+                out["change_in_oi"] = oi_chg
+                try:
+                    out["net_change"] = float(quote_data.get("net_change") or 0)
+                except (TypeError, ValueError):
+                    out["net_change"] = 0.0
+
+                logger.info(f"✅ Market quote for {instrument_key}: LTP=₹{ltp}, Close=₹{close_price}")
+
+                return out
+
+        logger.warning(f"⚠️ No valid quote data for {instrument_key}")
+        return None
+
     def get_market_quote_by_key(self, instrument_key: str) -> Optional[Dict]:
         """
         Get real-time market quote (LTP) using instrument key directly
@@ -2164,159 +2378,51 @@ class UpstoxService:
             # Use improved API request with retry and token refresh
             data = self.make_api_request(url, method="GET", timeout=10, max_retries=2)
             
-            if data and data.get('status') == 'success' and 'data' in data:
-                if not isinstance(data.get('data'), dict):
-                    logger.error(f"❌ Invalid market quote data type for {instrument_key}: {type(data.get('data'))}")
-                    return None
-                # Try different key formats to find exact match
-                # Upstox API may return keys in different formats than requested:
-                # - Request: "NSE_FO|104500" (pipe separator)
-                # - Response: "NSE_FO|104500" or "NSE_FO:104500" (colon separator) or other formats
-                quote_data = None
-                available_keys = list(data['data'].keys())
-                
-                # Strategy 1: Exact match
-                if instrument_key in data['data']:
-                    quote_data = data['data'][instrument_key]
-                    logger.debug(f"✅ Found exact match for {instrument_key}")
-                
-                # Strategy 2: Handle pipe vs colon separator mismatch
-                # Convert pipe to colon and vice versa for comparison
-                if not quote_data:
-                    # Try with colon instead of pipe
-                    alt_key1 = instrument_key.replace('|', ':')
-                    if alt_key1 in data['data']:
-                        quote_data = data['data'][alt_key1]
-                        logger.info(f"✅ Found match with colon separator: {alt_key1} (requested: {instrument_key})")
-                    
-                    # Try with pipe instead of colon
-                    if not quote_data:
-                        alt_key2 = instrument_key.replace(':', '|')
-                        if alt_key2 in data['data']:
-                            quote_data = data['data'][alt_key2]
-                            logger.info(f"✅ Found match with pipe separator: {alt_key2} (requested: {instrument_key})")
-                
-                # Strategy 3: Case-insensitive normalized match (handles spaces, case differences)
-                if not quote_data:
-                    # Normalize: remove spaces, convert to uppercase, normalize separators to pipe
-                    def normalize_key(key):
-                        return key.replace(' ', '').replace(':', '|').upper()
-                    
-                    normalized_request = normalize_key(instrument_key)
-                    for key in data['data']:
-                        normalized_response = normalize_key(key)
-                        if normalized_request == normalized_response:
-                            quote_data = data['data'][key]
-                            logger.info(f"✅ Found normalized match for {instrument_key} (response key: {key})")
-                            break
-                
-                # Strategy 4: Extract core identifier and match (e.g., "NSE_FO|104500" -> "104500")
-                if not quote_data:
-                    # Extract the core identifier (token/number after separator)
-                    core_id = None
-                    for sep in ['|', ':']:
-                        if sep in instrument_key:
-                            core_id = instrument_key.split(sep)[-1]
-                            break
-                    if not core_id:
-                        core_id = instrument_key.split()[-1] if ' ' in instrument_key else instrument_key
-                    
-                    if core_id:
-                        for key in data['data']:
-                            # Check if core_id appears in the key (at end or as substring)
-                            if core_id in key or key.endswith(core_id) or key.endswith(f'|{core_id}') or key.endswith(f':{core_id}'):
-                                quote_data = data['data'][key]
-                                logger.info(f"✅ Found core ID match for {instrument_key} (core: {core_id}, response key: {key})")
-                                break
-                
-                # Strategy 5: If still no match, use the first (and likely only) entry if response has exactly one key
-                # This handles cases where API returns data in a different format but it's the correct instrument
-                if not quote_data and len(data['data']) == 1:
-                    # Only use this if we have exactly one response - it's likely the correct one
-                    single_key = list(data['data'].keys())[0]
-                    quote_data = data['data'][single_key]
-                    logger.warning(f"⚠️ Using single response entry for {instrument_key} (response key: {single_key})")
-                    logger.warning(f"   This assumes the API returned the correct instrument despite key format mismatch")
-                
-                # CRITICAL FIX: Remove dangerous fallback that uses first value
-                # If we can't find a match, return None instead of using wrong data
-                if not quote_data:
-                    logger.error(f"❌ CRITICAL: No match found for instrument_key '{instrument_key}'")
-                    logger.error(f"   Requested format: {instrument_key}")
-                    logger.error(f"   Available keys in response ({len(available_keys)} total):")
-                    for i, key in enumerate(available_keys[:10]):  # Show first 10 keys
-                        logger.error(f"     [{i+1}] {key}")
-                    if len(available_keys) > 10:
-                        logger.error(f"     ... and {len(available_keys) - 10} more")
-                    logger.error(f"   This prevents using wrong data for different instruments")
-                    logger.error(f"   Possible causes:")
-                    logger.error(f"     1. Instrument expired or no longer traded")
-                    logger.error(f"     2. Format mismatch (pipe vs colon separator)")
-                    logger.error(f"     3. Stale instrument_key in database")
-                    logger.error(f"     4. API returned data for different instrument")
-                    return None
-                
-                if quote_data:
-                    ohlc = quote_data.get('ohlc', {})
-                    ltp = float(quote_data.get('last_price', 0))
-                    close_price = float(ohlc.get('close', ltp))
-                    
-                    # Additional validation: Ensure LTP is reasonable (not zero or negative)
-                    if ltp <= 0:
-                        logger.warning(f"⚠️ Invalid LTP (₹{ltp}) for {instrument_key} - returning None")
-                        return None
-                    
-                    bid_px, ask_px = self.extract_bid_ask_from_quote_data(quote_data)
-                    out = {
-                        'last_price': ltp,
-                        'close_price': close_price,
-                        'ohlc': ohlc,
-                        'open': float(ohlc.get('open', 0)),
-                        'high': float(ohlc.get('high', 0)),
-                        'low': float(ohlc.get('low', 0)),
-                    }
-                    if bid_px is not None and ask_px is not None and ask_px > 0 and bid_px <= ask_px:
-                        out['bid_price'] = bid_px
-                        out['ask_price'] = ask_px
-                        out['spread_pct'] = (ask_px - bid_px) / ask_px * 100.0
-
-                    # F&O: open interest (dashboard OI heatmap, diagnostics) — equities often omit these
-                    def _qi(*keys: str) -> int:
-                        for k in keys:
-                            v = quote_data.get(k)
-                            if v is not None and v != "":
-                                try:
-                                    return int(float(v))
-                                except (TypeError, ValueError):
-                                    continue
-                        return 0
-
-                    oi_v = _qi("oi", "open_interest", "openInterest")
-                    oi_chg = _qi(
-                        "change_in_oi",
-                        "changeInOi",
-                        "chgoi",
-                        "chg_oi",
-                        "pchangeinOpenInterest",
-                    )
-                    out["oi"] = oi_v
-                    out["change_in_oi"] = oi_chg
-                    try:
-                        out["net_change"] = float(quote_data.get("net_change") or 0)
-                    except (TypeError, ValueError):
-                        out["net_change"] = 0.0
-                    
-                    logger.info(f"✅ Market quote for {instrument_key}: LTP=₹{ltp}, Close=₹{close_price}")
-                    
-                    return out
-            
-            logger.warning(f"⚠️ No valid quote data for {instrument_key}")
+            return self._quote_from_response(instrument_key, data)
                 
         except Exception as e:
             logger.error(f"❌ Error fetching market quote for {instrument_key}: {str(e)}")
             
         return None
 
+    @staticmethod
+    def _batch_ltp_from_response(keys_batch: List[str], data: Optional[Dict]) -> Dict[str, float]:
+        """instrument_key -> last_price from a multi-key quotes response (see ``get_market_quotes_batch_by_keys``)."""
+        result: Dict[str, float] = {}
+        if not data or data.get("status") != "success" or "data" not in data:
+            return result
+        raw = data.get("data") or {}
+        if not isinstance(raw, dict):
+            return result
+
+        def normalize_key(k: str) -> str:
+            return k.replace(" ", "").replace(":", "|").upper()
+
+        def find_last_price(req_key: str) -> float | None:
+            if req_key in raw:
+                lp = raw[req_key].get("last_price", 0)
+                return float(lp) if lp and float(lp) > 0 else None
+            alt1 = req_key.replace("|", ":")
+            if alt1 in raw:
+                lp = raw[alt1].get("last_price", 0)
+                return float(lp) if lp and float(lp) > 0 else None
+            alt2 = req_key.replace(":", "|")
+            if alt2 in raw:
+                lp = raw[alt2].get("last_price", 0)
+                return float(lp) if lp and float(lp) > 0 else None
+            norm_req = normalize_key(req_key)
+            for resp_key, quote_data in raw.items():
+                if normalize_key(resp_key) == norm_req:
+                    lp = quote_data.get("last_price", 0)
+                    return float(lp) if lp and float(lp) > 0 else None
+            return None
+
+        for req_key in keys_batch:
+            lp = find_last_price(req_key)
+            if lp is not None:
+                result[req_key] = lp
+        return result
+
     def get_market_quotes_batch_by_keys(
         self, instrument_keys: list[str], max_per_request: int = 500
     ) -> dict[str, float]:
@@ -2337,38 +2443,7 @@ class UpstoxService:
             keys_param = ",".join(keys_batch)
             url = f"https://api.upstox.com/v2/market-quote/quotes?instrument_key={quote(keys_param, safe=',')}"
             data = self.make_api_request(url, method="GET", timeout=15, max_retries=2)
-            if not data or data.get("status") != "success" or "data" not in data:
-                return result
-            raw = data.get("data") or {}
-            if not isinstance(raw, dict):
-                return result
-
-            def normalize_key(k: str) -> str:
-                return k.replace(" ", "").replace(":", "|").upper()
-
-            def find_last_price(req_key: str) -> float | None:
-                if req_key in raw:
-                    lp = raw[req_key].get("last_price", 0)
-                    return float(lp) if lp and float(lp) > 0 else None
-                alt1 = req_key.replace("|", ":")
-                if alt1 in raw:
-                    lp = raw[alt1].get("last_price", 0)
-                    return float(lp) if lp and float(lp) > 0 else None
-                alt2 = req_key.replace(":", "|")
-                if alt2 in raw:
-                    lp = raw[alt2].get("last_price", 0)
-                    return float(lp) if lp and float(lp) > 0 else None
-                norm_req = normalize_key(req_key)
-                for resp_key, quote_data in raw.items():
-                    if normalize_key(resp_key) == norm_req:
-                        lp = quote_data.get("last_price", 0)
-                        return float(lp) if lp and float(lp) > 0 else None
-                return None
-
-            for req_key in keys_batch:
-                lp = find_last_price(req_key)
-                if lp is not None:
-                    result[req_key] = lp
+            result = self._batch_ltp_from_response(keys_batch, data)
         except Exception as e:
             logger.error(f"❌ Error fetching batch market quotes: {str(e)}")
         return result
@@ -2719,7 +2794,7 @@ class UpstoxService:
             url = f"https://api.upstox.com/v2/market-quote/quotes?instrument_key={instrument_key}"
             
             # Make request
-            response = requests.get(url, headers=self.get_headers(), timeout=10)
+            response = _http_session().get(url, headers=self.get_headers(), timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -3531,11 +3606,10 @@ class UpstoxService:
             # Get the last trading date
             last_trading_date = self.get_last_trading_date(reference_time)
             
-            # If last trading date is same as reference date, go back one more day
+            # If last trading date is same as reference date, use the trading day before it
             if last_trading_date.date() >= reference_time.date():
-                # Go back one more day from last trading date
-                last_trading_date = last_trading_date - timedelta(days=1)
-                last_trading_date = self.get_last_trading_date(last_trading_date)
+                prev = get_trading_calendar().previous_trading_day(last_trading_date)
+                last_trading_date = ist.localize(datetime(prev.year, prev.month, prev.day))
             
             # Fetch daily candle for the previous trading day
             daily_candles = self.get_historical_candles(stock_symbol, interval="days/1", days_back=7)
@@ -4339,7 +4413,7 @@ class UpstoxService:
             # Try a simple API call (NIFTY quote)
             url = f"https://api.upstox.com/v2/market-quote/quotes?instrument_key={self.NIFTY50_KEY}"
             
-            response = requests.get(
+            response = _http_session().get(
                 url,
                 headers=self.get_headers(),
                 timeout=10  # Increased timeout
@@ -4447,3 +4521,5 @@ except Exception as _e:
     logger.warning("upstox_service default init using empty keys (config import failed): %s", _e)
     upstox_service = UpstoxService(api_key="", api_secret="", access_token=None)
 
+# Upstox holiday API feeds the trading calendar from its background refresher only.
+register_holiday_source("upstox_api", upstox_service.fetch_market_holidays_api)
@@ -0,0 +1,556 @@
+"""Batched, off-thread persistence for the Upstox market-data WebSocket.
+
+The feed thread used to open a ``SessionLocal()`` and commit one
+``INSERT ... ON CONFLICT`` per instrument per frame (1m candle, 1m order-flow
+archive, order-flow latest). With ~600 keys at market open that serialized the
+asyncio receive loop on Postgres round-trips and drained the shared pool.
+
+Now the feed thread only mutates its in-memory state and calls ``enqueue_*``,
+which records the *latest* snapshot per dirty key (so N ticks for one key in a
+flush window coalesce into one row). A single daemon flusher wakes every
+``UPSTOX_WS_WRITER_FLUSH_SEC`` and writes everything dirty as multi-row upserts
+in one session / one commit.
+
+Upserts are idempotent on the latest snapshot (the in-memory 1m candle is
+already cumulative), so a flush that fails because the DB is unreachable simply
+re-queues its rows unless the key was re-dirtied meanwhile (newer snapshot
+wins). If the DB is up, the failure is blamed on the rows: the batch is split in
+halves until the offending rows are isolated, and those are dropped with a log
+line (kept in a small dead-letter ring for the status endpoint) so one bad row
+cannot fail every later flush.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement; keeps bind-parameter count well under Postgres' 65535.
+_ROWS_PER_STATEMENT = 400
+# Hard cap on pending keys (1m + latest). Beyond this, re-queues after a failed
+# flush are dropped so a dead DB cannot grow memory without bound.
+_MAX_PENDING = 50000
+
+_LOCK = threading.Lock()
+_PENDING_1M: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_PENDING_LATEST: Dict[str, Dict[str, Any]] = {}
+_WAKE = threading.Event()
+_STOP = threading.Event()
+_THREAD: Optional[threading.Thread] = None
+
+# Best-effort metrics.
+_enqueued = 0
+_coalesced = 0
+_dropped = 0
+_flushes = 0
+_flush_errors = 0
+_rows_written = 0
+_last_flush_rows = 0
+_max_flush_rows = 0
+_last_flush_ms = 0.0
+_last_flush_at: Optional[float] = None
+_last_error: Optional[str] = None
+_poison_dropped = 0
+_FLUSH_MS: Deque[float] = deque(maxlen=200)
+_DEAD_LETTER: Deque[Dict[str, Any]] = deque(maxlen=50)
+
+
+def writer_enabled() -> bool:
+    return bool(getattr(settings, "UPSTOX_WS_WRITER_ENABLED", True))
+
+
+def _flush_interval_sec() -> float:
+    return max(0.05, float(getattr(settings, "UPSTOX_WS_WRITER_FLUSH_SEC", 1.0) or 1.0))
+
+
+def _chunks(rows: Sequence[Any], size: int = _ROWS_PER_STATEMENT):
+    for i in range(0, len(rows), size):
+        yield rows[i : i + size]
+
+
+def _values_clause(n: int, cols: Sequence[str], tail: str = "") -> str:
+    """``(:ik_0, :open_0, …[, tail]), (:ik_1, …)`` for ``n`` rows."""
+    parts = []
+    for i in range(n):
+        binds = ", ".join(f":{c}_{i}" for c in cols)
+        parts.append(f"({binds}{', ' + tail if tail else ''})")
+    return ",\n".join(parts)
+
+
+_WS_1M_COLS = (
+    "ik",
+    "candle_time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "oi_open",
+    "oi_high",
+    "oi_low",
+    "oi_close",
+    "volume",
+    "bid_q",
+    "ask_q",
+    "tbq",
+    "tsq",
+    "source",
+)
+
+
+def upsert_ws_1m_rows(db: Any, rows: Sequence[Tuple[str, str, Dict[str, Any]]]) -> int:
+    """Multi-row upsert into ``upstox_ws_intraday_1m``. Caller commits."""
+    n = 0
+    for chunk in _chunks(rows):
+        params: Dict[str, Any] = {}
+        for i, (ik, minute_iso, candle) in enumerate(chunk):
+            params.update(
+                {
+                    f"ik_{i}": ik,
+                    f"candle_time_{i}": minute_iso,
+                    f"open_{i}": float(candle["open"]),
+                    f"high_{i}": float(candle["high"]),
+                    f"low_{i}": float(candle["low"]),
+                    f"close_{i}": float(candle["close"]),
+                    f"oi_open_{i}": int(candle["oi_open"]),
+                    f"oi_high_{i}": int(candle["oi_high"]),
+                    f"oi_low_{i}": int(candle["oi_low"]),
+                    f"oi_close_{i}": int(candle["oi_close"]),
+                    f"volume_{i}": int(candle.get("volume") or 0),
+                    f"bid_q_{i}": int(candle.get("bid_depth_qty") or 0),
+                    f"ask_q_{i}": int(candle.get("ask_depth_qty") or 0),
+                    f"tbq_{i}": int(candle.get("tbq") or 0),
+                    f"tsq_{i}": int(candle.get("tsq") or 0),
+                    f"source_{i}": str(candle.get("candle_source") or "ltp_tick"),
+                }
+            )
+        db.execute(
+            text(
+                f"""
+                INSERT INTO upstox_ws_intraday_1m (
+                    instrument_key,
+                    candle_time,
+                    open,
+                    high,
+                    low,
+                    close,
+                    oi_open,
+                    oi_high,
+                    oi_low,
+                    oi_close,
+                    volume,
+                    bid_depth_qty,
+                    ask_depth_qty,
+                    tbq,
+                    tsq,
+                    candle_source,
+                    updated_at
+                )
+                VALUES
+                {_values_clause(len(chunk), _WS_1M_COLS, "NOW()")}
+                ON CONFLICT (instrument_key, candle_time)
+                DO UPDATE SET
+                    high = GREATEST(upstox_ws_intraday_1m.high, EXCLUDED.high),
+                    low = LEAST(upstox_ws_intraday_1m.low, EXCLUDED.low),
+                    close = EXCLUDED.close,
+                    oi_high = GREATEST(upstox_ws_intraday_1m.oi_high, EXCLUDED.oi_high),
+                    oi_low = LEAST(upstox_ws_intraday_1m.oi_low, EXCLUDED.oi_low),
+                    oi_close = EXCLUDED.oi_close,
+                    volume = GREATEST(COALESCE(upstox_ws_intraday_1m.volume, 0), EXCLUDED.volume),
+                    bid_depth_qty = EXCLUDED.bid_depth_qty,
+                    ask_depth_qty = EXCLUDED.ask_depth_qty,
+                    tbq = EXCLUDED.tbq,
+                    tsq = EXCLUDED.tsq,
+                    candle_source = EXCLUDED.candle_source,
+                    updated_at = NOW()
+                """
+            ),
+            params,
+        )
+        n += len(chunk)
+    return n
+
+
+_OF_1M_COLS = ("ik", "bt", "oi", "oic", "bid", "ask", "dr", "tbq", "tsq", "pr", "ltp")
+
+
+def upsert_orderflow_1m_rows(db: Any, rows: Sequence[Tuple[str, str, Dict[str, Any]]]) -> int:
+    """Multi-row upsert into the ``upstox_ws_orderflow_1m`` archive. Caller commits."""
+    n = 0
+    for chunk in _chunks(rows):
+        params: Dict[str, Any] = {}
+        for i, (ik, minute_iso, candle) in enumerate(chunk):
+            bid = int(candle.get("bid_depth_qty") or 0)
+            ask = int(candle.get("ask_depth_qty") or 0)
+            tbq = int(candle.get("tbq") or 0)
+            tsq = int(candle.get("tsq") or 0)
+            oi_close = int(candle.get("oi_close") or 0)
+            oi_open = int(candle.get("oi_open") or oi_close)
+            params.update(
+                {
+                    f"ik_{i}": ik,
+                    f"bt_{i}": minute_iso,
+                    f"oi_{i}": oi_close,
+                    f"oic_{i}": oi_close - oi_open,
+                    f"bid_{i}": bid,
+                    f"ask_{i}": ask,
+                    f"dr_{i}": bid / max(ask, 1),
+                    f"tbq_{i}": tbq,
+                    f"tsq_{i}": tsq,
+                    f"pr_{i}": tbq / max(tsq, 1),
+                    f"ltp_{i}": float(candle.get("close") or 0),
+                }
+            )
+        db.execute(
+            text(
+                f"""
+                INSERT INTO upstox_ws_orderflow_1m (
+                    instrument_key, bucket_time, oi, oi_change,
+                    bid_depth_qty, ask_depth_qty, depth_imbalance_ratio,
+                    tbq, tsq, pressure_ratio, ltp, updated_at
+                ) VALUES
+                {_values_clause(len(chunk), _OF_1M_COLS, "NOW()")}
+                ON CONFLICT (instrument_key, bucket_time)
+                DO UPDATE SET
+                    oi = EXCLUDED.oi,
+                    oi_change = EXCLUDED.oi_change,
+                    bid_depth_qty = EXCLUDED.bid_depth_qty,
+                    ask_depth_qty = EXCLUDED.ask_depth_qty,
+                    depth_imbalance_ratio = EXCLUDED.depth_imbalance_ratio,
+                    tbq = EXCLUDED.tbq,
+                    tsq = EXCLUDED.tsq,
+                    pressure_ratio = EXCLUDED.pressure_ratio,
+                    ltp = EXCLUDED.ltp,
+                    updated_at = NOW()
+                """
+            ),
+            params,
+        )
+        n += len(chunk)
+    return n
+
+
+_OF_LATEST_COLS = ("ik", "bid", "ask", "dr", "tbq", "tsq", "pr", "oi", "ltp", "oic")
+
+
+def upsert_orderflow_latest_rows(db: Any, rows: Sequence[Tuple[str, Dict[str, Any]]]) -> int:
+    """Multi-row upsert into ``upstox_ws_orderflow_latest``. Caller commits."""
+    n = 0
+    for chunk in _chunks(rows):
+        params: Dict[str, Any] = {}
+        for i, (ik, fields) in enumerate(chunk):
+            params.update(
+                {
+                    f"ik_{i}": ik,
+                    f"bid_{i}": int(fields.get("bid_depth_qty") or 0),
+                    f"ask_{i}": int(fields.get("ask_depth_qty") or 0),
+                    f"dr_{i}": float(fields.get("depth_imbalance_ratio") or 1.0),
+                    f"tbq_{i}": int(fields.get("tbq") or 0),
+                    f"tsq_{i}": int(fields.get("tsq") or 0),
+                    f"pr_{i}": float(fields.get("pressure_ratio") or 1.0),
+                    f"oi_{i}": fields.get("oi"),
+                    f"ltp_{i}": fields.get("ltp"),
+                    f"oic_{i}": int(fields.get("oi_change") or 0),
+                }
+            )
+        db.execute(
+            text(
+                f"""
+                INSERT INTO upstox_ws_orderflow_latest (
+                    instrument_key, bid_depth_qty, ask_depth_qty, depth_imbalance_ratio,
+                    tbq, tsq, pressure_ratio, oi, ltp, oi_change, updated_at
+                ) VALUES
+                {_values_clause(len(chunk), _OF_LATEST_COLS, "NOW()")}
+                ON CONFLICT (instrument_key) DO UPDATE SET
+                    bid_depth_qty = EXCLUDED.bid_depth_qty,
+                    ask_depth_qty = EXCLUDED.ask_depth_qty,
+                    depth_imbalance_ratio = EXCLUDED.depth_imbalance_ratio,
+                    tbq = EXCLUDED.tbq,
+                    tsq = EXCLUDED.tsq,
+                    pressure_ratio = EXCLUDED.pressure_ratio,
+                    oi = EXCLUDED.oi,
+                    ltp = EXCLUDED.ltp,
+                    oi_change = EXCLUDED.oi_change,
+                    updated_at = NOW()
+                """
+            ),
+            params,
+        )
+        n += len(chunk)
+    return n
+
+
+def enqueue_1m(ik: str, minute_iso: str, candle: Dict[str, Any]) -> None:
+    """Mark one instrument-minute candle dirty (latest snapshot wins)."""
+    global _enqueued, _coalesced
+    snap = dict(candle)
+    with _LOCK:
+        k = (ik, minute_iso)
+        if k in _PENDING_1M:
+            _coalesced += 1
+        _PENDING_1M[k] = snap
+        _enqueued += 1
+
+
+def enqueue_orderflow_latest(ik: str, fields: Dict[str, Any]) -> None:
+    """Mark one instrument's latest order-flow snapshot dirty (latest wins)."""
+    global _enqueued, _coalesced
+    snap = dict(fields)
+    with _LOCK:
+        if ik in _PENDING_LATEST:
+            _coalesced += 1
+        _PENDING_LATEST[ik] = snap
+        _enqueued += 1
+
+
+def queue_depth() -> int:
+    with _LOCK:
+        return len(_PENDING_1M) + len(_PENDING_LATEST)
+
+
+def _requeue(
+    batch_1m: Dict[Tuple[str, str], Dict[str, Any]],
+    batch_latest: Dict[str, Dict[str, Any]],
+) -> None:
+    """Put a failed batch back without overwriting newer snapshots."""
+    global _dropped
+    with _LOCK:
+        room = _MAX_PENDING - (len(_PENDING_1M) + len(_PENDING_LATEST))
+        for k, c in batch_1m.items():
+            if k in _PENDING_1M:
+                continue
+            if room <= 0:
+                _dropped += 1
+                continue
+            _PENDING_1M[k] = c
+            room -= 1
+        for k, f in batch_latest.items():
+            if k in _PENDING_LATEST:
+                continue
+            if room <= 0:
+                _dropped += 1
+                continue
+            _PENDING_LATEST[k] = f
+            room -= 1
+
+
+def _rollback_quietly(db: Any) -> None:
+    try:
+        db.rollback()
+    except Exception:
+        pass
+
+
+def _db_alive(db: Any) -> bool:
+    """True when the session can still run a trivial query (failure is the rows' fault).
+
+    Callers give up on the session (re-queue, then close) when this is False.
+    """
+    try:
+        db.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+def _write_1m_rows(db: Any, rows: Sequence[Tuple[str, str, Dict[str, Any]]]) -> int:
+    return upsert_ws_1m_rows(db, rows) + upsert_orderflow_1m_rows(db, rows)
+
+
+def _write_bisecting(db: Any, rows: Sequence[Any], write: Any) -> Tuple[int, List[Tuple[Any, Exception]]]:
+    """Commit ``rows`` via ``write``, halving on failure. Returns (rows written, failing rows)."""
+    try:
+        n = write(db, rows)
+        db.commit()
+        return n, []
+    except Exception as e:
+        _rollback_quietly(db)
+        if len(rows) == 1:
+            return 0, [(rows[0], e)]
+    mid = len(rows) // 2
+    n_lo, bad_lo = _write_bisecting(db, rows[:mid], write)
+    n_hi, bad_hi = _write_bisecting(db, rows[mid:], write)
+    return n_lo + n_hi, bad_lo + bad_hi
+
+
+def _dead_letter(table: str, key: Any, err: Exception) -> None:
+    global _poison_dropped
+    _poison_dropped += 1
+    _DEAD_LETTER.append({"table": table, "key": key, "error": str(err)[:300], "at": time.time()})
+    logger.warning("upstox_ws_writer: dropped %s row %s that fails on its own: %s", table, key, err)
+
+
+def _flush_isolating(
+    db: Any,
+    rows_1m: List[Tuple[str, str, Dict[str, Any]]],
+    rows_latest: List[Tuple[str, Dict[str, Any]]],
+) -> int:
+    """Write a failed batch in halving sub-batches; drop rows that still fail alone."""
+    n_1m, bad_1m = _write_bisecting(db, rows_1m, _write_1m_rows) if rows_1m else (0, [])
+    n_latest, bad_latest = (
+        _write_bisecting(db, rows_latest, upsert_orderflow_latest_rows) if rows_latest else (0, [])
+    )
+    if (bad_1m or bad_latest) and not _db_alive(db):
+        # The DB went away mid-split; these rows are not proven bad.
+        logger.warning(
+            "upstox_ws_writer: DB lost while isolating rows (%s 1m, %s latest re-queued)",
+            len(bad_1m),
+            len(bad_latest),
+        )
+        _requeue(
+            {(ik, minute_iso): c for (ik, minute_iso, c), _ in bad_1m},
+            {ik: f for (ik, f), _ in bad_latest},
+        )
+    else:
+        for (ik, minute_iso, _c), err in bad_1m:
+            _dead_letter("1m", f"{ik}@{minute_iso}", err)
+        for (ik, _f), err in bad_latest:
+            _dead_letter("latest", ik, err)
+    return n_1m + n_latest
+
+
+def flush_once() -> int:
+    """Write every dirty snapshot in one session. Returns rows written (per table summed)."""
+    global _PENDING_1M, _PENDING_LATEST
+    global _flushes, _flush_errors, _rows_written, _last_flush_rows, _max_flush_rows
+    global _last_flush_ms, _last_flush_at, _last_error
+    from backend.database import SessionLocal
+
+    with _LOCK:
+        if not _PENDING_1M and not _PENDING_LATEST:
+            return 0
+        batch_1m, _PENDING_1M = _PENDING_1M, {}
+        batch_latest, _PENDING_LATEST = _PENDING_LATEST, {}
+
+    rows_1m = [(ik, minute_iso, c) for (ik, minute_iso), c in batch_1m.items()]
+    rows_latest = list(batch_latest.items())
+    t0 = time.perf_counter()
+    db = SessionLocal()
+    try:
+        try:
+            n = 0
+            if rows_1m:
+                n += _write_1m_rows(db, rows_1m)
+            if rows_latest:
+                n += upsert_orderflow_latest_rows(db, rows_latest)
+            db.commit()
+        except Exception as e:
+            _rollback_quietly(db)
+            _flush_errors += 1
+            _last_error = str(e)[:300]
+            if not _db_alive(db):
+                logger.warning(
+                    "upstox_ws_writer: flush failed (%s 1m, %s latest rows re-queued): %s",
+                    len(rows_1m),
+                    len(rows_latest),
+                    e,
+                )
+                _requeue(batch_1m, batch_latest)
+                return 0
+            logger.warning(
+                "upstox_ws_writer: flush failed with DB up, splitting %s 1m / %s latest rows: %s",
+                len(rows_1m),
+                len(rows_latest),
+                e,
+            )
+            n = _flush_isolating(db, rows_1m, rows_latest)
+    finally:
+        db.close()
+    ms = (time.perf_counter() - t0) * 1000.0
+    _flushes += 1
+    _rows_written += n
+    _last_flush_rows = n
+    _max_flush_rows = max(_max_flush_rows, n)
+    _last_flush_ms = ms
+    _last_flush_at = time.time()
+    _FLUSH_MS.append(ms)
+    return n
+
+
+def _flush_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        _WAKE.wait(timeout=_flush_interval_sec())
+        _WAKE.clear()
+        try:
+            flush_once()
+        except Exception as e:
+            logger.warning("upstox_ws_writer: flush loop error: %s", e, exc_info=True)
+    try:
+        flush_once()
+    except Exception as e:
+        logger.warning("upstox_ws_writer: final flush failed: %s", e)
+
+
+def ensure_writer_running() -> None:
+    """Start the flusher thread once per process (idempotent)."""
+    global _THREAD, _STOP
+    if _THREAD is not None and _THREAD.is_alive():
+        return
+    _STOP = threading.Event()
+    _THREAD = threading.Thread(
+        target=_flush_loop,
+        args=(_STOP,),
+        name="upstox-ws-writer",
+        daemon=True,
+    )
+    _THREAD.start()
+    logger.info("upstox_ws_writer: started (flush every %.2fs)", _flush_interval_sec())
+
+
+def stop_writer(timeout: float = 5.0) -> None:
+    """Stop the flusher after a final flush of everything still dirty."""
+    global _THREAD
+    if _THREAD is None:
+        return
+    _STOP.set()
+    _WAKE.set()
+    _THREAD.join(timeout=timeout)
+    _THREAD = None
+
+
+def _percentile(sorted_vals: List[float], pct: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(pct / 100.0 * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+def writer_stats() -> Dict[str, Any]:
+    """Queue depth, flush latency and rows-per-flush for ``/upstox-market-feed/status``."""
+    with _LOCK:
+        depth_1m = len(_PENDING_1M)
+        depth_latest = len(_PENDING_LATEST)
+        lat = sorted(_FLUSH_MS)
+    dead_letter = list(_DEAD_LETTER)[-10:]
+    return {
+        "enabled": writer_enabled(),
+        "thread_alive": _THREAD is not None and _THREAD.is_alive(),
+        "flush_interval_sec": _flush_interval_sec(),
+        "queue_depth": depth_1m + depth_latest,
+        "queue_depth_1m": depth_1m,
+        "queue_depth_latest": depth_latest,
+        "enqueued": _enqueued,
+        "coalesced": _coalesced,
+        "dropped": _dropped,
+        "flushes": _flushes,
+        "flush_errors": _flush_errors,
+        "rows_written": _rows_written,
+        "rows_last_flush": _last_flush_rows,
+        "rows_max_flush": _max_flush_rows,
+        "rows_avg_flush": round(_rows_written / _flushes, 1) if _flushes else 0.0,
+        "flush_ms_last": round(_last_flush_ms, 2),
+        "flush_ms_p50": round(_percentile(lat, 50), 2),
+        "flush_ms_p95": round(_percentile(lat, 95), 2),
+        "flush_ms_max": round(lat[-1], 2) if lat else 0.0,
+        "last_flush_at": _last_flush_at,
+        "last_error": _last_error,
+        "poison_dropped": _poison_dropped,
+        "dead_letter_recent": dead_letter,
+    }
@@ -10,7 +10,7 @@ from typing import Any, Dict, List, Optional
 import pytz
 
 from backend.config import settings
-from backend.services.market_holiday import refresh_holiday_dates_from_db
+from backend.services.trading_calendar import get_trading_calendar
 from backend.services.upstox_service import UpstoxService
 from backend.services.volume_mismatch.backtest_signals import collect_gap_bb_signals_for_date
 from backend.services.volume_mismatch.backtest_universe import (
@@ -37,35 +37,6 @@ SIGNAL_CRITERIA = (
 )
 
 
-def _load_holiday_dates(
-    upstox: UpstoxService,
-    from_date: date,
-    to_date: date,
-) -> set[date]:
-    """NSE holidays for the backtest range — DB first, Upstox API fallback."""
-    holidays = refresh_holiday_dates_from_db()
-    if holidays:
-        return holidays
-    out: set[date] = set()
-    for year in range(from_date.year, to_date.year + 1):
-        for dstr in upstox.get_market_holidays(year) or []:
-            try:
-                out.add(date.fromisoformat(str(dstr)[:10]))
-            except ValueError:
-                continue
-    return out
-
-
-def _iter_trading_days(d0: date, d1: date, holiday_dates: set[date]) -> List[date]:
-    out: List[date] = []
-    d = d0
-    while d <= d1:
-        if d.weekday() < 5 and d not in holiday_dates:
-            out.append(d)
-        d += timedelta(days=1)
-    return out
-
-
 def _write_incremental_artifact(
     path: Optional[Path],
     *,
@@ -125,13 +96,13 @@ def run_volume_mismatch_backtest(
     if not getattr(upstox, "access_token", None):
         return {"error": "Upstox token unavailable", "rows": []}
 
-    holiday_dates = _load_holiday_dates(upstox, from_date, to_date)
-    session_days = _iter_trading_days(from_date, to_date, holiday_dates)
-    holidays_in_range = sum(
+    session_days = get_trading_calendar().trading_days(from_date, to_date)
+    weekdays_in_range = sum(
         1
         for d in (from_date + timedelta(days=i) for i in range((to_date - from_date).days + 1))
-        if d.weekday() < 5 and d in holiday_dates
+        if d.weekday() < 5
     )
+    holidays_in_range = weekdays_in_range - len(session_days)
     logger.info(
         "Gap+BB backtest range %s..%s: %s trading days (%s NSE holidays skipped)",
         from_date,
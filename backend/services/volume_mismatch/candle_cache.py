@@ -12,6 +12,7 @@ from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
 import pytz
 
+from backend.services.market_data.candle_store import historical_candles
 from backend.services.volume_mismatch.candles import (
     BB_DAILY_DAYS_BACK,
     FIRST_15M_DAYS_BACK,
@@ -265,7 +266,8 @@ class VolumeMismatchCandleCache:
 
             days_back = BB_DAILY_DAYS_BACK
             try:
-                fresh = upstox.get_historical_candles_by_instrument_key(
+                fresh = historical_candles(
+                    upstox,
                     ik,
                     interval="days/1",
                     days_back=days_back,
@@ -281,7 +283,8 @@ class VolumeMismatchCandleCache:
             if self._daily_sufficient(merged, session_date, min_closes=min_closes):
                 return merged, True
             try:
-                fresh = upstox.get_historical_candles_by_instrument_key(
+                fresh = historical_candles(
+                    upstox,
                     ik,
                     interval="days/1",
                     days_back=BB_DAILY_DAYS_BACK,
@@ -318,7 +321,8 @@ class VolumeMismatchCandleCache:
                 self._day_stats["m15_disk_hit"] = self._day_stats.get("m15_disk_hit", 0) + 1
                 return hit, False
             try:
-                raw = upstox.get_historical_candles_by_instrument_key(
+                raw = historical_candles(
+                    upstox,
                     ik,
                     interval="minutes/15",
                     days_back=FIRST_15M_DAYS_BACK,
@@ -347,7 +351,8 @@ class VolumeMismatchCandleCache:
         if bars and self._daily_sufficient(bars, range_end, min_closes=BB_DAILY_DAYS_BACK):
             return False
         try:
-            fresh = upstox.get_historical_candles_by_instrument_key(
+            fresh = historical_candles(
+                upstox,
                 ik,
                 interval="days/1",
                 days_back=days_back,
@@ -373,7 +378,8 @@ class VolumeMismatchCandleCache:
             return False
         bars = self._load_m15(ik)
         try:
-            fresh = upstox.get_historical_candles_by_instrument_key(
+            fresh = historical_candles(
+                upstox,
                 ik,
                 interval="minutes/15",
                 days_back=days_back,
@@ -12,6 +12,8 @@ from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import pytz
 
+from backend.services.market_data.candle_store import historical_candles
+
 logger = logging.getLogger(__name__)
 IST = pytz.timezone("Asia/Kolkata")
 
@@ -83,7 +85,8 @@ def fetch_candles_cached(
 
     try:
         logger.debug("VM backtest/allow_rest Upstox fetch %s %s", ik, interval)
-        raw = upstox.get_historical_candles_by_instrument_key(
+        raw = historical_candles(
+            upstox,
             ik,
             interval=interval,
             days_back=days_back,
@@ -313,7 +316,8 @@ def fetch_first_15m_bar_for_session(
     if persistent_cache is not None:
         return persistent_cache.get_first_15m_bar(upstox, ik, session_date)
     try:
-        raw = upstox.get_historical_candles_by_instrument_key(
+        raw = historical_candles(
+            upstox,
             ik,
             interval="minutes/15",
             days_back=FIRST_15M_DAYS_BACK,
@@ -401,7 +405,8 @@ class BacktestDailyCache:
             days_back = BB_DAILY_DAYS_BACK
 
         try:
-            fresh = upstox.get_historical_candles_by_instrument_key(
+            fresh = historical_candles(
+                upstox,
                 ik,
                 interval="days/1",
                 days_back=days_back,
@@ -421,7 +426,8 @@ class BacktestDailyCache:
         if days_back >= BB_DAILY_DAYS_BACK:
             return merged, True
         try:
-            fresh = upstox.get_historical_candles_by_instrument_key(
+            fresh = historical_candles(
+                upstox,
                 ik,
                 interval="days/1",
                 days_back=BB_DAILY_DAYS_BACK,
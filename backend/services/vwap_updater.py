@@ -220,6 +220,120 @@ def historical_data_exists(db: Session, stock_name: str, scan_time: datetime, ti
         logger.warning(f"⚠️ Error checking existing historical data for {stock_name}: {str(e)}")
         return False  # If check fails, allow save (fail-safe)
 
+
+# Upstox reads counted per open-position cycle (see CountedBroker).
+_CYCLE_BROKER_READS = frozenset({
+    "get_market_quote_snapshots_batch",
+    "get_market_quote_by_key",
+    "get_stock_ltp_from_market_quote",
+    "get_stock_vwap",
+    "get_order_book_today",
+})
+_QUOTE_SNAPSHOT_CHUNK = 100
+_LAST_OPEN_POSITION_CYCLE: dict = {}
+
+
+class CountedBroker:
+    """Proxy over the Upstox service counting the broker reads made through it in one cycle."""
+
+    def __init__(self, service):
+        self._service = service
+        self.calls: dict = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._service, name)
+        if name not in _CYCLE_BROKER_READS or not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            return attr(*args, **kwargs)
+
+        return counted
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+class OpenPositionMarketData:
+    """
+    Fetch phase of the open-position loop: one batched quote snapshot for every stock and
+    option key, one hourly-candle VWAP per distinct stock, and one order book for buy-fill sync.
+    The decide phase reads from here and only calls the broker for keys the batch missed.
+    """
+
+    def __init__(self, quotes: dict, stock_keys: dict, stock_vwap: dict, order_book: Optional[dict]):
+        self.quotes = quotes
+        self.stock_keys = stock_keys
+        self.stock_vwap = stock_vwap
+        self.order_book = order_book
+
+    def option_quote(self, instrument_key: Optional[str]) -> Optional[dict]:
+        return self.quotes.get(instrument_key) if instrument_key else None
+
+    def stock_ltp(self, stock_name: str) -> Optional[float]:
+        """LTP like ``get_stock_ltp_from_market_quote`` (last price, else day close); None if not in the batch."""
+        snap = self.quotes.get(self.stock_keys.get(stock_name) or "")
+        if not snap:
+            return None
+        ltp = float(snap.get("last_price") or 0)
+        if ltp <= 0:
+            ltp = float((snap.get("ohlc") or {}).get("close") or 0)
+        return ltp if ltp > 0 else None
+
+
+def fetch_open_position_market_data(broker, positions, with_order_book: bool = False) -> OpenPositionMarketData:
+    """
+    Args:
+        broker: Upstox service (or ``CountedBroker``)
+        positions: (stock_name, option instrument_key) pairs of the open positions
+        with_order_book: fetch today's order book once for ``sync_trade_buy_fill_from_broker``
+    """
+    stock_keys = {}
+    option_keys = []
+    for stock_name, instrument_key in positions:
+        if stock_name and stock_name not in stock_keys:
+            try:
+                stock_keys[stock_name] = broker.get_instrument_key(stock_name)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not resolve instrument key for {stock_name}: {e}")
+                stock_keys[stock_name] = None
+        if instrument_key and instrument_key not in option_keys:
+            option_keys.append(instrument_key)
+
+    keys = list(dict.fromkeys([k for k in stock_keys.values() if k] + option_keys))
+    quotes = {}
+    for i in range(0, len(keys), _QUOTE_SNAPSHOT_CHUNK):
+        batch = keys[i:i + _QUOTE_SNAPSHOT_CHUNK]
+        try:
+            quotes.update(broker.get_market_quote_snapshots_batch(batch, max_per_request=len(batch)) or {})
+        except Exception as e:
+            logger.warning(f"⚠️ Batch quote snapshot failed for {len(batch)} keys: {e}")
+
+    stock_vwap = {}
+    for stock_name in stock_keys:
+        try:
+            stock_vwap[stock_name] = broker.get_stock_vwap(stock_name)
+        except Exception as e:
+            logger.warning(f"⚠️ VWAP fetch failed for {stock_name}: {e}")
+            stock_vwap[stock_name] = 0.0
+
+    order_book = None
+    if with_order_book:
+        try:
+            order_book = broker.get_order_book_today()
+        except Exception as e:
+            logger.warning(f"⚠️ Order book fetch failed: {e}")
+
+    return OpenPositionMarketData(quotes, stock_keys, stock_vwap, order_book)
+
+
+def get_last_open_position_cycle_stats() -> dict:
+    """Wall time and broker-call count of the last open-position cycle."""
+    return dict(_LAST_OPEN_POSITION_CYCLE)
+
+
 class VWAPUpdater:
     """Scheduler for updating stock VWAP hourly during market hours"""
     
@@ -837,16 +951,18 @@ def update_vwap_for_all_open_positions():
         if db is not None:
             db.commit()
         
-        open_position_ids = [
-            int(r[0])
-            for r in db.query(IntradayStockOption.id).filter(
-                and_(
-                    IntradayStockOption.trade_date >= today,
-                    IntradayStockOption.status == 'bought',
-                    IntradayStockOption.exit_reason == None,
-                )
-            ).all()
-        ]
+        open_rows = db.query(
+            IntradayStockOption.id,
+            IntradayStockOption.stock_name,
+            IntradayStockOption.instrument_key,
+        ).filter(
+            and_(
+                IntradayStockOption.trade_date >= today,
+                IntradayStockOption.status == 'bought',
+                IntradayStockOption.exit_reason == None,
+            )
+        ).all()
+        open_position_ids = [int(r[0]) for r in open_rows]
         if not open_position_ids:
             logger.info("No open positions found to update")
         else:
@@ -929,8 +1045,18 @@ def update_vwap_for_all_open_positions():
         if len(open_position_ids) == 0:
             logger.debug(f"⚠️ No positions to process (no trades entered today or all exited)")
         
+        # Fetch phase: all broker reads for the cycle up front, then decide per position from memory
+        cycle_t0 = time.perf_counter()
+        broker = CountedBroker(vwap_service)
+        market = fetch_open_position_market_data(
+            broker,
+            [(r.stock_name, r.instrument_key) for r in open_rows],
+            with_order_book=bool(open_rows) and live_trading.is_trading_live_enabled(),
+        )
+        fetch_sec = time.perf_counter() - cycle_t0
+        
+        pos_db = SessionLocal()
         for idx, position_id in enumerate(open_position_ids, 1):
-            pos_db = SessionLocal()
             try:
                 db = pos_db
                 position = pos_db.query(IntradayStockOption).filter(
@@ -972,7 +1098,9 @@ def update_vwap_for_all_open_positions():
                 
                 if position.status == 'bought' and position.buy_price and position.instrument_key:
                     try:
-                        live_trading.sync_trade_buy_fill_from_broker(db, position)
+                        live_trading.sync_trade_buy_fill_from_broker(
+                            db, position, order_book=market.order_book
+                        )
                     except Exception as sync_err:
                         logger.warning(
                             f"⚠️ Buy fill sync failed for {stock_name}: {sync_err}"
@@ -1005,18 +1133,23 @@ def update_vwap_for_all_open_positions():
                         logger.warning(f"⚠️ Timezone conversion error for {stock_name}: {str(tz_error)} - continuing with update")
                         # Continue processing - don't let timezone check block the update
                 
-                # 1. Fetch fresh Stock VWAP from API
-                new_vwap = vwap_service.get_stock_vwap(stock_name)
+                # 1. Stock VWAP (hourly candles, fetched once per stock in the fetch phase)
+                if stock_name in market.stock_vwap:
+                    new_vwap = market.stock_vwap[stock_name]
+                else:
+                    new_vwap = broker.get_stock_vwap(stock_name)
                 
-                # 2. Fetch fresh Stock LTP (Last Traded Price)
-                new_stock_ltp = vwap_service.get_stock_ltp_from_market_quote(stock_name)
+                # 2. Stock LTP from the batch snapshot; single-key quote only if the batch missed it
+                new_stock_ltp = market.stock_ltp(stock_name)
+                if new_stock_ltp is None:
+                    new_stock_ltp = broker.get_stock_ltp_from_market_quote(stock_name)
                 
-                # 3. Fetch fresh Option LTP (if option contract exists) - SIMPLIFIED
+                # 3. Option LTP (if option contract exists) - SIMPLIFIED
                 new_option_ltp = 0.0
                 if option_contract and position.instrument_key:
                     try:
                         instrument_key = position.instrument_key
-                        option_quote = vwap_service.get_market_quote_by_key(instrument_key)
+                        option_quote = market.option_quote(instrument_key) or broker.get_market_quote_by_key(instrument_key)
                         
                         if option_quote and isinstance(option_quote, dict) and 'last_price' in option_quote:
                             option_ltp_data = option_quote['last_price']
@@ -1086,7 +1219,7 @@ def update_vwap_for_all_open_positions():
                                                                     logger.info(f"🔍 [{now.strftime('%H:%M:%S')}] Found instrument_key via lookup: {instrument_key}")
                                                                     logger.info(f"   Strike: {inst_strike}, Type: {opt_type}, Expiry: {inst_expiry.strftime('%d-%b-%Y')}")
                                                                     
-                                                                    option_quote = vwap_service.get_market_quote_by_key(instrument_key)
+                                                                    option_quote = broker.get_market_quote_by_key(instrument_key)
                                                                     
                                                                     if option_quote and 'last_price' in option_quote:
                                                                         option_ltp_data = option_quote['last_price']
@@ -1109,7 +1242,7 @@ def update_vwap_for_all_open_positions():
                     logger.warning(f"⚠️ Option LTP fetch FAILED for {stock_name} {option_contract} - RETRYING...")
                     try:
                         # Retry option LTP fetch
-                        option_quote_retry = vwap_service.get_market_quote_by_key(position.instrument_key)
+                        option_quote_retry = broker.get_market_quote_by_key(position.instrument_key)
                         if option_quote_retry and 'last_price' in option_quote_retry:
                             option_ltp_retry = option_quote_retry['last_price']
                             if option_ltp_retry and option_ltp_retry > 0:
@@ -1139,7 +1272,7 @@ def update_vwap_for_all_open_positions():
                                 if position.instrument_key:
                                     try:
                                         logger.critical(f"   🔄 Final attempt to fetch option LTP for exit...")
-                                        final_quote = vwap_service.get_market_quote_by_key(position.instrument_key)
+                                        final_quote = broker.get_market_quote_by_key(position.instrument_key)
                                         if final_quote and 'last_price' in final_quote:
                                             final_ltp = final_quote['last_price']
                                             if final_ltp and final_ltp > 0:
@@ -1508,7 +1641,7 @@ def update_vwap_for_all_open_positions():
                         if exit_option_ltp == 0 and position.instrument_key:
                             try:
                                 logger.warning(f"⚠️ VWAP cross detected but option LTP is 0 - retrying fetch...")
-                                final_quote = vwap_service.get_market_quote_by_key(position.instrument_key)
+                                final_quote = broker.get_market_quote_by_key(position.instrument_key)
                                 if final_quote and 'last_price' in final_quote:
                                     final_ltp = final_quote['last_price']
                                     if final_ltp and final_ltp > 0:
@@ -1673,10 +1806,38 @@ def update_vwap_for_all_open_positions():
                         pass
                     failed_count += 1
             finally:
+                # Positions left via `continue` are not committed — discard, as closing a
+                # per-position session used to.
                 try:
-                    pos_db.close()
+                    pos_db.rollback()
                 except Exception:
                     pass
+        try:
+            pos_db.close()
+        except Exception:
+            pass
+        db = None
+        
+        cycle_sec = time.perf_counter() - cycle_t0
+        _LAST_OPEN_POSITION_CYCLE.clear()
+        _LAST_OPEN_POSITION_CYCLE.update({
+            "at": now.isoformat(),
+            "positions": len(open_position_ids),
+            "wall_sec": round(cycle_sec, 3),
+            "fetch_sec": round(fetch_sec, 3),
+            "decide_sec": round(cycle_sec - fetch_sec, 3),
+            "api_calls": broker.total_calls,
+            "api_calls_by_method": dict(broker.calls),
+        })
+        logger.info(
+            "⏱️ Open-position cycle: %s positions in %.2fs (fetch %.2fs, decide %.2fs), %s API calls %s",
+            len(open_position_ids),
+            cycle_sec,
+            fetch_sec,
+            cycle_sec - fetch_sec,
+            broker.total_calls,
+            broker.calls,
+        )
         
         # ═══════════════════════════════════════════════════════════════
         # SAVE HISTORICAL MARKET DATA FOR NO_ENTRY TRADES
@@ -0,0 +1,163 @@
+"""Concurrent enrichment stage for ChartInk webhook batches.
+
+``process_webhook_data`` used to enrich alert stocks one after another: LTP/VWAP,
+option chain → contract, option quote, option candles and previous-hour VWAP
+are each a broker round trip, so a 20–30 name alert took tens of seconds before
+any entry was recorded. The per-stock work is independent, so it now runs on a
+small thread pool:
+
+* duplicate names in one alert are enriched once (the copy keeps its own
+  ``trigger_price``);
+* up to ``WEBHOOK_ENRICH_WORKERS`` stocks (default 8) are in flight at once —
+  candle requests still go through the shared ``acquire_candle_slot`` budget and
+  all REST calls share the pooled session, so the bound keeps the burst polite;
+* output order matches the alert order (ranking ties depend on it).
+
+``StageTimer`` records per-stage wall time for the log line emitted at the end
+of each webhook. Raw payloads are appended to
+``scan_data/webhook_payloads/YYYY-MM-DD.jsonl`` so
+``scripts/replay_webhooks.py`` can replay them against a stubbed broker.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone("Asia/Kolkata")
+ENRICH_WORKERS = max(1, int(os.getenv("WEBHOOK_ENRICH_WORKERS", "8") or "8"))
+ARCHIVE_DIR = Path(__file__).resolve().parent.parent / "scan_data" / "webhook_payloads"
+
+_archive_lock = threading.Lock()
+
+
+class StageTimer:
+    """Wall time per named stage; ``lap(name)`` closes the stage that started at the previous lap."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self._t0 = self._last = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+
+    def lap(self, name: str) -> float:
+        now = time.perf_counter()
+        dt = now - self._last
+        self._last = now
+        self.stages.append((name, dt))
+        return dt
+
+    @property
+    def total(self) -> float:
+        return self._last - self._t0
+
+    def as_dict(self) -> Dict[str, float]:
+        out: Dict[str, float] = {}
+        for name, dt in self.stages:
+            out[name] = out.get(name, 0.0) + dt
+        out["total"] = self.total
+        return out
+
+    def summary(self) -> str:
+        parts = " ".join(f"{k}={v * 1e3:.0f}ms" for k, v in self.as_dict().items())
+        return f"{self.label} {parts}".strip()
+
+
+def _name_key(stock: Dict[str, Any]) -> str:
+    return str(stock.get("stock_name") or "").strip().upper()
+
+
+def dedupe_stocks(stocks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """(first occurrence of each name, index into that list for every input row)."""
+    unique: List[Dict[str, Any]] = []
+    seen: Dict[str, int] = {}
+    mapping: List[int] = []
+    for stock in stocks:
+        key = _name_key(stock)
+        if key not in seen:
+            seen[key] = len(unique)
+            unique.append(stock)
+        mapping.append(seen[key])
+    return unique, mapping
+
+
+def enrich_webhook_stocks(
+    stocks: List[Dict[str, Any]],
+    enrich_one: Callable[[Dict[str, Any]], Dict[str, Any]],
+    *,
+    max_workers: Optional[int] = None,
+    timer: Optional[StageTimer] = None,
+) -> List[Dict[str, Any]]:
+    """Run ``enrich_one`` over the alert's stocks concurrently; one result per input row, same order."""
+    if not stocks:
+        if timer is not None:
+            timer.lap("enrich")
+        return []
+    unique, mapping = dedupe_stocks(stocks)
+    workers = max(1, min(int(max_workers or ENRICH_WORKERS), len(unique)))
+    if workers == 1:
+        results = [enrich_one(s) for s in unique]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webhook-enrich") as pool:
+            results = list(pool.map(enrich_one, unique))
+    out: List[Dict[str, Any]] = []
+    used = set()
+    for stock, j in zip(stocks, mapping):
+        if j in used:
+            row = dict(results[j])
+            row["trigger_price"] = stock.get("trigger_price", row.get("trigger_price"))
+        else:
+            row = results[j]
+            used.add(j)
+        out.append(row)
+    if timer is not None:
+        dt = timer.lap("enrich")
+        logger.info(
+            "webhook enrichment: %d stocks (%d unique) in %.0f ms with %d workers",
+            len(stocks),
+            len(unique),
+            dt * 1e3,
+            workers,
+        )
+    return out
+
+
+# --- payload archive (replay input) -------------------------------------------------
+
+
+def archive_webhook_payload(
+    payload: Dict[str, Any], forced_type: Optional[str], directory: Optional[Path] = None
+) -> Optional[Path]:
+    """Append the raw payload to today's JSONL archive; never raises."""
+    try:
+        now = datetime.now(IST)
+        d = Path(directory or ARCHIVE_DIR)
+        d.mkdir(parents=True, exist_ok=True)
+        path = d / f"{now.strftime('%Y-%m-%d')}.jsonl"
+        line = json.dumps(
+            {"received_at": now.isoformat(), "forced_type": forced_type, "payload": payload}, default=str
+        )
+        with _archive_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        return path
+    except Exception as e:
+        logger.warning("webhook payload archive failed: %s", e)
+        return None
+
+
+def iter_archived_payloads(path: Path) -> Iterator[Dict[str, Any]]:
+    """Entries (``received_at``, ``forced_type``, ``payload``) from an archive file, oldest first."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,92 @@
+"""Pandas-free ADX must reproduce pandas_ta.adx (TradingView-style Wilder DI/ADX)."""
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services import indicator_kernels as ik
+from backend.services.iron_condor_service import _universe_adx_last
+from backend.services.smart_futures_picker.indicators import adx_last_two, adx_value
+from backend.test_indicator_kernels import _bars
+
+
+def _ref_adx(h, l, c, length=14, lensig=None):
+    """``pandas_ta.adx`` 0.3.14b0 (drift=1, scalar=100, mamode="rma"), written out with pandas."""
+    lensig = lensig or length
+    eps = sys.float_info.epsilon
+    h, l, c = (pd.Series(x, dtype=float) for x in (h, l, c))
+    hl = h - l
+    if (hl == 0).any():
+        hl = hl + eps
+    pc = c.shift(1)
+    tr = pd.concat([hl.abs(), (h - pc).abs(), (pc - l).abs()], axis=1).max(axis=1)
+    tr.iloc[:1] = np.nan
+
+    def rma(s, n):
+        return s.ewm(alpha=1.0 / n, min_periods=n).mean()
+
+    up = h - h.shift(1)
+    dn = l.shift(1) - l
+    pos = (((up > dn) & (up > 0)) * up).apply(lambda x: 0 if abs(x) < eps else x)
+    neg = (((dn > up) & (dn > 0)) * dn).apply(lambda x: 0 if abs(x) < eps else x)
+    k = 100 / rma(tr, length)
+    dmp = k * rma(pos, length)
+    dmn = k * rma(neg, length)
+    dx = 100 * (dmp - dmn).abs() / (dmp + dmn)
+    return rma(dx, lensig), dmp, dmn
+
+
+def _none(s):
+    return [None if x != x else float(x) for x in s]
+
+
+def test_series_matches_pandas_ta_formula():
+    for seed in range(6):
+        h, l, c, _ = _bars(220, seed, flat_every=13 if seed % 2 else 0)
+        for length, lensig in ((14, None), (10, 10), (7, 12)):
+            got = ik.adx_series(h, l, c, length, lensig)
+            for g, r in zip(got, _ref_adx(h, l, c, length, lensig)):
+                assert g == pytest.approx(_none(r), rel=1e-12, nan_ok=False)
+    flat = [100.0] * 40
+    assert ik.adx_series(flat, flat, flat, 14)[0] == _none(_ref_adx(flat, flat, flat, 14)[0])
+    assert ik.adx_series([], [], [], 14) == ([], [], [])
+
+
+def test_matches_pandas_ta_when_installed():
+    ta = pytest.importorskip("pandas_ta")
+    h, l, c, _ = _bars(200, 4)
+    df = ta.adx(pd.Series(h), pd.Series(l), pd.Series(c), length=14, lensig=14)
+    adx, dmp, dmn = ik.adx_series(h, l, c, 14)
+    assert adx == pytest.approx(_none(df["ADX_14"]), rel=1e-9)
+    assert dmp == pytest.approx(_none(df["DMP_14"]), rel=1e-9)
+    assert dmn == pytest.approx(_none(df["DMN_14"]), rel=1e-9)
+
+
+def test_batch_rows_match_scalar_including_ragged_histories():
+    rows = [_bars(180 - 25 * s, s, flat_every=11 if s == 2 else 0) for s in range(5)]
+    H, L, C = (ik.pad_left([r[k] for r in rows]) for k in range(3))
+    adx_b, dmp_b, dmn_b = ik.adx_batch(H, L, C, 14)
+    for i, (h, l, c, _) in enumerate(rows):
+        off = H.shape[1] - len(c)
+        adx, dmp, dmn = ik.adx_series(h, l, c, 14)
+        assert _none(adx_b[i, off:]) == adx
+        assert _none(dmp_b[i, off:]) == dmp
+        assert _none(dmn_b[i, off:]) == dmn
+        assert np.isnan(adx_b[i, :off]).all()
+
+
+def test_picker_wrappers_and_universe_batch():
+    h, l, c, _ = _bars(80, 9)
+    ref = _ref_adx(h, l, c, 10)[0].dropna()
+    assert adx_value(h, l, c, 10) == float(ref.iloc[-1])
+    assert adx_last_two(h, l, c, 10) == (float(ref.iloc[-1]), float(ref.iloc[-2]))
+    assert ik.adx_last_two(h, l, c, 10) == adx_last_two(h, l, c, 10)
+    assert adx_value(h[:29], l[:29], c[:29], 10) is None
+    assert adx_last_two(h[:31], l[:31], c[:31], 10) == (None, None)
+
+    short = _bars(20, 1)[:3]
+    got = _universe_adx_last({"A": (h, l, c), "B": tuple(x[10:] for x in (h, l, c)), "C": short, "D": None}, 10)
+    assert got["A"] == adx_value(h, l, c, 10)
+    assert got["B"] == adx_value(h[10:], l[10:], c[10:], 10)
+    assert got["C"] is None and got["D"] is None
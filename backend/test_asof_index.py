@@ -0,0 +1,83 @@
+"""As-of index: searchsorted lookups vs brute-force scans, and the backtest helpers built on it."""
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from backend.services.asof_index import NS_PER_MIN, AsOfIndex, ist_ns, to_epoch_ns
+
+IST = pytz.timezone("Asia/Kolkata")
+
+
+def _brute_asof(ts, q, same_session, lookback):
+    best = None
+    for k, t in enumerate(ts):
+        if t > q or (same_session and (t + 19800 * 10**9) // 86400_000_000_000 != (q + 19800 * 10**9) // 86400_000_000_000):
+            continue
+        if lookback is not None and q - t > lookback:
+            continue
+        if best is None or t >= ts[best]:
+            best = k
+    return best
+
+
+def test_asof_positions_match_brute_force():
+    rnd = random.Random(5)
+    base = ist_ns(date(2026, 7, 1), 9, 15)
+    ts = [base + rnd.randrange(0, 3 * 86400) * 10**9 for _ in range(300)]
+    idx = AsOfIndex(ts)
+    queries = np.array([base + rnd.randrange(-3600, 4 * 86400) * 10**9 for _ in range(500)], dtype=np.int64)
+    for same_session, lookback in ((False, None), (True, None), (True, 20 * NS_PER_MIN)):
+        got = idx.asof_positions(queries, same_session=same_session, max_lookback_ns=lookback)
+        for q, p in zip(queries, got):
+            want = _brute_asof(ts, int(q), same_session, lookback)
+            assert (p == -1) if want is None else ts[idx.source(p)] == ts[want]
+
+
+def test_parsing_and_sessions():
+    assert to_epoch_ns("2026-07-01T09:15:00+05:30") == to_epoch_ns(datetime(2026, 7, 1, 9, 15)) == ist_ns(date(2026, 7, 1), 9, 15)
+    assert to_epoch_ns(IST.localize(datetime(2026, 7, 1, 9, 15))) == ist_ns(date(2026, 7, 1), 9, 15)
+    assert to_epoch_ns("garbage") is None
+    stamps = ["2026-07-01T15:15:00+05:30", "bad", "2026-07-02T09:15:00+05:30", "2026-07-01T09:15:00+05:30"]
+    idx = AsOfIndex.from_wall_clock(stamps)
+    assert len(idx) == 3 and [idx.source(p) for p in range(3)] == [3, 0, 2]
+    lo, hi = idx.session_range(date(2026, 7, 1), upto_ns=ist_ns(date(2026, 7, 1), 12, 0))
+    assert [stamps[idx.source(p)] for p in range(lo, hi)] == ["2026-07-01T09:15:00+05:30"]
+    assert idx.at_or_after(ist_ns(date(2026, 7, 1), 15, 20), same_session=True) == -1
+
+
+def test_nifty_lookup_forward_fills_like_the_scan():
+    from backtest.engine_v2 import _lookup_nifty, nifty_asof_join
+
+    rnd = random.Random(2)
+    stamps = pd.date_range("2026-07-01 09:15", periods=200, freq="15min", tz="Asia/Kolkata")
+    closes = {t: 100.0 + k for k, t in enumerate(stamps) if rnd.random() > 0.3}
+    vwaps = {t: 99.0 + k for k, t in enumerate(stamps) if t in closes and rnd.random() > 0.1}
+    for t in stamps:
+        earlier = [k for k in closes if k <= t and k.date() == t.date()] or [k for k in closes if k <= t]
+        want = (closes[max(earlier)], vwaps.get(max(earlier))) if earlier else (None, None)
+        assert _lookup_nifty(t.to_pydatetime(), closes, vwaps) == want
+    c, v = nifty_asof_join(np.array([t.value for t in stamps], dtype=np.int64), closes, vwaps)
+    for k, t in enumerate(stamps):
+        want = _lookup_nifty(t.to_pydatetime(), closes, vwaps)
+        assert (np.isnan(c[k]) and want[0] is None) or c[k] == want[0]
+        assert (np.isnan(v[k]) and want[1] is None) or v[k] == want[1]
+
+
+def test_futures_backtester_candle_finders():
+    import futures_backtester as fb
+
+    d = date(2026, 7, 1)
+    t0 = datetime(2026, 7, 1, 9, 15)
+    candles = [{"timestamp": (t0 + timedelta(minutes=m)).strftime("%Y-%m-%dT%H:%M:%S+05:30"), "m": m} for m in (0, 1, 5, 20, 371)]
+    candles.insert(2, {"timestamp": "2026-06-30T15:29:00+05:30", "m": -1})
+    assert fb.find_candle(candles, d, 9, 20)["m"] == 5
+    assert fb.find_candle(candles, d, 9, 21) is None
+    assert fb.find_candle_at_or_after(candles, d, 9, 17, max_delay_min=20)["m"] == 5
+    assert fb.find_candle_at_or_after(candles, d, 9, 40, max_delay_min=20) is None
+    assert fb.find_candle_at_or_before(candles, d, 15, 30, max_lookback_min=20)["m"] == 371
+    assert fb.find_candle_at_or_before(candles, d, 9, 14, max_lookback_min=20) is None  # previous session excluded
+    assert fb.find_candle_at_or_before(candles, d, 9, 50, max_lookback_min=20)["m"] == 20
+    assert fb.find_candle_at_or_before(candles, d, 10, 0, max_lookback_min=20) is None
@@ -106,3 +106,205 @@ def test_invalidate_drops_entry():
     c.put("NSE_FO|1", "minutes/5", "2026-06-30", "2026-06-30", _candles(["2026-06-30"]))
     assert c.invalidate("NSE_FO|1", "minutes/5") is True
     assert c.get_recent("NSE_FO|1", "minutes/5", max_age_sec=60) is None
+
+
+def _fetch_n_threads(c, n, fetch, from_date="2026-06-29"):
+    import threading
+
+    barrier = threading.Barrier(n)
+    results, errors = [None] * n, [None] * n
+
+    def reader(i):
+        barrier.wait()
+        try:
+            results[i] = c.get_or_fetch(
+                "NSE_FO|1", "minutes/5", from_date, 60, fetch, span_from="2026-06-24", span_to="2026-06-30"
+            )
+        except Exception as e:  # noqa: BLE001
+            errors[i] = e
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_single_flight_n_threads_one_fetch():
+    import time
+
+    c = _reset()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return _candles(["2026-06-24", "2026-06-29", "2026-06-30"])
+
+    results, errors = _fetch_n_threads(c, 16, fetch)
+    assert len(calls) == 1
+    assert errors == [None] * 16
+    assert all([x["timestamp"][:10] for x in r] == ["2026-06-29", "2026-06-30"] for r in results)
+    st = c.stats()
+    assert st["coalesced_waits"] == 15 and st["saved_requests"] == 15 and st["inflight"] == 0
+    # The leader stored the full span; the next reader is a plain hit.
+    assert c.get("NSE_FO|1", "minutes/5", "2026-06-24", max_age_sec=60) is not None
+
+
+def test_single_flight_shares_failure():
+    import time
+
+    c = _reset()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        raise RuntimeError("429")
+
+    results, errors = _fetch_n_threads(c, 8, fetch)
+    assert len(calls) == 1
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert c.stats()["inflight"] == 0
+    # The failure is not cached: the next miss fetches again.
+    c.get_or_fetch("NSE_FO|1", "minutes/5", "2026-06-29", 60, lambda: _candles(["2026-06-30"]),
+                   span_from="2026-06-29", span_to="2026-06-30")
+    assert c.get_recent("NSE_FO|1", "minutes/5", max_age_sec=60) is not None
+
+
+def test_single_flight_wait_timeout_falls_back_to_own_fetch():
+    import threading
+    import time
+
+    c = _reset()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append("leader")
+        release.wait(2)
+        return _candles(["2026-06-30"])
+
+    leader = threading.Thread(
+        target=c.get_or_fetch,
+        args=("NSE_FO|1", "minutes/5", "2026-06-30", 60, slow),
+        kwargs={"span_from": "2026-06-30", "span_to": "2026-06-30"},
+    )
+    leader.start()
+    time.sleep(0.05)
+    out = c.get_or_fetch(
+        "NSE_FO|1", "minutes/5", "2026-06-30", 60, lambda: calls.append("own") or _candles(["2026-06-30"]),
+        span_from="2026-06-30", span_to="2026-06-30", wait_timeout_sec=0.05,
+    )
+    release.set()
+    leader.join()
+    assert out and calls == ["leader", "own"]
+    assert c.stats()["wait_timeouts"] == 1
+
+
+def _one_minute_bars(day, n, start_close=100.0):
+    from datetime import datetime, timedelta
+
+    t0 = datetime.strptime(f"{day} 09:15", "%Y-%m-%d %H:%M")
+    return [
+        {
+            "timestamp": (t0 + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:00+05:30"),
+            "open": start_close + i,
+            "high": start_close + i + 1,
+            "low": start_close + i - 1,
+            "close": start_close + i + 0.5,
+            "volume": 100.0 + i,
+        }
+        for i in range(n)
+    ]
+
+
+def test_higher_timeframes_derive_from_one_shared_1m_series(monkeypatch):
+    from datetime import datetime, timedelta
+
+    import pytz
+
+    from backend.services import upstox_service as us
+
+    c = _reset()
+    now = datetime.now(pytz.timezone("Asia/Kolkata"))
+    yday, today = (now - timedelta(days=1)).strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d")
+    hist, intra = _one_minute_bars(yday, 60), _one_minute_bars(today, 30, 200.0)
+    calls = []
+    svc = us.UpstoxService(api_key="", api_secret="", access_token="t")
+    monkeypatch.setattr(svc, "_fetch_historical_v2_candles", lambda *a: calls.append(("v2",) + a[1:2]) or list(hist))
+    monkeypatch.setattr(svc, "_fetch_intraday_candles_v3", lambda *a: calls.append(("intraday", a[1])) or list(intra))
+    monkeypatch.setattr(svc, "_fetch_historical_v3_candles", lambda *a: calls.append(("v3",)) or None)
+
+    got = {iv: svc.get_historical_candles_by_instrument_key("NSE_FO|1", iv, days_back=5) for iv in
+           ("minutes/5", "minutes/15", "minutes/30", "minutes/1")}
+
+    assert calls == [("v2", "1minute"), ("intraday", "minutes/1")]
+    base = hist + intra
+    for iv, n in (("minutes/5", 5), ("minutes/15", 15), ("minutes/30", 30)):
+        assert got[iv] == us._aggregate_1m_to_n_minute(base, n)
+    assert got["minutes/1"] == base
+    assert c.stats()["derived_builds"] == 3
+    # A second 5m reader after the 5m entry is dropped re-derives from the memo, no REST.
+    c.invalidate("NSE_FO|1", "minutes/5")
+    assert svc.get_historical_candles_by_instrument_key("NSE_FO|1", "minutes/5", days_back=5) == got["minutes/5"]
+    assert len(calls) == 2 and c.stats()["derived_hits"] == 1
+
+
+def test_stale_while_revalidate_serves_now_and_refreshes_once():
+    import threading
+    import time
+
+    c = _reset()
+    c.put("NSE_FO|1", "minutes/5", "2026-06-29", "2026-06-30", _candles(["2026-06-29", "2026-06-30"]))
+    c._CACHE[("NSE_FO|1", "minutes/5")].fetched -= 90  # 30 s past a 60 s TTL
+    release, calls = threading.Event(), []
+
+    def slow_fetch():
+        calls.append(threading.current_thread().name)
+        release.wait(2)
+        return _candles(["2026-06-29", "2026-06-30", "2026-07-01"])
+
+    stale_flags = []
+
+    def reader():
+        out = c.get_or_fetch("NSE_FO|1", "minutes/5", "2026-06-29", 60, slow_fetch,
+                             span_from="2026-06-29", span_to="2026-07-01", stale_sec=120)
+        stale_flags.append((len(out), c.last_read_stale()))
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=reader) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.perf_counter() - t0 < 0.5  # nobody waited on the refresh
+    assert stale_flags == [(2, True)] * 8
+    release.set()
+    for _ in range(100):
+        if c.stats()["inflight"] == 0:
+            break
+        time.sleep(0.01)
+    assert len(calls) == 1 and calls[0].startswith("candle-swr")
+    st = c.stats()
+    assert st["stale_served"] == 8 and st["refreshes_queued"] == 1 and st["refresh_failures"] == 0
+    assert st["read_age_sec"]["<=120"] == 8
+    r = c.read("NSE_FO|1", "minutes/5", "2026-06-29", 60)
+    assert len(r.candles) == 3 and not r.stale and r.age_sec < 60
+    # Beyond TTL + stale window the reader fetches synchronously again.
+    c._CACHE[("NSE_FO|1", "minutes/5")].fetched -= 600
+    out = c.get_or_fetch("NSE_FO|1", "minutes/5", "2026-06-29", 60, lambda: _candles(["2026-07-02"]),
+                         span_from="2026-06-29", span_to="2026-07-02", stale_sec=120)
+    assert [x["timestamp"][:10] for x in out] == ["2026-07-02"] and not c.last_read_stale()
+
+
+def test_derive_memo_rows_are_not_shared_with_callers():
+    c = _reset()
+    base = _candles(["2026-06-29", "2026-06-30"])
+    first = c.derive("NSE_FO|1", "minutes/5", base, lambda b: [dict(r) for r in b])
+    first[0]["close"] = -1.0  # a caller mutating its bars
+    second = c.derive("NSE_FO|1", "minutes/5", base, lambda b: [dict(r) for r in b])
+    assert c.stats()["derived_hits"] == 1 and second[0]["close"] == 100.0
+    second[1]["close"] = -2.0
+    assert c.derive("NSE_FO|1", "minutes/5", base, lambda b: [])[1]["close"] == 100.0
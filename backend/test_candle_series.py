@@ -0,0 +1,96 @@
+"""Columnar candle series: lossless dict view, zero-copy date slicing, cache + RS scanner parity."""
+import importlib
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from backend.services.market_data import candle_cache as cc
+from backend.services.market_data.candle_series import CandleSeries
+
+IST = pytz.timezone("Asia/Kolkata")
+
+
+def _session_rows(days_back: int = 5, seed: int = 1, now: datetime = None):
+    """Oldest-first 5m bars for the last ``days_back`` calendar days up to ``now``."""
+    now = now or datetime.now(IST)
+    rnd = random.Random(seed)
+    px, rows = 500.0, []
+    for d in range(days_back, -1, -1):
+        day = (now - timedelta(days=d)).date()
+        for i in range(75):
+            t = IST.localize(datetime(day.year, day.month, day.day, 9, 15) + timedelta(minutes=5 * i))
+            if t > now - timedelta(minutes=5):
+                break
+            o = px
+            px *= 1 + rnd.gauss(0, 0.003)
+            rows.append(
+                {
+                    "timestamp": t.isoformat(),
+                    "open": o,
+                    "high": max(o, px) + 1,
+                    "low": min(o, px) - 1,
+                    "close": px,
+                    "volume": float(rnd.randint(500, 5000)),
+                    "oi": float(rnd.randint(10**5, 10**6)),
+                }
+            )
+    return rows
+
+
+def test_roundtrip_and_filter_parity_for_any_row_order():
+    rows = _session_rows(now=IST.localize(datetime(2026, 10, 16, 15, 30)))
+    rows[3] = {k: v for k, v in rows[3].items() if k != "oi"}  # heterogeneous keys survive
+    shuffled = random.Random(3).sample(rows, len(rows))
+    for src in (rows, rows[::-1], shuffled):
+        s = CandleSeries.from_dicts(src)
+        assert s.to_dicts() == src
+        assert s.tip_timestamp() == cc.tip_timestamp(src)
+        for d in ("2026-10-10", "2026-10-14", "2026-10-16", "2026-10-17", ""):
+            assert s.since_date(d).to_dicts() == cc.filter_from(src, d)
+        assert s.sorted().to_dicts() == sorted(src, key=lambda c: c["timestamp"])
+
+
+def test_date_slices_are_views():
+    s = CandleSeries.from_dicts(_session_rows(now=IST.localize(datetime(2026, 10, 16, 15, 30))))
+    for src in (s, s[::-1]):
+        part = src.since_date("2026-10-15")
+        assert 0 < len(part) < len(src)
+        assert np.shares_memory(part.values, s.values) and np.shares_memory(part.ts, s.ts)
+    t0 = int(IST.localize(datetime(2026, 10, 16, 10, 0)).timestamp())
+    hour = s.between(t0, t0 + 3600)
+    assert len(hour) == 12 and hour[0]["timestamp"].startswith("2026-10-16T10:00")
+
+
+def test_cache_stores_series_and_serves_legacy_dicts():
+    c = importlib.reload(cc)
+    rows = _session_rows(now=IST.localize(datetime(2026, 10, 16, 15, 30)))
+    c.put("NSE_FO|1", "minutes/5", "2026-10-11", "2026-10-16", rows)
+    assert isinstance(c._CACHE[("NSE_FO|1", "minutes/5")].candles, CandleSeries)
+    assert c.get_recent("NSE_FO|1", "minutes/5", 60) == rows
+    assert c.get("NSE_FO|1", "minutes/5", "2026-10-15", 60) == c.filter_from(rows, "2026-10-15")
+    series = c.get_series("NSE_FO|1", "minutes/5", "2026-10-15", 60)
+    assert series.close.tolist() == [r["close"] for r in c.filter_from(rows, "2026-10-15")]
+    # Rows the columnar form cannot hold are kept as a plain list.
+    odd = [{"timestamp": "2026-10-16T09:15:00+05:30", "close": 1.0, "bar_end": "x"}]
+    c.put("NSE_FO|2", "minutes/5", "2026-10-16", "2026-10-16", odd)
+    assert c.get_recent("NSE_FO|2", "minutes/5", 60) == odd
+    assert c.get_recent_series("NSE_FO|2", "minutes/5", 60) is None
+
+
+def test_rs_scanner_metrics_identical_from_series_and_dicts(monkeypatch):
+    from backend.services import relative_strength_scanner as rs
+
+    c = importlib.reload(cc)
+    monkeypatch.setattr(rs, "candle_cache", c)
+    c.put("NSE_FO|X", "minutes/5", "2026-01-01", "2026-12-31", _session_rows()[::-1])
+    entry = {"instrument_key": "NSE_FO|X", "stock": "XYZ"}
+    from_series = rs._compute_symbol_metrics(None, entry, 0.1, cache_only=True)
+    monkeypatch.setattr(c, "get_recent_series", lambda *a, **k: None)
+    from_dicts = rs._compute_symbol_metrics(None, entry, 0.1, cache_only=True)
+    assert from_series[0] is not None and from_series == from_dicts
+    deferred, _ = rs._compute_symbol_metrics(None, entry, 0.1, cache_only=True, defer_kavach=True)
+    assert deferred["kavach_state"] is None
+    rs._apply_kavach([deferred])
+    assert deferred == from_dicts[0]
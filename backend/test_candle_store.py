@@ -0,0 +1,109 @@
+"""Shared on-disk candle store: partitions, memory-mapped reads, gap detection and fetch planning."""
+from datetime import date, datetime, timedelta
+
+import pytz
+
+from backend.services.market_data import candle_store
+from backend.services.market_data.candle_store import CandleStore, historical_candles
+from backend.services.trading_calendar import TradingCalendar
+
+IST = pytz.timezone("Asia/Kolkata")
+CAL = TradingCalendar(known={2026: ["2026-08-15"]}, use_db=False)
+NOW = datetime(2026, 9, 1, 12, 0)
+IK = "NSE_FO|12345"
+
+
+def _bars(days, *, px=100.0, n=4):
+    out = []
+    for d in days:
+        for i in range(n):
+            t = IST.localize(datetime(d.year, d.month, d.day, 9, 15) + timedelta(minutes=15 * i))
+            out.append({"timestamp": t.isoformat(), "open": px, "high": px + 1, "low": px - 1, "close": px + i, "volume": 10.0 * i})
+    return out
+
+
+class _Fetcher:
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+
+    def __call__(self, ik, interval, a, b):
+        self.calls.append((a, b))
+        if a in self.fail:
+            return None
+        return _bars(d for d in CAL.trading_days(a, b) if d != date(2026, 7, 10))[::-1]  # 07-10: no bars
+
+
+def test_append_read_roundtrip_across_months(tmp_path):
+    st = CandleStore(tmp_path, calendar=CAL)
+    rows = _bars([date(2026, 6, 30), date(2026, 7, 1)])
+    assert st.append(IK, "minutes/15", rows[::-1] + [{"timestamp": "junk"}], [date(2026, 6, 30), date(2026, 7, 1)]) == 8
+    assert sorted(p.name for p in st.series_dir(IK, "minutes/15").iterdir()) == ["2026-06.npz", "2026-07.npz"]
+    assert st.candles(IK, "minutes/15", date(2026, 6, 1), date(2026, 7, 31)) == rows
+    one = st.read(IK, "minutes/15", date(2026, 7, 1), date(2026, 7, 1))
+    assert not one.close.flags.owndata and not one.close.flags.writeable and one.to_dicts() == rows[4:]
+    # refetched bar replaces the stored one; others untouched
+    st.append(IK, "minutes/15", [{**rows[5], "close": 555.0}])
+    got = st.candles(IK, "minutes/15", date(2026, 7, 1), date(2026, 7, 1))
+    assert len(got) == 4 and got[1]["close"] == 555.0 and got[2] == rows[6]
+    assert st.covered_sessions(IK, "minutes/15", date(2026, 6, 1), date(2026, 7, 31)) == [date(2026, 6, 30), date(2026, 7, 1)]
+
+
+def test_ensure_fetches_only_gaps(tmp_path):
+    st = CandleStore(tmp_path, calendar=CAL)
+    fetch = _Fetcher()
+    series, ok = st.ensure(IK, "minutes/15", date(2026, 7, 6), date(2026, 7, 17), fetch, now=NOW)
+    assert ok and fetch.calls == [(date(2026, 7, 6), date(2026, 7, 17))]
+    assert len(series) == 9 * 4  # 07-10 fetched but empty
+    series, ok = st.ensure(IK, "minutes/15", date(2026, 7, 1), date(2026, 7, 24), fetch, now=NOW)
+    assert ok and fetch.calls[1:] == [(date(2026, 7, 1), date(2026, 7, 3)), (date(2026, 7, 20), date(2026, 7, 24))]
+    assert st.missing_sessions(IK, "minutes/15", date(2026, 7, 1), date(2026, 7, 24), now=NOW) == []
+    st.ensure(IK, "minutes/15", date(2026, 7, 8), date(2026, 7, 22), fetch, now=NOW)
+    assert len(fetch.calls) == 3 and st.stats["store_hits"] == 1
+
+
+def test_failed_fetch_and_unfinished_session_stay_missing(tmp_path):
+    st = CandleStore(tmp_path, calendar=CAL)
+    fetch = _Fetcher(fail={date(2026, 8, 3)})
+    _, ok = st.ensure(IK, "days/1", date(2026, 8, 3), date(2026, 8, 7), fetch, now=NOW)
+    assert not ok and st.missing_sessions(IK, "days/1", date(2026, 8, 3), date(2026, 8, 7), now=NOW) == CAL.trading_days(
+        date(2026, 8, 3), date(2026, 8, 7)
+    )
+    intraday = datetime(2026, 8, 20, 11, 0)
+    st.ensure(IK, "minutes/5", date(2026, 8, 17), date(2026, 8, 20), _Fetcher(), now=intraday)
+    assert st.missing_sessions(IK, "minutes/5", date(2026, 8, 17), date(2026, 8, 20), now=intraday) == []
+    assert st.missing_sessions(IK, "minutes/5", date(2026, 8, 17), date(2026, 8, 20), now=NOW) == [date(2026, 8, 20)]
+
+
+def test_plan_fetches_span_cap_and_bridge(tmp_path):
+    st = CandleStore(tmp_path, calendar=CAL)
+    july = CAL.trading_days(date(2026, 7, 1), date(2026, 8, 31))
+    assert st.plan_fetches(july, "minutes/15") == [(date(2026, 7, 1), date(2026, 7, 31)), (date(2026, 8, 3), date(2026, 8, 31))]
+    assert st.plan_fetches(july, "days/1") == [(date(2026, 7, 1), date(2026, 8, 31))]
+    holed = [d for d in july if d not in (date(2026, 7, 8), date(2026, 7, 20), date(2026, 7, 21))]
+    assert len(st.plan_fetches(holed, "days/1")) == 3
+    assert len(st.plan_fetches(holed, "days/1", bridge_sessions=1)) == 2
+    assert st.plan_fetches(holed, "days/1", bridge_sessions=2) == [(date(2026, 7, 1), date(2026, 8, 31))]
+
+
+def test_historical_candles_serves_past_windows_from_store(tmp_path, monkeypatch):
+    st = CandleStore(tmp_path, calendar=CAL)
+    monkeypatch.setattr(candle_store, "_store", st)
+    monkeypatch.setattr(st, "last_complete_session", lambda now=None: date(2026, 8, 31))
+
+    class _Ux:
+        calls = []
+
+        def get_historical_candles_by_instrument_key(self, ik, interval="hours/1", days_back=2, *, range_end_date=None):
+            self.calls.append((interval, days_back, range_end_date))
+            end = range_end_date or date(2026, 9, 1)
+            return _bars(CAL.trading_days(end - timedelta(days=days_back), end))[::-1]
+
+    ux = _Ux()
+    first = historical_candles(ux, IK, "minutes/5", 120, range_end_date=date(2026, 8, 14))
+    again = historical_candles(ux, IK, "minutes/5", 10, range_end_date=date(2026, 8, 14))
+    assert ux.calls == [("minutes/5", 31, date(2026, 8, 14))]  # clamped like Upstox; second call from disk
+    assert first[0]["timestamp"].startswith("2026-07-14") and first[-1]["timestamp"].startswith("2026-08-14")
+    assert again == [c for c in first if c["timestamp"][:10] >= "2026-08-04"]
+    historical_candles(ux, IK, "minutes/5", 2)
+    assert ux.calls[-1] == ("minutes/5", 2, None)  # live path untouched
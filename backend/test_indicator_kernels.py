@@ -0,0 +1,175 @@
+"""Single-pass indicator kernels must reproduce the old per-bar implementations bit-for-bit."""
+import random
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.services import indicator_kernels as ik
+from backend.services.btst_backtest import indicators as btst_ind
+from backend.services.open_low_15m import indicators as ol_ind
+from backend.services.smart_futures_exit import _ema_last, _supertrend_dir_last_two
+from backend.services.smart_futures_picker.indicators import session_vwap, wilder_atr
+from backend.services.vajra import indicators as vajra_ind
+
+
+def _bars(n: int, seed: int, flat_every: int = 0) -> Tuple[List[float], List[float], List[float], List[float]]:
+    rnd = random.Random(seed)
+    px = 100.0 + rnd.random() * 900
+    h, l, c, v = [], [], [], []
+    for i in range(n):
+        if flat_every and i % flat_every == 0:
+            bar = (px, px, px, 0.0)
+        else:
+            o = px
+            px = max(1.0, px * (1.0 + rnd.gauss(0, 0.004)))
+            hi = max(o, px) * (1 + rnd.random() * 0.002)
+            lo = min(o, px) * (1 - rnd.random() * 0.002)
+            bar = (round(hi, 2), round(lo, 2), round(px, 2), float(rnd.randint(0, 50_000)))
+        for col, x in zip((h, l, c, v), bar):
+            col.append(x)
+    return h, l, c, v
+
+
+# --- reference implementations (the pre-kernel code, kept verbatim) -------------
+
+
+def _ref_exit_st_dirs(highs, lows, closes, period=10, multiplier=3.0):
+    n = len(closes)
+    fub = [0.0] * n
+    flb = [0.0] * n
+    st = [0.0] * n
+    direction = [1] * n
+    for i in range(n):
+        atr_i = wilder_atr(highs[: i + 1], lows[: i + 1], closes[: i + 1], period)
+        if atr_i is None:
+            continue
+        hl2 = (float(highs[i]) + float(lows[i])) / 2.0
+        bub = hl2 + float(multiplier) * float(atr_i)
+        blb = hl2 - float(multiplier) * float(atr_i)
+        if i == 0:
+            fub[i], flb[i], st[i], direction[i] = bub, blb, blb, 1
+            continue
+        fub[i] = bub if (bub < fub[i - 1] or float(closes[i - 1]) > fub[i - 1]) else fub[i - 1]
+        flb[i] = blb if (blb > flb[i - 1] or float(closes[i - 1]) < flb[i - 1]) else flb[i - 1]
+        if st[i - 1] == fub[i - 1]:
+            st[i] = fub[i] if float(closes[i]) <= fub[i] else flb[i]
+        else:
+            st[i] = flb[i] if float(closes[i]) >= flb[i] else fub[i]
+        direction[i] = 1 if float(closes[i]) >= st[i] else -1
+    return st, direction
+
+
+def _ref_btst_st(highs, lows, closes, period=10, multiplier=3.0):
+    n = len(closes)
+    st: List[float] = []
+    direction: List[int] = []
+    fub = 0.0
+    flb = 0.0
+    for i in range(n):
+        atr_i = wilder_atr(highs[: i + 1], lows[: i + 1], closes[: i + 1], period)
+        if atr_i is None:
+            continue
+        hl2 = (float(highs[i]) + float(lows[i])) / 2.0
+        bub = hl2 + float(multiplier) * float(atr_i)
+        blb = hl2 - float(multiplier) * float(atr_i)
+        if not st:
+            fub, flb = bub, blb
+            st.append(blb)
+            direction.append(1)
+            continue
+        fub = bub if (bub < fub or float(closes[i - 1]) > fub) else fub
+        flb = blb if (blb > flb or float(closes[i - 1]) < flb) else flb
+        prev_st = st[-1]
+        if prev_st == fub:
+            cur = fub if float(closes[i]) <= fub else flb
+        else:
+            cur = flb if float(closes[i]) >= flb else fub
+        st.append(cur)
+        direction.append(1 if float(closes[i]) >= cur else -1)
+    return st, direction
+
+
+def _ref_wma(values: Sequence[float], period: int) -> Optional[float]:
+    if period < 1 or len(values) < period:
+        return None
+    window = [float(v) for v in values[-period:]]
+    weights = list(range(1, period + 1))
+    return sum(w * v for w, v in zip(weights, window)) / float(sum(weights))
+
+
+def _ref_hma(closes, length):
+    n = len(closes)
+    out: List[float] = []
+    if n < length:
+        return out
+    half = max(1, length // 2)
+    sqrt_n = max(1, int(round(length**0.5)))
+    for i in range(length - 1, n):
+        raw_hist = []
+        for k in range(length - 1, i + 1):
+            s = [float(closes[j]) for j in range(k + 1)]
+            raw_hist.append(2.0 * _ref_wma(s, half) - _ref_wma(s, length))
+        if len(raw_hist) < sqrt_n:
+            continue
+        out.append(_ref_wma(raw_hist, sqrt_n))
+    return out
+
+
+def _ref_vajra_ema(values, period):
+    p = max(1, int(period))
+    k = 2.0 / (p + 1.0)
+    out = []
+    ema_v = float(values[0])
+    for v in values:
+        ema_v = float(v) * k + ema_v * (1.0 - k)
+        out.append(ema_v)
+    return out
+
+
+# --- tests ------------------------------------------------------------------------
+
+
+def test_atr_series_matches_prefix_recompute():
+    for seed in range(5):
+        h, l, c, _ = _bars(120, seed, flat_every=17)
+        for period in (1, 5, 14):
+            series = ik.wilder_atr_series(h, l, c, period)
+            assert series == [wilder_atr(h[: i + 1], l[: i + 1], c[: i + 1], period) for i in range(len(c))]
+
+
+def test_supertrend_matches_exit_and_btst_references():
+    for seed in range(8):
+        h, l, c, _ = _bars(300, seed, flat_every=41 if seed % 2 else 0)
+        for period, mult in ((10, 3.0), (7, 2.0), (14, 1.5)):
+            _, ref_dir = _ref_exit_st_dirs(h, l, c, period, mult)
+            assert _supertrend_dir_last_two(h, l, c, period, mult) == (ref_dir[-1], ref_dir[-2])
+            _, kdir = ik.supertrend_series(h, l, c, period, mult, seed_first_bar=False, compare_prev_band=True)
+            assert kdir[period:] == ref_dir[period:]
+            assert btst_ind.supertrend_series(h, l, c, period, mult) == _ref_btst_st(h, l, c, period, mult)
+    assert _supertrend_dir_last_two([1.0] * 10, [1.0] * 10, [1.0] * 10) == (None, None)
+
+
+def test_supertrend_batch_matches_scalar_rows():
+    rows = [_bars(200, s) for s in range(6)]
+    H, L, C = (np.array([r[k] for r in rows]) for k in range(3))
+    for kw in ({}, {"seed_first_bar": False, "compare_prev_band": True}):
+        st_b, dir_b = ik.supertrend_batch(H, L, C, 10, 3.0, **kw)
+        for r, (h, l, c, _) in enumerate(rows):
+            st, d = ik.supertrend_series(h, l, c, 10, 3.0, **kw)
+            assert [None if np.isnan(x) else float(x) for x in st_b[r]] == st
+            assert [None if x == 0 else int(x) for x in dir_b[r]] == d
+    atr_b = ik.wilder_atr_batch(H, L, C, 14)
+    assert [float(x) for x in atr_b[2, 14:]] == ik.wilder_atr_series(*rows[2][:3], 14)[14:]
+
+
+def test_ema_wma_hma_vwap_match_module_versions():
+    h, l, c, v = _bars(150, 3, flat_every=9)
+    assert vajra_ind.ema_series(c, 9) == _ref_vajra_ema(c, 9)
+    assert ol_ind.ema_series(c, 5)[-1] == _ema_last(c, 5)
+    assert ol_ind.ema_series(c, 0) == [] and ik.ema_series([], 5) == []
+    assert vajra_ind.wma_series(c, 20) == [None] * 19 + [_ref_wma(c[: i + 1], 20) for i in range(19, len(c))]
+    for length in (9, 16, 32):
+        assert btst_ind.hma_series(c[:90], length) == _ref_hma(c[:90], length)
+    assert btst_ind.hma_series(c[:5], 9) == []
+    vw = vajra_ind.cumulative_vwap(h, l, c, v)
+    assert vw[-1] == session_vwap(h, l, c, v)
@@ -0,0 +1,97 @@
+"""Indexed instrument master must return exactly the rows a JSON scan would."""
+import json
+import os
+
+from backend.services import instrument_master as im
+
+_ROWS = [
+    {"segment": "NSE_EQ", "instrument_type": "EQ", "trading_symbol": "RELIANCE", "name": "RELIANCE INDUSTRIES",
+     "isin": "INE002A01018", "instrument_key": "NSE_EQ|INE002A01018", "tick_size": 0.05},
+    {"segment": "NSE_EQ", "instrument_type": "EQ", "trading_symbol": "SBIN", "name": "STATE BANK",
+     "isin": "INE062A01020", "instrument_key": "NSE_EQ|INE062A01020"},
+    {"segment": "NSE_FO", "instrument_type": "FUT", "trading_symbol": "RELIANCE FUT 30 JUN 26",
+     "underlying_symbol": "RELIANCE", "expiry": 1782777599000, "lot_size": 500, "instrument_key": "NSE_FO|1001"},
+    {"segment": "NSE_FO", "instrument_type": "CE", "trading_symbol": "RELIANCE 1500 CE 30 JUN 26",
+     "underlying_symbol": "RELIANCE", "expiry": 1782777599000, "strike_price": 1500.0, "instrument_key": "NSE_FO|1002"},
+    {"segment": "NSE_FO", "instrument_type": "PE", "trading_symbol": "RELIANCE 1512.5 PE 30 JUN 26",
+     "underlying_symbol": "RELIANCE", "expiry": 1782777599000, "strike_price": 1512.5, "instrument_key": "NSE_FO|1003"},
+    {"segment": "NSE_FO", "instrument_type": "FUT", "trading_symbol": "SBIN FUT 30 JUN 26",
+     "underlying_symbol": "SBIN", "expiry": 1782777599000, "lot_size": 750, "instrument_key": "NSE_FO|2001"},
+    "not-a-dict",
+]
+
+
+def _write(tmp_path, rows=_ROWS):
+    p = tmp_path / "nse_instruments.json"
+    p.write_text(json.dumps(rows), encoding="utf-8")
+    return p
+
+
+def test_lookups_match_source_rows(tmp_path):
+    src = _write(tmp_path)
+    m = im.InstrumentMaster(im.build_instrument_master(src))
+    assert len(m) == 6
+    assert m.get("NSE_FO|1002") == _ROWS[3]
+    assert m.get(" NSE_FO|1002 ") == _ROWS[3]
+    assert m.get("NSE_FO|missing") is None
+    assert m.by_trading_symbol("reliance") == [_ROWS[0]]
+    assert m.by_isin("INE062A01020", segment="NSE_EQ") == [_ROWS[1]]
+    assert m.by_underlying("RELIANCE", segment="NSE_FO") == _ROWS[2:5]
+    assert m.by_underlying("RELIANCE", instrument_type="fut") == [_ROWS[2]]
+    assert m.by_segment("NSE_FO", "FUT") == [_ROWS[2], _ROWS[5]]
+    assert m.by_segment("NSE_EQ") == _ROWS[:2]
+    assert m.contract("RELIANCE", "PE", 1782777599000, 1512.5) == [_ROWS[4]]
+    assert m.contract("RELIANCE", "CE", 1782777599000, 1500) == [_ROWS[3]]
+    assert m.contract("RELIANCE", "FUT", 1782777599000) == [_ROWS[2]]
+    assert m.contract("RELIANCE", "CE", 1782777599000, 1600) == []
+    assert list(m.iter_records()) == _ROWS[:6]
+
+
+def test_returned_rows_are_copies(tmp_path):
+    m = im.InstrumentMaster(im.build_instrument_master(_write(tmp_path)))
+    m.get("NSE_FO|1001")["lot_size"] = 1
+    assert m.get("NSE_FO|1001")["lot_size"] == 500
+
+
+def test_many_keys_probe_correctly(tmp_path):
+    rows = [{"segment": "NSE_FO", "instrument_type": "FUT", "instrument_key": f"NSE_FO|{i}",
+             "underlying_symbol": f"U{i % 97}"} for i in range(5000)]
+    m = im.InstrumentMaster(im.build_instrument_master(_write(tmp_path, rows)))
+    for i in range(0, 5000, 37):
+        assert m.get(f"NSE_FO|{i}") == rows[i]
+    assert len(m.by_underlying("U5")) == len([r for r in rows if r["underlying_symbol"] == "U5"])
+
+
+def test_singleton_rebuilds_when_source_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(im, "_RECHECK_SEC", 0.0)
+    src = _write(tmp_path)
+    m1 = im.get_instrument_master(src)
+    assert m1 is not None and im.is_artifact_fresh(src)
+    assert im.get_instrument_master(src) is m1
+
+    _write(tmp_path, _ROWS[:2])
+    st = src.stat()
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert not im.is_artifact_fresh(src)
+    m2 = im.get_instrument_master(src)
+    assert m2 is not m1 and len(m2) == 2
+    assert m2.get("NSE_FO|1001") is None
+
+
+def test_missing_source_returns_none(tmp_path):
+    assert im.get_instrument_master(tmp_path / "absent.json") is None
+
+
+def test_callers_fall_back_to_json_without_master(tmp_path, monkeypatch):
+    import backend.config as config
+    from backend.services import live_trading
+    from backend.services.upstox_service import UpstoxService
+
+    src = _write(tmp_path)
+    monkeypatch.setattr(im, "get_instrument_master", lambda *a, **k: None)
+    monkeypatch.setattr(config, "get_instruments_file_path", lambda: src)
+    assert live_trading._load_instrument_dict_by_key("NSE_FO|1001") == _ROWS[2]
+    assert live_trading._load_instrument_dict_by_key("NSE_FO|404") is None
+    svc = UpstoxService.__new__(UpstoxService)
+    assert svc.get_tick_size_by_instrument_key("NSE_EQ|INE002A01018") == 0.05
+    assert svc.get_tick_size_by_instrument_key("NSE_EQ|INE062A01020") is None
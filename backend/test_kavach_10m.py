@@ -75,3 +75,14 @@ def test_kavach_direction():
     assert kavach_direction("BUY") == "LONG"
     assert kavach_direction("READY SHORT") == "SHORT"
     assert kavach_direction("WATCH") is None
+
+
+def test_aggregate_10m_memo_returns_fresh_copies_and_tracks_tip():
+    day = "2026-07-08"
+    candles = [_bar(day, "09:15", 100), _bar(day, "09:20", 101)]
+    first = aggregate_10m_bars(candles)
+    first[0]["close"] = -1.0  # caller mutation must not leak into the memo
+    assert aggregate_10m_bars(list(candles))[0]["close"] == 101
+    # A revised (still forming) tip bar is a different series.
+    candles[-1] = _bar(day, "09:20", 105)
+    assert aggregate_10m_bars(candles)[0]["close"] == 105
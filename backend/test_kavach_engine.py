@@ -1,4 +1,9 @@
 """Unit tests for the Kavach engine and Relative Strength scoring/ranking."""
+import math
+import random
+
+import numpy as np
+
 from backend.services.kavach_engine import (
     RANKING_BEARISH,
     RANKING_BULLISH,
@@ -6,10 +11,14 @@ from backend.services.kavach_engine import (
     STATE_NEUTRAL,
     STATE_SELL,
     STATE_WATCH,
+    KavachBatch,
     KavachInput,
     adx_score,
     compute_trade_score,
     evaluate_kavach,
+    evaluate_kavach_batch,
+    trade_score_batch,
+    trade_score_breakdown,
     kavach_score,
     relative_strength_score,
     volume_ratio_score,
@@ -112,3 +121,73 @@ def test_bearish_trade_score_is_meaningful():
         ranking_type=RANKING_BEARISH,
     )
     assert score == 100
+
+
+def _pick(rnd, edges):
+    """Threshold values, their neighbours, NaN or a random draw — ties are where masks drift."""
+    r = rnd.random()
+    if r < 0.5:
+        return rnd.choice(edges)
+    if r < 0.55:
+        return math.nan
+    return rnd.uniform(min(edges) - 1.0, max(edges) + 1.0)
+
+
+def test_batch_matches_scalar_engine_property():
+    rnd = random.Random(2024)
+    eps = 1e-9
+    inputs, rs, persist, bullish = [], [], [], []
+    for _ in range(5000):
+        vwap = rnd.choice([100.0, 100.0 + eps, 99.5])
+        ema5 = rnd.choice([vwap, 100.0, 100.3, 99.7, math.nan])
+        ema9 = rnd.choice([ema5, 100.0, 100.2, 99.8])
+        price = rnd.choice([ema5, vwap, 100.4, 99.6])
+        sig = _pick(rnd, [0.0, 0.5, -0.5])
+        inputs.append(
+            KavachInput(
+                price=price,
+                ema5=ema5,
+                ema9=ema9,
+                ema9_slope=_pick(rnd, [0.0, eps, -eps]),
+                vwap=vwap,
+                supertrend_bullish=rnd.choice([True, False, None]),
+                macd=rnd.choice([sig, _pick(rnd, [0.0, 0.5, -0.5])]),
+                macd_signal=sig,
+                macd_histogram=_pick(rnd, [0.0, eps, -eps]),
+                adx=_pick(rnd, [20.0, 25.0, 30.0, 20.0 + eps, 0.0]),
+                volume_ratio=_pick(rnd, [1.0, 1.5, 2.0, 1.0 + eps]),
+            )
+        )
+        rs.append(_pick(rnd, [1.0, 0.75, 0.5, 0.25, 0.0, -0.25, -0.5, -0.75, -1.0, 1.0 + eps]))
+        persist.append(rnd.randrange(0, 5))
+        bullish.append(rnd.random() < 0.5)
+
+    res = evaluate_kavach_batch(KavachBatch.from_inputs(inputs))
+    states = res.states()
+    for i, inp in enumerate(inputs):
+        assert res.result(i) == evaluate_kavach(inp), inp
+    assert {STATE_BUY, STATE_SELL, STATE_WATCH, STATE_NEUTRAL} <= set(states)
+
+    scores = trade_score_batch(
+        rs=np.array(rs),
+        state_code=res.state_code,
+        volume_ratio=np.array([i.volume_ratio for i in inputs]),
+        adx=np.array([i.adx for i in inputs]),
+        price=np.array([i.price for i in inputs]),
+        vwap=np.array([i.vwap for i in inputs]),
+        bullish=np.array(bullish),
+        vwap_steep_persist_bars=np.array(persist),
+    )
+    for i, inp in enumerate(inputs):
+        want = trade_score_breakdown(
+            rs=rs[i],
+            state=states[i],
+            volume_ratio=inp.volume_ratio,
+            adx=inp.adx,
+            price=inp.price,
+            vwap=inp.vwap,
+            ranking_type=RANKING_BULLISH if bullish[i] else RANKING_BEARISH,
+            vwap_steep_persist_bars=persist[i],
+        )
+        got = {k: int(v[i]) for k, v in scores.items()}
+        assert got == {k: want[k] for k in got}, (inp, rs[i], bullish[i])
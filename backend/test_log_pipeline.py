@@ -0,0 +1,139 @@
+"""Queue-backed log pipeline: rotation, ERROR fsync, rate limiting, drain on shutdown."""
+import logging
+import os
+
+from backend.services import log_pipeline
+from backend.services.log_pipeline import BufferedRotatingFileHandler, LogPipeline, RateLimitFilter
+
+
+def _record(msg, level=logging.INFO, name="t"):
+    return logging.LogRecord(name, level, __file__, 1, msg, None, None)
+
+
+def _logger(name, handler):
+    lg = logging.getLogger(name)
+    lg.handlers[:] = [handler]
+    lg.setLevel(logging.INFO)
+    lg.propagate = False
+    return lg
+
+
+def test_size_rotation_and_error_fsync(tmp_path, monkeypatch):
+    path = str(tmp_path / "app.log")
+    synced = []
+    monkeypatch.setattr(log_pipeline.os, "fsync", lambda fd: synced.append(fd))
+    fh = BufferedRotatingFileHandler(path, max_bytes=200, backup_count=2, rotate_daily=False, fsync_interval=60)
+    fh.setFormatter(logging.Formatter("%(message)s"))
+    for i in range(30):
+        fh.emit(_record(f"line {i:03d} " + "x" * 20))
+    assert len(synced) == fh.rotations  # INFO records only buffer; rollover syncs the closed file
+    assert fh.rotations > 2 and os.path.exists(path + ".1") and os.path.exists(path + ".2")
+    assert not os.path.exists(path + ".3")  # backup_count respected
+    before = len(synced)
+    fh.emit(_record("boom", level=logging.ERROR))
+    assert len(synced) == before + 1  # ERROR forces flush + fsync
+    with open(path) as f:
+        assert f.read().endswith("boom\n")
+    fh.close()
+
+
+def test_daily_rotation(tmp_path):
+    now = [1_700_000_000.0]
+    fh = BufferedRotatingFileHandler(str(tmp_path / "d.log"), rotate_daily=True, clock=lambda: now[0])
+    fh.setFormatter(logging.Formatter("%(message)s"))
+    fh.emit(_record("day1"))
+    now[0] += 86400
+    fh.emit(_record("day2"))
+    fh.close()
+    assert fh.rotations == 1
+    assert open(str(tmp_path / "d.log.1")).read() == "day1\n"
+    assert open(str(tmp_path / "d.log")).read() == "day2\n"
+
+
+def test_rate_limit_keeps_errors_and_reports_suppressed():
+    now = [0.0]
+    f = RateLimitFilter([("noisy", 5.0)], clock=lambda: now[0])
+    passed = sum(f.filter(_record(f"m{i}", name="noisy.feed")) for i in range(100))
+    assert passed == 10  # burst of 2 s worth
+    assert f.filter(_record("bad", level=logging.ERROR, name="noisy.feed"))
+    assert all(f.filter(_record("q", name="quiet")) for _ in range(50))  # unlisted logger untouched
+    now[0] += 1.0
+    rec = _record("after", name="noisy.feed")
+    assert f.filter(rec) and rec.getMessage() == "after"  # other handlers see the original message
+    out = log_pipeline.PipelineFormatter("%(message)s").format(rec)
+    assert out == "after [90 earlier records from this logger suppressed]"
+    assert f.suppressed_total == 90
+
+
+def test_shutdown_drains_queue_in_order(tmp_path):
+    p = LogPipeline(flush_interval=10, fsync_interval=10, rate_limits="")
+    h1 = p.handler_for(tmp_path / "a.log")
+    assert p.handler_for(tmp_path / "a.log") is h1  # one handler per file
+    la = _logger("pipeline.test.a", h1)
+    lb = _logger("pipeline.test.b", p.handler_for(tmp_path / "b.log"))
+    for i in range(2000):
+        la.info("a %d", i)
+        lb.info("b %d", i)
+    p.shutdown()
+    a = open(tmp_path / "a.log").read().splitlines()
+    assert len(a) == 2000 and a[-1].endswith("INFO - pipeline.test.a - a 1999")
+    assert [line.rsplit(" ", 1)[1] for line in a[:3]] == ["0", "1", "2"]
+    assert len(open(tmp_path / "b.log").read().splitlines()) == 2000
+
+
+def test_full_queue_drops_info_but_not_errors(tmp_path):
+    p = LogPipeline(queue_max=0)
+    lg = _logger("pipeline.test.full", p.handler_for(tmp_path / "f.log"))
+    lg.info("dropped")
+    lg.error("kept")
+    p.shutdown()
+    assert p.dropped == 1
+    assert open(tmp_path / "f.log").read().strip().endswith("kept")
+
+
+def test_records_after_shutdown_write_directly(tmp_path):
+    p = LogPipeline(flush_interval=10, fsync_interval=10)
+    lg = _logger("pipeline.test.late", p.handler_for(tmp_path / "late.log"))
+    lg.info("before")
+    p.shutdown()
+    lg.info("after")  # handler is still attached; must not vanish into the dead queue
+    lines = open(tmp_path / "late.log").read().splitlines()
+    assert [line.rsplit(" - ", 1)[1] for line in lines] == ["before", "after"]
+
+
+def test_forked_child_writes_directly(tmp_path, monkeypatch):
+    import multiprocessing
+
+    p = LogPipeline(flush_interval=10, fsync_interval=10)
+    monkeypatch.setattr(log_pipeline, "_PIPELINE", p)
+    lg = _logger("pipeline.test.fork", p.handler_for(tmp_path / "fork.log"))
+    lg.info("parent buffered")
+
+    def child():
+        lg.info("child")
+
+    proc = multiprocessing.get_context("fork").Process(target=child)
+    proc.start()
+    proc.join(10)
+    assert proc.exitcode == 0
+    p.shutdown()
+    lines = open(tmp_path / "fork.log").read().splitlines()
+    assert sorted(line.rsplit(" - ", 1)[1] for line in lines) == ["child", "parent buffered"]
+
+
+def test_size_counts_encoded_bytes(tmp_path):
+    fh = BufferedRotatingFileHandler(str(tmp_path / "u.log"), rotate_daily=False)
+    fh.setFormatter(logging.Formatter("%(message)s"))
+    fh.emit(_record("✅ ok"))
+    fh.close()
+    assert fh._size == len("✅ ok\n".encode("utf-8")) == os.path.getsize(tmp_path / "u.log")
+
+
+def test_shared_handler_keeps_most_verbose_level(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_pipeline, "_PIPELINE", LogPipeline())
+    path = tmp_path / "lv.log"
+    try:
+        assert log_pipeline.get_file_handler(path, level=logging.DEBUG).level == logging.DEBUG
+        assert log_pipeline.get_file_handler(path, level=logging.WARNING).level == logging.DEBUG
+    finally:
+        log_pipeline._PIPELINE.shutdown()
@@ -31,3 +31,55 @@ def test_candle_rl_max_wait_override_roundtrip():
     rl.set_candle_rl_max_wait_override(None)
     with rl._max_wait_override_lock:
         assert rl._max_wait_override is None
+
+
+def test_prefetch_5m_refreshes_only_keys_older_than_bar_close(monkeypatch):
+    import importlib
+    import time
+
+    from backend.services import upstox_service
+    from backend.services.market_data import candle_cache
+
+    c = importlib.reload(candle_cache)
+    monkeypatch.setattr(md_engine, "candle_cache", c)
+    now = datetime.now(md_engine.IST)
+    bar_close = md_engine._last_bar_close_epoch(now)
+    rows = [{"stock": s, "currmth_future_instrument_key": f"NSE_FO|{s}"} for s in ("AAA", "BBB", "CCC")]
+    monkeypatch.setattr(md_engine, "load_universe_rows", lambda: rows)
+    bars = [{"timestamp": "2026-06-30T09:15:00+05:30", "close": 1.0}]
+    for s in ("AAA", "BBB"):
+        c.put(f"NSE_FO|{s}", "minutes/5", "2026-06-24", "2026-06-30", bars)
+    c._CACHE[("NSE_FO|AAA", "minutes/5")].fetched = bar_close - 30  # fetched before the close
+    calls = []
+
+    class _Upstox:
+        access_token = "t"
+
+        def __init__(self, *a):
+            pass
+
+        def get_historical_candles_by_instrument_key(self, ik, **kw):
+            calls.append((ik, kw["interval"]))
+            assert 0 <= kw["cache_max_age_sec"] <= time.time() - bar_close + 1
+            c.put(ik, kw["interval"], "2026-06-24", "2026-06-30", bars + [{"timestamp": "2026-06-30T09:20:00+05:30"}])
+            return bars
+
+    monkeypatch.setattr(upstox_service, "UpstoxService", _Upstox)
+    out = md_engine.prefetch_curr_month_5m_candles(now=now)
+    assert sorted(calls) == [("NSE_FO|AAA", "minutes/5"), ("NSE_FO|CCC", "minutes/5")]
+    assert out["keys"] == 3 and out["already_fresh"] == 1 and out["refreshed"] == 2 and out["errors"] == 0
+
+
+def test_warm_indicator_fetch_never_accepts_stale_cache(monkeypatch):
+    seen = {}
+
+    class _Upstox:
+        access_token = "t"
+
+        def get_historical_candles_by_instrument_key(self, ik, **kw):
+            seen.update(kw)
+            return []
+
+    monkeypatch.setattr(md_engine.settings, "UPSTOX_CANDLE_CACHE_TTL_INTRADAY_SEC", 150, raising=False)
+    md_engine._fetch_5m_indicators(_Upstox(), "NSE_FO|X")
+    assert seen["cache_max_age_sec"] == 150.0
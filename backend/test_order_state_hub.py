@@ -0,0 +1,140 @@
+"""Order-state hub: monotone merge of out-of-order events, push-woken fill waiters, REST fallback for dropped postbacks."""
+import threading
+import time
+
+import pytest
+
+from backend.config import settings
+from backend.services import live_trading
+from backend.services.order_state_hub import OrderStateHub, publish_order_update
+
+
+def _row(status, fq=0, avg=None, txn="BUY", oid="OID1"):
+    r = {"order_id": oid, "status": status, "transaction_type": txn, "filled_quantity": fq, "quantity": 100}
+    if avg is not None:
+        r["average_price"] = avg
+    return r
+
+
+class _Broker:
+    """get_order_details stub returning queued rows (the last one repeats) and counting calls."""
+
+    def __init__(self, *rows):
+        self.rows = list(rows)
+        self.calls = 0
+
+    def get_order_details(self, oid):
+        self.calls += 1
+        row = self.rows[0] if len(self.rows) == 1 else self.rows.pop(0)
+        return {"success": True, "data": dict(row, order_id=oid)}
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    h = OrderStateHub()
+    monkeypatch.setattr(live_trading, "order_hub", h)
+    monkeypatch.setattr(settings, "UPSTOX_PORTFOLIO_STREAM_ENABLED", False, raising=False)
+    return h
+
+
+def _publish_later(h, delay, *rows):
+    def run():
+        for r in rows:
+            time.sleep(delay)
+            h.publish(r, source="postback")
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return t
+
+
+def test_out_of_order_events_never_regress():
+    h = OrderStateHub()
+    assert h.publish(_row("open"), source="stream")
+    assert h.publish(_row("complete", 100, 12.5), source="postback")
+    assert not h.publish(_row("open"), source="stream")  # late non-terminal after complete
+    assert not h.publish(_row("open", 40), source="rest")
+    assert h.get("OID1")["status"] == "complete" and h.get("OID1")["average_price"] == 12.5
+    # A duplicate terminal event without the price keeps the known average.
+    assert h.publish(_row("complete", 100), source="stream")
+    assert h.get("OID1")["average_price"] == 12.5
+    assert h.stats()["stale_dropped"] == 2 and h.stats()["by_source"] == {"stream": 3, "postback": 1, "rest": 1}
+    # Nested notifier payloads are flattened by publish_order_update.
+    h2 = OrderStateHub()
+    import backend.services.order_state_hub as osh
+
+    orig, osh.hub = osh.hub, h2
+    try:
+        assert publish_order_update({"update_type": "order", "data": _row("complete", 5, 3.0, oid="X")}, "postback")
+    finally:
+        osh.hub = orig
+    assert h2.get("X")["filled_quantity"] == 5 and "data" not in h2.get("X")
+
+
+def test_waiter_wakes_on_postback_without_polling(monkeypatch, hub):
+    broker = _Broker(_row("open"))
+    monkeypatch.setattr(live_trading, "upstox_service", broker)
+    hub.set_stream_connected(True)
+    t = _publish_later(hub, 0.2, _row("open", 40), _row("complete", 100, 10.25))
+    t0 = time.monotonic()
+    out = live_trading.wait_for_buy_order_fill("OID1", 100, timeout_sec=10, poll_interval=1.5)
+    elapsed = time.monotonic() - t0
+    t.join()
+    assert out["filled"] and out["average_price"] == 10.25
+    assert elapsed < 1.0  # two postbacks 0.2 s apart; old loop would poll every 1.5 s
+    assert broker.calls == 1  # only the initial REST read
+
+
+def test_postback_ahead_of_waiter_and_stale_rest(monkeypatch, hub):
+    # The fill postback lands before the waiter starts, and REST still says "open".
+    broker = _Broker(_row("open"))
+    monkeypatch.setattr(live_trading, "upstox_service", broker)
+    hub.publish(_row("complete", 100, 7.5), source="postback")
+    out = live_trading.wait_for_buy_order_fill("OID1", 100, timeout_sec=5)
+    assert out["filled"] and out["average_price"] == 7.5
+    assert hub.stats()["stale_dropped"] == 1
+
+
+def test_dropped_postbacks_fall_back_to_rest(monkeypatch, hub):
+    broker = _Broker(_row("open", txn="SELL"), _row("open", txn="SELL"), _row("complete", 50, 20.0, txn="SELL"))
+    monkeypatch.setattr(live_trading, "upstox_service", broker)
+    monkeypatch.setattr(live_trading, "ORDER_FILL_FALLBACK_POLL_SEC", 0.2)
+    hub.publish(_row("complete", 1, 1.0, oid="OTHER"), source="postback")  # push channel is live
+    out = live_trading.wait_for_sell_order_fill("OID1", 50, timeout_sec=5, poll_interval=0.05)
+    assert out["filled"] and out["average_price"] == 20.0
+    assert broker.calls == 3  # fallback cadence is the slow one, not poll_interval
+
+
+def test_no_push_channel_polls_at_caller_interval(monkeypatch, hub):
+    broker = _Broker(_row("open"))
+    monkeypatch.setattr(live_trading, "upstox_service", broker)
+    out = live_trading.wait_for_buy_order_fill("OID1", 100, timeout_sec=0.35, poll_interval=0.1)
+    assert out["error"] == "timeout_waiting_for_fill"
+    assert 3 <= broker.calls <= 5
+
+
+def test_push_liveness_follows_stream_state_and_recent_postbacks():
+    import backend.services.order_state_hub as osh
+
+    now = [0.0]
+    h = OrderStateHub(clock=lambda: now[0])
+    h.set_stream_connected(True)
+    h.publish(_row("open"), source="stream")
+    assert h.push_live()
+    h.set_stream_connected(False)  # stream died: its past events do not keep push live
+    assert not h.push_live()
+    h.publish(_row("open", 10), source="postback")
+    now[0] = osh.PUSH_FRESH_SEC - 1
+    assert h.push_live()
+    now[0] = osh.PUSH_FRESH_SEC + 1
+    assert not h.push_live()
+
+
+def test_reject_and_partial_outcomes(monkeypatch, hub):
+    monkeypatch.setattr(live_trading, "upstox_service", _Broker(_row("open")))
+    hub.set_stream_connected(True)
+    _publish_later(hub, 0.05, _row("rejected"))
+    assert live_trading.wait_for_buy_order_fill("OID1", 100, timeout_sec=5)["error"] == "order_cancelled_or_rejected"
+    hub.publish(_row("complete", 60, 5.0, oid="P"), source="stream")
+    out = live_trading.wait_for_buy_order_fill("P", 100, timeout_sec=5)
+    assert out["error"] == "partial_fill_incomplete" and out["filled_quantity"] == 60
@@ -0,0 +1,83 @@
+"""RS scan compute stage: process-pool parity with the in-process path, phase timings in the cycle log."""
+from datetime import datetime, timedelta
+
+import pytz
+
+from backend.services import relative_strength_scanner as rs
+from backend.services.market_data.candle_series import CandleSeries
+from backend.test_candle_series import _session_rows
+
+IST = pytz.timezone("Asia/Kolkata")
+
+
+def _jobs(now):
+    jobs = []
+    for k in range(5):
+        rows = _session_rows(seed=10 + k, now=now)
+        candles = CandleSeries.from_dicts(rows[::-1]) if k % 2 else rows
+        jobs.append(({"instrument_key": f"NSE_FO|{k}", "stock": f"S{k}"}, candles, bool(k % 2)))
+    today_only = [r for r in _session_rows(seed=99, now=now) if r["timestamp"][:10] == now.date().isoformat()]
+    jobs.append(({"instrument_key": "NSE_FO|T", "stock": "TODAY"}, today_only, True))
+    return jobs
+
+
+def test_pool_compute_matches_in_process():
+    now = IST.localize(datetime(2026, 10, 16, 14, 2))
+    jobs = _jobs(now)
+    serial, w0 = rs._compute_all(jobs, 0.1, now, workers=0)
+    try:
+        pooled, w2 = rs._compute_all(jobs, 0.1, now, workers=2, chunk_size=2)
+    finally:
+        rs._reset_pool()
+    assert (w0, w2) == (0, 2)
+    assert pooled == serial
+    assert all(m and m["kavach_state"] is None for m, _, _ in serial[:5])
+    assert serial[5] == (None, "no_prev_close", None)
+
+
+def test_scan_records_phase_timings(monkeypatch):
+    from backend.services import arbitrage_universe, rocket_ws_live, rs_exclusion_audit
+    from backend.services import rs_scanner_maturity, rs_universe_score_snapshot
+    from backend.services.rs_score_cycle_log import latest_rs_score_cycle
+
+    now = datetime.now(IST) - timedelta(minutes=1)
+    candles = {f"NSE_FO|{k}": _session_rows(seed=20 + k, now=now) for k in range(4)}
+    universe = [{"instrument_key": k, "stock": f"S{k[-1]}"} for k in candles] + [{"stock": "NOKEY"}]
+    monkeypatch.setenv("RS_SCAN_WORKERS", "0")
+    monkeypatch.setattr(rs, "UpstoxService", lambda *a, **k: None)
+    monkeypatch.setattr(rs, "_nifty_change_pct", lambda upstox: 0.2)
+    monkeypatch.setattr(rs, "_candles_for_symbol", lambda u, key, cache_only: (candles[key], True))
+    monkeypatch.setattr(rs, "_persist", lambda scan_time, ranked: None)
+    monkeypatch.setattr(arbitrage_universe, "load_arbitrage_curr_mth_universe", lambda: universe)
+    monkeypatch.setattr(rocket_ws_live, "ensure_rocket_feed_running", lambda: None)
+    monkeypatch.setattr(rocket_ws_live, "get_live_10m", lambda sym: None)
+    monkeypatch.setattr(rs_exclusion_audit, "write_exclusion_log", lambda **k: len(k["exclusions"]))
+    monkeypatch.setattr(rs_scanner_maturity, "enrich_ranked_with_maturity", lambda ranked, upstox: None)
+    monkeypatch.setattr(rs_universe_score_snapshot, "shadow_enabled", lambda: False)
+
+    out = rs.run_relative_strength_scan("test", cache_only=True)
+    assert out["ok"] and out["scanned"] == 4 and out["cache_hits"] == 4
+    assert set(out["phase_sec"]) == {"load", "compute", "rank", "persist"}
+    cycle = latest_rs_score_cycle()
+    assert cycle["scan_trigger"] == "test" and cycle["phase_sec"] == out["phase_sec"]
+    assert cycle["compute_workers"] == 0 and cycle["universe"] == 5
+    assert out["stale_reads"] == cycle["stale_reads"] == 0
+
+    # Fetched (not cache-served) candles that the shared cache served stale are counted.
+    monkeypatch.setattr(rs, "_candles_for_symbol", lambda u, key, cache_only: (candles[key], False))
+    monkeypatch.setattr(rs.candle_cache, "last_read_stale", lambda: True)
+    out = rs.run_relative_strength_scan("test", cache_only=False)
+    assert out["stale_reads"] == latest_rs_score_cycle()["stale_reads"] == 4
+
+
+def test_malformed_row_is_dropped_not_the_batch():
+    now = IST.localize(datetime(2026, 10, 16, 14, 2))
+    serial, _ = rs._compute_all(_jobs(now)[:3], 0.1, now, workers=0)
+    rows = [m for m, _, _ in serial]
+    expected = [dict(r) for r in rows]
+    rs._apply_kavach([expected[0], expected[2]])
+    rows[1]["_kavach_input"] = None  # breaks KavachBatch.from_inputs
+    failed = rs._apply_kavach(rows)
+    assert [r["symbol"] for r, _ in failed] == ["S1"]
+    assert rows == expected[::2]
+    assert all(r["kavach_state"] is not None for r in rows)
@@ -0,0 +1,65 @@
+"""Trading calendar: O(1) lookups over merged holiday sources, no network on the request path."""
+from datetime import date, datetime, timedelta
+
+import pytz
+
+from backend.services import trading_calendar as tc
+
+
+def _brute(cal_holidays, a, b):
+    out, d = [], a
+    while d <= b:
+        if d.weekday() < 5 and d not in cal_holidays:
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+
+def test_sources_are_merged_and_csv_is_read(tmp_path):
+    (tmp_path / "nse_holidays_2027.csv").write_text("Date,Description\n08-Mar-2027,Holi\nbad,row\n", encoding="utf-8")
+    cal = tc.TradingCalendar(known={2027: ["2027-01-26"]}, csv_dir=tmp_path, use_db=False)
+    assert cal.holidays(2027) == [date(2027, 1, 26), date(2027, 3, 8)]
+    assert not cal.is_trading_day(date(2027, 3, 8))
+    assert cal.is_trading_day(date(2027, 3, 9))
+
+    cal.register_source("api", lambda year: ["2027-03-09", "garbage"] if year == 2027 else [])
+    assert cal.is_trading_day(date(2027, 3, 9))  # sources only apply after refresh()
+    cal.refresh(years=[2027])
+    assert not cal.is_trading_day(date(2027, 3, 9))
+    assert tc.load_csv_holidays(tmp_path) == {date(2027, 3, 8)}
+
+
+def test_navigation_matches_brute_force_across_years():
+    cal = tc.TradingCalendar(csv_dir=tc.DEFAULT_CSV_DIR, use_db=False)
+    hol = set(cal.holidays(2025)) | set(cal.holidays(2026)) | set(cal.holidays(2027))
+    days = _brute(hol, date(2024, 12, 20), date(2027, 1, 10))
+    for d in (date(2025, 1, 1), date(2026, 3, 31), date(2026, 3, 28), date(2026, 12, 31), date(2026, 1, 1)):
+        assert cal.previous_trading_day(d) == max(x for x in days if x < d)
+        assert cal.next_trading_day(d) == min(x for x in days if x > d)
+        assert cal.previous_trading_day(d, include_self=True) == max(x for x in days if x <= d)
+    assert cal.trading_days(date(2025, 6, 1), date(2026, 8, 31)) == _brute(hol, date(2025, 6, 1), date(2026, 8, 31))
+    assert cal.trading_days_between(date(2025, 6, 1), date(2026, 8, 31)) == len(
+        _brute(hol, date(2025, 6, 1), date(2026, 8, 31))
+    )
+    assert cal.trading_days_between(date(2026, 5, 2), date(2026, 5, 1)) == 0
+    ist = pytz.timezone("Asia/Kolkata")
+    # 2026-03-30 20:00 UTC is already 31-Mar (Mahavir Jayanti) in IST
+    assert not cal.is_trading_day(datetime(2026, 3, 30, 20, 0, tzinfo=pytz.utc))
+    assert cal.is_trading_day(ist.localize(datetime(2026, 3, 30, 10, 0)))
+
+
+def test_upstox_service_uses_calendar_without_http(monkeypatch):
+    from backend.services import upstox_service as us
+
+    def _no_http(*a, **k):
+        raise AssertionError("holiday lookup must not hit the network")
+
+    monkeypatch.setattr(us, "_http_session", _no_http)
+    cal = tc.TradingCalendar(csv_dir=tc.DEFAULT_CSV_DIR, use_db=False)
+    monkeypatch.setattr(us, "get_trading_calendar", lambda: cal)
+    svc = us.upstox_service
+    ist = pytz.timezone("Asia/Kolkata")
+    assert not svc.is_trading_day(ist.localize(datetime(2026, 3, 31, 11, 0)))
+    last = svc.get_last_trading_date(ist.localize(datetime(2026, 4, 5, 11, 0)))  # Sun after Good Friday
+    assert last.date() == date(2026, 4, 2) and last.hour == 0 and last.tzinfo is not None
+    assert "2026-03-31" in svc.get_market_holidays(2026)
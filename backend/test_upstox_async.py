@@ -0,0 +1,147 @@
+"""Async Upstox client: same results as the sync service, concurrent I/O, event loop never blocked."""
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+
+from backend.services import upstox_service as us
+from backend.services.upstox_async import AsyncUpstoxService
+
+QUOTES = {
+    "NSE_INDEX:Nifty 50": {"last_price": 24510.5, "close_price": 24400.0, "ohlc": {"open": 24420.0}},
+    "NSE_FO:104500": {"last_price": 182.35, "close_price": 175.0, "ohlc": {"open": 176.2}},
+    "NSE_EQ:INE002A01018": {"last_price": 0, "close_price": 1301.0, "ohlc": {"open": 1299.0}},
+}
+
+
+def _broker(method: str, url: str, body: bytes):
+    """(status, json) for a minimal Upstox surface; shared by the sync and async transports."""
+    parts = urlsplit(url)
+    if parts.path == "/v2/market-quote/quotes":
+        keys = parse_qs(parts.query)["instrument_key"][0].split(",")
+        data = {k.replace("|", ":"): QUOTES[k.replace("|", ":")] for k in keys if k.replace("|", ":") in QUOTES}
+        return 200, {"status": "success", "data": data}
+    if parts.path == "/v2/portfolio/short-term-positions":
+        return 200, {"status": "success", "data": [{"instrument_token": "NSE_FO|104500", "quantity": 75}]}
+    if parts.path == "/v2/order/retrieve-all":
+        return 200, {"status": "success", "data": {"orders": [{"order_id": "1"}, {"order_id": "2"}]}}
+    if parts.path == "/v2/order/place" and method == "POST":
+        payload = json.loads(body)
+        if payload["quantity"] > 1000:
+            return 400, {"status": "error", "errors": [{"message": "Quantity exceeds freeze limit"}]}
+        return 200, {"status": "success", "data": {"order_id": f"OID-{payload['instrument_token']}"}}
+    return 404, {"status": "error"}
+
+
+class _SyncAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        status, payload = _broker(request.method, request.url, request.body or b"")
+        r = requests.Response()
+        r.status_code = status
+        r.headers["Content-Type"] = "application/json"
+        r._content = json.dumps(payload).encode()
+        r.url = request.url
+        r.request = request
+        return r
+
+    def close(self):
+        pass
+
+
+def _sync_service(monkeypatch):
+    session = requests.Session()
+    session.mount("https://", _SyncAdapter())
+    monkeypatch.setattr(us, "_http_session", lambda: session)
+    return us.UpstoxService(api_key="", api_secret="", access_token="t")
+
+
+def _async_transport(delay: float = 0.0):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if delay:
+            await asyncio.sleep(delay)
+        status, payload = _broker(request.method, str(request.url), request.content)
+        return httpx.Response(status, json=payload)
+
+    return httpx.MockTransport(handler)
+
+
+def test_async_results_match_sync_service(monkeypatch):
+    svc = _sync_service(monkeypatch)
+    keys = ["NSE_INDEX|Nifty 50", "NSE_FO|104500", "NSE_EQ|INE002A01018", "NSE_FO|999"]
+    orders = [
+        ("NSE_FO|104500", 75, "BUY", "LIMIT", "I", "DAY", 181.5, None, "t1"),
+        ("NSE_FO|104500", 5000, "SELL", "MARKET", "D", "DAY", None, None, None),
+        ("", 75, "BUY", "MARKET", "D", "DAY", None, None, None),
+    ]
+    expected = {
+        "quotes": [svc.get_market_quote_by_key(k) for k in keys],
+        "batch": svc.get_market_quotes_batch_by_keys(keys),
+        "positions": svc.get_short_term_positions(),
+        "orders": svc.get_order_book_today(),
+        "placed": [svc.place_order(*o) for o in orders],
+    }
+    client = AsyncUpstoxService(svc, transport=_async_transport())
+
+    async def run():
+        try:
+            return {
+                "quotes": [await client.get_market_quote_by_key(k) for k in keys],
+                "batch": await client.get_market_quotes_batch_by_keys(keys),
+                "positions": await client.get_short_term_positions(),
+                "orders": await client.get_order_book_today(),
+                "placed": [await client.place_order(*o) for o in orders],
+            }
+        finally:
+            await client.aclose()
+
+    got = asyncio.run(run())
+    assert got == expected
+    assert got["quotes"][3] is None and got["batch"] == {"NSE_INDEX|Nifty 50": 24510.5, "NSE_FO|104500": 182.35}
+    assert got["placed"][0]["order_id"] == "OID-NSE_FO|104500"
+    assert got["placed"][1]["success"] is False and "freeze" in got["placed"][1]["error"]
+    assert [len(got["positions"]["positions"]), len(got["orders"]["orders"])] == [1, 2]
+
+
+def test_concurrent_quotes_overlap_on_the_wire():
+    svc = us.UpstoxService(api_key="", api_secret="", access_token="t")
+    client = AsyncUpstoxService(svc, transport=_async_transport(delay=0.2))
+
+    async def run():
+        try:
+            t0 = time.perf_counter()
+            out = await asyncio.gather(*(client.get_market_quote_by_key("NSE_FO|104500") for _ in range(10)))
+            return out, time.perf_counter() - t0
+        finally:
+            await client.aclose()
+
+    out, elapsed = asyncio.run(run())
+    assert all(q and q["last_price"] == 182.35 for q in out)
+    assert elapsed < 1.0  # 10 × 0.2 s sequential would be 2 s
+
+
+def test_run_sync_keeps_event_loop_responsive():
+    client = AsyncUpstoxService(us.UpstoxService(api_key="", api_secret="", access_token="t"), offload_workers=2)
+
+    async def run():
+        ticks = 0
+        stop = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not stop.is_set():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(client.run_sync(time.sleep, 0.3), client.run_sync(sum, [1, 2, 3]))
+        stop.set()
+        await task
+        return ticks, results
+
+    ticks, results = asyncio.run(run())
+    assert results == [None, 6]
+    assert ticks >= 10  # a blocking 0.3 s call on the loop would leave ~1 tick
@@ -0,0 +1,88 @@
+"""Direct protobuf decode must match the MessageToDict dict path field-for-field."""
+from google.protobuf.json_format import MessageToDict
+
+from backend.scripts.bench_feed_decode import synth_frames
+from backend.services.upstox_feed_decode import FeedRecord, decode_frame, iter_frames, write_frame
+from backend.services.upstox_market_feed import _extract_feed_fields
+from backend.services.upstox_proto import MarketDataFeedV3_pb2 as feed_pb
+
+
+def _both(fr):
+    raw = fr.SerializeToString()
+    direct = dict(decode_frame(raw))
+    d = MessageToDict(fr, preserving_proto_field_name=True)
+    via_dict = {k: FeedRecord.from_fields(_extract_feed_fields(v)) for k, v in (d.get("feeds") or {}).items()}
+    return direct, via_dict
+
+
+def test_parity_on_synthetic_full_frames():
+    for raw in synth_frames(5, 20):
+        fr = feed_pb.FeedResponse()
+        fr.ParseFromString(raw)
+        direct, via_dict = _both(fr)
+        assert direct == via_dict
+        rec = next(iter(direct.values()))
+        assert rec.ltp and rec.oi and len(rec.i1_bars) == 2
+
+
+def test_parity_zero_defaults_are_absent():
+    fr = feed_pb.FeedResponse()
+    mff = fr.feeds["NSE_FO|1"].fullFeed.marketFF
+    mff.ltpc.ltq = 10  # ltp == 0 -> None, oi == 0 -> None
+    q = mff.marketLevel.bidAskQuote.add()
+    q.bidQ = 100  # askQ 0 -> ratio 2.0; prices 0 -> best bid/ask None
+    mff.tbq = 50.0
+    direct, via_dict = _both(fr)
+    rec = direct["NSE_FO|1"]
+    assert rec == via_dict["NSE_FO|1"]
+    assert rec.oi is None and rec.ltp is None
+    assert rec.best_bid is None and rec.best_ask is None
+    assert rec.depth_imbalance_ratio == 2.0
+    assert rec.pressure_ratio == 2.0
+
+
+def test_parity_first_level_with_greeks_fallback():
+    fr = feed_pb.FeedResponse()
+    flg = fr.feeds["NSE_FO|2"].firstLevelWithGreeks
+    flg.oi = 1234.0
+    flg.ltpc.ltp = 55.5
+    empty_mff = fr.feeds["NSE_FO|3"].fullFeed.marketFF
+    empty_mff.SetInParent()
+    direct, via_dict = _both(fr)
+    assert direct == via_dict
+    assert direct["NSE_FO|2"].oi == 1234
+    assert direct["NSE_FO|2"].ltp == 55.5
+    assert direct["NSE_FO|3"] == FeedRecord()
+
+
+def test_i1_bars_filter_interval_and_non_positive_prices():
+    fr = feed_pb.FeedResponse()
+    moh = fr.feeds["NSE_FO|4"].fullFeed.marketFF.marketOHLC
+    for iv, o, c in (("1d", 10.0, 11.0), ("I1", 0.0, 11.0), ("i1 ", 10.0, 12.0)):
+        row = moh.ohlc.add()
+        row.interval, row.open, row.close, row.ts = iv, o, c, 1_783_000_000_000
+    direct, via_dict = _both(fr)
+    assert direct == via_dict
+    bars = direct["NSE_FO|4"].i1_bars
+    assert len(bars) == 1
+    assert bars[0]["high"] == 12.0 and bars[0]["low"] == 10.0
+    assert bars[0]["timestamp"] == "1783000000000"
+
+
+def test_frame_file_round_trip(tmp_path):
+    frames = synth_frames(3, 2)
+    p = tmp_path / "frames.bin"
+    with open(p, "wb") as fh:
+        for f in frames:
+            write_frame(fh, f)
+    with open(p, "rb") as fh:
+        assert list(iter_frames(fh)) == frames
+
+
+def test_ltpc_mode_feed_yields_ltp_on_both_paths():
+    fr = feed_pb.FeedResponse()
+    fr.feeds["NSE_EQ|5"].ltpc.ltp = 1520.25
+    fr.feeds["NSE_EQ|5"].ltpc.ltq = 3
+    direct, via_dict = _both(fr)
+    assert direct == via_dict
+    assert direct["NSE_EQ|5"].ltp == 1520.25
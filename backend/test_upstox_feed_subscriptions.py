@@ -0,0 +1,128 @@
+"""Shared market feed: refcounted consumers, incremental sub/unsub/change_mode."""
+import asyncio
+import json
+
+from backend.services import upstox_market_feed as feed
+from backend.services.upstox_feed_subscriptions import SubscriptionManager
+
+
+def test_set_keys_replaces_consumer_universe_and_reports_change():
+    m = SubscriptionManager()
+    assert m.set_keys("market_data", ["NSE_FO|1", "NSE_FO|2"])
+    assert not m.set_keys("market_data", ["NSE_FO|2", "NSE_FO|1"])
+    assert m.set_keys("market_data", ["NSE_FO|2"])
+    assert m.desired() == {"NSE_FO|2": "full"}
+
+
+def test_shared_key_survives_until_last_consumer_releases():
+    m = SubscriptionManager()
+    m.set_keys("rocket_live", ["NSE_FO|1"])
+    m.acquire("chart", ["NSE_FO|1", "NSE_EQ|9"], mode="ltpc")
+    m.acquire("chart", ["NSE_EQ|9"], mode="ltpc")
+    assert m.refcount("chart", "NSE_EQ|9") == 2
+    # Richest mode wins for a key held by two consumers.
+    assert m.desired() == {"NSE_FO|1": "full", "NSE_EQ|9": "ltpc"}
+    m.release("chart", ["NSE_FO|1", "NSE_EQ|9"])
+    assert m.desired() == {"NSE_FO|1": "full", "NSE_EQ|9": "ltpc"}
+    m.release("chart", ["NSE_EQ|9"])
+    assert m.desired() == {"NSE_FO|1": "full"}
+    assert "chart" not in m.consumer_counts()
+
+
+def test_plan_emits_only_the_diff():
+    m = SubscriptionManager()
+    m.set_keys("a", ["K1", "K2", "K3"])
+    m.acquire("chart", ["K4"], mode="ltpc")
+    subscribed = {"K1": "full", "K2": "ltpc", "K9": "full"}
+    sub, unsub, change = m.plan(subscribed)
+    assert sub == {"full": ["K3"], "ltpc": ["K4"]}
+    assert unsub == ["K9"]
+    assert change == {"full": ["K2"]}
+
+
+def test_max_keys_truncates_deterministically():
+    m = SubscriptionManager(max_keys=2)
+    m.set_keys("a", ["K3", "K1", "K2"])
+    assert sorted(m.desired()) == ["K1", "K2"]
+    assert m.truncated == 1
+
+
+class _FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, payload):
+        self.sent.append(json.loads(payload))
+
+
+def test_sync_subscriptions_sends_incremental_messages(monkeypatch):
+    mgr = SubscriptionManager()
+    monkeypatch.setattr(feed, "_SUBS", mgr)
+    monkeypatch.setattr(feed, "_SUBSCRIBED", {})
+    monkeypatch.setattr(feed, "_SUB_MSG_GAP_SEC", 0)
+    ws = _FakeWS()
+
+    mgr.set_keys("market_data", [f"NSE_FO|{i}" for i in range(150)])
+    asyncio.run(feed._sync_subscriptions(ws))
+    assert [m["method"] for m in ws.sent] == ["sub", "sub"]
+    assert len(feed._SUBSCRIBED) == 150
+
+    ws.sent.clear()
+    mgr.set_keys("market_data", [f"NSE_FO|{i}" for i in range(1, 151)])
+    mgr.acquire("chart", ["NSE_FO|5", "NSE_EQ|1"], mode="ltpc")
+    asyncio.run(feed._sync_subscriptions(ws))
+    methods = [(m["method"], m["data"].get("mode"), m["data"]["instrumentKeys"]) for m in ws.sent]
+    assert ("unsub", None, ["NSE_FO|0"]) in methods
+    assert ("sub", "full", ["NSE_FO|150"]) in methods
+    assert ("sub", "ltpc", ["NSE_EQ|1"]) in methods
+    # NSE_FO|5 stays in full mode (market_data holds it) -> no change_mode.
+    assert all(m["method"] != "change_mode" for m in ws.sent)
+    assert feed._LAST_SYNC_VERSION == mgr.version
+
+    ws.sent.clear()
+    mgr.set_keys("market_data", [f"NSE_FO|{i}" for i in range(6, 151)])
+    asyncio.run(feed._sync_subscriptions(ws))
+    assert {"method": "change_mode", "mode": "ltpc", "keys": ["NSE_FO|5"]} in [
+        {"method": m["method"], "mode": m["data"].get("mode"), "keys": m["data"]["instrumentKeys"]} for m in ws.sent
+    ]
+    assert feed._SUBSCRIBED["NSE_FO|5"] == "ltpc"
+
+
+class _FakeThread:
+    started = 0
+
+    def __init__(self, **_kw):
+        pass
+
+    def start(self):
+        _FakeThread.started += 1
+
+    def is_alive(self):
+        return True
+
+
+def test_ensure_market_feed_running_does_not_restart_thread_on_key_change(monkeypatch):
+    _FakeThread.started = 0
+    monkeypatch.setattr(feed, "_SUBS", SubscriptionManager())
+    monkeypatch.setattr(feed, "_FEED_THREAD", None)
+    monkeypatch.setattr(feed, "writer_enabled", lambda: False)
+    monkeypatch.setattr(feed.threading, "Thread", _FakeThread)
+    feed.ensure_market_feed_running(["NSE_FO|1"], consumer="market_data")
+    feed.ensure_market_feed_running(["NSE_FO|1", "NSE_FO|2"], consumer="market_data")
+    feed.ensure_market_feed_running(["NSE_FO|3"], consumer="rocket_live")
+    assert _FakeThread.started == 1
+    assert sorted(feed._SUBS.desired()) == ["NSE_FO|1", "NSE_FO|2", "NSE_FO|3"]
+
+
+def test_orderflow_rows_only_for_full_mode_keys(monkeypatch):
+    from backend.services.upstox_feed_decode import FeedRecord
+
+    queued = []
+    monkeypatch.setattr(feed, "_SUBSCRIBED", {"NSE_FO|1": "full", "NSE_EQ|2": "ltpc"})
+    monkeypatch.setattr(feed, "_OI_LTP_BY_KEY", {})
+    monkeypatch.setattr(feed, "_queue_orderflow_latest", lambda ik, fields: queued.append(ik))
+    feed._ingest_feed_records(
+        [("NSE_FO|1", FeedRecord.from_fields({"ltp": 101.5})), ("NSE_EQ|2", FeedRecord.from_fields({"ltp": 99.0}))]
+    )
+    assert queued == ["NSE_FO|1"]  # the chart-only ltpc key carries no depth
+    assert set(feed._OI_LTP_BY_KEY) == {"NSE_FO|1", "NSE_EQ|2"}
@@ -0,0 +1,101 @@
+"""Shared Upstox HTTP transport: keep-alive reuse, default timeouts and metrics."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.services import upstox_http
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"status": "success", "data": {"path": self.path}}).encode()
+        self.send_response(429 if "throttle" in self.path else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    upstox_http.reset_stats()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_session_reuses_connections_and_records_latency(stub_url):
+    s = upstox_http.build_session(pool_maxsize=4)
+    for i in range(20):
+        r = s.get(f"{stub_url}/v3/historical-candle/NSE_EQ%7CINE{i:03d}/minutes/1/2026-07-24")
+        assert r.json()["status"] == "success"
+    s.get(f"{stub_url}/v2/market-quote/quotes", params={"instrument_key": "NSE_EQ|X"})
+    st = upstox_http.stats()
+    assert st["requests"] == 21 and st["errors"] == 0
+    assert st["handshakes"] == 1 and st["handshakes_by_host"] == {"127.0.0.1": 1}
+    by_ep = {e["endpoint"]: e for e in st["endpoints"]}
+    assert by_ep["GET /v3/historical-candle/:id/minutes/:id/:id"]["count"] == 20
+    assert by_ep["GET /v2/market-quote/quotes"]["count"] == 1
+    assert 0 < by_ep["GET /v2/market-quote/quotes"]["p50_ms"] <= by_ep["GET /v2/market-quote/quotes"]["p99_ms"]
+    s.close()
+
+
+def test_default_timeout_applied_when_caller_passes_none(stub_url, monkeypatch):
+    s = upstox_http.build_session(timeout=(1.5, 2.5))
+    seen = []
+    adapter = s.get_adapter("http://")
+    orig = type(adapter).__mro__[1].send
+
+    def spy(self, request, **kw):
+        seen.append(kw.get("timeout"))
+        return orig(self, request, **kw)
+
+    monkeypatch.setattr(type(adapter).__mro__[1], "send", spy)
+    s.get(f"{stub_url}/a")
+    s.get(f"{stub_url}/b", timeout=7)
+    assert seen == [(1.5, 2.5), 7]
+
+
+def test_all_upstox_service_instances_share_the_process_session(stub_url):
+    from backend.services.upstox_service import UpstoxService
+
+    upstox_http.reset_session()
+    for i in range(3):
+        svc = UpstoxService(api_key="", api_secret="", access_token="t")
+        assert svc.make_api_request(f"{stub_url}/v2/user/profile", max_retries=1)["status"] == "success"
+    st = upstox_http.stats()
+    assert st["requests"] == 3 and st["handshakes"] == 1
+    upstox_http.reset_session()
+
+
+def test_upstox_host_requests_draw_from_family_budgets(stub_url, monkeypatch):
+    from backend.services import upstox_rate_limiter as rl
+    from backend.services.upstox_service import UpstoxService
+
+    monkeypatch.setattr(rl, "_FAMILY_LIMITERS", {"quote": rl.SlidingWindowRateLimiter([(3, 60.0)])})
+    monkeypatch.setattr(rl, "_FAMILY_COUNTERS", {f: dict.fromkeys(("granted", "denied", "responses", "http_429"), 0) for f in rl.API_FAMILIES})
+    s = upstox_http.build_session(budget_hosts=("127.0.0.1",))
+    s.get(f"{stub_url}/v2/market-quote/ltp")
+    s.get(f"{stub_url}/v2/market-quote/throttle")  # Upstox answers 429
+    s.get(f"{stub_url}/v2/unbudgeted/path")
+    fam = rl.family_stats()["quote"]
+    assert fam["granted"] == 2 and fam["responses"] == 2 and fam["http_429"] == 1
+    assert fam["cap_scale"] == 0.5  # 3/min -> 1/min, already used: next quote is denied unsent
+    with pytest.raises(upstox_http.BudgetDenied):
+        s.get(f"{stub_url}/v2/market-quote/ltp")
+    assert upstox_http.stats()["requests"] == 3 and rl.family_stats()["quote"]["denied"] == 1
+    # make_api_request treats a denied slot as "no data" without retrying.
+    monkeypatch.setattr("backend.services.upstox_service._http_session", lambda: s)
+    svc = UpstoxService(api_key="", api_secret="", access_token="t")
+    assert svc.make_api_request(f"{stub_url}/v2/market-quote/quotes") is None
+    assert upstox_http.stats()["requests"] == 3
+    s.close()
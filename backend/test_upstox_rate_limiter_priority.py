@@ -57,3 +57,177 @@ def test_scheduled_execution_context_enables_workers(monkeypatch):
         t.start()
         t.join()
     assert results == [True]
+
+
+def test_background_worker_yields_first(monkeypatch):
+    lim = rl.SlidingWindowRateLimiter([(10, 1800.0)])
+    monkeypatch.setattr(rl, "_get_limiter", lambda: lim)
+    rl._denied_background = rl._background_acquired = 0
+
+    class _Settings:
+        UPSTOX_CANDLE_RATE_LIMIT_ENABLED = True
+        UPSTOX_CANDLE_RL_PER_30MIN = 10
+        SCHEDULED_CANDLE_RL_HEADROOM = 2
+        UPSTOX_CANDLE_RL_MAX_WAIT = 0.05
+        UPSTOX_CANDLE_RL_BACKGROUND_MAX_WAIT = 0.05
+
+    import backend.config as cfg
+
+    monkeypatch.setattr(cfg, "settings", _Settings())
+    for _ in range(7):
+        lim.acquire(max_wait=0.01)
+
+    # 7 used of 10: discretionary still fits under 10 - 2, background (2x headroom) does not.
+    with rl.background_candle_worker():
+        assert rl.acquire_candle_slot() is False
+    assert rl.acquire_candle_slot() is True
+    assert rl._denied_background == 1
+
+    monkeypatch.setattr(rl, "_LIMITER", rl.SlidingWindowRateLimiter([(100, 1.0)]))
+    monkeypatch.setattr(rl, "_get_limiter", lambda: rl._LIMITER)
+    with rl.candle_warm_execution("scheduled_10m"):
+        with rl.background_candle_worker():
+            assert rl.acquire_candle_slot() is False
+    with rl.background_candle_worker():
+        assert rl.acquire_candle_slot() is True
+    assert rl._background_acquired == 1 and rl.stats()["denied_background"] == 2
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_market_open_burst_simulation_fake_clock():
+    """09:15 burst: a 200-key scheduled warm, 40 scanner reads and 20 background
+    refreshes queue at once under prod caps; an exit check arrives 3 s later."""
+    P = rl.CandlePriority
+    clock = _FakeClock()
+    lim = rl.SlidingWindowRateLimiter([(5, 1.0), (120, 60.0), (1500, 1800.0)], min_interval=0.2, clock=clock)
+    warm = [lim.submit(P.SCHEDULED, deadline=300.0) for _ in range(200)]
+    scans = [lim.submit(P.SCANNER, deadline=90.0) for _ in range(40)]
+    backfill = [lim.submit(P.BACKFILL, deadline=20.0) for _ in range(20)]
+    exit_check = None
+    grants = []
+    while True:
+        nxt = lim.dispatch()
+        if exit_check is None and nxt > 3.0:
+            clock.now = 3.0
+            exit_check = lim.submit(P.ORDER, deadline=13.0)
+            continue
+        if nxt == float("inf"):
+            break
+        clock.now = nxt
+    tickets = warm + scans + backfill + [exit_check]
+    grants = sorted((t.decided_at, t.seq) for t in tickets if t.state == "granted")
+    times = [g for g, _ in grants]
+
+    # Caps hold at every instant (and drops never consumed a slot).
+    for i, t0 in enumerate(times):
+        assert sum(1 for t in times[i:] if t < t0 + 1.0) <= 5
+        assert sum(1 for t in times[i:] if t < t0 + 60.0) <= 120
+    assert all(b - a >= 0.2 - 1e-9 for a, b in zip(times, times[1:]))
+    # The exit check jumps ~200 queued warm requests: next slot after arrival.
+    assert exit_check.state == "granted" and exit_check.waited <= 0.2 + 1e-9
+    # FIFO within a class.
+    warm_granted = [t for t in warm if t.state == "granted"]
+    assert [t.decided_at for t in warm_granted] == sorted(t.decided_at for t in warm_granted)
+    assert len(warm_granted) == 200 and max(t.decided_at for t in warm) < 300.0
+    # Weighted, not strict: scanners are served while the warm is still queued.
+    assert min(t.decided_at for t in scans if t.state == "granted") < 2.0
+    # Deadlines: every ticket ends granted or dropped; drops happen by their deadline.
+    assert all(t.state in ("granted", "dropped") for t in tickets)
+    dropped = [t for t in backfill + scans if t.state == "dropped"]
+    assert dropped and all(t.decided_at <= t.deadline for t in dropped)
+    assert len(times) == len(tickets) - len(dropped)
+    classes = lim.class_stats()
+    assert classes["order"]["granted"] == 1 and classes["order"]["max_wait_sec"] <= 0.2
+    assert classes["scheduled"]["granted"] == 200
+    assert classes["backfill"]["dropped"] + classes["backfill"]["granted"] == 20
+
+
+def test_blocking_order_request_jumps_waiting_threads():
+    import time
+
+    P = rl.CandlePriority
+    lim = rl.SlidingWindowRateLimiter([(1000, 1.0)], min_interval=0.05)
+    order: list = []
+    lock = threading.Lock()
+
+    def worker(p, tag):
+        granted, _ = lim.acquire(max_wait=5.0, priority=p)
+        with lock:
+            order.append((tag, granted))
+
+    scanners = [threading.Thread(target=worker, args=(P.SCANNER, f"s{i}")) for i in range(12)]
+    for t in scanners:
+        t.start()
+        time.sleep(0.005)
+    time.sleep(0.05)
+    urgent = threading.Thread(target=worker, args=(P.ORDER, "exit"))
+    urgent.start()
+    for t in scanners + [urgent]:
+        t.join()
+    tags = [tag for tag, ok in order if ok]
+    assert len(tags) == 13
+    assert tags.index("exit") <= 4  # 12 scanners × 50 ms queued ahead of it
+    scan_order = [t for t in tags if t != "exit"]
+    assert scan_order == sorted(scan_order, key=lambda t: int(t[1:]))  # FIFO within class
+
+
+def test_order_request_wakes_timer_sleeping_for_reserved_slot():
+    import time
+
+    P = rl.CandlePriority
+    # Cap 3/s with 1 kept for ORDER: after two scanner grants the next scanner slot
+    # is ~1 s away, while an ORDER slot frees after the 0.2 s spacing.
+    lim = rl.SlidingWindowRateLimiter([(3, 1.0)], min_interval=0.2, order_reserve=1 / 3)
+    t0 = time.monotonic()
+    assert lim.acquire(max_wait=1.0)[0] and lim.acquire(max_wait=1.0)[0]
+    order: list = []
+    lock = threading.Lock()
+
+    def worker(p, tag, max_wait):
+        granted, waited = lim.acquire(max_wait=max_wait, priority=p)
+        with lock:
+            order.append((tag, granted, waited, time.monotonic() - t0))
+
+    scanner = threading.Thread(target=worker, args=(P.SCANNER, "scan", 3.0))
+    scanner.start()
+    time.sleep(0.05)  # the scanner now holds the timer, sleeping toward ~1.0 s
+    urgent = threading.Thread(target=worker, args=(P.ORDER, "exit", 0.3))
+    urgent.start()
+    scanner.join()
+    urgent.join()
+    assert [tag for tag, ok, _, _ in order if ok] == ["exit", "scan"]
+    _, _, exit_waited, exit_at = order[0]
+    assert exit_waited < 0.25 and exit_at < 0.6
+    assert order[1][3] >= 0.95
+
+
+def test_order_reserve_and_429_adaptation_fake_clock():
+    P = rl.CandlePriority
+    clock = _FakeClock()
+    lim = rl.SlidingWindowRateLimiter([(10, 60.0)], clock=clock, order_reserve=0.2, recover_sec=30.0)
+    polls = [lim.submit(P.SCANNER, deadline=100.0) for _ in range(12)]
+    assert sum(t.state == "granted" for t in polls) == 8  # 2 of 10 kept for ORDER
+    exits = [lim.submit(P.ORDER, deadline=1.0) for _ in range(2)]
+    assert all(t.state == "granted" and t.waited == 0.0 for t in exits)
+
+    clock.now = 61.0
+    lim.dispatch()
+    assert sum(t.state == "granted" for t in polls) == 12
+    assert lim.note_throttled() == 0.5  # caps 10 -> 5 (4 unreserved)
+    more = [lim.submit(P.SCANNER, deadline=200.0) for _ in range(4)]
+    assert sum(t.state == "granted" for t in more) == 0  # window already holds 4
+    clock.now = 122.0
+    lim.dispatch()
+    assert lim.scale == 0.7 and sum(t.state == "granted" for t in more) == 4  # +0.1 per 30 s
+    assert rl.endpoint_family("POST", "https://api.upstox.com/v2/order/place") == "order"
+    assert rl.endpoint_family("GET", "https://api.upstox.com/v2/option/chain?x=1") == "option_chain"
+    assert rl.endpoint_family("GET", "https://api.upstox.com/v2/portfolio/short-term-positions") == "portfolio"
+    assert rl.endpoint_family("GET", "https://api.upstox.com/v2/login/authorization/token") is None
+    assert rl._api_priority("order", "POST") == P.ORDER
@@ -0,0 +1,124 @@
+"""Batched WS persistence: coalescing, multi-row upserts, failure re-queue, poison rows."""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend.services import upstox_ws_writer as w
+
+
+def _candle(close: float = 100.0) -> dict:
+    return {
+        "open": 100.0,
+        "high": max(100.0, close),
+        "low": min(100.0, close),
+        "close": close,
+        "oi_open": 1000,
+        "oi_high": 1000,
+        "oi_low": 1000,
+        "oi_close": 1000,
+        "volume": 10,
+        "bid_depth_qty": 5,
+        "ask_depth_qty": 5,
+        "tbq": 1,
+        "tsq": 1,
+        "candle_source": "ltp_tick",
+    }
+
+
+@pytest.fixture(autouse=True)
+def _clean_queue():
+    w._PENDING_1M.clear()
+    w._PENDING_LATEST.clear()
+    yield
+    w._PENDING_1M.clear()
+    w._PENDING_LATEST.clear()
+
+
+def test_enqueue_coalesces_latest_snapshot_per_key():
+    w.enqueue_1m("NSE_FO|1", "2026-07-07T09:30:00+05:30", _candle(100.0))
+    w.enqueue_1m("NSE_FO|1", "2026-07-07T09:30:00+05:30", _candle(101.5))
+    w.enqueue_orderflow_latest("NSE_FO|1", {"ltp": 100.0})
+    w.enqueue_orderflow_latest("NSE_FO|1", {"ltp": 101.5})
+    assert w.queue_depth() == 2
+    assert w._PENDING_1M[("NSE_FO|1", "2026-07-07T09:30:00+05:30")]["close"] == 101.5
+    assert w._PENDING_LATEST["NSE_FO|1"]["ltp"] == 101.5
+
+
+def test_enqueue_copies_candle_so_later_mutation_is_not_seen_mid_flush():
+    c = _candle(100.0)
+    w.enqueue_1m("NSE_FO|1", "m", c)
+    c["close"] = 999.0
+    assert w._PENDING_1M[("NSE_FO|1", "m")]["close"] == 100.0
+
+
+def test_flush_once_writes_multi_row_statements_in_one_commit():
+    for i in range(3):
+        w.enqueue_1m(f"NSE_FO|{i}", "2026-07-07T09:30:00+05:30", _candle())
+        w.enqueue_orderflow_latest(f"NSE_FO|{i}", {"ltp": 100.0, "oi": 5})
+    db = MagicMock()
+    with patch("backend.database.SessionLocal", return_value=db):
+        n = w.flush_once()
+    # 3 rows each into intraday_1m, orderflow_1m and orderflow_latest.
+    assert n == 9
+    assert db.execute.call_count == 3
+    sqls = [c[0][0].text for c in db.execute.call_args_list]
+    assert "upstox_ws_intraday_1m" in sqls[0] and ":ik_2" in sqls[0]
+    assert "upstox_ws_orderflow_1m" in sqls[1]
+    assert "upstox_ws_orderflow_latest" in sqls[2]
+    db.commit.assert_called_once()
+    assert w.queue_depth() == 0
+    st = w.writer_stats()
+    assert st["rows_last_flush"] == 9
+    assert st["queue_depth"] == 0
+
+
+def test_flush_failure_requeues_without_clobbering_newer_snapshot():
+    w.enqueue_1m("NSE_FO|1", "m", _candle(100.0))
+    db = MagicMock()
+
+    def boom(*_a, **_k):
+        # A tick lands while the flush is in flight.
+        w.enqueue_1m("NSE_FO|1", "m", _candle(105.0))
+        raise RuntimeError("db down")
+
+    db.execute.side_effect = boom
+    with patch("backend.database.SessionLocal", return_value=db):
+        assert w.flush_once() == 0
+    db.rollback.assert_called_once()
+    assert w._PENDING_1M[("NSE_FO|1", "m")]["close"] == 105.0
+    assert w.writer_stats()["last_error"] == "db down"
+
+
+def test_poison_row_is_isolated_and_dropped_while_rest_is_written():
+    for i in range(5):
+        w.enqueue_1m(f"NSE_FO|{i}", "m", _candle())
+    w.enqueue_orderflow_latest("NSE_FO|ok", {"ltp": 1.0})
+    db = MagicMock()
+
+    def execute(stmt, params=None):
+        if params and "NSE_FO|3" in params.values():
+            raise RuntimeError("value out of range")
+
+    db.execute.side_effect = execute
+    before = w.writer_stats()["poison_dropped"]
+    with patch("backend.database.SessionLocal", return_value=db):
+        n = w.flush_once()
+    # 4 good 1m rows into two tables, plus the latest row.
+    assert n == 4 * 2 + 1
+    assert w.queue_depth() == 0
+    st = w.writer_stats()
+    assert st["poison_dropped"] == before + 1
+    assert st["dead_letter_recent"][-1]["key"] == "NSE_FO|3@m"
+
+    # The next flush is not poisoned by the dropped row.
+    w.enqueue_1m("NSE_FO|9", "m", _candle())
+    db.execute.reset_mock()
+    with patch("backend.database.SessionLocal", return_value=db):
+        assert w.flush_once() == 2
+
+
+def test_large_batches_are_chunked_per_statement():
+    rows = [(f"NSE_FO|{i}", {"ltp": 1.0}) for i in range(w._ROWS_PER_STATEMENT + 5)]
+    db = MagicMock()
+    assert w.upsert_orderflow_latest_rows(db, rows) == len(rows)
+    assert db.execute.call_count == 2
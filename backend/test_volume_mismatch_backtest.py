@@ -0,0 +1,40 @@
+"""Gap+BB backtest driver: session days and holiday count come from the trading calendar."""
+import logging
+from datetime import date
+
+import pytest
+
+from backend.services import trading_calendar as tc
+
+pytest.importorskip("pandas_ta")  # signal_rules (imported by the backtest) needs it
+
+from backend.services.volume_mismatch import backtest as bt  # noqa: E402
+
+
+def test_backtest_runs_over_range_with_holiday(monkeypatch, tmp_path, caplog):
+    cal = tc.TradingCalendar(known={2026: ["2026-05-01"]}, csv_dir=tmp_path / "no_csv", use_db=False)
+    seen = []
+
+    class _Upstox:
+        access_token = "t"
+
+        def __init__(self, *a, **k):
+            pass
+
+    def _signals(upstox, universe, sd, **kwargs):
+        seen.append(sd)
+        return [{"symbol": "ABC", "direction": "LONG"}], {}
+
+    monkeypatch.setattr(bt, "UpstoxService", _Upstox)
+    monkeypatch.setattr(bt, "get_trading_calendar", lambda: cal)
+    monkeypatch.setattr(bt, "load_volume_mismatch_universe_for_session", lambda sd: [{"instrument_key": "NSE_FO|1"}])
+    monkeypatch.setattr(bt, "collect_gap_bb_signals_for_date", _signals)
+    monkeypatch.setattr(bt.VolumeMismatchCandleCache, "warm_for_backtest", lambda self, *a, **k: {})
+
+    with caplog.at_level(logging.INFO, logger=bt.logger.name):
+        out = bt.run_volume_mismatch_backtest(
+            date(2026, 4, 29), date(2026, 5, 4), day_pause_sec=0, cache_dir=tmp_path / "cache"
+        )
+    assert seen == [date(2026, 4, 29), date(2026, 4, 30), date(2026, 5, 4)]
+    assert out["summary"]["trading_days_scanned"] == 3 and out["summary"]["total_signals"] == 3
+    assert "3 trading days (1 NSE holidays skipped)" in caplog.text
@@ -0,0 +1,90 @@
+"""Open-position cycle fetch phase: one quote batch, one VWAP per stock, one order book; buy-fill sync reuses it."""
+from types import SimpleNamespace
+
+from backend.services import live_trading
+from backend.services.vwap_updater import CountedBroker, fetch_open_position_market_data
+
+
+class _Broker:
+    def get_instrument_key(self, symbol):
+        return f"NSE_EQ|{symbol}"
+
+    def get_market_quote_snapshots_batch(self, keys, max_per_request=100, **kwargs):
+        out = {}
+        for k in keys:
+            if k == "NSE_EQ|HALTED":
+                out[k] = {"last_price": 0.0, "ohlc": {"close": 55.0}}
+            elif k != "NSE_FO|MISSING":
+                out[k] = {"last_price": 100.0 + len(k), "ohlc": {}}
+        return out
+
+    def get_stock_vwap(self, symbol):
+        return 99.5
+
+    def get_order_book_today(self):
+        return {"success": True, "orders": []}
+
+    def get_market_quote_by_key(self, key):
+        raise AssertionError("single-key quote in fetch phase")
+
+
+def test_fetch_phase_batches_reads_per_cycle():
+    broker = CountedBroker(_Broker())
+    positions = [
+        ("RELIANCE", "NSE_FO|1"),
+        ("RELIANCE", "NSE_FO|2"),  # two strikes on one stock share its quote and candles
+        ("TCS", "NSE_FO|3"),
+        ("HALTED", "NSE_FO|MISSING"),
+    ]
+    market = fetch_open_position_market_data(broker, positions, with_order_book=True)
+
+    assert broker.calls == {
+        "get_market_quote_snapshots_batch": 1,
+        "get_stock_vwap": 3,
+        "get_order_book_today": 1,
+    }
+    assert broker.total_calls == 5
+    assert market.stock_ltp("RELIANCE") == 100.0 + len("NSE_EQ|RELIANCE")
+    assert market.stock_ltp("HALTED") == 55.0  # zero last price falls back to day close
+    assert market.stock_ltp("UNKNOWN") is None
+    assert market.option_quote("NSE_FO|3")["last_price"] > 0
+    assert market.option_quote("NSE_FO|MISSING") is None
+    assert market.stock_vwap == {"RELIANCE": 99.5, "TCS": 99.5, "HALTED": 99.5}
+    assert market.order_book == {"success": True, "orders": []}
+
+
+def test_buy_fill_sync_uses_prefetched_order_book(monkeypatch):
+    class _Upstox:
+        def get_order_book_today(self):
+            raise AssertionError("order book refetched per trade")
+
+        def get_order_details(self, oid):
+            raise AssertionError("order details fetched although the book has the fill")
+
+    monkeypatch.setattr(live_trading, "is_trading_live_enabled", lambda: True)
+    monkeypatch.setattr(live_trading, "upstox_service", _Upstox())
+    trade = SimpleNamespace(
+        status="bought",
+        instrument_key="NSE_FO|1",
+        buy_price=10.0,
+        qty=100,
+        buy_order_id="240101000001",
+        stop_loss=9.0,
+        sell_price=None,
+        option_ltp=10.0,
+        stock_name="RELIANCE",
+    )
+    book = {
+        "orders": [
+            {
+                "order_id": "240101000001",
+                "transaction_type": "BUY",
+                "status": "complete",
+                "filled_quantity": 100,
+                "average_price": 10.4,
+            }
+        ]
+    }
+    monkeypatch.setattr("sqlalchemy.orm.attributes.flag_modified", lambda *a: None)
+    assert live_trading.sync_trade_buy_fill_from_broker(None, trade, order_book=book) is True
+    assert trade.buy_price == 10.4
@@ -0,0 +1,60 @@
+"""Webhook enrichment: dedupe, order, concurrency, and parity of the real per-stock path."""
+import logging
+import threading
+import time
+
+from backend.scripts.replay_webhooks import StubBroker, payload_stocks, replay, stubbed_instruments, synthetic_payload
+from backend.services.webhook_enrichment import (
+    StageTimer,
+    archive_webhook_payload,
+    enrich_webhook_stocks,
+    iter_archived_payloads,
+)
+
+
+def test_order_dedupe_and_overlap():
+    calls = []
+    lock = threading.Lock()
+
+    def enrich_one(stock):
+        with lock:
+            calls.append(stock["stock_name"])
+        time.sleep(0.1)
+        return {"stock_name": stock["stock_name"], "trigger_price": stock["trigger_price"], "ok": True}
+
+    stocks = [{"stock_name": n, "trigger_price": float(i)} for i, n in enumerate("ABCDEFGH")]
+    stocks.append({"stock_name": "c ", "trigger_price": 99.0})
+    timer = StageTimer("t")
+    t0 = time.perf_counter()
+    out = enrich_webhook_stocks(stocks, enrich_one, max_workers=8, timer=timer)
+    elapsed = time.perf_counter() - t0
+
+    assert sorted(calls) == list("ABCDEFGH")  # the repeated name is enriched once
+    assert [r["stock_name"] for r in out] == list("ABCDEFGHC")
+    assert out[-1]["trigger_price"] == 99.0 and out[2]["trigger_price"] == 2.0
+    assert out[-1] is not out[2]
+    assert elapsed < 0.5  # 8 × 0.1 s sequential would be 0.8 s
+    assert list(timer.as_dict()) == ["enrich", "total"]
+
+
+def test_concurrent_replay_matches_sequential():
+    logging.disable(logging.WARNING)
+    try:
+        payload = synthetic_payload(10)
+        with stubbed_instruments([s["stock_name"] for s in payload_stocks(payload)]):
+            seq, _ = replay(payload, None, StubBroker(latency=0.0), workers=1)
+            par, _ = replay(payload, None, StubBroker(latency=0.0), workers=6)
+    finally:
+        logging.disable(logging.NOTSET)
+    assert seq == par
+    assert len(par) == 10 and all(r.get("instrument_key") and r.get("qty") for r in par)
+    assert all(r["option_type"] == "CE" for r in par)
+
+
+def test_archive_roundtrip(tmp_path):
+    payload = {"stocks": "RELIANCE,TCS", "trigger_prices": "1300,4100"}
+    path = archive_webhook_payload(payload, "bullish", directory=tmp_path)
+    archive_webhook_payload(payload, None, directory=tmp_path)
+    entries = list(iter_archived_payloads(path))
+    assert [e["forced_type"] for e in entries] == ["bullish", None]
+    assert entries[0]["payload"] == payload
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Wall-clock benchmark: HA Momentum variant sweep, engine_v2 serial loop vs engine_vec.
+
+Uses cached 15m candles (``data/candles``) when ``--cached`` is given and the
+universe is available, otherwise generates ``--symbols`` random-walk series over
+the backtest window. Both engines run the first ``--variants`` VARIANTS and the
+outputs are compared row-for-row.
+
+    PYTHONPATH=. python backtest/bench_sweep.py --symbols 200 --variants 10
+    PYTHONPATH=. python backtest/bench_sweep.py --cached --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backtest.engine_v2 import candles_to_df, nifty_session_vwap, run_prepared
+from backtest.engine_vec import prepare_arrays, run_sweep
+from backtest.fetch_candles import BACKTEST_FROM, BACKTEST_TO, load_cached
+from backtest.run_backtest_v3 import VARIANTS
+
+
+def synthetic_candles(seed: int, from_d: date, to_d: date) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    px, drift, out = 100.0 + (seed * 37) % 2400, 0.0, []
+    d = from_d - timedelta(days=7)  # indicator warm-up before the window
+    while d <= to_d:
+        if d.weekday() < 5:
+            for b in range(25):
+                if b % 4 == 0:
+                    drift = rnd.gauss(0, 0.004)
+                t = datetime(d.year, d.month, d.day, 9, 15) + timedelta(minutes=15 * b)
+                o = px
+                c = o * (1 + drift + rnd.gauss(0, 0.003))
+                px = c
+                out.append(
+                    {
+                        "timestamp": t.strftime("%Y-%m-%dT%H:%M:%S+05:30"),
+                        "open": o,
+                        "high": max(o, c) * (1 + abs(rnd.gauss(0, 0.0015))),
+                        "low": min(o, c) * (1 - abs(rnd.gauss(0, 0.0015))),
+                        "close": c,
+                        "volume": rnd.randint(100, 90000),
+                    }
+                )
+        d += timedelta(days=1)
+    return out
+
+
+def load_items(args, from_d: date, to_d: date) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[Dict[str, Any]]]:
+    if args.cached:
+        from backtest.fetch_candles import load_universe
+        from backtest.fetch_nifty_candles import NIFTY_KEY, NIFTY_SYMBOL
+        from backtest.run_backtest_v2 import _lot_index
+
+        lots = _lot_index()
+        items = []
+        for u in load_universe()[: args.symbols]:
+            cached = load_cached(u["stock"], u["ikey"])
+            if cached and cached.get("candles") and lots.get(u["ikey"]):
+                items.append((u["stock"], {"candles": cached["candles"], "ikey": u["ikey"], "lot": lots[u["ikey"]]}))
+        nifty = (load_cached(NIFTY_SYMBOL, NIFTY_KEY) or {}).get("candles") or []
+        return items, nifty
+    items = [
+        (f"SYN{s:03d}", {"candles": synthetic_candles(s, from_d, to_d), "ikey": f"NSE_FO|{60000 + s}", "lot": 25 * (1 + s % 20)})
+        for s in range(args.symbols)
+    ]
+    return items, synthetic_candles(10_000, from_d, to_d)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the HA Momentum variant sweep.")
+    ap.add_argument("--symbols", type=int, default=200)
+    ap.add_argument("--variants", type=int, default=10)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--cached", action="store_true", help="use data/candles + arbitrage_master universe")
+    ap.add_argument("--skip-v2", action="store_true", help="only time the vectorized engine")
+    args = ap.parse_args()
+    logging.getLogger("ha_engine_v2").setLevel(logging.ERROR)  # Nifty forward-fill warnings
+
+    from_d, to_d = date.fromisoformat(BACKTEST_FROM), date.fromisoformat(BACKTEST_TO)
+    variants = VARIANTS[: args.variants]
+    items, nifty = load_items(args, from_d, to_d)
+    n_closes, n_vwaps, _ = nifty_session_vwap(nifty)
+
+    t0 = time.perf_counter()
+    for _, pack in items:
+        pack["df"] = candles_to_df(pack["candles"])
+    t_prep = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _, pack in items:
+        pack["arrays"] = prepare_arrays(pack["df"])
+    t_arr = time.perf_counter() - t0
+    bars = sum(len(p["df"]) for _, p in items)
+    print(f"{len(items)} symbols, {bars} bars, {len(variants)} variants; indicators {t_prep:.1f}s, arrays {t_arr:.2f}s")
+
+    kw = dict(from_d=from_d, to_d=to_d, nifty_closes=n_closes, nifty_vwaps=n_vwaps)
+    t0 = time.perf_counter()
+    serial = run_sweep(items, variants, workers=0, **kw)
+    t_vec = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pooled = run_sweep(items, variants, workers=args.workers, **kw)
+    t_pool = time.perf_counter() - t0
+    n_trades = sum(len(t) for t, _ in serial)
+    print(f"  engine_vec in-process      {t_vec:8.2f} s   ({n_trades} trades)")
+    print(f"  engine_vec {args.workers:2d} workers      {t_pool:8.2f} s   {'OK' if pooled == serial else 'MISMATCH'}")
+    if args.skip_v2:
+        return 0 if pooled == serial else 2
+
+    t0 = time.perf_counter()
+    ref = []
+    for v in variants:
+        tr, sk = [], []
+        for sym, pack in items:
+            a, b = run_prepared(pack["df"], symbol=sym, instrument_key=pack["ikey"], lot_qty=pack["lot"], variant=v, **kw)
+            tr.extend(a)
+            sk.extend(b)
+        ref.append((tr, sk))
+    t_v2 = time.perf_counter() - t0
+    same = ref == serial
+    print(f"  engine_v2 serial           {t_v2:8.2f} s   {'OK' if same else 'MISMATCH'} vs engine_vec")
+    print(f"  speedup: {t_v2 / max(t_vec, 1e-9):.0f}x in-process, {t_v2 / max(t_pool, 1e-9):.0f}x pooled")
+    return 0 if same and pooled == serial else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,8 +5,10 @@ import logging
 from datetime import date, datetime, time
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from backend.services.asof_index import AsOfIndex
 from backtest.engine import (
     FORCED_EXIT,
     IST,
@@ -65,24 +67,58 @@ def nifty_session_vwap(candles: List[Dict[str, Any]]) -> Tuple[Dict[pd.Timestamp
     return closes, vwaps, used_vol
 
 
+_NIFTY_INDEX: Dict[str, Any] = {}
+
+
+def _nifty_index(closes: Dict) -> Tuple[AsOfIndex, List[pd.Timestamp]]:
+    """As-of index over the Nifty close map, rebuilt only when a different/changed map is passed."""
+    c = _NIFTY_INDEX
+    if c.get("map") is not closes or c.get("len") != len(closes):
+        keys = list(closes)
+        c.update(map=closes, len=len(closes), keys=keys, index=AsOfIndex([pd.Timestamp(k).value for k in keys]), warned=False)
+    return c["index"], c["keys"]
+
+
 def _lookup_nifty(ts: datetime, closes: Dict, vwaps: Dict) -> Tuple[Optional[float], Optional[float]]:
     if not closes:
         return None, None
     key = pd.Timestamp(ts)
     if key.tzinfo is None:
         key = key.tz_localize(IST)
-    if key in closes:
-        return closes[key], vwaps.get(key)
-    logger.warning("Nifty VWAP missing at %s — forward-filling last known", key)
-    earlier = [k for k in closes if k <= key and k.date() == key.date()]
-    if not earlier:
-        earlier = [k for k in closes if k <= key]
-    if not earlier:
+    index, keys = _nifty_index(closes)
+    pos = index.asof(int(key.value))
+    if pos < 0:
         return None, None
-    last = max(earlier)
+    last = keys[index.source(pos)]
+    if index.ts[pos] != key.value:
+        # Forward-fill from the latest bar at or before ts (a same-day bar, if any, is that bar).
+        if not _NIFTY_INDEX["warned"]:
+            logger.warning("Nifty VWAP missing at %s — forward-filling last known (further misses at DEBUG)", key)
+            _NIFTY_INDEX["warned"] = True
+        else:
+            logger.debug("Nifty VWAP missing at %s — forward-filling last known", key)
     return closes[last], vwaps.get(last)
 
 
+def nifty_asof_join(ts_ns: np.ndarray, closes: Dict, vwaps: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Nifty close / VWAP as of every bar in ``ts_ns`` (UTC epoch ns) in one ``searchsorted``;
+    NaN where ``_lookup_nifty`` would return None.
+    """
+    n = len(ts_ns)
+    if not closes:
+        return np.full(n, np.nan), np.full(n, np.nan)
+    index, keys = _nifty_index(closes)
+    pos = index.asof_positions(ts_ns)
+    close_by_pos = np.array([float(closes[keys[k]]) for k in index.order], dtype=np.float64)
+    vwap_by_pos = np.array(
+        [float(vwaps[keys[k]]) if vwaps.get(keys[k]) is not None else np.nan for k in index.order], dtype=np.float64
+    )
+    found = pos >= 0
+    safe = np.where(found, pos, 0)
+    return np.where(found, close_by_pos[safe], np.nan), np.where(found, vwap_by_pos[safe], np.nan)
+
+
 def simulate_trade(
     df: pd.DataFrame,
     i: int,
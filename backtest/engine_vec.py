@@ -0,0 +1,451 @@
+"""HA Momentum v2 simulation on NumPy arrays, with a process-pool variant sweep.
+
+Same rules and output rows as ``engine_v2.run_prepared`` / ``simulate_trade``:
+
+* Signal masks (long/short, indicator warm-up, date/clock window) are computed
+  once per symbol as boolean arrays and shared by every variant.
+* Per variant, the day's first consuming signal is found with ``np.unique`` over
+  the candidate days; SHORT-only "long filtered" rows before it are kept as skips.
+* Nifty close/VWAP for every bar comes from one ``nifty_asof_join``.
+* Exits are resolved for all entries of a variant at once: a (trades x bars-left-
+  in-session) window matrix, first-hit offsets for SL / T1 / T2 and the
+  session/forced-exit boundary from ``searchsorted``.
+
+``run_sweep`` writes the prepared columns of every symbol to one set of ``.npy``
+files, and worker processes memory-map them instead of receiving pickled frames.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import IST, LARGE_CANDLE_THRESHOLD_PCT, SIGNAL_START, WARMUP, _pnl
+from backtest.engine_v2 import SIGNAL_SCAN_END, SLIPPAGE_PCT, nifty_asof_join
+
+NS_PER_SEC = 1_000_000_000
+NS_PER_DAY = 86_400 * NS_PER_SEC
+COLUMNS = ("ts_ns", "local_ns", "open", "high", "low", "close", "ema5", "ema15", "ema50", "macd_hist", "adx14", "adx14_prev")
+_EPOCH = date(1970, 1, 1)
+
+Rows = List[Dict[str, Any]]
+
+
+def _sod(t) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def prepare_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Columns of a ``candles_to_df`` frame as contiguous arrays (UTC and IST wall-clock ns timestamps)."""
+    ts = df["ts"]
+    out = {
+        "ts_ns": ts.dt.tz_convert("UTC").dt.tz_localize(None).values.astype("datetime64[ns]").astype(np.int64),
+        "local_ns": ts.dt.tz_localize(None).values.astype("datetime64[ns]").astype(np.int64),
+    }
+    for c in COLUMNS[2:]:
+        out[c] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return out
+
+
+def _to_datetime(ts_ns: int) -> datetime:
+    return pd.Timestamp(int(ts_ns), tz="UTC").tz_convert(IST).to_pydatetime()
+
+
+def variant_params(variant: Dict[str, Any]) -> Dict[str, Any]:
+    """``run_prepared``'s reading of a VARIANTS entry."""
+    exit_s = str(variant.get("forced_exit") or "15:00")
+    raw_pct = variant.get("fixed_sl_pct")
+    return {
+        "name": str(variant["name"]),
+        "cutoff_s": _sod(datetime.strptime(str(variant.get("entry_cutoff") or variant.get("cutoff") or "14:45"), "%H:%M").time()),
+        "exit_s": exit_s,
+        "forced_exit_s": _sod(datetime.strptime(exit_s, "%H:%M").time()),
+        "rr_t1": float(variant["rr_t1"]),
+        "rr_t2": float(variant["rr_t2"]),
+        "use_fixed": bool(variant.get("use_fixed_sl")),
+        "fixed_pct": float(raw_pct) if raw_pct is not None else 0.004,
+        "sl_cap": float(variant.get("sl_cap_rs") if variant.get("sl_cap_rs") is not None else variant.get("sl_cap") or 5000),
+        "nifty_filter": bool(variant.get("nifty_filter")),
+        "short_only": bool(variant.get("short_only")),
+    }
+
+
+class SymbolSignals:
+    """Per-symbol arrays and the variant-independent signal masks."""
+
+    def __init__(self, a: Dict[str, np.ndarray], from_d: date, to_d: date):
+        self.a = a
+        n = self.n = len(a["close"])
+        day = self.day = a["local_ns"] // NS_PER_DAY
+        self.sod = (a["local_ns"] % NS_PER_DAY) // NS_PER_SEC
+        self.session_key = day * 86_400 + self.sod
+        e5, e15, e50, mh, adx, adxp = (a[c] for c in ("ema5", "ema15", "ema50", "macd_hist", "adx14", "adx14_prev"))
+        p5 = np.concatenate(([np.nan], e5[:-1])) if n else e5
+        p15 = np.concatenate(([np.nan], e15[:-1])) if n else e15
+        with np.errstate(invalid="ignore"):
+            self.long = (e5 > e15) & (p5 <= p15) & (e15 > e50) & (e5 > e50) & (mh > 0) & (adx > 20) & (adx > adxp)
+            self.short = (e5 < e15) & (p5 >= p15) & (e15 < e50) & (e5 < e50) & (mh < 0) & (adx > 20) & (adx > adxp)
+        valid = ~(np.isnan(e50) | np.isnan(adx) | np.isnan(adxp))
+        window = (
+            (np.arange(n) >= max(WARMUP, 1))
+            & (day >= (from_d - _EPOCH).days)
+            & (day <= (to_d - _EPOCH).days)
+            & (self.sod >= _sod(SIGNAL_START))
+            & (self.sod <= _sod(SIGNAL_SCAN_END))
+        )
+        self.cand = window & valid & (self.long | self.short)
+
+    def first_hits(
+        self, idx: np.ndarray, is_long: np.ndarray, sl: np.ndarray, t1: np.ndarray, t2: np.ndarray, forced_exit_s: int
+    ) -> Dict[str, np.ndarray]:
+        """Resolve exits for entry bars ``idx`` at once (same bar order as ``simulate_trade``: SL, then T1, then T2)."""
+        a, n = self.a, self.n
+        # First bar after entry that is on another day or at/after the forced exit clock.
+        stop = np.maximum(idx + 1, np.searchsorted(self.session_key, self.day[idx] * 86_400 + forced_exit_s, side="left"))
+        width = max(1, int((stop - idx - 1).max(initial=0)))
+        off = np.arange(width)
+        win = idx[:, None] + 1 + off
+        inwin = win < stop[:, None]
+        win = np.minimum(win, n - 1)
+        hi, lo = a["high"][win], a["low"][win]
+        lg = is_long[:, None]
+        sl_m = inwin & np.where(lg, lo <= sl[:, None], hi >= sl[:, None])
+        t1_m = inwin & np.where(lg, hi >= t1[:, None], lo <= t1[:, None])
+        t2_m = inwin & np.where(lg, hi >= t2[:, None], lo <= t2[:, None])
+
+        def first(m):
+            return np.where(m.any(axis=1), m.argmax(axis=1), width)
+
+        fs, f1, f2 = first(sl_m), first(t1_m), first(t2_m)
+        hit_off = np.minimum(fs, f2)
+        hit = hit_off < width
+        sl_first = hit & (fs <= f2)
+        t2_first = hit & ~sl_first
+        t1_hit = np.where(sl_first, f1 < fs, np.where(t2_first, f1 <= f2, f1 < width))
+        # Bars seen by the MFE/MAE trackers: through the exit bar on a hit, else every in-session bar.
+        seen = inwin & (off[None, :] <= np.where(hit, hit_off, width)[:, None])
+        max_hi = np.where(seen, hi, -np.inf).max(axis=1)
+        min_lo = np.where(seen, lo, np.inf).min(axis=1)
+        exit_bar = np.where(hit, idx + 1 + hit_off, np.where(stop < n, stop, n - 1))
+        return {
+            "sl_hit": sl_first,
+            "t2_hit": t2_first,
+            "t1_hit": t1_hit,
+            "time_exit_open": ~hit & (stop < n),
+            "exit_bar": exit_bar,
+            "max_hi": max_hi,
+            "min_lo": min_lo,
+        }
+
+
+def _skip_row(direction: str, ts: datetime, lot_qty: int, reason: str) -> Dict[str, Any]:
+    return {
+        "direction": direction,
+        "signal_time": ts,
+        "entry_price": None,
+        "sl_price": None,
+        "sl_distance": None,
+        "sl_rs": None,
+        "lot_qty": lot_qty,
+        "skipped": True,
+        "reason": reason,
+    }
+
+
+def run_symbol_variants(
+    sig: SymbolSignals,
+    *,
+    symbol: str,
+    instrument_key: str,
+    lot_qty: int,
+    variants: Sequence[Dict[str, Any]],
+    nifty_closes: Dict,
+    nifty_vwaps: Dict,
+) -> List[Tuple[Rows, Rows]]:
+    """``[(trades, skipped)]`` per variant, row-for-row equal to ``engine_v2.run_prepared``."""
+    a = sig.a
+    cand_idx = np.flatnonzero(sig.cand)
+    n_close_at, n_vwap_at = nifty_asof_join(a["ts_ns"], nifty_closes, nifty_vwaps)
+    dt_at: Dict[int, datetime] = {}
+
+    def when(i: int) -> datetime:
+        if i not in dt_at:
+            dt_at[i] = _to_datetime(a["ts_ns"][i])
+        return dt_at[i]
+
+    def nifty(i: int) -> Tuple[Optional[float], Optional[float]]:
+        c, v = n_close_at[i], n_vwap_at[i]
+        return (None if np.isnan(c) else float(c)), (None if np.isnan(v) else float(v))
+
+    results: List[Tuple[Rows, Rows]] = []
+    for variant in variants:
+        p = variant_params(variant)
+        short_only = p["short_only"]
+        consume = cand_idx[sig.short[cand_idx]] if short_only else cand_idx
+        days, first_pos = np.unique(sig.day[consume], return_index=True)
+        entries = consume[first_pos]
+        events: List[Tuple[int, str]] = [(int(i), "entry") for i in entries]
+        if short_only:
+            # LONG-only signals before the day's SHORT entry are reported, and don't consume the day.
+            entry_of_day = dict(zip(days.tolist(), entries.tolist()))
+            long_only = cand_idx[sig.long[cand_idx] & ~sig.short[cand_idx]]
+            events += [
+                (int(i), "long_filtered")
+                for i in long_only
+                if int(sig.day[i]) not in entry_of_day or i < entry_of_day[int(sig.day[i])]
+            ]
+            events.sort()
+
+        def stamp(sim: Dict[str, Any], i: int) -> Dict[str, Any]:
+            n_close, n_vwap = nifty(i)
+            sim["symbol"] = symbol
+            sim["instrument_key"] = instrument_key
+            sim["variant"] = p["name"]
+            sim["use_fixed_sl"] = p["use_fixed"]
+            sim["fixed_sl_pct"] = round(p["fixed_pct"], 4) if p["use_fixed"] else None
+            sim["forced_exit_time"] = p["exit_s"]
+            sim["nifty_close_signal"] = round(n_close, 2) if n_close is not None else None
+            sim["nifty_vwap_signal"] = round(n_vwap, 2) if n_vwap is not None else None
+            sim["nifty_above_vwap"] = None if n_close is None or n_vwap is None else n_close > n_vwap
+            return sim
+
+        # Decide each event; entries that reach simulate_trade are resolved together below.
+        plan: List[Tuple[int, str, Optional[str], Optional[str]]] = []  # (bar, kind, direction, skip reason)
+        for i, kind in events:
+            if kind == "long_filtered":
+                plan.append((i, "skip", "LONG", "LONG_FILTERED_SHORT_ONLY_MODE"))
+                continue
+            direction = "SHORT" if short_only else ("LONG" if sig.long[i] else "SHORT")
+            if sig.sod[i] > p["cutoff_s"]:
+                plan.append((i, "skip", direction, "ENTRY_AFTER_1330_CUTOFF"))
+                continue
+            if p["nifty_filter"] and direction == "LONG":
+                n_close, n_vwap = nifty(i)
+                if n_close is not None and n_vwap is not None and not n_close > n_vwap:
+                    plan.append((i, "skip", direction, "NIFTY_BELOW_VWAP_LONG_FILTERED"))
+                    continue
+            plan.append((i, "sim", direction, None))
+
+        sims = _simulate_entries(sig, [(i, d) for i, k, d, _ in plan if k == "sim"], lot_qty, p)
+        trades: Rows = []
+        skipped: Rows = []
+        for i, kind, direction, reason in plan:
+            if kind == "skip":
+                skipped.append(stamp(_skip_row(direction, when(i), lot_qty, reason), i))
+                continue
+            sim = stamp(sims[i](when), i)
+            (skipped if sim.get("skipped") else trades).append(sim)
+        results.append((trades, skipped))
+    return results
+
+
+def _simulate_entries(sig: SymbolSignals, entries: List[Tuple[int, str]], lot_qty: int, p: Dict[str, Any]) -> Dict[int, Any]:
+    """Entry rows for ``(bar, direction)`` pairs; exits of all live trades come from one ``first_hits`` call."""
+    if not entries:
+        return {}
+    a = sig.a
+    idx = np.array([i for i, _ in entries], dtype=np.int64)
+    is_long = np.array([d == "LONG" for _, d in entries])
+    close, high, low = a["close"][idx], a["high"][idx], a["low"][idx]
+    prev_high, prev_low = a["high"][idx - 1], a["low"][idx - 1]
+    entry = np.where(is_long, close * (1.0 + SLIPPAGE_PCT), close * (1.0 - SLIPPAGE_PCT))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        candle_pct = np.where(low != 0, np.abs(high - low) / low * 100.0, 0.0)
+    use_prev = candle_pct > LARGE_CANDLE_THRESHOLD_PCT
+    if p["use_fixed"]:
+        sl = np.where(is_long, entry * (1.0 - p["fixed_pct"]), entry * (1.0 + p["fixed_pct"]))
+    else:
+        sl = np.where(is_long, np.where(use_prev, prev_low, low), np.where(use_prev, prev_high, high))
+    risk = np.abs(entry - sl)
+    sl_rs = risk * lot_qty
+    sign = np.where(is_long, 1.0, -1.0)
+    t1 = entry + sign * p["rr_t1"] * risk
+    t2 = entry + sign * p["rr_t2"] * risk
+    # simulate_trade computes entry ± rr * risk; the sign multiply keeps that exact (±1.0 * x == ±x).
+    skip_cap = (not p["use_fixed"]) & (sl_rs > p["sl_cap"])
+    live = ~skip_cap & (risk > 0) & (lot_qty > 0)
+    hits = sig.first_hits(idx[live], is_long[live], sl[live], t1[live], t2[live], p["forced_exit_s"]) if live.any() else None
+    live_pos = np.cumsum(live) - 1
+
+    out: Dict[int, Any] = {}
+    for k, (i, direction) in enumerate(entries):
+
+        def build(when, k=k, i=i, direction=direction):
+            long_ = direction == "LONG"
+            row = {
+                "direction": direction,
+                "signal_time": when(i),
+                "entry_price": round(float(entry[k]), 2),
+                "sl_price": round(float(sl[k]), 2),
+                "sl_distance": round(float(risk[k]), 4),
+                "sl_rs": round(float(sl_rs[k]), 2),
+                "lot_qty": int(lot_qty),
+                "t1_price": round(float(t1[k]), 2),
+                "t2_price": round(float(t2[k]), 2),
+                "entry_candle_size_pct": round(float(candle_pct[k]), 4),
+                "sl_used_prev_candle": bool(use_prev[k]) and not p["use_fixed"],
+                "sl_logic_used": "FIXED_PCT" if p["use_fixed"] else "CANDLE_LOW",
+                "skipped": bool(skip_cap[k]),
+                "reason": "SL_EXCEEDS_CAP" if skip_cap[k] else None,
+                "use_fixed_sl": p["use_fixed"],
+                "fixed_sl_pct": round(p["fixed_pct"], 4) if p["use_fixed"] else None,
+                "forced_exit_time": p["exit_s"],
+            }
+            if not live[k]:
+                return row
+            j = live_pos[k]
+            e, s, tp1, tp2 = float(entry[k]), float(sl[k]), float(t1[k]), float(t2[k])
+            bar = int(hits["exit_bar"][j])
+            t1_hit, t2_hit, sl_hit = bool(hits["t1_hit"][j]), bool(hits["t2_hit"][j]), bool(hits["sl_hit"][j])
+            if sl_hit:
+                reason, exit_px = ("T1_THEN_SL" if t1_hit else "SL_HIT"), s
+            elif t2_hit:
+                reason, exit_px = ("T1_THEN_T2" if t1_hit else "T2_HIT"), tp2
+            elif hits["time_exit_open"][j]:
+                reason, exit_px = "TIME_EXIT", float(a["open"][bar])
+            else:
+                reason, exit_px = "TIME_EXIT", float(a["close"][bar])
+            mfe = max(float(high[k]), float(hits["max_hi"][j])) if long_ else min(float(low[k]), float(hits["min_lo"][j]))
+            mae = min(float(low[k]), float(hits["min_lo"][j])) if long_ else max(float(high[k]), float(hits["max_hi"][j]))
+            t1_exit = tp1 if t1_hit else exit_px
+            t2_exit = tp2 if t2_hit else exit_px
+            row.update(
+                {
+                    "t1_hit": t1_hit,
+                    "t2_hit": t2_hit,
+                    "sl_hit": sl_hit,
+                    "t1_exit_price": round(float(t1_exit), 2),
+                    "t2_exit_price": round(float(t2_exit), 2),
+                    "actual_exit_price": round(float(exit_px), 2),
+                    "actual_exit_time": when(bar),
+                    "exit_reason": reason,
+                    "pnl_t1_rs": _pnl(direction, e, float(t1_exit), lot_qty),
+                    "pnl_t2_rs": _pnl(direction, e, float(t2_exit), lot_qty),
+                    "actual_pnl_rs": _pnl(direction, e, float(exit_px), lot_qty),
+                    "max_favorable": round(float(mfe), 2),
+                    "max_adverse": round(float(mae), 2),
+                    "holding_min": int((int(a["ts_ns"][bar]) - int(a["ts_ns"][i])) // NS_PER_SEC // 60),
+                }
+            )
+            return row
+
+        out[i] = build
+    return out
+
+
+# --- process-pool sweep over shared memory-mapped columns ----------------------
+
+_WORKER: Dict[str, Any] = {}
+
+
+def write_column_store(packs: Sequence[Dict[str, np.ndarray]], directory: Path) -> np.ndarray:
+    """Concatenate every symbol's columns into ``<col>.npy`` files; returns row offsets (len = symbols + 1)."""
+    offsets = np.zeros(len(packs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(p["close"]) for p in packs])
+    for c in COLUMNS:
+        col = np.lib.format.open_memmap(
+            str(directory / f"{c}.npy"), mode="w+", dtype=np.int64 if c.endswith("_ns") else np.float64, shape=(int(offsets[-1]),)
+        )
+        for k, p in enumerate(packs):
+            col[offsets[k] : offsets[k + 1]] = p[c]
+        col.flush()
+        del col
+    np.save(directory / "offsets.npy", offsets)
+    return offsets
+
+
+def _init_worker(store_dir: str, meta: List[Dict[str, Any]], variants, from_d, to_d, nifty_closes, nifty_vwaps) -> None:
+    d = Path(store_dir)
+    _WORKER.update(
+        cols={c: np.load(d / f"{c}.npy", mmap_mode="r") for c in COLUMNS},
+        offsets=np.load(d / "offsets.npy"),
+        meta=meta,
+        variants=variants,
+        from_d=from_d,
+        to_d=to_d,
+        nifty_closes=nifty_closes,
+        nifty_vwaps=nifty_vwaps,
+    )
+
+
+def _run_chunk(sym_ids: List[int]) -> List[Tuple[int, List[Tuple[Rows, Rows]]]]:
+    w = _WORKER
+    out = []
+    for s in sym_ids:
+        lo, hi = int(w["offsets"][s]), int(w["offsets"][s + 1])
+        arrays = {c: np.asarray(w["cols"][c][lo:hi]) for c in COLUMNS}
+        m = w["meta"][s]
+        sig = SymbolSignals(arrays, w["from_d"], w["to_d"])
+        out.append(
+            (
+                s,
+                run_symbol_variants(
+                    sig,
+                    symbol=m["symbol"],
+                    instrument_key=m["instrument_key"],
+                    lot_qty=m["lot_qty"],
+                    variants=w["variants"],
+                    nifty_closes=w["nifty_closes"],
+                    nifty_vwaps=w["nifty_vwaps"],
+                ),
+            )
+        )
+    return out
+
+
+def run_sweep(
+    items: Sequence[Tuple[str, Dict[str, Any]]],
+    variants: Sequence[Dict[str, Any]],
+    *,
+    from_d: date,
+    to_d: date,
+    nifty_closes: Dict,
+    nifty_vwaps: Dict,
+    workers: Optional[int] = None,
+    chunk_size: int = 8,
+) -> List[Tuple[Rows, Rows]]:
+    """
+    Variant x symbol grid. ``items`` are ``(symbol, {"df", "ikey", "lot"})`` as built by
+    ``run_backtest_v3.main``. Returns ``[(trades, skipped)]`` per variant with rows in the same
+    symbol order as the serial loop. ``workers=0`` runs in-process.
+    """
+    meta = [{"symbol": sym, "instrument_key": pack["ikey"], "lot_qty": pack["lot"]} for sym, pack in items]
+    packs = [pack.get("arrays") or prepare_arrays(pack["df"]) for _, pack in items]
+    per_symbol: List[Optional[List[Tuple[Rows, Rows]]]] = [None] * len(items)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 0 or len(items) <= chunk_size:
+        for s, (m, arrays) in enumerate(zip(meta, packs)):
+            per_symbol[s] = run_symbol_variants(
+                SymbolSignals(arrays, from_d, to_d),
+                symbol=m["symbol"],
+                instrument_key=m["instrument_key"],
+                lot_qty=m["lot_qty"],
+                variants=variants,
+                nifty_closes=nifty_closes,
+                nifty_vwaps=nifty_vwaps,
+            )
+    else:
+        with tempfile.TemporaryDirectory(prefix="ha_sweep_") as d:
+            write_column_store(packs, Path(d))
+            chunks = [list(range(k, min(k + chunk_size, len(items)))) for k in range(0, len(items), chunk_size)]
+            init = (d, meta, list(variants), from_d, to_d, nifty_closes, nifty_vwaps)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init) as pool:
+                for part in pool.map(_run_chunk, chunks):
+                    for s, res in part:
+                        per_symbol[s] = res
+    out: List[Tuple[Rows, Rows]] = []
+    for v in range(len(variants)):
+        trades: Rows = []
+        skipped: Rows = []
+        for res in per_symbol:
+            trades.extend(res[v][0])
+            skipped.extend(res[v][1])
+        out.append((trades, skipped))
+    return out
@@ -6,7 +6,7 @@ import json
 import logging
 import sys
 import time
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import quote
@@ -28,7 +28,9 @@ RR_T2 = 3
 LARGE_CANDLE_THRESHOLD_PCT = 0.3
 FORCED_EXIT_TIME = "15:00"
 
-CANDLE_DIR = ROOT / "data" / "candles"
+CANDLE_DIR = ROOT / "data" / "candles"  # legacy per-symbol JSON, read when the store has nothing
+STORE_INTERVAL = "minutes/15"
+WARMUP_DAYS = 14
 LOG_DIR = ROOT / "logs"
 SLEEP_BETWEEN_CALLS = 0.12
 BATCH_SIZE = 50
@@ -90,7 +92,16 @@ def _cache_path(symbol: str) -> Path:
     return CANDLE_DIR / f"{safe}_15min.json"
 
 
-def cache_ok(symbol: str) -> bool:
+def _window(from_d: date, to_d: date) -> Tuple[date, date]:
+    return from_d - timedelta(days=WARMUP_DAYS), to_d
+
+
+def cache_ok(symbol: str, instrument_key: Optional[str] = None) -> bool:
+    if instrument_key:
+        from backend.services.market_data.candle_store import get_candle_store
+
+        a, b = _window(date.fromisoformat(BACKTEST_FROM), date.fromisoformat(BACKTEST_TO))
+        return not get_candle_store().missing_sessions(instrument_key, STORE_INTERVAL, a, b)
     p = _cache_path(symbol)
     return p.exists() and p.stat().st_size > 20
 
@@ -101,18 +112,19 @@ def _headers() -> Dict[str, str]:
     return upstox_service.get_headers()
 
 
-def fetch_chunk(instrument_key: str, to_d: date, from_d: date) -> List[Dict[str, Any]]:
+def fetch_chunk(instrument_key: str, to_d: date, from_d: date) -> Optional[List[Dict[str, Any]]]:
     # TEMP: Upstox data fetch for backtest — not for live trading.
     # V2 does not accept 15minute; build 15m bars from 1-minute candles.
     raw_1m = _http_candles(instrument_key, "1minute", to_d, from_d)
     if not raw_1m:
-        return []
+        return raw_1m
     from backend.services.upstox_service import _aggregate_1m_to_n_minute
 
     return _aggregate_1m_to_n_minute(raw_1m, 15)
 
 
-def _http_candles(instrument_key: str, interval: str, to_d: date, from_d: date) -> List[Dict[str, Any]]:
+def _http_candles(instrument_key: str, interval: str, to_d: date, from_d: date) -> Optional[List[Dict[str, Any]]]:
+    """Candles for ``[from_d, to_d]``; ``[]`` when Upstox has none, None when the request failed."""
     key_enc = quote(instrument_key, safe="")
     url = (
         "https://api.upstox.com/v2/historical-candle/"
@@ -135,11 +147,11 @@ def _http_candles(instrument_key: str, interval: str, to_d: date, from_d: date)
             continue
         if resp.status_code != 200:
             logger.warning("HTTP %s for %s: %s", resp.status_code, instrument_key, resp.text[:200])
-            return []
+            return None
         body = resp.json()
         if body.get("status") != "success":
             logger.warning("no data %s: %s", instrument_key, body.get("message") or body.get("status"))
-            return []
+            return None
         raw = (body.get("data") or {}).get("candles") or []
         rows: List[Dict[str, Any]] = []
         for c in raw:
@@ -157,36 +169,51 @@ def _http_candles(instrument_key: str, interval: str, to_d: date, from_d: date)
             )
         return rows
     logger.warning("gave up fetching %s", instrument_key)
-    return []
+    return None
 
 
-def fetch_symbol(symbol: str, instrument_key: str, from_d: date, to_d: date) -> int:
-    if cache_ok(symbol):
-        return json.loads(_cache_path(symbol).read_text()).get("count") or 0
-    warmup_from = from_d - timedelta(days=14)
+def fetch_range(instrument_key: str, _interval: str, from_d: date, to_d: date) -> Optional[List[Dict[str, Any]]]:
+    """Candle-store ``RangeFetcher``: 15m bars for ``[from_d, to_d]`` in ``CHUNK_DAYS`` requests."""
     merged: Dict[str, Dict[str, Any]] = {}
-    for a, b in _date_chunks(warmup_from, to_d):
-        for row in fetch_chunk(instrument_key, b, a):
+    for a, b in _date_chunks(from_d, to_d):
+        rows = fetch_chunk(instrument_key, b, a)
+        if rows is None:
+            return None
+        for row in rows:
             merged[str(row["timestamp"])] = row
-    candles = sorted(merged.values(), key=lambda r: r["timestamp"])
-    CANDLE_DIR.mkdir(parents=True, exist_ok=True)
-    payload = {
-        "symbol": symbol,
-        "instrument_key": instrument_key,
-        "from": from_d.isoformat(),
-        "to": to_d.isoformat(),
-        "interval": CANDLE_INTERVAL,
-        "count": len(candles),
-        "candles": candles,
-        "fetched_at": datetime.now().isoformat(),
-    }
-    _cache_path(symbol).write_text(json.dumps(payload), encoding="utf-8")
-    if not candles:
-        logger.warning("empty candles for %s (%s)", symbol, instrument_key)
-    return len(candles)
+    return sorted(merged.values(), key=lambda r: r["timestamp"])
 
 
-def load_cached(symbol: str) -> Optional[Dict[str, Any]]:
+def fetch_symbol(symbol: str, instrument_key: str, from_d: date, to_d: date) -> int:
+    """Fill the shared candle store for the backtest window (+ warm-up); only missing sessions are fetched."""
+    from backend.services.market_data.candle_store import get_candle_store
+
+    a, b = _window(from_d, to_d)
+    series, ok = get_candle_store().ensure(instrument_key, STORE_INTERVAL, a, b, fetch_range)
+    if not ok:
+        logger.warning("incomplete fetch for %s (%s)", symbol, instrument_key)
+    if not len(series):
+        logger.warning("empty candles for %s (%s)", symbol, instrument_key)
+    return len(series)
+
+
+def load_cached(symbol: str, instrument_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Backtest-window candles from the shared store (by ``instrument_key``), else the legacy JSON file."""
+    if instrument_key:
+        from backend.services.market_data.candle_store import get_candle_store
+
+        a, b = _window(date.fromisoformat(BACKTEST_FROM), date.fromisoformat(BACKTEST_TO))
+        candles = get_candle_store().candles(instrument_key, STORE_INTERVAL, a, b)
+        if candles:
+            return {
+                "symbol": symbol,
+                "instrument_key": instrument_key,
+                "from": BACKTEST_FROM,
+                "to": BACKTEST_TO,
+                "interval": CANDLE_INTERVAL,
+                "count": len(candles),
+                "candles": candles,
+            }
     p = _cache_path(symbol)
     if not p.exists():
         return None
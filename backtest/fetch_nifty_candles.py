@@ -23,7 +23,7 @@ def main() -> None:
     from_d = date.fromisoformat(BACKTEST_FROM)
     to_d = date.fromisoformat(BACKTEST_TO)
     n = fetch_symbol(NIFTY_SYMBOL, NIFTY_KEY, from_d, to_d)
-    cached = load_cached(NIFTY_SYMBOL)
+    cached = load_cached(NIFTY_SYMBOL, NIFTY_KEY)
     logger.info("NIFTY50 15m bars=%s cached=%s", n, bool(cached and cached.get("candles")))
 
 
@@ -204,7 +204,7 @@ def main() -> None:
     try:
         for i, u in enumerate(universe, 1):
             sym, ikey = u["stock"], u["ikey"]
-            cached = load_cached(sym)
+            cached = load_cached(sym, ikey)
             if not cached or not cached.get("candles"):
                 logger.warning("no cache for %s — skip", sym)
                 continue
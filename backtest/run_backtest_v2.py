@@ -16,7 +16,7 @@ if str(ROOT) not in sys.path:
 
 from backtest.engine_v2 import candles_to_df, nifty_session_vwap, run_prepared
 from backtest.fetch_candles import BACKTEST_FROM, BACKTEST_TO, load_cached, load_universe
-from backtest.fetch_nifty_candles import NIFTY_SYMBOL
+from backtest.fetch_nifty_candles import NIFTY_KEY, NIFTY_SYMBOL
 
 LOG_DIR = ROOT / "logs"
 RESULTS_JSON = ROOT / "data" / "ha_backtest_results_v2.json"
@@ -197,7 +197,7 @@ def main() -> None:
     to_d = date.fromisoformat(BACKTEST_TO)
     universe = load_universe()
     lots = _lot_index()
-    nifty = load_cached(NIFTY_SYMBOL) or {}
+    nifty = load_cached(NIFTY_SYMBOL, NIFTY_KEY) or {}
     n_closes, n_vwaps, used_vol = nifty_session_vwap(nifty.get("candles") or [])
     if not used_vol:
         logger.warning("Nifty volume missing or zero — using typical-price expanding mean VWAP")
@@ -205,7 +205,7 @@ def main() -> None:
 
     frames = {}
     for u in universe:
-        cached = load_cached(u["stock"])
+        cached = load_cached(u["stock"], u["ikey"])
         if not cached or not cached.get("candles"):
             continue
         frames[u["stock"]] = {
@@ -3,7 +3,9 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 import sys
+import time
 from datetime import date, datetime
 from pathlib import Path
 from typing import Any, Dict, List
@@ -15,13 +17,17 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 from backtest.engine_v2 import candles_to_df, nifty_session_vwap, run_prepared
+from backtest.engine_vec import run_sweep
 from backtest.fetch_candles import BACKTEST_FROM, BACKTEST_TO, load_cached, load_universe
-from backtest.fetch_nifty_candles import NIFTY_SYMBOL
+from backtest.fetch_nifty_candles import NIFTY_KEY, NIFTY_SYMBOL
 from backtest.run_backtest_v2 import _json_safe, _lot_index, _ts
 
 LOG_DIR = ROOT / "logs"
 RESULTS_JSON = ROOT / "data" / "ha_backtest_results_v3.json"
 logger = logging.getLogger("ha_v3")
+# "vec": NumPy engine, variant x symbol grid on a process pool; "v2": serial engine_v2 loop
+ENGINE = os.getenv("HA_BT_ENGINE", "vec").strip().lower()
+WORKERS = int(os.getenv("HA_BT_WORKERS", str(os.cpu_count() or 1)))
 
 VARIANTS: List[Dict[str, Any]] = [
     {"name": "v1_baseline", "tier": "ORIGINAL", "rr_t1": 2.0, "rr_t2": 3.0, "entry_cutoff": "14:45", "use_fixed_sl": False, "fixed_sl_pct": None, "sl_cap_rs": 5000, "nifty_filter": False, "short_only": False, "forced_exit": "15:00", "description": "v1: Original (candle SL, 1:2/1:3 RR, ₹5K cap)"},
@@ -193,7 +199,7 @@ def main() -> None:
     to_d = date.fromisoformat(BACKTEST_TO)
     universe = load_universe()
     lots = _lot_index()
-    nifty = load_cached(NIFTY_SYMBOL) or {}
+    nifty = load_cached(NIFTY_SYMBOL, NIFTY_KEY) or {}
     n_closes, n_vwaps, used_vol = nifty_session_vwap(nifty.get("candles") or [])
     if not used_vol:
         logger.warning("Nifty volume missing or zero — using typical-price expanding mean VWAP")
@@ -201,7 +207,7 @@ def main() -> None:
 
     frames = {}
     for u in universe:
-        cached = load_cached(u["stock"])
+        cached = load_cached(u["stock"], u["ikey"])
         if not cached or not cached.get("candles"):
             continue
         frames[u["stock"]] = {
@@ -215,29 +221,45 @@ def main() -> None:
     all_skips: List[Dict[str, Any]] = []
     summaries = []
     items = [(sym, pack) for sym, pack in frames.items() if pack["lot"] > 0]
-    for variant in VARIANTS:
+    swept = None
+    if ENGINE == "vec":
+        t0 = time.perf_counter()
+        swept = run_sweep(
+            items,
+            VARIANTS,
+            from_d=from_d,
+            to_d=to_d,
+            nifty_closes=n_closes,
+            nifty_vwaps=n_vwaps,
+            workers=WORKERS,
+        )
+        logger.info("vectorized sweep: %s variants x %s symbols in %.1fs (%s workers)", len(VARIANTS), len(items), time.perf_counter() - t0, WORKERS)
+    for vi, variant in enumerate(VARIANTS):
         print(f"Running {variant['name']}... { {k: variant[k] for k in ('fixed_sl_pct', 'short_only', 'forced_exit', 'nifty_filter')} }")
         trows: List[Dict[str, Any]] = []
         srows: List[Dict[str, Any]] = []
-        for i, (sym, pack) in enumerate(items, 1):
-            if i % 10 == 0:
-                print(f"  {variant['name']}: {i}/{len(items)} symbols")
-            tr, sk = run_prepared(
-                pack["df"],
-                symbol=sym,
-                instrument_key=pack["ikey"],
-                lot_qty=pack["lot"],
-                from_d=from_d,
-                to_d=to_d,
-                variant=variant,
-                nifty_closes=n_closes,
-                nifty_vwaps=n_vwaps,
-            )
-            trows.extend(tr)
-            srows.extend(sk)
-            for row in tr:
-                if float(row.get("sl_rs") or 0) > 20000:
-                    logger.warning("SL_RS outlier %s %s ₹%s", variant["name"], sym, row.get("sl_rs"))
+        if swept is not None:
+            trows, srows = swept[vi]
+        else:
+            for i, (sym, pack) in enumerate(items, 1):
+                if i % 10 == 0:
+                    print(f"  {variant['name']}: {i}/{len(items)} symbols")
+                tr, sk = run_prepared(
+                    pack["df"],
+                    symbol=sym,
+                    instrument_key=pack["ikey"],
+                    lot_qty=pack["lot"],
+                    from_d=from_d,
+                    to_d=to_d,
+                    variant=variant,
+                    nifty_closes=n_closes,
+                    nifty_vwaps=n_vwaps,
+                )
+                trows.extend(tr)
+                srows.extend(sk)
+        for row in trows:
+            if float(row.get("sl_rs") or 0) > 20000:
+                logger.warning("SL_RS outlier %s %s ₹%s", variant["name"], row.get("symbol"), row.get("sl_rs"))
         all_trades.extend(trows)
         all_skips.extend(srows)
         summ = {
@@ -19,11 +19,15 @@ from pathlib import Path
 from statistics import median
 from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pytz
 from sqlalchemy import text
 
 from backend.config import get_instruments_file_path, settings
 from backend.database import SessionLocal
+from backend.services.asof_index import NS_PER_MIN, AsOfIndex, ist_ns, to_epoch_ns
+from backend.services.instrument_master import get_instrument_master
+from backend.services.market_data.candle_store import historical_candles
 from backend.services.smart_futures_backtest.april_2026_universe import (
     load_april_2026_futures_by_underlying,
     use_fixed_april_2026_futures,
@@ -144,50 +148,76 @@ def sort_candles(candles: Optional[List[dict]]) -> List[dict]:
     return sorted(candles or [], key=lambda c: str(c.get("timestamp") or ""))
 
 
-def find_candle(candles: Sequence[dict], session_d: date, hh: int, mm: int) -> Optional[dict]:
-    for c in candles:
+_CANDLE_INDEX: Dict[int, Tuple[Sequence[dict], int, AsOfIndex]] = {}
+
+
+def candle_asof_index(candles: Sequence[dict]) -> AsOfIndex:
+    """
+    As-of index over ``candles`` (timestamps parsed once with ``parse_dt_ist``). The find_* helpers are
+    called several times per candle list per session, so the last few indexes are kept by list identity.
+    """
+    hit = _CANDLE_INDEX.get(id(candles))
+    if hit is not None and hit[0] is candles and hit[1] == len(candles):
+        return hit[2]
+    pos: List[int] = []
+    ts: List[int] = []
+    for k, c in enumerate(candles):
         dt = parse_dt_ist(c.get("timestamp"))
-        if dt and dt.date() == session_d and dt.hour == hh and dt.minute == mm:
-            return c
-    return None
+        if dt is not None:
+            pos.append(k)
+            ts.append(to_epoch_ns(dt))
+    idx = AsOfIndex(ts, pos)
+    if len(_CANDLE_INDEX) >= 16:
+        _CANDLE_INDEX.pop(next(iter(_CANDLE_INDEX)))
+    _CANDLE_INDEX[id(candles)] = (candles, len(candles), idx)
+    return idx
+
+
+def _pick(candles: Sequence[dict], idx: AsOfIndex, lo: int, hi: int) -> dict:
+    """First candle in list order among sorted positions [lo, hi)."""
+    return candles[int(idx.order[lo:hi].min())]
+
+
+def find_candle(candles: Sequence[dict], session_d: date, hh: int, mm: int) -> Optional[dict]:
+    idx = candle_asof_index(candles)
+    target = ist_ns(session_d, hh, mm)
+    lo = int(np.searchsorted(idx.ts, target, side="left"))
+    hi = int(np.searchsorted(idx.ts, target + NS_PER_MIN, side="left"))
+    return _pick(candles, idx, lo, hi) if hi > lo else None
 
 
 def find_candle_at_or_after(
     candles: Sequence[dict], session_d: date, hh: int, mm: int, max_delay_min: int = 20
 ) -> Optional[dict]:
-    target = IST.localize(datetime.combine(session_d, dt_time(hh, mm)))
-    best = None
-    best_delay = None
-    for c in candles:
-        dt = parse_dt_ist(c.get("timestamp"))
-        if not dt or dt.date() != session_d or dt < target:
-            continue
-        delay = int((dt - target).total_seconds() // 60)
-        if delay < 0 or delay > max_delay_min:
-            continue
-        if best is None or delay < (best_delay or 10**9):
-            best = c
-            best_delay = delay
-    return best
+    idx = candle_asof_index(candles)
+    target = ist_ns(session_d, hh, mm)
+    pos = idx.at_or_after(target, same_session=True)
+    if pos < 0:
+        return None
+    delay = int((idx.ts[pos] - target) // NS_PER_MIN)
+    if delay > max_delay_min:
+        return None
+    # Smallest whole-minute delay wins; ties keep the first candle in list order.
+    hi = int(np.searchsorted(idx.ts, target + (delay + 1) * NS_PER_MIN, side="left"))
+    hi = min(hi, idx.session_range(session_d)[1])
+    return _pick(candles, idx, pos, hi)
 
 
 def find_candle_at_or_before(
     candles: Sequence[dict], session_d: date, hh: int, mm: int, max_lookback_min: int = 20
 ) -> Optional[dict]:
-    target = IST.localize(datetime.combine(session_d, dt_time(hh, mm)))
-    best = None
-    best_back = None
-    for c in candles:
-        dt = parse_dt_ist(c.get("timestamp"))
-        if not dt or dt.date() != session_d or dt > target:
-            continue
-        back = int((target - dt).total_seconds() // 60)
-        if back < 0 or back > max_lookback_min:
-            continue
-        if best is None or back < (best_back or 10**9):
-            best = c
-            best_back = back
-    return best
+    idx = candle_asof_index(candles)
+    target = ist_ns(session_d, hh, mm)
+    pos = idx.asof(target, same_session=True)
+    if pos < 0:
+        return None
+    back = int((target - idx.ts[pos]) // NS_PER_MIN)
+    if back > max_lookback_min:
+        return None
+    # Smallest whole-minute lookback wins; ties keep the first candle in list order.
+    lo = int(np.searchsorted(idx.ts, target - (back + 1) * NS_PER_MIN, side="right"))
+    lo = max(lo, idx.session_range(session_d)[0])
+    return _pick(candles, idx, lo, pos + 1)
 
 
 def candles_for_day(candles: Sequence[dict], session_d: date) -> List[dict]:
@@ -282,6 +312,21 @@ def load_instruments() -> List[Dict[str, Any]]:
     return json.loads(p.read_text(encoding="utf-8"))
 
 
+def _instrument_master():
+    p = get_instruments_file_path()
+    if not p.exists():
+        raise FileNotFoundError(f"instruments file missing: {p}")
+    return get_instrument_master(p)
+
+
+def load_futures_instruments() -> List[Dict[str, Any]]:
+    """NSE_FO FUT rows only (indexed instrument master; full JSON parse if unavailable)."""
+    master = _instrument_master()
+    if master is None:
+        return load_instruments()
+    return master.by_segment("NSE_FO", "FUT")
+
+
 def is_stock_future(inst: Dict[str, Any]) -> bool:
     seg = str(inst.get("segment") or "").upper()
     if "NSE_FO" not in seg and "NFO" not in seg:
@@ -294,7 +339,7 @@ def is_stock_future(inst: Dict[str, Any]) -> bool:
 
 def front_month_resolver(session_d: date, symbols: Sequence[str]) -> Dict[str, ContractInfo]:
     target_ms = int(IST.localize(datetime.combine(session_d, dt_time(13, 30))).timestamp() * 1000)
-    rows = [r for r in load_instruments() if isinstance(r, dict) and is_stock_future(r)]
+    rows = [r for r in load_futures_instruments() if isinstance(r, dict) and is_stock_future(r)]
     by_sym: Dict[str, List[Dict[str, Any]]] = {}
     for r in rows:
         und = str(r.get("underlying_symbol") or "").strip().upper()
@@ -324,7 +369,9 @@ def front_month_resolver(session_d: date, symbols: Sequence[str]) -> Dict[str, C
 
 def contract_info_from_instrument_key(stock: str, futures_symbol: str, instrument_key: str) -> Optional[ContractInfo]:
     """Lot/expiry from instruments JSON for a known FUT instrument_key (matches smart_futures_backtest universe)."""
-    for c in load_instruments():
+    master = _instrument_master()
+    candidates = [master.get(instrument_key)] if master is not None else load_instruments()
+    for c in candidates:
         if not isinstance(c, dict):
             continue
         if str(c.get("instrument_key") or "").strip() != instrument_key:
@@ -357,11 +404,11 @@ def fetch_futures_day_candles(
         if not raw_1m:
             raw_1m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/1", 5) or []
     else:
-        raw_1m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/1", 0, range_end_date=session_d) or []
+        raw_1m = historical_candles(ux, ci.instrument_key, "minutes/1", 0, range_end_date=session_d) or []
         if not raw_1m:
-            raw_1m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/1", 1, range_end_date=session_d) or []
+            raw_1m = historical_candles(ux, ci.instrument_key, "minutes/1", 1, range_end_date=session_d) or []
         if not raw_1m:
-            raw_1m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/1", 5, range_end_date=session_d) or []
+            raw_1m = historical_candles(ux, ci.instrument_key, "minutes/1", 5, range_end_date=session_d) or []
     day_1m = candles_for_day(sort_candles(raw_1m), session_d)
     if day_1m:
         f1.write_text(json.dumps(day_1m), encoding="utf-8")
@@ -372,11 +419,11 @@ def fetch_futures_day_candles(
         if not raw_5m:
             raw_5m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/5", 5) or []
     else:
-        raw_5m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/5", 0, range_end_date=session_d) or []
+        raw_5m = historical_candles(ux, ci.instrument_key, "minutes/5", 0, range_end_date=session_d) or []
         if not raw_5m:
-            raw_5m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/5", 1, range_end_date=session_d) or []
+            raw_5m = historical_candles(ux, ci.instrument_key, "minutes/5", 1, range_end_date=session_d) or []
         if not raw_5m:
-            raw_5m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/5", 5, range_end_date=session_d) or []
+            raw_5m = historical_candles(ux, ci.instrument_key, "minutes/5", 5, range_end_date=session_d) or []
     day_5m = candles_for_day(sort_candles(raw_5m), session_d)
     if day_5m:
         f5.write_text(json.dumps(day_5m), encoding="utf-8")
@@ -593,9 +640,9 @@ def _run_legacy_backtest(args: argparse.Namespace) -> Tuple[List[BacktestRow], D
             entry_dt = parse_dt_ist(c1330.get("timestamp")) or IST.localize(datetime.combine(sd, dt_time(th, tm)))
             entry_ts = entry_dt.isoformat()
             candles_by_symbol[sym] = candles
-            raw_5m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/5", 0, range_end_date=sd) or []
+            raw_5m = historical_candles(ux, ci.instrument_key, "minutes/5", 0, range_end_date=sd) or []
             if not raw_5m:
-                raw_5m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/5", 1, range_end_date=sd) or []
+                raw_5m = historical_candles(ux, ci.instrument_key, "minutes/5", 1, range_end_date=sd) or []
             m5_by_symbol[sym] = candles_for_day(sort_candles(raw_5m), sd)
 
             rows.append(
@@ -1112,9 +1159,9 @@ def _run_smart_futures_selection(args: argparse.Namespace) -> Tuple[List[Backtes
             if exit_data_missing and is_today_session:
                 r.final_exit_reason = "NO_DATA_FOR_EXIT_CONDITION"
                 r.error = "no_data_for_exit_condition"
-            raw_5m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/5", 0, range_end_date=sd) or []
+            raw_5m = historical_candles(ux, ci.instrument_key, "minutes/5", 0, range_end_date=sd) or []
             if not raw_5m:
-                raw_5m = ux.get_historical_candles_by_instrument_key(ci.instrument_key, "minutes/5", 1, range_end_date=sd) or []
+                raw_5m = historical_candles(ux, ci.instrument_key, "minutes/5", 1, range_end_date=sd) or []
             m5_by_symbol[r.symbol] = candles_for_day(sort_candles(raw_5m), sd)
             candles_by_symbol[r.symbol] = candles
         except Exception as e:
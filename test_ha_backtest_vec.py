@@ -0,0 +1,87 @@
+"""Vectorized HA Momentum engine must match engine_v2.run_prepared row-for-row."""
+import logging
+import random
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from backtest.engine import IST
+from backtest.engine_v2 import run_prepared
+from backtest.engine_vec import SymbolSignals, prepare_arrays, run_symbol_variants, run_sweep
+from backtest.run_backtest_v3 import VARIANTS
+
+FROM_D, TO_D = date(2026, 7, 8), date(2026, 8, 14)
+
+
+def _frame(seed: int, days: int = 30) -> pd.DataFrame:
+    """15m bars with noisy indicator columns so crossovers (and every exit path) are frequent."""
+    rnd = random.Random(seed)
+    rows, px, d = [], 100.0 + seed, date(2026, 7, 1)
+    while len({r["ts"].date() for r in rows}) < days:
+        if d.weekday() < 5:
+            n_bars = 25 if rnd.random() > 0.1 else rnd.randint(8, 24)  # some short sessions
+            for b in range(n_bars):
+                ts = pd.Timestamp(datetime(d.year, d.month, d.day, 9, 15) + timedelta(minutes=15 * b)).tz_localize(IST)
+                o = px
+                c = o * (1 + rnd.gauss(0, 0.004))
+                px = c
+                h = max(o, c) * (1 + abs(rnd.gauss(0, 0.002)))
+                lo = min(o, c) * (1 - abs(rnd.gauss(0, 0.002)))
+                trend = rnd.choice((-1, 1))
+                rows.append(
+                    {
+                        "ts": ts, "open": o, "high": h, "low": lo, "close": c,
+                        "ema5": c * (1 + rnd.gauss(0, 0.002)), "ema15": c,
+                        "ema50": c * (1 - trend * 0.004) if rnd.random() > 0.2 else float("nan"),
+                        "macd_hist": trend * abs(rnd.gauss(0, 1)),
+                        "adx14": rnd.uniform(15, 40), "adx14_prev": rnd.uniform(15, 40),
+                    }
+                )
+        d += timedelta(days=1)
+    return pd.DataFrame(rows)
+
+
+def _nifty(df: pd.DataFrame):
+    rnd = random.Random(7)
+    closes, vwaps = {}, {}
+    for ts in df["ts"]:
+        if rnd.random() < 0.15:
+            continue  # missing Nifty bars exercise the forward-fill lookup
+        closes[ts] = 20000 + rnd.uniform(-50, 50)
+        vwaps[ts] = 20000.0
+    return closes, vwaps
+
+
+def test_vectorized_engine_matches_engine_v2():
+    logging.getLogger("ha_engine_v2").setLevel(logging.ERROR)
+    reasons = set()
+    for seed, lot in ((1, 50), (2, 1), (3, 100000), (4, 0), (5, 250)):
+        df = _frame(seed)
+        closes, vwaps = _nifty(df)
+        vec = run_symbol_variants(
+            SymbolSignals(prepare_arrays(df), FROM_D, TO_D),
+            symbol=f"S{seed}", instrument_key=f"NSE_FO|{seed}", lot_qty=lot,
+            variants=VARIANTS, nifty_closes=closes, nifty_vwaps=vwaps,
+        )
+        for variant, (trades, skipped) in zip(VARIANTS, vec):
+            ref_trades, ref_skipped = run_prepared(
+                df, symbol=f"S{seed}", instrument_key=f"NSE_FO|{seed}", lot_qty=lot,
+                from_d=FROM_D, to_d=TO_D, variant=variant, nifty_closes=closes, nifty_vwaps=vwaps,
+            )
+            assert trades == ref_trades, (seed, variant["name"])
+            assert skipped == ref_skipped, (seed, variant["name"])
+            reasons.update(t.get("exit_reason") for t in trades)
+            reasons.update(s["reason"] for s in skipped)
+    assert {"SL_HIT", "T1_THEN_SL", "T1_THEN_T2", "TIME_EXIT", "SL_EXCEEDS_CAP",
+            "LONG_FILTERED_SHORT_ONLY_MODE", "NIFTY_BELOW_VWAP_LONG_FILTERED", "ENTRY_AFTER_1330_CUTOFF"} <= reasons
+
+
+def test_process_pool_sweep_matches_serial():
+    logging.getLogger("ha_engine_v2").setLevel(logging.ERROR)
+    items = [(f"S{s}", {"df": _frame(s, days=12), "ikey": f"k{s}", "lot": 50}) for s in range(6)]
+    closes, vwaps = _nifty(items[0][1]["df"])
+    kw = dict(from_d=date(2026, 7, 1), to_d=TO_D, nifty_closes=closes, nifty_vwaps=vwaps)
+    serial = run_sweep(items, VARIANTS[:4], workers=0, **kw)
+    pooled = run_sweep(items, VARIANTS[:4], workers=2, chunk_size=2, **kw)
+    assert pooled == serial
+    assert sum(len(t) for t, _ in serial) > 0